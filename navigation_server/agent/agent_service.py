@@ -11,62 +11,37 @@
 
 
 import subprocess
-import shlex
 import threading
 import logging
-import time
 import signal
 from socket import gethostname
 
-from navigation_server.generated.agent_pb2 import NavigationSystemMsg, AgentResponse
+from navigation_server.generated.agent_pb2 import NavigationSystemMsg, AgentResponse, ServiceStateMsg
 from navigation_server.generated.services_server_pb2 import SystemProcessMsg, Server, Connection, ProcessState
 from navigation_server.generated.agent_pb2_grpc import AgentServicer, add_AgentServicer_to_server
 from navigation_server.router_common import (GrpcService, GenericTopServer, resolve_ref, copy_protobuf_data,
-                                                MessageServerGlobals, GrpcServer)
+                                                MessageServerGlobals, GrpcServer, open_dbus_connection,
+                                                DBusException, SystemdManager, SystemdUnit, UnitChangeListener)
 from navigation_server.nav_gpio import STNC_D7_Led, STNC_Gpio_Set
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
 
-def run_cmd(cmd:str):
-    _logger.debug("Agent run_cmd: %s" % cmd)
-    args = shlex.split(cmd)
-    try:
-        r = subprocess.run(args, capture_output=True, encoding='utf-8')
-    except Exception as e:
-        _logger.error('SendCmd %s error %s' % (args[0], e))
-        return -1, str(e)
-    if r.returncode != 0:
-        _logger.error("Agent error for command:%s" % args[0])
-        return r.returncode, 'Process return code %s' % r.returncode
-    lines = r.stdout.split('\n')
-    return 0, lines
-
-
-def run_systemd(cmd: str, service: str):
-    if cmd not in ('start', 'stop', 'restart', 'status'):
+def run_systemd(cmd: str, service: str, *options) -> int:
+    """
+    systemctl command on a service, used when systemd is not reachable through D-Bus
+    return the systemctl return code (status: 0 running, 3 inactive, 4 unknown service)
+    """
+    if cmd not in ('start', 'stop', 'restart', 'status', 'kill'):
         raise ValueError
-    args = ['systemctl', cmd, service]
+    args = ['systemctl', cmd, *options, service]
     try:
         r = subprocess.run(args, capture_output=True, encoding='utf-8')
     except Exception as e:
         _logger.error("systemctl execution error: %s" % e)
         return -1
-    _logger.debug("systemctl return code:%d" % r.returncode)
-    lines = r.stdout.split('\n')
-    # _logger.debug("stdout=%s" % lines)
-    return r.returncode, lines
-
-
-class AgentExecutor(threading.Thread):
-
-    def __init__(self, cmd: str):
-        self._cmd = cmd
-        super().__init__()
-
-    def run(self):
-        time.sleep(3.0)
-        run_cmd(self._cmd)
+    _logger.debug("systemctl %s %s return code:%d" % (cmd, service, r.returncode))
+    return r.returncode
 
 
 class SystemdProcess:
@@ -84,6 +59,7 @@ class SystemdProcess:
         STOPPED (int): State representing a stopped process.
     """
     (NOT_STARTED, RUNNING, STOPPED) = range(0,3)
+    JOB_TIMEOUT = 30.0
 
     def __init__(self, opts):
         self._name = opts.get('name', str, 'incognito')
@@ -95,8 +71,8 @@ class SystemdProcess:
         self._state = self.NOT_STARTED
         self._process_msg = None
         self._start_event = threading.Event()
-        self._pid = 0
-        self._control_group = None
+        self._agent = None
+        self._unit = None
 
     def __getattr__(self, attr_name):
         if self._process_msg is None:
@@ -108,76 +84,111 @@ class SystemdProcess:
             _logger.error(f"SystemdProcess missing {attr_name} attribute")
             raise
 
+    def attach(self, agent):
+        """
+        agent gives access to systemd (systemd property)
+        """
+        self._agent = agent
+
+    @property
+    def unit(self) -> SystemdUnit:
+        """
+        systemd unit followed through D-Bus, raise DBusException
+        """
+        if self._unit is None:
+            self._unit = self._agent.systemd.unit(self._service)
+        return self._unit
+
+    def _run_job(self, command: str) -> str:
+        """
+        queue the systemd job (start, stop, restart) and wait for its end, return the job result ('done' on success)
+        """
+        if not self._agent.systemd_available():
+            # systemctl waits for the end of the job
+            return 'done' if run_systemd(command, self._service) == 0 else 'failed'
+        try:
+            systemd = self._agent.systemd
+            job = getattr(systemd, f"{command}_unit")(self._service)
+            result = systemd.wait_job(job, self.JOB_TIMEOUT)
+        except DBusException as err:
+            _logger.error(f"Agent systemd job on {self._service} error: {err}")
+            return 'failed'
+        if result is None:
+            _logger.error(f"Agent systemd job {job} on {self._service} not finished within {self.JOB_TIMEOUT}s")
+            return 'timeout'
+        return result
+
     def start(self):
         _logger.info(f"Agent starting systemd service {self._service}")
-        if self.status() == 4:
+        code = self.status()
+        if code == 4:
             # non existent service
-            return
+            return code
         if self._state == self.RUNNING:
             _logger.error(f"Agent Service {self._service} already running")
             if not self._controlled:
-                return
+                return 0
             if self._process_msg is None:
                 # let's force registration
-                run_cmd(f"kill -{signal.SIGUSR1} {self._pid}")
-            return
+                self._kill(signal.SIGUSR1)
+            return 0
         self._start_event.clear()
-        code, lines = run_systemd('start', self._service)
-        if code == 0:
+        result = self._run_job('start')
+        if result != 'done':
+            _logger.error(f"Agent - systemd service {self._service} start {result}")
+            return 1
+        self._state = self.RUNNING
+        if not self._controlled:
+            return 0
+        elif not self._start_event.wait(20.0):
+            _logger.error(f"Agent - systemd process {self._service} did not start within 20s")
+            return -1
+        else:
+            _logger.info(f"Agent - service {self._service} successfully started")
+            return 0
+
+    def status(self, accounting: bool = False) -> int:
+        """
+        Status from the unit cache: 0 running, 3 inactive, 4 unknown service
+        accounting: read the memory and CPU usage from systemd (not signalled)
+        Without D-Bus, the status is the return code of systemctl status
+        """
+        if not self._agent.systemd_available():
+            return self._systemctl_status()
+        try:
+            unit = self.unit
+            if accounting and unit.exists:
+                unit.refresh_accounting()
+        except DBusException as err:
+            _logger.error(f"Agent service {self._service} status error: {err}")
+            return 4
+        code = unit.status_code()
+        if code == 4:
+            _logger.error(f"Agent service {self._service} is unknown")
+        elif code == 0:
             self._state = self.RUNNING
-            if not self._controlled:
-                return code
-            elif not self._start_event.wait(20.0):
-                _logger.error(f"Agent - systemd process {self._service} did not start within 20s")
-                return -1
-            else:
-                _logger.info(f"Agent - service {self._service} successfully started")
-                return code
+        elif unit.active_state in ('inactive', 'failed'):
+            self._state = self.NOT_STARTED
+        _logger.debug("Status for %s load %s state %s" % (self._service, unit.load_state, unit.active_state))
         return code
 
-    def status(self):
-        _logger.debug("Query status for service %s" % self._service)
-        code, lines = run_systemd('status', self._service)
-        loaded = False
-        active = False
-        state = 'unknown'
+    def _systemctl_status(self) -> int:
+        code = run_systemd('status', self._service)
         if code == 4:
             _logger.error(f"Agent service {self._service} is unknown")
-        elif code == 0 or code == 3:
-            in_cg = False
-            for line in lines:
-                if idx := line.find('Loaded') >= 0:
-                    loaded = True
-                elif (idx := line.find('Active')) >= 0:
-                    print("idx=",idx)
-                    idx += 8
-                    first_space = line.find(' ', idx)
-                    state = line[idx: first_space]
-                    if state == 'active':
-                        self._state = self.RUNNING
-                    elif state == 'inactive':
-                        self._state = self.NOT_STARTED
-                        break
-                elif (idx :=line.find('CGroup')) >= 0:
-                    # start Control group
-                    in_cg = True
-                    idx += 8
-                    self._control_group = line[idx:]
-                elif in_cg:
-                    idx = line.find('─')
-                    if idx < 0 :
-                        continue
-                    idx += 1
-                    idx2 = line.find(' ', idx)
-                    strpid = line[idx:idx2]
-                    if line.find('python3', idx2) > idx2:
-                        # ok we found it
-                        in_cg = False
-                        self._pid = int(strpid)
-                        break
-            _logger.debug("Status for %s loaded %s state %s" % (self._service, loaded, state))
+        elif code == 0:
+            self._state = self.RUNNING
+        elif code == 3:
+            self._state = self.NOT_STARTED
         return code
 
+    def fill_service_state(self, msg: ServiceStateMsg):
+        msg.name = self._name
+        # local states have the same values as ProcessState
+        msg.state = self._state
+        if self._unit is not None:
+            self._unit.as_protobuf(msg)
+
     def start_confirmation(self, process_msg: SystemProcessMsg):
         self._process_msg = process_msg
         self.debug_msg_attributes(['name', 'state', 'grpc_port', 'version', 'start_time', 'console_present'])
@@ -195,14 +206,23 @@ class SystemdProcess:
             except AttributeError:
                 _logger.debug(f"{attr} non existent")
 
+    def _kill(self, signal_number):
+        if not self._agent.systemd_available():
+            run_systemd('kill', self._service, '--kill-who=main', f"--signal={int(signal_number)}")
+            return
+        try:
+            self._agent.systemd.kill_unit(self._service, signal_number)
+        except DBusException as err:
+            _logger.error(f"Agent signal {signal_number} to {self._service} error: {err}")
+
     def send_sigint(self):
-        run_cmd(f"kill -{signal.SIGINT} {self._pid}")
+        self._kill(signal.SIGINT)
 
     def restart(self):
         # proceed to hard restart
         if self._state == self.RUNNING:
             _logger.info(f"Restarting process '{self.name}' service:{self._service}")
-            run_systemd('restart', self._service)
+            self._run_job('restart')
             return self.status()
         else:
             _logger.error(f"Agent cannot restart a process ({self.name}) that is not running")
@@ -213,8 +233,7 @@ class SystemdProcess:
         if self._state == self.RUNNING:
             _logger.info(f"Stopping process '{self.name}' service:{self._service}")
             self._state = self.STOPPED
-            self._pid = 0
-            run_systemd('stop', self._service)
+            self._run_job('stop')
         else:
             _logger.error(f"Agent cannot stop a process ({self.name}) that is not running")
 
@@ -318,8 +337,43 @@ class AgentServicerImpl(AgentServicer):
         resp.name = process.name
         _logger.debug(f"Process {process.name} console {resp.console_present}")
 
+    def StreamProcessStates(self, request, context):
+        try:
+            systemd = self._agent.systemd
+        except DBusException as err:
+            _logger.error(f"Agent cannot stream the process states: {err}")
+            return
+        listener = UnitChangeListener()
+        systemd.add_listener(listener)
+        _logger.info("Agent start streaming process states to %s" % context.peer())
+        try:
+            processes = {}
+            for process in list(self._agent.get_processes()):
+                if request.target and process.name != request.target:
+                    continue
+                if process.status() == 4:
+                    continue
+                processes[process.unit.name] = process
+                msg = ServiceStateMsg()
+                process.fill_service_state(msg)
+                yield msg
+            while context.is_active():
+                for unit in listener.get_changes(1.0):
+                    process = processes.get(unit)
+                    if process is None:
+                        continue
+                    process.status()
+                    msg = ServiceStateMsg()
+                    process.fill_service_state(msg)
+                    yield msg
+        finally:
+            systemd.remove_listener(listener)
+            _logger.info("Agent end of process states streaming to %s" % context.peer())
+
     def status(self, process:SystemdProcess, resp):
-        code = process.status()
+        code = process.status(accounting=True)
+        if code != 4:
+            process.fill_service_state(resp.service_state)
         if code == 0:
             # process is running
             resp.err_code = 0
@@ -417,32 +471,84 @@ class AgentServicerImpl(AgentServicer):
     def system_halt(self, resp):
         STNC_D7_Led.green_brightness(0)
         STNC_D7_Led.red_brightness(0)
-        ex = AgentExecutor('halt')
-        ex.start()
+        self._agent.system_target('halt.target')
         resp.err_code = 0
 
     def system_reboot(self, resp):
         STNC_D7_Led.green_brightness(0)
         STNC_D7_Led.red_brightness(0)
-        ex = AgentExecutor('reboot')
-        ex.start()
+        self._agent.system_target('reboot.target')
         resp.err_code = 0
 
 
 
 class AgentService(GrpcService):
     """
-
+    Supervision of the processes (systemd services) of the system
+    systemd is accessed through D-Bus, the units state is cached and updated by the systemd signals
+    When D-Bus is not available (no jeepney package or no bus), the services are controlled with systemctl
+    Options:
+        bus: D-Bus to reach systemd, SYSTEM (default) or a bus address
     """
+    SYSTEM_TARGET_DELAY = 3.0
+    control_service = True
+
     def __init__(self, opts):
         super().__init__(opts)
         self._processes = {}
+        self._bus = opts.get('bus', str, 'SYSTEM')
+        self._systemd = None
+        self._systemd_error = None
+        self._systemd_lock = threading.Lock()
 
     def finalize(self):
         super().finalize()
         add_AgentServicer_to_server(AgentServicerImpl(self), self.grpc_server)
 
+    @property
+    def systemd(self) -> SystemdManager:
+        """
+        systemd manager, connected on first use, raise DBusException
+        """
+        with self._systemd_lock:
+            if self._systemd is None:
+                if self._systemd_error is not None:
+                    raise DBusException(self._systemd_error.name, "systemd not reachable through D-Bus")
+                try:
+                    self._systemd = SystemdManager(open_dbus_connection(self._bus))
+                except DBusException as err:
+                    _logger.error(f"Agent no D-Bus access to systemd ({err}), using systemctl")
+                    self._systemd_error = err
+                    raise
+            return self._systemd
+
+    def systemd_available(self) -> bool:
+        """
+        True when systemd is reachable through D-Bus (connection tried once)
+        """
+        try:
+            self.systemd
+        except DBusException:
+            return False
+        return True
+
+    def system_target(self, target: str):
+        """
+        start a system target (halt, reboot) after a delay to let the response go back to the client
+        """
+        def start_target():
+            if not self.systemd_available():
+                run_systemd('start', target, '--job-mode=replace-irreversibly')
+                return
+            try:
+                self.systemd.start_unit(target, 'replace-irreversibly')
+            except DBusException as err:
+                _logger.error(f"Agent cannot start {target}: {err}")
+        timer = threading.Timer(self.SYSTEM_TARGET_DELAY, start_target)
+        timer.start()
+
     def add_process(self, process):
+        process.attach(self)
         self._processes[process.name] = process
 
     def get_process(self, name):
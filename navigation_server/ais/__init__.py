@@ -0,0 +1,15 @@
+#-------------------------------------------------------------------------------
+# Name:        package ais
+# Purpose:     AIS decoding and target tracking
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+from .ais_decoder import (AISPositionReport, AISStaticReport, AISDecodeError, AISPayload, AISFragmentAssembler,
+                          decode_ais_payload, n2k_ais_reports, AIS_PGN)
+from .ais_tracker import AISTarget, AISTargetTable, AISChangeListener, OwnShip
+from .ais_service import AISService, AISPublisher
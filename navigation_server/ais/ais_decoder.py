@@ -0,0 +1,369 @@
+#-------------------------------------------------------------------------------
+# Name:        ais_decoder
+# Purpose:     Decoding of the AIS messages from NMEA0183 VDM/VDO sentences and NMEA2000 PGN
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   Both sources are converted in the same reports (AISPositionReport and AISStaticReport) in ISO units, like the
+#   NMEA2000 decoded classes: degrees for the position, radians for the angles, m/s for the speed.
+#   Missing float values are NaN, missing static values are None (not part of the report)
+#   The VDM payload (6 bits armoring) is converted in a single integer, the fields are extracted by shift and mask.
+#   Supported AIS messages: 1, 2, 3 (class A position), 5 (class A static), 18 (class B position),
+#   19 (class B extended position), 24 (class B static A and B parts)
+
+import logging
+import math
+import time
+
+from navigation_server.router_core import NMEA0183Msg, NMEA0183Index
+from navigation_server.generated.ais_pb2 import AIS_CLASS_A, AIS_CLASS_B
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+NAN = float('nan')
+KNOT = 1852. / 3600.
+DEG_TO_RAD = math.pi / 180.
+# AIS ROT is in degrees per minute
+ROT_TO_RAD_S = DEG_TO_RAD / 60.
+
+
+class AISDecodeError(Exception):
+    pass
+
+
+class AISPositionReport:
+
+    __slots__ = ('mmsi', 'ais_class', 'latitude', 'longitude', 'sog', 'cog', 'heading', 'rate_of_turn',
+                 'navigation_status')
+
+    def __init__(self, mmsi: int, ais_class: int, latitude: float, longitude: float, sog: float, cog: float,
+                 heading: float, rate_of_turn: float = NAN, navigation_status: int = 15):
+        self.mmsi = mmsi
+        self.ais_class = ais_class
+        self.latitude = latitude
+        self.longitude = longitude
+        self.sog = sog
+        self.cog = cog
+        self.heading = heading
+        self.rate_of_turn = rate_of_turn
+        self.navigation_status = navigation_status
+
+    def __str__(self):
+        return "AIS position MMSI %d lat %.5f lon %.5f SOG %.1f COG %.3f" % (
+            self.mmsi, self.latitude, self.longitude, self.sog, self.cog)
+
+
+class AISStaticReport:
+
+    __slots__ = ('mmsi', 'ais_class', 'name', 'callsign', 'imo_number', 'ship_type', 'length', 'beam', 'draft',
+                 'destination')
+
+    def __init__(self, mmsi: int, ais_class: int, name: str = None, callsign: str = None, imo_number: int = None,
+                 ship_type: int = None, length: float = None, beam: float = None, draft: float = None,
+                 destination: str = None):
+        self.mmsi = mmsi
+        self.ais_class = ais_class
+        self.name = name
+        self.callsign = callsign
+        self.imo_number = imo_number
+        self.ship_type = ship_type
+        self.length = length
+        self.beam = beam
+        self.draft = draft
+        self.destination = destination
+
+    def __str__(self):
+        return "AIS static MMSI %d name %s" % (self.mmsi, self.name)
+
+
+def ais_text(value) -> str:
+    """
+    clean up a text field: padding with @ and trailing spaces are removed
+    """
+    if value is None:
+        return None
+    return value.split('@', 1)[0].rstrip()
+
+
+#  6 bits armoring: the characters 0 to W and ` to w are the values 0 to 63
+_armor = [-1] * 128
+for _c in range(48, 88):
+    _armor[_c] = _c - 48
+for _c in range(96, 120):
+    _armor[_c] = _c - 56
+# AIS 6 bits characters
+_sixbit_chars = "@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_ !\"#$%&'()*+,-./0123456789:;<=>?"
+
+
+class AISPayload:
+    """
+    The payload of an AIS message as a bit vector
+    bits beyond the end of the payload are read as 0, some transmitters are not sending the last padding bits
+    """
+
+    __slots__ = ('_value', '_nb_bits')
+
+    def __init__(self, payload: bytes, fill_bits: int = 0):
+        value = 0
+        armor = _armor
+        try:
+            for c in payload:
+                v = armor[c]
+                if v < 0:
+                    raise AISDecodeError(f"Invalid character in AIS payload {payload}")
+                value = (value << 6) | v
+        except IndexError:
+            raise AISDecodeError(f"Invalid character in AIS payload {payload}")
+        self._nb_bits = len(payload) * 6 - fill_bits
+        self._value = value >> fill_bits
+
+    @property
+    def nb_bits(self) -> int:
+        return self._nb_bits
+
+    def unsigned(self, start: int, length: int) -> int:
+        shift = self._nb_bits - start - length
+        if shift >= 0:
+            return (self._value >> shift) & ((1 << length) - 1)
+        return (self._value << -shift) & ((1 << length) - 1)
+
+    def signed(self, start: int, length: int) -> int:
+        value = self.unsigned(start, length)
+        if value & (1 << (length - 1)):
+            value -= 1 << length
+        return value
+
+    def text(self, start: int, nb_chars: int) -> str:
+        value = self.unsigned(start, nb_chars * 6)
+        chars = [_sixbit_chars[(value >> shift) & 0x3F] for shift in range((nb_chars - 1) * 6, -1, -6)]
+        return ais_text(''.join(chars))
+
+    # conversions to ISO units, not available values are converted to NaN
+
+    def position(self, start: int) -> tuple:
+        """
+        return latitude, longitude from the longitude field (28 bits) followed by the latitude field (27 bits)
+        """
+        longitude = self.signed(start, 28)
+        latitude = self.signed(start + 28, 27)
+        if longitude == 108600000 or latitude == 54600000:
+            return NAN, NAN
+        return latitude / 600000., longitude / 600000.
+
+    def sog(self, start: int) -> float:
+        value = self.unsigned(start, 10)
+        return NAN if value == 1023 else value * 0.1 * KNOT
+
+    def cog(self, start: int) -> float:
+        value = self.unsigned(start, 12)
+        return NAN if value >= 3600 else value * 0.1 * DEG_TO_RAD
+
+    def heading(self, start: int) -> float:
+        value = self.unsigned(start, 9)
+        return NAN if value >= 360 else value * DEG_TO_RAD
+
+    def rate_of_turn(self, start: int) -> float:
+        value = self.signed(start, 8)
+        if value == -128 or abs(value) == 127:
+            # not available or turning without a rate of turn indicator
+            return NAN
+        rot = (value / 4.733) ** 2
+        return (rot if value >= 0 else -rot) * ROT_TO_RAD_S
+
+    def dimensions(self, start: int) -> tuple:
+        """
+        return length, beam from the dimensions to bow (9 bits), stern (9 bits), port (6 bits), starboard (6 bits)
+        """
+        length = self.unsigned(start, 9) + self.unsigned(start + 9, 9)
+        beam = self.unsigned(start + 18, 6) + self.unsigned(start + 24, 6)
+        return (float(length) if length > 0 else None), (float(beam) if beam > 0 else None)
+
+
+def _class_a_position(payload: AISPayload, mmsi: int) -> list:
+    latitude, longitude = payload.position(61)
+    return [AISPositionReport(mmsi, AIS_CLASS_A, latitude, longitude, payload.sog(50), payload.cog(116),
+                              payload.heading(128), payload.rate_of_turn(42), payload.unsigned(38, 4))]
+
+
+def _class_a_static(payload: AISPayload, mmsi: int) -> list:
+    length, beam = payload.dimensions(240)
+    draft = payload.unsigned(294, 8)
+    imo_number = payload.unsigned(40, 30)
+    return [AISStaticReport(mmsi, AIS_CLASS_A, name=payload.text(112, 20), callsign=payload.text(70, 7),
+                            imo_number=imo_number if imo_number > 0 else None, ship_type=payload.unsigned(232, 8),
+                            length=length, beam=beam, draft=draft * 0.1 if draft > 0 else None,
+                            destination=payload.text(302, 20))]
+
+
+def _class_b_position(payload: AISPayload, mmsi: int) -> list:
+    latitude, longitude = payload.position(57)
+    return [AISPositionReport(mmsi, AIS_CLASS_B, latitude, longitude, payload.sog(46), payload.cog(112),
+                              payload.heading(124))]
+
+
+def _class_b_extended(payload: AISPayload, mmsi: int) -> list:
+    result = _class_b_position(payload, mmsi)
+    length, beam = payload.dimensions(271)
+    result.append(AISStaticReport(mmsi, AIS_CLASS_B, name=payload.text(143, 20), ship_type=payload.unsigned(263, 8),
+                                  length=length, beam=beam))
+    return result
+
+
+def _class_b_static(payload: AISPayload, mmsi: int) -> list:
+    part = payload.unsigned(38, 2)
+    if part == 0:
+        return [AISStaticReport(mmsi, AIS_CLASS_B, name=payload.text(40, 20))]
+    elif part == 1:
+        length, beam = payload.dimensions(132)
+        return [AISStaticReport(mmsi, AIS_CLASS_B, ship_type=payload.unsigned(40, 8), callsign=payload.text(90, 7),
+                                length=length, beam=beam)]
+    raise AISDecodeError(f"AIS message 24 invalid part number {part}")
+
+
+_ais_messages = {
+    1: _class_a_position,
+    2: _class_a_position,
+    3: _class_a_position,
+    5: _class_a_static,
+    18: _class_b_position,
+    19: _class_b_extended,
+    24: _class_b_static
+}
+
+
+def decode_ais_payload(payload: bytes, fill_bits: int = 0) -> list:
+    """
+    Decode a complete AIS payload (all fragments concatenated)
+    return the list of reports, empty when the message type is not supported
+    """
+    bits = AISPayload(payload, fill_bits)
+    if bits.nb_bits < 38:
+        raise AISDecodeError(f"AIS payload too short {payload}")
+    try:
+        decoder = _ais_messages[bits.unsigned(0, 6)]
+    except KeyError:
+        return []
+    return decoder(bits, bits.unsigned(8, 30))
+
+
+class AISFragmentAssembler:
+    """
+    Reassembly of the multi sentences AIS messages (VDM/VDO)
+    The fragments are identified by talker, sequential message id and channel, they must be received in sequence
+    Pending messages are discarded after timeout and the number of pending messages is limited
+    Counters:
+        messages: complete messages returned
+        fragment_errors: fragments out of sequence, incomplete or expired messages
+    """
+
+    def __init__(self, timeout: float = 5.0, max_pending: int = 32):
+        self._timeout = timeout
+        self._max_pending = max_pending
+        self._pending = {}
+        self._vdo = NMEA0183Index.formatter_code(b'VDO')
+        self.messages = 0
+        self.fragment_errors = 0
+
+    def add(self, msg: NMEA0183Msg):
+        """
+        Add a VDM/VDO sentence
+        return (payload, fill_bits, own_ship) when the message is complete, None otherwise
+        """
+        fields = msg.fields()
+        if len(fields) < 6:
+            raise AISDecodeError(f"Invalid AIS sentence {msg}")
+        own_ship = msg.formatter_code == self._vdo
+        try:
+            count = int(fields[0])
+            number = int(fields[1])
+            fill_bits = int(fields[5]) if len(fields[5]) > 0 else 0
+        except ValueError:
+            raise AISDecodeError(f"Invalid AIS sentence {msg}")
+        if count == 1:
+            self.messages += 1
+            return bytes(fields[4]), fill_bits, own_ship
+        key = (msg.talker_code, bytes(fields[2]), bytes(fields[3]))
+        now = time.monotonic()
+        if number == 1:
+            if key in self._pending:
+                self.fragment_errors += 1
+            elif len(self._pending) >= self._max_pending:
+                # discard the oldest pending message
+                del self._pending[next(iter(self._pending))]
+                self.fragment_errors += 1
+            self._pending[key] = (now, count, [bytes(fields[4])])
+            return None
+        try:
+            start, expected_count, parts = self._pending[key]
+        except KeyError:
+            self.fragment_errors += 1
+            return None
+        if number != len(parts) + 1 or count != expected_count or now - start > self._timeout:
+            del self._pending[key]
+            self.fragment_errors += 1
+            return None
+        parts.append(bytes(fields[4]))
+        if number < count:
+            return None
+        del self._pending[key]
+        self.messages += 1
+        return b''.join(parts), fill_bits, own_ship
+
+    def reset(self):
+        self._pending = {}
+
+
+def _n2k_class_a_position(msg) -> list:
+    return [AISPositionReport(msg.mmsi, AIS_CLASS_A, msg.latitude, msg.longitude, msg.SOG, msg.COG, msg.heading,
+                              msg.rate_of_turn, msg.navigation_status)]
+
+
+def _n2k_class_b_position(msg) -> list:
+    return [AISPositionReport(msg.mmsi, AIS_CLASS_B, msg.latitude, msg.longitude, msg.SOG, msg.COG, msg.heading)]
+
+
+def _n2k_float(value: float):
+    return None if math.isnan(value) or value == 0. else value
+
+
+def _n2k_class_a_static(msg) -> list:
+    return [AISStaticReport(msg.mmsi, AIS_CLASS_A, name=ais_text(msg.ship_name), callsign=ais_text(msg.callsign),
+                            imo_number=msg.IMO_number if msg.IMO_number not in (0, 0xFFFFFFFF) else None,
+                            ship_type=msg.type_of_ship, length=_n2k_float(msg.length), beam=_n2k_float(msg.beam),
+                            draft=_n2k_float(msg.draft), destination=ais_text(msg.destination))]
+
+
+def _n2k_class_b_static_a(msg) -> list:
+    return [AISStaticReport(msg.mmsi, AIS_CLASS_B, name=ais_text(msg.ship_name))]
+
+
+def _n2k_class_b_static_b(msg) -> list:
+    return [AISStaticReport(msg.mmsi, AIS_CLASS_B, callsign=ais_text(msg.call_sign), ship_type=msg.type_of_ship,
+                            length=_n2k_float(msg.length), beam=_n2k_float(msg.beam))]
+
+
+_n2k_ais_pgn = {
+    129038: _n2k_class_a_position,
+    129039: _n2k_class_b_position,
+    129794: _n2k_class_a_static,
+    129809: _n2k_class_b_static_a,
+    129810: _n2k_class_b_static_b
+}
+
+AIS_PGN = tuple(_n2k_ais_pgn.keys())
+
+
+def n2k_ais_reports(msg) -> list:
+    """
+    Convert an AIS PGN decoded object (see get_n2k_decoded_object) in reports
+    """
+    try:
+        return _n2k_ais_pgn[msg.pgn](msg)
+    except KeyError:
+        return []
@@ -0,0 +1,191 @@
+#-------------------------------------------------------------------------------
+# Name:        ais_service
+# Purpose:     AIS target tracker service and NMEA0183 VDM/VDO publisher
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import threading
+
+from navigation_server.router_common import GrpcService, ConfigurationException, resolve_ref, N0183_MSG, N2K_MSG
+from navigation_server.router_core import ExternalPublisher, NMEA0183Index, NMEAInvalidFrame
+from navigation_server.nmea2000 import get_n2k_decoded_object
+from navigation_server.generated.ais_pb2 import ais_snapshot, ais_target_event, TARGET_LOST
+from navigation_server.generated.ais_pb2_grpc import AISTrackerServicer, add_AISTrackerServicer_to_server
+from .ais_decoder import (AISFragmentAssembler, AISPositionReport, AISDecodeError, decode_ais_payload,
+                          n2k_ais_reports, AIS_PGN)
+from .ais_tracker import AISTargetTable, AISChangeListener
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class AISTrackerServicerImpl(AISTrackerServicer):
+    """
+    gRPC access to the AIS target table
+        GetTargets: snapshot of all targets or a single one (mmsi), optionally limited in range
+        StreamTargets: stream of changes, starting with all the targets currently in range as TARGET_NEW
+    """
+
+    def __init__(self, service):
+        self._service = service
+
+    def GetTargets(self, request, context):
+        response = ais_snapshot()
+        response.id = request.id
+        table = self._service.tracker
+        table.own_ship.as_protobuf(response.own_ship)
+        if request.mmsi != 0:
+            try:
+                table.target(request.mmsi).as_protobuf(response.targets.add())
+            except KeyError:
+                response.error_message = "NO_TARGET"
+                return response
+        else:
+            for target in table.snapshot(request.max_range):
+                target.as_protobuf(response.targets.add())
+        response.error_message = "NO_ERROR"
+        return response
+
+    def StreamTargets(self, request, context):
+        table = self._service.tracker
+        listener = AISChangeListener()
+        table.add_listener(listener)
+        _logger.info("AIS tracker start streaming targets to %s" % context.peer())
+        try:
+            for target in table.snapshot(request.max_range):
+                if request.mmsi == 0 or target.mmsi == request.mmsi:
+                    event = ais_target_event()
+                    event.mmsi = target.mmsi
+                    target.as_protobuf(event.target)
+                    yield event
+            while context.is_active():
+                for mmsi, change in listener.get_changes(1.0):
+                    if request.mmsi != 0 and mmsi != request.mmsi:
+                        continue
+                    event = ais_target_event()
+                    event.change = change
+                    event.mmsi = mmsi
+                    if change != TARGET_LOST:
+                        try:
+                            target = table.target(mmsi)
+                        except KeyError:
+                            # lost in the meantime
+                            continue
+                        if 0. < request.max_range < target.range:
+                            continue
+                        target.as_protobuf(event.target)
+                    yield event
+        finally:
+            table.remove_listener(listener)
+            _logger.info("AIS tracker end of streaming to %s" % context.peer())
+
+
+class AISService(GrpcService):
+    """
+    AIS target tracker
+    The targets are fed by the NMEA2000 AIS PGN from the primary service (NavigationDataService) if defined and/or
+    by AISPublisher from NMEA0183 couplers.
+    Own ship is taken from PGN 129025 and 129026 (primary service) or from the VDO sentences
+    Options:
+        primary: NavigationDataService providing the NMEA2000 data
+        target_timeout: time in seconds without report before a target is removed
+    """
+    def __init__(self, opts):
+        super().__init__(opts)
+        self._primary_name = opts.get('primary', str, None)
+        self._primary_service = None
+        self._tracker = AISTargetTable(opts.get('target_timeout', float, 360.))
+        self._servicer = None
+        self._timer = None
+
+    @property
+    def tracker(self) -> AISTargetTable:
+        return self._tracker
+
+    def finalize(self):
+        super().finalize()
+        self._servicer = AISTrackerServicerImpl(self)
+        add_AISTrackerServicer_to_server(self._servicer, self.grpc_server)
+        if self._primary_name is not None:
+            self._primary_service = resolve_ref(self._primary_name)
+            if self._primary_service is None:
+                _logger.error(f"AIS service {self._name} primary service {self._primary_name} not found")
+            else:
+                for pgn in AIS_PGN:
+                    self._primary_service.subscribe(self, pgn, self.p_ais)
+                self._primary_service.subscribe(self, 129025, self.p129025)
+                self._primary_service.subscribe(self, 129026, self.p129026)
+        self._timer = threading.Timer(10.0, self.check_targets)
+        self._timer.start()
+
+    def p_ais(self, msg):
+        self._tracker.update_reports(n2k_ais_reports(msg))
+
+    def p129025(self, msg):
+        self._tracker.set_own_position(msg.latitude, msg.longitude)
+
+    def p129026(self, msg):
+        self._tracker.set_own_velocity(msg.SOG, msg.COG)
+
+    def check_targets(self):
+        self._tracker.age_out()
+        self._timer = threading.Timer(10.0, self.check_targets)
+        self._timer.start()
+
+    def stop_service(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        super().stop_service()
+
+
+class AISPublisher(ExternalPublisher):
+    """
+    Publisher feeding the AIS tracker from couplers
+    NMEA0183 VDM/VDO sentences are reassembled and decoded, NMEA2000 AIS PGN are decoded
+    Options:
+        tracker: name of the AISService
+        fragment_timeout: maximum time in seconds between the first and the last fragment of a VDM message
+    """
+    def __init__(self, opts):
+        super().__init__(opts)
+        tracker_name = opts.get('tracker', str, None)
+        service = resolve_ref(tracker_name) if tracker_name is not None else None
+        if not isinstance(service, AISService):
+            raise ConfigurationException(f"AISPublisher {self._name} requires an AISService as tracker")
+        self._tracker = service.tracker
+        self._assembler = AISFragmentAssembler(opts.get('fragment_timeout', float, 5.0))
+        self._ais_formatters = (NMEA0183Index.formatter_code(b'VDM'), NMEA0183Index.formatter_code(b'VDO'))
+        self._decode_errors = 0
+
+    def process_msg(self, msg) -> bool:
+        if msg.type == N0183_MSG:
+            if msg.formatter_code not in self._ais_formatters:
+                return True
+            try:
+                message = self._assembler.add(msg)
+                if message is None:
+                    return True
+                reports = decode_ais_payload(message[0], message[1])
+            except (AISDecodeError, NMEAInvalidFrame) as err:
+                self._decode_errors += 1
+                _logger.debug("AISPublisher %s error %s" % (self._name, err))
+                return True
+            if message[2]:
+                # VDO own ship report
+                for report in reports:
+                    if type(report) is AISPositionReport:
+                        self._tracker.set_own_position(report.latitude, report.longitude)
+                        self._tracker.set_own_velocity(report.sog, report.cog)
+            else:
+                self._tracker.update_reports(reports, msg.timestamp)
+        elif msg.type == N2K_MSG and msg.msg.pgn in AIS_PGN:
+            self._tracker.update_reports(n2k_ais_reports(get_n2k_decoded_object(msg.msg)))
+        return True
+
+    def descr(self):
+        return "AIS Publisher %s" % self._name
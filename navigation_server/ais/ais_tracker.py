@@ -0,0 +1,374 @@
+#-------------------------------------------------------------------------------
+# Name:        ais_tracker
+# Purpose:     AIS target table with static/dynamic merge, ageing and CPA/TCPA computation
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   The cost of a report is constant whatever the number of targets:
+#   - the targets are kept in an OrderedDict in the order of the last report, a report moves the target at the end
+#     and the ageing pops the stale targets from the beginning
+#   - the CPA/TCPA of a target is computed when a position report is received for that target. When own ship moves
+#     the values of the other targets are not recomputed: the own ship state has a version and the CPA/TCPA are
+#     recomputed when a target is read (snapshot) with an older version
+#   - the change listeners keep one pending change per MMSI, so a slow gRPC client does not accumulate events
+#   The CPA/TCPA are computed on a local plane around own ship (equirectangular projection), which is accurate
+#   for the ranges covered by AIS
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from navigation_server.generated.ais_pb2 import (ais_target, ais_own_ship, AIS_UNKNOWN, TARGET_NEW, TARGET_POSITION,
+                                                 TARGET_STATIC, TARGET_LOST)
+from .ais_decoder import AISPositionReport, AISStaticReport, NAN
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+# meters per degree of latitude
+LAT_SCALE = 1852. * 60.
+TWO_PI = 2. * math.pi
+
+
+class OwnShip:
+    """
+    Own ship position and velocity as used for the CPA/TCPA computation
+    """
+
+    __slots__ = ('latitude', 'longitude', 'sog', 'cog', 'lon_scale', 'vx', 'vy', 'timestamp', 'version')
+
+    def __init__(self):
+        self.latitude = NAN
+        self.longitude = NAN
+        self.sog = 0.
+        self.cog = 0.
+        self.lon_scale = LAT_SCALE
+        self.vx = 0.
+        self.vy = 0.
+        self.timestamp = 0.
+        self.version = 0
+
+    @property
+    def valid(self) -> bool:
+        return not math.isnan(self.latitude)
+
+    def set_position(self, latitude: float, longitude: float, timestamp: float):
+        if math.isnan(latitude) or math.isnan(longitude):
+            return
+        self.latitude = latitude
+        self.longitude = longitude
+        self.lon_scale = LAT_SCALE * math.cos(latitude * math.pi / 180.)
+        self.timestamp = timestamp
+        self.version += 1
+
+    def set_velocity(self, sog: float, cog: float):
+        if math.isnan(sog) or math.isnan(cog):
+            sog = 0.
+            cog = 0.
+        self.sog = sog
+        self.cog = cog
+        self.vx = sog * math.sin(cog)
+        self.vy = sog * math.cos(cog)
+        self.version += 1
+
+    def as_protobuf(self, pb: ais_own_ship):
+        pb.valid = self.valid
+        pb.latitude = self.latitude
+        pb.longitude = self.longitude
+        pb.sog = self.sog
+        pb.cog = self.cog
+
+
+class AISTarget:
+    """
+    Merged AIS data for a MMSI
+    """
+
+    __slots__ = ('mmsi', 'ais_class', 'latitude', 'longitude', 'sog', 'cog', 'heading', 'rate_of_turn',
+                 'navigation_status', 'name', 'callsign', 'imo_number', 'ship_type', 'length', 'beam', 'draft',
+                 'destination', 'last_position', 'last_static', 'last_report', 'range', 'bearing', 'cpa', 'tcpa',
+                 '_own_version')
+
+    def __init__(self, mmsi: int):
+        self.mmsi = mmsi
+        self.ais_class = AIS_UNKNOWN
+        self.latitude = NAN
+        self.longitude = NAN
+        self.sog = NAN
+        self.cog = NAN
+        self.heading = NAN
+        self.rate_of_turn = NAN
+        self.navigation_status = 15
+        self.name = None
+        self.callsign = None
+        self.imo_number = None
+        self.ship_type = None
+        self.length = None
+        self.beam = None
+        self.draft = None
+        self.destination = None
+        self.last_position = 0.
+        self.last_static = 0.
+        self.last_report = 0.
+        self.range = NAN
+        self.bearing = NAN
+        self.cpa = NAN
+        self.tcpa = NAN
+        self._own_version = -1
+
+    def update_position(self, report: AISPositionReport, timestamp: float):
+        self.ais_class = report.ais_class
+        self.latitude = report.latitude
+        self.longitude = report.longitude
+        self.sog = report.sog
+        self.cog = report.cog
+        self.heading = report.heading
+        self.rate_of_turn = report.rate_of_turn
+        self.navigation_status = report.navigation_status
+        self.last_position = timestamp
+
+    def update_static(self, report: AISStaticReport, timestamp: float):
+        if self.ais_class == AIS_UNKNOWN:
+            self.ais_class = report.ais_class
+        # the class B static data comes in 2 parts, only the fields in the report are updated
+        for attr in ('name', 'callsign', 'imo_number', 'ship_type', 'length', 'beam', 'draft', 'destination'):
+            value = getattr(report, attr)
+            if value is not None:
+                setattr(self, attr, value)
+        self.last_static = timestamp
+
+    def compute_cpa(self, own: OwnShip):
+        """
+        compute range, bearing, CPA and TCPA relative to own ship
+        """
+        self._own_version = own.version
+        if not own.valid or math.isnan(self.latitude) or math.isnan(self.longitude):
+            self.range = self.bearing = self.cpa = self.tcpa = NAN
+            return
+        dx = (self.longitude - own.longitude) * own.lon_scale
+        dy = (self.latitude - own.latitude) * LAT_SCALE
+        distance = math.hypot(dx, dy)
+        self.range = distance
+        self.bearing = math.atan2(dx, dy) % TWO_PI
+        sog = self.sog
+        cog = self.cog
+        if math.isnan(sog) or math.isnan(cog):
+            # target velocity unknown => considered as stationary
+            rvx = -own.vx
+            rvy = -own.vy
+        else:
+            rvx = sog * math.sin(cog) - own.vx
+            rvy = sog * math.cos(cog) - own.vy
+        v2 = rvx * rvx + rvy * rvy
+        if v2 < 1e-6:
+            # same velocity, the distance does not change
+            self.tcpa = 0.
+            self.cpa = distance
+            return
+        tcpa = -(dx * rvx + dy * rvy) / v2
+        self.tcpa = tcpa
+        if tcpa <= 0.:
+            self.cpa = distance
+        else:
+            self.cpa = math.hypot(dx + rvx * tcpa, dy + rvy * tcpa)
+
+    def refresh_cpa(self, own: OwnShip):
+        if self._own_version != own.version:
+            self.compute_cpa(own)
+
+    def as_protobuf(self, pb: ais_target):
+        pb.mmsi = self.mmsi
+        pb.ais_class = self.ais_class
+        pb.latitude = self.latitude
+        pb.longitude = self.longitude
+        pb.sog = self.sog
+        pb.cog = self.cog
+        pb.heading = self.heading
+        pb.rate_of_turn = self.rate_of_turn
+        pb.navigation_status = self.navigation_status
+        if self.name is not None:
+            pb.name = self.name
+        if self.callsign is not None:
+            pb.callsign = self.callsign
+        if self.imo_number is not None:
+            pb.imo_number = self.imo_number
+        if self.ship_type is not None:
+            pb.ship_type = self.ship_type
+        pb.length = self.length if self.length is not None else NAN
+        pb.beam = self.beam if self.beam is not None else NAN
+        pb.draft = self.draft if self.draft is not None else NAN
+        if self.destination is not None:
+            pb.destination = self.destination
+        pb.last_position = self.last_position
+        pb.last_static = self.last_static
+        pb.range = self.range
+        pb.bearing = self.bearing
+        pb.cpa = self.cpa
+        pb.tcpa = self.tcpa
+
+
+class AISChangeListener:
+    """
+    Receives the changes on the target table, there is at most one pending change per MMSI
+    a new or lost target is never hidden by a later position or static change
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def notify(self, mmsi: int, change: int):
+        with self._lock:
+            previous = self._pending.get(mmsi)
+            if previous is None or change in (TARGET_NEW, TARGET_LOST) or previous not in (TARGET_NEW, TARGET_LOST):
+                self._pending[mmsi] = change
+            self._event.set()
+
+    def get_changes(self, timeout: float = None) -> list:
+        """
+        wait for changes and return the list of (mmsi, change), empty on timeout
+        """
+        if not self._event.wait(timeout):
+            return []
+        with self._lock:
+            changes = list(self._pending.items())
+            self._pending = {}
+            self._event.clear()
+        return changes
+
+
+class AISTargetTable:
+    """
+    AIS targets indexed by MMSI
+    All methods are thread safe, reports come from the NMEA2000 and NMEA0183 input threads and the reads from the
+    gRPC threads
+    """
+
+    def __init__(self, target_timeout: float = 360.):
+        self._target_timeout = target_timeout
+        self._targets = OrderedDict()
+        self._own_ship = OwnShip()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.reports = 0
+        self.targets_lost = 0
+
+    def __len__(self):
+        return len(self._targets)
+
+    @property
+    def own_ship(self) -> OwnShip:
+        return self._own_ship
+
+    def add_listener(self, listener: AISChangeListener):
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: AISChangeListener):
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l is not listener]
+
+    def _notify(self, mmsi: int, change: int):
+        for listener in self._listeners:
+            listener.notify(mmsi, change)
+
+    def _get_target(self, mmsi: int, timestamp: float) -> tuple:
+        target = self._targets.get(mmsi)
+        if target is None:
+            target = AISTarget(mmsi)
+            self._targets[mmsi] = target
+            new = True
+        else:
+            self._targets.move_to_end(mmsi)
+            new = False
+        target.last_report = timestamp
+        return target, new
+
+    def update(self, report, timestamp: float = None):
+        """
+        Merge a position or static report in the table
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self.reports += 1
+            target, new = self._get_target(report.mmsi, timestamp)
+            if type(report) is AISPositionReport:
+                target.update_position(report, timestamp)
+                target.compute_cpa(self._own_ship)
+                change = TARGET_POSITION
+            else:
+                target.update_static(report, timestamp)
+                change = TARGET_STATIC
+            if self._listeners:
+                self._notify(report.mmsi, TARGET_NEW if new else change)
+
+    def update_reports(self, reports: list, timestamp: float = None):
+        for report in reports:
+            self.update(report, timestamp)
+
+    def set_own_position(self, latitude: float, longitude: float, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._own_ship.set_position(latitude, longitude, timestamp)
+
+    def set_own_velocity(self, sog: float, cog: float):
+        with self._lock:
+            self._own_ship.set_velocity(sog, cog)
+
+    def age_out(self, now: float = None) -> list:
+        """
+        Remove the targets without report during target_timeout, return the list of lost MMSI
+        """
+        if now is None:
+            now = time.time()
+        limit = now - self._target_timeout
+        lost = []
+        with self._lock:
+            while len(self._targets) > 0:
+                mmsi, target = next(iter(self._targets.items()))
+                if target.last_report >= limit:
+                    break
+                del self._targets[mmsi]
+                lost.append(mmsi)
+                if self._listeners:
+                    self._notify(mmsi, TARGET_LOST)
+        self.targets_lost += len(lost)
+        if len(lost) > 0:
+            _logger.debug("AIS targets lost:%s" % lost)
+        return lost
+
+    def target(self, mmsi: int) -> AISTarget:
+        """
+        return the target with CPA/TCPA up to date, raise KeyError if the target is not in the table
+        """
+        with self._lock:
+            target = self._targets[mmsi]
+            target.refresh_cpa(self._own_ship)
+            return target
+
+    def snapshot(self, max_range: float = 0.) -> list:
+        """
+        return the list of targets with CPA/TCPA up to date, limited to max_range (meters) when not 0
+        """
+        with self._lock:
+            own = self._own_ship
+            targets = list(self._targets.values())
+            for target in targets:
+                target.refresh_cpa(own)
+        if max_range > 0.:
+            targets = [t for t in targets if t.range <= max_range]
+        return targets
+
+    def clear(self):
+        with self._lock:
+            self._targets = OrderedDict()
@@ -21,3 +21,4 @@ from .nmea2k_can_coupler import DirectCANCoupler
 from .nmea2k_application import NMEA2000Application, DeviceReplaySimulator, DeviceSimulator
 from .nmea2k_can_interface import SocketCANInterface, SocketCANWriter, SocketCanError, SocketCanReadInvalid
 from .nmea2k_can_service import N2KCanService
+from .nmea2k_traffic_generator import N2KTrafficGenerator, TrafficGenerator, TrafficProfile, TrafficStream
@@ -9,12 +9,15 @@
 # Licence:     Eclipse Public License 2.0
 # -------------------------------------------------------------------------------
 
+import asyncio
 import logging
 import queue
+import collections
 import threading
 
-from navigation_server.router_core import NMEA2000Msg
-from navigation_server.nmea2000 import NMEA2KController
+from navigation_server.router_core import (NMEA2000Msg, N2KSharedRingWriter, SharedRingFull, SharedRingClosed,
+                                           N2KLatestValueCache)
+from navigation_server.nmea2000 import NMEA2KController, GroupFunctionTransactions
 from .nmea2k_application import NMEA2000Application, NMEA2000ApplicationPool
 from .nmea2k_can_interface import SocketCANInterface, SocketCanError
 from navigation_server.router_common import ObjectCreationError, set_global_var
@@ -26,12 +29,39 @@ class N2KReadTimeOut(Exception):
     pass
 
 
+class N2KReadClosed(Exception):
+    pass
+
+
 class N2KReadSubscriber:
+    """
+    Buffer of NMEA2000 messages for one read stream (gRPC client)
+    When the buffer is full, the overflow policy is applied:
+        disconnect: the subscriber is removed (behaviour up to version 2.5.2)
+        drop_oldest: the oldest message is discarded
+        coalesce: the message waiting with the same (PGN, source) is replaced by the new one, drop_oldest otherwise
+    """
+
+    overflow_policies = ('disconnect', 'drop_oldest', 'coalesce')
 
     def __init__(self, client: str, select_source: list, reject_source: list, select_pgn: list, reject_pgn: list,
-                 timeout=60.00):
+                 timeout=60.00, queue_size: int = 20, overflow_policy: str = 'disconnect'):
         self._client = client
-        self._queue = queue.Queue(20)
+        if overflow_policy not in self.overflow_policies:
+            _logger.error(f"N2KReadSubscriber {client} invalid overflow policy {overflow_policy} => drop_oldest")
+            overflow_policy = 'drop_oldest'
+        self._policy = overflow_policy
+        self._coalesce = overflow_policy == 'coalesce'
+        self._queue_size = max(queue_size, 1)
+        # entries are [key, msg] so they can be updated in place when coalescing
+        self._buffer = collections.deque()
+        self._latest = {}
+        self._cond = threading.Condition()
+        self._wake_level = 1
+        self._closed = False
+        self._total = 0
+        self._dropped = 0
+        self._coalesced = 0
         self._select_source = None
         self._reject_source = None
         if len(select_source) > 0:
@@ -45,16 +75,137 @@ class N2KReadSubscriber:
         elif len(reject_pgn) > 0:
             self._reject_pgn = {pgn for pgn in reject_pgn}
         self._timeout = timeout
+        # coroutine reader (grpc.aio), the event is set from the producer threads through the event loop
+        self._loop = None
+        self._event = None
+        self._async_waiting = False
 
     @property
     def client(self):
         return self._client
 
+    @property
+    def transport(self) -> str:
+        return 'grpc'
+
+    @property
+    def overflow_policy(self) -> str:
+        return self._policy
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def counters(self) -> tuple:
+        """
+        return (queued, total, dropped, coalesced)
+        """
+        return len(self._buffer), self._total, self._dropped, self._coalesced
+
+    def _ready(self) -> bool:
+        return len(self._buffer) >= self._wake_level or self._closed
+
+    def _pop(self) -> NMEA2000Msg:
+        entry = self._buffer.popleft()
+        if self._coalesce and self._latest.get(entry[0]) is entry:
+            del self._latest[entry[0]]
+        return entry[1]
+
+    def _append(self, msg: NMEA2000Msg):
+        entry = [(msg.pgn, msg.sa), msg]
+        self._buffer.append(entry)
+        if self._coalesce:
+            self._latest[entry[0]] = entry
+
     def get_message(self) -> NMEA2000Msg:
+        with self._cond:
+            if not self._cond.wait_for(self._ready, self._timeout):
+                raise N2KReadTimeOut
+            if self._closed:
+                raise N2KReadClosed
+            return self._pop()
+
+    def _batch_level(self, batch_size: int) -> int:
+        # a batch larger than the queue cannot fill up, the reader is woken up when the queue is full
+        return min(batch_size, self._queue_size)
+
+    def get_batch(self, batch_size: int, max_latency: float) -> list:
+        """
+        Wait for at least one message and return up to batch_size messages
+        The first message is held at most max_latency seconds while the batch (or the queue) is filling up
+        """
+        wake_level = self._batch_level(batch_size)
+        with self._cond:
+            if not self._cond.wait_for(self._ready, self._timeout):
+                raise N2KReadTimeOut
+            if len(self._buffer) < wake_level and max_latency > 0.0 and not self._closed:
+                self._wake_level = wake_level
+                self._cond.wait_for(self._ready, max_latency)
+                self._wake_level = 1
+            if self._closed:
+                raise N2KReadClosed
+            return [self._pop() for _ in range(min(batch_size, len(self._buffer)))]
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        The messages are read by a coroutine running in loop (get_message_async and get_batch_async)
+        """
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def _wake_async(self):
+        # called with the condition held
+        if self._async_waiting:
+            self._async_waiting = False
+            try:
+                self._loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                # event loop closed, the server is stopping
+                pass
+
+    async def _wait_async(self, wake_level: int, timeout: float) -> bool:
+        deadline = self._loop.time() + timeout
         try:
-            return self._queue.get(block=True, timeout=self._timeout)
-        except queue.Empty:
+            while True:
+                with self._cond:
+                    self._wake_level = wake_level
+                    if self._ready():
+                        return True
+                    self._event.clear()
+                    self._async_waiting = True
+                remaining = deadline - self._loop.time()
+                if remaining <= 0.0:
+                    return False
+                try:
+                    await asyncio.wait_for(self._event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._wake_level = 1
+                self._async_waiting = False
+
+    async def get_message_async(self) -> NMEA2000Msg:
+        if not await self._wait_async(1, self._timeout):
             raise N2KReadTimeOut
+        with self._cond:
+            if self._closed:
+                raise N2KReadClosed
+            return self._pop()
+
+    async def get_batch_async(self, batch_size: int, max_latency: float) -> list:
+        """
+        Same as get_batch for a coroutine reader
+        """
+        wake_level = self._batch_level(batch_size)
+        if not await self._wait_async(1, self._timeout):
+            raise N2KReadTimeOut
+        if len(self._buffer) < wake_level and max_latency > 0.0 and not self._closed:
+            await self._wait_async(wake_level, max_latency)
+        with self._cond:
+            if self._closed:
+                raise N2KReadClosed
+            return [self._pop() for _ in range(min(batch_size, len(self._buffer)))]
 
     def push_message(self, msg: NMEA2000Msg):
         if self._select_source is not None:
@@ -69,11 +220,83 @@ class N2KReadSubscriber:
         elif self._reject_pgn is not None:
             if msg.pgn in self._reject_pgn:
                 return
+        self.queue_message(msg)
+
+    def queue_message(self, msg: NMEA2000Msg):
+        with self._cond:
+            self._total += 1
+            if len(self._buffer) >= self._queue_size:
+                if self._policy == 'disconnect':
+                    _logger.error(f"N2KReadSubscriber queue for {self._client} full, disconnecting")
+                    raise queue.Full
+                if self._coalesce:
+                    entry = self._latest.get((msg.pgn, msg.sa))
+                    if entry is not None:
+                        entry[1] = msg
+                        self._coalesced += 1
+                        return
+                self._pop()
+                self._dropped += 1
+            self._append(msg)
+            if len(self._buffer) >= self._wake_level:
+                self._cond.notify()
+                self._wake_async()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._wake_async()
+            self._cond.notify_all()
+
+
+class N2KSharedRingSubscriber(N2KReadSubscriber):
+    """
+    Subscriber for a co-located client, messages are written in a shared memory ring instead of a queue
+    """
+
+    def __init__(self, client: str, select_source: list, reject_source: list, select_pgn: list, reject_pgn: list,
+                 ring: N2KSharedRingWriter):
+        super().__init__(client, select_source, reject_source, select_pgn, reject_pgn)
+        self._ring = ring
+        self._overflow = 0
+
+    @property
+    def transport(self) -> str:
+        return 'local'
+
+    @property
+    def ring(self) -> N2KSharedRingWriter:
+        return self._ring
+
+    def counters(self) -> tuple:
+        return self._ring.pending(), self._ring.total_msg, self._ring.dropped(), 0
+
+    def get_message(self) -> NMEA2000Msg:
+        raise NotImplementedError("N2KSharedRingSubscriber messages are read from the shared ring")
+
+    def get_batch(self, batch_size: int, max_latency: float) -> list:
+        raise NotImplementedError("N2KSharedRingSubscriber messages are read from the shared ring")
+
+    def queue_message(self, msg: NMEA2000Msg):
         try:
-            self._queue.put(msg, block=False)
-        except queue.Full:
-            _logger.error(f"N2KReadSubscriber queue for {self._client} full, ignoring message")
-            raise
+            self._ring.push(msg)
+        except SharedRingFull:
+            # one warning per overflow episode
+            if self._overflow == 0:
+                _logger.warning(f"N2KSharedRingSubscriber ring for {self._client} full, ignoring messages")
+            self._overflow += 1
+            return
+        except SharedRingClosed:
+            # the reader is gone => the subscriber is removed
+            raise queue.Full
+        if self._overflow > 0:
+            _logger.warning(f"N2KSharedRingSubscriber ring for {self._client} available again, "
+                            f"{self._overflow} messages lost")
+            self._overflow = 0
+
+    def close(self):
+        super().close()
+        self._ring.close()
 
 
 class NMEA2KActiveController(NMEA2KController):
@@ -84,10 +307,17 @@ class NMEA2KActiveController(NMEA2KController):
         self._channel = opts.get('channel', str, 'can0')
         self._trace = opts.get('trace', bool, False)
         try:
-            self._can = SocketCANInterface(self._channel, self._input_queue, self._trace)
+            self._can = SocketCANInterface(self._channel, self._input_queue, self._trace,
+                                           opts.get('tx_bandwidth', float, 20.),
+                                           opts.get('tx_queue_size', int, 64),
+                                           opts.get('tx_burst', int, 5),
+                                           opts.get('iso_tp_window', int, 16),
+                                           opts.get('iso_tp_sessions', int, 8),
+                                           opts.get_choice('bus_interface', ['socketcan', 'virtual'], 'socketcan'))
         except SocketCanError as e:
             _logger.error(e)
             raise ObjectCreationError(str(e))
+        self._can.iso_tp_handler.set_session_end_callback(self.iso_transport_session_end)
         self._coupler_queue = None
         self._applications = []
         self._applications_register = {}
@@ -101,10 +331,17 @@ class NMEA2KActiveController(NMEA2KController):
         self._app_timer = None
         self._timer_vector = []
         self._catch_all = []
+        # Group Function transactions initiated by the applications
+        self._group_functions = GroupFunctionTransactions(f"{self._name}-GF")
         set_global_var("NMEA2K_ECU", self)
         # remote access
         self._read_subscribers = {}     # 2025-06-10 changed to dictionary
         self._read_subscribers_lock = threading.Lock()
+        # latest value per (PGN, source) for the snapshot queries
+        if opts.get('latest_value_cache', bool, True):
+            self._latest_values = N2KLatestValueCache(opts.get('latest_value_max_entries', int, 2048))
+        else:
+            self._latest_values = None
 
     @property
     def min_queue_size(self):
@@ -136,6 +373,7 @@ class NMEA2KActiveController(NMEA2KController):
 
         _logger.debug("Starting CAN bus")
         self._can.start()
+        self._group_functions.start()
         super().start()
         self.start_applications()
         # start timer
@@ -168,6 +406,7 @@ class NMEA2KActiveController(NMEA2KController):
         # stop all applications first
         for app in self._applications:
             app.stop_request()
+        self._group_functions.stop()
         self._can.stop()
         super().stop()
 
@@ -175,6 +414,14 @@ class NMEA2KActiveController(NMEA2KController):
     def CAN_interface(self):
         return self._can
 
+    @property
+    def group_functions(self) -> GroupFunctionTransactions:
+        return self._group_functions
+
+    @property
+    def latest_values(self) -> N2KLatestValueCache:
+        return self._latest_values
+
     @property
     def app_pool(self) -> NMEA2000ApplicationPool:
         return self._apool
@@ -232,24 +479,70 @@ class NMEA2KActiveController(NMEA2KController):
         except RuntimeError:
             _logger.error("Active Controller => release before lock for application:%d" % application.id)
 
-    def add_read_subscriber(self, client, select_source:list, reject_source:list, select_pgn:list, reject_pgn:list, timeout:float) -> N2KReadSubscriber:
+    def add_read_subscriber(self, client, select_source:list, reject_source:list, select_pgn:list, reject_pgn:list,
+                            timeout:float, queue_size: int = 20, overflow_policy: str = 'disconnect') -> N2KReadSubscriber:
         self._read_subscribers_lock.acquire()
-        sub = N2KReadSubscriber(client, select_source, reject_source, select_pgn, reject_pgn, timeout)
+        sub = N2KReadSubscriber(client, select_source, reject_source, select_pgn, reject_pgn, timeout,
+                                queue_size, overflow_policy)
         self._read_subscribers[client] = sub
         self._read_subscribers_lock.release()
         return sub
 
+    def add_ring_subscriber(self, client, select_source:list, reject_source:list, select_pgn:list, reject_pgn:list,
+                            ring: N2KSharedRingWriter) -> N2KSharedRingSubscriber:
+        self._read_subscribers_lock.acquire()
+        sub = N2KSharedRingSubscriber(client, select_source, reject_source, select_pgn, reject_pgn, ring)
+        self._read_subscribers[client] = sub
+        self._read_subscribers_lock.release()
+        return sub
+
+    def remove_ring_subscriber(self, ring_name: str, token: int) -> bool:
+        """
+        Remove the subscriber attached to the ring, the token shall match the one of the ring
+        Returns False if no subscriber is found
+        """
+        self._read_subscribers_lock.acquire()
+        try:
+            for client, sub in self._read_subscribers.items():
+                if (isinstance(sub, N2KSharedRingSubscriber) and sub.ring.name == ring_name and
+                        sub.ring.token == token):
+                    self._read_subscribers.pop(client).close()
+                    _logger.info(f"CAN Read subscriber {client} released by the client")
+                    return True
+            return False
+        finally:
+            self._read_subscribers_lock.release()
+
     def remove_read_subscriber(self, client):
         self._read_subscribers_lock.acquire()
         try:
-            del self._read_subscribers[client]
+            self._read_subscribers.pop(client).close()
         except KeyError:
             _logger.error(f"CAN Read subscribers removing non existing client {client} => ignored")
             pass
         self._read_subscribers_lock.release()
 
+    def read_subscribers(self) -> list:
+        return list(self._read_subscribers.values())
+
+    def iso_transport_session_end(self, session):
+        """
+        Notify the application that has sent a message with the ISO transport protocol of the end of the session
+        """
+        if not session.outgoing:
+            return
+        try:
+            application = self._app_index[session.local]
+        except KeyError:
+            _logger.debug("ISO transport session end for address %d without application" % session.local)
+            return
+        application.iso_transport_end(session)
+
     def process_msg(self, msg: NMEA2000Msg):
         _logger.debug("CAN data received sa=%d PGN=%d da=%d" % (msg.sa, msg.pgn, msg.da))
+        if self._group_functions.requests_pending:
+            # PGN answering a Request Group Function
+            self._group_functions.message_received(msg)
         if msg.da != 255:
             # we have a da, so call the application
             try:
@@ -271,6 +564,11 @@ class NMEA2KActiveController(NMEA2KController):
                     self.apply_change_application_address()
             else:
                 _logger.debug("Active controller message dispatch sa=%d pgn =%d" % (msg.sa, msg.pgn))
+                if self._latest_values is not None:
+                    self._latest_values.update(msg)
+                device = self._devices.get(msg.sa)
+                if device is not None:
+                    self._registry.device_update(device, msg)
                 # new in version 2.4.3 dispatch to all subscribers
                 subscribers = list(self._read_subscribers.values())
                 for subscriber in subscribers:
@@ -17,8 +17,11 @@ import threading
 from navigation_server.router_core import NMEA2000Msg
 from navigation_server.nmea2000_datamodel import NMEA2000MutableName, PGNDef
 from navigation_server.nmea2000 import (AddressClaim, ISORequest, ProductInformation, ConfigurationInformation,
-                                          AcknowledgeGroupFunction, create_group_function, CommandedAddress,
-                                          CommandGroupFunction, Heartbeat, get_n2k_decoded_object, NMEA2000Device)
+                                          create_group_function, CommandedAddress, CommandGroupFunction, Heartbeat,
+                                          get_n2k_decoded_object, NMEA2000Device, GroupFunction, RequestGroupFunction,
+                                          ReadFieldsGroupFunction, WriteFieldsGroupFunction, GroupFunctionFieldMap,
+                                          GroupFunctionTarget, GroupFunctionResponder, GroupFunctionTransaction)
+from navigation_server.nmea2000.nmea2k_iso_messages import GF_PRIORITY_UNCHANGED, GF_TI_OK, GF_TI_TOO_LOW
 from navigation_server.router_common import get_id_from_mac, MessageServerGlobals, resolve_ref
 
 
@@ -104,6 +107,9 @@ class NMEA2000Application(NMEA2000Device):
         - Address Claim
         - Address Claimed / Cannot Claim
 
+    Group Functions (PGN 126208) are processed for the PGN declared as targets (add_group_function_target)
+    and can be sent to other devices (request_pgn, command_pgn, read_fields, write_fields)
+
     The address can be either taken automatically from the address pool or assigned by configuration.
     In case of conflict and after ISO/J1939 NAME comparison another address is allocated from the pool.
     If all addresses from the pool are exhausted, then the CA/Device goes offline.
@@ -153,6 +159,8 @@ class NMEA2000Application(NMEA2000Device):
         self._claim_timer = None
         self._heartbeat_timer = None
         self._heartbeat_interval = 60.0  # can be adjusted in subclasses
+        self._default_heartbeat_interval = self._heartbeat_interval
+        self._heartbeat_msg = Heartbeat()
         self._sequence = 0
         self._master_app = False
         super().__init__(self._address, name=self._iso_name)
@@ -166,12 +174,16 @@ class NMEA2000Application(NMEA2000Device):
         self._process_broadcast_vector = {
             59904: self.iso_request,
             60928: self.remote_address_claim,
-            65240: self.commanded_address_request
+            65240: self.commanded_address_request,
+            126208: self.group_function_handler
         }
         self._product_information = ProductInformation()
         self.init_product_information()
         self._configuration_information = ConfigurationInformation()
         self.init_configuration_information()
+        self._gf_responder = GroupFunctionResponder(self._app_name)
+        self._gf_unique_id = 0
+        self.init_group_function_targets()
         self._manufacturer_name = MessageServerGlobals.manufacturers.by_code(self._iso_name.manufacturer_code).name
         self._id = self.application_id
         NMEA2000Application.application_id += 1
@@ -216,6 +228,24 @@ class NMEA2000Application(NMEA2000Device):
         self._configuration_information.installation_2 = "Test2"
         self._configuration_information.manufacturer_info = "Sterwen Technology SAS"
 
+    def init_group_function_targets(self):
+        '''
+        Declare the PGN that are processed by the Group Functions
+        To be extended in subclasses to expose their own PGN with add_group_function_target
+        '''
+        self.add_group_function_target(GroupFunctionTarget(self._iso_name, pgn=60928))
+        self.add_group_function_target(GroupFunctionTarget(
+            self._heartbeat_msg, on_request=lambda requester: self.transmit_heartbeat(),
+            on_interval=self.heartbeat_interval_request))
+        self.add_group_function_target(GroupFunctionTarget(
+            self._product_information, on_request=lambda requester: self.send_product_information()))
+        self.add_group_function_target(GroupFunctionTarget(
+            self._configuration_information, writable=('installation_1', 'installation_2'),
+            on_request=lambda requester: self.send_configuration_information()))
+
+    def add_group_function_target(self, target: GroupFunctionTarget):
+        self._gf_responder.add_target(target)
+
     def send_address_claim(self):
         if self._app_state == self.STOP_IN_PROGRESS:
             return
@@ -369,48 +399,146 @@ class NMEA2000Application(NMEA2000Device):
     def send_heartbeat(self):
         if self._app_state == self.STOP_IN_PROGRESS:
             return
+        self.transmit_heartbeat()
+        self._heartbeat_timer = threading.Timer(self._heartbeat_interval, self.send_heartbeat)
+        self._heartbeat_timer.start()
+
+    def transmit_heartbeat(self):
         _logger.debug("sending heartbeat from device %d sequence %d" % (self._address, self._sequence))
-        request = Heartbeat()
-        request.interval = self._heartbeat_interval
-        request.sequence = self._sequence
-        request.sa = self._address
+        self._heartbeat_msg.interval = self._heartbeat_interval
+        self._heartbeat_msg.sequence = self._sequence
+        self._heartbeat_msg.sa = self._address
         self._sequence += 1
         if self._sequence > 253:
             self._sequence = 0
+        self._controller.CAN_interface.send(self._heartbeat_msg.message(), force_send=True)
 
-        self._controller.CAN_interface.send(request.message(), force_send=True)
-        self._heartbeat_timer = threading.Timer(self._heartbeat_interval, self.send_heartbeat)
-        self._heartbeat_timer.start()
+    def heartbeat_interval_request(self, interval, offset) -> int:
+        '''
+        Transmission interval of the heartbeat changed by a Request Group Function, 0 restores the default
+        '''
+        if interval is None:
+            return GF_TI_OK
+        if interval == 0.:
+            interval = self._default_heartbeat_interval
+        elif interval < 1.0:
+            return GF_TI_TOO_LOW
+        _logger.info("Application %d heartbeat interval set to %.3fs" % (self._address, interval))
+        self._heartbeat_interval = interval
+        if self._heartbeat_timer is not None:
+            # the heartbeat is sent in reply to the request, so the next one is after the new interval
+            self._heartbeat_timer.cancel()
+            self._heartbeat_timer = threading.Timer(self._heartbeat_interval, self.send_heartbeat)
+            self._heartbeat_timer.start()
+        return GF_TI_OK
 
     def group_function_handler(self, msg: NMEA2000Msg):
         '''
-        Handle PGN 126408 Group Function handler
+        Handle PGN 126208 Group Function
+        Requests, Commands, Read and Write Fields are processed by the responder, the replies are passed to the
+        controller transactions. There is no acknowledgement of the Group Functions sent to all devices
         '''
-        group_function = create_group_function(message=msg)
+        try:
+            group_function = create_group_function(message=msg)
+        except ValueError as err:
+            _logger.error("Application %d Group Function from %d error: %s" % (self._address, msg.sa, err))
+            return
         _logger.debug("Received Group Function for address %d function=%d on PGN %d" % (self._address,
                                                                                         group_function.function,
                                                                                         group_function.function_pgn))
-        if type(group_function) is CommandGroupFunction and group_function.pgn_class is not None:
-            # ok supported
-            acknowledge = AcknowledgeGroupFunction(pgn=group_function.function_pgn, pgn_error_code=0)
-            self.process_command_group_function(group_function, acknowledge)
+        if group_function.is_reply:
+            if msg.da == self._address and not self._controller.group_functions.reply_received(self._address,
+                                                                                                group_function):
+                _logger.warning("Application %d Group Function %d from %d on PGN %d without transaction" %
+                                (self._address, group_function.function, msg.sa, group_function.function_pgn))
+            return
+        reply = self._gf_responder.process(group_function, msg.sa)
+        if reply is None:
+            return
+        if isinstance(reply, GroupFunction):
+            if msg.da == 255:
+                return
+            reply.da = msg.sa
+        elif (reply.pgn >> 8) & 0xFF < 240:
+            # requested PGN with a destination address
+            reply.da = msg.sa
+        reply.sa = self._address
+        _logger.debug("Group Function sending reply => %s" % reply.message())
+        self._controller.CAN_interface.send(reply.message())
+
+    def group_function_transaction(self, da: int, group_function: GroupFunction, timeout: float = 1.0,
+                                   callback=None) -> GroupFunctionTransaction:
+        '''
+        Send a Group Function and return the transaction waiting for the reply
+        returns None if a transaction is already pending with that device on that PGN
+        '''
+        group_function.sa = self._address
+        group_function.da = da
+        transactions = self._controller.group_functions
+        transaction = transactions.start_transaction(self._address, da, group_function, timeout, callback)
+        if transaction is None:
+            return None
+        if not self._controller.CAN_interface.send(group_function.message()):
+            transactions.end_transaction(transaction, "failed")
+        return transaction
+
+    @staticmethod
+    def group_function_field_map(pgn: int) -> GroupFunctionFieldMap:
+        field_map = GroupFunctionFieldMap.for_pgn(pgn)
+        if field_map is None:
+            raise ValueError(f"No Group Function fields for PGN {pgn}")
+        return field_map
+
+    def next_unique_id(self) -> int:
+        self._gf_unique_id = (self._gf_unique_id + 1) & 0xFF
+        return self._gf_unique_id
+
+    def request_pgn(self, da: int, pgn: int, interval: float = None, offset: float = None, selection=None,
+                    timeout: float = 1.0, callback=None) -> GroupFunctionTransaction:
+        '''
+        Request a PGN, optionally with a new transmission interval and offset (seconds)
+        selection: dictionary or list of (field, value) that the PGN shall match
+        The fields are given by number, attribute of the generated class or name
+        '''
+        if selection:
+            selection = self.group_function_field_map(pgn).resolve(selection)
         else:
-            acknowledge = AcknowledgeGroupFunction(pgn=group_function.function_pgn, pgn_error_code=1)
-        acknowledge.sa = self._address
-        acknowledge.da = msg.sa
-        _logger.debug("Group Function sending acknowledgement => %s" % acknowledge.message())
-        self._controller.CAN_interface.send(acknowledge.message())
-
-    def process_command_group_function(self, group_function, acknowledge):
-        if group_function.function_pgn == 60928:
-            _logger.debug("Command Group Function on name %s" % self._iso_name)
-            group_function.pgn_class.execute_command_parameters(self._iso_name, group_function.parameters, acknowledge)
-            _logger.debug("Command Group Function new name %s" % self._iso_name)
-        elif group_function.function_pgn == 126998:
-            group_function.pgn_class.execute_command_parameters(self._configuration_information,
-                                                                group_function.parameters, acknowledge)
+            selection = []
+        request = RequestGroupFunction(pgn=pgn, interval=interval, offset=offset, selection=selection)
+        return self.group_function_transaction(da, request, timeout, callback)
+
+    def command_pgn(self, da: int, pgn: int, parameters, priority: int = GF_PRIORITY_UNCHANGED,
+                    timeout: float = 1.0, callback=None) -> GroupFunctionTransaction:
+        parameters = self.group_function_field_map(pgn).resolve(parameters)
+        command = CommandGroupFunction(pgn=pgn, priority=priority, parameters=parameters)
+        return self.group_function_transaction(da, command, timeout, callback)
+
+    def read_fields(self, da: int, pgn: int, fields, selection=None, timeout: float = 1.0,
+                    callback=None) -> GroupFunctionTransaction:
+        field_map = self.group_function_field_map(pgn)
+        read = ReadFieldsGroupFunction(pgn=pgn, unique_id=self.next_unique_id(),
+                                       selection=field_map.resolve(selection or []), fields=field_map.numbers(fields))
+        return self.group_function_transaction(da, read, timeout, callback)
+
+    def write_fields(self, da: int, pgn: int, parameters, selection=None, timeout: float = 1.0,
+                     callback=None) -> GroupFunctionTransaction:
+        field_map = self.group_function_field_map(pgn)
+        write = WriteFieldsGroupFunction(pgn=pgn, unique_id=self.next_unique_id(),
+                                         selection=field_map.resolve(selection or []),
+                                         parameters=field_map.resolve(parameters))
+        return self.group_function_transaction(da, write, timeout, callback)
+
+    def iso_transport_end(self, session):
+        '''
+        Called when a message sent with the ISO transport protocol is acknowledged or aborted
+        To be overloaded by applications that need to know the result of the transmission
+        '''
+        if session.status == "complete":
+            _logger.debug("Device %d ISO transport PGN %d to %d complete in %.3fs" %
+                          (self._address, session.pgn, session.peer, session.duration))
         else:
-            _logger.error("Command Group Function PGN %d not supported" % group_function.function_pgn)
+            _logger.error("Device %d ISO transport PGN %d to %d aborted reason %d" %
+                          (self._address, session.pgn, session.peer, session.abort_reason))
 
     def wake_up(self):
         # wake up call every second
@@ -83,6 +83,7 @@ class DirectCANCoupler(Coupler, NMEA2000Application):
         def process_msg(m) -> NavGenericMsg:
             # _logger.debug("Direct CAN read %s" % m.format1())
             gen_msg = NavGenericMsg(N2K_MSG, msg=m)
+            gen_msg.stamp = m.stamp
             self.trace(self.TRACE_IN, gen_msg)
             return gen_msg
 
@@ -11,6 +11,8 @@
 
 # update notes
 # 4/1/2024  => adding a first minimal version of ISO (J1939) Transport protocol - Only broadcast receipt
+# 15/10/2025 => priority transmit scheduler with token bucket pacing replacing the writer FIFO
+# 17/10/2025 => full ISO-TP (J1939/21) with connection mode (RTS/CTS) on receive and transmit
 
 import datetime
 import logging
@@ -18,16 +20,17 @@ import threading
 import queue
 import time
 import subprocess
-from queue import Queue
 
 from can import Message, CanError, ThreadSafeBus
 
 from navigation_server.router_core.nmea2000_msg import NMEA2000Msg
 from navigation_server.nmea2000 import FastPacketHandler, FastPacketException
-from navigation_server.nmea2000 import IsoTransportHandler, IsoTransportException
+from navigation_server.nmea2000 import IsoTransportHandler
 from navigation_server.nmea2000_datamodel import PGNDef
-from navigation_server.router_common import NMEAMsgTrace, MessageTraceError, NavThread, build_subclass_dict
+from navigation_server.router_common import (NMEAMsgTrace, MessageTraceError, NavThread, build_subclass_dict,
+                                             LatencyTracker, MetricsRegistry, FaultInjector)
 from navigation_server.router_common import ObjectFatalError
+from .nmea2k_can_scheduler import CANTransmitScheduler, TokenBucket
 
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
@@ -63,23 +66,35 @@ def check_can_device(link: str):
     return
 
 
+_can_frames_in = MetricsRegistry.counter('navigation_can_frames_in', 'CAN frames received', ('channel',))
+_can_frames_out = MetricsRegistry.counter('navigation_can_frames_out', 'CAN frames sent', ('channel',))
+
+
 class SocketCANInterface(NavThread):
     """
     Manage a socket CAN interface including transport layer both ISO and Fast Packets
     """
     (BUS_NOT_CONNECTED, BUS_CONNECTED, BUS_READY, BUS_SENS_ALLOWED) = range(0, 4)
 
-    def __init__(self, channel: str, out_queue: queue.Queue, trace=False):
+    def __init__(self, channel: str, out_queue: queue.Queue, trace=False, tx_bandwidth: float = 20.,
+                 tx_queue_size: int = 64, tx_burst: int = 5, iso_tp_window: int = 16, iso_tp_sessions: int = 8,
+                 bus_interface: str = 'socketcan'):
 
-        try:
-            check_can_device(channel)
-        except SocketCanError as err:
-            err_str = "CAN bus not available"
-            _logger.critical("%s: %s" % (err_str, err))
-            raise ObjectFatalError(err_str)
+        # bus_interface is the python-can interface, 'virtual' is an in-process bus for simulation and benchmarks
+        if bus_interface == 'socketcan':
+            try:
+                check_can_device(channel)
+            except SocketCanError as err:
+                err_str = "CAN bus not available"
+                _logger.critical("%s: %s" % (err_str, err))
+                raise ObjectFatalError(err_str)
+        self._bus_interface = bus_interface
 
         super().__init__(name="CAN-if-%s" % channel)
         self._channel = channel
+        self._reassembly_latency = LatencyTracker.histogram('can_reassembly', channel)
+        # chaos mode, None unless faults are configured for the channel
+        self._faults = FaultInjector.point(f"can:{channel}")
         self._bus = None
         self._queue = out_queue     # that is the queue used to push all message received towards application
         self._stop_flag = False
@@ -88,10 +103,11 @@ class SocketCANInterface(NavThread):
         self._allowed_send.clear()
         self._bus_ready = threading.Event()
         self._bus_ready.clear()
-        self._write_buffer_size: int = 40
-        self._in_queue = queue.Queue(self._write_buffer_size)    # queue for outgoing messages to the bus (internal queue)
+        # priority queues for outgoing messages to the bus
+        self._tx_scheduler = CANTransmitScheduler(tx_queue_size)
         self._fp_handler = FastPacketHandler(self)
-        self._iso_tp_handler = IsoTransportHandler()
+        self._iso_tp_handler = IsoTransportHandler(f"CAN-if-{channel}-ISO-TP", self._send_iso_tp_frames,
+                                                   iso_tp_window, iso_tp_sessions)
         self._total_msg_in = 0
         # self._access_lock = threading.Lock()
         self._addresses = [255]
@@ -109,12 +125,14 @@ class SocketCANInterface(NavThread):
         else:
             self._trace = None
 
-        self._writer = SocketCANWriter(self._in_queue, self, self._trace)
+        self._writer = SocketCANWriter(self._tx_scheduler, self, self._trace, tx_bandwidth, tx_burst)
+        _can_frames_in.labels(channel).set_function(self.total_msg_raw)
+        _can_frames_out.labels(channel).set_function(self.total_msg_raw_out)
 
     def start(self):
         # connect to the CAN bus
         try:
-            self._bus = ThreadSafeBus(channel=self._channel, interface="socketcan", bitrate=250000)
+            self._bus = ThreadSafeBus(channel=self._channel, interface=self._bus_interface, bitrate=250000)
         except CanError as e:
             _logger.error("Error initializing CAN Channel %s: %s" % (self._channel, e))
             raise SocketCanError
@@ -123,11 +141,13 @@ class SocketCANInterface(NavThread):
         self._state = self.BUS_CONNECTED
         super().start()
         self._writer.start()
+        self._iso_tp_handler.start()
         # once the first message is received, the bus is considered as ready
         self._bus_ready.set()
         self._state = self.BUS_READY
 
     def stop(self):
+        self._iso_tp_handler.stop()
         self._writer.stop()
         self._writer.join() # change 2025-05-26 => wait until the writer stops before stopping the full service
         self._stop_flag = True
@@ -157,6 +177,21 @@ class SocketCANInterface(NavThread):
     def total_msg_raw_out(self) -> int:
         return self._writer.total_msg()
 
+    @property
+    def tx_scheduler(self) -> CANTransmitScheduler:
+        return self._tx_scheduler
+
+    @property
+    def iso_tp_handler(self) -> IsoTransportHandler:
+        return self._iso_tp_handler
+
+    @property
+    def tx_bandwidth(self) -> float:
+        return self._writer.bandwidth
+
+    def change_bandwidth(self, bandwidth: float):
+        self._writer.change_bandwidth(bandwidth)
+
     def wait_for_bus_ready(self):
         self._bus_ready.wait()
         _logger.debug("NMEA CAN Interface BUS ready")
@@ -171,10 +206,11 @@ class SocketCANInterface(NavThread):
         trace_str = "%08X,%s" % (can_id, data.hex())
         self._trace.trace_n2k_raw_can(date_ts, self._total_msg_in, direction, trace_str)
 
-    def process_receive_msg(self, msg_recv: Message):
+    def process_receive_msg(self, msg_recv: Message, stamp: int = 0):
         """
         function to read the bus and perform Fast packet reassembly
         push a NMEA200Msg when a valid message as been received or reassembled
+        stamp is the read time of the frame for the latency tracking (0 when off)
         """
 
         can_id = msg_recv.arbitration_id
@@ -188,17 +224,15 @@ class SocketCANInterface(NavThread):
         if self._trace is not None:
             self.send_trace(NMEAMsgTrace.TRACE_IN, can_id, msg_recv.timestamp, data)
         self._total_msg_in += 1
-        # ISO TP handling
-        # only Broadcast messages are handled, others will raise an exception
+        # ISO TP handling, broadcast (BAM) and connection mode (RTS/CTS)
         if pgn == 60416:
-            self._iso_tp_handler.new_transaction(sa, prio, data)
+            self._iso_tp_handler.control_message(sa, da, prio, data)
             return
         elif pgn == 60160:
-            try:
-                n2k_msg = self._iso_tp_handler.incoming_packet(sa, data)
-            except IsoTransportException:
-                return
+            n2k_msg = self._iso_tp_handler.data_packet(sa, da, data)
             if n2k_msg is not None:
+                n2k_msg.stamp = stamp
+                self._reassembly_latency.record_since(stamp)
                 try:
                     self._queue.put(n2k_msg, block=False)
                 except queue.Full:
@@ -230,6 +264,9 @@ class SocketCANInterface(NavThread):
                     return
         # end fast packet handling
         n2k_msg = NMEA2000Msg(pgn, prio, sa, da, data)
+        if stamp != 0:
+            n2k_msg.stamp = stamp
+            self._reassembly_latency.record_since(stamp)
         if n2k_msg is not None:
             try:
                 # new in version 2.2 put a small timeout to allow the queue messages to be processed
@@ -239,6 +276,31 @@ class SocketCANInterface(NavThread):
                 #  time.sleep(0.02) # remove as we have the timeout
         return
 
+    def faulty_receive_msg(self, msg_recv: Message):
+        """
+        Receive path with the faults injected on the channel (chaos mode)
+        The truncation applies to the Fast Packet and ISO-TP data frames following the first one
+        """
+        if self._faults.event('read_error'):
+            return
+        self._faults.stall()
+        stamp = LatencyTracker.stamp()
+        can_id = msg_recv.arbitration_id
+        pgn, da = PGNDef.pgn_pdu1_adjust((can_id >> 8) & 0x1FFFF)
+        data = msg_recv.data
+        if pgn == 60160:
+            continuation = len(data) > 0 and data[0] > 1
+        else:
+            continuation = len(data) > 0 and data[0] & 0x1F != 0 and PGNDef.fast_packet_check(pgn)
+        for frame in self._faults.process(msg_recv, corrupt=self._corrupt_frame, key=can_id,
+                                          continuation=continuation):
+            self.process_receive_msg(frame, stamp)
+
+    @staticmethod
+    def _corrupt_frame(msg_recv: Message, point) -> Message:
+        return Message(arbitration_id=msg_recv.arbitration_id, is_extended_id=True,
+                       data=point.corrupt_bytes(msg_recv.data), timestamp=msg_recv.timestamp)
+
     def read_can(self) -> Message:
         """
         Perform the actual read on the CAN bus
@@ -289,7 +351,10 @@ class SocketCANInterface(NavThread):
             except SocketCanReadInvalid:
                 continue
             _logger.debug("CAN RECV:%s" % str(msg))
-            self.process_receive_msg(msg)
+            if self._faults is None:
+                self.process_receive_msg(msg, LatencyTracker.stamp())
+            else:
+                self.faulty_receive_msg(msg)
 
             # end of the run loop
 
@@ -303,23 +368,28 @@ class SocketCANInterface(NavThread):
         """
         Send a CAN message to the sending queue
         """
-        msg = Message(arbitration_id=can_id, is_extended_id=True, timestamp=time.time(), data=data)
-        try:
-            self._in_queue.put(msg, timeout=5.0)
+        return self.put_can_frames([Message(arbitration_id=can_id, is_extended_id=True, timestamp=time.time(),
+                                            data=data)])
+
+    def put_can_frames(self, frames: list, on_sent=None) -> bool:
+        """
+        Send a sequence of CAN messages to the sending queue, they will be sent contiguously
+        on_sent is called when the last frame is sent
+        """
+        if self._tx_scheduler.submit(frames, timeout=5.0, on_sent=on_sent):
             self._write_errors = 0
-        except queue.Full:
-            _logger.error(f"CAN Interface {self.name} Write buffer full occurrence {self._write_errors}")
-            self._write_errors += 1
-            if self._write_errors > 10:
-                raise SocketCanError("Socket write buffer full")
-            else:
-                return False
-        return True
+            return True
+        _logger.error(f"CAN Interface {self.name} Write buffer full occurrence {self._write_errors}")
+        self._write_errors += 1
+        if self._write_errors > 10:
+            raise SocketCanError("Socket write buffer full")
+        return False
 
     def send(self, n2k_msg: NMEA2000Msg, force_send=False) -> bool:
         """
         Send a NMEA2000 message to the CAN bus
         Message will be split if FastPacket and send to the sending queue
+        Messages longer than 8 bytes that cannot be sent as Fast Packet are sent with the ISO transport protocol
         """
 
         if not self._allowed_send.is_set() and not force_send:
@@ -330,31 +400,50 @@ class SocketCANInterface(NavThread):
 
         _logger.debug("CAN interface send in queue message: %s" % n2k_msg.format1())
 
-        # Fast packet processing
-        if n2k_msg.fast_packet:
+        # Fast packet processing (223 bytes maximum)
+        if n2k_msg.fast_packet and len(n2k_msg.payload) <= 223:
             _logger.debug("CAN interface -> start split fast packet")
-            for data in self._fp_handler.split_message(n2k_msg.pgn, n2k_msg.payload):
-                if not self.put_can_msg(can_id, data):
-                    return False
+            pgn = n2k_msg.pgn
+            sa = n2k_msg.sa
+            try:
+                seq = self._fp_handler.allocate_seq(pgn, sa)
+            except FastPacketException:
+                return False
+            ts = time.time()
+            frames = [Message(arbitration_id=can_id, is_extended_id=True, timestamp=ts, data=data)
+                      for data in self._fp_handler.build_frames(seq, n2k_msg.payload)]
+            # the sequence stays allocated until the last frame leaves the writer
+            try:
+                queued = self.put_can_frames(frames, lambda: self._fp_handler.free_seq(pgn, seq, sa))
+            except SocketCanError:
+                self._fp_handler.free_seq(pgn, seq, sa)
+                raise
+            if not queued:
+                self._fp_handler.free_seq(pgn, seq, sa)
+            return queued
+        elif len(n2k_msg.payload) > 8:
+            return self._iso_tp_handler.send_message(n2k_msg)
         else:
             return self.put_can_msg(can_id, n2k_msg.payload)
 
-
     def send_broadcast_with_iso_tp(self, msg: NMEA2000Msg):
         """
         Send a PGN with the J1939/21 Transport protocol
         """
-        tp_transact, tpcm_msg = self._iso_tp_handler.new_output_transaction(msg)
-        can_id = self.build_arbitration_id(tpcm_msg)
-        # send the broadcast announcement
-        if not self.put_can_msg(can_id, tpcm_msg.payload):
+        return self._iso_tp_handler.send_message(NMEA2000Msg(msg.pgn, msg.prio, msg.sa, 255, msg.payload))
+
+    def _send_iso_tp_frames(self, pgn: int, sa: int, da: int, frames: list, on_sent=None) -> bool:
+        """
+        Sender for the ISO transport handler, all frames are sent contiguously with the TP priority (7)
+        """
+        can_id = self.build_arbitration_id(NMEA2000Msg(pgn, 7, sa, da))
+        ts = time.time()
+        try:
+            return self.put_can_frames([Message(arbitration_id=can_id, is_extended_id=True, timestamp=ts, data=data)
+                                        for data in frames], on_sent)
+        except SocketCanError as err:
+            _logger.error(f"CAN interface ISO transport error: {err}")
             return False
-        # now send the data
-        bam_tpdt_can_id = self.build_arbitration_id(NMEA2000Msg(60160, 7, msg.sa, 255))
-        for data in tp_transact.split_message():
-            if not self.put_can_msg(bam_tpdt_can_id, data):
-                return False
-        return True
 
     #
     #   Trace management methods
@@ -378,20 +467,25 @@ class SocketCANInterface(NavThread):
 
 class SocketCANWriter(NavThread):
 
-    max_throughput = 2000.0
-    min_interval_100 = 1. / max_throughput
+    max_throughput = 2000.0     # frames per second at 100% of the bus bandwidth
 
-    def __init__(self, in_queue: Queue, can_interface, trace):
+    def __init__(self, scheduler: CANTransmitScheduler, can_interface, trace, bandwidth: float = 20.,
+                 burst: int = 5):
 
         super().__init__(name=f"{can_interface.name}-Writer", daemon=True)
         self._can_interface = can_interface
-        self._in_queue: Queue = in_queue
-        self._in_queue_size = self._in_queue.maxsize
+        self._scheduler = scheduler
         self._bus = None
         self._trace = trace
         self._stop_flag = False
         self._total_msg = 0
-        self._min_interval = (100. / 20.) * self.min_interval_100  # 20% of the bandwidth by default
+        self._faults = FaultInjector.point(f"can:{can_interface.channel}:tx")
+        if not 5. < bandwidth <= 50.:
+            _logger.error(f"SocketCANWriter bandwidth {bandwidth}% out of range (5-50) => 20%")
+            bandwidth = 20.
+        self._bandwidth = bandwidth
+        # each ECU is allowed to a max bandwidth% of the bus, burst is the number of frames that can be sent back to back
+        self._bucket = TokenBucket(self.max_throughput * bandwidth / 100., burst)
         # self._access_lock = can_interface.access_lock
 
     def set_bus(self, bus):
@@ -406,89 +500,66 @@ class SocketCANWriter(NavThread):
     def total_msg(self) -> int:
         return self._total_msg
 
+    @property
+    def bandwidth(self) -> float:
+        return self._bandwidth
+
     def change_bandwidth(self, bandwidth: float):
+        """
+        Change the percentage of the bus bandwidth used by the writer, can be done while running
+        """
         if 5. < bandwidth <= 50.:
-            self._min_interval = (100. / bandwidth) * self.min_interval_100
+            self._bandwidth = bandwidth
+            self._bucket.set_rate(self.max_throughput * bandwidth / 100.)
+            _logger.info(f"SocketCANWriter {self.name} bandwidth set to {bandwidth}%")
         else:
             _logger.error("Cannot increase bandwidth over 50% of the bus bandwidth")
 
-
     def nrun(self):
         """
         CAN bus write loop
-        Wait for messages to be sent on the queue and then send them to the CAN BUS
-        Message pacing is implemented with a fixed timing of 5ms (to be improved)
+        Get the highest priority unit from the scheduler and send all its frames on the CAN bus
+        The pacing is done by the token bucket
         """
 
         #  Run loop
-        last_write_time = time.monotonic()
         nberr = 0
-        retry = False
         while not self._stop_flag:
 
-            if not retry:
-                try:
-                    msg = self._in_queue.get(timeout=1.0)
-                except queue.Empty:
-                    continue
-            # 2024-09-07 change the pacing algorithm
-            msg_pace = time.monotonic() - last_write_time
-            # each ECU is allowed to a max bandwidth% of the bus, so a minimum interval is setup
-            # except when the input queue start to fill-up
-            # Burst implemented in version 2.2 to speed up the processing of the queue
-            if self._in_queue.qsize() > self._in_queue_size - 2:
-                # the input is filling up => burst mode
-                burst = 5
-            else:
-                burst = 1
-            if burst == 1 and msg_pace < self._min_interval:
-                # stop the thread for the delta
-                time.sleep(self._min_interval - msg_pace)
-            while burst > 0:
-                #
-                # message can be sent as burst when the queue is filling up
-                #
+            unit = self._scheduler.get_unit(timeout=1.0)
+            if unit is None:
+                continue
+            for msg in unit.frames:
+                self._bucket.consume()
                 if self._trace is not None:
                     dts = datetime.datetime.fromtimestamp(msg.timestamp)
                     self._trace.trace_n2k_raw_can(dts, self._total_msg, NMEAMsgTrace.TRACE_OUT,
                                                   "%08X,%s" % (msg.arbitration_id, msg.data.hex()))
-
-                try:
-                    _logger.debug("CAN sending: %s" % str(msg))
-                    self._total_msg += 1
-                    self._bus.send(msg, 5.0)
-                    last_write_time = time.monotonic()
-                    if retry:
-                        _logger.info("SocketCANWriter success after retry (%4X) attempt:%d" % (msg.arbitration_id, nberr))
-                    retry = False
-                    nberr = 0
-                except ValueError:
-                    # can happen if the thread was blocked while the CAN interface is closed
-                    raise SocketCanError(f"SocketCANWriter {self.name} CAN access closed during write => STOP")
-                except CanError as e:
-                    nberr += 1
-                    _logger.error("SocketCANWriter: Error writing message (%4X) to channel %s: %s retry:%d" %
-                                  (msg.arbitration_id, self._can_interface.channel, e, nberr))
-                    burst = 1 # we stop burst
-                    retry = True
-                    last_write_time = time.monotonic()
-                    if nberr > 20:
-                        # more than 20 consecutive error no need to continue
-                        _logger.critical("CAN Write too many errors stopping")
-                        raise SocketCanError(f"Too many errors in write operations - suspecting CAN bus problem")
-                burst -= 1
-                if burst > 0:
-                    # in case of burst limit anyway to 1000 msg/sec
-                    # decrease to 500msg/sec 25-04-2025
-                    time.sleep(0.002)
-                    # then get one more message
+                while True:
                     try:
-                        msg = self._in_queue.get(block=False)
-                    except queue.Empty:
-                        break  # stop burst
-
+                        _logger.debug("CAN sending: %s" % str(msg))
+                        self._total_msg += 1
+                        if self._faults is not None and self._faults.event('write_error'):
+                            raise CanError("Injected write error")
+                        self._bus.send(msg, 5.0)
+                        if nberr > 0:
+                            _logger.info("SocketCANWriter success after retry (%4X) attempt:%d" % (msg.arbitration_id, nberr))
+                        nberr = 0
+                        break
+                    except ValueError:
+                        # can happen if the thread was blocked while the CAN interface is closed
+                        raise SocketCanError(f"SocketCANWriter {self.name} CAN access closed during write => STOP")
+                    except CanError as e:
+                        nberr += 1
+                        _logger.error("SocketCANWriter: Error writing message (%4X) to channel %s: %s retry:%d" %
+                                      (msg.arbitration_id, self._can_interface.channel, e, nberr))
+                        if nberr > 20:
+                            # more than 20 consecutive error no need to continue
+                            _logger.critical("CAN Write too many errors stopping")
+                            raise SocketCanError(f"Too many errors in write operations - suspecting CAN bus problem")
+                        self._bucket.consume()
+            if unit.on_sent is not None:
+                unit.on_sent()
 
             # end of the run loop
         _logger.info("Socket CAN Write thread stops")
-
-
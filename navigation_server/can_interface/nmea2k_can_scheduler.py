@@ -0,0 +1,158 @@
+# -------------------------------------------------------------------------------
+# Name:        NMEA2K-CAN transmit scheduler
+# Purpose:     Priority queues and bandwidth control for the CAN frames to be sent
+#
+# Author:      Laurent Carré
+#
+# Created:     15/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+# -------------------------------------------------------------------------------
+
+#  implementation notes
+#   Messages are queued as transmit units: a single frame, all frames of a fast packet or an ISO transport sequence
+#   The frames of a unit are always sent contiguously
+#   There is one FIFO per NMEA2000 priority (0 highest, 7 lowest), the highest priority unit is always sent first
+#   as the CAN bus arbitration would do
+#   The bandwidth is controlled by a token bucket in frames per second
+
+import collections
+import logging
+import threading
+import time
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class CANTransmitUnit:
+
+    __slots__ = ('frames', 'priority', 'enqueue_time', 'on_sent')
+
+    def __init__(self, frames: list, priority: int, on_sent=None):
+        self.frames = frames
+        self.priority = priority
+        self.enqueue_time = time.monotonic()
+        self.on_sent = on_sent  # called by the writer once the last frame is sent
+
+
+class CANPriorityStats:
+
+    __slots__ = ('queued_frames', 'units', 'frames', 'dropped', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.queued_frames = 0
+        self.units = 0
+        self.frames = 0
+        self.dropped = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def mean_wait(self) -> float:
+        if self.units == 0:
+            return 0.0
+        return self.total_wait / self.units
+
+
+class CANTransmitScheduler:
+    """
+    Priority queues of transmit units
+    queue_size is the maximum number of frames waiting per priority, a unit larger than the queue is accepted
+    only if the queue is empty
+    """
+
+    nb_priorities = 8
+
+    def __init__(self, queue_size: int = 64):
+        self._queue_size = queue_size
+        self._queues = [collections.deque() for _ in range(self.nb_priorities)]
+        self._stats = [CANPriorityStats() for _ in range(self.nb_priorities)]
+        self._nb_units = 0
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def frame_priority(can_id: int) -> int:
+        return (can_id >> 26) & 7
+
+    def submit(self, frames: list, timeout: float, on_sent=None) -> bool:
+        """
+        Queue all frames as one unit, the priority is taken from the first frame
+        Wait at most timeout seconds for room in the queue, return False if the unit is dropped
+        on_sent is called without argument when the last frame of the unit has been sent
+        """
+        priority = self.frame_priority(frames[0].arbitration_id)
+        stats = self._stats[priority]
+        nb_frames = len(frames)
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: stats.queued_frames == 0 or stats.queued_frames + nb_frames <= self._queue_size,
+                    timeout):
+                stats.dropped += 1
+                return False
+            self._queues[priority].append(CANTransmitUnit(frames, priority, on_sent))
+            stats.queued_frames += nb_frames
+            self._nb_units += 1
+            self._cond.notify_all()
+        return True
+
+    def get_unit(self, timeout: float) -> CANTransmitUnit:
+        """
+        Return the highest priority unit or None if nothing is available within the timeout
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._nb_units > 0, timeout):
+                return None
+            for priority_queue in self._queues:
+                if len(priority_queue) > 0:
+                    unit = priority_queue.popleft()
+                    break
+            self._nb_units -= 1
+            stats = self._stats[unit.priority]
+            stats.queued_frames -= len(unit.frames)
+            wait = time.monotonic() - unit.enqueue_time
+            stats.units += 1
+            stats.frames += len(unit.frames)
+            stats.total_wait += wait
+            if wait > stats.max_wait:
+                stats.max_wait = wait
+            # room for the producers
+            self._cond.notify_all()
+        return unit
+
+    def queued_frames(self) -> int:
+        return sum(stats.queued_frames for stats in self._stats)
+
+    def stats(self) -> list:
+        return self._stats
+
+
+class TokenBucket:
+    """
+    Token bucket in frames per second, depth is the maximum number of frames that can be sent back to back
+    """
+
+    def __init__(self, rate: float, depth: int):
+        self._rate = rate
+        self._depth = float(depth)
+        self._tokens = self._depth
+        self._last = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float):
+        self._rate = rate
+
+    def consume(self):
+        """
+        Take one token, wait until it is available
+        """
+        now = time.monotonic()
+        self._tokens = min(self._depth, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+        if self._tokens < 1.0:
+            time.sleep((1.0 - self._tokens) / self._rate)
+            now = time.monotonic()
+            self._tokens = min(self._depth, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+        self._tokens -= 1.0
@@ -9,25 +9,47 @@
 # Licence:     Eclipse Public License 2.0
 #-------------------------------------------------------------------------------
 
+import asyncio
 import logging
 import time
 
+import grpc
 
-from navigation_server.generated.n2k_can_service_pb2 import N2KDeviceMsg, CAN_ControllerMsg, CANRequest, CANReadRequest, CANAck
+
+from navigation_server.generated.n2k_can_service_pb2 import (N2KDeviceMsg, CAN_ControllerMsg, CANRequest, CANReadRequest,
+                                                             CANAck, CANLocalStreamMsg, CANMsgBatch, CANSubscriberMsg,
+                                                             StreamOverflowPolicy, CANPriorityStatsMsg,
+                                                             IsoTransportSessionMsg)
 from navigation_server.generated.n2k_can_service_pb2_grpc import CAN_ControllerServiceServicer, add_CAN_ControllerServiceServicer_to_server
-from navigation_server.generated.nmea2000_pb2 import nmea2000pb
+from navigation_server.generated.nmea2000_pb2 import nmea2000pb, N2KSnapshotMsg
 from navigation_server.generated.iso_name_pb2 import ISOName
 from navigation_server.router_common import GrpcService, get_global_var, resolve_ref, MessageTraceError
-from navigation_server.router_core import NMEA2000Msg
-from navigation_server.can_interface import NMEA2KActiveController
+from navigation_server.router_core import NMEA2000Msg, N2KSharedRingWriter, SharedRingError
+from navigation_server.nmea2000 import fill_snapshot
+from .nmea2k_active_controller import NMEA2KActiveController, N2KReadSubscriber, N2KReadClosed
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
 
 class CAN_ControllerServiceServicerImpl(CAN_ControllerServiceServicer):
 
-    def __init__(self, controller):
+    overflow_policies = {
+        StreamOverflowPolicy.OVERFLOW_DISCONNECT: 'disconnect',
+        StreamOverflowPolicy.OVERFLOW_DROP_OLDEST: 'drop_oldest',
+        StreamOverflowPolicy.OVERFLOW_COALESCE: 'coalesce'
+    }
+
+    def __init__(self, controller, local_transport: bool = True, ring_slots: int = 256, queue_size: int = 20,
+                 overflow_policy: str = 'drop_oldest', batch_size: int = 32, batch_max_latency: float = 0.05,
+                 stale_after: float = 5.0):
         self._controller: NMEA2KActiveController = controller
+        self._local_transport = local_transport
+        self._ring_slots = ring_slots
+        self._queue_size = queue_size
+        self._overflow_policy = overflow_policy
+        self._batch_size = batch_size
+        self._batch_max_latency = batch_max_latency
+        self._stale_after = stale_after
         self._start_period = time.monotonic()
         self._start_in_counter = 0
         self._start_out_counter = 0
@@ -59,6 +81,34 @@ class CAN_ControllerServiceServicerImpl(CAN_ControllerServiceServicer):
         self._start_out_counter = out_counter
 
         resp.traces_on = self._controller.CAN_interface.is_trace_active()
+        resp.tx_bandwidth = self._controller.CAN_interface.tx_bandwidth
+        for priority, stats in enumerate(self._controller.CAN_interface.tx_scheduler.stats()):
+            prio_pb = CANPriorityStatsMsg()
+            prio_pb.priority = priority
+            prio_pb.queued_frames = stats.queued_frames
+            prio_pb.units = stats.units
+            prio_pb.frames = stats.frames
+            prio_pb.dropped = stats.dropped
+            prio_pb.mean_wait = stats.mean_wait()
+            prio_pb.max_wait = stats.max_wait
+            resp.tx_priorities.append(prio_pb)
+        iso_tp = self._controller.CAN_interface.iso_tp_handler
+        active, resp.iso_tp_completed, resp.iso_tp_aborted = iso_tp.counters()
+        for session in iso_tp.sessions() + iso_tp.history():
+            session_pb = IsoTransportSessionMsg()
+            session_pb.outgoing = session.outgoing
+            session_pb.local_address = session.local
+            session_pb.peer_address = session.peer
+            session_pb.pgn = session.pgn
+            session_pb.size = session.total_size
+            session_pb.nb_packets = session.nb_packets
+            session_pb.packets = session.packets
+            session_pb.windows = session.windows
+            session_pb.retransmits = session.retransmits
+            session_pb.status = session.status
+            session_pb.abort_reason = session.abort_reason
+            session_pb.duration = session.duration
+            resp.iso_tp_sessions.append(session_pb)
 
         for device in self._controller.get_device():
             dev_pb = N2KDeviceMsg()
@@ -77,6 +127,13 @@ class CAN_ControllerServiceServicerImpl(CAN_ControllerServiceServicer):
             if device.configuration_information is not None:
                 device.configuration_information.set_protobuf(dev_pb.configuration_information)
             resp.devices.append(dev_pb)
+        for subscriber in self._controller.read_subscribers():
+            sub_pb = CANSubscriberMsg()
+            sub_pb.client = subscriber.client
+            sub_pb.transport = subscriber.transport
+            sub_pb.overflow_policy = subscriber.overflow_policy
+            sub_pb.queued, sub_pb.total, sub_pb.dropped, sub_pb.coalesced = subscriber.counters()
+            resp.subscribers.append(sub_pb)
         _logger.debug("Get NMEA Devices END")
         return resp
 
@@ -105,24 +162,132 @@ class CAN_ControllerServiceServicerImpl(CAN_ControllerServiceServicer):
         resp.traces_on = False
         return resp
 
+    def _new_subscriber(self, request: CANReadRequest, context) -> N2KReadSubscriber:
+        stream_id = f"{request.client}-{context.peer()}"
+        policy = self.overflow_policies.get(request.overflow_policy, self._overflow_policy)
+        queue_size = request.queue_size if request.queue_size > 0 else self._queue_size
+        return self._controller.add_read_subscriber(stream_id,
+                                                    request.select_sources,
+                                                    request.reject_sources,
+                                                    request.select_pgn,
+                                                    request.reject_pgn,
+                                                    timeout=60.,
+                                                    queue_size=queue_size,
+                                                    overflow_policy=policy)
+
+    def _add_subscriber(self, request: CANReadRequest, context) -> N2KReadSubscriber:
+        msg_stream = self._new_subscriber(request, context)
+        # the stream can be waiting for messages when the client cancels => the subscriber is removed right away
+        context.add_callback(lambda: self._remove_subscriber(msg_stream))
+        return msg_stream
+
+    def _remove_subscriber(self, msg_stream: N2KReadSubscriber):
+        if not msg_stream.closed:
+            self._controller.remove_read_subscriber(msg_stream.client)
+
+    def _end_stream(self, msg_stream: N2KReadSubscriber, context):
+        if msg_stream.closed and context.is_active():
+            # the subscriber has been removed on overflow
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Stream {msg_stream.client} too slow, disconnected")
+        else:
+            # client cancelled, timeout or server stopped
+            self._remove_subscriber(msg_stream)
+
     def ReadNmea2000Msg(self, request: CANReadRequest, context):
         """
         Start a reading stream of NMEA2000 messages
         """
         _logger.debug("NMEA CAN service -> ReadNmea2000Msg from %s" % context.peer())
+        msg_stream = self._add_subscriber(request, context)
+        try:
+            while True:
+                msg = msg_stream.get_message()
+                msg_pb = nmea2000pb()
+                msg.as_protobuf(msg_pb)
+                _logger.debug("Pushing message with PGN %d" % msg_pb.pgn)
+                yield msg_pb
+        except N2KReadClosed:
+            pass
+        finally:
+            self._end_stream(msg_stream, context)
+
+    def ReadNmea2000MsgBatch(self, request: CANReadRequest, context):
+        """
+        Start a reading stream of NMEA2000 messages grouped in batches
+        A batch is sent as soon as batch_size messages are waiting or when the oldest message has waited max_latency
+        """
+        _logger.debug("NMEA CAN service -> ReadNmea2000MsgBatch from %s" % context.peer())
+        batch_size = request.batch_size if request.batch_size > 0 else self._batch_size
+        max_latency = request.max_latency if request.max_latency > 0. else self._batch_max_latency
+        msg_stream = self._add_subscriber(request, context)
+        try:
+            while True:
+                batch_pb = CANMsgBatch()
+                for msg in msg_stream.get_batch(batch_size, max_latency):
+                    msg.as_protobuf(batch_pb.messages.add())
+                queued, total, batch_pb.dropped, batch_pb.coalesced = msg_stream.counters()
+                yield batch_pb
+        except N2KReadClosed:
+            pass
+        finally:
+            self._end_stream(msg_stream, context)
+
+    def OpenLocalStream(self, request: CANReadRequest, context):
+        """
+        Open a stream of NMEA2000 messages over a shared memory ring for a client located on the same host
+        The client falls back on ReadNmea2000Msg if the request is not accepted
+        """
+        _logger.debug("NMEA CAN service -> OpenLocalStream from %s" % context.peer())
+        resp = CANLocalStreamMsg()
+        resp.id = request.id
+        if not self._local_transport:
+            resp.accepted = False
+            resp.status = "Local transport disabled"
+            return resp
         stream_id = f"{request.client}-{context.peer()}"
-        msg_stream = self._controller.add_read_subscriber(stream_id,
-                                                          request.select_sources,
-                                                          request.reject_sources,
-                                                          request.select_pgn,
-                                                          request.reject_pgn,
-                                                          timeout=60.)
-        while True:
-            msg = msg_stream.get_message()
-            msg_pb = nmea2000pb()
-            msg.as_protobuf(msg_pb)
-            _logger.debug("Pushing message with PGN %d" % msg_pb.pgn)
-            yield msg_pb
+        try:
+            ring = N2KSharedRingWriter(stream_id, self._ring_slots)
+        except SharedRingError as err:
+            resp.accepted = False
+            resp.status = str(err)
+            return resp
+        self._controller.add_ring_subscriber(stream_id,
+                                             request.select_sources,
+                                             request.reject_sources,
+                                             request.select_pgn,
+                                             request.reject_pgn,
+                                             ring)
+        resp.accepted = True
+        resp.status = "OK"
+        resp.ring_name = ring.name
+        resp.token = ring.token
+        resp.nb_slots = ring.nb_slots
+        return resp
+
+    def CloseLocalStream(self, request: CANLocalStreamMsg, context):
+        """
+        Release a shared memory ring opened by OpenLocalStream when the client cannot use it
+        """
+        _logger.debug("NMEA CAN service -> CloseLocalStream %s from %s" % (request.ring_name, context.peer()))
+        resp = CANAck()
+        resp.id = request.id
+        if not self._controller.remove_ring_subscriber(request.ring_name, request.token):
+            _logger.error("NMEA CAN service -> CloseLocalStream no subscriber for ring %s" % request.ring_name)
+            resp.error = 1
+        return resp
+
+    def GetSnapshot(self, request, context):
+        """
+        Return the latest message received for each (PGN, source) selected in the request
+        """
+        _logger.debug("NMEA CAN service -> GetSnapshot")
+        resp = N2KSnapshotMsg()
+        resp.id = request.id
+        if self._controller.latest_values is None:
+            resp.status = "Latest value cache not active on the CAN controller"
+            return resp
+        fill_snapshot(self._controller.latest_values, request, resp, self._stale_after)
+        return resp
 
     def SendNmea2000Msg(self, request, context):
         """
@@ -138,11 +303,65 @@ class CAN_ControllerServiceServicerImpl(CAN_ControllerServiceServicer):
         return resp
 
 
+class CAN_ControllerServiceAsyncServicer(CAN_ControllerServiceServicerImpl):
+    """
+    Servicer for the grpc.aio server: the read streams are coroutines and do not hold a thread
+    The other methods are synchronous and run in the server pools
+    """
+
+    def _add_async_subscriber(self, request: CANReadRequest, context) -> N2KReadSubscriber:
+        msg_stream = self._new_subscriber(request, context)
+        msg_stream.attach_loop(asyncio.get_running_loop())
+        return msg_stream
+
+    async def ReadNmea2000Msg(self, request: CANReadRequest, context):
+        _logger.debug("NMEA CAN service -> ReadNmea2000Msg (async) from %s" % context.peer())
+        msg_stream = self._add_async_subscriber(request, context)
+        try:
+            while True:
+                msg = await msg_stream.get_message_async()
+                msg_pb = nmea2000pb()
+                msg.as_protobuf(msg_pb)
+                yield msg_pb
+        except N2KReadClosed:
+            pass
+        finally:
+            # client cancelled, timeout or server stopped
+            self._remove_subscriber(msg_stream)
+        # the subscriber has been removed on overflow
+        await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Stream {msg_stream.client} too slow, disconnected")
+
+    async def ReadNmea2000MsgBatch(self, request: CANReadRequest, context):
+        _logger.debug("NMEA CAN service -> ReadNmea2000MsgBatch (async) from %s" % context.peer())
+        batch_size = request.batch_size if request.batch_size > 0 else self._batch_size
+        max_latency = request.max_latency if request.max_latency > 0. else self._batch_max_latency
+        msg_stream = self._add_async_subscriber(request, context)
+        try:
+            while True:
+                batch_pb = CANMsgBatch()
+                for msg in await msg_stream.get_batch_async(batch_size, max_latency):
+                    msg.as_protobuf(batch_pb.messages.add())
+                queued, total, batch_pb.dropped, batch_pb.coalesced = msg_stream.counters()
+                yield batch_pb
+        except N2KReadClosed:
+            pass
+        finally:
+            self._remove_subscriber(msg_stream)
+        await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Stream {msg_stream.client} too slow, disconnected")
+
+
 class N2KCanService(GrpcService):
 
     def __init__(self, opts):
         super().__init__(opts)
         self._ctlr_name = opts.get('can_controller', str, None)
+        self._local_transport = opts.get('local_transport', bool, True)
+        self._ring_slots = opts.get('local_ring_slots', int, 256)
+        self._queue_size = opts.get('stream_queue_size', int, 20)
+        self._overflow_policy = opts.get_choice('overflow_policy', N2KReadSubscriber.overflow_policies, 'drop_oldest')
+        self._batch_size = opts.get('batch_size', int, 32)
+        self._batch_max_latency = opts.get('batch_max_latency', float, 0.05)
+        self._stale_after = opts.get('stale_after', float, 5.0)
         self._nmea2k_ECU = None
         self._servicer = None
 
@@ -159,6 +378,12 @@ class N2KCanService(GrpcService):
                 _logger.critical(f"N2KCanService {self._name} => No Can controller (ECU)")
                 return
         super().finalize()
-        self._servicer = CAN_ControllerServiceServicerImpl(self._nmea2k_ECU)
+        if self.asynchronous:
+            servicer_class = CAN_ControllerServiceAsyncServicer
+        else:
+            servicer_class = CAN_ControllerServiceServicerImpl
+        self._servicer = servicer_class(self._nmea2k_ECU, self._local_transport, self._ring_slots, self._queue_size,
+                                        self._overflow_policy, self._batch_size, self._batch_max_latency,
+                                        self._stale_after)
         add_CAN_ControllerServiceServicer_to_server(self._servicer, self.grpc_server)
         _logger.debug("N2KCanService %s ready" % self.name)
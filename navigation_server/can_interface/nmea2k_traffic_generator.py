@@ -0,0 +1,458 @@
+#-------------------------------------------------------------------------------
+# Name:        nmea2k_traffic_generator
+# Purpose:     Synthetic NMEA2000 bus traffic for load tests and benchmarks
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   A traffic profile is a list of streams (PGN, source, rate, payload). It is built from the generated
+#   PGN classes with typical instrument rates, from the statistics of a raw CAN log or from the configuration.
+#   The generator schedules the messages of all streams in a virtual time, splits them into frames (single,
+#   Fast Packet or ISO-TP BAM when the payload exceeds 223 bytes) and queues the frames per source.
+#   One frame at a time is taken from a random source, so the multi-frame messages of the sources are
+#   interleaved as on a real bus. The virtual time advances by one frame time (bus bandwidth) per frame.
+#   Errors can be injected per message: frame dropped, duplicated, swapped (out of sequence) or truncated.
+#   The frames are sent on a python-can bus: socketcan (can or vcan device) or virtual (in-process).
+
+import collections
+import heapq
+import logging
+import random
+import threading
+import time
+
+from can import Message, CanError, ThreadSafeBus
+
+from navigation_server.router_core import NMEA2000Msg
+from navigation_server.router_common import NavigationServer, NavThread, MetricsRegistry
+from navigation_server.nmea2000 import FastPacketHandler, IsoTransportHandler
+from navigation_server.nmea2000_datamodel import PGNDef
+from navigation_server.generated.nmea2000_classes_gen import nmea2k_generated_classes
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+# typical transmission rate (messages per second and per source) of the instruments
+DEFAULT_PGN_RATES = {
+    127250: 10.,    # heading
+    127245: 10.,    # rudder
+    127488: 10.,    # engine rapid update
+    127508: 1.,     # battery status
+    128259: 1.,     # speed
+    128267: 1.,     # depth
+    129025: 10.,    # position rapid update
+    129026: 4.,     # COG SOG rapid update
+    129029: 1.,     # GNSS position
+    129038: 0.5,    # AIS class A position
+    129039: 0.5,    # AIS class B position
+    129794: 0.2,    # AIS class A static data
+    128275: 1.,     # distance log
+    130306: 10.,    # wind
+    130312: 0.5,    # temperature
+    126992: 1.,     # system time
+}
+
+ERROR_KINDS = ('drop', 'duplicate', 'sequence', 'truncate')
+FAST_PACKET_MAX = 223
+BUS_FRAME_RATE = 1800.  # maximum frames per second on a 250kb/s bus
+
+
+def can_identifier(pgn: int, prio: int, sa: int, da: int = 255) -> int:
+    can_id = sa | ((prio & 7) << 26)
+    if ((pgn >> 8) & 0xFF) < 240:
+        can_id |= (pgn + da) << 8
+    else:
+        can_id |= pgn << 8
+    return can_id
+
+
+def generated_payload(pgn: int, rng: random.Random = None) -> bytearray:
+    """
+    Build a payload from the generated class of the PGN, the float fields get random values in [0, 1)
+    return None if there is no generated class for the PGN
+    """
+    try:
+        pgn_class = nmea2k_generated_classes[pgn]
+    except KeyError:
+        return None
+    obj = pgn_class()
+    obj.from_protobuf(pgn_class.protobuf_class()())
+    if rng is not None:
+        for slot in pgn_class.__slots__:
+            if isinstance(getattr(obj, slot, None), float):
+                setattr(obj, slot, rng.random())
+    try:
+        return obj.encode_payload()
+    except Exception as err:
+        _logger.error(f"Traffic generator cannot encode PGN {pgn}: {err}")
+        return None
+
+
+class TrafficStream:
+    """
+    Periodic message of one PGN from one source
+    """
+
+    __slots__ = ('pgn', 'sa', 'da', 'prio', 'period', 'payload', 'sequence_id', 'fast_packet', 'iso_tp',
+                 'fp_seq', 'counter')
+
+    def __init__(self, pgn: int, sa: int, rate: float, payload: bytearray, prio: int = 2, da: int = 255,
+                 sequence_id: bool = False):
+        self.pgn = pgn
+        self.sa = sa
+        self.da = da
+        self.prio = prio
+        self.period = 1.0 / rate
+        self.payload = bytearray(payload)
+        self.sequence_id = sequence_id
+        self.iso_tp = len(payload) > FAST_PACKET_MAX
+        self.fast_packet = not self.iso_tp and (len(payload) > 8 or PGNDef.fast_packet_check(pgn))
+        self.fp_seq = 0
+        self.counter = 0
+
+    @property
+    def rate(self) -> float:
+        return 1.0 / self.period
+
+    def nb_frames(self) -> int:
+        if self.iso_tp:
+            return 1 + (len(self.payload) + 6) // 7
+        elif self.fast_packet:
+            return 1 + len(self.payload) // 7
+        return 1
+
+    def frames(self) -> list:
+        """
+        return the list of (can_id, data) for the next message
+        """
+        payload = self.payload
+        if self.sequence_id:
+            payload = bytearray(payload)
+            payload[0] = self.counter & 0xFF
+        self.counter += 1
+        if self.iso_tp:
+            msg = NMEA2000Msg(self.pgn, self.prio, self.sa, 255, payload)
+            return [(can_identifier(pgn, 7, self.sa), data) for pgn, data in IsoTransportHandler.broadcast_frames(msg)]
+        can_id = can_identifier(self.pgn, self.prio, self.sa, self.da)
+        if self.fast_packet:
+            self.fp_seq = (self.fp_seq + 1) & 7
+            return [(can_id, frame) for frame in FastPacketHandler.build_frames(self.fp_seq, payload)]
+        return [(can_id, payload)]
+
+
+class TrafficProfile:
+    """
+    Set of streams making the bus traffic
+    """
+
+    def __init__(self):
+        self._streams = []
+
+    @property
+    def streams(self) -> list:
+        return self._streams
+
+    def add_stream(self, stream: TrafficStream):
+        self._streams.append(stream)
+
+    def scale(self, factor: float):
+        for stream in self._streams:
+            stream.period /= factor
+
+    def message_rate(self) -> float:
+        return sum(s.rate for s in self._streams)
+
+    def frame_rate(self) -> float:
+        return sum(s.rate * s.nb_frames() for s in self._streams)
+
+    @classmethod
+    def from_generated(cls, nb_sources: int = 1, pgn_rates: dict = None, first_source: int = 10,
+                       seed: int = 0) -> 'TrafficProfile':
+        """
+        Profile with nb_sources sending each PGN at the given rates (DEFAULT_PGN_RATES if None)
+        Only the PGN with a generated class are used
+        """
+        rng = random.Random(seed)
+        profile = cls()
+        if pgn_rates is None:
+            pgn_rates = DEFAULT_PGN_RATES
+        for pgn, rate in pgn_rates.items():
+            payload = generated_payload(pgn, rng)
+            if payload is None:
+                _logger.error(f"Traffic profile: no generated class for PGN {pgn} => ignored")
+                continue
+            sequence_id = '_sequence_id' in nmea2k_generated_classes[pgn].__slots__[:1]
+            for sa in range(first_source, first_source + nb_sources):
+                profile.add_stream(TrafficStream(pgn, sa, rate, payload, sequence_id=sequence_id))
+        return profile
+
+    def add_iso_tp(self, pgn: int, sa: int, rate: float, size: int):
+        """
+        Add a stream of large messages sent with the ISO transport protocol (BAM)
+        """
+        self.add_stream(TrafficStream(pgn, sa, rate, bytearray((i & 0xFF for i in range(size))), prio=6))
+
+    @classmethod
+    def from_raw_log(cls, filename: str) -> 'TrafficProfile':
+        """
+        Profile reproducing the message rate per PGN and source of a raw CAN log (SocketCANInterface format)
+        The payload of each stream is the last payload seen in the log
+        """
+        fp_handler = FastPacketHandler(None)
+        counts = collections.Counter()
+        last = {}
+        first_ts = last_ts = None
+        with open(filename, 'r') as fd:
+            header = fd.readline()
+            if not header.startswith('H') or header.split('|')[1] != 'SocketCANInterface':
+                raise ValueError(f"{filename} is not a raw CAN log")
+            for line in fd:
+                ih = line.find('#')
+                i_sup = line.find('>')
+                if line[0] != 'R' or ih < 0 or i_sup < 0:
+                    continue
+                ts = line[ih + 1: i_sup]
+                try:
+                    can_id = int(line[i_sup + 1: i_sup + 9], 16)
+                    data = bytearray.fromhex(line[i_sup + 10:].strip())
+                except ValueError:
+                    continue
+                if first_ts is None:
+                    first_ts = ts
+                last_ts = ts
+                pgn, da = PGNDef.pgn_pdu1_adjust((can_id >> 8) & 0x1FFFF)
+                sa = can_id & 0xFF
+                prio = (can_id >> 26) & 7
+                if pgn == 60416:
+                    if data[0] == 32:
+                        # BAM announce, the payload is replaced by a dummy one of the same size
+                        pgn = data[5] | (data[6] << 8) | (data[7] << 16)
+                        counts[(pgn, sa)] += 1
+                        last[(pgn, sa)] = (prio, 255, bytearray(data[1] | (data[2] << 8)))
+                    continue
+                elif pgn == 60160:
+                    continue
+                if PGNDef.fast_packet_check(pgn):
+                    try:
+                        data = fp_handler.process_frame(pgn, sa, data)
+                    except Exception:
+                        continue
+                    if data is None:
+                        continue
+                counts[(pgn, sa)] += 1
+                last[(pgn, sa)] = (prio, da, data)
+        if first_ts is None:
+            raise ValueError(f"{filename} is empty")
+        duration = _log_seconds(last_ts) - _log_seconds(first_ts)
+        if duration <= 0.:
+            duration = 1.0
+        profile = cls()
+        for (pgn, sa), count in counts.items():
+            prio, da, payload = last[(pgn, sa)]
+            profile.add_stream(TrafficStream(pgn, sa, count / duration, payload, prio, da))
+        _logger.info(f"Traffic profile from {filename}: {len(profile.streams)} streams "
+                     f"{profile.message_rate():.0f} msg/s over {duration:.0f}s")
+        return profile
+
+    @classmethod
+    def from_list(cls, streams: list, seed: int = 0) -> 'TrafficProfile':
+        """
+        Profile from a list of dictionaries with the keys: pgn, rate, sources (list), prio (optional)
+        size (optional, to force a payload size, ISO-TP if above 223 bytes)
+        """
+        rng = random.Random(seed)
+        profile = cls()
+        for descr in streams:
+            pgn = int(descr['pgn'])
+            size = descr.get('size', None)
+            if size is not None:
+                payload = bytearray((i & 0xFF for i in range(int(size))))
+            else:
+                payload = generated_payload(pgn, rng)
+                if payload is None:
+                    _logger.error(f"Traffic profile: no generated class for PGN {pgn} and no size => ignored")
+                    continue
+            for sa in descr.get('sources', [10]):
+                profile.add_stream(TrafficStream(pgn, int(sa), float(descr.get('rate', 1.)), payload,
+                                                 int(descr.get('prio', 2))))
+        return profile
+
+
+def _log_seconds(date_str: str) -> float:
+    # 'YYYY-mm-dd HH:MM:SS.ffffff' => seconds in the day, the logs are shorter than one day
+    hours, minutes, seconds = date_str.split(' ')[1].split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class TrafficGenerator:
+    """
+    Produce the frames of a profile in virtual time with interleaving and optional error injection
+    frame_rate is the bus capacity (frames per second), 0 for no limit
+    """
+
+    def __init__(self, profile: TrafficProfile, frame_rate: float = BUS_FRAME_RATE, error_rate: float = 0.,
+                 errors=ERROR_KINDS, seed: int = 0):
+        self._profile = profile
+        self._frame_time = 1.0 / frame_rate if frame_rate > 0. else 0.
+        self._error_rate = error_rate
+        self._errors = [e for e in errors if e in ERROR_KINDS]
+        if error_rate > 0. and len(self._errors) == 0:
+            raise ValueError("No valid error kind")
+        self._rng = random.Random(seed)
+        self.nb_messages = 0
+        self.nb_frames = 0
+        self.nb_errors = collections.Counter()
+
+    def _inject_error(self, frames: list) -> list:
+        kind = self._rng.choice(self._errors)
+        if kind == 'sequence' and len(frames) < 2:
+            kind = 'drop'
+        index = self._rng.randrange(len(frames))
+        if kind == 'drop':
+            del frames[index]
+        elif kind == 'duplicate':
+            frames.insert(index, frames[index])
+        elif kind == 'sequence':
+            index = min(index, len(frames) - 2)
+            frames[index], frames[index + 1] = frames[index + 1], frames[index]
+        else:
+            can_id, data = frames[index]
+            frames[index] = (can_id, data[:self._rng.randint(1, len(data) - 1)])
+        self.nb_errors[kind] += 1
+        return frames
+
+    def frames(self, duration: float = None):
+        """
+        Iterate over (time, can_id, data) with time in seconds from the start, endless if duration is None
+        """
+        rng = self._rng
+        heap = [(rng.random() * s.period, i, s) for i, s in enumerate(self._profile.streams)]
+        heapq.heapify(heap)
+        pending = {}
+        t = 0.
+        while duration is None or t < duration:
+            while heap and heap[0][0] <= t:
+                due, index, stream = heapq.heappop(heap)
+                frames = stream.frames()
+                self.nb_messages += 1
+                if self._error_rate > 0. and rng.random() < self._error_rate:
+                    frames = self._inject_error(frames)
+                if len(frames) > 0:
+                    pending.setdefault(stream.sa, collections.deque()).extend(frames)
+                heapq.heappush(heap, (due + stream.period, index, stream))
+            if len(pending) == 0:
+                if not heap:
+                    return
+                t = heap[0][0]
+                continue
+            sa = rng.choice(list(pending.keys()))
+            source_frames = pending[sa]
+            can_id, data = source_frames.popleft()
+            if len(source_frames) == 0:
+                del pending[sa]
+            self.nb_frames += 1
+            yield t, can_id, data
+            t += self._frame_time
+
+
+_generator_messages = MetricsRegistry.counter('navigation_generator_messages', 'Messages generated',
+                                              ('generator',))
+_generator_frames = MetricsRegistry.counter('navigation_generator_frames', 'CAN frames sent by the generator',
+                                            ('generator',))
+_generator_errors = MetricsRegistry.counter('navigation_generator_errors', 'Errors injected by the generator',
+                                            ('generator', 'kind'))
+
+
+class N2KTrafficGenerator(NavigationServer, NavThread):
+    """
+    Send a synthetic traffic on a CAN bus (socketcan can/vcan device or python-can virtual bus in the process)
+    The traffic profile comes from a raw log (raw_log), a list of streams (streams) or the generated classes
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        NavThread.__init__(self, name=self._name, daemon=True)
+        self._channel = options.get('channel', str, 'vcan0')
+        self._bus_interface = options.get_choice('bus_interface', ['socketcan', 'virtual'], 'socketcan')
+        self._duration = options.get('duration', float, 0.)
+        self._start_delay = options.get('start_delay', float, 2.)
+        seed = options.get('seed', int, 0)
+        raw_log = options.get('raw_log', str, None)
+        try:
+            streams = options['streams']
+        except KeyError:
+            streams = None
+        if raw_log is not None:
+            try:
+                profile = TrafficProfile.from_raw_log(raw_log)
+            except (IOError, ValueError) as err:
+                _logger.error(f"Traffic generator {self._name} raw log error: {err}")
+                raise ValueError
+        elif isinstance(streams, list):
+            profile = TrafficProfile.from_list(streams, seed)
+        else:
+            profile = TrafficProfile.from_generated(options.get('sources', int, 3), seed=seed)
+        iso_tp_rate = options.get('iso_tp_rate', float, 0.)
+        if iso_tp_rate > 0.:
+            profile.add_iso_tp(options.get('iso_tp_pgn', int, 126464), options.get('iso_tp_source', int, 40),
+                               iso_tp_rate, options.get('iso_tp_size', int, 300))
+        profile.scale(options.get('rate_scale', float, 1.))
+        self._generator = TrafficGenerator(profile, options.get('frame_rate', float, BUS_FRAME_RATE),
+                                           options.get('error_rate', float, 0.),
+                                           options.getlist('errors', str, ERROR_KINDS), seed)
+        self._stop_event = threading.Event()
+        self._bus = None
+        self._send_errors = 0
+        _logger.info(f"Traffic generator {self._name} {len(profile.streams)} streams "
+                     f"{profile.message_rate():.0f} msg/s {profile.frame_rate():.0f} frames/s")
+        _generator_messages.labels(self._name).set_function(lambda: self._generator.nb_messages)
+        _generator_frames.labels(self._name).set_function(lambda: self._generator.nb_frames)
+        _generator_errors.add_collector(self._name, lambda: [((self._name, kind), count) for kind, count in
+                                                             list(self._generator.nb_errors.items())])
+
+    def server_type(self):
+        return 'Simulator'
+
+    def protocol(self):
+        return 'NMEA2000'
+
+    def running(self) -> bool:
+        return self.is_alive()
+
+    @property
+    def generator(self) -> TrafficGenerator:
+        return self._generator
+
+    def nrun(self):
+        try:
+            self._bus = ThreadSafeBus(channel=self._channel, interface=self._bus_interface, bitrate=250000)
+        except (CanError, OSError) as err:
+            _logger.error(f"Traffic generator {self._name} cannot open CAN channel {self._channel}: {err}")
+            return
+        if self._stop_event.wait(self._start_delay):
+            self._bus.shutdown()
+            return
+        _logger.info(f"Traffic generator {self._name} starts on {self._channel}")
+        start = time.monotonic()
+        duration = self._duration if self._duration > 0. else None
+        for t, can_id, data in self._generator.frames(duration):
+            if self._stop_event.is_set():
+                break
+            delay = start + t - time.monotonic()
+            if delay > 0.001:
+                time.sleep(delay)
+            try:
+                self._bus.send(Message(arbitration_id=can_id, is_extended_id=True, data=data), timeout=0.1)
+            except CanError as err:
+                self._send_errors += 1
+                _logger.debug(f"Traffic generator send error {err}")
+        self._bus.shutdown()
+        _logger.info(f"Traffic generator {self._name} stops after {self._generator.nb_messages} messages "
+                     f"{self._generator.nb_frames} frames {self._send_errors} send errors")
+
+    def stop(self):
+        self._stop_event.set()
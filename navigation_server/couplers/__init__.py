@@ -17,5 +17,6 @@ from .grpc_nmea_coupler import GrpcNmeaCoupler
 from .ydn2k_coupler import YDCoupler
 from .nmea_tcp_coupler import NMEATCPReader
 from .vedirect_coupler import VEDirectCoupler, VEDirectMsg, mppt_nmea0183
+from .vedirect_parser import VEDirectParser, VEDirectRecord, VEDirectHexRecord
 from .nmea2k_grpc_coupler import N2KGrpcCoupler
 from .grpc_send_coupler import N2KGrpcSendCoupler
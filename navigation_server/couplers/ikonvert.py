@@ -14,9 +14,12 @@ import threading
 import logging
 import queue
 import base64
+import collections
+from binascii import a2b_base64
 
-from navigation_server.router_core import Coupler, NMEA2000Msg
+from navigation_server.router_core import Coupler, NMEA2000Msg, LineFramer
 from navigation_server.router_common import NavThread, NMEAMsgTrace, NavGenericMsg, N0183_MSG, N2K_MSG, NULL_MSG
+from .serial_framing import SerialBatchReader, BATCH_DELAY
 
 
 _logger = logging.getLogger("ShipDataServer"+"."+__name__)
@@ -115,20 +118,56 @@ class iKonvertMsg:
         return self._msg
 
 
+class PDGYFramer(LineFramer):
+    '''
+    Frames the iKonvert stream
+    The !PDGY lines are decoded directly into NMEA2000 messages and the NMEA0183 sentences are returned as
+    NavGenericMsg, the $PDGY lines (status, acknowledgements) are returned as iKonvertMsg
+    errors: lines that cannot be decoded
+    '''
+
+    def _frame(self, line, timestamp):
+        raw = bytes(line)
+        if raw.startswith(b'!PDGY,'):
+            # !PDGY,pgn,prio,sa,da,timestamp,base64 data
+            fields = raw.split(b',', 6)
+            try:
+                # the CR LF is ignored by the base64 decoding
+                payload = a2b_base64(fields[6])
+                if len(payload) == 0:
+                    raise ValueError("no data")
+                msg = NMEA2000Msg(int(fields[1]), int(fields[2]), int(fields[3]), int(fields[4]), payload,
+                                  timestamp if timestamp is not None else 0.0)
+            except (ValueError, IndexError) as err:
+                _logger.error("iKonvert incorrect NMEA2000 message (%s): %s" % (err, raw))
+                self.errors += 1
+                return None
+            return NavGenericMsg(N2K_MSG, raw, msg)
+        elif raw[0] == 0x24 and not raw.startswith(b'$PDGY'):
+            return NavGenericMsg(N0183_MSG, raw)
+        try:
+            return iKonvertMsg(raw)
+        except (ValueError, IndexError, KeyError):
+            _logger.error("iKonvert decoding error on message:%s" % raw)
+            self.errors += 1
+            return None
+
+
 class iKonvertRead(NavThread):
     '''
     Class for low level read on the iKonvert adapter
-    Run asynchronously and callback according to the message type
+    Run asynchronously, the data messages are passed in batches to the coupler and the
+    status messages are processed by callback according to their type
     '''
 
-    def __init__(self, coupler, tty, callback_table):
+    def __init__(self, coupler, batch_reader: SerialBatchReader, callback_table):
         '''
         parameters:
         instrument: main coupler (instance of iKonvert)
-        tty: serial connection
+        batch_reader: serial connection reader with the PDGYFramer
         callback_table: jump table according the message type
         '''
-        self._tty = tty
+        self._batch_reader = batch_reader
         self._coupler = coupler
         super().__init__(name="IKonvertRead", daemon=True)
 
@@ -136,25 +175,32 @@ class iKonvertRead(NavThread):
         self._callback_table = callback_table
 
     def nrun(self) -> None:
+        framer = self._batch_reader.framer
         while self._stop_flag is False:
+            frames = framer.frames
             try:
-                data = self._tty.readline()
+                batch = self._batch_reader.read_batch()
             except serial.SerialException as e:
                 _logger.error("iKonvert read error: %s" % str(e))
                 continue
-            if len(data) == 0:
+            if batch is None:
                 # that is a suspected timeout
                 _logger.info("iKonvert read on %s timeout" % self._coupler.tty_name)
                 continue
-            self._coupler.trace_raw(NMEAMsgTrace.TRACE_IN, data, strip_suffix='\r\n')
-            self._coupler.increment_count()
-            try:
-                msg = iKonvertMsg(data)
-            except (ValueError, IndexError, KeyError):
-                _logger.error("iKonvert decoding error on message:%s" % data)
-                continue
-
-            self._callback_table[msg.type](msg)
+            self._coupler.increment_msg_raw(framer.frames - frames)
+            data_batch = []
+            for msg in batch:
+                self._coupler.trace_raw(NMEAMsgTrace.TRACE_IN, msg.raw, strip_suffix='\r\n')
+                if type(msg) is iKonvertMsg:
+                    # keep the order between the data and the status messages
+                    if len(data_batch) > 0:
+                        self._coupler.process_batch(data_batch)
+                        data_batch = []
+                    self._callback_table[msg.type](msg)
+                else:
+                    data_batch.append(msg)
+            if len(data_batch) > 0:
+                self._coupler.process_batch(data_batch)
             # end of read loop
         _logger.info("stopped iKonvert read")
 
@@ -167,7 +213,8 @@ class iKonvert(Coupler):
     This class implement the interface towards the iKonvert Digital Yacht USB-NMEA2000 device
     Inherits from Coupler
     The full connection logic is handled by the class
-    NMEA0183 or NMEA2000 messages are pushed in the input queue of the coupler
+    NMEA0183 or NMEA2000 messages are pushed in the input queue of the coupler by batches (all the messages
+    of one serial read)
     """
 
     (IKIDLE, IKREADY, IKCONNECTED) = range(10, 13)
@@ -189,8 +236,12 @@ class iKonvert(Coupler):
         self._tx_pgn = []
         self._ikstate = self.IKIDLE
         self._wait_event = 0
+        # the queue holds the batches of messages
         self._queue_size = opts.get('msg_queue_size', int, 10)
         self._queue = queue.Queue(self._queue_size)
+        self._batch = collections.deque()
+        self._batch_delay = opts.get('batch_delay', float, BATCH_DELAY)
+        self._input_framer = PDGYFramer()
         self._queue_tpass = False
         self._cmd_result = None
         self._status_count = 0
@@ -218,7 +269,9 @@ class iKonvert(Coupler):
         callback_table = {UNKNOWN: self.process_status, STATUS: self.process_status, NOT_CONN: self.process_status,
               ACK: self.process_acknak, NAK: self.process_acknak, N2K: self.process_nmea, N183: self.process_nmea}
         if self._reader is None:
-            self._reader = iKonvertRead(self, self._tty, callback_table)
+            self._input_framer.reset()
+            self._reader = iKonvertRead(self, SerialBatchReader(self._tty, self._input_framer, self._batch_delay),
+                                        callback_table)
             self._reader.start()
         self.wait_status()
         if self._ikstate == self.IKREADY:
@@ -251,6 +304,28 @@ class iKonvert(Coupler):
         except queue.Full:
             # just discard
             _logger.error("iKonvert write queue full discard message:%s" % msg.raw)
+            self._overruns += 1
+
+    def process_batch(self, batch: list):
+        '''
+        Messages (NavGenericMsg) from one read of the serial line
+        '''
+        if self._ikstate != self.IKCONNECTED:
+            #  a normal message is received before the status
+            self.set_connected()
+        try:
+            self._queue.put(batch, block=False)
+        except queue.Full:
+            # just discard
+            _logger.error("iKonvert input queue full discard %d messages" % len(batch))
+            self._overruns += len(batch)
+
+    def set_connected(self):
+        if self._ikstate != self.IKCONNECTED:
+            self._ikstate = self.IKCONNECTED
+        if self._wait_event == self.WAIT_CONN or self._wait_event == self.WAIT_MSG:
+            self._wait_event = 0
+            self._wait_sem.release()
 
     def process_status(self, msg):
 
@@ -262,11 +337,7 @@ class iKonvert(Coupler):
                 self._wait_event = 0
                 self._wait_sem.release()
         else:
-            if self._ikstate != self.IKCONNECTED:
-                self._ikstate = self.IKCONNECTED
-            if self._wait_event == self.WAIT_CONN or self._wait_event == self.WAIT_MSG:
-                self._wait_event = 0
-                self._wait_sem.release()
+            self.set_connected()
             if msg.type == STATUS:
                 _logger.debug("iKonvert connected to NMEA2000 network addr:%s" % msg.get('CAN_address'))
                 frame_errors = msg.get('frame_errors')
@@ -324,7 +395,13 @@ class iKonvert(Coupler):
                 _logger.error("iKonvert CMD error %s" % self._cmd_result[1])
 
     def _read(self):
-        return self._queue.get()
+        while len(self._batch) == 0:
+            batch = self._queue.get()
+            if type(batch) is not list:
+                # single message (end of data)
+                return batch
+            self._batch.extend(batch)
+        return self._batch.popleft()
 
     def stop_communication(self):
         _logger.debug("iKonvert entering stop state=%d" % self._ikstate)
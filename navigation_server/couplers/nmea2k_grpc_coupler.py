@@ -15,7 +15,7 @@ import time
 
 from navigation_server.router_common import (N2K_MSG, NavGenericMsg,
                                               GrpcStreamTimeout, GrpcAccessException)
-from navigation_server.router_core import NMEA2000Msg, Coupler, CANGrpcStreamReader, CouplerReadError, CouplerTimeOut
+from navigation_server.router_core import Coupler, CANGrpcStreamReader, CouplerReadError, CouplerTimeOut
 
 from navigation_server.generated.n2k_can_service_pb2 import CANReadRequest
 from navigation_server.generated.nmea2000_pb2 import nmea2000pb
@@ -43,8 +43,8 @@ class N2KGrpcCoupler(Coupler, CANGrpcStreamReader):
     def _read(self):
         _logger.debug("N2KGrpcCoupler read")
         try:
-            pb_msg = self._read_stream()
-            _logger.debug("N2KGrpcCoupler message received with PGN %d" % pb_msg.pgn)
+            stream_msg = self._read_stream()
+            _logger.debug("N2KGrpcCoupler message received with PGN %d" % stream_msg.pgn)
         except GrpcAccessException:
             # ok, we have a problem, let's wait and restart later
             time.sleep(1.0)
@@ -54,8 +54,7 @@ class N2KGrpcCoupler(Coupler, CANGrpcStreamReader):
         except GrpcStreamTimeout:
             _logger.debug("N2KGrpcCoupler => Timeout")
             raise CouplerTimeOut
-        n2k_msg = NMEA2000Msg(pgn=pb_msg.pgn, protobuf=pb_msg)
-        return NavGenericMsg(N2K_MSG, msg=n2k_msg)
+        return NavGenericMsg(N2K_MSG, msg=self.n2k_message(stream_msg))
 
 
     def stop(self):
@@ -55,7 +55,7 @@ class NMEATCPReader(BufferedIPCoupler):
         else:
             msg0183 = NMEA0183Msg(frame)
 
-        if msg0183.proprietary():
+        if msg0183.address() == b'PDGY':
             return fromProprietaryNmea(msg0183)
         elif msg0183.address() == b'MXPGN':
             msg = ShipModulInterface.mxpgn_decode(self, msg0183)
@@ -0,0 +1,90 @@
+#-------------------------------------------------------------------------------
+# Name:        serial_framing
+# Purpose:     Buffered ingestion of the line oriented serial streams (NMEA0183, iKonvert, Miniplex)
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   readline on a serial port reads one byte per system call and returns one line per wake-up of the coupler.
+#   The batch reader waits for the first byte (port timeout), lets the line fill for batch_delay and reads all the
+#   bytes waiting in one call. The buffer is framed by a LineFramer, so all the lines received since the previous
+#   call are decoded at once. When the coupler is slower than the line, the bytes accumulate in the driver and the
+#   batches grow without added latency.
+
+import logging
+import time
+
+import serial
+
+from navigation_server.router_core import LineFramer
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+READ_SIZE = 4096
+BATCH_DELAY = 0.01
+
+
+class SerialBatchReader:
+    """
+    Read the serial port by chunks and frame all the lines of each chunk
+    Counters:
+        reads: number of chunks read (wake-ups)
+        bytes: number of bytes read
+    The framing counters (frames, errors, overruns) are in the framer
+    """
+
+    def __init__(self, tty: serial.Serial, framer: LineFramer, batch_delay: float = BATCH_DELAY,
+                 read_size: int = READ_SIZE):
+        self._tty = tty
+        self._framer = framer
+        self._batch_delay = batch_delay
+        self._read_size = read_size
+        self.reads = 0
+        self.bytes = 0
+
+    @property
+    def framer(self) -> LineFramer:
+        return self._framer
+
+    def read_chunk(self) -> bytes:
+        """
+        return the bytes waiting on the port, the first one is waited for up to the port timeout
+        return an empty buffer on timeout, raise serial.SerialException on error
+        """
+        tty = self._tty
+        waiting = tty.in_waiting
+        if waiting == 0:
+            data = tty.read(1)
+            if len(data) == 0:
+                return data
+            if self._batch_delay > 0.:
+                time.sleep(self._batch_delay)
+            waiting = tty.in_waiting
+            if waiting > 0:
+                data += tty.read(min(waiting, self._read_size))
+        else:
+            data = tty.read(min(waiting, self._read_size))
+        self.reads += 1
+        self.bytes += len(data)
+        return data
+
+    def read_batch(self, timestamp: float = None) -> list:
+        """
+        return the messages of the lines completed by the next chunk, None on timeout
+        the list is empty if the chunk does not complete any valid line
+        """
+        data = self.read_chunk()
+        if len(data) == 0:
+            return None
+        if timestamp is None:
+            # all the messages of the chunk get the time of the read
+            timestamp = time.time()
+        return self._framer.messages(data, timestamp)
+
+    def reset(self):
+        self._framer.reset()
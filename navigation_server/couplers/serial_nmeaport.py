@@ -11,9 +11,11 @@
 
 import serial
 import logging
+import collections
 
-from navigation_server.router_core import Coupler, CouplerReadError, CouplerTimeOut,NMEA0183Msg, NMEAInvalidFrame
+from navigation_server.router_core import Coupler, CouplerReadError, CouplerTimeOut, NMEA0183Framer
 from navigation_server.router_common import NavGenericMsg, NULL_MSG
+from .serial_framing import SerialBatchReader, BATCH_DELAY
 
 _logger = logging.getLogger("ShipDataServer"+"."+__name__)
 
@@ -29,7 +31,11 @@ class NMEASerialPort(Coupler):
             _logger.error("SerialPort %s no device specified" % self.object_name())
             raise ValueError
         self._baudrate = opts.get('baudrate', int, 4800)
+        self._batch_delay = opts.get('batch_delay', float, BATCH_DELAY)
         self._tty = None
+        self._input_framer = NMEA0183Framer()
+        self._batch_reader = None
+        self._batch = collections.deque()
 
     def open(self):
 
@@ -38,29 +44,28 @@ class NMEASerialPort(Coupler):
         except serial.serialutil.SerialException as e:
             _logger.error("Serial Port %s cannot open TTY:%s" % (self.object_name(), e))
             return False
+        self._batch_reader = SerialBatchReader(self._tty, self._input_framer, self._batch_delay)
+        self._batch.clear()
         self._state = self.CONNECTED
         return True
 
     def _read(self):
-
-        while True:
+        # all the sentences received since the previous read are framed at once
+        while len(self._batch) == 0:
             if self._stopflag:
                 return NavGenericMsg(NULL_MSG)
+            frames = self._input_framer.frames
             try:
-                data = self._tty.readline()
+                batch = self._batch_reader.read_batch()
             except serial.serialutil.SerialException as e:
-                if not self._stop_flag:
+                if not self._stopflag:
                     _logger.error("Serial Port %s error reading %s" % (self.object_name(), e))
-                    raise CouplerReadError("Serial Port error")
-            if len(data) == 0:
+                raise CouplerReadError("Serial Port error")
+            if batch is None:
                 raise CouplerTimeOut
-            try:
-                msg = NMEA0183Msg(data)
-            except NMEAInvalidFrame:
-                _logger.error("Frame error: %s" % data)
-                continue
-            break
-        return msg
+            self._total_msg_raw += self._input_framer.frames - frames
+            self._batch.extend(batch)
+        return self._batch.popleft()
 
     def send(self, msg):
         if self._trace_msg:
@@ -74,4 +79,6 @@ class NMEASerialPort(Coupler):
 
     def close(self):
         # super().close()
+        self._batch_reader = None
+        self._input_framer.reset()
         self._tty.close()
\ No newline at end of file
@@ -11,16 +11,21 @@
 
 import socket
 import logging
+from binascii import a2b_hex
 
 from navigation_server.router_core import (NavTCPServer, ConnectionRecord, Publisher, Coupler, BufferedIPCoupler,
-                                            NMEA0183Msg, NMEA0183Sentences, NMEA2000Msg, CouplerReadError)
-from navigation_server.router_common import IncompleteMessage, N2KUnknownPGN, NavGenericMsg, TRANSPARENT_MSG, N2K_MSG, NULL_MSG
+                                            NMEA0183Msg, NMEA0183Sentences, NMEA2000Msg, CouplerReadError,
+                                            NMEA0183Framer, NMEA0183Index)
+from navigation_server.router_common import (IncompleteMessage, N2KUnknownPGN, NavGenericMsg, TRANSPARENT_MSG, N2K_MSG,
+                                             NULL_MSG, N0183_MSG)
 from navigation_server.nmea2000 import FastPacketHandler, FastPacketException
 from navigation_server.nmea2000_datamodel import PGNDef
 
 
 _logger = logging.getLogger("ShipDataServer"+"."+__name__)
 
+_MXPGN_CODE = NMEA0183Index.address(b'MXPGN').code
+
 
 #################################################################
 #
@@ -39,7 +44,11 @@ class ShipModulInterface(BufferedIPCoupler):
         super().__init__(opts)
         self._separator = b'\r\n'
         self._separator_len = 2
-        if self._mode in (self.NMEA2000, self.NMEA_MIX):
+        if self._mode == self.NMEA2000:
+            # the buffers are framed and the MXPGN sentences decoded in one pass
+            self._fast_packet_handler = FastPacketHandler(self)
+            self.set_message_processing(framer=ShipModulFramer(self))
+        elif self._mode == self.NMEA_MIX:
             self._fast_packet_handler = FastPacketHandler(self)
             self.set_message_processing(msg_processing=self.shipmodul_extract_nmea2000)
         else:
@@ -87,7 +96,7 @@ class ShipModulInterface(BufferedIPCoupler):
 
     def shipmodul_process_frame(self, frame):
         """
-        Extract tag header when present
+        Process a frame, the tag block is extracted when present
         :param frame:
         :return: NMEA0183Msg
         """
@@ -95,19 +104,16 @@ class ShipModulInterface(BufferedIPCoupler):
             # EOT
             return NavGenericMsg(NULL_MSG)
         self._total_msg_raw += 1
+        self.check_version_answer(frame)
+        # the TAG block is removed by NMEA0183Msg
+        return NMEA0183Msg(frame)
+
+    def check_version_answer(self, frame):
         if self._check_in_progress:
             # the frame with the software version is expected
             if frame[:self.version_fmt_l] == self.version_fmt:
                 _logger.info("Check connection answer: %s" % frame)
                 self._check_ok = True
-                return NMEA0183Msg(frame)
-
-        if frame[:2] == b'\\s':
-            end_of_tag = frame[2:].index(b'\\')
-            msg = NMEA0183Msg(frame[end_of_tag+1:])
-        else:
-            msg = NMEA0183Msg(frame)
-        return msg
 
     def check_connection(self):
         """
@@ -145,7 +151,7 @@ class ShipModulInterface(BufferedIPCoupler):
             return NavGenericMsg(TRANSPARENT_MSG, raw=frame)
 
         if msg.fast_packet:
-            for data_packet in self._fast_packet_handler.split_message(msg.pgn, msg.payload):
+            for data_packet in self._fast_packet_handler.split_message(msg.pgn, msg.payload, msg.sa):
                 yield encode(data_packet)
         else:
             yield encode(msg.payload)
@@ -190,7 +196,7 @@ class ShipModulInterface(BufferedIPCoupler):
             pr_byte += 1
             i_hex -= 2
         '''
-        data = bytearray.fromhex(fields[2].decode())
+        data = bytearray(a2b_hex(fields[2]))
         data.reverse()
         # now the PGN sentence is decoded
 
@@ -228,6 +234,45 @@ class ShipModulInterface(BufferedIPCoupler):
         return gmsg
 
 
+class MXPGNFramer(NMEA0183Framer):
+    """
+    Frames a Miniplex stream, the $MXPGN sentences are decoded into NMEA2000 messages (after the fast packet
+    reassembly) and the other sentences are returned as NMEA0183Msg
+    The coupler (NMEA2000 mode) provides the fast packet handler and the NMEA2000 controller
+    errors also counts the MXPGN sentences that cannot be decoded
+    """
+
+    def __init__(self, coupler: Coupler):
+        super().__init__()
+        self._coupler = coupler
+
+    def _frame(self, line, timestamp):
+        msg = super()._frame(line, timestamp)
+        if msg is None or msg.address_code != _MXPGN_CODE:
+            return msg
+        self._coupler.trace_raw(Coupler.TRACE_IN, msg.raw, strip_suffix='\r\n')
+        try:
+            return ShipModulInterface.mxpgn_decode(self._coupler, msg)
+        except IncompleteMessage:
+            return None
+        except (ValueError, IndexError, CouplerReadError) as err:
+            _logger.error("%s MXPGN decode error %s: %s" % (self._coupler.object_name(), err, msg.raw))
+            self.errors += 1
+            return None
+
+
+class ShipModulFramer(MXPGNFramer):
+    """
+    The answer to the version request of the connection check is detected in the stream
+    """
+
+    def _frame(self, line, timestamp):
+        msg = super()._frame(line, timestamp)
+        if msg is not None and msg.type == N0183_MSG:
+            self._coupler.check_version_answer(msg.raw)
+        return msg
+
+
 class ConfigPublisher(Publisher):
     '''
     This class is used for Configuration mode, meaning when the Multiplexer utility is connected
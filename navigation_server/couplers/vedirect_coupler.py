@@ -17,26 +17,30 @@ import threading
 from collections import namedtuple
 import serial
 import datetime
-import time
 import os
 
 from navigation_server.router_common import MessageServerGlobals, NavGenericMsg, TRANSPARENT_MSG, NULL_MSG
 from navigation_server.router_core import (Coupler, CouplerReadError, CouplerTimeOut, XDR, NMEA0183SentenceMsg,
                                            NMEA0183Sentences, NMEA0183Msg)
 from navigation_server.log_replay import RawLogFile, LogReadError
+from .vedirect_parser import VEDirectParser, VEDirectRecord, VEDirectHexRecord
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
 HexCommandContext = namedtuple('HexCommandContext', ['command', 'field', 'callback'])
 
+READ_SIZE = 1024
+INTER_BYTE_TIMEOUT = 0.01   # about 20 characters at 19200 bauds
+
 
 class VEDirectException(Exception):
     pass
 
 
 class Vedirect(threading.Thread):
-
-    (HEX, WAIT_HEADER, IN_KEY, IN_VALUE, IN_CHECKSUM) = range(5)
+    """
+    Reader of the VEDirect serial line, the bytes available are read in one call and parsed by VEDirectParser
+    """
 
     def __init__(self, serialport, timeout, input_queue, trace_input=False):
         super().__init__(name="Vedirect", daemon=True)
@@ -44,22 +48,11 @@ class Vedirect(threading.Thread):
         self._timeout = timeout
         self._serial_fd = None
         self._queue = input_queue
-        self.header1 = ord('\r')
-        self.header2 = ord('\n')
-        self.hexmarker = ord(':')
-        self.delimiter = ord('\t')
-        self.key = ''
-        self.value = ''
-        self.bytes_sum = 0
-        self.state = self.WAIT_HEADER
-        self.dict = {}
+        self._parser = VEDirectParser()
         self._stop_flag = False
-        self._buffer = bytearray(512)
-        self._buflen = 0
         self._hex_send_buffer = bytearray(32)
         self._hex_send_buffer[0] = ord(':')
         self._hex_cmd_context = None
-        # self._ts = 0
         self._trace_fd = None
         if trace_input:
             trace_dir = MessageServerGlobals.configuration.get_option('trace_dir', '/var/log')
@@ -69,12 +62,16 @@ class Vedirect(threading.Thread):
             _logger.info("Opening trace file %s" % filepath)
             try:
                 self._trace_fd = open(filepath, "w")
+                # header for the RawLogFile reader
+                self._trace_fd.write("H0|VEDirectInterface|V1.0\n")
             except IOError as e:
                 _logger.error("Trace file error %s" % e)
 
     def open(self):
         try:
-            self._serial_fd = serial.Serial(self._serialport, 19200, timeout=self._timeout)
+            # the devices send each block in one burst, the read returns at the end of the burst
+            self._serial_fd = serial.Serial(self._serialport, 19200, timeout=self._timeout,
+                                            inter_byte_timeout=INTER_BYTE_TIMEOUT)
         except (serial.SerialException, BrokenPipeError) as e:
             _logger.error("Cannot open VEdirect serial interface %s" % str(e))
             return False
@@ -87,105 +84,38 @@ class Vedirect(threading.Thread):
     def stop(self):
         self._stop_flag = True
 
-    def input(self, byte):
-        try:
-            self._buffer[self._buflen] = byte
-        except IndexError:
-            _logger.error("Input buffer overflow %d" % self._buflen)
-            self._buflen = 0
-            return None
-
-        self._buflen += 1
-
-        if byte == self.hexmarker and self.state != self.IN_CHECKSUM:
-            self.state = self.HEX
-        if self.state == self.WAIT_HEADER:
-            self.bytes_sum += byte
-            if byte == self.header1:
-                self.state = self.WAIT_HEADER
-            elif byte == self.header2:
-                self.state = self.IN_KEY
-            return None
-        elif self.state == self.IN_KEY:
-            self.bytes_sum += byte
-            if byte == self.delimiter:
-                if self.key == 'Checksum':
-                    self.state = self.IN_CHECKSUM
-                else:
-                    self.state = self.IN_VALUE
-            else:
-                self.key += chr(byte)
-            return None
-        elif self.state == self.IN_VALUE:
-            self.bytes_sum += byte
-            if byte == self.header1:
-                self.state = self.WAIT_HEADER
-                self.dict[self.key] = self.value
-                self.key = ''
-                self.value = ''
-            else:
-                self.value += chr(byte)
-            return None
-        elif self.state == self.IN_CHECKSUM:
-            self.bytes_sum += byte
-            self.key = ''
-            self.value = ''
-            self.state = self.WAIT_HEADER
-            if self.bytes_sum % 256 == 0:
-                self.bytes_sum = 0
-                return self.dict
-            else:
-                self.bytes_sum = 0
-        elif self.state == self.HEX:
-            self.bytes_sum = 0
-            if byte == self.header2:
-                message = self._buffer[:self._buflen]
-                self.receive_hex_resp(message)
-                self.state = self.WAIT_HEADER
-                self._buflen = 0
-                return None
-        else:
-            raise AssertionError()
-
     def run(self):
         msg_count = 0
         while True:
             if self._stop_flag:
                 return
             try:
-                data = self._serial_fd.read()
-            except (serial.SerialException, serial.SerialTimeoutException):
+                data = self._serial_fd.read(READ_SIZE)
+            except (serial.SerialException, serial.SerialTimeoutException, OSError):
                 _logger.error(f"VEdirect read on port {self._serialport} that is not open")
                 return
+            if len(data) == 0:
+                continue
 
-            for byte in data:
-                packet = self.input(byte)
-                if packet is not None:
-                    # ok we have a good packet
-                    if self._trace_fd is not None:
-                        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-                        try:
-                            trace = f"R{msg_count}#{timestamp}>{self._buffer[:self._buflen].hex()}\n"
-                            self._trace_fd.write(trace)
-                            self._trace_fd.flush()
-                        except IOError as e:
-                            _logger.error("Error writing VEdirect trace file %s" % e)
-                            self._trace_fd.close()
-                            self._trace_fd = None
-                        except UnicodeDecodeError as e:
-                            _logger.error("VEdirect Unicode error %s in buffer %s" % (e, self._buffer[:self._buflen]))
-
-                    self.dict['timestamp'] = time.monotonic()
-                    # send the dict in the queue
+            for record in self._parser.feed(data):
+                if type(record) is VEDirectHexRecord:
+                    self.receive_hex_resp(record)
+                    continue
+                if self._trace_fd is not None:
+                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
                     try:
-                        self._queue.put(VEDirectMsg(self.dict), block=True, timeout=1.0)
-                    except queue.Full:
-                        _logger.error("VEDirect output queue full message lost")
-                        continue
-                    self.dict = {}
-                    msg_count += 1
-                    # _logger.debug(self._buffer[:self._buflen])
-                    self._buflen = 0
+                        self._trace_fd.write(f"R{msg_count}#{timestamp}>{record.raw.hex()}\n")
+                        self._trace_fd.flush()
+                    except IOError as e:
+                        _logger.error("Error writing VEdirect trace file %s" % e)
+                        self._trace_fd.close()
+                        self._trace_fd = None
+                try:
+                    self._queue.put(VEDirectMsg(record), block=True, timeout=1.0)
+                except queue.Full:
+                    _logger.error("VEDirect output queue full message lost")
+                    continue
+                msg_count += 1
 
     def send_hex_cmd(self, cmd: int, parameters=None):
         #
@@ -226,9 +156,8 @@ class Vedirect(threading.Thread):
             _logger.error(f"VE Direct: Error writing HEX command {e} on tty {self._serialport}")
             raise VEDirectException
 
-    def receive_hex_resp(self, message: bytearray):
-        _logger.debug("VE.direct receive HEX response:%s" % message.hex())
-        response_id = message[0]
+    def receive_hex_resp(self, record: VEDirectHexRecord):
+        _logger.debug("VE.direct receive HEX response:%s" % record)
 
     vedirect_fields = {'current': ('I', float, 0.001),
                         'voltage': ('V', float, 0.001),
@@ -255,6 +184,9 @@ class Vedirect(threading.Thread):
 
 
 class VEDirectMsg(NavGenericMsg):
+    """
+    msg is the VEDirectRecord (dictionary label => value)
+    """
 
     def __init__(self, ve_dict: dict):
         super().__init__(TRANSPARENT_MSG, raw=ve_dict, msg=ve_dict)
@@ -269,6 +201,7 @@ class VEDirectLogReader(threading.Thread):
         self._log_file = log_file
         self._log_reader = None
         self._output_queue = output_queue
+        self._parser = VEDirectParser()
         super().__init__(name="VEDirectLogReader", daemon=True)
         self._stop_flag = False
 
@@ -305,22 +238,14 @@ class VEDirectLogReader(threading.Thread):
                                    err.reason))
                 self._output_queue.put(NavGenericMsg(NULL_MSG))
                 break
-            # now let's decode
-            # msg = msg.message.rstrip('\n')
-            buffer = bytearray.fromhex(msg.message)
-            msg_dec = {}
-            fields = buffer.split(b'\r\n')
-            for f in fields:
-                if len(f) == 0:
+            # the trace lines are the blocks as received, they are parsed as on the serial line
+            for record in self._parser.feed(bytes.fromhex(msg.message)):
+                if type(record) is not VEDirectRecord:
                     continue
-                label, value = f.split(b'\t')
-                if label == b'Checksum':
-                    break
-                msg_dec[label.decode()] = value.decode()  # to be consistent all is converted in str
-            try:
-                self._output_queue.put(VEDirectMsg(msg_dec), timeout=10.0)
-            except queue.Full:
-                _logger.error("LogReader queue full, message discarded")
+                try:
+                    self._output_queue.put(VEDirectMsg(record), timeout=10.0)
+                except queue.Full:
+                    _logger.error("LogReader queue full, message discarded")
 
 
 class VEDirectCoupler(Coupler):
@@ -0,0 +1,241 @@
+#-------------------------------------------------------------------------------
+# Name:        vedirect_parser
+# Purpose:     Buffer oriented parser for the Victron VE.Direct Text and HEX protocols
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import time
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+#
+#   Text protocol fields: label => (type, scale, unit)
+#   The record keeps the value in the device unit (int for the numeric fields), value() applies the scale
+#
+VEDIRECT_TEXT_FIELDS = {
+    'V': (int, 0.001, 'V'),             # main or channel 1 battery voltage (mV)
+    'V2': (int, 0.001, 'V'),
+    'V3': (int, 0.001, 'V'),
+    'VS': (int, 0.001, 'V'),            # auxiliary (starter) voltage
+    'VM': (int, 0.001, 'V'),            # mid-point voltage
+    'DM': (int, 0.1, '%'),              # mid-point deviation (per mille)
+    'VPV': (int, 0.001, 'V'),           # panel voltage
+    'PPV': (int, 1., 'W'),              # panel power
+    'I': (int, 0.001, 'A'),             # main or channel 1 battery current (mA)
+    'I2': (int, 0.001, 'A'),
+    'I3': (int, 0.001, 'A'),
+    'IL': (int, 0.001, 'A'),            # load current
+    'LOAD': (str, None, None),
+    'T': (int, 1., 'C'),                # battery temperature
+    'P': (int, 1., 'W'),                # instantaneous power
+    'CE': (int, 0.001, 'Ah'),           # consumed Amp Hours
+    'SOC': (int, 0.1, '%'),             # state of charge (per mille)
+    'TTG': (int, 1., 'min'),            # time to go
+    'Alarm': (str, None, None),
+    'Relay': (str, None, None),
+    'AR': (int, 1, None),               # alarm reason
+    'OR': (str, None, None),            # off reason
+    'H1': (int, 0.001, 'Ah'),           # depth of the deepest discharge
+    'H2': (int, 0.001, 'Ah'),           # depth of the last discharge
+    'H3': (int, 0.001, 'Ah'),           # depth of the average discharge
+    'H4': (int, 1, None),               # number of charge cycles
+    'H5': (int, 1, None),               # number of full discharges
+    'H6': (int, 0.001, 'Ah'),           # cumulative Amp Hours drawn
+    'H7': (int, 0.001, 'V'),            # minimum main voltage
+    'H8': (int, 0.001, 'V'),            # maximum main voltage
+    'H9': (int, 1., 's'),               # time since last full charge
+    'H10': (int, 1, None),              # number of automatic synchronizations
+    'H11': (int, 1, None),              # number of low main voltage alarms
+    'H12': (int, 1, None),              # number of high main voltage alarms
+    'H13': (int, 1, None),              # number of low auxiliary voltage alarms
+    'H14': (int, 1, None),              # number of high auxiliary voltage alarms
+    'H15': (int, 0.001, 'V'),           # minimum auxiliary voltage
+    'H16': (int, 0.001, 'V'),           # maximum auxiliary voltage
+    'H17': (int, 0.01, 'kWh'),          # discharged energy
+    'H18': (int, 0.01, 'kWh'),          # charged energy
+    'H19': (int, 0.01, 'kWh'),          # yield total
+    'H20': (int, 0.01, 'kWh'),          # yield today
+    'H21': (int, 1., 'W'),              # maximum power today
+    'H22': (int, 0.01, 'kWh'),          # yield yesterday
+    'H23': (int, 1., 'W'),              # maximum power yesterday
+    'HSDS': (int, 1, None),             # day sequence number
+    'ERR': (int, 1, None),
+    'CS': (int, 1, None),               # state of operation
+    'MPPT': (int, 1, None),             # tracker operation mode
+    'MODE': (int, 1, None),
+    'WARN': (int, 1, None),
+    'MON': (int, 1, None),              # DC monitor mode
+    'AC_OUT_V': (int, 0.01, 'V'),
+    'AC_OUT_I': (int, 0.1, 'A'),
+    'AC_OUT_S': (int, 1., 'VA'),
+    'DC_IN_V': (int, 0.01, 'V'),
+    'DC_IN_I': (int, 0.1, 'A'),
+    'DC_IN_P': (int, 1., 'W'),
+    'BMV': (str, None, None),
+    'FW': (str, None, None),
+    'FWE': (str, None, None),
+    'PID': (str, None, None),
+    'SER#': (str, None, None),
+}
+
+TEXT_CHECKSUM_LABEL = b'\r\nChecksum\t'
+HEX_MARKER = ord(':')
+HEX_CHECKSUM = 0x55
+MAX_PENDING = 2048      # bytes kept while waiting for the end of a block
+
+
+class VEDirectRecord(dict):
+    """
+    One validated Text protocol block, the dictionary is label => value with the numeric fields converted to int
+    raw: block as received (for the traces)
+    """
+
+    def __init__(self, fields: dict, raw: bytes, timestamp: float):
+        super().__init__(fields)
+        self.raw = raw
+        self.timestamp = timestamp
+
+    def value(self, label: str):
+        """
+        return the value of the field in the unit given by unit(), the non-numeric fields are returned unchanged
+        raise KeyError if the field is not in the record
+        """
+        value = self[label]
+        try:
+            scale = VEDIRECT_TEXT_FIELDS[label][1]
+        except KeyError:
+            return value
+        if scale is None or type(value) is not int:
+            return value
+        return value * scale
+
+    @staticmethod
+    def unit(label: str):
+        try:
+            return VEDIRECT_TEXT_FIELDS[label][2]
+        except KeyError:
+            return None
+
+
+class VEDirectHexRecord:
+    """
+    One HEX protocol frame, data excludes the checksum
+    """
+
+    __slots__ = ('command', 'data', 'valid', 'raw')
+
+    def __init__(self, command: int, data: bytes, valid: bool, raw: bytes):
+        self.command = command
+        self.data = data
+        self.valid = valid
+        self.raw = raw
+
+    def __str__(self):
+        return "HEX command %X data %s%s" % (self.command, self.data.hex(), "" if self.valid else " (invalid)")
+
+
+class VEDirectParser:
+    """
+    Parser working on whole read buffers
+    The Text blocks are located by their Checksum field and validated with one sum over the block, the HEX frames
+    (':' to '\\n') are extracted wherever they are, including inside a Text block
+    feed() returns the list of records (VEDirectRecord or VEDirectHexRecord) completed by the buffer
+    """
+
+    def __init__(self):
+        self._pending = bytearray()
+        self._scan = 0
+        self._labels = {}
+        self.nb_blocks = 0
+        self.nb_checksum_errors = 0
+        self.nb_hex_frames = 0
+
+    def reset(self):
+        self._pending = bytearray()
+        self._scan = 0
+
+    def feed(self, data, timestamp: float = None) -> list:
+        if timestamp is None:
+            timestamp = time.monotonic()
+        buffer = self._pending
+        buffer += data
+        records = []
+        start = 0
+        # bytes before scan have already been searched in a previous buffer
+        scan = self._scan
+        while True:
+            search = max(start, scan)
+            checksum_label = buffer.find(TEXT_CHECKSUM_LABEL, search)
+            hex_start = buffer.find(b':', search, checksum_label if checksum_label >= 0 else len(buffer))
+            if hex_start >= 0:
+                hex_end = buffer.find(b'\n', hex_start)
+                if hex_end < 0:
+                    scan = hex_start
+                    break
+                records.append(self._hex_frame(bytes(buffer[hex_start:hex_end + 1])))
+                # the frame is removed so the Text block around it is contiguous
+                del buffer[hex_start:hex_end + 1]
+                scan = hex_start
+                continue
+            if checksum_label < 0:
+                scan = max(start, len(buffer) - len(TEXT_CHECKSUM_LABEL) + 1)
+                break
+            end = checksum_label + len(TEXT_CHECKSUM_LABEL) + 1
+            if end > len(buffer):
+                scan = checksum_label
+                break
+            block = bytes(buffer[start:end])
+            start = end
+            if sum(block) & 0xFF != 0:
+                self.nb_checksum_errors += 1
+                continue
+            self.nb_blocks += 1
+            records.append(VEDirectRecord(self._fields(block), block, timestamp))
+        if start > 0:
+            del buffer[:start]
+            scan -= start
+        if len(buffer) > MAX_PENDING:
+            _logger.error("VEDirect parser no block end in %d bytes => discarded" % len(buffer))
+            del buffer[:-len(TEXT_CHECKSUM_LABEL)]
+            scan = 0
+        self._scan = scan
+        return records
+
+    def _fields(self, block: bytes) -> dict:
+        fields = {}
+        labels = self._labels
+        # first line is empty (block starts with \r\n), last one is the checksum
+        for line in block.split(b'\r\n')[1:-1]:
+            label, sep, value = line.partition(b'\t')
+            try:
+                label, field_type = labels[label]
+            except KeyError:
+                label_str = label.decode(errors='replace')
+                field_type = VEDIRECT_TEXT_FIELDS.get(label_str, (str,))[0]
+                labels[label] = (label_str, field_type)
+                label = label_str
+            if field_type is int:
+                try:
+                    fields[label] = int(value)
+                    continue
+                except ValueError:
+                    # '---' for unknown values
+                    pass
+            fields[label] = value.decode(errors='replace')
+        return fields
+
+    def _hex_frame(self, frame: bytes) -> VEDirectHexRecord:
+        self.nb_hex_frames += 1
+        try:
+            command = int(frame[1:2], 16)
+            data = bytes.fromhex(frame[2:].rstrip(b'\r\n').decode())
+        except (ValueError, UnicodeDecodeError):
+            return VEDirectHexRecord(0, b'', False, frame)
+        valid = (command + sum(data)) & 0xFF == HEX_CHECKSUM
+        return VEDirectHexRecord(command, data[:-1], valid, frame)
@@ -122,7 +122,7 @@ class YDCoupler(BufferedIPCoupler):
         def encode(data: bytearray):
             return NavGenericMsg(TRANSPARENT_MSG, raw=b'%s %s\r\n' % (canid, data.hex(b' ').encode()))
         if msg.fast_packet:
-            for data_packet in self._fast_packet_handler.split_message(msg.pgn, msg.payload):
+            for data_packet in self._fast_packet_handler.split_message(msg.pgn, msg.payload, msg.sa):
                 yield encode(data_packet)
         else:
             yield encode(msg.payload)
@@ -18,7 +18,8 @@ from collections import namedtuple, deque
 
 from navigation_server.generated.energy_pb2 import solar_output, request, MPPT_device, trend_response
 from navigation_server.generated.energy_pb2_grpc import solar_mpptServicer, add_solar_mpptServicer_to_server
-from navigation_server.router_common import GrpcService, MessageServerGlobals, resolve_ref, copy_protobuf_data
+from navigation_server.router_common import (GrpcService, MessageServerGlobals, resolve_ref, copy_protobuf_data,
+                                             MetricsRegistry)
 from navigation_server.router_core import NMEA0183Sentences
 from navigation_server.couplers import mppt_nmea0183
 
@@ -27,6 +28,14 @@ from navigation_server.generated.nmea2000_classes_gen import Pgn127751Class, Pgn
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
+_mppt_metrics = {
+    'voltage': MetricsRegistry.gauge('navigation_mppt_battery_volts', 'MPPT battery voltage', ('device',)),
+    'current': MetricsRegistry.gauge('navigation_mppt_battery_amperes', 'MPPT battery current', ('device',)),
+    'panel_power': MetricsRegistry.gauge('navigation_mppt_panel_watts', 'MPPT panel power', ('device',)),
+    'day_power': MetricsRegistry.gauge('navigation_mppt_day_watt_hours', 'MPPT energy produced today', ('device',)),
+    'state': MetricsRegistry.gauge('navigation_mppt_state', 'MPPT charger state (Victron)', ('device',)),
+}
+
 
 class MPPTData:
     def __init__(self, value_dict):
@@ -143,6 +152,16 @@ class VictronMPPT:
 
         self._coupler.register(self)
         self._start_period = time.monotonic()
+        for attribute, family in _mppt_metrics.items():
+            family.labels(self._name).set_function(lambda a=attribute: self.current_value(a))
+
+    def current_value(self, attribute):
+        """
+        return the attribute of the last MPPT data or None if no data has been received
+        """
+        if self._current_data is None:
+            return None
+        return getattr(self._current_data, attribute)
 
     def publish(self, msg):
         _logger.debug("VEDirect message:%s" % msg.msg)
@@ -26,7 +26,7 @@ import navigation_server.generated.services_server_pb2 as services__server__pb2
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0b\x61gent.proto\x1a\x15services_server.proto\"\x9e\x01\n\x13NavigationSystemMsg\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07version\x18\x07 \x01(\t\x12\x12\n\nstart_time\x18\x08 \x01(\t\x12\x10\n\x08hostname\x18\n \x01(\t\x12\x10\n\x08settings\x18\x0c \x01(\t\x12$\n\tprocesses\x18\x03 \x03(\x0b\x32\x11.SystemProcessMsg\"6\n\x0b\x41gentCmdMsg\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\x12\x0e\n\x06target\x18\x03 \x01(\t\"\xd8\x01\n\rAgentResponse\x12\n\n\x02id\x18\x01 \x01(\r\x12\x10\n\x08\x65rr_code\x18\x02 \x01(\r\x12\x10\n\x08response\x18\x03 \x01(\t\x12$\n\x06system\x18\x04 \x01(\x0b\x32\x14.NavigationSystemMsg\x12$\n\tprocesses\x18\x05 \x03(\x0b\x32\x11.SystemProcessMsg\x12\"\n\x07process\x18\x06 \x01(\x0b\x32\x11.SystemProcessMsg\x12\x11\n\tgrpc_port\x18\x07 \x01(\r\x12\x14\n\x0cstatus_lines\x18\x08 \x03(\t2\x9d\x01\n\x05\x41gent\x12*\n\x08\x41gentCmd\x12\x0c.AgentCmdMsg\x1a\x0e.AgentResponse\"\x00\x12\x30\n\x0e\x41gentSystemCmd\x12\x0c.AgentCmdMsg\x1a\x0e.AgentResponse\"\x00\x12\x36\n\x0fRegisterProcess\x12\x11.SystemProcessMsg\x1a\x0e.AgentResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0b\x61gent.proto\x1a\x15services_server.proto\"\x9e\x01\n\x13NavigationSystemMsg\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07version\x18\x07 \x01(\t\x12\x12\n\nstart_time\x18\x08 \x01(\t\x12\x10\n\x08hostname\x18\n \x01(\t\x12\x10\n\x08settings\x18\x0c \x01(\t\x12$\n\tprocesses\x18\x03 \x03(\x0b\x32\x11.SystemProcessMsg\"6\n\x0b\x41gentCmdMsg\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\x12\x0e\n\x06target\x18\x03 \x01(\t\"\xe5\x01\n\x0fServiceStateMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x1c\n\x05state\x18\x02 \x01(\x0e\x32\r.ProcessState\x12\x0c\n\x04unit\x18\x03 \x01(\t\x12\x12\n\nload_state\x18\x04 \x01(\t\x12\x14\n\x0c\x61\x63tive_state\x18\x05 \x01(\t\x12\x11\n\tsub_state\x18\x06 \x01(\t\x12\x10\n\x08main_pid\x18\x07 \x01(\r\x12\x0e\n\x06memory\x18\x08 \x01(\x04\x12\x14\n\x0c\x63pu_usage_ns\x18\t \x01(\x04\x12\x10\n\x08restarts\x18\n \x01(\r\x12\x11\n\ttimestamp\x18\x0b \x01(\x01\"\x81\x02\n\rAgentResponse\x12\n\n\x02id\x18\x01 \x01(\r\x12\x10\n\x08\x65rr_code\x18\x02 \x01(\r\x12\x10\n\x08response\x18\x03 \x01(\t\x12$\n\x06system\x18\x04 \x01(\x0b\x32\x14.NavigationSystemMsg\x12$\n\tprocesses\x18\x05 \x03(\x0b\x32\x11.SystemProcessMsg\x12\"\n\x07process\x18\x06 \x01(\x0b\x32\x11.SystemProcessMsg\x12\x11\n\tgrpc_port\x18\x07 \x01(\r\x12\x14\n\x0cstatus_lines\x18\x08 \x03(\t\x12\'\n\rservice_state\x18\t \x01(\x0b\x32\x10.ServiceStateMsg2\xd8\x01\n\x05\x41gent\x12*\n\x08\x41gentCmd\x12\x0c.AgentCmdMsg\x1a\x0e.AgentResponse\"\x00\x12\x30\n\x0e\x41gentSystemCmd\x12\x0c.AgentCmdMsg\x1a\x0e.AgentResponse\"\x00\x12\x36\n\x0fRegisterProcess\x12\x11.SystemProcessMsg\x1a\x0e.AgentResponse\"\x00\x12\x39\n\x13StreamProcessStates\x12\x0c.AgentCmdMsg\x1a\x10.ServiceStateMsg\"\x00\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -37,8 +37,10 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_NAVIGATIONSYSTEMMSG']._serialized_end=197
   _globals['_AGENTCMDMSG']._serialized_start=199
   _globals['_AGENTCMDMSG']._serialized_end=253
-  _globals['_AGENTRESPONSE']._serialized_start=256
-  _globals['_AGENTRESPONSE']._serialized_end=472
-  _globals['_AGENT']._serialized_start=475
-  _globals['_AGENT']._serialized_end=632
+  _globals['_SERVICESTATEMSG']._serialized_start=256
+  _globals['_SERVICESTATEMSG']._serialized_end=485
+  _globals['_AGENTRESPONSE']._serialized_start=488
+  _globals['_AGENTRESPONSE']._serialized_end=745
+  _globals['_AGENT']._serialized_start=748
+  _globals['_AGENT']._serialized_end=964
 # @@protoc_insertion_point(module_scope)
@@ -52,6 +52,11 @@ class AgentStub(object):
                 request_serializer=services__server__pb2.SystemProcessMsg.SerializeToString,
                 response_deserializer=agent__pb2.AgentResponse.FromString,
                 _registered_method=True)
+        self.StreamProcessStates = channel.unary_stream(
+                '/Agent/StreamProcessStates',
+                request_serializer=agent__pb2.AgentCmdMsg.SerializeToString,
+                response_deserializer=agent__pb2.ServiceStateMsg.FromString,
+                _registered_method=True)
 
 
 class AgentServicer(object):
@@ -75,6 +80,13 @@ class AgentServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamProcessStates(self, request, context):
+        """target: process name or empty for all, current state first then the changes
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_AgentServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -93,6 +105,11 @@ def add_AgentServicer_to_server(servicer, server):
                     request_deserializer=services__server__pb2.SystemProcessMsg.FromString,
                     response_serializer=agent__pb2.AgentResponse.SerializeToString,
             ),
+            'StreamProcessStates': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamProcessStates,
+                    request_deserializer=agent__pb2.AgentCmdMsg.FromString,
+                    response_serializer=agent__pb2.ServiceStateMsg.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'Agent', rpc_method_handlers)
@@ -184,3 +201,30 @@ class Agent(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamProcessStates(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/Agent/StreamProcessStates',
+            agent__pb2.AgentCmdMsg.SerializeToString,
+            agent__pb2.ServiceStateMsg.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: ais.proto
+# Protobuf Python Version: 5.27.2
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    5,
+    27,
+    2,
+    '',
+    'ais.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tais.proto\"\xa9\x03\n\nais_target\x12\x0c\n\x04mmsi\x18\x01 \x01(\r\x12\x1c\n\tais_class\x18\x02 \x01(\x0e\x32\t.AISClass\x12\x10\n\x08latitude\x18\x03 \x01(\x01\x12\x11\n\tlongitude\x18\x04 \x01(\x01\x12\x0b\n\x03sog\x18\x05 \x01(\x02\x12\x0b\n\x03\x63og\x18\x06 \x01(\x02\x12\x0f\n\x07heading\x18\x07 \x01(\x02\x12\x14\n\x0crate_of_turn\x18\x08 \x01(\x02\x12\x19\n\x11navigation_status\x18\t \x01(\r\x12\x0c\n\x04name\x18\n \x01(\t\x12\x10\n\x08\x63\x61llsign\x18\x0b \x01(\t\x12\x12\n\nimo_number\x18\x0c \x01(\r\x12\x11\n\tship_type\x18\r \x01(\r\x12\x0e\n\x06length\x18\x0e \x01(\x02\x12\x0c\n\x04\x62\x65\x61m\x18\x0f \x01(\x02\x12\r\n\x05\x64raft\x18\x10 \x01(\x02\x12\x13\n\x0b\x64\x65stination\x18\x11 \x01(\t\x12\x15\n\rlast_position\x18\x12 \x01(\x01\x12\x13\n\x0blast_static\x18\x13 \x01(\x01\x12\r\n\x05range\x18\x14 \x01(\x02\x12\x0f\n\x07\x62\x65\x61ring\x18\x15 \x01(\x02\x12\x0b\n\x03\x63pa\x18\x16 \x01(\x02\x12\x0c\n\x04tcpa\x18\x17 \x01(\x02\":\n\x0b\x61is_request\x12\n\n\x02id\x18\x01 \x01(\r\x12\x11\n\tmax_range\x18\x02 \x01(\x02\x12\x0c\n\x04mmsi\x18\x03 \x01(\r\"\\\n\x0c\x61is_own_ship\x12\r\n\x05valid\x18\x01 \x01(\x08\x12\x10\n\x08latitude\x18\x02 \x01(\x01\x12\x11\n\tlongitude\x18\x03 \x01(\x01\x12\x0b\n\x03sog\x18\x04 \x01(\x02\x12\x0b\n\x03\x63og\x18\x05 \x01(\x02\"p\n\x0c\x61is_snapshot\x12\n\n\x02id\x18\x01 \x01(\r\x12\x15\n\rerror_message\x18\x02 \x01(\t\x12\x1f\n\x08own_ship\x18\x03 \x01(\x0b\x32\r.ais_own_ship\x12\x1c\n\x07targets\x18\x04 \x03(\x0b\x32\x0b.ais_target\"_\n\x10\x61is_target_event\x12 \n\x06\x63hange\x18\x01 \x01(\x0e\x32\x10.AISTargetChange\x12\x0c\n\x04mmsi\x18\x02 \x01(\r\x12\x1b\n\x06target\x18\x03 \x01(\x0b\x32\x0b.ais_target*=\n\x08\x41ISClass\x12\x0f\n\x0b\x41IS_UNKNOWN\x10\x00\x12\x0f\n\x0b\x41IS_CLASS_A\x10\x01\x12\x0f\n\x0b\x41IS_CLASS_B\x10\x02*Z\n\x0f\x41ISTargetChange\x12\x0e\n\nTARGET_NEW\x10\x00\x12\x13\n\x0fTARGET_POSITION\x10\x01\x12\x11\n\rTARGET_STATIC\x10\x02\x12\x0f\n\x0bTARGET_LOST\x10\x03\x32o\n\nAISTracker\x12+\n\nGetTargets\x12\x0c.ais_request\x1a\r.ais_snapshot\"\x00\x12\x34\n\rStreamTargets\x12\x0c.ais_request\x1a\x11.ais_target_event\"\x00\x30\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'ais_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_AISCLASS']._serialized_start=806
+  _globals['_AISCLASS']._serialized_end=867
+  _globals['_AISTARGETCHANGE']._serialized_start=869
+  _globals['_AISTARGETCHANGE']._serialized_end=959
+  _globals['_AIS_TARGET']._serialized_start=14
+  _globals['_AIS_TARGET']._serialized_end=439
+  _globals['_AIS_REQUEST']._serialized_start=441
+  _globals['_AIS_REQUEST']._serialized_end=499
+  _globals['_AIS_OWN_SHIP']._serialized_start=501
+  _globals['_AIS_OWN_SHIP']._serialized_end=593
+  _globals['_AIS_SNAPSHOT']._serialized_start=595
+  _globals['_AIS_SNAPSHOT']._serialized_end=707
+  _globals['_AIS_TARGET_EVENT']._serialized_start=709
+  _globals['_AIS_TARGET_EVENT']._serialized_end=804
+  _globals['_AISTRACKER']._serialized_start=961
+  _globals['_AISTRACKER']._serialized_end=1072
+# @@protoc_insertion_point(module_scope)
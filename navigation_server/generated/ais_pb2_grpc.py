@@ -0,0 +1,141 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+import navigation_server.generated.ais_pb2 as ais__pb2
+
+
+GRPC_GENERATED_VERSION = '1.66.2'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + f' but the generated code in ais_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class AISTrackerStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.GetTargets = channel.unary_unary(
+                '/AISTracker/GetTargets',
+                request_serializer=ais__pb2.ais_request.SerializeToString,
+                response_deserializer=ais__pb2.ais_snapshot.FromString,
+                _registered_method=True)
+        self.StreamTargets = channel.unary_stream(
+                '/AISTracker/StreamTargets',
+                request_serializer=ais__pb2.ais_request.SerializeToString,
+                response_deserializer=ais__pb2.ais_target_event.FromString,
+                _registered_method=True)
+
+
+class AISTrackerServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def GetTargets(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamTargets(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_AISTrackerServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'GetTargets': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetTargets,
+                    request_deserializer=ais__pb2.ais_request.FromString,
+                    response_serializer=ais__pb2.ais_snapshot.SerializeToString,
+            ),
+            'StreamTargets': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamTargets,
+                    request_deserializer=ais__pb2.ais_request.FromString,
+                    response_serializer=ais__pb2.ais_target_event.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'AISTracker', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('AISTracker', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class AISTracker(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def GetTargets(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/AISTracker/GetTargets',
+            ais__pb2.ais_request.SerializeToString,
+            ais__pb2.ais_snapshot.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamTargets(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/AISTracker/StreamTargets',
+            ais__pb2.ais_request.SerializeToString,
+            ais__pb2.ais_target_event.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
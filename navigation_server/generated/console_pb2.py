@@ -28,7 +28,7 @@ import navigation_server.generated.services_server_pb2 as services__server__pb2
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rconsole.proto\x1a\x0f\x61rguments.proto\x1a\x15services_server.proto\"\xaa\x03\n\nCouplerMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x15\n\rcoupler_class\x18\x02 \x01(\t\x12(\n\x05state\x18\x03 \x01(\x0e\x32\x19.CouplerMsg.Coupler_state\x12+\n\tdev_state\x18\x04 \x01(\x0e\x32\x18.CouplerMsg.Device_state\x12\x10\n\x08protocol\x18\x05 \x01(\t\x12\x0e\n\x06msg_in\x18\x06 \x01(\r\x12\x0f\n\x07msg_raw\x18\r \x01(\r\x12\x0f\n\x07msg_out\x18\x07 \x01(\r\x12\x0e\n\x06status\x18\x08 \x01(\t\x12\r\n\x05\x65rror\x18\t \x01(\r\x12\x12\n\ninput_rate\x18\n \x01(\x02\x12\x16\n\x0einput_rate_raw\x18\x0c \x01(\x02\x12\x13\n\x0boutput_rate\x18\x0b \x01(\x02\"8\n\rCoupler_state\x12\x0b\n\x07STOPPED\x10\x00\x12\x0b\n\x07RUNNING\x10\x01\x12\r\n\tSUSPENDED\x10\x03\"B\n\x0c\x44\x65vice_state\x12\r\n\tNOT_READY\x10\x00\x12\x08\n\x04OPEN\x10\x01\x12\r\n\tCONNECTED\x10\x02\x12\n\n\x06\x41\x43TIVE\x10\x03\")\n\nServiceMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05\x63lass\x18\x02 \x01(\t\";\n\x0cPublisherMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05\x63lass\x18\x02 \x01(\t\x12\x0e\n\x06\x61\x63tive\x18\x03 \x01(\x08\"Q\n\x07Request\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\x12\x0e\n\x06target\x18\x03 \x01(\t\x12\x1d\n\x06kwargs\x18\x04 \x01(\x0b\x32\r.ArgumentList\"N\n\x08Response\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12&\n\x0fresponse_values\x18\x03 \x01(\x0b\x32\r.ArgumentList2\xdc\x01\n\x11NavigationConsole\x12\"\n\tServerCmd\x12\x08.Request\x1a\t.Response\"\x00\x12-\n\x0cServerStatus\x12\x08.Request\x1a\x11.SystemProcessMsg\"\x00\x12(\n\x0bGetCouplers\x12\x08.Request\x1a\x0b.CouplerMsg\"\x00\x30\x01\x12%\n\nGetCoupler\x12\x08.Request\x1a\x0b.CouplerMsg\"\x00\x12#\n\nCouplerCmd\x12\x08.Request\x1a\t.Response\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rconsole.proto\x1a\x0f\x61rguments.proto\x1a\x15services_server.proto\"\xaa\x03\n\nCouplerMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x15\n\rcoupler_class\x18\x02 \x01(\t\x12(\n\x05state\x18\x03 \x01(\x0e\x32\x19.CouplerMsg.Coupler_state\x12+\n\tdev_state\x18\x04 \x01(\x0e\x32\x18.CouplerMsg.Device_state\x12\x10\n\x08protocol\x18\x05 \x01(\t\x12\x0e\n\x06msg_in\x18\x06 \x01(\r\x12\x0f\n\x07msg_raw\x18\r \x01(\r\x12\x0f\n\x07msg_out\x18\x07 \x01(\r\x12\x0e\n\x06status\x18\x08 \x01(\t\x12\r\n\x05\x65rror\x18\t \x01(\r\x12\x12\n\ninput_rate\x18\n \x01(\x02\x12\x16\n\x0einput_rate_raw\x18\x0c \x01(\x02\x12\x13\n\x0boutput_rate\x18\x0b \x01(\x02\"8\n\rCoupler_state\x12\x0b\n\x07STOPPED\x10\x00\x12\x0b\n\x07RUNNING\x10\x01\x12\r\n\tSUSPENDED\x10\x03\"B\n\x0c\x44\x65vice_state\x12\r\n\tNOT_READY\x10\x00\x12\x08\n\x04OPEN\x10\x01\x12\r\n\tCONNECTED\x10\x02\x12\n\n\x06\x41\x43TIVE\x10\x03\")\n\nServiceMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05\x63lass\x18\x02 \x01(\t\";\n\x0cPublisherMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05\x63lass\x18\x02 \x01(\t\x12\x0e\n\x06\x61\x63tive\x18\x03 \x01(\x08\"Q\n\x07Request\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\x12\x0e\n\x06target\x18\x03 \x01(\t\x12\x1d\n\x06kwargs\x18\x04 \x01(\x0b\x32\r.ArgumentList\"N\n\x08Response\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12&\n\x0fresponse_values\x18\x03 \x01(\x0b\x32\r.ArgumentList\"e\n\x12ReloadObjectResult\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x10\n\x08\x63\x61tegory\x18\x02 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x03 \x01(\t\x12\x0f\n\x07success\x18\x04 \x01(\x08\x12\x0e\n\x06status\x18\x05 \x01(\t\"R\n\x0eReloadResponse\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12$\n\x07results\x18\x03 \x03(\x0b\x32\x13.ReloadObjectResult\"\xae\x01\n\x13LatencyHistogramMsg\x12\r\n\x05stage\x18\x01 \x01(\t\x12\r\n\x05owner\x18\x02 \x01(\t\x12\r\n\x05\x63ount\x18\x03 \x01(\x04\x12\x0c\n\x04mean\x18\x04 \x01(\x02\x12\x0b\n\x03max\x18\x05 \x01(\r\x12\x0b\n\x03p50\x18\x06 \x01(\r\x12\x0b\n\x03p90\x18\x07 \x01(\r\x12\x0b\n\x03p99\x18\x08 \x01(\r\x12\x12\n\nbucket_low\x18\t \x03(\r\x12\x14\n\x0c\x62ucket_count\x18\n \x03(\x04\"f\n\rLatencyReport\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07\x65nabled\x18\x03 \x01(\x08\x12(\n\nhistograms\x18\x04 \x03(\x0b\x32\x14.LatencyHistogramMsg\">\n\x0e\x46oldedStackMsg\x12\x0e\n\x06thread\x18\x01 \x01(\t\x12\r\n\x05stack\x18\x02 \x01(\t\x12\r\n\x05\x63ount\x18\x03 \x01(\x04\"\x92\x01\n\x0eProfilerReport\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07running\x18\x03 \x01(\x08\x12\x0c\n\x04rate\x18\x04 \x01(\x02\x12\x12\n\nnb_samples\x18\x05 \x01(\x04\x12\x10\n\x08\x63pu_load\x18\x06 \x01(\x02\x12\x1f\n\x06stacks\x18\x07 \x03(\x0b\x32\x0f.FoldedStackMsg\"\x97\x01\n\x14\x41rbitrationSourceMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x10\n\x08priority\x18\x02 \x01(\r\x12\x0f\n\x07primary\x18\x03 \x01(\x08\x12\x0f\n\x07healthy\x18\x04 \x01(\x08\x12\x0b\n\x03\x61ge\x18\x05 \x01(\x02\x12\x0c\n\x04rate\x18\x06 \x01(\x02\x12\x0e\n\x06nb_msg\x18\x07 \x01(\x04\x12\x12\n\nquality_ok\x18\x08 \x01(\x08\"\x86\x01\n\x13\x41rbitrationGroupMsg\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0f\n\x07primary\x18\x02 \x01(\t\x12\x14\n\x0cnb_failovers\x18\x03 \x01(\x04\x12\x12\n\nnb_dropped\x18\x04 \x01(\x04\x12&\n\x07sources\x18\x05 \x03(\x0b\x32\x15.ArbitrationSourceMsg\"j\n\x13\x41rbitrationEventMsg\x12\x11\n\ttimestamp\x18\x01 \x01(\x01\x12\r\n\x05group\x18\x02 \x01(\t\x12\x10\n\x08previous\x18\x03 \x01(\t\x12\x0f\n\x07primary\x18\x04 \x01(\t\x12\x0e\n\x06reason\x18\x05 \x01(\t\"\xac\x01\n\x11\x41rbitrationReport\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x18\n\x10\x64uplicate_window\x18\x03 \x01(\x02\x12\x15\n\rnb_duplicates\x18\x04 \x01(\x04\x12$\n\x06groups\x18\x05 \x03(\x0b\x32\x14.ArbitrationGroupMsg\x12$\n\x06\x65vents\x18\x06 \x03(\x0b\x32\x14.ArbitrationEventMsg\"\xb6\x02\n\x0fTrafficEntryMsg\x12\x0b\n\x03pgn\x18\x01 \x01(\r\x12\n\n\x02sa\x18\x02 \x01(\r\x12\x14\n\x0cmanufacturer\x18\x03 \x01(\r\x12\r\n\x05\x63ount\x18\x04 \x01(\x04\x12\x12\n\nfirst_seen\x18\x05 \x01(\x01\x12\x11\n\tlast_seen\x18\x06 \x01(\x01\x12\x0c\n\x04rate\x18\x07 \x01(\x02\x12\x14\n\x0c\x61verage_rate\x18\x08 \x01(\x02\x12\x15\n\rmean_interval\x18\t \x01(\x02\x12\x0e\n\x06jitter\x18\n \x01(\x02\x12\x1a\n\x12interval_histogram\x18\x0b \x03(\x04\x12\x0e\n\x06\x66rames\x18\x0c \x01(\x04\x12\r\n\x05\x62ytes\x18\r \x01(\x04\x12\x10\n\x08\x62us_load\x18\x0e \x01(\x02\x12\x11\n\tfp_errors\x18\x0f \x01(\x04\x12\x13\n\x0b\x66p_timeouts\x18\x10 \x01(\x04\"\xe5\x01\n\x15TrafficAnalysisReport\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x12\n\nstart_time\x18\x03 \x01(\x01\x12\x10\n\x08\x65nd_time\x18\x04 \x01(\x01\x12\x11\n\ttotal_msg\x18\x05 \x01(\x04\x12\x14\n\x0ctotal_frames\x18\x06 \x01(\x04\x12\x10\n\x08\x62us_load\x18\x07 \x01(\x02\x12\x13\n\x0bnb_overflow\x18\x08 \x01(\x04\x12\x17\n\x0finterval_bounds\x18\t \x03(\x02\x12!\n\x07\x65ntries\x18\n \x03(\x0b\x32\x10.TrafficEntryMsg2\xd7\x03\n\x11NavigationConsole\x12\"\n\tServerCmd\x12\x08.Request\x1a\t.Response\"\x00\x12-\n\x0cServerStatus\x12\x08.Request\x1a\x11.SystemProcessMsg\"\x00\x12(\n\x0bGetCouplers\x12\x08.Request\x1a\x0b.CouplerMsg\"\x00\x30\x01\x12%\n\nGetCoupler\x12\x08.Request\x1a\x0b.CouplerMsg\"\x00\x12#\n\nCouplerCmd\x12\x08.Request\x1a\t.Response\"\x00\x12\x32\n\x13ReloadConfiguration\x12\x08.Request\x1a\x0f.ReloadResponse\"\x00\x12(\n\nGetLatency\x12\x08.Request\x1a\x0e.LatencyReport\"\x00\x12/\n\x10SamplingProfiler\x12\x08.Request\x1a\x0f.ProfilerReport\"\x00\x12\x30\n\x0eGetArbitration\x12\x08.Request\x1a\x12.ArbitrationReport\"\x00\x12\x38\n\x12GetTrafficAnalysis\x12\x08.Request\x1a\x16.TrafficAnalysisReport\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -49,6 +49,30 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_REQUEST']._serialized_end=671
   _globals['_RESPONSE']._serialized_start=673
   _globals['_RESPONSE']._serialized_end=751
-  _globals['_NAVIGATIONCONSOLE']._serialized_start=754
-  _globals['_NAVIGATIONCONSOLE']._serialized_end=974
+  _globals['_RELOADOBJECTRESULT']._serialized_start=753
+  _globals['_RELOADOBJECTRESULT']._serialized_end=854
+  _globals['_RELOADRESPONSE']._serialized_start=856
+  _globals['_RELOADRESPONSE']._serialized_end=938
+  _globals['_LATENCYHISTOGRAMMSG']._serialized_start=941
+  _globals['_LATENCYHISTOGRAMMSG']._serialized_end=1115
+  _globals['_LATENCYREPORT']._serialized_start=1117
+  _globals['_LATENCYREPORT']._serialized_end=1219
+  _globals['_FOLDEDSTACKMSG']._serialized_start=1221
+  _globals['_FOLDEDSTACKMSG']._serialized_end=1283
+  _globals['_PROFILERREPORT']._serialized_start=1286
+  _globals['_PROFILERREPORT']._serialized_end=1432
+  _globals['_ARBITRATIONSOURCEMSG']._serialized_start=1435
+  _globals['_ARBITRATIONSOURCEMSG']._serialized_end=1586
+  _globals['_ARBITRATIONGROUPMSG']._serialized_start=1589
+  _globals['_ARBITRATIONGROUPMSG']._serialized_end=1723
+  _globals['_ARBITRATIONEVENTMSG']._serialized_start=1725
+  _globals['_ARBITRATIONEVENTMSG']._serialized_end=1831
+  _globals['_ARBITRATIONREPORT']._serialized_start=1834
+  _globals['_ARBITRATIONREPORT']._serialized_end=2006
+  _globals['_TRAFFICENTRYMSG']._serialized_start=2009
+  _globals['_TRAFFICENTRYMSG']._serialized_end=2319
+  _globals['_TRAFFICANALYSISREPORT']._serialized_start=2322
+  _globals['_TRAFFICANALYSISREPORT']._serialized_end=2551
+  _globals['_NAVIGATIONCONSOLE']._serialized_start=2554
+  _globals['_NAVIGATIONCONSOLE']._serialized_end=3025
 # @@protoc_insertion_point(module_scope)
@@ -62,6 +62,31 @@ class NavigationConsoleStub(object):
                 request_serializer=console__pb2.Request.SerializeToString,
                 response_deserializer=console__pb2.Response.FromString,
                 _registered_method=True)
+        self.ReloadConfiguration = channel.unary_unary(
+                '/NavigationConsole/ReloadConfiguration',
+                request_serializer=console__pb2.Request.SerializeToString,
+                response_deserializer=console__pb2.ReloadResponse.FromString,
+                _registered_method=True)
+        self.GetLatency = channel.unary_unary(
+                '/NavigationConsole/GetLatency',
+                request_serializer=console__pb2.Request.SerializeToString,
+                response_deserializer=console__pb2.LatencyReport.FromString,
+                _registered_method=True)
+        self.SamplingProfiler = channel.unary_unary(
+                '/NavigationConsole/SamplingProfiler',
+                request_serializer=console__pb2.Request.SerializeToString,
+                response_deserializer=console__pb2.ProfilerReport.FromString,
+                _registered_method=True)
+        self.GetArbitration = channel.unary_unary(
+                '/NavigationConsole/GetArbitration',
+                request_serializer=console__pb2.Request.SerializeToString,
+                response_deserializer=console__pb2.ArbitrationReport.FromString,
+                _registered_method=True)
+        self.GetTrafficAnalysis = channel.unary_unary(
+                '/NavigationConsole/GetTrafficAnalysis',
+                request_serializer=console__pb2.Request.SerializeToString,
+                response_deserializer=console__pb2.TrafficAnalysisReport.FromString,
+                _registered_method=True)
 
 
 class NavigationConsoleServicer(object):
@@ -97,6 +122,36 @@ class NavigationConsoleServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ReloadConfiguration(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetLatency(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SamplingProfiler(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetArbitration(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetTrafficAnalysis(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_NavigationConsoleServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -125,6 +180,31 @@ def add_NavigationConsoleServicer_to_server(servicer, server):
                     request_deserializer=console__pb2.Request.FromString,
                     response_serializer=console__pb2.Response.SerializeToString,
             ),
+            'ReloadConfiguration': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReloadConfiguration,
+                    request_deserializer=console__pb2.Request.FromString,
+                    response_serializer=console__pb2.ReloadResponse.SerializeToString,
+            ),
+            'GetLatency': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetLatency,
+                    request_deserializer=console__pb2.Request.FromString,
+                    response_serializer=console__pb2.LatencyReport.SerializeToString,
+            ),
+            'SamplingProfiler': grpc.unary_unary_rpc_method_handler(
+                    servicer.SamplingProfiler,
+                    request_deserializer=console__pb2.Request.FromString,
+                    response_serializer=console__pb2.ProfilerReport.SerializeToString,
+            ),
+            'GetArbitration': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetArbitration,
+                    request_deserializer=console__pb2.Request.FromString,
+                    response_serializer=console__pb2.ArbitrationReport.SerializeToString,
+            ),
+            'GetTrafficAnalysis': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetTrafficAnalysis,
+                    request_deserializer=console__pb2.Request.FromString,
+                    response_serializer=console__pb2.TrafficAnalysisReport.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'NavigationConsole', rpc_method_handlers)
@@ -270,3 +350,138 @@ class NavigationConsole(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def ReloadConfiguration(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/NavigationConsole/ReloadConfiguration',
+            console__pb2.Request.SerializeToString,
+            console__pb2.ReloadResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetLatency(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/NavigationConsole/GetLatency',
+            console__pb2.Request.SerializeToString,
+            console__pb2.LatencyReport.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SamplingProfiler(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/NavigationConsole/SamplingProfiler',
+            console__pb2.Request.SerializeToString,
+            console__pb2.ProfilerReport.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetArbitration(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/NavigationConsole/GetArbitration',
+            console__pb2.Request.SerializeToString,
+            console__pb2.ArbitrationReport.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetTrafficAnalysis(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/NavigationConsole/GetTrafficAnalysis',
+            console__pb2.Request.SerializeToString,
+            console__pb2.TrafficAnalysisReport.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -30,25 +30,47 @@ import navigation_server.generated.nmea2000_pb2 as nmea2000__pb2
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x15n2k_can_service.proto\x1a\x0eiso_name.proto\x1a\x1enmea2000_classes_iso_gen.proto\x1a\x0enmea2000.proto\"\xca\x01\n\x0cN2KDeviceMsg\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\r\x12\x0f\n\x07\x63hanged\x18\x02 \x01(\x08\x12\x16\n\x0elast_time_seen\x18\x03 \x01(\x02\x12\x1a\n\x08iso_name\x18\x04 \x01(\x0b\x32\x08.ISOName\x12.\n\x13product_information\x18\x05 \x01(\x0b\x32\x11.Pgn126996ClassPb\x12\x34\n\x19\x63onfiguration_information\x18\x06 \x01(\x0b\x32\x11.Pgn126998ClassPb\"\x95\x01\n\x11\x43\x41N_ControllerMsg\x12\x0f\n\x07\x63hannel\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x15\n\rincoming_rate\x18\x03 \x01(\x02\x12\x15\n\routgoing_rate\x18\x04 \x01(\x02\x12\x11\n\ttraces_on\x18\x05 \x01(\x08\x12\x1e\n\x07\x64\x65vices\x18\x06 \x03(\x0b\x32\r.N2KDeviceMsg\"%\n\nCANRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\";\n\x06\x43\x41NAck\x12\n\n\x02id\x18\x01 \x01(\r\x12\x16\n\x0emessages_count\x18\x02 \x01(\r\x12\r\n\x05\x65rror\x18\x03 \x01(\r\"\x84\x01\n\x0e\x43\x41NReadRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06\x63lient\x18\x02 \x01(\t\x12\x16\n\x0eselect_sources\x18\x03 \x03(\r\x12\x16\n\x0ereject_sources\x18\x04 \x03(\r\x12\x12\n\nselect_pgn\x18\x05 \x03(\r\x12\x12\n\nreject_pgn\x18\x06 \x03(\r\"J\n\x0e\x43\x41NSendRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06\x64\x65vice\x18\x02 \x01(\t\x12\x1c\n\x07n2k_msg\x18\x03 \x01(\x0b\x32\x0b.nmea2000pb2\x8c\x02\n\x15\x43\x41N_ControllerService\x12.\n\tGetStatus\x12\x0b.CANRequest\x1a\x12.CAN_ControllerMsg\"\x00\x12/\n\nStartTrace\x12\x0b.CANRequest\x1a\x12.CAN_ControllerMsg\"\x00\x12.\n\tStopTrace\x12\x0b.CANRequest\x1a\x12.CAN_ControllerMsg\"\x00\x12\x33\n\x0fReadNmea2000Msg\x12\x0f.CANReadRequest\x1a\x0b.nmea2000pb\"\x00\x30\x01\x12-\n\x0fSendNmea2000Msg\x12\x0f.CANSendRequest\x1a\x07.CANAck\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x15n2k_can_service.proto\x1a\x0eiso_name.proto\x1a\x1enmea2000_classes_iso_gen.proto\x1a\x0enmea2000.proto\"\xca\x01\n\x0cN2KDeviceMsg\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\r\x12\x0f\n\x07\x63hanged\x18\x02 \x01(\x08\x12\x16\n\x0elast_time_seen\x18\x03 \x01(\x02\x12\x1a\n\x08iso_name\x18\x04 \x01(\x0b\x32\x08.ISOName\x12.\n\x13product_information\x18\x05 \x01(\x0b\x32\x11.Pgn126996ClassPb\x12\x34\n\x19\x63onfiguration_information\x18\x06 \x01(\x0b\x32\x11.Pgn126998ClassPb\"\x93\x01\n\x12N2KRegistryRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06target\x18\x02 \x01(\t\x12\r\n\x05names\x18\x03 \x03(\x04\x12\x11\n\taddresses\x18\x04 \x03(\r\x12\x1a\n\x12manufacturer_codes\x18\x05 \x03(\r\x12\x16\n\x0e\x64\x65vice_classes\x18\x06 \x03(\r\x12\x0b\n\x03pgn\x18\x07 \x01(\r\"9\n\x13N2KAddressChangeMsg\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\r\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\"\x9a\x02\n\x13N2KRegistryEntryMsg\x12\x0c\n\x04name\x18\x01 \x01(\x04\x12\x1a\n\x08iso_name\x18\x02 \x01(\x0b\x32\x08.ISOName\x12\x0f\n\x07\x61\x64\x64ress\x18\x03 \x01(\x05\x12\x12\n\nfirst_seen\x18\x04 \x01(\x01\x12\x11\n\tlast_seen\x18\x05 \x01(\x01\x12-\n\x0f\x61\x64\x64ress_history\x18\x06 \x03(\x0b\x32\x14.N2KAddressChangeMsg\x12\x0c\n\x04pgns\x18\x07 \x03(\r\x12.\n\x13product_information\x18\x08 \x01(\x0b\x32\x11.Pgn126996ClassPb\x12\x34\n\x19\x63onfiguration_information\x18\t \x01(\x0b\x32\x11.Pgn126998ClassPb\"g\n\x0eN2KRegistryMsg\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x12\n\nnb_devices\x18\x03 \x01(\r\x12%\n\x07\x65ntries\x18\x04 \x03(\x0b\x32\x14.N2KRegistryEntryMsg\"\x91\x01\n\x10\x43\x41NSubscriberMsg\x12\x0e\n\x06\x63lient\x18\x01 \x01(\t\x12\x11\n\ttransport\x18\x02 \x01(\t\x12\x17\n\x0foverflow_policy\x18\x03 \x01(\t\x12\x0e\n\x06queued\x18\x04 \x01(\r\x12\r\n\x05total\x18\x05 \x01(\x04\x12\x0f\n\x07\x64ropped\x18\x06 \x01(\x04\x12\x11\n\tcoalesced\x18\x07 \x01(\x04\"\x93\x01\n\x13\x43\x41NPriorityStatsMsg\x12\x10\n\x08priority\x18\x01 \x01(\r\x12\x15\n\rqueued_frames\x18\x02 \x01(\r\x12\r\n\x05units\x18\x03 \x01(\x04\x12\x0e\n\x06\x66rames\x18\x04 \x01(\x04\x12\x0f\n\x07\x64ropped\x18\x05 \x01(\x04\x12\x11\n\tmean_wait\x18\x06 \x01(\x02\x12\x10\n\x08max_wait\x18\x07 \x01(\x02\"\xf5\x01\n\x16IsoTransportSessionMsg\x12\x10\n\x08outgoing\x18\x01 \x01(\x08\x12\x15\n\rlocal_address\x18\x02 \x01(\r\x12\x14\n\x0cpeer_address\x18\x03 \x01(\r\x12\x0b\n\x03pgn\x18\x04 \x01(\r\x12\x0c\n\x04size\x18\x05 \x01(\r\x12\x12\n\nnb_packets\x18\x06 \x01(\r\x12\x0f\n\x07packets\x18\x07 \x01(\r\x12\x0f\n\x07windows\x18\x08 \x01(\r\x12\x13\n\x0bretransmits\x18\t \x01(\r\x12\x0e\n\x06status\x18\n \x01(\t\x12\x14\n\x0c\x61\x62ort_reason\x18\x0b \x01(\r\x12\x10\n\x08\x64uration\x18\x0c \x01(\x02\"\xe4\x02\n\x11\x43\x41N_ControllerMsg\x12\x0f\n\x07\x63hannel\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x15\n\rincoming_rate\x18\x03 \x01(\x02\x12\x15\n\routgoing_rate\x18\x04 \x01(\x02\x12\x11\n\ttraces_on\x18\x05 \x01(\x08\x12\x1e\n\x07\x64\x65vices\x18\x06 \x03(\x0b\x32\r.N2KDeviceMsg\x12&\n\x0bsubscribers\x18\x07 \x03(\x0b\x32\x11.CANSubscriberMsg\x12\x14\n\x0ctx_bandwidth\x18\x08 \x01(\x02\x12+\n\rtx_priorities\x18\t \x03(\x0b\x32\x14.CANPriorityStatsMsg\x12\x30\n\x0fiso_tp_sessions\x18\n \x03(\x0b\x32\x17.IsoTransportSessionMsg\x12\x18\n\x10iso_tp_completed\x18\x0b \x01(\x04\x12\x16\n\x0eiso_tp_aborted\x18\x0c \x01(\x04\"%\n\nCANRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\";\n\x06\x43\x41NAck\x12\n\n\x02id\x18\x01 \x01(\r\x12\x16\n\x0emessages_count\x18\x02 \x01(\r\x12\r\n\x05\x65rror\x18\x03 \x01(\r\"\xf1\x01\n\x0e\x43\x41NReadRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06\x63lient\x18\x02 \x01(\t\x12\x16\n\x0eselect_sources\x18\x03 \x03(\r\x12\x16\n\x0ereject_sources\x18\x04 \x03(\r\x12\x12\n\nselect_pgn\x18\x05 \x03(\r\x12\x12\n\nreject_pgn\x18\x06 \x03(\r\x12.\n\x0foverflow_policy\x18\x07 \x01(\x0e\x32\x15.StreamOverflowPolicy\x12\x12\n\nqueue_size\x18\x08 \x01(\r\x12\x12\n\nbatch_size\x18\t \x01(\r\x12\x13\n\x0bmax_latency\x18\n \x01(\x02\"P\n\x0b\x43\x41NMsgBatch\x12\x0f\n\x07\x64ropped\x18\x01 \x01(\x04\x12\x11\n\tcoalesced\x18\x02 \x01(\x04\x12\x1d\n\x08messages\x18\x03 \x03(\x0b\x32\x0b.nmea2000pb\"J\n\x0e\x43\x41NSendRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06\x64\x65vice\x18\x02 \x01(\t\x12\x1c\n\x07n2k_msg\x18\x03 \x01(\x0b\x32\x0b.nmea2000pb\"u\n\x11\x43\x41NLocalStreamMsg\x12\n\n\x02id\x18\x01 \x01(\r\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x02 \x01(\x08\x12\x0e\n\x06status\x18\x03 \x01(\t\x12\x11\n\tring_name\x18\x04 \x01(\t\x12\r\n\x05token\x18\x05 \x01(\r\x12\x10\n\x08nb_slots\x18\x06 \x01(\r*}\n\x14StreamOverflowPolicy\x12\x1b\n\x17OVERFLOW_SERVER_DEFAULT\x10\x00\x12\x17\n\x13OVERFLOW_DISCONNECT\x10\x01\x12\x18\n\x14OVERFLOW_DROP_OLDEST\x10\x02\x12\x15\n\x11OVERFLOW_COALESCE\x10\x03\x32P\n\x18N2KDeviceRegistryService\x12\x34\n\nGetDevices\x12\x13.N2KRegistryRequest\x1a\x0f.N2KRegistryMsg\"\x00\x32\xeb\x03\n\x15\x43\x41N_ControllerService\x12.\n\tGetStatus\x12\x0b.CANRequest\x1a\x12.CAN_ControllerMsg\"\x00\x12/\n\nStartTrace\x12\x0b.CANRequest\x1a\x12.CAN_ControllerMsg\"\x00\x12.\n\tStopTrace\x12\x0b.CANRequest\x1a\x12.CAN_ControllerMsg\"\x00\x12\x33\n\x0fReadNmea2000Msg\x12\x0f.CANReadRequest\x1a\x0b.nmea2000pb\"\x00\x30\x01\x12-\n\x0fSendNmea2000Msg\x12\x0f.CANSendRequest\x1a\x07.CANAck\"\x00\x12\x38\n\x0fOpenLocalStream\x12\x0f.CANReadRequest\x1a\x12.CANLocalStreamMsg\"\x00\x12\x39\n\x14ReadNmea2000MsgBatch\x12\x0f.CANReadRequest\x1a\x0c.CANMsgBatch\"\x00\x30\x01\x12\x35\n\x0bGetSnapshot\x12\x13.N2KSnapshotRequest\x1a\x0f.N2KSnapshotMsg\"\x00\x12\x31\n\x10\x43loseLocalStream\x12\x12.CANLocalStreamMsg\x1a\x07.CANAck\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'n2k_can_service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_STREAMOVERFLOWPOLICY']._serialized_start=2419
+  _globals['_STREAMOVERFLOWPOLICY']._serialized_end=2544
   _globals['_N2KDEVICEMSG']._serialized_start=90
   _globals['_N2KDEVICEMSG']._serialized_end=292
-  _globals['_CAN_CONTROLLERMSG']._serialized_start=295
-  _globals['_CAN_CONTROLLERMSG']._serialized_end=444
-  _globals['_CANREQUEST']._serialized_start=446
-  _globals['_CANREQUEST']._serialized_end=483
-  _globals['_CANACK']._serialized_start=485
-  _globals['_CANACK']._serialized_end=544
-  _globals['_CANREADREQUEST']._serialized_start=547
-  _globals['_CANREADREQUEST']._serialized_end=679
-  _globals['_CANSENDREQUEST']._serialized_start=681
-  _globals['_CANSENDREQUEST']._serialized_end=755
-  _globals['_CAN_CONTROLLERSERVICE']._serialized_start=758
-  _globals['_CAN_CONTROLLERSERVICE']._serialized_end=1026
+  _globals['_N2KREGISTRYREQUEST']._serialized_start=295
+  _globals['_N2KREGISTRYREQUEST']._serialized_end=442
+  _globals['_N2KADDRESSCHANGEMSG']._serialized_start=444
+  _globals['_N2KADDRESSCHANGEMSG']._serialized_end=501
+  _globals['_N2KREGISTRYENTRYMSG']._serialized_start=504
+  _globals['_N2KREGISTRYENTRYMSG']._serialized_end=786
+  _globals['_N2KREGISTRYMSG']._serialized_start=788
+  _globals['_N2KREGISTRYMSG']._serialized_end=891
+  _globals['_CANSUBSCRIBERMSG']._serialized_start=894
+  _globals['_CANSUBSCRIBERMSG']._serialized_end=1039
+  _globals['_CANPRIORITYSTATSMSG']._serialized_start=1042
+  _globals['_CANPRIORITYSTATSMSG']._serialized_end=1189
+  _globals['_ISOTRANSPORTSESSIONMSG']._serialized_start=1192
+  _globals['_ISOTRANSPORTSESSIONMSG']._serialized_end=1437
+  _globals['_CAN_CONTROLLERMSG']._serialized_start=1440
+  _globals['_CAN_CONTROLLERMSG']._serialized_end=1796
+  _globals['_CANREQUEST']._serialized_start=1798
+  _globals['_CANREQUEST']._serialized_end=1835
+  _globals['_CANACK']._serialized_start=1837
+  _globals['_CANACK']._serialized_end=1896
+  _globals['_CANREADREQUEST']._serialized_start=1899
+  _globals['_CANREADREQUEST']._serialized_end=2140
+  _globals['_CANMSGBATCH']._serialized_start=2142
+  _globals['_CANMSGBATCH']._serialized_end=2222
+  _globals['_CANSENDREQUEST']._serialized_start=2224
+  _globals['_CANSENDREQUEST']._serialized_end=2298
+  _globals['_CANLOCALSTREAMMSG']._serialized_start=2300
+  _globals['_CANLOCALSTREAMMSG']._serialized_end=2417
+  _globals['_N2KDEVICEREGISTRYSERVICE']._serialized_start=2546
+  _globals['_N2KDEVICEREGISTRYSERVICE']._serialized_end=2626
+  _globals['_CAN_CONTROLLERSERVICE']._serialized_start=2629
+  _globals['_CAN_CONTROLLERSERVICE']._serialized_end=3120
 # @@protoc_insertion_point(module_scope)
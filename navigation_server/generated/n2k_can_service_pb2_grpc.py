@@ -28,6 +28,78 @@ if _version_not_supported:
     )
 
 
+class N2KDeviceRegistryServiceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.GetDevices = channel.unary_unary(
+                '/N2KDeviceRegistryService/GetDevices',
+                request_serializer=n2k__can__service__pb2.N2KRegistryRequest.SerializeToString,
+                response_deserializer=n2k__can__service__pb2.N2KRegistryMsg.FromString,
+                _registered_method=True)
+
+
+class N2KDeviceRegistryServiceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def GetDevices(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_N2KDeviceRegistryServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'GetDevices': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetDevices,
+                    request_deserializer=n2k__can__service__pb2.N2KRegistryRequest.FromString,
+                    response_serializer=n2k__can__service__pb2.N2KRegistryMsg.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'N2KDeviceRegistryService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('N2KDeviceRegistryService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class N2KDeviceRegistryService(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def GetDevices(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/N2KDeviceRegistryService/GetDevices',
+            n2k__can__service__pb2.N2KRegistryRequest.SerializeToString,
+            n2k__can__service__pb2.N2KRegistryMsg.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+
 class CAN_ControllerServiceStub(object):
     """Missing associated documentation comment in .proto file."""
 
@@ -62,6 +134,26 @@ class CAN_ControllerServiceStub(object):
                 request_serializer=n2k__can__service__pb2.CANSendRequest.SerializeToString,
                 response_deserializer=n2k__can__service__pb2.CANAck.FromString,
                 _registered_method=True)
+        self.OpenLocalStream = channel.unary_unary(
+                '/CAN_ControllerService/OpenLocalStream',
+                request_serializer=n2k__can__service__pb2.CANReadRequest.SerializeToString,
+                response_deserializer=n2k__can__service__pb2.CANLocalStreamMsg.FromString,
+                _registered_method=True)
+        self.ReadNmea2000MsgBatch = channel.unary_stream(
+                '/CAN_ControllerService/ReadNmea2000MsgBatch',
+                request_serializer=n2k__can__service__pb2.CANReadRequest.SerializeToString,
+                response_deserializer=n2k__can__service__pb2.CANMsgBatch.FromString,
+                _registered_method=True)
+        self.GetSnapshot = channel.unary_unary(
+                '/CAN_ControllerService/GetSnapshot',
+                request_serializer=nmea2000__pb2.N2KSnapshotRequest.SerializeToString,
+                response_deserializer=nmea2000__pb2.N2KSnapshotMsg.FromString,
+                _registered_method=True)
+        self.CloseLocalStream = channel.unary_unary(
+                '/CAN_ControllerService/CloseLocalStream',
+                request_serializer=n2k__can__service__pb2.CANLocalStreamMsg.SerializeToString,
+                response_deserializer=n2k__can__service__pb2.CANAck.FromString,
+                _registered_method=True)
 
 
 class CAN_ControllerServiceServicer(object):
@@ -97,6 +189,30 @@ class CAN_ControllerServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def OpenLocalStream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReadNmea2000MsgBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetSnapshot(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CloseLocalStream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_CAN_ControllerServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -125,6 +241,26 @@ def add_CAN_ControllerServiceServicer_to_server(servicer, server):
                     request_deserializer=n2k__can__service__pb2.CANSendRequest.FromString,
                     response_serializer=n2k__can__service__pb2.CANAck.SerializeToString,
             ),
+            'OpenLocalStream': grpc.unary_unary_rpc_method_handler(
+                    servicer.OpenLocalStream,
+                    request_deserializer=n2k__can__service__pb2.CANReadRequest.FromString,
+                    response_serializer=n2k__can__service__pb2.CANLocalStreamMsg.SerializeToString,
+            ),
+            'ReadNmea2000MsgBatch': grpc.unary_stream_rpc_method_handler(
+                    servicer.ReadNmea2000MsgBatch,
+                    request_deserializer=n2k__can__service__pb2.CANReadRequest.FromString,
+                    response_serializer=n2k__can__service__pb2.CANMsgBatch.SerializeToString,
+            ),
+            'GetSnapshot': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetSnapshot,
+                    request_deserializer=nmea2000__pb2.N2KSnapshotRequest.FromString,
+                    response_serializer=nmea2000__pb2.N2KSnapshotMsg.SerializeToString,
+            ),
+            'CloseLocalStream': grpc.unary_unary_rpc_method_handler(
+                    servicer.CloseLocalStream,
+                    request_deserializer=n2k__can__service__pb2.CANLocalStreamMsg.FromString,
+                    response_serializer=n2k__can__service__pb2.CANAck.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'CAN_ControllerService', rpc_method_handlers)
@@ -270,3 +406,111 @@ class CAN_ControllerService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def OpenLocalStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CAN_ControllerService/OpenLocalStream',
+            n2k__can__service__pb2.CANReadRequest.SerializeToString,
+            n2k__can__service__pb2.CANLocalStreamMsg.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReadNmea2000MsgBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/CAN_ControllerService/ReadNmea2000MsgBatch',
+            n2k__can__service__pb2.CANReadRequest.SerializeToString,
+            n2k__can__service__pb2.CANMsgBatch.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetSnapshot(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CAN_ControllerService/GetSnapshot',
+            nmea2000__pb2.N2KSnapshotRequest.SerializeToString,
+            nmea2000__pb2.N2KSnapshotMsg.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CloseLocalStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CAN_ControllerService/CloseLocalStream',
+            n2k__can__service__pb2.CANLocalStreamMsg.SerializeToString,
+            n2k__can__service__pb2.CANAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
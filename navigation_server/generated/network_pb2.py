@@ -26,29 +26,35 @@ import navigation_server.generated.uuid_pb2 as uuid__pb2
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rnetwork.proto\x1a\nuuid.proto\"+\n\x0cNetParameter\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"\x8c\x01\n\x0cNetInterface\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x19\n\x04type\x18\x03 \x01(\x0e\x32\x0b.DeviceType\x12 \n\x06status\x18\x04 \x01(\x0e\x32\x10.InterfaceStatus\x12\x1c\n\x04\x63onn\x18\x05 \x01(\x0b\x32\x0e.NetConnection\x12\x13\n\x0b\x64\x65vice_name\x18\x06 \x01(\t\"Y\n\rNetConnection\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x17\n\x04uuid\x18\x02 \x01(\x0b\x32\t.ObjectId\x12!\n\nparameters\x18\x04 \x03(\x0b\x32\r.NetParameter\"b\n\x0eNetworkCommand\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\x12\x19\n\x02if\x18\x03 \x01(\x0b\x32\r.NetInterface\x12\x1c\n\x04\x63onn\x18\x04 \x01(\x0b\x32\x0e.NetConnection\"S\n\x0cNetworkReply\x12\n\n\x02id\x18\x01 \x01(\r\x12\x19\n\x02if\x18\x02 \x01(\x0b\x32\r.NetInterface\x12\x1c\n\x04\x63onn\x18\x03 \x01(\x0b\x32\x0e.NetConnection\"O\n\rNetworkStatus\x12\n\n\x02id\x18\x01 \x01(\r\x12\x12\n\nnm_running\x18\x02 \x01(\x08\x12\x1e\n\x07if_list\x18\x03 \x03(\x0b\x32\r.NetInterface*^\n\x0fInterfaceStatus\x12\x11\n\rNOT_CONNECTED\x10\x00\x12\x12\n\x0eLAN_CONTROLLER\x10\x01\x12\x11\n\rWAN_INTERFACE\x10\x02\x12\x11\n\rLAN_INTERFACE\x10\x03*?\n\nDeviceType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0c\n\x08\x45THERNET\x10\x01\x12\x08\n\x04WIFI\x10\x02\x12\x0c\n\x08\x43\x45LLULAR\x10\x03\x32\xf6\x01\n\x0eNetworkService\x12\x35\n\x11set_configuration\x12\x0f.NetworkCommand\x1a\r.NetworkReply\"\x00\x12\x35\n\x11get_configuration\x12\x0f.NetworkCommand\x1a\r.NetworkReply\"\x00\x12=\n\x18set_global_configuration\x12\x0f.NetworkCommand\x1a\x0e.NetworkStatus\"\x00\x12\x37\n\x12get_network_status\x12\x0f.NetworkCommand\x1a\x0e.NetworkStatus\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rnetwork.proto\x1a\nuuid.proto\"+\n\x0cNetParameter\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"\xaf\x01\n\x0cNetInterface\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x19\n\x04type\x18\x03 \x01(\x0e\x32\x0b.DeviceType\x12 \n\x06status\x18\x04 \x01(\x0e\x32\x10.InterfaceStatus\x12\x1c\n\x04\x63onn\x18\x05 \x01(\x0b\x32\x0e.NetConnection\x12\x13\n\x0b\x64\x65vice_name\x18\x06 \x01(\t\x12\r\n\x05state\x18\x07 \x01(\t\x12\x12\n\nip_address\x18\x08 \x01(\t\"Y\n\rNetConnection\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x17\n\x04uuid\x18\x02 \x01(\x0b\x32\t.ObjectId\x12!\n\nparameters\x18\x04 \x03(\x0b\x32\r.NetParameter\"b\n\x0eNetworkCommand\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0b\n\x03\x63md\x18\x02 \x01(\t\x12\x19\n\x02if\x18\x03 \x01(\x0b\x32\r.NetInterface\x12\x1c\n\x04\x63onn\x18\x04 \x01(\x0b\x32\x0e.NetConnection\"S\n\x0cNetworkReply\x12\n\n\x02id\x18\x01 \x01(\r\x12\x19\n\x02if\x18\x02 \x01(\x0b\x32\r.NetInterface\x12\x1c\n\x04\x63onn\x18\x03 \x01(\x0b\x32\x0e.NetConnection\"\xf1\x01\n\x08NetModem\x12\r\n\x05index\x18\x01 \x01(\r\x12\x14\n\x0cmanufacturer\x18\x02 \x01(\t\x12\r\n\x05model\x18\x03 \x01(\t\x12\x0c\n\x04imei\x18\x04 \x01(\t\x12\r\n\x05state\x18\x05 \x01(\t\x12\x14\n\x0cregistration\x18\x06 \x01(\t\x12\x15\n\roperator_name\x18\x07 \x01(\t\x12\x15\n\roperator_code\x18\x08 \x01(\t\x12\x1b\n\x13\x61\x63\x63\x65ss_technologies\x18\t \x01(\t\x12\x16\n\x0esignal_quality\x18\n \x01(\r\x12\x0c\n\x04imsi\x18\x0b \x01(\t\x12\r\n\x05iccid\x18\x0c \x01(\t\"\xae\x01\n\rNetworkStatus\x12\n\n\x02id\x18\x01 \x01(\r\x12\x12\n\nnm_running\x18\x02 \x01(\x08\x12\x1e\n\x07if_list\x18\x03 \x03(\x0b\x32\r.NetInterface\x12\x14\n\x0c\x63onnectivity\x18\x04 \x01(\t\x12\x10\n\x08nm_state\x18\x05 \x01(\t\x12\x1a\n\x12primary_connection\x18\x06 \x01(\t\x12\x19\n\x06modems\x18\x07 \x03(\x0b\x32\t.NetModem\"|\n\x0cNetworkEvent\x12\n\n\x02id\x18\x01 \x01(\r\x12\r\n\x05\x65vent\x18\x02 \x01(\t\x12\x0c\n\x04name\x18\x03 \x01(\t\x12\r\n\x05state\x18\x04 \x01(\t\x12!\n\nparameters\x18\x05 \x03(\x0b\x32\r.NetParameter\x12\x11\n\ttimestamp\x18\x06 \x01(\x01\"{\n\nModemEvent\x12\n\n\x02id\x18\x01 \x01(\r\x12\r\n\x05modem\x18\x02 \x01(\r\x12\r\n\x05\x65vent\x18\x03 \x01(\t\x12\r\n\x05value\x18\x04 \x01(\t\x12!\n\nparameters\x18\x05 \x03(\x0b\x32\r.NetParameter\x12\x11\n\ttimestamp\x18\x06 \x01(\x01*^\n\x0fInterfaceStatus\x12\x11\n\rNOT_CONNECTED\x10\x00\x12\x12\n\x0eLAN_CONTROLLER\x10\x01\x12\x11\n\rWAN_INTERFACE\x10\x02\x12\x11\n\rLAN_INTERFACE\x10\x03*?\n\nDeviceType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0c\n\x08\x45THERNET\x10\x01\x12\x08\n\x04WIFI\x10\x02\x12\x0c\n\x08\x43\x45LLULAR\x10\x03\x32\xeb\x02\n\x0eNetworkService\x12\x35\n\x11set_configuration\x12\x0f.NetworkCommand\x1a\r.NetworkReply\"\x00\x12\x35\n\x11get_configuration\x12\x0f.NetworkCommand\x1a\r.NetworkReply\"\x00\x12=\n\x18set_global_configuration\x12\x0f.NetworkCommand\x1a\x0e.NetworkStatus\"\x00\x12\x37\n\x12get_network_status\x12\x0f.NetworkCommand\x1a\x0e.NetworkStatus\"\x00\x12\x37\n\x13stream_modem_events\x12\x0f.NetworkCommand\x1a\x0b.ModemEvent\"\x00\x30\x01\x12:\n\x14stream_network_state\x12\x0f.NetworkCommand\x1a\r.NetworkEvent\"\x00\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'network_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_INTERFACESTATUS']._serialized_start=574
-  _globals['_INTERFACESTATUS']._serialized_end=668
-  _globals['_DEVICETYPE']._serialized_start=670
-  _globals['_DEVICETYPE']._serialized_end=733
+  _globals['_INTERFACESTATUS']._serialized_start=1200
+  _globals['_INTERFACESTATUS']._serialized_end=1294
+  _globals['_DEVICETYPE']._serialized_start=1296
+  _globals['_DEVICETYPE']._serialized_end=1359
   _globals['_NETPARAMETER']._serialized_start=29
   _globals['_NETPARAMETER']._serialized_end=72
   _globals['_NETINTERFACE']._serialized_start=75
-  _globals['_NETINTERFACE']._serialized_end=215
-  _globals['_NETCONNECTION']._serialized_start=217
-  _globals['_NETCONNECTION']._serialized_end=306
-  _globals['_NETWORKCOMMAND']._serialized_start=308
-  _globals['_NETWORKCOMMAND']._serialized_end=406
-  _globals['_NETWORKREPLY']._serialized_start=408
-  _globals['_NETWORKREPLY']._serialized_end=491
-  _globals['_NETWORKSTATUS']._serialized_start=493
-  _globals['_NETWORKSTATUS']._serialized_end=572
-  _globals['_NETWORKSERVICE']._serialized_start=736
-  _globals['_NETWORKSERVICE']._serialized_end=982
+  _globals['_NETINTERFACE']._serialized_end=250
+  _globals['_NETCONNECTION']._serialized_start=252
+  _globals['_NETCONNECTION']._serialized_end=341
+  _globals['_NETWORKCOMMAND']._serialized_start=343
+  _globals['_NETWORKCOMMAND']._serialized_end=441
+  _globals['_NETWORKREPLY']._serialized_start=443
+  _globals['_NETWORKREPLY']._serialized_end=526
+  _globals['_NETMODEM']._serialized_start=529
+  _globals['_NETMODEM']._serialized_end=770
+  _globals['_NETWORKSTATUS']._serialized_start=773
+  _globals['_NETWORKSTATUS']._serialized_end=947
+  _globals['_NETWORKEVENT']._serialized_start=949
+  _globals['_NETWORKEVENT']._serialized_end=1073
+  _globals['_MODEMEVENT']._serialized_start=1075
+  _globals['_MODEMEVENT']._serialized_end=1198
+  _globals['_NETWORKSERVICE']._serialized_start=1362
+  _globals['_NETWORKSERVICE']._serialized_end=1725
 # @@protoc_insertion_point(module_scope)
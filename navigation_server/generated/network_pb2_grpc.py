@@ -55,6 +55,16 @@ class NetworkServiceStub(object):
                 request_serializer=network__pb2.NetworkCommand.SerializeToString,
                 response_deserializer=network__pb2.NetworkStatus.FromString,
                 _registered_method=True)
+        self.stream_modem_events = channel.unary_stream(
+                '/NetworkService/stream_modem_events',
+                request_serializer=network__pb2.NetworkCommand.SerializeToString,
+                response_deserializer=network__pb2.ModemEvent.FromString,
+                _registered_method=True)
+        self.stream_network_state = channel.unary_stream(
+                '/NetworkService/stream_network_state',
+                request_serializer=network__pb2.NetworkCommand.SerializeToString,
+                response_deserializer=network__pb2.NetworkEvent.FromString,
+                _registered_method=True)
 
 
 class NetworkServiceServicer(object):
@@ -84,6 +94,18 @@ class NetworkServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def stream_modem_events(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def stream_network_state(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_NetworkServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -107,6 +129,16 @@ def add_NetworkServiceServicer_to_server(servicer, server):
                     request_deserializer=network__pb2.NetworkCommand.FromString,
                     response_serializer=network__pb2.NetworkStatus.SerializeToString,
             ),
+            'stream_modem_events': grpc.unary_stream_rpc_method_handler(
+                    servicer.stream_modem_events,
+                    request_deserializer=network__pb2.NetworkCommand.FromString,
+                    response_serializer=network__pb2.ModemEvent.SerializeToString,
+            ),
+            'stream_network_state': grpc.unary_stream_rpc_method_handler(
+                    servicer.stream_network_state,
+                    request_deserializer=network__pb2.NetworkCommand.FromString,
+                    response_serializer=network__pb2.NetworkEvent.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'NetworkService', rpc_method_handlers)
@@ -225,3 +257,57 @@ class NetworkService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def stream_modem_events(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/NetworkService/stream_modem_events',
+            network__pb2.NetworkCommand.SerializeToString,
+            network__pb2.ModemEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def stream_network_state(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/NetworkService/stream_network_state',
+            network__pb2.NetworkCommand.SerializeToString,
+            network__pb2.NetworkEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
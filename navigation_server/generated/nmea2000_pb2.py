@@ -25,7 +25,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import any_pb2 as google_dot_protobuf_dot_any__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0enmea2000.proto\x1a\x19google/protobuf/any.proto\"g\n\nnmea2000pb\x12\x0b\n\x03pgn\x18\x01 \x01(\r\x12\x10\n\x08priority\x18\x02 \x01(\r\x12\n\n\x02sa\x18\x03 \x01(\r\x12\n\n\x02\x64\x61\x18\x04 \x01(\r\x12\x11\n\ttimestamp\x18\x05 \x01(\x02\x12\x0f\n\x07payload\x18\x06 \x01(\x0c\"\x9f\x01\n\x13nmea2000_decoded_pb\x12\x0b\n\x03pgn\x18\x01 \x01(\r\x12\x10\n\x08priority\x18\x02 \x01(\r\x12\n\n\x02sa\x18\x03 \x01(\r\x12\n\n\x02\x64\x61\x18\x04 \x01(\r\x12\x11\n\ttimestamp\x18\x05 \x01(\x02\x12\x17\n\x0fmanufacturer_id\x18\x06 \x01(\r\x12%\n\x07payload\x18\x07 \x01(\x0b\x32\x14.google.protobuf.Anyb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0enmea2000.proto\x1a\x19google/protobuf/any.proto\"g\n\nnmea2000pb\x12\x0b\n\x03pgn\x18\x01 \x01(\r\x12\x10\n\x08priority\x18\x02 \x01(\r\x12\n\n\x02sa\x18\x03 \x01(\r\x12\n\n\x02\x64\x61\x18\x04 \x01(\r\x12\x11\n\ttimestamp\x18\x05 \x01(\x02\x12\x0f\n\x07payload\x18\x06 \x01(\x0c\"\x9f\x01\n\x13nmea2000_decoded_pb\x12\x0b\n\x03pgn\x18\x01 \x01(\r\x12\x10\n\x08priority\x18\x02 \x01(\r\x12\n\n\x02sa\x18\x03 \x01(\r\x12\n\n\x02\x64\x61\x18\x04 \x01(\r\x12\x11\n\ttimestamp\x18\x05 \x01(\x02\x12\x17\n\x0fmanufacturer_id\x18\x06 \x01(\r\x12%\n\x07payload\x18\x07 \x01(\x0b\x32\x14.google.protobuf.Any\"\x7f\n\x12N2KSnapshotRequest\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06target\x18\x02 \x01(\t\x12\x0b\n\x03pgn\x18\x03 \x03(\r\x12\n\n\x02sa\x18\x04 \x03(\r\x12\x0f\n\x07max_age\x18\x05 \x01(\x02\x12\x13\n\x0bstale_after\x18\x06 \x01(\x02\x12\x0e\n\x06\x64\x65\x63ode\x18\x07 \x01(\x08\"\x80\x01\n\x10N2KSnapshotEntry\x12\x18\n\x03msg\x18\x01 \x01(\x0b\x32\x0b.nmea2000pb\x12%\n\x07\x64\x65\x63oded\x18\x02 \x01(\x0b\x32\x14.nmea2000_decoded_pb\x12\x0b\n\x03\x61ge\x18\x03 \x01(\x02\x12\r\n\x05stale\x18\x04 \x01(\x08\x12\x0f\n\x07updates\x18\x05 \x01(\r\"d\n\x0eN2KSnapshotMsg\x12\n\n\x02id\x18\x01 \x01(\r\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x12\n\nnb_entries\x18\x03 \x01(\r\x12\"\n\x07\x65ntries\x18\x04 \x03(\x0b\x32\x11.N2KSnapshotEntry2K\n\x12N2KSnapshotService\x12\x35\n\x0bGetSnapshot\x12\x13.N2KSnapshotRequest\x1a\x0f.N2KSnapshotMsg\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -36,4 +36,12 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_NMEA2000PB']._serialized_end=148
   _globals['_NMEA2000_DECODED_PB']._serialized_start=151
   _globals['_NMEA2000_DECODED_PB']._serialized_end=310
+  _globals['_N2KSNAPSHOTREQUEST']._serialized_start=312
+  _globals['_N2KSNAPSHOTREQUEST']._serialized_end=439
+  _globals['_N2KSNAPSHOTENTRY']._serialized_start=442
+  _globals['_N2KSNAPSHOTENTRY']._serialized_end=570
+  _globals['_N2KSNAPSHOTMSG']._serialized_start=572
+  _globals['_N2KSNAPSHOTMSG']._serialized_end=672
+  _globals['_N2KSNAPSHOTSERVICE']._serialized_start=674
+  _globals['_N2KSNAPSHOTSERVICE']._serialized_end=749
 # @@protoc_insertion_point(module_scope)
@@ -3,6 +3,8 @@
 import grpc
 import warnings
 
+import navigation_server.generated.nmea2000_pb2 as nmea2000__pb2
+
 
 GRPC_GENERATED_VERSION = '1.66.2'
 GRPC_VERSION = grpc.__version__
@@ -22,3 +24,75 @@ if _version_not_supported:
         + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
         + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
     )
+
+
+class N2KSnapshotServiceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.GetSnapshot = channel.unary_unary(
+                '/N2KSnapshotService/GetSnapshot',
+                request_serializer=nmea2000__pb2.N2KSnapshotRequest.SerializeToString,
+                response_deserializer=nmea2000__pb2.N2KSnapshotMsg.FromString,
+                _registered_method=True)
+
+
+class N2KSnapshotServiceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def GetSnapshot(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_N2KSnapshotServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'GetSnapshot': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetSnapshot,
+                    request_deserializer=nmea2000__pb2.N2KSnapshotRequest.FromString,
+                    response_serializer=nmea2000__pb2.N2KSnapshotMsg.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'N2KSnapshotService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('N2KSnapshotService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class N2KSnapshotService(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def GetSnapshot(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/N2KSnapshotService/GetSnapshot',
+            nmea2000__pb2.N2KSnapshotRequest.SerializeToString,
+            nmea2000__pb2.N2KSnapshotMsg.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -15,7 +15,7 @@ import threading
 import serial
 import queue
 
-from navigation_server.router_core import NMEA0183Msg, NMEAInvalidFrame
+from navigation_server.router_core import NMEA0183Msg, NMEAInvalidFrame, NMEA0183Index
 from navigation_server.router_common import NavThread, NMEAMsgTrace
 from navigation_server.gnss.gnss_data import GNSSDataManager, N2KForwarder
 from navigation_server.generated.gnss_pb2 import SatellitesInView, ConstellationStatus, GNSS_Status
@@ -35,11 +35,11 @@ class N0183Subscriber:
 
     def __init__(self, formatters: list, push_queue: queue.Queue):
         _logger.debug("GNSS Creating NMEA0183 Subscriber with formatters:%s" % formatters)
-        self._formatters = formatters
+        self._formatters = set(NMEA0183Index.formatter_code(fmt) for fmt in formatters)
         self._queue = push_queue
 
     def push(self, msg: NMEA0183Msg):
-        if msg.formatter() in self._formatters:
+        if msg.formatter_code in self._formatters:
             try:
                 _logger.debug("NMEA0183 Subscriber push:%s" % msg)
                 self._queue.put(msg, block=True, timeout=0.2)
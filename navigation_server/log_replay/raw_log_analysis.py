@@ -0,0 +1,120 @@
+#-------------------------------------------------------------------------------
+# Name:        raw_log_analysis
+# Purpose:     Offline traffic analysis of raw log files
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import os
+
+from .raw_log_reader import RawLogFile
+from navigation_server.router_core import NMEA0183Msg, NMEAInvalidFrame, fromProprietaryNmea, NMEA2000Msg
+from navigation_server.router_common import IncompleteMessage, NavGenericMsg, N2K_MSG, N0183_MSG
+from navigation_server.nmea2000 import FastPacketHandler, FastPacketException
+from navigation_server.nmea2000_datamodel import PGNDef, N2KUnknownPGN
+from navigation_server.nmea_data import N2KStatistics, NMEA183Statistics
+from navigation_server.couplers import ShipModulInterface
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class RawLogAnalysis:
+    """
+    Offline traffic analysis of a raw log file (SocketCANInterface or ShipModulInterface traces)
+    The NMEA2000 messages are reassembled as in the RawLogCoupler and analysed with the record timestamps, so the
+    figures are the same as the ones of a N2KStatisticPublisher running on the live bus
+    """
+
+    def __init__(self, logfile: str, max_entries: int = 1024):
+        self._name = os.path.basename(logfile)
+        self._logfile = RawLogFile(logfile)
+        self._fast_packet_handler = FastPacketHandler(self)
+        self._n2k_stats = N2KStatistics(max_entries)
+        self._n2k_stats.attach_fast_packet_handler(self._name, self._fast_packet_handler)
+        self._n183_stats = NMEA183Statistics()
+        self._nb_invalid = 0
+
+    # the interface below is the part of the Coupler used by the frame decoders
+    @property
+    def fast_packet_handler(self) -> FastPacketHandler:
+        return self._fast_packet_handler
+
+    def object_name(self) -> str:
+        return self._name
+
+    def add_event_trace(self, message: str):
+        _logger.debug("%s: %s" % (self._name, message))
+
+    @property
+    def n2k_statistics(self) -> N2KStatistics:
+        return self._n2k_stats
+
+    @property
+    def n183_statistics(self) -> NMEA183Statistics:
+        return self._n183_stats
+
+    @property
+    def nb_invalid(self) -> int:
+        return self._nb_invalid
+
+    def run(self, first: int = 0, last: int = 0) -> N2KStatistics:
+        """
+        load the file and analyse the records between first and last (0 for the end of file)
+        """
+        self._logfile.load_file()
+        if self._logfile.file_type == "SocketCANInterface":
+            process = self.process_can_frame
+        elif self._logfile.file_type == "ShipModulInterface":
+            process = self.process_shipmodul_frame
+        else:
+            _logger.error(f"Log analysis => file type {self._logfile.file_type} not supported")
+            raise ValueError
+        for record in self._logfile.records(first, last):
+            try:
+                msg = process(record.message)
+            except IncompleteMessage:
+                continue
+            except (NMEAInvalidFrame, FastPacketException, ValueError):
+                self._nb_invalid += 1
+                continue
+            if msg.type == N2K_MSG:
+                self._n2k_stats.add_entry(msg.msg, record.timestamp.timestamp())
+            elif msg.type == N0183_MSG:
+                self._n183_stats.add_msg(msg)
+        return self._n2k_stats
+
+    def process_can_frame(self, frame: str) -> NavGenericMsg:
+        can_id = int(frame[:8], 16)
+        data = bytearray.fromhex(frame[9:])
+        pgn, da = PGNDef.pgn_pdu1_adjust((can_id >> 8) & 0x1FFFF)
+        sa = can_id & 0xFF
+        prio = (can_id >> 26) & 0x7
+        try:
+            fast_packet = PGNDef.fast_packet_check(pgn)
+        except N2KUnknownPGN:
+            # unknown PGN in the mixed range, analysed as single frame
+            fast_packet = False
+        if fast_packet or self._fast_packet_handler.is_pgn_active(pgn, sa, data):
+            data = self._fast_packet_handler.process_frame(pgn, sa, data)
+            if data is None:
+                raise IncompleteMessage
+        return NavGenericMsg(N2K_MSG, msg=NMEA2000Msg(pgn, prio, sa, da, data))
+
+    def process_shipmodul_frame(self, frame: bytes) -> NavGenericMsg:
+        msg0183 = NMEA0183Msg(frame)
+        if msg0183.address() == b'PDGY':
+            return fromProprietaryNmea(msg0183)
+        elif msg0183.address() == b'MXPGN':
+            return ShipModulInterface.mxpgn_decode(self, msg0183)
+        return msg0183
+
+    def print_analysis(self):
+        self._n183_stats.print_entries()
+        self._n2k_stats.print_entries()
+        if self._nb_invalid > 0:
+            print("Invalid records:%d" % self._nb_invalid)
@@ -207,7 +207,7 @@ class RawLogCoupler(Coupler):
 
     def process_n2k(self, message):
         msg0183 = self.process_shipmodul_frame(message.message)
-        if msg0183.proprietary():
+        if msg0183.address() == b'PDGY':
             return fromProprietaryNmea(msg0183)
         elif msg0183.address() == b'MXPGN':
             msg = ShipModulInterface.mxpgn_decode(self, msg0183)
@@ -241,6 +241,15 @@ class RawLogFile:
 
             yield record.message
 
+    def records(self, first=0, last=0):
+        """
+        iterate over the records without the original timing (analysis)
+        """
+        if last == 0:
+            last = self._nb_record
+        for index in range(first, last):
+            yield self._records[index]
+
     def prepare_read(self, first=0):
         self._index = first
         self.set_references()
@@ -128,3 +128,67 @@ class ConsoleClient(ServiceClient):
 
 
 
+
+    def get_latency(self, cmd=None, stage=None):
+        """
+        Read the latency histograms, cmd can be 'enable', 'disable' or 'reset'
+        """
+        req = Request()
+        if cmd is not None:
+            req.cmd = cmd
+        if stage is not None:
+            req.target = stage
+        return self._server_call(self._stub.GetLatency, req, None)
+
+    def sampling_profiler(self, cmd=None, thread=None, rate=None):
+        """
+        Control the sampling profiler, cmd can be 'start', 'stop', 'reset' or 'dump' (default)
+        return the ProfilerReport, the stacks are returned on dump only
+        """
+        req = Request()
+        if cmd is not None:
+            req.cmd = cmd
+        if thread is not None:
+            req.target = thread
+        if rate is not None:
+            dict_to_protob({'rate': float(rate)}, req.kwargs)
+        return self._server_call(self._stub.SamplingProfiler, req, None)
+
+    @staticmethod
+    def folded_lines(report) -> list:
+        """
+        return the stacks of a ProfilerReport as lines in folded format (thread;func;func count)
+        """
+        return [f"{s.thread};{s.stack} {s.count}" for s in report.stacks]
+
+    def get_arbitration(self, cmd=None, group=None):
+        """
+        Read the source arbitration groups and failover events, cmd can be 'clear_events'
+        """
+        req = Request()
+        if cmd is not None:
+            req.cmd = cmd
+        if group is not None:
+            req.target = group
+        return self._server_call(self._stub.GetArbitration, req, None)
+
+    def get_traffic_analysis(self, publisher, cmd=None):
+        """
+        Read the traffic analysis of a N2KStatisticPublisher, cmd can be 'reset' or 'write_csv'
+        """
+        req = Request()
+        req.target = publisher
+        if cmd is not None:
+            req.cmd = cmd
+        return self._server_call(self._stub.GetTrafficAnalysis, req, None)
+
+    def reload_configuration(self, settings_file=None):
+        """
+        Request the server to apply the settings file, the current one if None
+        return the global status and the list of ReloadObjectResult
+        """
+        req = Request()
+        if settings_file is not None:
+            req.target = settings_file
+        response = self._server_call(self._stub.ReloadConfiguration, req, None)
+        return response.status, list(response.results)
@@ -11,10 +11,9 @@
 import logging
 from collections import namedtuple
 
-from navigation_server.router_common import CANGrpcStreamReader, NavThread
-from navigation_server.router_core import NMEA2000Msg
+from navigation_server.router_common import NavThread
+from navigation_server.router_core import CANGrpcStreamReader
 from navigation_server.nmea2000 import get_n2k_decoded_object
-from navigation_server.generated.nmea2000_pb2 import nmea2000pb
 
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
@@ -83,14 +82,15 @@ class NavigationDataService(NavThread):
             if self._input_stream.start_stream_to_callback(self.process_can_protobuf):
                 self._input_stream.wait_for_stream()
 
-    def process_can_protobuf(self, pb_msg:nmea2000pb):
+    def process_can_protobuf(self, stream_msg):
+        # stream_msg is a nmea2000pb or a NMEA2000Msg if the local (shared memory) transport is used
         try:
-            vector = self._dispatch_table[pb_msg.pgn].vector
+            vector = self._dispatch_table[stream_msg.pgn].vector
         except KeyError:
-            _logger.debug("NavigationDataService no processing vector for PGN %d" % pb_msg.pgn)
+            _logger.debug("NavigationDataService no processing vector for PGN %d" % stream_msg.pgn)
             return
         # now convert to actual decoded PGN object
-        n2k_msg = NMEA2000Msg(pgn=pb_msg.pgn, protobuf=pb_msg)
+        n2k_msg = self._input_stream.n2k_message(stream_msg)
         decoded_msg = get_n2k_decoded_object(n2k_msg)
         try:
             vector(decoded_msg)
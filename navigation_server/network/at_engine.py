@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------------
+# Name:        at_engine
+# Purpose:     Asynchronous AT command engine with unsolicited result codes dispatch
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+# -------------------------------------------------------------------------------
+
+import logging
+import queue
+import re
+import threading
+import time
+
+modem_log = logging.getLogger('ShipDataServer.' + __name__)
+
+FINAL_ERRORS = ('ERROR', 'NO CARRIER', 'NO DIALTONE', 'BUSY', 'NO ANSWER')
+ERROR_PREFIXES = ('+CME ERROR', '+CMS ERROR')
+#
+#   Unsolicited result codes recognized by default (3GPP 27.005/27.007 and Quectel)
+#   A line starting with one of these prefixes is a URC unless it is the response expected by the running command
+#
+DEFAULT_URC = ('RING', 'RDY', 'POWERED DOWN', '+CREG', '+CGREG', '+CEREG', '+CMTI', '+CMT', '+CDS', '+CPIN',
+               '+CFUN', '+CUSD', '+CTZV', '+CTZE', '+QIND', '+QUSIM', '+QGPSURC', '+QSTAT', '+QNITZ')
+SMS_PROMPT = b'> '
+SMS_END = '\x1a'
+
+_response_prefix = re.compile(r'^([+$%#&][A-Z0-9]+)')
+
+
+class ATCommand:
+    """
+    One command in the engine queue, command is given without the 'AT' prefix
+    lines: information lines of the response, including the +CME/+CMS error line
+    final: final result code
+    payload: text sent after the '> ' prompt (SMS) terminated by Ctrl-Z
+    """
+    (PENDING, RUNNING, DONE, ERROR, TIMEOUT, CANCELLED) = range(6)
+
+    def __init__(self, command: str, timeout: float, payload: str = None):
+        self.command = command
+        self.timeout = timeout
+        self.payload = payload
+        self.payload_sent = False
+        self.lines = []
+        self.final = None
+        self.state = self.PENDING
+        self.start_time = 0.0
+        self.end_time = 0.0
+        prefix = _response_prefix.match(command)
+        # information lines of a '+CREG?' command start with '+CREG'
+        self.prefix = prefix.group(1) if prefix is not None else None
+        self._done = threading.Event()
+
+    def finish(self, state: int, final: str = None):
+        self.state = state
+        self.final = final
+        self.end_time = time.monotonic()
+        self._done.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def ok(self) -> bool:
+        return self.state == self.DONE
+
+    @property
+    def duration(self) -> float:
+        return self.end_time - self.start_time
+
+    def __str__(self):
+        return f"AT{self.command}"
+
+
+class ATEngine:
+    """
+    AT command engine on a serial port (pyserial interface: read, write, flush, in_waiting, timeout)
+    The port timeout shall be short (0.1s), it sets the reaction time of the reader to stop()
+    - submit() queues a command and returns immediately, the commands are sent one at a time by the sender thread
+      and each has its own timeout
+    - the reader thread reads the port, correlates the lines with the running command and its final result code,
+      and dispatches the unsolicited result codes (URC) to the subscribers
+    The URC callbacks, callback(prefix, line, timestamp), run in the reader thread: they can submit() commands but
+    shall not wait for them
+    trace: optional function(direction, text) with direction '>' for the modem input and '<' for its output
+    """
+
+    def __init__(self, port, trace=None, default_timeout: float = 10.0):
+        self._port = port
+        self._trace = trace
+        self._default_timeout = default_timeout
+        self._queue = queue.Queue()
+        self._current = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._subscribers = {}
+        self._urc_prefixes = set(DEFAULT_URC)
+        self._stop_flag = False
+        self._reader = None
+        self._sender = None
+        self.nb_commands = 0
+        self.nb_timeouts = 0
+        self.nb_urc = 0
+        self.nb_unexpected = 0
+
+    def start(self):
+        self._stop_flag = False
+        self._reader = threading.Thread(target=self._read_loop, name="ATReader", daemon=True)
+        self._sender = threading.Thread(target=self._send_loop, name="ATSender", daemon=True)
+        self._reader.start()
+        self._sender.start()
+
+    def stop(self):
+        with self._lock:
+            self._stop_flag = True
+            current = self._current
+            self._current = None
+        if current is not None:
+            current.finish(ATCommand.CANCELLED)
+        self._queue.put(None)
+        for thread in (self._sender, self._reader):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(2.0)
+        # commands still in the queue
+        while True:
+            try:
+                command = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if command is not None:
+                command.finish(ATCommand.CANCELLED)
+
+    @property
+    def running(self) -> bool:
+        return self._reader is not None and self._reader.is_alive()
+
+    def subscribe(self, prefix: str, callback):
+        """
+        callback for the URC starting with prefix ('*' for all URC including the unknown lines)
+        the prefix is added to the URC table
+        """
+        with self._lock:
+            if prefix != '*':
+                self._urc_prefixes.add(prefix)
+            self._subscribers[prefix] = self._subscribers.get(prefix, []) + [callback]
+
+    def unsubscribe(self, prefix: str, callback):
+        with self._lock:
+            self._subscribers[prefix] = [c for c in self._subscribers.get(prefix, []) if c is not callback]
+
+    def submit(self, command: str, timeout: float = None, payload: str = None) -> ATCommand:
+        at_command = ATCommand(command, timeout if timeout is not None else self._default_timeout, payload)
+        with self._lock:
+            if self._stop_flag:
+                at_command.finish(ATCommand.CANCELLED)
+            else:
+                self._queue.put(at_command)
+        return at_command
+
+    def command(self, command: str, timeout: float = None, payload: str = None) -> ATCommand:
+        """
+        submit the command and wait for its end (result, timeout or cancellation)
+        """
+        if threading.current_thread() is self._reader:
+            raise RuntimeError("AT command cannot be waited from a URC callback")
+        at_command = self.submit(command, timeout, payload)
+        at_command.wait()
+        return at_command
+
+    def _write(self, text: str):
+        if self._trace is not None:
+            self._trace('>', text)
+        with self._write_lock:
+            self._port.write(text.encode())
+            self._port.flush()
+
+    def _send_loop(self):
+        while not self._stop_flag:
+            command = self._queue.get()
+            if command is None:
+                break
+            with self._lock:
+                if self._stop_flag:
+                    command.finish(ATCommand.CANCELLED)
+                    break
+                self._current = command
+            command.state = ATCommand.RUNNING
+            command.start_time = time.monotonic()
+            self.nb_commands += 1
+            try:
+                self._write(f"AT{command.command}\r")
+            except Exception as err:
+                modem_log.error(f"AT engine write error {err} command:{command}")
+                with self._lock:
+                    self._current = None
+                command.finish(ATCommand.ERROR, str(err))
+                continue
+            if not command.wait(command.timeout):
+                with self._lock:
+                    if self._current is command:
+                        self._current = None
+                        timeout = True
+                    else:
+                        timeout = False
+                if timeout:
+                    self.nb_timeouts += 1
+                    modem_log.error(f"AT engine no result for {command} within {command.timeout}s")
+                    command.finish(ATCommand.TIMEOUT)
+
+    def _read_loop(self):
+        buffer = bytearray()
+        while not self._stop_flag:
+            try:
+                data = self._port.read(max(1, self._port.in_waiting))
+            except Exception as err:
+                modem_log.error(f"AT engine read error {err}")
+                break
+            if not data:
+                continue
+            buffer += data
+            timestamp = time.time()
+            while True:
+                end = buffer.find(b'\n')
+                if end < 0:
+                    break
+                line = buffer[:end].strip(b'\r').decode(errors='replace')
+                del buffer[:end + 1]
+                if line:
+                    self._line(line, timestamp)
+            current = self._current
+            if current is not None and current.payload is not None and not current.payload_sent and \
+                    buffer.lstrip(b'\r').startswith(SMS_PROMPT):
+                # the prompt is not followed by an end of line
+                current.payload_sent = True
+                del buffer[:]
+                try:
+                    self._write(current.payload + SMS_END)
+                except Exception as err:
+                    modem_log.error(f"AT engine write error {err} payload for:{current}")
+
+    def _is_urc(self, line: str) -> str:
+        """
+        return the URC prefix or None
+        """
+        prefix = line.split(':', 1)[0] if line[0] == '+' else line
+        return prefix if prefix in self._urc_prefixes else None
+
+    def _line(self, line: str, timestamp: float):
+        if self._trace is not None:
+            self._trace('<', line)
+        with self._lock:
+            command = self._current
+            if command is not None:
+                if line == 'OK':
+                    self._current = None
+                    command.finish(ATCommand.DONE, line)
+                    return
+                if line in FINAL_ERRORS:
+                    self._current = None
+                    command.finish(ATCommand.ERROR, line)
+                    return
+                if line.startswith(ERROR_PREFIXES):
+                    self._current = None
+                    command.lines.append(line)
+                    command.finish(ATCommand.ERROR, line)
+                    return
+        urc = self._is_urc(line)
+        if command is not None:
+            if line == f"AT{command.command}":
+                # echo
+                return
+            if urc is None or (command.prefix is not None and line.startswith(command.prefix)):
+                command.lines.append(line)
+                return
+        elif urc is None and (line == 'OK' or line in FINAL_ERRORS or line.startswith(ERROR_PREFIXES)):
+            # result of a command in timeout
+            self.nb_unexpected += 1
+            modem_log.warning(f"AT engine result without command: {line}")
+            return
+        self._dispatch(urc, line, timestamp)
+
+    def _dispatch(self, prefix, line: str, timestamp: float):
+        self.nb_urc += 1
+        callbacks = self._subscribers.get(prefix, []) if prefix is not None else []
+        callbacks = callbacks + self._subscribers.get('*', [])
+        if not callbacks:
+            modem_log.debug(f"AT engine URC without subscriber: {line}")
+        for callback in callbacks:
+            try:
+                callback(prefix, line, timestamp)
+            except Exception as err:
+                modem_log.error(f"AT engine URC {line} callback error: {err}")
@@ -27,11 +27,19 @@ def mmcli_request(command: list) -> dict:
         return None
 
 class ModemControl:
+    """
+    Modems detection through mmcli
+    With a NetworkStateCache (state), the modems are the ModemState objects of the cache (same attributes)
+    """
 
-    def __init__(self):
+    def __init__(self, state=None):
+        self._state = state
         self._modems = []
 
     def detect(self):
+        if self._state is not None:
+            self._modems = self._state.modems()
+            return
         result = mmcli_request(['-L'])
         modems = result['modem-list']
 
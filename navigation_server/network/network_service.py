@@ -9,17 +9,25 @@
 #-------------------------------------------------------------------------------
 
 import logging
+import threading
 import yaml
 import os.path
+from collections import deque
 
 _logger = logging.getLogger('ShipDataServer.' + __name__)
 
-from navigation_server.router_common import GrpcService, GrpcServerError, get_global_var
+from navigation_server.router_common import (GrpcService, GrpcServerError, get_global_var, open_dbus_connection,
+                                             DBusException)
 from navigation_server.network.nmcli_interface import NetworkManagerControl, NetworkManagerError
+from navigation_server.network.network_state import (NetworkStateCache, NetworkStateListener, CONNECTIVITY_EVENT,
+                                                     DEVICE_EVENT, MODEM_EVENT, SIGNAL_EVENT)
+from navigation_server.network.usb_modem_at_lib import ModemException
+from navigation_server.network.quectel_modem import QuectelModem
 
 from navigation_server.generated.network_pb2_grpc import NetworkServiceServicer, add_NetworkServiceServicer_to_server
 from navigation_server.generated.network_pb2 import (NetInterface, NetConnection, NetworkCommand, NetworkStatus,
-                                                    NetworkReply, InterfaceStatus, DeviceType)
+                                                    NetworkReply, InterfaceStatus, DeviceType, ModemEvent,
+                                                    NetworkEvent)
 
 
 (NOT_CONNECTED, LAN_CONTROLLER, WAN_INTERFACE, LAN_INTERFACE) = range(4)
@@ -110,6 +118,34 @@ class NetworkInterfaceConnection:
         return self._name
 
 
+class ModemEventListener:
+    """
+    Events queue for one gRPC stream, the oldest events are dropped when the client is too slow
+    """
+
+    def __init__(self, max_events: int = 64):
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def notify(self, modem_event):
+        with self._lock:
+            self._events.append(modem_event)
+            self._event.set()
+
+    def get_changes(self, timeout: float = None) -> list:
+        """
+        wait for events and return them, empty on timeout
+        """
+        if not self._event.wait(timeout):
+            return []
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+            self._event.clear()
+        return events
+
+
 class NetworkServicerImpl(NetworkServiceServicer):
 
     def __init__(self, service):
@@ -122,6 +158,7 @@ class NetworkServicerImpl(NetworkServiceServicer):
         resp.id = self._id
         self._id += 1
         resp.nm_running = self._service.network_manager.nm_running
+        state = self._service.state
         for iface in self._service.interfaces():
             interface = NetInterface()
             interface.name = iface.name
@@ -131,9 +168,83 @@ class NetworkServicerImpl(NetworkServiceServicer):
                 interface.device_name = "Not available"
             else:
                 interface.device_name = iface.device
+            if state is not None:
+                try:
+                    device = state.device(iface.device)
+                    interface.state = device.state
+                    interface.ip_address = device.ip4_address
+                except KeyError:
+                    interface.state = 'unavailable'
+            else:
+                interface.state = iface.state
             resp.if_list.append(interface)
+        if state is not None:
+            resp.nm_running = state.nm_running
+            resp.connectivity = state.connectivity
+            resp.nm_state = state.nm_state
+            resp.primary_connection = state.primary_connection
+            for modem in state.modems():
+                self._fill_modem(modem, resp.modems.add())
         return resp
 
+    @staticmethod
+    def _fill_modem(modem, msg):
+        msg.index = modem.index
+        msg.manufacturer = modem.manufacturer
+        msg.model = modem.model
+        msg.imei = modem.imei
+        msg.state = modem.state
+        msg.registration = modem.registration
+        msg.operator_name = modem.operator_name
+        msg.operator_code = modem.operator_code
+        msg.access_technologies = modem.access_technologies
+        msg.signal_quality = modem.signal_quality
+        if modem.sim is not None:
+            msg.imsi = modem.sim.imsi
+            msg.iccid = modem.sim.iccid
+
+    def _network_event(self, event: str, name: str) -> NetworkEvent:
+        state = self._service.state
+        msg = NetworkEvent()
+        msg.id = self._id
+        self._id += 1
+        msg.event = event
+        msg.name = name
+        parameters = {}
+        if event == CONNECTIVITY_EVENT:
+            msg.state = state.connectivity if state.nm_running else 'unknown'
+            parameters = {'nm_running': str(state.nm_running), 'nm_state': state.nm_state,
+                          'primary_connection': state.primary_connection}
+        elif event == DEVICE_EVENT:
+            try:
+                device = state.device(name)
+            except KeyError:
+                msg.state = 'removed'
+            else:
+                msg.state = device.state
+                parameters = {'type': device.type, 'connection': device.connection, 'ip_address': device.ip4_address}
+                msg.timestamp = device.timestamp
+        else:
+            try:
+                modem = state.modem(int(name))
+            except KeyError:
+                msg.state = 'removed'
+            else:
+                msg.timestamp = modem.timestamp
+                if event == SIGNAL_EVENT:
+                    msg.state = str(modem.signal_quality)
+                    parameters = {'recent': str(modem.signal_recent),
+                                  'access_technologies': modem.access_technologies}
+                else:
+                    msg.state = modem.state
+                    parameters = {'registration': modem.registration, 'operator_name': modem.operator_name,
+                                  'operator_code': modem.operator_code, 'imsi': modem.sim.imsi if modem.sim else ''}
+        for p_name, value in parameters.items():
+            param = msg.parameters.add()
+            param.name = p_name
+            param.value = value
+        return msg
+
     def set_global_configuration(self, request, context):
         _logger.debug(f'set_global_configuration: request={request}')
         resp = NetworkStatus()
@@ -149,12 +260,82 @@ class NetworkServicerImpl(NetworkServiceServicer):
         resp = NetworkReply()
         return resp
 
+    def stream_modem_events(self, request, context):
+        """
+        Stream of the modem events (registration, SIM, SMS, signal, power and other URC)
+        request.cmd can filter on one event type
+        """
+        listener = ModemEventListener()
+        self._service.add_modem_listener(listener)
+        _logger.info("NetworkService start streaming modem events to %s" % context.peer())
+        try:
+            while context.is_active():
+                for modem_event in listener.get_changes(1.0):
+                    if request.cmd and request.cmd != modem_event.event:
+                        continue
+                    resp = ModemEvent()
+                    resp.id = self._id
+                    self._id += 1
+                    resp.modem = modem_event.modem
+                    resp.event = modem_event.event
+                    resp.value = modem_event.value
+                    for name, value in modem_event.parameters.items():
+                        param = resp.parameters.add()
+                        param.name = name
+                        param.value = value
+                    resp.timestamp = modem_event.timestamp
+                    yield resp
+        finally:
+            self._service.remove_modem_listener(listener)
+            _logger.info("NetworkService end of modem events streaming to %s" % context.peer())
+
+    def stream_network_state(self, request, context):
+        """
+        Stream of the connectivity, devices, modems and signal quality changes, starting with the current state
+        request.cmd can filter on one event type
+        """
+        state = self._service.state
+        if state is None:
+            return
+        listener = NetworkStateListener()
+        state.add_listener(listener)
+        _logger.info("NetworkService start streaming network state to %s" % context.peer())
+        try:
+            changes = [(CONNECTIVITY_EVENT, 'NetworkManager')]
+            changes.extend((DEVICE_EVENT, device.name) for device in state.devices())
+            for modem in state.modems():
+                changes.extend([(MODEM_EVENT, str(modem.index)), (SIGNAL_EVENT, str(modem.index))])
+            while context.is_active():
+                for event, name in changes:
+                    if request.cmd and request.cmd != event:
+                        continue
+                    yield self._network_event(event, name)
+                changes = listener.get_changes(1.0)
+        finally:
+            state.remove_listener(listener)
+            _logger.info("NetworkService end of network state streaming to %s" % context.peer())
+
 
 class NetworkService(GrpcService):
+    """
+    Network interfaces control
+        configuration: network configuration file in the settings directory
+        state_source: dbus (default) the NetworkManager and ModemManager state is cached and followed by signals,
+                      nmcli the state is read by nmcli at start
+        bus: D-Bus to reach NetworkManager and ModemManager, SYSTEM (default) or a bus address
+        modem, modem_dir: modem controlled through its AT interface
+    """
 
     def __init__(self, opts):
         super().__init__(opts)
         self._configuration_file = opts.get('configuration', str, 'network_conf.yml')
+        self._state_source = opts.get_choice('state_source', ('dbus', 'nmcli'), 'dbus')
+        self._bus = opts.get('bus', str, 'SYSTEM')
+        self._state = None
+        self._modem_num = opts.get('modem', int, None)
+        self._modem_dir = opts.get('modem_dir', str, None)
+        self._modem = None
+        self._modem_listeners = []
         self._network_manager = NetworkManagerControl()
         self._servicer = None
         self._configuration = None
@@ -170,6 +351,59 @@ class NetworkService(GrpcService):
     def interfaces(self):
         return self._interfaces.values()
 
+    @property
+    def state(self) -> NetworkStateCache:
+        return self._state
+
+    def open_state(self):
+        if self._state_source != 'dbus':
+            return
+        try:
+            connection = open_dbus_connection(self._bus)
+        except DBusException as err:
+            _logger.error(f"NetworkService no D-Bus access ({err}), using nmcli")
+            return
+        self._state = NetworkStateCache(connection)
+        self._state.start()
+        self._network_manager = NetworkManagerControl(self._state)
+
+    @property
+    def modem(self):
+        return self._modem
+
+    def add_modem_listener(self, listener):
+        self._modem_listeners.append(listener)
+
+    def remove_modem_listener(self, listener):
+        self._modem_listeners = [l for l in self._modem_listeners if l is not listener]
+
+    def _modem_event(self, modem_event):
+        for listener in self._modem_listeners:
+            listener.notify(modem_event)
+
+    def open_modem(self):
+        if self._modem_num is None:
+            return
+        try:
+            self._modem = QuectelModem(self._modem_num, filepath=self._modem_dir)
+        except (ModemException, OSError, ValueError) as err:
+            _logger.error(f"NetworkService cannot open modem{self._modem_num}: {err}")
+            self._modem = None
+            return
+        self._modem.add_event_listener(self._modem_event)
+        self._modem.networkStatus()
+        _logger.info(f"NetworkService modem{self._modem_num} {self._modem.model()} registration:{self._modem.regStatus()}")
+
+    def stop_service(self):
+        if self._modem is not None:
+            self._modem.close()
+            self._modem = None
+        if self._state is not None:
+            self._state.close()
+            self._state.connection.close()
+            self._state = None
+        super().stop_service()
+
     def finalize(self):
         try:
             super().finalize()
@@ -178,6 +412,8 @@ class NetworkService(GrpcService):
         _logger.info("Adding service %s to server" % self._name)
         self._servicer = NetworkServicerImpl(self)
         add_NetworkServiceServicer_to_server(self._servicer, self.grpc_server)
+        self.open_modem()
+        self.open_state()
         # now we get the current situation from NetworkManager
         try:
             self._network_manager.check_network_manager(wait=True)
@@ -0,0 +1,638 @@
+#-------------------------------------------------------------------------------
+# Name:        network_state.py
+# Purpose:     NetworkManager and ModemManager state cache updated by the D-Bus signals
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import threading
+import time
+
+from navigation_server.router_common import DBusConnection, DBusException
+from navigation_server.router_common.dbus_client import unwrap_variants
+from .nmcli_interface import NetworkConnection
+
+_logger = logging.getLogger('ShipDataServer.' + __name__)
+
+NM_SERVICE = 'org.freedesktop.NetworkManager'
+NM_PATH = '/org/freedesktop/NetworkManager'
+NM_INTERFACE = 'org.freedesktop.NetworkManager'
+DEVICE_INTERFACE = 'org.freedesktop.NetworkManager.Device'
+ACTIVE_CONNECTION_INTERFACE = 'org.freedesktop.NetworkManager.Connection.Active'
+IP4CONFIG_INTERFACE = 'org.freedesktop.NetworkManager.IP4Config'
+SETTINGS_PATH = '/org/freedesktop/NetworkManager/Settings'
+SETTINGS_INTERFACE = 'org.freedesktop.NetworkManager.Settings'
+SETTINGS_CONNECTION_INTERFACE = 'org.freedesktop.NetworkManager.Settings.Connection'
+
+MM_SERVICE = 'org.freedesktop.ModemManager1'
+MM_PATH = '/org/freedesktop/ModemManager1'
+MODEM_INTERFACE = 'org.freedesktop.ModemManager1.Modem'
+MODEM_3GPP_INTERFACE = 'org.freedesktop.ModemManager1.Modem.Modem3gpp'
+SIM_INTERFACE = 'org.freedesktop.ModemManager1.Sim'
+OBJECT_MANAGER_INTERFACE = 'org.freedesktop.DBus.ObjectManager'
+
+BUS_SERVICE = 'org.freedesktop.DBus'
+BUS_PATH = '/org/freedesktop/DBus'
+NO_OBJECT = '/'
+
+#
+#   NetworkManager and ModemManager enumerations, translated into the nmcli/mmcli wording
+#
+nm_states = {0: 'unknown', 10: 'asleep', 20: 'disconnected', 30: 'disconnecting', 40: 'connecting',
+             50: 'connected (local only)', 60: 'connected (site only)', 70: 'connected'}
+nm_connectivity = {0: 'unknown', 1: 'none', 2: 'portal', 3: 'limited', 4: 'full'}
+device_types = {1: 'ethernet', 2: 'wifi', 8: 'gsm', 13: 'bridge', 14: 'generic', 16: 'tun', 30: 'wifi-p2p',
+                32: 'loopback'}
+device_states = {0: 'unknown', 10: 'unmanaged', 20: 'unavailable', 30: 'disconnected',
+                 40: 'connecting (prepare)', 50: 'connecting (configuring)', 60: 'connecting (need authentication)',
+                 70: 'connecting (getting IP configuration)', 80: 'connecting (checking IP connectivity)',
+                 90: 'connecting (starting secondary connections)', 100: 'connected', 110: 'deactivating',
+                 120: 'failed'}
+modem_states = {-1: 'failed', 0: 'unknown', 1: 'initializing', 2: 'locked', 3: 'disabled', 4: 'disabling',
+                5: 'enabling', 6: 'enabled', 7: 'searching', 8: 'registered', 9: 'disconnecting', 10: 'connecting',
+                11: 'connected'}
+registration_states = {0: 'idle', 1: 'home', 2: 'searching', 3: 'denied', 4: 'unknown', 5: 'roaming',
+                       6: 'home-sms-only', 7: 'roaming-sms-only', 8: 'emergency-only', 9: 'home-csfb-not-preferred',
+                       10: 'roaming-csfb-not-preferred', 11: 'attached-rlos'}
+access_technologies = {1 << 1: 'gsm', 1 << 2: 'gsm-compact', 1 << 3: 'gprs', 1 << 4: 'edge', 1 << 5: 'umts',
+                       1 << 6: 'hsdpa', 1 << 7: 'hsupa', 1 << 8: 'hspa', 1 << 9: 'hspa-plus', 1 << 14: 'lte',
+                       1 << 15: '5gnr'}
+
+#   change notifications
+(CONNECTIVITY_EVENT, DEVICE_EVENT, MODEM_EVENT, SIGNAL_EVENT) = ('connectivity', 'device', 'modem', 'signal')
+
+
+def decode_access_technologies(mask: int) -> str:
+    names = [name for bit, name in access_technologies.items() if mask & bit]
+    return ', '.join(names) if names else 'unknown'
+
+
+class NMDevice:
+    """
+    Network device as seen by NetworkManager, same attributes as NetworkDevice (name, type, state, connection)
+    connection is the name of the active connection, empty when not connected
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = ''
+        self.type = 'unknown'
+        self.state_code = 0
+        self.active_connection = NO_OBJECT
+        self.connection = ''
+        self.ip4_config = NO_OBJECT
+        self.ip4_address = ''
+        self.timestamp = 0.0
+
+    @property
+    def state(self) -> str:
+        return device_states.get(self.state_code, 'unknown')
+
+    @property
+    def connected(self) -> bool:
+        return self.state_code == 100
+
+    def update(self, properties: dict):
+        if 'Interface' in properties:
+            self.name = properties['Interface']
+        if 'DeviceType' in properties:
+            self.type = device_types.get(properties['DeviceType'], 'unknown')
+        if 'State' in properties:
+            self.state_code = properties['State']
+        self.timestamp = time.time()
+
+    def __str__(self):
+        return f"{self.name} {self.type} {self.state} {self.connection}"
+
+
+class SimState:
+
+    def __init__(self, path: str, properties: dict):
+        self.path = path
+        self.imsi = properties.get('Imsi', '')
+        self.iccid = properties.get('SimIdentifier', '')
+        self.operator_name = properties.get('OperatorName', '')
+        self.operator_id = properties.get('OperatorIdentifier', '')
+
+
+class ModemState:
+    """
+    Modem as seen by ModemManager, index is the mmcli modem number
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index = int(path.rsplit('/', 1)[1])
+        self._modem = {}
+        self._3gpp = {}
+        self.sim = None
+        self.timestamp = 0.0
+
+    @property
+    def manufacturer(self) -> str:
+        return self._modem.get('Manufacturer', '')
+
+    @property
+    def model(self) -> str:
+        return self._modem.get('Model', '')
+
+    @property
+    def revision(self) -> str:
+        return self._modem.get('Revision', '')
+
+    @property
+    def imei(self) -> str:
+        return self._3gpp.get('Imei', self._modem.get('EquipmentIdentifier', ''))
+
+    @property
+    def state(self) -> str:
+        return modem_states.get(self._modem.get('State', 0), 'unknown')
+
+    @property
+    def signal_quality(self) -> int:
+        """
+        signal quality in percent
+        """
+        return self._modem.get('SignalQuality', (0, False))[0]
+
+    @property
+    def signal_recent(self) -> bool:
+        return self._modem.get('SignalQuality', (0, False))[1]
+
+    @property
+    def access_technologies(self) -> str:
+        return decode_access_technologies(self._modem.get('AccessTechnologies', 0))
+
+    @property
+    def registration(self) -> str:
+        return registration_states.get(self._3gpp.get('RegistrationState', 4), 'unknown')
+
+    @property
+    def operator_code(self) -> str:
+        return self._3gpp.get('OperatorCode', '')
+
+    @property
+    def operator_name(self) -> str:
+        return self._3gpp.get('OperatorName', '')
+
+    @property
+    def sim_path(self) -> str:
+        return self._modem.get('Sim', NO_OBJECT)
+
+    @property
+    def active_sim(self) -> SimState:
+        return self.sim
+
+    def update(self, interface: str, properties: dict) -> str:
+        """
+        return the change notified: SIGNAL_EVENT when only the signal quality changed, MODEM_EVENT otherwise
+        or None for an interface that is not followed
+        """
+        if interface == MODEM_INTERFACE:
+            self._modem.update(properties)
+        elif interface == MODEM_3GPP_INTERFACE:
+            self._3gpp.update(properties)
+        else:
+            return None
+        self.timestamp = time.time()
+        if interface == MODEM_INTERFACE and set(properties.keys()) <= {'SignalQuality', 'AccessTechnologies'}:
+            return SIGNAL_EVENT
+        return MODEM_EVENT
+
+
+class NetworkStateListener:
+    """
+    Receives the (event, name) of the objects that changed, at most one pending notification per object
+    event is connectivity, device, modem or signal
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def notify(self, event: str, name: str):
+        with self._lock:
+            self._pending[(event, name)] = True
+            self._event.set()
+
+    def get_changes(self, timeout: float = None) -> list:
+        """
+        wait for changes and return the list of (event, name), empty on timeout
+        """
+        if not self._event.wait(timeout):
+            return []
+        with self._lock:
+            changes = list(self._pending.keys())
+            self._pending = {}
+            self._event.clear()
+        return changes
+
+
+class NetworkStateCache:
+    """
+    In memory model of the NetworkManager devices and connections and of the ModemManager modems and SIM
+    The model is read once by start() and then updated by the signals (PropertiesChanged, DeviceAdded/Removed,
+    NewConnection/ConnectionRemoved, InterfacesAdded/Removed and NameOwnerChanged when a daemon restarts)
+    All the read methods are served from memory, the signal callbacks run in the connection dispatch thread
+    """
+
+    def __init__(self, connection: DBusConnection):
+        self._connection = connection
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._subscriptions = []
+        self._nm = {}
+        self._nm_running = False
+        self._devices = {}
+        self._active_connections = {}
+        self._ip4_configs = {}
+        self._connections = {}
+        self._mm_running = False
+        self._modems = {}
+        self._sims = {}
+        self.nb_signals = 0
+
+    @property
+    def connection(self) -> DBusConnection:
+        return self._connection
+
+    def start(self):
+        connection = self._connection
+        self._subscriptions = [
+            connection.subscribe_properties(NM_SERVICE, self._nm_properties_changed, path_namespace=NM_PATH),
+            connection.subscribe(NM_SERVICE, NM_INTERFACE, 'DeviceAdded', self._device_added, path=NM_PATH),
+            connection.subscribe(NM_SERVICE, NM_INTERFACE, 'DeviceRemoved', self._device_removed, path=NM_PATH),
+            connection.subscribe(NM_SERVICE, SETTINGS_INTERFACE, 'NewConnection', self._settings_changed,
+                                 path=SETTINGS_PATH),
+            connection.subscribe(NM_SERVICE, SETTINGS_INTERFACE, 'ConnectionRemoved', self._settings_changed,
+                                 path=SETTINGS_PATH),
+            connection.subscribe(NM_SERVICE, SETTINGS_CONNECTION_INTERFACE, 'Updated', self._settings_changed,
+                                 path_namespace=SETTINGS_PATH),
+            connection.subscribe_properties(MM_SERVICE, self._mm_properties_changed, path_namespace=MM_PATH),
+            connection.subscribe(MM_SERVICE, OBJECT_MANAGER_INTERFACE, 'InterfacesAdded', self._modem_added,
+                                 path=MM_PATH),
+            connection.subscribe(MM_SERVICE, OBJECT_MANAGER_INTERFACE, 'InterfacesRemoved', self._modem_removed,
+                                 path=MM_PATH),
+            connection.subscribe(BUS_SERVICE, BUS_SERVICE, 'NameOwnerChanged', self._name_owner_changed,
+                                 path=BUS_PATH)
+        ]
+        self.load_network_manager()
+        self.load_modem_manager()
+
+    def close(self):
+        for subscription in self._subscriptions:
+            self._connection.unsubscribe(subscription)
+        self._subscriptions = []
+
+    def add_listener(self, listener: NetworkStateListener):
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: NetworkStateListener):
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l is not listener]
+
+    def _notify(self, event: str, name: str):
+        for listener in self._listeners:
+            listener.notify(event, name)
+
+    #
+    #   NetworkManager
+    #
+    def _nm_get_all(self, path: str, interface: str) -> dict:
+        return self._connection.get_all(NM_SERVICE, path, interface)
+
+    def load_network_manager(self):
+        """
+        (re)read the full NetworkManager model
+        """
+        try:
+            nm = self._nm_get_all(NM_PATH, NM_INTERFACE)
+        except DBusException as err:
+            _logger.error(f"NetworkManager not available: {err}")
+            with self._lock:
+                self._nm_running = False
+                self._nm = {}
+                self._devices = {}
+                self._connections = {}
+            self._notify(CONNECTIVITY_EVENT, 'NetworkManager')
+            return
+        with self._lock:
+            self._nm = nm
+            self._nm_running = True
+            self._devices = {}
+            self._active_connections = {}
+            self._ip4_configs = {}
+        for path in nm.get('Devices', []):
+            self._load_device(path)
+        self._load_connections()
+        _logger.info(f"NetworkManager {nm.get('Version', '')} state {self.nm_state} connectivity {self.connectivity}"
+                     f" {len(self._devices)} devices")
+        self._notify(CONNECTIVITY_EVENT, 'NetworkManager')
+
+    def _load_device(self, path: str):
+        try:
+            properties = self._nm_get_all(path, DEVICE_INTERFACE)
+        except DBusException as err:
+            _logger.error(f"NetworkManager device {path} read error: {err}")
+            return None
+        device = NMDevice(path)
+        device.update(properties)
+        self._set_active_connection(device, properties.get('ActiveConnection', NO_OBJECT))
+        self._set_ip4_config(device, properties.get('Ip4Config', NO_OBJECT))
+        with self._lock:
+            self._devices[path] = device
+        return device
+
+    def _set_active_connection(self, device: NMDevice, path: str):
+        device.active_connection = path
+        if path == NO_OBJECT:
+            device.connection = ''
+            return
+        active = self._active_connections.get(path)
+        if active is None:
+            try:
+                active = self._nm_get_all(path, ACTIVE_CONNECTION_INTERFACE)
+            except DBusException as err:
+                _logger.error(f"NetworkManager active connection {path} read error: {err}")
+                device.connection = ''
+                return
+            self._active_connections[path] = active
+        device.connection = active.get('Id', '')
+
+    def _set_ip4_config(self, device: NMDevice, path: str):
+        device.ip4_config = path
+        if path == NO_OBJECT:
+            device.ip4_address = ''
+            return
+        config = self._ip4_configs.get(path)
+        if config is None:
+            try:
+                config = self._nm_get_all(path, IP4CONFIG_INTERFACE)
+            except DBusException as err:
+                _logger.error(f"NetworkManager IP4 configuration {path} read error: {err}")
+                device.ip4_address = ''
+                return
+            self._ip4_configs[path] = config
+        device.ip4_address = self._ip4_address(config)
+
+    @staticmethod
+    def _ip4_address(config: dict) -> str:
+        addresses = []
+        for address in config.get('AddressData', []):
+            address = unwrap_variants(address)
+            addresses.append(f"{address.get('address', '')}/{address.get('prefix', 0)}")
+        return ', '.join(addresses)
+
+    def _load_connections(self):
+        try:
+            paths = self._connection.call(NM_SERVICE, SETTINGS_PATH, SETTINGS_INTERFACE, 'ListConnections')[0]
+        except DBusException as err:
+            _logger.error(f"NetworkManager connections read error: {err}")
+            return
+        connections = {}
+        for path in paths:
+            connection = self._read_connection(path)
+            if connection is not None:
+                connections[connection.name] = connection
+        with self._lock:
+            self._connections = connections
+
+    def _read_connection(self, path: str):
+        try:
+            settings = self._connection.call(NM_SERVICE, path, SETTINGS_CONNECTION_INTERFACE, 'GetSettings')[0]
+        except DBusException as err:
+            _logger.error(f"NetworkManager connection {path} read error: {err}")
+            return None
+        connection = NetworkConnection()
+        connection.add_property('dbus.path', path)
+        for setting, values in settings.items():
+            values = unwrap_variants(values)
+            for key, value in values.items():
+                if type(value) is bytes:
+                    value = value.decode(errors='replace')
+                connection.add_property(f"{setting}.{key}", value)
+            if 'address-data' in values:
+                # same presentation as nmcli
+                addresses = self._ip4_address({'AddressData': values['address-data']})
+                connection.add_property(f"{setting}.addresses", addresses)
+        return connection
+
+    def _nm_properties_changed(self, path: str, interface: str, changed: dict, invalidated: list):
+        self.nb_signals += 1
+        if interface == NM_INTERFACE and path == NM_PATH:
+            with self._lock:
+                self._nm.update(changed)
+            if {'State', 'Connectivity', 'PrimaryConnection'} & set(changed.keys()):
+                self._notify(CONNECTIVITY_EVENT, 'NetworkManager')
+        elif interface == DEVICE_INTERFACE:
+            device = self._devices.get(path)
+            if device is None:
+                return
+            device.update(changed)
+            if 'ActiveConnection' in changed:
+                self._set_active_connection(device, changed['ActiveConnection'])
+            if 'Ip4Config' in changed:
+                self._set_ip4_config(device, changed['Ip4Config'])
+            if 'ActiveConnection' in changed or 'Ip4Config' in changed:
+                self._prune()
+            self._notify(DEVICE_EVENT, device.name)
+        elif interface == ACTIVE_CONNECTION_INTERFACE:
+            active = self._active_connections.get(path)
+            if active is not None:
+                active.update(changed)
+        elif interface == IP4CONFIG_INTERFACE:
+            config = self._ip4_configs.get(path)
+            if config is None:
+                return
+            config.update(changed)
+            for device in self.devices():
+                if device.ip4_config == path:
+                    device.ip4_address = self._ip4_address(config)
+                    self._notify(DEVICE_EVENT, device.name)
+
+    def _prune(self):
+        """
+        forget the active connections and IP configurations no longer used by a device
+        """
+        with self._lock:
+            devices = list(self._devices.values())
+            used = {device.active_connection for device in devices}
+            used.add(self._nm.get('PrimaryConnection', NO_OBJECT))
+            self._active_connections = {p: a for p, a in self._active_connections.items() if p in used}
+            used = {device.ip4_config for device in devices}
+            self._ip4_configs = {p: c for p, c in self._ip4_configs.items() if p in used}
+
+    def _device_added(self, path: str, interface: str, member: str, body: tuple):
+        self.nb_signals += 1
+        device = self._load_device(body[0])
+        if device is not None:
+            _logger.info(f"NetworkManager new device {device}")
+            self._notify(DEVICE_EVENT, device.name)
+
+    def _device_removed(self, path: str, interface: str, member: str, body: tuple):
+        self.nb_signals += 1
+        with self._lock:
+            device = self._devices.pop(body[0], None)
+        if device is not None:
+            _logger.info(f"NetworkManager device {device.name} removed")
+            self._notify(DEVICE_EVENT, device.name)
+
+    def _settings_changed(self, path: str, interface: str, member: str, body: tuple):
+        # connections are few and seldom modified, the list is read again
+        self.nb_signals += 1
+        self._load_connections()
+
+    @property
+    def nm_running(self) -> bool:
+        return self._nm_running
+
+    @property
+    def nm_state(self) -> str:
+        return nm_states.get(self._nm.get('State', 0), 'unknown')
+
+    @property
+    def connectivity(self) -> str:
+        return nm_connectivity.get(self._nm.get('Connectivity', 0), 'unknown')
+
+    @property
+    def primary_connection(self) -> str:
+        """
+        name of the connection holding the default route, empty if none
+        """
+        path = self._nm.get('PrimaryConnection', NO_OBJECT)
+        active = self._active_connections.get(path)
+        return active.get('Id', '') if active is not None else ''
+
+    def devices(self) -> list:
+        return list(self._devices.values())
+
+    def device(self, name: str) -> NMDevice:
+        """
+        device by interface name, raise KeyError
+        """
+        for device in self.devices():
+            if device.name == name:
+                return device
+        raise KeyError(name)
+
+    def connections(self) -> list:
+        return list(self._connections.values())
+
+    def connection_by_name(self, name: str) -> NetworkConnection:
+        """
+        connection by name, the connections are read again when not found, raise KeyError
+        """
+        try:
+            return self._connections[name]
+        except KeyError:
+            pass
+        self._load_connections()
+        return self._connections[name]
+
+    #
+    #   ModemManager
+    #
+    def load_modem_manager(self):
+        try:
+            objects = self._connection.call(MM_SERVICE, MM_PATH, OBJECT_MANAGER_INTERFACE, 'GetManagedObjects')[0]
+        except DBusException as err:
+            _logger.info(f"ModemManager not available: {err}")
+            with self._lock:
+                self._mm_running = False
+                self._modems = {}
+            return
+        with self._lock:
+            self._mm_running = True
+            self._modems = {}
+        for path, interfaces in objects.items():
+            self._add_modem(path, interfaces)
+        _logger.info(f"ModemManager {len(self._modems)} modems")
+
+    def _add_modem(self, path: str, interfaces: dict):
+        with self._lock:
+            modem = self._modems.get(path)
+            if modem is None:
+                modem = ModemState(path)
+                self._modems[path] = modem
+        for interface, properties in interfaces.items():
+            modem.update(interface, unwrap_variants(properties))
+        self._load_sim(modem)
+        self._notify(MODEM_EVENT, str(modem.index))
+        return modem
+
+    def _load_sim(self, modem: ModemState):
+        path = modem.sim_path
+        if path == NO_OBJECT:
+            modem.sim = None
+            return
+        if modem.sim is not None and modem.sim.path == path:
+            return
+        try:
+            modem.sim = SimState(path, self._connection.get_all(MM_SERVICE, path, SIM_INTERFACE))
+        except DBusException as err:
+            _logger.error(f"ModemManager SIM {path} read error: {err}")
+            modem.sim = None
+
+    def _mm_properties_changed(self, path: str, interface: str, changed: dict, invalidated: list):
+        self.nb_signals += 1
+        modem = self._modems.get(path)
+        if modem is None:
+            return
+        event = modem.update(interface, changed)
+        if event is None:
+            return
+        if 'Sim' in changed:
+            self._load_sim(modem)
+        self._notify(event, str(modem.index))
+
+    def _modem_added(self, path: str, interface: str, member: str, body: tuple):
+        self.nb_signals += 1
+        modem = self._add_modem(body[0], body[1])
+        _logger.info(f"ModemManager new modem {modem.index} {modem.manufacturer} {modem.model}")
+
+    def _modem_removed(self, path: str, interface: str, member: str, body: tuple):
+        self.nb_signals += 1
+        if MODEM_INTERFACE not in body[1]:
+            return
+        with self._lock:
+            modem = self._modems.pop(body[0], None)
+        if modem is not None:
+            _logger.info(f"ModemManager modem {modem.index} removed")
+            self._notify(MODEM_EVENT, str(modem.index))
+
+    def _name_owner_changed(self, path: str, interface: str, member: str, body: tuple):
+        name, old_owner, new_owner = body
+        if name == NM_SERVICE:
+            self.nb_signals += 1
+            _logger.info(f"NetworkManager {'started' if new_owner else 'stopped'}")
+            self.load_network_manager()
+        elif name == MM_SERVICE:
+            self.nb_signals += 1
+            _logger.info(f"ModemManager {'started' if new_owner else 'stopped'}")
+            removed = [str(m.index) for m in self.modems()]
+            self.load_modem_manager()
+            for index in removed:
+                self._notify(MODEM_EVENT, index)
+
+    @property
+    def mm_running(self) -> bool:
+        return self._mm_running
+
+    def modems(self) -> list:
+        return sorted(self._modems.values(), key=lambda m: m.index)
+
+    def modem(self, index: int) -> ModemState:
+        """
+        modem by ModemManager index, raise KeyError
+        """
+        for modem in self.modems():
+            if modem.index == index:
+                return modem
+        raise KeyError(index)
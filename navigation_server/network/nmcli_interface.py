@@ -81,6 +81,11 @@ class NetworkConnection:
 
 
 class NetworkManagerControl:
+    """
+    NetworkManager control through nmcli
+    With a NetworkStateCache (state), the devices and connections are read from the cache (D-Bus) and only the
+    modifications go through nmcli
+    """
 
     ethernet = {
         "WAN_INTERFACE": ['type', 'ethernet', 'ipv4.method', 'auto', 'ipv6.method', 'auto'],
@@ -88,8 +93,9 @@ class NetworkManagerControl:
         "LAN_CONTROLLER": ['type', 'ethernet', 'ipv4.method', 'shared', 'ipv6.method', 'shared'],
     }
 
-    def __init__(self):
+    def __init__(self, state=None):
 
+        self._state = state
         self._nm_running = False
         self._general_status = None
         self._devices = {}
@@ -102,6 +108,11 @@ class NetworkManagerControl:
 
     def check_network_manager(self, wait:bool = True):
         def read_status():
+            if self._state is not None:
+                if not self._state.nm_running:
+                    _logger.critical("NetworkInterface NetworkManager not running")
+                    raise NetworkManagerError("NetworkManager not running")
+                return [self._state.nm_state]
             try:
                 for reply in nmcli_request(['general', 'status']):
                    return reply
@@ -132,10 +143,16 @@ class NetworkManagerControl:
             _logger.error("NetworkInterface NetworkManager not running")
             raise NetworkManagerError("NetworkManager not running")
 
-        for d in nmcli_request(["device"]):
-            if d[1] in {'ethernet', 'wifi', 'gsm'}:
-                dev = NetworkDevice(d[0], d[1], d[2], d[3])
-                self._devices[dev.name] = dev
+        if self._state is not None:
+            # the cache devices are kept up to date by NetworkManager signals
+            for dev in self._state.devices():
+                if dev.type in {'ethernet', 'wifi', 'gsm'}:
+                    self._devices[dev.name] = dev
+        else:
+            for d in nmcli_request(["device"]):
+                if d[1] in {'ethernet', 'wifi', 'gsm'}:
+                    dev = NetworkDevice(d[0], d[1], d[2], d[3])
+                    self._devices[dev.name] = dev
 
         # now get the connections
         for device in self._devices.values():
@@ -143,9 +160,13 @@ class NetworkManagerControl:
                 self.read_connection(device.connection)
 
     def get_device(self, name):
+        if self._state is not None:
+            return self._state.device(name)
         return self._devices[name]
 
     def get_devices(self):
+        if self._state is not None:
+            return [dev for dev in self._state.devices() if dev.type in {'ethernet', 'wifi', 'gsm'}]
         return self._devices.values()
 
     def get_connections(self):
@@ -164,6 +185,9 @@ class NetworkManagerControl:
         del self._connections[name]
 
     def read_connection(self, name):
+        if self._state is not None:
+            self._connections[name] = self._state.connection_by_name(name)
+            return
         conn = NetworkConnection()
         for property in nmcli_request(["con", "show", name]):
             conn.add_property(property[0], property[1])
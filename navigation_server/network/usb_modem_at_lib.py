@@ -22,6 +22,8 @@ from collections import namedtuple
 
 import serial
 
+from .at_engine import ATEngine, ATCommand, DEFAULT_URC
+
 modem_log = logging.getLogger('ShipDataServer.' + __name__)
 
 
@@ -29,6 +31,31 @@ class ModemException(Exception):
     pass
 
 
+class ModemEvent:
+    """
+    Modem state change, mostly from the unsolicited result codes
+    event: registration, sim, sms, signal, power or urc
+    """
+
+    def __init__(self, modem: int, event: str, value: str, parameters: dict = None, timestamp: float = None):
+        self.modem = modem
+        self.event = event
+        self.value = value
+        self.parameters = parameters if parameters is not None else {}
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    def __str__(self):
+        return f"Modem{self.modem} {self.event}:{self.value} {self.parameters}"
+
+
+REGISTRATION_STATUS = {1: "HOME", 5: "ROAMING", 3: "DENIED", 2: "IN PROGRESS"}
+#
+#   response time of the slow commands (the default is 10s)
+#
+AT_TIMEOUTS = {'+COPS=?': 180.0, '+COPS': 180.0, '+COPN': 60.0, '+CFUN': 60.0, '+CMGS': 60.0, '+CMGL': 30.0,
+               '+QGPSLOC': 30.0}
+
+
 class UsbTty:
 
     keys = ("module", "name", "vendor", "product", "num_ports", "port", "path")
@@ -224,7 +251,8 @@ class UsbATModem:
             raise
 
         self._tty = None
-        self._open()
+        self._engine = None
+        self._event_listeners = []
         self._logAT = log
         if self._logAT:
             tracefile = os.path.join(self._filepath, f"atcmd{self._if_num}.log")
@@ -250,7 +278,9 @@ class UsbATModem:
         self._manufacturer = "Unknown"
         self._networkName = None
         self._regPLMN = 0
+        self._rssi = 99
 
+        self._open()
         if init:
             self._initialize()
         self._operatorNames = None  # dictionary PLMN/Operator name
@@ -259,13 +289,39 @@ class UsbATModem:
 
     def _open(self):
         try:
-            self._tty = serial.Serial(self._ifname, timeout=10.0)
+            # short timeout: the responses are awaited by the engine, not by the serial read
+            self._tty = serial.Serial(self._ifname, timeout=0.1)
         except serial.SerialException as err:
             # print "Opening:",ifName," :",err
             raise ModemException(f"Open modem AT interface:{self._ifname} error:{err}")
-        return
+        self._start_engine()
+
+    def _start_engine(self):
+        self._engine = ATEngine(self._tty, trace=self._logATCommand if self._logAT else None)
+        handlers = {
+            '+CREG': self._urc_registration,
+            '+CGREG': self._urc_registration,
+            '+CEREG': self._urc_registration,
+            '+CPIN': self._urc_sim,
+            '+CMTI': self._urc_sms,
+            '+QIND': self._urc_indication,
+            'RDY': self._urc_power,
+            'POWERED DOWN': self._urc_power
+        }
+        for prefix in DEFAULT_URC:
+            self._engine.subscribe(prefix, handlers.get(prefix, self._urc_generic))
+        self._engine.start()
+
+    def open(self):
+        """
+        Re-open the AT interface after a close
+        """
+        if self._engine is None or not self._engine.running:
+            self._open()
 
     def close(self):
+        if self._engine is not None:
+            self._engine.stop()
         self._tty.close()
         if self._logAT:
             self._closeAtLog()
@@ -278,11 +334,11 @@ class UsbATModem:
             self._logfp.close()
             self._logAT = False
 
-    def _logATCommand(self, cmd):
+    def _logATCommand(self, direction, text):
         if self._logAT:
-            buf = datetime.datetime.now().strftime("%H:%M:%S.%f >")
-            buf += cmd
-            self._logfp.write(buf)
+            buf = datetime.datetime.now().strftime(f"%H:%M:%S.%f {direction}")
+            buf += text.rstrip('\r\x1a')
+            self._logfp.write(buf + '\n')
 
     def _store_def(self):
         if self._pin_code is not None:
@@ -305,80 +361,137 @@ class UsbATModem:
     def nmea_tty(self) -> str:
         return self._nmea_tty
 
+    @property
+    def engine(self) -> ATEngine:
+        return self._engine
+
+    def add_event_listener(self, callback):
+        """
+        callback(event: ModemEvent), called from the AT engine reader thread for the unsolicited events
+        it shall not send AT commands synchronously
+        """
+        self._event_listeners.append(callback)
+
+    def remove_event_listener(self, callback):
+        self._event_listeners = [c for c in self._event_listeners if c is not callback]
+
+    def _emit(self, event: str, value: str, parameters: dict = None, timestamp: float = None):
+        modem_event = ModemEvent(self._if_num, event, value, parameters, timestamp)
+        modem_log.debug(str(modem_event))
+        for callback in self._event_listeners:
+            try:
+                callback(modem_event)
+            except Exception as err:
+                modem_log.error(f"Modem event {event} listener error: {err}")
+
     # low level I/O methods
     # send AT command and return the responses
     #
-    def writeATBuffer(self, buf: str):
-        # print buf
-        if self._logAT:
-            self._logATCommand(buf)
-
-        try:
-            self._tty.write(buf.encode())
-            self._tty.flush()
-        except serial.serialutil.SerialException as err:
-            modem_log.error(f"Send AT command Write error {err} command:{buf}")
-            if self._logAT:
-                self._logfp.write(str(err) + "\n")
-            raise ModemException(err)
+    @staticmethod
+    def _command_timeout(param: str):
+        if param is None:
+            return None
+        timeout = AT_TIMEOUTS.get(param)
+        if timeout is None:
+            cmd = param.split('=', 1)[0].rstrip('?')
+            timeout = AT_TIMEOUTS.get(cmd)
+        return timeout
 
-    def readATResponse(self, param: str, raiseException: bool) -> list:
+    def sendATcommand(self, param: str=None, raiseException: bool=False, timeout: float = None) -> list:
         """
-        :param param: command string that was sent
-        :type param: str
-        :param raiseException: if True raise an exception if read or decoding error
-        :type raiseException:
-        :return:
+        Send the command through the AT engine and wait for the result
+        :param param: command without the 'AT' prefix
+        :param raiseException: if True raise a ModemException on error result or timeout
+        :param timeout: response timeout, default from the command
+        :return: the response lines (including the +CME/+CMS error line)
         :rtype: list of str
         """
-        read_resp = True
-        nb_resp = 0
-        resp_list = []
-        while read_resp:
-            # reading one response
-            # self._tty.timeout=10.0
-            try:
-                resp = self._tty.read_until().decode()
-            except serial.serialutil.SerialException as err:
-                modem_log.error("Read at Command Error:" + str(err))
-                if self._logAT:
-                    self._logfp.write(str(err) + "\n")
-                read_resp = False
-                break
-            if self._logAT:
-                self._logfp.write(resp)
-            clean_resp = resp.strip('\n\r')
-            # analysis of the response
-            if clean_resp == "OK":
-                read_resp = False
-            elif clean_resp == "ERROR":
-                read_resp = False
+        if timeout is None:
+            timeout = self._command_timeout(param)
+        command = self._engine.command(param if param is not None else '', timeout)
+        if command.state == ATCommand.ERROR:
+            if command.final.startswith(("+CME", "+CMS")):
+                modem_log.debug(command.final)
                 if raiseException:
-                    raise ModemException(param + " ERROR")
-            elif clean_resp == "NO CARRIER":
-                read_resp = False
-                if raiseException:
-                    raise ModemException(param + " NO CARRIER")
-            elif clean_resp.startswith("+CME") or clean_resp.startswith("+CMS"):
-                read_resp = False
-                modem_log.debug(clean_resp)
-                resp_list.append(clean_resp)
-                if raiseException:
-                    raise ModemException(clean_resp)
-            else:
-                if len(clean_resp) > 0:
-                    resp_list.append(clean_resp)
-                    nb_resp = nb_resp + 1
-        # print "Number of responses:",nbResp
-        return resp_list
-
-    def sendATcommand(self, param: str=None, raiseException: bool=False) -> list:
-        buf = "AT"
-        if param is not None:
-            buf = buf + param
-        buf = buf + '\r'
-        self.writeATBuffer(buf)
-        return self.readATResponse(param, raiseException)
+                    raise ModemException(command.final)
+            elif raiseException:
+                raise ModemException(f"{param} {command.final}")
+        elif command.state == ATCommand.TIMEOUT:
+            if self._logAT:
+                self._logATCommand('!', f"TIMEOUT AT{command.command}")
+            if raiseException:
+                raise ModemException(f"{param} TIMEOUT")
+        elif command.state == ATCommand.CANCELLED:
+            modem_log.error(f"AT command {param} cancelled, modem interface closed")
+            if raiseException:
+                raise ModemException(f"{param} CANCELLED")
+        return command.lines
+
+    #
+    # unsolicited result codes handlers, called in the engine reader thread
+    #
+    def _urc_registration(self, prefix, line, timestamp):
+        # +CREG: <stat>[,<lac>,<ci>[,<AcT>]] (URC mode 2, no <n> first)
+        param = self.splitResponse(prefix, line, False)
+        if not param:
+            return
+        status = REGISTRATION_STATUS.get(param[0], "NO REG")
+        parameters = {'domain': prefix[1:], 'stat': str(param[0])}
+        if len(param) >= 3:
+            parameters['lac'] = str(param[1])
+            parameters['ci'] = str(param[2])
+            if len(param) >= 4:
+                parameters['technology'] = str(param[3])
+        if prefix == '+CREG':
+            self._networkReg = status
+            if param[0] not in (1, 5):
+                self._isRegistered = False
+            if 'lac' in parameters:
+                try:
+                    self._lac = int(parameters['lac'], 16)
+                    self._ci = int(parameters['ci'], 16)
+                except ValueError:
+                    pass
+        self._emit('registration', status, parameters, timestamp)
+
+    def _urc_sim(self, prefix, line, timestamp):
+        param = self.splitResponse(prefix, line, False)
+        if not param:
+            return
+        status = str(param[0])
+        if status == "NOT INSERTED":
+            self._SIM = False
+        else:
+            self._SIM = True
+            self._SIM_STATUS = status
+        self._emit('sim', status, None, timestamp)
+
+    def _urc_sms(self, prefix, line, timestamp):
+        # +CMTI: <mem>,<index>
+        param = self.splitResponse(prefix, line, False)
+        if not param:
+            return
+        self._emit('sms', str(param[0]), {'index': str(param[1]) if len(param) > 1 else ''}, timestamp)
+
+    def _urc_indication(self, prefix, line, timestamp):
+        param = self.splitResponse(prefix, line, False)
+        if param and param[0] == 'csq' and len(param) >= 2 and type(param[1]) is int:
+            # +QIND: "csq",<rssi>,<ber>
+            self._rssi = -113 + (param[1] * 2) if param[1] <= 31 else 99
+            self._emit('signal', str(self._rssi), {'csq': str(param[1])}, timestamp)
+        else:
+            self._urc_generic(prefix, line, timestamp)
+
+    def _urc_power(self, prefix, line, timestamp):
+        if prefix == 'POWERED DOWN':
+            self._isRegistered = False
+            self._networkReg = "UNKNOWN"
+            self._emit('power', 'down', None, timestamp)
+        else:
+            self._emit('power', 'ready', None, timestamp)
+
+    def _urc_generic(self, prefix, line, timestamp):
+        self._emit('urc', line, {'prefix': prefix}, timestamp)
 
     #
     # perform initialisation of the modem parameters
@@ -587,12 +700,17 @@ class UsbATModem:
             return False
 
         resp = self.sendATcommand("+CREG?")
-        # warning some spontaneous messages can come
+        # the spontaneous messages are filtered by the AT engine
         vresp = self.checkAndSplitResponse("+CREG", resp)
         if vresp is None:
             modem_log.error("No registration status returned (+CREG)")
             return False
-        return self._decodeRegistration(vresp, log)
+        previous = self._networkReg
+        result = self._decodeRegistration(vresp, log)
+        if self._networkReg != previous:
+            self._emit('registration', self._networkReg, {'domain': 'CREG', 'lac': f"{self._lac:X}",
+                                                           'ci': f"{self._ci:X}"})
+        return result
 
     def regStatus(self):
         return self._networkReg
@@ -612,11 +730,11 @@ class UsbATModem:
         if param[1] == 1:
             if log:
                 modem_log.info("registered on home operator")
-            self._networkReg = "HOME"
+            self._networkReg = REGISTRATION_STATUS[1]
         elif param[1] == 5:
             if log:
                 modem_log.info("registered on roaming")
-            self._networkReg = "ROAMING"
+            self._networkReg = REGISTRATION_STATUS[5]
         else:
             '''
             Correction of issue 534
@@ -979,33 +1097,18 @@ class UsbATModem:
         # first check that we are in the right mode
         if self.check_sms_mode() != 1:
             self.configureSMS()
-        buf = f'AT+CMGS="{da}"\r'
-        # print(buf)
-        self.writeATBuffer(buf)
-        # read the first response
-        resp = self._tty.read_until()
-        prompt = self._tty.read(1)
-        # print("Prompt received:",prompt[0])
-        if prompt[0] != 62:
-            # read error message
-            err_msg = self._tty.read_until().strip(b'\r\n').decode()
-            modem_log.error(f"Error sending SMS:{err_msg}")
-            return f"SEND ERROR: {err_msg}"
-        else:
-            buf2 = text + '\x1a'
-            # print(buf2)
-            self.writeATBuffer(buf2)
-            resp = self.readATResponse("+CMGS", False)
-            # print(resp)
-            if resp is not None:
-                result = self.checkResponse(resp[1])
-                if result.startswith("+CMS"):
-                    error = self.splitResponse("+CMS ERROR", resp[1])
-                    modem_log.error("Error sending SMS:" + str(error[0]) + " to:" + da)
-                    return resp[1]
-                else:
-                    modem_log.info("SMS sent to:" + da)
-                    return "OK"
+        # the engine sends the text on the '>' prompt
+        command = self._engine.command(f'+CMGS="{da}"', self._command_timeout('+CMGS'), payload=text)
+        if command.ok:
+            modem_log.info("SMS sent to:" + da)
+            return "OK"
+        err_msg = command.final if command.final is not None else "TIMEOUT"
+        if command.payload_sent and err_msg.startswith("+CMS"):
+            error = self.splitResponse("+CMS ERROR", err_msg, False)
+            modem_log.error("Error sending SMS:" + str(error[0] if error else err_msg) + " to:" + da)
+            return err_msg
+        modem_log.error(f"Error sending SMS:{err_msg}")
+        return f"SEND ERROR: {err_msg}"
 
     def readSMS(self, stat):
         cmd = '+CMGL="%s"' % stat
@@ -13,7 +13,7 @@ import logging
 
 from navigation_server.router_core import NMEAFilter
 from navigation_server.router_common import N0183_MSG
-from navigation_server.router_core.nmea0183_msg import NMEA0183Msg
+from navigation_server.router_core.nmea0183_msg import NMEA0183Msg, NMEA0183Index
 
 _logger = logging.getLogger('ShipDataServer.' + __name__)
 
@@ -22,12 +22,13 @@ class NMEA0183Filter(NMEAFilter):
 
     def __init__(self, opts):
         super().__init__(opts)
+        # talker and formatter are compared as NMEA0183Index codes
         self._talker = opts.get('talker', str, None)
         if self._talker is not None:
-            self._talker = self._talker.encode()
+            self._talker = NMEA0183Index.talker_code(self._talker)
         self._formatter = opts.get('formatter', str, None)
         if self._formatter is not None:
-            self._formatter = self._formatter.encode()
+            self._formatter = NMEA0183Index.formatter_code(self._formatter)
 
     def valid(self) -> bool:
         if self._talker is not None or self._formatter is not None:
@@ -37,18 +38,18 @@ class NMEA0183Filter(NMEAFilter):
 
     def process_nmea0183(self, msg: NMEA0183Msg) -> bool:
 
-        if self._talker is None or self._talker == msg.talker():
+        if self._talker is None or self._talker == msg.talker_code:
             talker = True
         else:
             talker = False
         # _logger.debug("Filter formatter %s with %s" % (self._formatter, msg.formatter()))
-        if self._formatter is None or self._formatter == msg.formatter():
+        if self._formatter is None or self._formatter == msg.formatter_code:
             formatter = True
         else:
             formatter = False
         result = talker and formatter
         if result:
-            _logger.debug("Processing NMEA0183 filter %s with message %s ==>> OK" % (self._name, msg))
+            _logger.debug("Processing NMEA0183 filter %s with message %s ==>> OK", self._name, msg)
         return result
 
     def message_type(self):
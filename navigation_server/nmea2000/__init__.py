@@ -10,7 +10,7 @@
 #-------------------------------------------------------------------------------
 
 from .nmea2k_fast_packet import FastPacketHandler, FastPacketException
-from .nmea2k_iso_transport import IsoTransportHandler, IsoTransportException
+from .nmea2k_iso_transport import IsoTransportHandler, IsoTransportException, IsoTransportSession
 from .nmea2k_decode_dispatch import get_n2k_decoded_object, get_n2k_object_from_protobuf
 from .nmea2k_filters import NMEA2000Filter, NMEA2000TimeFilter
 from .nmea2k_controller import NMEA2KController
@@ -19,8 +19,16 @@ from .nmea2k_grpc_publisher import GrpcPublisher
 from .nmea2k_publisher import N2KTracePublisher, N2KStatisticPublisher, N2KSourceDispatcher, N2KJsonPublisher
 from .nmea2k_device import NMEA2000Device
 from .nmea0183_to_nmea2k import NMEA0183ToNMEA2000Converter
+from .nmea2k_snapshot_service import N2KSnapshotService, fill_snapshot
+from .nmea2k_device_registry import N2KDeviceRegistry, N2KDeviceRecord
+from .nmea2k_registry_service import N2KDeviceRegistryService
 from .nmea2k_iso_messages import (AddressClaim, ConfigurationInformation, ProductInformation, Heartbeat, ISORequest,
-                                  CommandedAddress, AcknowledgeGroupFunction, create_group_function, CommandGroupFunction)
+                                  CommandedAddress, AcknowledgeGroupFunction, create_group_function, CommandGroupFunction,
+                                  GroupFunction, RequestGroupFunction, ReadFieldsGroupFunction,
+                                  ReadFieldsReplyGroupFunction, WriteFieldsGroupFunction, WriteFieldsReplyGroupFunction,
+                                  GroupFunctionField, GroupFunctionFieldMap, GroupParameter)
+from .nmea2k_group_function import (GroupFunctionTarget, GroupFunctionResponder, GroupFunctionTransaction,
+                                    GroupFunctionTransactions)
 # from .nmea2k_name import NMEA2000Name
 
 from navigation_server.nmea2000_datamodel import initialize_feature as init_datamodel
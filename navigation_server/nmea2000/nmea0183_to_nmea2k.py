@@ -30,9 +30,9 @@ def convert_time(time_bytes) -> float:
     # return number of seconds since midnight
     h = int(time_bytes[0:2]) * 3600
     m = int(time_bytes[2:4]) * 60
-    s = int(time_bytes[4:6])
-    ms = int(time_bytes[7:9]) * 1e-6
-    return h + m + s + ms
+    # seconds with their decimal fraction (hhmmss.ss)
+    s = float(time_bytes[4:])
+    return h + m + s
 
 
 def convert_date(date_bytes) -> int:
@@ -44,14 +44,14 @@ def convert_date(date_bytes) -> int:
 
 
 def convert_latitude(ns_indicator, latitude_bytes) -> float:
-    lat = float(latitude_bytes[0:2]) + (float(latitude_bytes[2:7]) / 60.0)
+    lat = float(latitude_bytes[0:2]) + (float(latitude_bytes[2:]) / 60.0)
     if ns_indicator == b'S':
         lat = -lat
     return lat
 
 
 def convert_longitude(ew_indicator, longitude_bytes) -> float:
-    long = float(longitude_bytes[0:3]) + (float(longitude_bytes[3:8]) / 60.0)
+    long = float(longitude_bytes[0:3]) + (float(longitude_bytes[3:]) / 60.0)
     if ew_indicator == b'W':
         long = -long
     return long
@@ -278,8 +278,8 @@ class NMEA0183ToNMEA2000Converter:
         for sat in self._current_sat_gsv_data:
             sat_obj = Pgn129540Class.Satellites_DataClass()
             sat_obj.satellite_number = sat.prn
-            sat_obj.elevation = sat.elevation * deg_to_radian
-            sat_obj.azimuth = sat.azimuth * deg_to_radian
+            sat_obj.elevation = sat.elevation
+            sat_obj.azimuth = sat.azimuth
             sat_obj.signal_noise_ratio = sat.snr
             sat_obj.range_residuals = 0x7fffffff
             sat_obj.status = sat.status
@@ -307,7 +307,7 @@ class NMEA0183ToNMEA2000Converter:
         pgn129029.method = int(fields[5])
         pgn129029.integrity = 0
         pgn129029.HDOP = float(fields[7])
-        pgn129029.geoidal_separation = float(fields[8])
+        pgn129029.geoidal_separation = float(fields[10])
         if self._current_sat_gsa_data is not None:
             pgn129029.PDOP = self._current_sat_gsa_data.pdop
         else:
@@ -16,7 +16,8 @@ import time
 from typing import Generator
 
 from .nmea2k_device import NMEA2000Device
-from navigation_server.router_common import NavigationServer, NavThread, set_global_var
+from .nmea2k_device_registry import N2KDeviceRegistry
+from navigation_server.router_common import NavigationServer, NavThread, set_global_var, LatencyTracker
 from navigation_server.router_core import NMEA2000Msg
 from .nmea2k_iso_messages import ISORequest
 
@@ -31,10 +32,11 @@ class NMEA2KController(NavigationServer, NavThread):
         queue_size = opts.get('queue_size', int, 20)
         if queue_size < self.min_queue_size:
             queue_size = self.min_queue_size
+        # the registry is persisted in the save file if defined
         self._save_file = opts.get('save_file', str, None)
-        if self._save_file is not None:
-            self.init_save()
+        self._registry = N2KDeviceRegistry(self._save_file)
         self._input_queue = queue.Queue(queue_size)
+        self._queue_latency = LatencyTracker.histogram('controller_queue', self._name)
         self._stop_flag = False
         set_global_var('N2KController', self)
         self._subscriber = {}
@@ -81,6 +83,7 @@ class NMEA2KController(NavigationServer, NavThread):
                 msg = self._input_queue.get(block=True, timeout=1.0)
             except queue.Empty:
                 continue
+            self._queue_latency.record_since(msg.stamp)
             _logger.debug("NMEA Controller input %s" % msg.format1())
             # further processing here
             try:
@@ -94,6 +97,11 @@ class NMEA2KController(NavigationServer, NavThread):
         self._stop_flag = True
         if self._gc_timer is not None:
             self._gc_timer.cancel()
+        self._registry.close()
+
+    @property
+    def registry(self) -> N2KDeviceRegistry:
+        return self._registry
 
     def check_device(self, address: int) -> NMEA2000Device:
         """
@@ -106,6 +114,11 @@ class NMEA2KController(NavigationServer, NavThread):
             return self._devices[address]
         except KeyError:
             dev = NMEA2000Device(address)
+            # warm start from the last device known at that address
+            record = self._registry.by_address(address)
+            if record is not None:
+                dev.restore(record.iso_name, record.manufacturer_name, record.product_information(),
+                            record.configuration_information())
             self._devices[address] = dev
             return dev
 
@@ -115,14 +128,12 @@ class NMEA2KController(NavigationServer, NavThread):
         self._gc_lock.acquire()
         device = self.check_device(msg.sa)
         device.receive_msg(msg)
+        self._registry.device_update(device, msg)
         self.call_subscribers(msg.pgn, msg)
         self._gc_lock.release()
 
     def store_devices(self):
-
-        filename = self._options.get('store', str, None)
-        if filename is None:
-            return
+        self._registry.flush()
 
     def get_device(self) -> Generator[NMEA2000Device, None, None]:
         """
@@ -162,9 +173,6 @@ class NMEA2KController(NavigationServer, NavThread):
         self._gc_lock.release()
         raise KeyError
 
-    def init_save(self):
-        pass
-
     def add_subscriber(self, pgn, function):
         self._subscriber[pgn] = function
 
@@ -194,6 +202,7 @@ class NMEA2KController(NavigationServer, NavThread):
         for key in to_be_deleted:
             del self._devices[key]
         self._gc_lock.release()
+        self.store_devices()
         self._gc_timer = threading.Timer(self._max_silent, self.device_gc)
         self._gc_timer.start()
 
@@ -75,7 +75,9 @@ class NMEA2000Device:
         try:
             pgn_def = self.add_pgn_count(msg.pgn)
         except N2KUnknownPGN:
-            return
+            # the service PGN without definition (Group Function) are still processed
+            if msg.pgn not in self._process_vector:
+                return
         try:
             self._process_vector[msg.pgn](msg)
         except KeyError:
@@ -109,6 +111,21 @@ class NMEA2000Device:
     def product_information_sent(self, flag:bool):
         self._product_info_sent = flag
 
+    def pgn_list(self) -> list:
+        return list(self._pgn_received.keys())
+
+    def restore(self, iso_name, manufacturer_name: str, product_information: ProductInformation,
+                configuration_information: ConfigurationInformation):
+        '''
+        Restore the device from the registry at start, the ISO NAME is checked at the next address claim
+        so the product and configuration information are not requested on the bus
+        '''
+        _logger.debug("Device address %d restored from the registry" % self._address)
+        self._iso_name = iso_name
+        self._manufacturer_name = manufacturer_name
+        self._product_information = product_information
+        self._configuration_info = configuration_information
+
     def add_pgn_count(self, pgn) -> PgnRecord:
         try:
             pgn_def = self._pgn_received[pgn]
@@ -125,6 +142,10 @@ class NMEA2000Device:
         n2k_obj.from_message(msg)
         if self._iso_name is None or self._iso_name != n2k_obj.name:
             self._changed = True
+            if self._iso_name is not None:
+                # another device is now at that address
+                self._product_information = None
+                self._configuration_info = None
             self._iso_name = n2k_obj.name
             _logger.debug("Processing ISO address claim for address %d name=%16X" %
                          (self._address, self._iso_name.name_value))
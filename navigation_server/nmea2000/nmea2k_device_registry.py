@@ -0,0 +1,305 @@
+#-------------------------------------------------------------------------------
+# Name:        nmea2k_device_registry
+# Purpose:     Registry of the NMEA2000 devices keyed by ISO NAME with local persistence
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   Devices are identified by their 64 bits ISO NAME, the address is only the current location on the bus
+#   Secondary indexes: address, manufacturer code, device class and PGN transmitted
+#   The registry is persisted in a SQLite file, the address claims are committed immediately,
+#   the new PGN and last seen times are committed on flush (garbage collection timer and stop)
+#   The update from the controller thread is one dictionary access when nothing changes
+
+import logging
+import sqlite3
+import struct
+import threading
+import time
+
+from navigation_server.router_core import NMEA2000Msg
+from navigation_server.nmea2000_datamodel import NMEA2000Name
+from navigation_server.router_common import manufacturer_name
+from .nmea2k_iso_messages import ProductInformation, ConfigurationInformation
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+def _db_name(value: int) -> int:
+    # SQLite integers are signed 64 bits
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _name_from_db(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class N2KDeviceRecord:
+    """
+    Persistent view of a device
+    address is -1 when another device has claimed the last address of this device
+    """
+
+    __slots__ = ('iso_name', 'address', 'first_seen', 'last_seen', 'address_history', 'pgns',
+                 'product_payload', 'configuration_payload')
+
+    max_history = 16
+
+    def __init__(self, iso_name: NMEA2000Name, address: int, first_seen: float):
+        self.iso_name = iso_name
+        self.address = address
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.address_history = []   # (address, time of the claim)
+        self.pgns = set()
+        self.product_payload = None
+        self.configuration_payload = None
+
+    @property
+    def name(self) -> int:
+        return self.iso_name.int_value
+
+    @property
+    def manufacturer_code(self) -> int:
+        return self.iso_name.manufacturer_code
+
+    @property
+    def device_class(self) -> int:
+        return self.iso_name.device_class
+
+    @property
+    def manufacturer_name(self) -> str:
+        return manufacturer_name(self.manufacturer_code)
+
+    def add_address(self, address: int, timestamp: float):
+        self.address_history.append((address, timestamp))
+        if len(self.address_history) > self.max_history:
+            del self.address_history[0]
+
+    def product_information(self) -> ProductInformation:
+        if self.product_payload is None:
+            return None
+        return ProductInformation(message=NMEA2000Msg(126996, payload=self.product_payload))
+
+    def configuration_information(self) -> ConfigurationInformation:
+        if self.configuration_payload is None:
+            return None
+        return ConfigurationInformation(message=NMEA2000Msg(126998, payload=self.configuration_payload))
+
+
+class N2KDeviceRegistry:
+    """
+    Registry of all devices seen on the bus, persisted in filename if not None
+    """
+
+    def __init__(self, filename: str = None):
+        self._by_name = {}
+        self._by_address = {}
+        self._by_manufacturer = {}
+        self._by_class = {}
+        self._by_pgn = {}
+        self._lock = threading.Lock()
+        self._filename = filename
+        self._db = None
+        if filename is not None:
+            try:
+                self._open()
+            except sqlite3.Error as err:
+                _logger.error(f"Device registry cannot use file {filename}: {err} => not persisted")
+                self._db = None
+
+    def _open(self):
+        self._db = sqlite3.connect(self._filename, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS devices (name INTEGER PRIMARY KEY, address INTEGER, "
+                         "first_seen REAL, last_seen REAL, product_information BLOB, configuration_information BLOB)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS address_history (name INTEGER, address INTEGER, timestamp REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS pgns (name INTEGER, pgn INTEGER, PRIMARY KEY (name, pgn))")
+        for name, address, first_seen, last_seen, product, configuration in self._db.execute(
+                "SELECT * FROM devices"):
+            record = N2KDeviceRecord(NMEA2000Name(struct.pack("<Q", _name_from_db(name))), address, first_seen)
+            record.last_seen = last_seen
+            record.product_payload = product
+            record.configuration_payload = configuration
+            self._index(record)
+        for name, address, timestamp in self._db.execute(
+                "SELECT name, address, timestamp FROM address_history ORDER BY timestamp"):
+            record = self._by_name.get(_name_from_db(name))
+            if record is not None:
+                record.add_address(address, timestamp)
+        for name, pgn in self._db.execute("SELECT name, pgn FROM pgns"):
+            record = self._by_name.get(_name_from_db(name))
+            if record is not None:
+                record.pgns.add(pgn)
+                self._by_pgn.setdefault(pgn, {})[record.name] = record
+        self._db.commit()
+        _logger.info(f"Device registry {self._filename} loaded with {len(self._by_name)} devices")
+
+    def _index(self, record: N2KDeviceRecord):
+        self._by_name[record.name] = record
+        if record.address >= 0:
+            self._by_address[record.address] = record
+        self._by_manufacturer.setdefault(record.manufacturer_code, {})[record.name] = record
+        self._by_class.setdefault(record.device_class, {})[record.name] = record
+
+    def _store_address(self, record: N2KDeviceRecord):
+        if self._db is not None:
+            self._db.execute("UPDATE devices SET address=? WHERE name=?", (record.address, _db_name(record.name)))
+
+    #
+    #   Updates from the controller
+    #
+    def device_update(self, device, msg: NMEA2000Msg):
+        """
+        Update the registry with a message received from a device
+        Nothing is done until the ISO NAME of the device is known
+        """
+        iso_name = device.iso_name
+        if iso_name is None:
+            return
+        record = self._by_address.get(msg.sa)
+        if record is None or record.name != iso_name.int_value:
+            record = self.address_claim(iso_name, msg.sa, device.pgn_list())
+        record.last_seen = time.time()
+        if msg.pgn not in record.pgns:
+            self.add_pgn(record, msg.pgn)
+        if msg.pgn == 126996:
+            if record.product_payload != msg.payload:
+                self._set_information(record, 'product_information', bytes(msg.payload))
+                record.product_payload = bytes(msg.payload)
+        elif msg.pgn == 126998:
+            if record.configuration_payload != msg.payload:
+                self._set_information(record, 'configuration_information', bytes(msg.payload))
+                record.configuration_payload = bytes(msg.payload)
+
+    def address_claim(self, iso_name: NMEA2000Name, address: int, pgns=None) -> N2KDeviceRecord:
+        """
+        Record that the device with the ISO NAME is at the address
+        """
+        now = time.time()
+        with self._lock:
+            previous = self._by_address.get(address)
+            record = self._by_name.get(iso_name.int_value)
+            if record is None:
+                record = N2KDeviceRecord(iso_name, address, now)
+                _logger.info("Device registry new device %016X at address %d" % (record.name, address))
+                if self._db is not None:
+                    self._db.execute("INSERT INTO devices VALUES (?, ?, ?, ?, NULL, NULL)",
+                                     (_db_name(record.name), address, now, now))
+                self._index(record)
+            elif record.address == address:
+                return record
+            else:
+                _logger.info("Device registry device %016X moved from address %d to %d" %
+                             (record.name, record.address, address))
+                if self._by_address.get(record.address) is record:
+                    del self._by_address[record.address]
+                record.address = address
+                self._store_address(record)
+            if previous is not None and previous is not record:
+                previous.address = -1
+                self._store_address(previous)
+            self._by_address[address] = record
+            record.add_address(address, now)
+            if self._db is not None:
+                self._db.execute("INSERT INTO address_history VALUES (?, ?, ?)", (_db_name(record.name), address, now))
+                self._db.commit()
+        if pgns is not None:
+            for pgn in pgns:
+                if pgn not in record.pgns:
+                    self.add_pgn(record, pgn)
+        return record
+
+    def add_pgn(self, record: N2KDeviceRecord, pgn: int):
+        with self._lock:
+            record.pgns.add(pgn)
+            self._by_pgn.setdefault(pgn, {})[record.name] = record
+            if self._db is not None:
+                self._db.execute("INSERT OR IGNORE INTO pgns VALUES (?, ?)", (_db_name(record.name), pgn))
+
+    def _set_information(self, record: N2KDeviceRecord, column: str, payload: bytes):
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(f"UPDATE devices SET {column}=? WHERE name=?", (payload, _db_name(record.name)))
+                self._db.commit()
+
+    def flush(self):
+        """
+        Save the last seen times and commit the pending updates
+        """
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.executemany("UPDATE devices SET last_seen=? WHERE name=?",
+                                     [(record.last_seen, _db_name(record.name)) for record in self._by_name.values()])
+                self._db.commit()
+            except sqlite3.Error as err:
+                _logger.error(f"Device registry {self._filename} save error: {err}")
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    #
+    #   Queries
+    #
+    def __len__(self):
+        return len(self._by_name)
+
+    def get(self, name: int) -> N2KDeviceRecord:
+        """
+        raise KeyError if the ISO NAME is not known
+        """
+        return self._by_name[name]
+
+    def by_address(self, address: int) -> N2KDeviceRecord:
+        """
+        return the device that has last claimed the address or None
+        """
+        return self._by_address.get(address)
+
+    def by_manufacturer(self, manufacturer_code: int) -> list:
+        return list(self._by_manufacturer.get(manufacturer_code, {}).values())
+
+    def by_class(self, device_class: int) -> list:
+        return list(self._by_class.get(device_class, {}).values())
+
+    def senders(self, pgn: int) -> list:
+        """
+        return the devices that have transmitted the PGN
+        """
+        return list(self._by_pgn.get(pgn, {}).values())
+
+    def devices(self) -> list:
+        return list(self._by_name.values())
+
+    def select(self, names=None, addresses=None, manufacturers=None, device_classes=None, pgn: int = 0) -> list:
+        """
+        return the devices matching all the criteria, empty or None criteria are ignored
+        the most selective index is used first
+        """
+        with self._lock:
+            if names:
+                candidates = [self._by_name[n] for n in names if n in self._by_name]
+            elif pgn != 0:
+                candidates = self.senders(pgn)
+            elif addresses:
+                candidates = [self._by_address[a] for a in addresses if a in self._by_address]
+            elif manufacturers:
+                candidates = [r for m in manufacturers for r in self._by_manufacturer.get(m, {}).values()]
+            elif device_classes:
+                candidates = [r for c in device_classes for r in self._by_class.get(c, {}).values()]
+            else:
+                candidates = self.devices()
+            return [r for r in candidates
+                    if (not addresses or r.address in addresses)
+                    and (not manufacturers or r.manufacturer_code in manufacturers)
+                    and (not device_classes or r.device_class in device_classes)
+                    and (pgn == 0 or pgn in r.pgns)]
@@ -10,6 +10,7 @@
 # -------------------------------------------------------------------------------
 
 import logging
+import threading
 import time
 
 
@@ -102,7 +103,7 @@ class FastPacket:
                 raise FastPacketException("Missing frame %d" % i)
             l = len(f)
             if start_idx + l >= self._byte_length:
-                result[start_idx:] = f[:self._byte_length - start_idx + 1]
+                result[start_idx:] = f[:self._byte_length - start_idx]
             else:
                 result[start_idx:] = f
             start_idx += l
@@ -127,18 +128,42 @@ class FastPacket:
     def pgn(self):
         return self._pgn
 
+    @property
+    def source(self):
+        return self._source
+
 
 class FastPacketHandler:
 
     """
     This class is linked to one Coupler instance and handle the reassembly of fast Packets payload
+    Reassembly errors and incomplete sequences (timeouts) are counted per (PGN, source address)
 
     """
 
+    ERROR = 0
+    TIMEOUT = 1
+
     def __init__(self, instrument):
         self._sequences = {}
         self._instrument = instrument
         self._write_sequences = {}
+        self._write_lock = threading.Lock()
+        self._errors = {}
+
+    def _count_error(self, pgn: int, addr: int, index: int):
+        try:
+            self._errors[(pgn, addr)][index] += 1
+        except KeyError:
+            counts = [0, 0]
+            counts[index] = 1
+            self._errors[(pgn, addr)] = counts
+
+    def error_counts(self) -> list:
+        """
+        return the list of (pgn, addr, nb_errors, nb_timeouts) since the creation of the handler
+        """
+        return [(key[0], key[1], counts[0], counts[1]) for key, counts in list(self._errors.items())]
 
     def process_frame(self, pgn, addr, frame):
         seq = (frame[0] >> 5) & 7
@@ -154,23 +179,32 @@ class FastPacketHandler:
                 "Fast packet ==> start sequence on PGN %d from address %d with sequence %d" % (pgn, addr, seq))
             return l_handle
 
-        if handle is None:
-            if counter != 0:
-                raise FastPacketException(f"Fast packet PGN {pgn} from address {addr} wrong first packet {counter}")
-            handle = allocate_handle()
-
         if counter == 0:
+            if handle is not None:
+                # the previous sequence with the same number is incomplete (lost frame) => restart it
+                _logger.debug("Fast packet ==> incomplete sequence on PGN %d from address %d sequence %d discarded" %
+                              (pgn, addr, seq))
+                self._count_error(pgn, addr, self.TIMEOUT)
+            handle = allocate_handle()
             handle.first_packet(frame)
+        elif handle is None:
+            self._count_error(pgn, addr, self.ERROR)
+            raise FastPacketException(f"Fast packet PGN {pgn} from address {addr} wrong first packet {counter}")
         else:
             try:
                 handle.add_packet(frame)
             except FastPacketException:
                 del self._sequences[key]
+                self._count_error(pgn, addr, self.ERROR)
                 raise
 
         if handle.check_complete():
             del self._sequences[key]
-            result = handle.total_frame()
+            try:
+                result = handle.total_frame()
+            except FastPacketException:
+                self._count_error(pgn, addr, self.ERROR)
+                raise
             _logger.debug("Fast packet ==> end sequence on PGN %d from address %d sequence %d" % (pgn, addr, seq))
             return result
         else:
@@ -191,17 +225,31 @@ class FastPacketHandler:
             if not s.check_validity():
                 to_be_removed.append(s.key)
         for key in to_be_removed:
-            del self._sequences[key]
+            handle = self._sequences.pop(key)
+            self._count_error(handle.pgn, handle.source, self.TIMEOUT)
 
-    def split_message(self, pgn: int, data: bytearray) -> bytearray:
+    def split_message(self, pgn: int, data: bytearray, sa: int = 0) -> bytearray:
         """
         split the NMEA payload with Fast Packet structure
+        The sequence is released when the last frame has been generated, so this is only suitable when the frames
+        are sent synchronously. Otherwise, use allocate_seq / build_frames / free_seq
         :param pgn:
         :param data: NMEA 2000 payload
+        :param sa: source address
         :return: iterator over Fast Packet frames
         """
+        seq = self.allocate_seq(pgn, sa)
+        try:
+            yield from self.build_frames(seq, data)
+        finally:
+            self.free_seq(pgn, seq, sa)
+
+    @staticmethod
+    def build_frames(seq: int, data: bytearray) -> bytearray:
+        """
+        Generate the Fast Packet frames for the payload with the sequence number
+        """
         nb_frames = ((len(data) - 6) / 7) + 1
-        seq = self.allocate_seq(pgn)
         seq_en = seq << 5
         counter = 0
         total_len = len(data)
@@ -227,21 +275,40 @@ class FastPacketHandler:
             # print("frame #", counter, "remaining bytes", remaining_bytes, "DLC", len(frame))
             yield frame
             counter += 1
-        self.free_seq(pgn, seq)
 
-    def allocate_seq(self, pgn: int) -> int:
+    def allocate_seq(self, pgn: int, sa: int = 0) -> int:
         """
-        Allocate a sequence number for a given PGN. Currently one sequence at a time for a given PGN
-        So seq is always 1
+        Allocate a sequence number for a given PGN and source address.
+        The 3 bits sequence counter is rotated, so consecutive messages have different sequences, and sequences
+        still in flight (not freed) are skipped.
+        raise FastPacketException if all sequences are in flight
         """
-        seq = self._write_sequences.get(pgn, 0)
-        if seq == 0:
-            self._write_sequences[pgn] = 1
-            return 1
-        else:
-            _logger.critical("NMEA2000 Fast Packet => cannot allocate sequence for PGN %d already in use" % pgn)
-            raise ValueError
-
-    def free_seq(self, pgn, seq):
-        self._write_sequences[pgn] = 0
+        key = (pgn, sa)
+        with self._write_lock:
+            state = self._write_sequences.get(key)
+            if state is None:
+                # [next sequence, bit mask of sequences in flight]
+                state = [0, 0]
+                self._write_sequences[key] = state
+            for i in range(8):
+                seq = (state[0] + i) & 7
+                if state[1] & (1 << seq) == 0:
+                    state[1] |= 1 << seq
+                    state[0] = (seq + 1) & 7
+                    return seq
+        _logger.error("NMEA2000 Fast Packet => no sequence available for PGN %d source %d" % (pgn, sa))
+        raise FastPacketException(f"No Fast Packet sequence available for PGN {pgn} source {sa}")
+
+    def free_seq(self, pgn: int, seq: int, sa: int = 0):
+        with self._write_lock:
+            try:
+                self._write_sequences[(pgn, sa)][1] &= ~(1 << seq)
+            except KeyError:
+                _logger.error("NMEA2000 Fast Packet => free sequence %d for PGN %d source %d not allocated" %
+                              (seq, pgn, sa))
 
+    def sequences_in_flight(self, pgn: int, sa: int = 0) -> int:
+        try:
+            return bin(self._write_sequences[(pgn, sa)][1]).count('1')
+        except KeyError:
+            return 0
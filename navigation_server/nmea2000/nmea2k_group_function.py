@@ -0,0 +1,482 @@
+# -------------------------------------------------------------------------------
+# Name:        nmea2k_group_function
+# Purpose:     NMEA2000 Group Function (PGN 126208) responder and requester transactions
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+# -------------------------------------------------------------------------------
+
+#  implementation notes
+#   Responder: each application declares the PGN instances (generated class objects) it exposes as targets
+#   the responder processes Request, Command, Read Fields and Write Fields and builds the reply
+#   The fields are selected by number via the GroupFunctionFieldMap of the generated class
+#   Requester: transactions are correlated by (local address, peer address, PGN) and the unique id for the
+#   Read/Write Fields. All deadlines of a controller are managed by a single thread with a heap.
+#   A Request is answered by the PGN itself, so the controller passes the messages to the transactions table
+#   while Requests are pending
+
+import heapq
+import logging
+import threading
+import time
+
+from navigation_server.router_common import NavThread
+from navigation_server.router_core import NMEA2000Msg
+from .nmea2k_iso_messages import (GroupFunction, AcknowledgeGroupFunction, ReadFieldsReplyGroupFunction,
+                                  WriteFieldsReplyGroupFunction, GroupFunctionFieldMap, GroupParameter,
+                                  GF_REQUEST, GF_COMMAND, GF_ACKNOWLEDGE, GF_READ_FIELDS, GF_READ_FIELDS_REPLY,
+                                  GF_WRITE_FIELDS, GF_WRITE_FIELDS_REPLY, GF_PGN_OK, GF_PGN_NOT_SUPPORTED,
+                                  GF_PGN_NOT_AVAILABLE, GF_PGN_READ_WRITE_NOT_SUPPORTED, GF_TI_OK,
+                                  GF_TI_NOT_SUPPORTED, GF_PARAM_OK, GF_PARAM_INVALID_FIELD, GF_PARAM_OUT_OF_RANGE,
+                                  GF_PARAM_ACCESS_DENIED, GF_PRIORITY_UNCHANGED)
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class GroupFunctionTarget:
+    '''
+    PGN instance exposed to the Group Functions by an application
+    obj: generated class instance holding the values, or the specific object of a PGN in pgn_function_table
+    writable: fields (numbers, attributes or names) that can be changed by Command and Write Fields
+    on_request: function(requester address) sending the PGN, by default obj.message() is sent
+    on_interval: function(interval, offset) -> transmission interval error code, None if the interval is fixed
+    on_change: function(target, list of changed attributes) called after a successful Command or Write Fields
+    '''
+
+    def __init__(self, obj, pgn: int = 0, writable=(), on_request=None, on_interval=None, on_change=None):
+        self._obj = obj
+        self._pgn = pgn if pgn > 0 else obj.pgn
+        self._field_map = GroupFunctionFieldMap.for_pgn(self._pgn)
+        if self._field_map is not None:
+            self._writable = set(self._field_map.numbers(writable))
+        else:
+            self._writable = set()
+        self._on_request = on_request
+        self._on_interval = on_interval
+        self._on_change = on_change
+
+    @property
+    def pgn(self) -> int:
+        return self._pgn
+
+    @property
+    def obj(self):
+        return self._obj
+
+    @property
+    def field_map(self) -> GroupFunctionFieldMap:
+        return self._field_map
+
+    def value(self, number: int):
+        return getattr(self._obj, self._field_map.field(number).attribute)
+
+    def match(self, selection: list, codes: list) -> bool:
+        '''
+        Check the selection pairs against the current values, the parameter error codes are appended to codes
+        '''
+        matched = True
+        for param in selection:
+            try:
+                field = self._field_map.field(param.number)
+            except KeyError:
+                codes.append(GF_PARAM_INVALID_FIELD)
+                matched = False
+                continue
+            try:
+                equal = field.to_bytes(param.value) == field.to_bytes(self.value(param.number))
+            except ValueError:
+                equal = False
+            codes.append(GF_PARAM_OK if equal else GF_PARAM_OUT_OF_RANGE)
+            matched = matched and equal
+        return matched
+
+    def check_write(self, parameters: list, codes: list) -> bool:
+        ok = True
+        for param in parameters:
+            try:
+                field = self._field_map.field(param.number)
+            except KeyError:
+                codes.append(GF_PARAM_INVALID_FIELD)
+                ok = False
+                continue
+            if param.number not in self._writable:
+                codes.append(GF_PARAM_ACCESS_DENIED)
+                ok = False
+                continue
+            try:
+                field.to_bytes(param.value)
+            except (ValueError, TypeError):
+                codes.append(GF_PARAM_OUT_OF_RANGE)
+                ok = False
+                continue
+            codes.append(GF_PARAM_OK)
+        return ok
+
+    def write(self, parameters: list):
+        changed = []
+        for param in parameters:
+            attribute = self._field_map.field(param.number).attribute
+            setattr(self._obj, attribute, param.value)
+            changed.append(attribute)
+        if self._on_change is not None:
+            self._on_change(self, changed)
+
+    def request(self, requester: int):
+        if self._on_request is not None:
+            self._on_request(requester)
+            return None
+        return self._obj
+
+    def set_interval(self, interval, offset) -> int:
+        if self._on_interval is None:
+            return GF_TI_NOT_SUPPORTED
+        return self._on_interval(interval, offset)
+
+
+class GroupFunctionResponder:
+    '''
+    Process the Group Functions received by an application for its targets
+    '''
+
+    def __init__(self, name: str):
+        self._name = name
+        self._targets = {}
+
+    def add_target(self, target: GroupFunctionTarget):
+        self._targets[target.pgn] = target
+
+    def target(self, pgn: int) -> GroupFunctionTarget:
+        return self._targets.get(pgn)
+
+    def process(self, group_function: GroupFunction, requester: int):
+        '''
+        Returns the Group Function to send back, or the PGN object to send for a successful Request
+        or None when nothing shall be sent
+        '''
+        pgn = group_function.function_pgn
+        target = self._targets.get(pgn)
+        if target is None:
+            _logger.debug("%s Group Function %d on PGN %d not supported" % (self._name, group_function.function,
+                                                                           pgn))
+            return self.acknowledge(group_function, [], pgn_error_code=GF_PGN_NOT_SUPPORTED)
+        function = group_function.function
+        if function == GF_REQUEST:
+            return self.request(target, group_function, requester)
+        elif function == GF_COMMAND:
+            return self.command(target, group_function)
+        elif function == GF_READ_FIELDS:
+            return self.read_fields(target, group_function)
+        elif function == GF_WRITE_FIELDS:
+            return self.write_fields(target, group_function)
+        _logger.error("%s Group Function code %d not processed" % (self._name, function))
+        return None
+
+    @staticmethod
+    def acknowledge(group_function: GroupFunction, codes: list, pgn_error_code=GF_PGN_OK,
+                    transmission_error_code=GF_TI_OK) -> AcknowledgeGroupFunction:
+        '''
+        Acknowledge with one code per parameter of the Group Function, the parameters that have not been
+        processed are acknowledged, the ones from a decoding error are invalid
+        '''
+        ack = AcknowledgeGroupFunction(pgn=group_function.function_pgn, pgn_error_code=pgn_error_code,
+                                       transmission_error_code=transmission_error_code)
+        error = group_function.decode_error
+        for code in codes:
+            ack.add_parameter(code)
+        for index in range(len(codes), group_function.nb_parameters):
+            ack.add_parameter(GF_PARAM_INVALID_FIELD if 0 <= error <= index else GF_PARAM_OK)
+        return ack
+
+    def request(self, target: GroupFunctionTarget, request, requester: int):
+        codes = []
+        if not target.match(request.selection, codes) or request.decode_error >= 0:
+            return self.acknowledge(request, codes, pgn_error_code=GF_PGN_NOT_AVAILABLE)
+        if request.interval is not None or request.offset is not None:
+            ti_code = target.set_interval(request.interval, request.offset)
+            if ti_code != GF_TI_OK:
+                return self.acknowledge(request, codes, transmission_error_code=ti_code)
+        return target.request(requester)
+
+    def command(self, target: GroupFunctionTarget, command):
+        if command.pgn_class is not None:
+            # PGN with a specific parameters encoding
+            ack = AcknowledgeGroupFunction(pgn=target.pgn)
+            command.pgn_class.execute_command_parameters(target.obj, command.parameters, ack)
+            return ack
+        ti_code = GF_TI_OK
+        if command.priority != GF_PRIORITY_UNCHANGED and command.priority > 7:
+            ti_code = GF_TI_NOT_SUPPORTED
+        if target.field_map is None:
+            return self.acknowledge(command, [GF_PARAM_ACCESS_DENIED] * command.nb_parameters,
+                                    pgn_error_code=GF_PGN_READ_WRITE_NOT_SUPPORTED, transmission_error_code=ti_code)
+        codes = []
+        ok = target.check_write(command.parameters, codes) and command.decode_error < 0
+        if ok and ti_code == GF_TI_OK:
+            # all parameters are applied or none
+            target.write(command.parameters)
+            if command.priority != GF_PRIORITY_UNCHANGED:
+                target.obj.priority = command.priority
+        return self.acknowledge(command, codes, transmission_error_code=ti_code)
+
+    def check_selection(self, target: GroupFunctionTarget, fields_function, codes: list) -> bool:
+        if not target.match(fields_function.selection, codes):
+            return False
+        return fields_function.decode_error < 0 or fields_function.decode_error >= fields_function.nb_selection
+
+    def read_fields(self, target: GroupFunctionTarget, read):
+        codes = []
+        if target.field_map is None:
+            return self.acknowledge(read, codes, pgn_error_code=GF_PGN_READ_WRITE_NOT_SUPPORTED)
+        if not self.check_selection(target, read, codes):
+            return self.acknowledge(read, codes, pgn_error_code=GF_PGN_NOT_AVAILABLE)
+        values = []
+        for number in read.parameters:
+            try:
+                target.field_map.field(number)
+            except KeyError:
+                codes.append(GF_PARAM_INVALID_FIELD)
+                continue
+            codes.append(GF_PARAM_OK)
+            values.append(GroupParameter(number, target.value(number)))
+        if any(codes) or read.decode_error >= 0:
+            return self.acknowledge(read, codes)
+        return ReadFieldsReplyGroupFunction(pgn=target.pgn, unique_id=read.unique_id, selection=read.selection,
+                                            parameters=values, manufacturer_code=read.manufacturer_code)
+
+    def write_fields(self, target: GroupFunctionTarget, write):
+        codes = []
+        if target.field_map is None:
+            return self.acknowledge(write, codes, pgn_error_code=GF_PGN_READ_WRITE_NOT_SUPPORTED)
+        if not self.check_selection(target, write, codes):
+            return self.acknowledge(write, codes, pgn_error_code=GF_PGN_NOT_AVAILABLE)
+        if not target.check_write(write.parameters, codes) or write.decode_error >= 0:
+            return self.acknowledge(write, codes)
+        target.write(write.parameters)
+        values = [GroupParameter(param.number, target.value(param.number)) for param in write.parameters]
+        return WriteFieldsReplyGroupFunction(pgn=target.pgn, unique_id=write.unique_id, selection=write.selection,
+                                             parameters=values, manufacturer_code=write.manufacturer_code)
+
+
+class GroupFunctionTransaction:
+    '''
+    Group Function sent by a local application and waiting for its reply
+    status: pending, complete, rejected (Acknowledge with error codes), timeout, failed (not sent)
+    The callback(transaction) is called once when the transaction ends, it shall not block
+    '''
+
+    __slots__ = ('local', 'peer', 'pgn', 'function', 'unique_id', 'status', 'reply', 'start_time', 'end_time',
+                 'deadline', '_callback', '_event')
+
+    def __init__(self, local: int, peer: int, group_function: GroupFunction, callback=None):
+        self.local = local
+        self.peer = peer
+        self.pgn = group_function.function_pgn
+        self.function = group_function.function
+        self.unique_id = getattr(group_function, 'unique_id', None)
+        self.status = "pending"
+        self.reply = None
+        self.start_time = time.monotonic()
+        self.end_time = 0.0
+        self.deadline = None
+        self._callback = callback
+        self._event = threading.Event()
+
+    @property
+    def key(self) -> tuple:
+        return self.local, self.peer, self.pgn
+
+    @property
+    def duration(self) -> float:
+        if self.end_time == 0.0:
+            return time.monotonic() - self.start_time
+        return self.end_time - self.start_time
+
+    @property
+    def acknowledge(self) -> AcknowledgeGroupFunction:
+        if self.reply is not None and type(self.reply) is AcknowledgeGroupFunction:
+            return self.reply
+        return None
+
+    def values(self) -> dict:
+        '''
+        Field values of a Read Fields or Write Fields reply by attribute name
+        '''
+        if not isinstance(self.reply, GroupFunction) or self.reply.function not in (GF_READ_FIELDS_REPLY,
+                                                                                     GF_WRITE_FIELDS_REPLY):
+            return {}
+        field_map = self.reply.field_map
+        return {field_map.field(param.number).attribute: param.value for param in self.reply.parameters}
+
+    def wait(self, timeout: float = None) -> bool:
+        '''
+        Wait for the end of the transaction, returns True if the transaction is complete
+        '''
+        self._event.wait(timeout)
+        return self.status == "complete"
+
+    def end(self, status: str, reply=None):
+        self.status = status
+        self.reply = reply
+        self.end_time = time.monotonic()
+        self.deadline = None
+        self._event.set()
+        if self._callback is not None:
+            try:
+                self._callback(self)
+            except Exception as err:
+                _logger.error(f"Group Function transaction callback error {err.__class__.__name__}:{err}")
+
+
+class GroupFunctionTransactions(NavThread):
+    '''
+    Pending Group Function transactions of a controller, the thread manages the deadlines of all transactions
+    Only one transaction per (local address, peer address, PGN) can be pending
+    '''
+
+    def __init__(self, name: str):
+        super().__init__(name=name, daemon=True)
+        self._pending = {}
+        self._nb_requests = 0
+        self._heap = []
+        self._counter = 0
+        self._cond = threading.Condition()
+        self._stop_flag = False
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    def counters(self) -> tuple:
+        '''
+        return (pending, completed, rejected, timeouts)
+        '''
+        return len(self._pending), self._completed, self._rejected, self._timeouts
+
+    @property
+    def requests_pending(self) -> bool:
+        return self._nb_requests > 0
+
+    def start_transaction(self, local: int, peer: int, group_function: GroupFunction, timeout: float,
+                          callback=None) -> GroupFunctionTransaction:
+        '''
+        Register the transaction before the Group Function is sent, returns None if a transaction is already
+        pending for the same local address, peer and PGN
+        '''
+        transaction = GroupFunctionTransaction(local, peer, group_function, callback)
+        with self._cond:
+            if transaction.key in self._pending:
+                _logger.error("Group Function transaction already pending from %d to %d on PGN %d" %
+                              transaction.key)
+                return None
+            self._pending[transaction.key] = transaction
+            if transaction.function == GF_REQUEST:
+                self._nb_requests += 1
+            transaction.deadline = transaction.start_time + timeout
+            self._counter += 1
+            heapq.heappush(self._heap, (transaction.deadline, self._counter, transaction))
+            if self._heap[0][2] is transaction:
+                self._cond.notify()
+        return transaction
+
+    def _remove(self, transaction: GroupFunctionTransaction):
+        # called with the lock held
+        del self._pending[transaction.key]
+        if transaction.function == GF_REQUEST:
+            self._nb_requests -= 1
+        transaction.deadline = None
+
+    def _find(self, local: int, peer: int, pgn: int) -> GroupFunctionTransaction:
+        transaction = self._pending.get((local, peer, pgn))
+        if transaction is None:
+            # broadcast request answered by any device
+            transaction = self._pending.get((local, 255, pgn))
+        return transaction
+
+    def end_transaction(self, transaction: GroupFunctionTransaction, status: str, reply=None):
+        with self._cond:
+            if self._pending.get(transaction.key) is not transaction:
+                return
+            self._remove(transaction)
+        self._end(transaction, status, reply)
+
+    def _end(self, transaction: GroupFunctionTransaction, status: str, reply):
+        if status == "complete":
+            self._completed += 1
+        elif status == "rejected":
+            self._rejected += 1
+        elif status == "timeout":
+            self._timeouts += 1
+        transaction.end(status, reply)
+
+    def reply_received(self, local: int, reply: GroupFunction) -> bool:
+        '''
+        Process an Acknowledge, Read Fields Reply or Write Fields Reply received by a local application
+        returns False if there is no transaction for that reply
+        '''
+        with self._cond:
+            transaction = self._find(local, reply.sa, reply.function_pgn)
+            if transaction is None:
+                return False
+            if reply.function == GF_ACKNOWLEDGE:
+                if transaction.function == GF_COMMAND:
+                    status = "complete" if reply.accepted else "rejected"
+                elif reply.accepted:
+                    # positive acknowledge of a request, the PGN is still expected
+                    return True
+                else:
+                    status = "rejected"
+            elif ((reply.function == GF_READ_FIELDS_REPLY and transaction.function == GF_READ_FIELDS) or
+                  (reply.function == GF_WRITE_FIELDS_REPLY and transaction.function == GF_WRITE_FIELDS)):
+                if reply.unique_id != transaction.unique_id:
+                    _logger.warning("Group Function reply from %d PGN %d unique id %d expected %d" %
+                                    (reply.sa, reply.function_pgn, reply.unique_id, transaction.unique_id))
+                    return False
+                status = "complete"
+            else:
+                return False
+            self._remove(transaction)
+        self._end(transaction, status, reply)
+        return True
+
+    def message_received(self, msg: NMEA2000Msg):
+        '''
+        Complete the Requests waiting for that PGN
+        '''
+        ended = []
+        with self._cond:
+            for transaction in self._pending.values():
+                if (transaction.function == GF_REQUEST and transaction.pgn == msg.pgn and
+                        transaction.peer in (msg.sa, 255) and msg.da in (transaction.local, 255)):
+                    ended.append(transaction)
+            for transaction in ended:
+                self._remove(transaction)
+        for transaction in ended:
+            self._end(transaction, "complete", msg)
+
+    def stop(self):
+        with self._cond:
+            self._stop_flag = True
+            self._cond.notify()
+
+    def nrun(self):
+        while not self._stop_flag:
+            expired = []
+            with self._cond:
+                now = time.monotonic()
+                while len(self._heap) > 0 and self._heap[0][0] <= now:
+                    deadline, counter, transaction = heapq.heappop(self._heap)
+                    if transaction.deadline == deadline:
+                        self._remove(transaction)
+                        expired.append(transaction)
+                if len(expired) == 0:
+                    if len(self._heap) > 0:
+                        self._cond.wait(self._heap[0][0] - now)
+                    else:
+                        self._cond.wait(1.0)
+                    continue
+            for transaction in expired:
+                _logger.warning("Group Function %d from %d to %d on PGN %d timeout" %
+                                (transaction.function, transaction.local, transaction.peer, transaction.pgn))
+                self._end(transaction, "timeout", None)
@@ -14,7 +14,8 @@ import logging
 
 from navigation_server.router_core import ExternalPublisher, NMEA0183Msg, NMEA2000Msg, NMEAInvalidFrame
 from .nmea2k_decode_dispatch import get_n2k_decoded_object, N2KMissingDecodeEncodeException
-from navigation_server.router_common import NavGenericMsg, N2K_MSG, N0183_MSG
+from navigation_server.router_common import (NavGenericMsg, N2K_MSG, N0183_MSG, LatencyTracker, FaultInjector,
+                                             InjectedRpcError)
 from navigation_server.nmea2000_datamodel import NMEA2000DecodedMsg, N2K_DECODED
 from .nmea0183_to_nmea2k import NMEA0183ToNMEA2000Converter
 
@@ -42,6 +43,9 @@ class GrpcPublisher(ExternalPublisher):
         # we consider that by default filters are select not discard => can be overridden by configuration
         self._filter_select = opts.get('filter_select', bool, True)
         self._address = "%s:%d" % (opts.get('address', str, '127.0.0.1'), opts.get('port', int, 4502))
+        self._send_latency = LatencyTracker.histogram('grpc_send', self.object_name())
+        # chaos mode, None unless faults are configured for the publisher
+        self._faults = FaultInjector.point(f"grpc:{self.object_name()}")
         self._channel = None
         self._stub = None
         self.open_channel()
@@ -51,6 +55,9 @@ class GrpcPublisher(ExternalPublisher):
         self._nb_lost_msg = 0
         self._retry_in_progress = False
 
+    def _filter_selection(self, opts, filters) -> bool:
+        return opts.get('filter_select', bool, True)
+
     def open_channel(self):
         """
         Open channel at object creation and during retries
@@ -74,6 +81,7 @@ class GrpcPublisher(ExternalPublisher):
             self.process_n2k_raw(gen_msg.msg)
         elif gen_msg.type == N2K_DECODED:
             self.send_decoded_n2k(gen_msg)
+        self._send_latency.record_since(gen_msg.stamp)
         return True
 
     def process_n2k_raw(self, n2k_msg: NMEA2000Msg):
@@ -135,6 +143,7 @@ class GrpcPublisher(ExternalPublisher):
     def send_pb_message(self, msg):
         _logger.debug("gRPC Publisher send decoded message: %s" % msg)
         try:
+            self.inject_channel_faults()
             resp = self._stub.pushDecodedNMEA2K(msg)
         except grpc.RpcError as err:
             if err.code() != grpc.StatusCode.UNAVAILABLE:
@@ -156,6 +165,7 @@ class GrpcPublisher(ExternalPublisher):
     def send_message(self, msg):
         _logger.debug("gRPC Publisher send message pushNMEA: %s" % msg)
         try:
+            self.inject_channel_faults()
             resp = self._stub.pushNMEA(msg)
         except grpc.RpcError as err:
             if err.code() != grpc.StatusCode.UNAVAILABLE:
@@ -179,6 +189,18 @@ class GrpcPublisher(ExternalPublisher):
         if resp.reportCode != 0:
             _logger.error("Grpc Publisher error returned by server %s" % resp.status)
 
+    def inject_channel_faults(self):
+        """
+        Chaos mode: the channel is closed and the call fails as if the server was gone
+        """
+        if self._faults is None:
+            return
+        self._faults.stall()
+        if self._faults.event('close_channel'):
+            _logger.warning(f"GrpcPublisher {self._name} channel closed by fault injection")
+            self._channel.close()
+            raise InjectedRpcError()
+
     def check_status(self) -> bool:
         msg = server_cmd()
         msg.cmd = "TEST_STATUS"
@@ -1,6 +1,7 @@
 # -------------------------------------------------------------------------------
 # Name:        NMEA2K-CAN messages classes
-# Purpose:     Classes to implement ISO and CAN services messages 59904, 60928, 65240, 126992, 126993, 126996
+# Purpose:     Classes to implement ISO and CAN services messages 59904, 60928, 65240, 126208, 126992, 126993,
+#              126996, 126998
 #
 # Author:      Laurent Carré
 #
@@ -12,11 +13,16 @@
 import logging
 import struct
 from collections import namedtuple
+from math import isnan
 
 from navigation_server.router_common import N2KUnknownPGN, find_pgn, NavGenericMsg, N2K_MSG
 from navigation_server.router_core import NMEA2000Msg
-from navigation_server.nmea2000_datamodel import NMEA2000Name, PGNDef,extract_var_str
+from navigation_server.nmea2000_datamodel import (NMEA2000Name, PGNDef, extract_var_str, clean_string, BitField,
+                                                  REPEATED_FIELD_SET)
 from navigation_server.generated.nmea2000_classes_iso_gen import Pgn126996Class, Pgn126998Class, Pgn126993Class
+from navigation_server.generated.nmea2000_classes_iso_gen import (
+    nmea2k_generated_classes as nmea2k_iso_generated_classes)
+from navigation_server.generated.nmea2000_classes_gen import nmea2k_generated_classes
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
@@ -37,8 +43,11 @@ class NMEA2000Object:
         try:
             self._pgn_def = find_pgn(pgn)
         except N2KUnknownPGN:
-            _logger.error("NMEA2000Object creation with unknown PGN %d" % pgn)
-            raise
+            if pgn not in PGNDef.pgn_service:
+                _logger.error("NMEA2000Object creation with unknown PGN %d" % pgn)
+                raise
+            # service PGN fully handled by the subclass (Group Function)
+            self._pgn_def = None
         self._sa = 0
         self._da = 255
         self._fields = None
@@ -58,7 +67,7 @@ class NMEA2000Object:
     def message(self):
         if self._message is None:
             self._message = NMEA2000Msg(self._pgn, self._prio, self._sa, self._da, self.encode_payload())
-        if self._pgn_def.pdu_format == PGNDef.PDU1 and self._da == 0:
+        if self._pgn_def is not None and self._pgn_def.pdu_format == PGNDef.PDU1 and self._da == 0:
             _logger.warning("NMEA2000 Message with PDU1 format and no destination address")
         return self._message
 
@@ -203,37 +212,6 @@ class ProductInformation(Pgn126996Class):
 
 class ConfigurationInformation(Pgn126998Class):
 
-    @staticmethod
-    def decode_command_parameters(nb_param: int, buffer: bytearray, index: int):
-        _logger.debug("Group Function on 126998 nb_param %d param %s" % (nb_param, buffer))
-        param_processed = 0
-        result = []
-        while param_processed < nb_param:
-            param_num = buffer[index]
-            index += 1
-            if param_num == 1 or param_num == 2:
-                str_value, param_len = extract_var_str(buffer, index)
-                _logger.debug("Group Function for 126998 param %d value %s" % (param_num, str_value))
-                result.append((param_num, str_value))
-                index += param_len
-            else:
-                _logger.error("Group Function for 126998 Parameter Error: %d" % param_num)
-            param_processed += 1
-        return result
-
-    @staticmethod
-    def execute_command_parameters(target_obj, parameters: list, ack):
-        for param in parameters:
-            if param[0] == 1:
-                target_obj.installation_1 = param[1]
-                res = 0
-            elif param[0] == 2:
-                target_obj.installation_2 = param[1]
-                res = 0
-            else:
-                res = 1
-            ack.add_parameter(res)
-
     def __init__(self, message=None):
         super().__init__(message=message)
         self._da = 255
@@ -278,9 +256,255 @@ class CommandedAddress(NMEA2000Object):
         return self._commanded_address
 
 
-def create_group_function(message: NMEA2000Msg):
-    function = message.payload[0]
-    return group_function_table[function](message)
+
+
+#
+#   Group Function (PGN 126208)
+#
+
+(GF_REQUEST, GF_COMMAND, GF_ACKNOWLEDGE, GF_READ_FIELDS, GF_READ_FIELDS_REPLY, GF_WRITE_FIELDS,
+ GF_WRITE_FIELDS_REPLY) = range(7)
+
+# PGN error codes
+GF_PGN_OK = 0
+GF_PGN_NOT_SUPPORTED = 1
+GF_PGN_NOT_AVAILABLE = 2
+GF_PGN_ACCESS_DENIED = 3
+GF_PGN_REQUEST_NOT_SUPPORTED = 4
+GF_PGN_TAG_NOT_SUPPORTED = 5
+GF_PGN_READ_WRITE_NOT_SUPPORTED = 6
+
+# Transmission interval / priority error codes
+GF_TI_OK = 0
+GF_TI_NOT_SUPPORTED = 1
+GF_TI_TOO_LOW = 2
+GF_TI_ACCESS_DENIED = 3
+GF_TI_REQUEST_NOT_SUPPORTED = 4
+
+# Parameter error codes
+GF_PARAM_OK = 0
+GF_PARAM_INVALID_FIELD = 1
+GF_PARAM_TEMPORARY_ERROR = 2
+GF_PARAM_OUT_OF_RANGE = 3
+GF_PARAM_ACCESS_DENIED = 4
+GF_PARAM_NOT_SUPPORTED = 5
+GF_PARAM_READ_WRITE_NOT_SUPPORTED = 6
+
+GF_PRIORITY_UNCHANGED = 8
+
+
+class GroupFunctionField:
+    '''
+    Field of a PGN as addressed by the Group Functions: the number is the order of the field in the PGN definition
+    starting at 1 and the value is the one of the attribute in the generated class.
+    On the bus the value is byte aligned (bit fields take a full byte)
+    '''
+
+    (INT, FLOAT, FIX_STR, VAR_STR, NAME, BYTES) = range(6)
+
+    __slots__ = ('_number', '_name', '_attribute', '_field', '_kind', '_length', '_signed', '_min', '_max',
+                 '_invalid')
+
+    def __init__(self, number: int, field, attribute: str):
+        self._number = number
+        self._name = field.name
+        self._attribute = attribute
+        self._field = field
+        self._length = field.length()
+        self._signed = False
+        self._min = self._max = self._invalid = 0
+        field_type = field.type()
+        if field_type == 'VarLengthStringField':
+            self._kind = self.VAR_STR
+        elif field_type == 'FixLengthStringField':
+            self._kind = self.FIX_STR
+        elif field_type == 'NameField':
+            self._kind = self.NAME
+            self._length = 8
+        elif field_type == 'BytesField':
+            self._kind = self.BYTES
+        else:
+            self._kind = self.FLOAT if field.python_type == 'float' else self.INT
+            bit_length = field.bit_length
+            self._signed = field.signed
+            if self._signed:
+                self._min = -(1 << (bit_length - 1))
+                self._max = (1 << (bit_length - 1)) - 1
+            else:
+                self._max = (1 << bit_length) - 1
+            self._invalid = self._max
+
+    @property
+    def number(self) -> int:
+        return self._number
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def attribute(self) -> str:
+        return self._attribute
+
+    def _int_value(self, value) -> int:
+        if self._kind == self.FLOAT:
+            value = float(value)
+            if isnan(value):
+                return self._invalid
+            value = self._field.convert_to_int(value)
+        elif type(value) is not int and type(value) is not bool:
+            raise ValueError(f"Field {self._name} integer value expected")
+        value = int(value)
+        if value < self._min or value > self._max:
+            raise ValueError(f"Field {self._name} value {value} out of range")
+        return value
+
+    def encode(self, value, buffer: bytearray):
+        '''
+        Append the value to the buffer, raise ValueError if the value cannot be encoded in the field
+        '''
+        if self._kind == self.INT or self._kind == self.FLOAT:
+            buffer.extend(self._int_value(value).to_bytes(self._length, 'little', signed=self._signed))
+        elif self._kind == self.VAR_STR:
+            data = str(value).encode()
+            if len(data) > 253:
+                raise ValueError(f"Field {self._name} string too long")
+            buffer.append(len(data) + 2)
+            buffer.append(1)
+            buffer.extend(data)
+        elif self._kind == self.NAME:
+            buffer.extend(value.bytes())
+        else:
+            data = str(value).encode() if self._kind == self.FIX_STR else bytes(value)
+            if len(data) > self._length:
+                raise ValueError(f"Field {self._name} value longer than {self._length} bytes")
+            buffer.extend(data)
+            buffer.extend(b'\xff' * (self._length - len(data)))
+
+    def to_bytes(self, value) -> bytes:
+        buffer = bytearray()
+        self.encode(value, buffer)
+        return bytes(buffer)
+
+    def decode(self, payload, index: int):
+        '''
+        Decode the value at index, returns (value, index of the next byte)
+        The integer values are not checked against the field range, raise ValueError if the payload is too short
+        '''
+        if self._kind == self.VAR_STR:
+            if index + 2 > len(payload):
+                raise ValueError(f"Field {self._name} truncated")
+            value, length = extract_var_str(payload, index)
+            if length < 2 or index + length > len(payload):
+                raise ValueError(f"Field {self._name} invalid string length")
+            return value, index + length
+        end = index + self._length
+        if end > len(payload):
+            raise ValueError(f"Field {self._name} truncated")
+        data = bytes(payload[index:end])
+        if self._kind == self.INT:
+            value = int.from_bytes(data, 'little', signed=self._signed)
+        elif self._kind == self.FLOAT:
+            value = int.from_bytes(data, 'little', signed=self._signed)
+            if value == self._invalid:
+                value = float('nan')
+            else:
+                value = self._field.apply_scale_offset(float(value))
+        elif self._kind == self.FIX_STR:
+            value = clean_string(bytearray(data))
+        elif self._kind == self.NAME:
+            value = NMEA2000Name(data)
+        else:
+            value = data
+        return value, end
+
+
+class GroupFunctionFieldMap:
+    '''
+    Fields of a PGN that can be selected, read or written by the Group Functions
+    These are the fields of the generated class (nmea2000_classes_gen) numbered from the PGN definition
+    The maps are built on first use and shared
+    '''
+
+    _maps = {}
+
+    @classmethod
+    def for_pgn(cls, pgn: int, manufacturer_id: int = 0):
+        '''
+        Returns the map for the PGN or None if there is no generated class for it
+        '''
+        key = (pgn, manufacturer_id)
+        try:
+            return cls._maps[key]
+        except KeyError:
+            pass
+        field_map = None
+        generated_class = _generated_classes.get(pgn)
+        if isinstance(generated_class, dict):
+            generated_class = generated_class.get(manufacturer_id)
+        if generated_class is not None:
+            try:
+                field_map = cls(generated_class, find_pgn(pgn, manufacturer_id))
+            except N2KUnknownPGN:
+                _logger.error("Group Function no definition for PGN %d" % pgn)
+        cls._maps[key] = field_map
+        return field_map
+
+    def __init__(self, generated_class, pgn_def):
+        self._pgn = pgn_def.id
+        self._generated_class = generated_class
+        attributes = {fmt.field_name: fmt.attribute for fmt in generated_class._json_format}
+        self._fields = {}
+        self._by_name = {}
+        for pgn_field in pgn_def.field_list:
+            if isinstance(pgn_field, BitField):
+                sub_fields = [bf.field() for bf in pgn_field.sub_fields()]
+            elif pgn_field.decode_method == REPEATED_FIELD_SET:
+                # the repeated fields are not addressable
+                break
+            else:
+                sub_fields = [pgn_field]
+            for field in sub_fields:
+                try:
+                    attribute = attributes[field.name][1:]
+                except KeyError:
+                    # reserved or not generated
+                    continue
+                gf_field = GroupFunctionField(field.index + 1, field, attribute)
+                self._fields[gf_field.number] = gf_field
+                self._by_name[field.name] = gf_field
+                self._by_name[attribute] = gf_field
+
+    @property
+    def pgn(self) -> int:
+        return self._pgn
+
+    @property
+    def generated_class(self):
+        return self._generated_class
+
+    def fields(self) -> list:
+        return list(self._fields.values())
+
+    def field(self, key) -> GroupFunctionField:
+        '''
+        Field by number, attribute or field name, raise KeyError if the field does not exist
+        '''
+        if type(key) is int:
+            return self._fields[key]
+        return self._by_name[key]
+
+    def resolve(self, parameters) -> list:
+        '''
+        Convert a dictionary or a list of (key, value) into a list of GroupParameter
+        The keys are field numbers, attributes or field names, raise KeyError for an unknown field
+        '''
+        if isinstance(parameters, dict):
+            parameters = parameters.items()
+        return [GroupParameter(self.field(key).number, value) for key, value in parameters]
+
+    def numbers(self, fields) -> list:
+        return [self.field(key).number for key in fields]
 
 
 class GroupFunction(NMEA2000Object):
@@ -294,23 +518,31 @@ class GroupFunction(NMEA2000Object):
     def __init__(self, message: NMEA2000Msg = None, function=0, pgn=0):
 
         super().__init__(126208)
+        self._prio = 3
+        self._pgn_class = None
+        self._field_map = None
+        self._decode_error = -1
         if message is not None:
             # the object is created from an incoming message
             self._sa = message.sa
+            self._da = message.da
+            self._message = message
             v = self.function_str.unpack_from(message.payload, 0)
             self._function = v[0]
             self._function_pgn = v[1] + (v[2] << 16)
+            if self._function_pgn > 0x1FFFF:
+                raise ValueError(f"Group Function invalid PGN {self._function_pgn}")
             _logger.debug("Group Function [%d] on PGN %d" % (self._function, self._function_pgn))
-            try:
-                self._pgn_class = pgn_function_table[self._function_pgn]
-            except KeyError:
-                self._pgn_class = None
+            self._pgn_class = pgn_function_table.get(self._function_pgn)
+            if self._pgn_class is None:
+                self._field_map = GroupFunctionFieldMap.for_pgn(self._function_pgn)
 
         elif pgn > 0:
             # the object is created internally
             _logger.debug("New Group Function command=%d for PGN %d" % (function, pgn))
             self._function_pgn = pgn
             self._function = function
+            self._field_map = GroupFunctionFieldMap.for_pgn(pgn)
 
         else:
             raise ValueError
@@ -327,14 +559,108 @@ class GroupFunction(NMEA2000Object):
     def pgn_class(self):
         return self._pgn_class
 
+    @property
+    def field_map(self) -> GroupFunctionFieldMap:
+        return self._field_map
+
+    @property
+    def is_reply(self) -> bool:
+        return self._function in (GF_ACKNOWLEDGE, GF_READ_FIELDS_REPLY, GF_WRITE_FIELDS_REPLY)
+
+    @property
+    def decode_error(self) -> int:
+        '''
+        Index of the first parameter that could not be decoded (selection pairs first), -1 if all are decoded
+        '''
+        return self._decode_error
+
+    def decode_pairs(self, payload, index: int, nb_pairs: int, first: int = 0):
+        '''
+        Decode nb_pairs (field number, value), returns the list of GroupParameter and the index after the last one
+        The decoding stops on the first unknown field number or truncated value
+        '''
+        pairs = []
+        while len(pairs) < nb_pairs:
+            if self._field_map is None or index >= len(payload):
+                self._decode_error = first + len(pairs)
+                break
+            number = payload[index]
+            try:
+                value, index = self._field_map.field(number).decode(payload, index + 1)
+            except (KeyError, ValueError) as err:
+                _logger.error("Group Function on PGN %d parameter %d error %s" % (self._function_pgn, number, err))
+                self._decode_error = first + len(pairs)
+                break
+            pairs.append(GroupParameter(number, value))
+        return pairs, index
+
+    def encode_pairs(self, buffer: bytearray, pairs):
+        for param in pairs:
+            buffer.append(param.number)
+            self._field_map.field(param.number).encode(param.value, buffer)
+
+    def encode_payload(self) -> bytearray:
+        buffer = bytearray(self.function_str.pack(self._function, self._function_pgn & 0xFFFF,
+                                                  (self._function_pgn >> 16) & 0xFF))
+        self.encode_content(buffer)
+        return buffer
+
+    def encode_content(self, buffer: bytearray):
+        raise NotImplementedError("Method encode_content To be implemented in subclass")
+
+
+class RequestGroupFunction(GroupFunction):
+    '''
+    Request the transmission of a PGN, optionally with a new transmission interval (seconds)
+    and selection pairs that the PGN field values shall match
+    '''
+
+    header_struct = struct.Struct("<IHB")
+
+    def __init__(self, message=None, pgn=0, interval=None, offset=None, selection=()):
+        super().__init__(message, function=GF_REQUEST, pgn=pgn)
+        if message is not None:
+            v = self.header_struct.unpack_from(message.payload, 4)
+            self._interval = None if v[0] == 0xFFFFFFFF else v[0] * 0.001
+            self._offset = None if v[1] == 0xFFFF else v[1] * 0.01
+            self._nb_param = v[2]
+            self._selection, index = self.decode_pairs(message.payload, 11, v[2])
+        else:
+            self._interval = interval
+            self._offset = offset
+            self._selection = list(selection)
+            self._nb_param = len(self._selection)
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def offset(self):
+        return self._offset
+
+    @property
+    def selection(self) -> list:
+        return self._selection
+
+    @property
+    def nb_parameters(self) -> int:
+        return self._nb_param
+
+    def encode_content(self, buffer: bytearray):
+        interval = 0xFFFFFFFF if self._interval is None else round(self._interval * 1000.)
+        offset = 0xFFFF if self._offset is None else round(self._offset * 100.)
+        buffer.extend(self.header_struct.pack(interval, offset, len(self._selection)))
+        self.encode_pairs(buffer, self._selection)
+
 
 class CommandGroupFunction(GroupFunction):
 
     header_struct = struct.Struct("<BB")
 
-    def __init__(self, message=None, pgn=0):
+    def __init__(self, message=None, pgn=0, priority=GF_PRIORITY_UNCHANGED, parameters=()):
 
-        super().__init__(message, function=1, pgn=pgn)
+        super().__init__(message, function=GF_COMMAND, pgn=pgn)
         if message is not None:
             # decode the rest of the message
             v = self.header_struct.unpack_from(message.payload, 4)
@@ -343,39 +669,67 @@ class CommandGroupFunction(GroupFunction):
             if self._pgn_class is not None:
                 self._params = self._pgn_class.decode_command_parameters(self._nb_param, message.payload, 6)
             else:
-                self._params = None
+                self._params, index = self.decode_pairs(message.payload, 6, self._nb_param)
+        else:
+            self._priority = priority
+            self._params = list(parameters)
+            self._nb_param = len(self._params)
 
     @property
-    def parameters(self):
-        return self._params
+    def priority(self) -> int:
+        return self._priority
 
+    @property
+    def nb_parameters(self) -> int:
+        return self._nb_param
 
-class RequestGroupFunction(GroupFunction):
+    @property
+    def parameters(self):
+        return self._params
 
-    def __init__(self,message=None, pgn=0):
-        super().__init__(message, function=0, pgn=pgn)
+    def encode_content(self, buffer: bytearray):
+        buffer.extend(self.header_struct.pack(0xF0 | (self._priority & 0xF), len(self._params)))
+        self.encode_pairs(buffer, self._params)
 
 
 class AcknowledgeGroupFunction(GroupFunction):
+    '''
+    Result of a Command, or error on the other functions
+    The error codes are 4 bits values, the PGN error code is in the low order bits
+    '''
 
     header_struct = struct.Struct("<BB")
-    full_header_struct = struct.Struct("<BHBBB")
 
-    def __init__(self, message=None, pgn=0, pgn_error_code=0):
-        super().__init__(message, function=2, pgn=pgn)
+    def __init__(self, message=None, pgn=0, pgn_error_code=GF_PGN_OK, transmission_error_code=GF_TI_OK):
+        super().__init__(message, function=GF_ACKNOWLEDGE, pgn=pgn)
+        self._params = []
         if message is not None:
             v = self.header_struct.unpack_from(message.payload, 4)
-            self._pgn_error_code = (v[0] >> 4) & 0xF
-            self._transmission_error_code = v[0] & 0xF
+            self._pgn_error_code = v[0] & 0xF
+            self._transmission_error_code = (v[0] >> 4) & 0xF
             self._nb_param = v[1]
-            self._params = []
-            self.unpack_params(message[6:])
+            self.unpack_params(message.payload[6:])
         else:
             self._pgn_error_code = pgn_error_code
-            self._transmission_error_code = 0
+            self._transmission_error_code = transmission_error_code
             self._nb_param = 0
-            self._prio = 3
-            self._params = []
+
+    @property
+    def pgn_error_code(self) -> int:
+        return self._pgn_error_code
+
+    @property
+    def transmission_error_code(self) -> int:
+        return self._transmission_error_code
+
+    @property
+    def parameters(self) -> list:
+        return self._params
+
+    @property
+    def accepted(self) -> bool:
+        return (self._pgn_error_code == GF_PGN_OK and self._transmission_error_code == GF_TI_OK and
+                not any(self._params))
 
     def add_parameter(self, value):
         self._nb_param += 1
@@ -383,68 +737,185 @@ class AcknowledgeGroupFunction(GroupFunction):
 
     def unpack_params(self, buffer):
         p_idx = 0
-        b_idx = 0
-        while p_idx < self._nb_param:
-            v = buffer[b_idx]
+        while p_idx < self._nb_param and p_idx // 2 < len(buffer):
+            v = buffer[p_idx // 2]
             if p_idx % 2 == 0:
-                self._params.append((v >> 4) & 0xF)
-            else:
                 self._params.append(v & 0xF)
-                b_idx += 1
+            else:
+                self._params.append((v >> 4) & 0xF)
             p_idx += 1
 
     def pack_params(self, buffer, index):
         p_idx = 0
-        v = 0
         while p_idx < self._nb_param:
             if p_idx % 2 == 0:
-                v = self._params[p_idx] << 4
+                # unused high order bits are set to 1
+                buffer[index] = 0xF0 | self._params[p_idx]
             else:
-                v |= self._params[p_idx]
-                buffer[index] = v
+                buffer[index] = (buffer[index] & 0xF) | (self._params[p_idx] << 4)
                 index += 1
             p_idx += 1
 
     def encode_payload(self) -> bytearray:
         param_size = (self._nb_param // 2) + (self._nb_param % 2)
-        buffer = bytearray(6 + param_size)
-        pgn_l = self._function_pgn & 0xFFFF
-        pgn_h = (self._function_pgn >> 16) & 0xFF
-        err_code = (self._pgn_error_code << 4) | self._transmission_error_code
-        self.full_header_struct.pack_into(buffer, 0, 2, pgn_l, pgn_h, err_code, self._nb_param)
+        buffer = super().encode_payload()
+        buffer.extend(bytes(param_size))
         self.pack_params(buffer, 6)
         return buffer
 
+    def encode_content(self, buffer: bytearray):
+        buffer.extend(self.header_struct.pack((self._transmission_error_code << 4) | self._pgn_error_code,
+                                              self._nb_param))
+
+
+class FieldsGroupFunction(GroupFunction):
+    '''
+    Common part of the Read Fields and Write Fields functions and their replies
+    For proprietary PGNs the manufacturer and industry codes follow the PGN
+    The unique_id is set by the requester and returned in the reply
+    '''
+
+    header_struct = struct.Struct("<BBB")
+    proprietary_struct = struct.Struct("<H")
+    with_values = True
 
-class ReadFieldsGroupFunction(GroupFunction):
+    def __init__(self, message, function, pgn, unique_id, selection, parameters, manufacturer_code):
+        super().__init__(message, function=function, pgn=pgn)
+        if message is not None:
+            payload = message.payload
+            index = 4
+            self._manufacturer_code = 0
+            self._industry_code = 4
+            if PGNDef.is_pgn_proprietary(self._function_pgn):
+                v = self.proprietary_struct.unpack_from(payload, index)[0]
+                self._manufacturer_code = v & 0x7FF
+                self._industry_code = (v >> 13) & 0x7
+                index += 2
+                self._field_map = GroupFunctionFieldMap.for_pgn(self._function_pgn, self._manufacturer_code)
+            self._unique_id, self._nb_selection, self._nb_param = self.header_struct.unpack_from(payload, index)
+            index += 3
+            self._selection, index = self.decode_pairs(payload, index, self._nb_selection)
+            if self._decode_error >= 0:
+                self._params = []
+            elif self.with_values:
+                self._params, index = self.decode_pairs(payload, index, self._nb_param, self._nb_selection)
+            else:
+                self._params = list(payload[index:index + self._nb_param])
+                if len(self._params) < self._nb_param:
+                    self._decode_error = self._nb_selection + len(self._params)
+        else:
+            self._manufacturer_code = manufacturer_code
+            self._industry_code = 4
+            if manufacturer_code:
+                self._field_map = GroupFunctionFieldMap.for_pgn(pgn, manufacturer_code)
+            self._unique_id = unique_id
+            self._selection = list(selection)
+            self._params = list(parameters)
+            self._nb_selection = len(self._selection)
+            self._nb_param = len(self._params)
 
-    def __init__(self, message):
-        super().__init__(message)
+    @property
+    def unique_id(self) -> int:
+        return self._unique_id
 
+    @property
+    def manufacturer_code(self) -> int:
+        return self._manufacturer_code
 
-class WriteFieldsGroupFunction(GroupFunction):
+    @property
+    def selection(self) -> list:
+        return self._selection
 
-    def __init__(self, message):
-        super().__init__(message)
+    @property
+    def nb_selection(self) -> int:
+        return self._nb_selection
 
+    @property
+    def nb_parameters(self) -> int:
+        '''
+        Number of selection pairs and parameters in the message
+        '''
+        return self._nb_selection + self._nb_param
 
-group_function_table = {
-    0: RequestGroupFunction,
-    1: CommandGroupFunction,
-    2: AcknowledgeGroupFunction,
-    3: ReadFieldsGroupFunction,
-    5: WriteFieldsGroupFunction
-}
+    @property
+    def parameters(self) -> list:
+        return self._params
 
+    def encode_content(self, buffer: bytearray):
+        if PGNDef.is_pgn_proprietary(self._function_pgn):
+            buffer.extend(self.proprietary_struct.pack((self._manufacturer_code & 0x7FF) | (0x3 << 11) |
+                                                       (self._industry_code << 13)))
+        buffer.extend(self.header_struct.pack(self._unique_id & 0xFF, len(self._selection), len(self._params)))
+        self.encode_pairs(buffer, self._selection)
+        if self.with_values:
+            self.encode_pairs(buffer, self._params)
+        else:
+            buffer.extend(self._params)
 
-pgn_function_table = {
-    60928: AddressClaim,
-    126996: ProductInformation,
-    126998: ConfigurationInformation
-}
 
+class ReadFieldsGroupFunction(FieldsGroupFunction):
+    '''
+    Read the fields (list of field numbers) of a PGN instance matching the selection pairs
+    '''
+
+    with_values = False
+
+    def __init__(self, message=None, pgn=0, unique_id=0, selection=(), fields=(), manufacturer_code=0):
+        super().__init__(message, GF_READ_FIELDS, pgn, unique_id, selection, fields, manufacturer_code)
 
 
+class ReadFieldsReplyGroupFunction(FieldsGroupFunction):
 
+    def __init__(self, message=None, pgn=0, unique_id=0, selection=(), parameters=(), manufacturer_code=0):
+        super().__init__(message, GF_READ_FIELDS_REPLY, pgn, unique_id, selection, parameters, manufacturer_code)
 
 
+class WriteFieldsGroupFunction(FieldsGroupFunction):
+    '''
+    Write the fields (pairs field number, value) of a PGN instance matching the selection pairs
+    '''
+
+    def __init__(self, message=None, pgn=0, unique_id=0, selection=(), parameters=(), manufacturer_code=0):
+        super().__init__(message, GF_WRITE_FIELDS, pgn, unique_id, selection, parameters, manufacturer_code)
+
+
+class WriteFieldsReplyGroupFunction(FieldsGroupFunction):
+
+    def __init__(self, message=None, pgn=0, unique_id=0, selection=(), parameters=(), manufacturer_code=0):
+        super().__init__(message, GF_WRITE_FIELDS_REPLY, pgn, unique_id, selection, parameters, manufacturer_code)
+
+
+def create_group_function(message: NMEA2000Msg) -> GroupFunction:
+    '''
+    Decode a PGN 126208 message, raise ValueError if the message is not a valid Group Function
+    '''
+    if len(message.payload) < 4:
+        raise ValueError("Group Function message too short")
+    try:
+        group_function_class = group_function_table[message.payload[0]]
+    except KeyError:
+        raise ValueError(f"Invalid Group Function code {message.payload[0]}")
+    try:
+        return group_function_class(message=message)
+    except (struct.error, IndexError) as err:
+        raise ValueError(f"Group Function decoding error {err}")
+
+
+group_function_table = {
+    GF_REQUEST: RequestGroupFunction,
+    GF_COMMAND: CommandGroupFunction,
+    GF_ACKNOWLEDGE: AcknowledgeGroupFunction,
+    GF_READ_FIELDS: ReadFieldsGroupFunction,
+    GF_READ_FIELDS_REPLY: ReadFieldsReplyGroupFunction,
+    GF_WRITE_FIELDS: WriteFieldsGroupFunction,
+    GF_WRITE_FIELDS_REPLY: WriteFieldsReplyGroupFunction
+}
+
+
+# PGN with a specific parameter encoding (no generated class)
+pgn_function_table = {
+    60928: AddressClaim
+}
+
+_generated_classes = dict(nmea2k_iso_generated_classes)
+_generated_classes.update(nmea2k_generated_classes)
@@ -10,8 +10,15 @@
 # -------------------------------------------------------------------------------
 
 #  implementation notes
-#   Partial implementation with only Broadcast mode - limited defense
-
+#   Broadcast (BAM) and connection mode (RTS/CTS) on receive and transmit
+#   Sessions are identified by (direction, local address, peer address), local address is 255 for BAM
+#   so a peer can have at the same time a BAM, a receive and a transmit session with each local application
+#   All timeouts are managed by a single thread with a heap of deadlines
+#   Frames are sent via a sender callable: sender(pgn, sa, da, list of 8 bytes data, on_sent) -> bool
+#   that is always called outside the handler lock
+
+import collections
+import heapq
 import logging
 import struct
 import time
@@ -20,152 +27,542 @@ import threading
 
 from navigation_server.router_core import NMEA2000Msg
 from navigation_server.nmea2000_datamodel import PGNDef
+from navigation_server.router_common import NavThread
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
-(TP_CREATED, TP_ANNOUNCED, TP_IN_TRANSMISSION, TP_END) = range(1, 5)
+(TP_CREATED, TP_ANNOUNCED, TP_IN_TRANSMISSION, TP_WAIT_CTS, TP_SENDING, TP_WAIT_EOMA, TP_END,
+ TP_ABORTED) = range(1, 9)
 
+TP_CM_PGN = 60416
+TP_DT_PGN = 60160
 
-class IsoTransportException(Exception):
-    pass
+# control bytes of the TP.CM messages
+(TP_CM_RTS, TP_CM_CTS, TP_CM_EOMA, TP_CM_BAM, TP_CM_ABORT) = (16, 17, 19, 32, 255)
 
+# Abort reason codes
+TP_ABORT_BUSY = 1               # already in one or more connection managed sessions
+TP_ABORT_RESOURCES = 2          # system resources needed for another task
+TP_ABORT_TIMEOUT = 3
+TP_ABORT_CTS_IN_TRANSFER = 4    # CTS received while data transfer in progress
+TP_ABORT_RETRANSMIT_LIMIT = 5
+TP_ABORT_UNEXPECTED_DT = 6
+TP_ABORT_BAD_SEQUENCE = 7
+TP_ABORT_DUPLICATE_SEQUENCE = 8
+TP_ABORT_SIZE = 9               # total message size > 1785 bytes
+TP_ABORT_OTHER = 250
 
-class IsoTransportTransaction:
-
-    __slots__ = ("_pgn", "_total_size", "_nb_packets", "_state", "_transmitted_packets", "_buffer", "_start_time",
-                 "_sa", "_prio", '_timer')
-    _bam_struct = struct.Struct("<BHBBHB")
-
-    def __init__(self):
-        self._pgn = 0
-        self._state = TP_CREATED
-        self._nb_packets = 0
-        self._transmitted_packets = 0
-
-    def incoming_bam_transaction(self, sa: int, prio: int, frame: bytearray):
-        _logger.debug("ISO Transport => new transaction for address %d" % sa)
-        if frame[0] != 32:
-            raise IsoTransportException("ISO Transport Non BAM transaction: %d" % frame[0])
-        self._sa = sa
-        self._prio = prio
-        dec_val = self._bam_struct.unpack(frame)
-        self._total_size = dec_val[1]
-        self._nb_packets = dec_val[2]
-        self._pgn, da = PGNDef.pgn_pdu1_adjust(dec_val[4] | (dec_val[5] << 16))
-        self._state = TP_IN_TRANSMISSION
-        self._buffer = bytearray(self._total_size)
-        self._start_time = time.monotonic()
-        self._timer = threading.Timer(0.1 * self._nb_packets, self.timer_lapse)
-        _logger.debug("ISO Transport => Transaction for PGN %d l=%d" % (self._pgn, self._total_size))
-        return self
-
-    def incoming_packet(self, frame: bytearray):
-        if self._state != TP_IN_TRANSMISSION:
-            raise IsoTransportException
-        seq_num = frame[0]
-        _logger.debug("ISO transport incoming packet from sa %d seq %d" % (self._sa, seq_num))
-        ptr = (seq_num - 1) * 7
-        if ptr + 7 > self._total_size:
-            # partial fill of last buffer
-            length = self._total_size - ptr
-        else:
-            length = 7
-        self._buffer[ptr: ptr + length] = frame[1: length + 1]
-        self._transmitted_packets += 1
-        if self._transmitted_packets == self._nb_packets:
-            # transmission is over
-            self._state = TP_END
-            self._timer.cancel()
-            # now building the NMEA Message
-            msg = NMEA2000Msg(self._pgn, prio=self._prio, sa=self._sa, da=255, payload=self._buffer,
-                               timestamp=self._start_time)
-            _logger.debug("ISO Transport message=%s" % msg.format1())
-            return msg
-        else:
-            return None
-
-    def timer_lapse(self):
-        _logger.error("ISO Transport transaction timeout sa=%d PGN=%d" % (self._sa, self._pgn))
-        self._state = TP_END
-
-    def outgoing_bam_transaction(self, msg: NMEA2000Msg) -> NMEA2000Msg:
-        payload = bytearray(8)
-        self._total_size = len(msg.payload)
-        self._buffer = msg.payload
-        self._nb_packets = self._total_size // 7
-        if self._total_size % 7 != 0:
-            self._nb_packets += 1
-        pgn_low = msg.pgn & 0xFFFF
-        pgn_up = (msg.pgn >> 16) & 0xFF
-        self._bam_struct.pack_into(payload, 0, 32, self._total_size, self._nb_packets, 0xFF, pgn_low, pgn_up)
-        return NMEA2000Msg(60416, 7, msg.sa, 255, payload)
-
-    def split_message(self):
-        data = bytearray(8)
-        seq_num = 1
-        ptr = 0
-        while seq_num <= self._nb_packets:
-            data[0] = seq_num
-            if seq_num == self._nb_packets:
-                l = self._total_size - ptr
-                data[1: l+1] = self._buffer[ptr:]
-                r = 7 - l
-                if r != 0:
-                    # pad
-                    for p in (l, 7):
-                        data[p] = 0xFF
-            else:
-                data[1:] = self._buffer[ptr: ptr + 7]
-                ptr += 7
-            seq_num += 1
-            yield data
-        return
+# timeouts (seconds) as defined by J1939/21
+TP_TR = 0.2
+TP_TH = 0.5
+TP_T1 = 0.75
+TP_T2 = 1.25
+TP_T3 = 1.25
+TP_T4 = 1.05
 
+TP_MAX_SIZE = 1785
+TP_MAX_RETRANSMIT = 2
 
-class IsoTransportHandler:
+(TP_RX, TP_TX) = (0, 1)
 
-    def __init__(self):
-        self._transactions = {}
+_tp_cm_params = struct.Struct("<HBB")
 
-    def new_transaction(self, sa, prio, frame):
-        try:
-            transact = IsoTransportTransaction().incoming_bam_transaction(sa, prio, frame)
-        except IsoTransportException as e:
-            _logger.error("ISO Transport error: %s" % str(e))
-            return
-        self._transactions[sa] = transact
-
-    def new_output_transaction(self, msg: NMEA2000Msg):
-        transact = IsoTransportTransaction()
-        tpcm_msg = transact.outgoing_bam_transaction(msg)
-        return transact, tpcm_msg
-
-    def incoming_packet(self, sa, frame):
-        try:
-            transact = self._transactions[sa]
-        except KeyError:
-            _logger.error("Unknown transport transaction from sa:%d" % sa)
-            raise IsoTransportException
-        try:
-            result = transact.incoming_packet(frame)
-        except IsoTransportException as err:
-            # the whole transaction is aborted
-            _logger.error("ISO Transport aborted transaction (likely timeout)")
-            del self._transactions[sa]
-            raise
 
-        if result is not None:
-            # transaction is over
-            del self._transactions[sa]
-        return result
+def _tp_cm_frame(control: int, params: bytes, pgn: int) -> bytearray:
+    data = bytearray(8)
+    data[0] = control
+    data[1:5] = params
+    data[5] = pgn & 0xFF
+    data[6] = (pgn >> 8) & 0xFF
+    data[7] = (pgn >> 16) & 0xFF
+    return data
 
 
+def _tp_cm_pgn(data) -> int:
+    pgn, da = PGNDef.pgn_pdu1_adjust(data[5] | (data[6] << 8) | (data[7] << 16))
+    return pgn
 
 
+def nb_packets_for(size: int) -> int:
+    return (size + 6) // 7
 
 
+class IsoTransportException(Exception):
+    pass
+
 
+class IsoTransportSession:
+    """
+    State and statistics of one transport session
+    """
+
+    __slots__ = ('direction', 'local', 'peer', 'pgn', 'prio', 'total_size', 'nb_packets', 'buffer', 'state',
+                 'next_packet', 'window_end', 'max_window', 'packets', 'windows', 'retransmits', 'abort_reason',
+                 'start_time', 'end_time', 'timestamp', 'deadline')
+
+    def __init__(self, direction: int, local: int, peer: int, pgn: int, prio: int, total_size: int,
+                 nb_packets: int, buffer: bytearray):
+        self.direction = direction
+        self.local = local
+        self.peer = peer
+        self.pgn = pgn
+        self.prio = prio
+        self.total_size = total_size
+        self.nb_packets = nb_packets
+        self.buffer = buffer
+        self.state = TP_CREATED
+        self.next_packet = 1
+        self.window_end = 0
+        self.max_window = 255
+        self.packets = 0            # data packets received or sent (including retransmissions)
+        self.windows = 0            # CTS received or sent
+        self.retransmits = 0
+        self.abort_reason = 0
+        self.start_time = time.monotonic()
+        self.end_time = 0.0
+        self.timestamp = time.time()
+        self.deadline = None        # managed by the timeout thread
+
+    @property
+    def key(self) -> tuple:
+        return self.direction, self.local, self.peer
+
+    @property
+    def outgoing(self) -> bool:
+        return self.direction == TP_TX
+
+    @property
+    def broadcast(self) -> bool:
+        return self.local == 255 or self.peer == 255
+
+    @property
+    def sa(self) -> int:
+        return self.peer if self.direction == TP_RX else self.local
+
+    @property
+    def da(self) -> int:
+        return self.local if self.direction == TP_RX else self.peer
+
+    @property
+    def duration(self) -> float:
+        if self.end_time == 0.0:
+            return time.monotonic() - self.start_time
+        return self.end_time - self.start_time
+
+    @property
+    def status(self) -> str:
+        if self.state == TP_END:
+            return "complete"
+        elif self.state == TP_ABORTED:
+            return "aborted"
+        return "active"
+
+    def store_packet(self, data) -> bool:
+        """
+        Store the data of the next packet, return True when the message is complete
+        """
+        ptr = (self.next_packet - 1) * 7
+        length = min(7, self.total_size - ptr)
+        self.buffer[ptr: ptr + length] = data[1: length + 1]
+        self.packets += 1
+        self.next_packet += 1
+        return self.next_packet > self.nb_packets
+
+    def data_packets(self, first: int, count: int) -> list:
+        """
+        Build the TP.DT data for packets first to first + count - 1, the last packet is padded with 0xFF
+        """
+        result = []
+        for seq in range(first, first + count):
+            ptr = (seq - 1) * 7
+            chunk = self.buffer[ptr: ptr + 7]
+            data = bytearray(8)
+            data[0] = seq
+            data[1: len(chunk) + 1] = chunk
+            for p in range(len(chunk) + 1, 8):
+                data[p] = 0xFF
+            result.append(data)
+        return result
 
+    def message(self) -> NMEA2000Msg:
+        return NMEA2000Msg(self.pgn, prio=self.prio, sa=self.sa, da=self.da, payload=self.buffer,
+                           timestamp=self.timestamp)
+
+
+class IsoTransportTimeouts(NavThread):
+    """
+    Single thread managing the timeouts of all the transport sessions of a handler
+    Re-arming a session pushes a new deadline, the previous one is ignored when it comes to expiration
+    """
+
+    def __init__(self, name: str, handler):
+        super().__init__(name=name, daemon=True)
+        self._handler = handler
+        self._heap = []
+        self._counter = 0
+        self._cond = threading.Condition()
+        self._stop_flag = False
+
+    def arm(self, session: IsoTransportSession, delay: float):
+        with self._cond:
+            session.deadline = time.monotonic() + delay
+            self._counter += 1
+            heapq.heappush(self._heap, (session.deadline, self._counter, session))
+            if self._heap[0][2] is session:
+                self._cond.notify()
+
+    def cancel(self, session: IsoTransportSession):
+        with self._cond:
+            session.deadline = None
+
+    def stop(self):
+        with self._cond:
+            self._stop_flag = True
+            self._cond.notify()
+
+    def nrun(self):
+        while not self._stop_flag:
+            expired = []
+            with self._cond:
+                now = time.monotonic()
+                while len(self._heap) > 0 and self._heap[0][0] <= now:
+                    deadline, counter, session = heapq.heappop(self._heap)
+                    if session.deadline == deadline:
+                        session.deadline = None
+                        expired.append(session)
+                if len(expired) == 0:
+                    if len(self._heap) > 0:
+                        self._cond.wait(self._heap[0][0] - now)
+                    else:
+                        self._cond.wait(1.0)
+                    continue
+            for session in expired:
+                try:
+                    self._handler.session_timeout(session)
+                except Exception as err:
+                    _logger.error(f"ISO Transport timeout processing error {err.__class__.__name__}:{err}")
 
 
+class IsoTransportHandler:
+    """
+    J1939/21 transport protocol for one CAN interface
+    window is the maximum number of packets requested in one CTS
+    max_sessions is the maximum number of concurrent connection mode sessions in each direction
+    bam_interval is the time between 2 data packets when sending a BAM (50 to 200ms)
+    """
+
+    def __init__(self, name: str = "ISO-TP", sender=None, window: int = 16, max_sessions: int = 8,
+                 bam_interval: float = 0.05, history_size: int = 32):
+        self._sessions = {}
+        self._lock = threading.RLock()
+        self._sender = sender
+        self._window = max(1, min(window, 255))
+        self._max_sessions = max_sessions
+        self._bam_interval = min(max(bam_interval, 0.05), 0.2)
+        self._timeouts = IsoTransportTimeouts(f"{name}-Timeouts", self)
+        self._history = collections.deque(maxlen=history_size)
+        self._completed = 0
+        self._aborted = 0
+        self._session_end_callback = None
+
+    def start(self):
+        self._timeouts.start()
+
+    def stop(self):
+        self._timeouts.stop()
+
+    def set_sender(self, sender):
+        self._sender = sender
+
+    def set_session_end_callback(self, callback):
+        """
+        callback(session) is called when a session is complete or aborted
+        """
+        self._session_end_callback = callback
+
+    def sessions(self) -> list:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def history(self) -> list:
+        with self._lock:
+            return list(self._history)
+
+    def counters(self) -> tuple:
+        """
+        return (active sessions, completed, aborted)
+        """
+        return len(self._sessions), self._completed, self._aborted
+
+    #
+    #   Internal session management, called with the lock held
+    #   Frames to be sent and ended sessions are collected and processed once the lock is released
+    #
+    def _nb_sessions(self, direction: int) -> int:
+        return sum(1 for s in self._sessions.values() if s.direction == direction and not s.broadcast)
+
+    def _add(self, session: IsoTransportSession, ended: list):
+        previous = self._sessions.get(session.key)
+        if previous is not None:
+            _logger.warning("ISO Transport new session from %d to %d PGN %d replaces the one in progress" %
+                            (session.sa, session.da, session.pgn))
+            self._end(previous, TP_ABORTED, ended, TP_ABORT_OTHER)
+        self._sessions[session.key] = session
+
+    def _end(self, session: IsoTransportSession, state: int, ended: list, reason: int = 0):
+        if session.state in (TP_END, TP_ABORTED):
+            return
+        self._timeouts.cancel(session)
+        session.state = state
+        session.abort_reason = reason
+        session.end_time = time.monotonic()
+        if self._sessions.get(session.key) is session:
+            del self._sessions[session.key]
+        if state == TP_END:
+            self._completed += 1
+        else:
+            self._aborted += 1
+            _logger.error("ISO Transport session from %d to %d PGN %d aborted reason %d" %
+                          (session.sa, session.da, session.pgn, reason))
+        self._history.append(session)
+        ended.append(session)
+
+    @staticmethod
+    def _cm(out: list, session: IsoTransportSession, data: bytearray):
+        out.append((TP_CM_PGN, session.local, session.peer, [data], None))
+
+    def _abort(self, out: list, ended: list, session: IsoTransportSession, reason: int):
+        self._cm(out, session, _tp_cm_frame(TP_CM_ABORT, bytes((reason, 0xFF, 0xFF, 0xFF)), session.pgn))
+        self._end(session, TP_ABORTED, ended, reason)
+
+    def _send_cts(self, out: list, session: IsoTransportSession):
+        count = min(self._window, session.max_window, session.nb_packets - session.next_packet + 1)
+        session.window_end = session.next_packet + count - 1
+        session.windows += 1
+        self._cm(out, session, _tp_cm_frame(TP_CM_CTS, bytes((count, session.next_packet, 0xFF, 0xFF)),
+                                            session.pgn))
+        session.state = TP_IN_TRANSMISSION
+        self._timeouts.arm(session, TP_T2)
+
+    def _output(self, out: list, ended: list):
+        for pgn, sa, da, frames, on_sent in out:
+            if self._sender is None or not self._sender(pgn, sa, da, frames, on_sent):
+                _logger.error("ISO Transport error sending PGN %d from %d to %d" % (pgn, sa, da))
+        if self._session_end_callback is not None:
+            for session in ended:
+                self._session_end_callback(session)
+
+    #
+    #   Receive side
+    #
+    def control_message(self, sa: int, da: int, prio: int, data) -> None:
+        """
+        Process a TP.CM (PGN 60416) message received from sa for da
+        """
+        out = []
+        ended = []
+        control = data[0]
+        pgn = _tp_cm_pgn(data)
+        with self._lock:
+            if control == TP_CM_BAM:
+                total_size, nb_packets, reserved = _tp_cm_params.unpack_from(data, 1)
+                _logger.debug("ISO Transport => BAM from %d PGN %d l=%d" % (sa, pgn, total_size))
+                session = IsoTransportSession(TP_RX, 255, sa, pgn, prio, total_size, nb_packets,
+                                              bytearray(total_size))
+                session.state = TP_IN_TRANSMISSION
+                self._add(session, ended)
+                self._timeouts.arm(session, TP_T1)
+            elif da == 255:
+                _logger.error("ISO Transport broadcast control message %d from %d ignored" % (control, sa))
+            elif control == TP_CM_RTS:
+                self._receive_rts(sa, da, prio, pgn, data, out, ended)
+            elif control == TP_CM_CTS:
+                self._receive_cts(sa, da, pgn, data, out, ended)
+            elif control == TP_CM_EOMA:
+                session = self._sessions.get((TP_TX, da, sa))
+                if session is not None and session.pgn == pgn:
+                    _logger.debug("ISO Transport end of message acknowledge from %d PGN %d" % (sa, pgn))
+                    self._end(session, TP_END, ended)
+            elif control == TP_CM_ABORT:
+                for key in ((TP_TX, da, sa), (TP_RX, da, sa)):
+                    session = self._sessions.get(key)
+                    if session is not None and session.pgn == pgn:
+                        self._end(session, TP_ABORTED, ended, data[1])
+            else:
+                _logger.error("ISO Transport unknown control byte %d from %d" % (control, sa))
+        self._output(out, ended)
+
+    def _receive_rts(self, sa: int, da: int, prio: int, pgn: int, data, out: list, ended: list):
+        total_size, nb_packets, max_window = _tp_cm_params.unpack_from(data, 1)
+        _logger.debug("ISO Transport => RTS from %d to %d PGN %d l=%d" % (sa, da, pgn, total_size))
+        session = IsoTransportSession(TP_RX, da, sa, pgn, prio, total_size, nb_packets, bytearray(total_size))
+        session.max_window = max_window if max_window != 0 else 255
+        if total_size > TP_MAX_SIZE or nb_packets != nb_packets_for(total_size):
+            self._abort(out, ended, session, TP_ABORT_SIZE)
+            return
+        existing = self._sessions.get(session.key)
+        if existing is None and self._nb_sessions(TP_RX) >= self._max_sessions:
+            self._abort(out, ended, session, TP_ABORT_RESOURCES)
+            return
+        # a new RTS from the same peer means that the sender has given up the previous one
+        self._add(session, ended)
+        self._send_cts(out, session)
+
+    def _receive_cts(self, sa: int, da: int, pgn: int, data, out: list, ended: list):
+        session = self._sessions.get((TP_TX, da, sa))
+        if session is None or session.pgn != pgn:
+            _logger.debug("ISO Transport CTS from %d without session => ignored" % sa)
+            return
+        count = data[1]
+        first = data[2]
+        if count == 0:
+            # hold the connection
+            session.state = TP_WAIT_CTS
+            self._timeouts.arm(session, TP_T4)
+            return
+        if first < 1 or first > session.nb_packets:
+            self._abort(out, ended, session, TP_ABORT_BAD_SEQUENCE)
+            return
+        # a CTS while the window is still queued means that the last frame has already reached the bus
+        if first < session.next_packet:
+            session.retransmits += 1
+            if session.retransmits > TP_MAX_RETRANSMIT:
+                self._abort(out, ended, session, TP_ABORT_RETRANSMIT_LIMIT)
+                return
+        count = min(count, session.nb_packets - first + 1)
+        session.next_packet = first + count
+        session.packets += count
+        session.windows += 1
+        session.state = TP_SENDING
+        window = session.windows
+        out.append((TP_DT_PGN, session.local, session.peer, session.data_packets(first, count),
+                    lambda: self._window_sent(session, window)))
+        self._timeouts.arm(session, TP_T3)
+
+    def _window_sent(self, session: IsoTransportSession, window: int):
+        with self._lock:
+            if session.state == TP_SENDING and session.windows == window:
+                session.state = TP_WAIT_EOMA if session.next_packet > session.nb_packets else TP_WAIT_CTS
+                self._timeouts.arm(session, TP_T3)
+
+    def data_packet(self, sa: int, da: int, data) -> NMEA2000Msg:
+        """
+        Process a TP.DT (PGN 60160) packet
+        return the NMEA2000 message when complete otherwise None
+        """
+        out = []
+        ended = []
+        result = None
+        with self._lock:
+            session = self._sessions.get((TP_RX, da, sa))
+            if session is None:
+                _logger.debug("ISO Transport data from %d to %d without session => ignored" % (sa, da))
+                return None
+            seq = data[0]
+            if session.broadcast:
+                if seq != session.next_packet:
+                    _logger.error("ISO Transport BAM from %d sequence %d expected %d" % (sa, seq, session.next_packet))
+                    self._end(session, TP_ABORTED, ended, TP_ABORT_BAD_SEQUENCE)
+                elif session.store_packet(data):
+                    self._end(session, TP_END, ended)
+                    result = session.message()
+                else:
+                    self._timeouts.arm(session, TP_T1)
+            elif session.state != TP_IN_TRANSMISSION:
+                self._abort(out, ended, session, TP_ABORT_UNEXPECTED_DT)
+            elif seq < session.next_packet:
+                self._abort(out, ended, session, TP_ABORT_DUPLICATE_SEQUENCE)
+            elif seq > session.next_packet:
+                self._abort(out, ended, session, TP_ABORT_BAD_SEQUENCE)
+            elif session.store_packet(data):
+                self._cm(out, session, _tp_cm_frame(TP_CM_EOMA, _tp_cm_params.pack(session.total_size,
+                                                                                   session.nb_packets, 0xFF),
+                                                    session.pgn))
+                self._end(session, TP_END, ended)
+                result = session.message()
+            elif session.next_packet > session.window_end:
+                self._send_cts(out, session)
+            else:
+                self._timeouts.arm(session, TP_T1)
+        self._output(out, ended)
+        if result is not None:
+            _logger.debug("ISO Transport message PGN %d from %d to %d l=%d" % (result.pgn, sa, da, len(result.payload)))
+        return result
 
+    #
+    #   Transmit side
+    #
+    def send_message(self, msg: NMEA2000Msg) -> bool:
+        """
+        Send a message with the transport protocol, BAM if the destination is 255 otherwise RTS/CTS
+        The transmission is asynchronous, the end of the session is notified via the session end callback
+        return False if the session cannot be started
+        """
+        total_size = len(msg.payload)
+        if total_size > TP_MAX_SIZE:
+            _logger.error("ISO Transport PGN %d size %d exceeds %d bytes" % (msg.pgn, total_size, TP_MAX_SIZE))
+            return False
+        nb_packets = nb_packets_for(total_size)
+        out = []
+        ended = []
+        with self._lock:
+            session = IsoTransportSession(TP_TX, msg.sa, msg.da, msg.pgn, msg.prio, total_size, nb_packets,
+                                          msg.payload)
+            if session.key in self._sessions:
+                _logger.error("ISO Transport session from %d to %d already in progress" % (msg.sa, msg.da))
+                return False
+            if session.broadcast:
+                self._sessions[session.key] = session
+                self._cm(out, session, _tp_cm_frame(TP_CM_BAM, _tp_cm_params.pack(total_size, nb_packets, 0xFF),
+                                                    msg.pgn))
+                session.state = TP_IN_TRANSMISSION
+                # the data packets are paced by the timeout thread
+                self._timeouts.arm(session, self._bam_interval)
+            else:
+                if self._nb_sessions(TP_TX) >= self._max_sessions:
+                    _logger.error("ISO Transport maximum number of sessions reached")
+                    return False
+                self._sessions[session.key] = session
+                self._cm(out, session, _tp_cm_frame(TP_CM_RTS, _tp_cm_params.pack(total_size, nb_packets, 0xFF),
+                                                    msg.pgn))
+                session.state = TP_WAIT_CTS
+                self._timeouts.arm(session, TP_T3)
+        self._output(out, ended)
+        return True
+
+    @staticmethod
+    def broadcast_frames(msg: NMEA2000Msg) -> list:
+        """
+        Build all frames of a BAM transfer without session nor pacing (simulation and test purpose)
+        return the list of (pgn, data) starting with the TP.CM BAM
+        """
+        total_size = len(msg.payload)
+        nb_packets = nb_packets_for(total_size)
+        frames = [(TP_CM_PGN, _tp_cm_frame(TP_CM_BAM, _tp_cm_params.pack(total_size, nb_packets, 0xFF), msg.pgn))]
+        session = IsoTransportSession(TP_TX, msg.sa, 255, msg.pgn, msg.prio, total_size, nb_packets, msg.payload)
+        frames.extend((TP_DT_PGN, data) for data in session.data_packets(1, nb_packets))
+        return frames
+
+    def session_timeout(self, session: IsoTransportSession):
+        """
+        Called by the timeout thread when a session deadline expires
+        """
+        out = []
+        ended = []
+        with self._lock:
+            if session.deadline is not None or session.state in (TP_END, TP_ABORTED):
+                # re-armed or ended in the meantime
+                return
+            if session.direction == TP_TX and session.broadcast:
+                out.append((TP_DT_PGN, session.local, 255, session.data_packets(session.next_packet, 1), None))
+                session.packets += 1
+                session.next_packet += 1
+                if session.next_packet > session.nb_packets:
+                    self._end(session, TP_END, ended)
+                else:
+                    self._timeouts.arm(session, self._bam_interval)
+            elif session.broadcast:
+                self._end(session, TP_ABORTED, ended, TP_ABORT_TIMEOUT)
+            else:
+                self._abort(out, ended, session, TP_ABORT_TIMEOUT)
+        self._output(out, ended)
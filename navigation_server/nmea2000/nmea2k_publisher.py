@@ -126,23 +126,76 @@ class N2KTracePublisher(ExternalPublisher):
 
 
 class N2KStatisticPublisher(ExternalPublisher):
+    """
+    Traffic analysis of the messages received from the couplers
+    NMEA0183 sentences are counted per talker and formatter, NMEA2000 messages are analysed per (PGN, source)
+    The fast packet errors of the couplers are included in the analysis
+    Options:
+        max_entries: maximum number of NMEA2000 (PGN, source) entries
+        csv_file: file where the NMEA2000 analysis is written on stop or on console request
+                relative to the trace_dir global option
+    The analysis is accessible through the console GetTrafficAnalysis request
+    """
 
     def __init__(self, opts):
         super().__init__(opts)
         self._n183_stats = NMEA183Statistics()
-        self._n2k_stats = N2KStatistics()
+        self._n2k_stats = N2KStatistics(opts.get('max_entries', int, 1024))
+        self._csv_file = opts.get('csv_file', str, None)
+        if self._csv_file is not None and not os.path.isabs(self._csv_file):
+            self._csv_file = os.path.join(get_global_option('trace_dir', '/var/log'), self._csv_file)
+        self._n183_stats.register_metrics(self.object_name())
+        self._n2k_stats.register_metrics(self.object_name())
+
+    @property
+    def traffic_analyzer(self) -> N2KStatistics:
+        return self._n2k_stats
+
+    def _attach_coupler(self, coupler):
+        handler = coupler.fast_packet_handler
+        if handler is not None:
+            self._n2k_stats.attach_fast_packet_handler(coupler.object_name(), handler)
+
+    def start(self):
+        if self._active:
+            for coupler in self._couplers.values():
+                self._attach_coupler(coupler)
+        super().start()
+
+    def add_coupler(self, coupler):
+        super().add_coupler(coupler)
+        self._attach_coupler(coupler)
 
     def process_msg(self, msg: NavGenericMsg):
         if msg.type == N0183_MSG:
-            self._n183_stats.add_entry(msg.talker(), msg.formatter())
+            self._n183_stats.add_msg(msg)
         else:
             self._n2k_stats.add_entry(msg.msg)
         return True
 
+    def write_csv(self, file=None) -> str:
+        """
+        write the NMEA2000 analysis in CSV format, return the file name
+        """
+        if file is None:
+            file = self._csv_file
+        if file is None:
+            raise ValueError(f"N2KStatisticPublisher {self.object_name()} no csv_file defined")
+        self._n2k_stats.write_entries(file)
+        _logger.info(f"N2KStatisticPublisher {self.object_name()} analysis written in {file}")
+        return file
+
     def stop(self):
         if self._active:
             self._n183_stats.print_entries()
             self._n2k_stats.print_entries()
+            if self._csv_file is not None:
+                try:
+                    self.write_csv()
+                except IOError as e:
+                    _logger.error(f"N2KStatisticPublisher {self.object_name()} error writing {self._csv_file}: {e}")
+        self._n183_stats.remove_metrics(self.object_name())
+        self._n2k_stats.remove_metrics(self.object_name())
         super().stop()
 
 
@@ -0,0 +1,105 @@
+#-------------------------------------------------------------------------------
+# Name:        nmea2k_registry_service
+# Purpose:     gRPC service for the queries on the NMEA2000 device registry
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+
+from navigation_server.router_common import GrpcService, GrpcServerError, resolve_ref, get_global_var
+from .nmea2k_device_registry import N2KDeviceRegistry, N2KDeviceRecord
+
+from navigation_server.generated.n2k_can_service_pb2 import N2KRegistryRequest, N2KRegistryMsg, N2KRegistryEntryMsg
+from navigation_server.generated.n2k_can_service_pb2_grpc import (N2KDeviceRegistryServiceServicer,
+                                                                  add_N2KDeviceRegistryServiceServicer_to_server)
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+def fill_registry_entry(record: N2KDeviceRecord, entry: N2KRegistryEntryMsg):
+    entry.name = record.name
+    record.iso_name.set_protobuf(entry.iso_name)
+    entry.iso_name.manufacturer_name = record.manufacturer_name
+    entry.address = record.address
+    entry.first_seen = record.first_seen
+    entry.last_seen = record.last_seen
+    for address, timestamp in record.address_history:
+        change = entry.address_history.add()
+        change.address = address
+        change.timestamp = timestamp
+    entry.pgns.extend(sorted(record.pgns))
+    try:
+        product_information = record.product_information()
+        if product_information is not None:
+            product_information.set_protobuf(entry.product_information)
+        configuration_information = record.configuration_information()
+        if configuration_information is not None:
+            configuration_information.set_protobuf(entry.configuration_information)
+    except Exception as err:
+        _logger.error(f"Device registry error decoding the information of {record.name:016X}: {err}")
+
+
+class N2KDeviceRegistryServicer(N2KDeviceRegistryServiceServicer):
+
+    def __init__(self, service):
+        self._service = service
+
+    def GetDevices(self, request: N2KRegistryRequest, context):
+        _logger.debug("N2K Device registry request target:%s" % request.target)
+        resp = N2KRegistryMsg()
+        resp.id = request.id
+        try:
+            registry = self._service.get_registry(request.target)
+        except KeyError as err:
+            resp.status = err.args[0]
+            return resp
+        resp.nb_devices = len(registry)
+        for record in registry.select(request.names, request.addresses, request.manufacturer_codes,
+                                      request.device_classes, request.pgn):
+            fill_registry_entry(record, resp.entries.add())
+        resp.status = "OK"
+        return resp
+
+
+class N2KDeviceRegistryService(GrpcService):
+    """
+    Queries on the device registry of a NMEA2000 controller (coupler based or CAN)
+    """
+
+    def __init__(self, opts):
+        super().__init__(opts)
+        self._controller_name = opts.get('controller', str, None)
+        self._servicer = None
+
+    def get_registry(self, target: str) -> N2KDeviceRegistry:
+        """
+        return the registry of the target controller, or of the default one if the target is empty
+        raise KeyError if there is no controller
+        """
+        if len(target) == 0:
+            target = self._controller_name
+        try:
+            if target is None:
+                controller = get_global_var('N2KController')
+            else:
+                controller = resolve_ref(target)
+        except KeyError:
+            raise KeyError(f"Device registry controller {target} not found")
+        registry = getattr(controller, 'registry', None)
+        if registry is None:
+            raise KeyError(f"Device registry {target} is not a NMEA2000 controller")
+        return registry
+
+    def finalize(self):
+        try:
+            super().finalize()
+        except GrpcServerError:
+            return
+        _logger.info("Adding service %s to server" % self._name)
+        self._servicer = N2KDeviceRegistryServicer(self)
+        add_N2KDeviceRegistryServiceServicer_to_server(self._servicer, self.grpc_server)
@@ -0,0 +1,111 @@
+#-------------------------------------------------------------------------------
+# Name:        nmea2k_snapshot_service
+# Purpose:     gRPC service returning the latest NMEA2000 values per (PGN, source)
+#
+# Author:      Laurent Carré
+#
+# Created:     14/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+
+from navigation_server.router_common import GrpcService, GrpcServerError, resolve_ref
+from navigation_server.router_core import N2KLatestValueCache
+from .nmea2k_decode_dispatch import get_n2k_decoded_object, N2KMissingDecodeEncodeException
+
+from navigation_server.generated.nmea2000_pb2 import N2KSnapshotRequest, N2KSnapshotMsg
+from navigation_server.generated.nmea2000_pb2_grpc import N2KSnapshotServiceServicer, add_N2KSnapshotServiceServicer_to_server
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+def fill_snapshot(cache: N2KLatestValueCache, request: N2KSnapshotRequest, resp: N2KSnapshotMsg,
+                  stale_after: float):
+    """
+    Fill the response with the entries of the latest values table selected by the request
+    """
+    if request.stale_after > 0.0:
+        stale_after = request.stale_after
+    resp.nb_entries = len(cache)
+    for msg, age, updates in cache.snapshot(request.pgn, request.sa, request.max_age):
+        entry = resp.entries.add()
+        msg.as_protobuf(entry.msg)
+        entry.age = age
+        entry.stale = age > stale_after
+        entry.updates = updates
+        if request.decode:
+            try:
+                entry.decoded.CopyFrom(get_n2k_decoded_object(msg).protobuf_message())
+            except N2KMissingDecodeEncodeException:
+                pass
+            except Exception as e:
+                _logger.error(f"Snapshot error during PGN {msg.pgn} from:{msg.sa} decoding: {e}")
+    resp.status = "OK"
+
+
+class N2KSnapshotServicer(N2KSnapshotServiceServicer):
+
+    def __init__(self, service):
+        self._service = service
+
+    def GetSnapshot(self, request, context):
+        _logger.debug("N2K Snapshot request target:%s" % request.target)
+        resp = N2KSnapshotMsg()
+        resp.id = request.id
+        target = request.target if len(request.target) > 0 else self._service.default_source
+        try:
+            cache = self._service.get_cache(target)
+        except KeyError as err:
+            resp.status = err.args[0]
+            return resp
+        fill_snapshot(cache, request, resp, self._service.stale_after)
+        return resp
+
+
+class N2KSnapshotService(GrpcService):
+    """
+    Service giving access to the latest NMEA2000 values of the couplers (or CAN controller)
+    that have a latest value cache (latest_value_cache parameter)
+    """
+
+    def __init__(self, opts):
+        super().__init__(opts)
+        self._default_source = opts.get('source', str, None)
+        self._stale_after = opts.get('stale_after', float, 5.0)
+        self._servicer = None
+
+    @property
+    def default_source(self) -> str:
+        return self._default_source
+
+    @property
+    def stale_after(self) -> float:
+        return self._stale_after
+
+    @staticmethod
+    def get_cache(target: str) -> N2KLatestValueCache:
+        """
+        return the latest value cache of the target
+        raise KeyError if the target does not exist or has no cache
+        """
+        if target is None:
+            raise KeyError("No target for the snapshot")
+        try:
+            source = resolve_ref(target)
+        except KeyError:
+            raise KeyError(f"Snapshot target {target} not found")
+        cache = getattr(source, 'latest_values', None)
+        if cache is None:
+            raise KeyError(f"Snapshot target {target} has no latest value cache")
+        return cache
+
+    def finalize(self):
+        try:
+            super().finalize()
+        except GrpcServerError:
+            return
+        _logger.info("Adding service %s to server" % self._name)
+        self._servicer = N2KSnapshotServicer(self)
+        add_N2KSnapshotServiceServicer_to_server(self._servicer, self.grpc_server)
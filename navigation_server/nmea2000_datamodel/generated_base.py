@@ -302,6 +302,14 @@ class GenericFormatter:
         self._field_name = field_name
         self._valid_mask = invalid_mask
 
+    @property
+    def attribute(self) -> str:
+        return self._attr
+
+    @property
+    def field_name(self) -> str:
+        return self._field_name
+
     def output(self, msg, option, stream) -> bool:
         '''
         Format the field and push it to the stream
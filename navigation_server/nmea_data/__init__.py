@@ -1,2 +1,2 @@
 
-from .nmea_statistics import NMEA183Statistics, N2KStatistics
\ No newline at end of file
+from .nmea_statistics import NMEA183Statistics, N2KStatistics, N2KStatEntry, INTERVAL_BOUNDS, n2k_frames
\ No newline at end of file
@@ -37,8 +37,8 @@ class DataStatistics:
     def set_server(self, server):
         self._server = server
 
-    def add_n2kentry(self, pgn, sa):
-        self._n2kstats.add_entry(pgn, sa)
+    def add_n2kentry(self, msg):
+        self._n2kstats.add_entry(msg)
 
     def add_n183entry(self, talker, formatter):
         self._n183stats.add_entry(talker, formatter)
@@ -5,17 +5,26 @@
 # Author:      Laurent Carré
 #
 # Created:     25/10/2022
-# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2023
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
 # Licence:     Eclipse Public License 2.0
 #-------------------------------------------------------------------------------
 
 import logging
 import csv
+from array import array
+from bisect import bisect_right
+
 from navigation_server.nmea2000_datamodel import N2KUnknownPGN, PGNDef
-from navigation_server.router_common import find_pgn
+from navigation_server.router_common import find_pgn, MetricsRegistry
+from navigation_server.router_core import NMEA0183Index
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
+_n183_messages = MetricsRegistry.counter('navigation_nmea0183_messages', 'NMEA0183 sentences per talker and formatter',
+                                         ('owner', 'talker', 'formatter'))
+_n2k_messages = MetricsRegistry.counter('navigation_nmea2000_messages', 'NMEA2000 messages per PGN and source',
+                                        ('owner', 'pgn', 'sa'))
+
 
 class NMEA183StatEntry:
 
@@ -27,6 +36,18 @@ class NMEA183StatEntry:
     def add_count(self):
         self._count += 1
 
+    @property
+    def talker(self):
+        return self._talker
+
+    @property
+    def formatter(self):
+        return self._formatter
+
+    @property
+    def count(self) -> int:
+        return self._count
+
     def __str__(self):
         return "%s:%s count:%d" % (self._talker, self._formatter, self._count)
 
@@ -38,17 +59,34 @@ class NMEA183Statistics:
         self._total_msg = 0
 
     def add_entry(self, talker, formatter):
-        key = str(talker + formatter)
+        if type(talker) is str:
+            talker = talker.encode()
+        if type(formatter) is str:
+            formatter = formatter.encode()
+        self._add(NMEA0183Index.address(bytes(talker + formatter)))
+
+    def add_msg(self, msg):
+        """
+        count a NMEA0183Msg, the entries are keyed by the address code of the message
+        """
+        self._add(msg.index)
+
+    def _add(self, address):
         self._total_msg += 1
-        new_entry = False
         try:
-            entry = self._entries[key]
+            entry = self._entries[address.code]
         except KeyError:
-            entry = NMEA183StatEntry(talker, formatter)
-            new_entry = True
+            entry = NMEA183StatEntry(address.talker.decode(), address.formatter.decode())
+            if address.code >= 0:
+                self._entries[address.code] = entry
         entry.add_count()
-        if new_entry:
-            self._entries[key] = entry
+
+    def register_metrics(self, owner: str):
+        _n183_messages.add_collector(owner, lambda: [((owner, e.talker, e.formatter), e.count)
+                                                     for e in list(self._entries.values())])
+
+    def remove_metrics(self, owner: str):
+        _n183_messages.remove_collector(owner)
 
     def print_entries(self):
         print("Total number of N0183 messages:%d" % self._total_msg)
@@ -56,19 +94,185 @@ class NMEA183Statistics:
             print(entry)
 
 
+#
+#   NMEA2000 traffic analysis
+#   The entries are keyed per (PGN, source address), a source has one manufacturer, so the proprietary PGN
+#   are also differentiated
+#   Time is taken from the message timestamp, so the same analysis runs live or over a log file
+#
+
+# upper bounds (seconds) of the inter-arrival time histogram buckets, the last bucket is open
+# each bucket is centered on one of the usual transmission periods (10ms, 20ms, 50ms ... 30s, 60s), so a periodic
+# flow does not spread over 2 buckets
+INTERVAL_BOUNDS = (0.015, 0.03, 0.07, 0.15, 0.3, 0.7, 1.5, 3.0, 7.0, 15.0, 45.0)
+INTERVAL_BUCKETS = len(INTERVAL_BOUNDS) + 1
+# gain of the exponential averages of the interval and of the jitter (as in RFC 3550)
+EWMA_GAIN = 1. / 16.
+# CAN 2.0B extended frame overhead in bits (without bit stuffing) and default NMEA2000 bit rate
+CAN_FRAME_OVERHEAD = 67
+N2K_BITRATE = 250000
+
+
+def n2k_frames(msg) -> tuple:
+    """
+    return the number of CAN frames and of bits (without stuffing) needed to transport the message on the bus
+    """
+    length = len(msg.payload)
+    if msg.fast_packet:
+        # 6 bytes in the first frame, 7 in the next ones, all frames are 8 bytes long
+        frames = 1 + length // 7
+        return frames, frames * (CAN_FRAME_OVERHEAD + 64)
+    elif length > 8:
+        # ISO Transport (J1939/21) connection management frame and data transfer frames
+        frames = 1 + (length + 6) // 7
+        return frames, frames * (CAN_FRAME_OVERHEAD + 64)
+    else:
+        return 1, CAN_FRAME_OVERHEAD + 8 * length
+
+
 class N2KStatEntry:
+    """
+    Traffic figures for one (PGN, source address) flow
+    """
+
+    __slots__ = ('_pgn', '_sa', '_mfg', '_count', '_first_seen', '_last_seen', '_mean_interval', '_jitter',
+                 '_histogram', '_frames', '_bits', '_bytes', '_fp_errors', '_fp_timeouts')
 
-    def __init__(self, pgn, sa, mfg):
+    def __init__(self, pgn, sa, mfg=0):
         self._pgn = pgn
         self._sa = sa
         self._mfg = mfg
         self._count = 0
+        self._first_seen = 0.
+        self._last_seen = 0.
+        self._mean_interval = 0.
+        self._jitter = 0.
+        self._histogram = array('Q', bytes(8 * INTERVAL_BUCKETS))
+        self._frames = 0
+        self._bits = 0
+        self._bytes = 0
+        self._fp_errors = 0
+        self._fp_timeouts = 0
 
-    def add_count(self):
-        self._count += 1
+    def add(self, timestamp: float, length: int, frames: int, bits: int):
+        count = self._count
+        if count == 0:
+            self._first_seen = timestamp
+            self._last_seen = timestamp
+        else:
+            interval = timestamp - self._last_seen
+            # messages merged from several couplers can be slightly out of order, they are not in the intervals
+            if interval >= 0.:
+                self._last_seen = timestamp
+                self._histogram[bisect_right(INTERVAL_BOUNDS, interval)] += 1
+                if count == 1:
+                    self._mean_interval = interval
+                else:
+                    deviation = interval - self._mean_interval
+                    self._mean_interval += deviation * EWMA_GAIN
+                    if deviation < 0.:
+                        deviation = -deviation
+                    self._jitter += (deviation - self._jitter) * EWMA_GAIN
+        self._count = count + 1
+        self._frames += frames
+        self._bits += bits
+        self._bytes += length
+
+    def set_fp_errors(self, errors: int, timeouts: int):
+        self._fp_errors = errors
+        self._fp_timeouts = timeouts
+
+    @property
+    def pgn(self) -> int:
+        return self._pgn
+
+    @property
+    def sa(self) -> int:
+        return self._sa
+
+    @property
+    def manufacturer(self) -> int:
+        return self._mfg
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def first_seen(self) -> float:
+        return self._first_seen
+
+    @property
+    def last_seen(self) -> float:
+        return self._last_seen
+
+    @property
+    def mean_interval(self) -> float:
+        """
+        recent average of the interval between 2 messages (s)
+        """
+        return self._mean_interval
+
+    @property
+    def jitter(self) -> float:
+        """
+        recent average of the deviation of the interval from the mean (s)
+        """
+        return self._jitter
+
+    @property
+    def rate(self) -> float:
+        """
+        current message rate (msg/s) from the recent average interval
+        """
+        if self._mean_interval > 0.:
+            return 1. / self._mean_interval
+        return 0.
+
+    @property
+    def average_rate(self) -> float:
+        """
+        message rate (msg/s) over the whole observation of the flow
+        """
+        duration = self._last_seen - self._first_seen
+        if duration > 0.:
+            return (self._count - 1) / duration
+        return 0.
+
+    @property
+    def histogram(self) -> list:
+        return self._histogram.tolist()
+
+    @property
+    def frames(self) -> int:
+        return self._frames
+
+    @property
+    def bits(self) -> int:
+        return self._bits
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def fp_errors(self) -> int:
+        return self._fp_errors
+
+    @property
+    def fp_timeouts(self) -> int:
+        return self._fp_timeouts
+
+    @staticmethod
+    def csv_header() -> list:
+        return ['pgn', 'sa', 'manufacturer', 'count', 'first_seen', 'last_seen', 'rate', 'average_rate',
+                'mean_interval', 'jitter', 'frames', 'bytes', 'fp_errors', 'fp_timeouts'] + \
+            ['interval<%g' % b for b in INTERVAL_BOUNDS] + ['interval>=%g' % INTERVAL_BOUNDS[-1]]
 
     def iterable(self):
-        return self._pgn, self._sa, self._mfg, self._count
+        return [self._pgn, self._sa, self._mfg, self._count, '%.3f' % self._first_seen, '%.3f' % self._last_seen,
+                '%.3f' % self.rate, '%.3f' % self.average_rate, '%.4f' % self._mean_interval, '%.4f' % self._jitter,
+                self._frames, self._bytes, self._fp_errors, self._fp_timeouts] + self._histogram.tolist()
 
     def __str__(self):
         try:
@@ -76,44 +280,170 @@ class N2KStatEntry:
         except N2KUnknownPGN:
             pgn_name = "Unknown PGN for manufacturer (Mfg=%d)" % self._mfg
 
-        return "PGN %d (%s) sa %d: %d" % (self._pgn, pgn_name, self._sa, self._count)
+        return "PGN %d (%s) sa %d: %d rate %.2f/s jitter %.1fms frames %d fp errors %d timeouts %d" % (
+            self._pgn, pgn_name, self._sa, self._count, self.rate, self._jitter * 1000., self._frames,
+            self._fp_errors, self._fp_timeouts)
 
 
 class N2KStatistics:
+    """
+    Streaming analysis of the NMEA2000 traffic, per (PGN, source address):
+    message rate, inter-arrival histogram, jitter, bus load contribution in frames and bits, fast packet errors
+    The memory is bounded by max_entries, messages from flows beyond the limit are only counted globally
+    add_entry is the only method in the message path, the other figures are computed when a snapshot is read
+    """
 
-    def __init__(self):
+    def __init__(self, max_entries: int = 1024, bitrate: int = N2K_BITRATE):
+        self._max_entries = max_entries
+        self._bitrate = bitrate
+        self._fp_handlers = {}
+        self._fp_baseline = {}
+        self.reset()
+
+    def reset(self):
         self._entries = {}
         self._total_msg = 0
+        self._total_frames = 0
+        self._total_bits = 0
+        self._nb_overflow = 0
+        self._start_time = 0.
+        self._end_time = 0.
+        self._fp_baseline = self._fp_counts()
 
-    def add_entry(self, msg):
+    def add_entry(self, msg, timestamp: float = None):
+        """
+        account one NMEA2000Msg, timestamp overrides the message timestamp (replay of logs)
+        """
+        if timestamp is None:
+            timestamp = msg.timestamp
+        key = (msg.pgn << 8) | msg.sa
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            entry = self._new_entry(key, msg)
+        frames, bits = n2k_frames(msg)
+        self._total_msg += 1
+        self._total_frames += frames
+        self._total_bits += bits
+        if self._start_time == 0.:
+            self._start_time = timestamp
+        if timestamp > self._end_time:
+            self._end_time = timestamp
+        if entry is not None:
+            entry.add(timestamp, len(msg.payload), frames, bits)
+        else:
+            self._nb_overflow += 1
 
-        if PGNDef.is_pgn_proprietary(msg.pgn):
+    def _new_entry(self, key: int, msg):
+        if len(self._entries) >= self._max_entries:
+            return None
+        if PGNDef.is_pgn_proprietary(msg.pgn) and len(msg.payload) >= 2:
             manufacturer = msg.get_manufacturer()
-            # print("PGN", msg.pgn, "Manufacturer", manufacturer)
-            key = msg.sa << 29 + msg.pgn << 11 + manufacturer
         else:
             manufacturer = 0
-            key = msg.sa << 18 + msg.pgn
-        self._total_msg += 1
-        new_entry = False
-        try:
-            entry = self._entries[key]
-        except KeyError:
-            entry = N2KStatEntry(msg.pgn, msg.sa, manufacturer)
-            new_entry = True
-        entry.add_count()
-        if new_entry:
-            self._entries[key] = entry
+        entry = N2KStatEntry(msg.pgn, msg.sa, manufacturer)
+        self._entries[key] = entry
+        return entry
+
+    def attach_fast_packet_handler(self, name: str, handler):
+        """
+        the fast packet errors and timeouts counted by the handler (one per coupler) are added in the snapshots
+        """
+        self._fp_handlers[name] = handler
+
+    def detach_fast_packet_handler(self, name: str):
+        self._fp_handlers.pop(name, None)
+
+    def _fp_counts(self) -> dict:
+        counts = {}
+        for handler in list(self._fp_handlers.values()):
+            for pgn, sa, errors, timeouts in handler.error_counts():
+                key = (pgn << 8) | sa
+                previous = counts.get(key, (0, 0))
+                counts[key] = (previous[0] + errors, previous[1] + timeouts)
+        return counts
+
+    def snapshot(self) -> list:
+        """
+        return the list of the entries with the fast packet errors updated
+        """
+        for key, counts in self._fp_counts().items():
+            baseline = self._fp_baseline.get(key, (0, 0))
+            errors = counts[0] - baseline[0]
+            timeouts = counts[1] - baseline[1]
+            entry = self._entries.get(key)
+            if entry is None:
+                if errors == 0 and timeouts == 0 or len(self._entries) >= self._max_entries:
+                    continue
+                # no message could be reassembled from that flow
+                entry = N2KStatEntry(key >> 8, key & 0xFF)
+                self._entries[key] = entry
+            entry.set_fp_errors(errors, timeouts)
+        return list(self._entries.values())
+
+    @property
+    def total_msg(self) -> int:
+        return self._total_msg
+
+    @property
+    def total_frames(self) -> int:
+        return self._total_frames
+
+    @property
+    def total_bits(self) -> int:
+        return self._total_bits
+
+    @property
+    def nb_overflow(self) -> int:
+        return self._nb_overflow
+
+    @property
+    def start_time(self) -> float:
+        return self._start_time
+
+    @property
+    def end_time(self) -> float:
+        return self._end_time
+
+    @property
+    def duration(self) -> float:
+        return self._end_time - self._start_time
+
+    @property
+    def interval_bounds(self) -> tuple:
+        return INTERVAL_BOUNDS
+
+    def bus_load(self, bits: int = None) -> float:
+        """
+        ratio of the bus capacity used over the observation (total or for the given number of bits)
+        """
+        duration = self._end_time - self._start_time
+        if duration <= 0.:
+            return 0.
+        if bits is None:
+            bits = self._total_bits
+        return bits / (self._bitrate * duration)
+
+    def register_metrics(self, owner: str):
+        _n2k_messages.add_collector(owner, lambda: [((owner, e.pgn, e.sa), e.count)
+                                                    for e in list(self._entries.values())])
+
+    def remove_metrics(self, owner: str):
+        _n2k_messages.remove_collector(owner)
 
     def print_entries(self):
-        print("Total number of N2K messages:%d" % self._total_msg)
-        for entry in self._entries.values():
+        entries = self.snapshot()
+        print("Total number of N2K messages:%d frames:%d over %.1fs bus load %.1f%%" %
+              (self._total_msg, self._total_frames, self.duration, self.bus_load() * 100.))
+        if self._nb_overflow > 0:
+            print("Messages beyond the %d entries:%d" % (self._max_entries, self._nb_overflow))
+        for entry in entries:
             print(entry)
 
     def write_entries(self, file):
-        with open(file,'w') as fp:
+        entries = self.snapshot()
+        with open(file, 'w', newline='') as fp:
             csv_writer = csv.writer(fp, dialect='excel')
-            for entry in self._entries.values():
+            csv_writer.writerow(N2KStatEntry.csv_header())
+            for entry in entries:
                 csv_writer.writerow(entry.iterable())
-
-
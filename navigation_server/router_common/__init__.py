@@ -16,7 +16,7 @@ from .date_time_utilities import format_timestamp
 from .global_exceptions import *
 from .generic_msg import *
 from .log_utilities import NavigationLogSystem
-from .network_utils import get_id_from_mac, get_mac
+from .network_utils import get_id_from_mac, get_mac, is_local_address
 from .object_utilities import copy_attribute, build_subclass_dict
 from .protobuf_utilities import (pb_enum_string, set_protobuf_data, ProtobufProxy, GrpcAccessException,
                                  copy_protobuf_data)
@@ -26,8 +26,15 @@ from .configuration import NavigationConfiguration
 from .message_trace import MessageTraceError, NMEAMsgTrace
 from .server_common import NavigationServer
 from .grpc_server_service import GrpcServer, GrpcService, GrpcServerError, GrpcSecondaryService
+from .grpc_aio_server import GrpcAioServer, ServicePolicy, SyncServicerContext
 from .generic_top_server import GenericTopServer
 from .nav_threading import NavThread, NavThreadingController, NavProfilingController
+from .latency_histogram import LatencyHistogram, LatencyHistogramGroup, LatencyTracker, latency_bucket_low
+from .metrics_registry import MetricsRegistry, MetricFamily, OPENMETRICS_CONTENT_TYPE
+from .dbus_client import (DBusConnection, DBusException, DBusSubscription, MockDBusTree, MockDBusObject,
+                          MockDBusConnection, open_dbus_connection, dbus_variant)
+from .systemd_dbus import SystemdManager, SystemdUnit, UnitChangeListener
+from .fault_injection import FaultInjector, FaultPoint, FaultConfigurationError, InjectedRpcError
 from .constants_conversion import nautical_mille, mps_to_knots, n2ktime_to_datetime, radian_to_deg
 from .client_common import GrpcClient, ServiceClient, GrpcStreamTimeout, GrpcSendStreamIterator, GrpcStreamIteratorError
 from .agent_interface import AgentInterface, AgentClient
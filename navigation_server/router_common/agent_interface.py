@@ -18,7 +18,7 @@ import time
 from navigation_server.router_common import (GrpcClient, ServiceClient, NavThread, MessageServerGlobals,
                                              GrpcAccessException, GrpcServer, ProtobufProxy, pb_enum_string)
 from navigation_server.generated.agent_pb2_grpc import AgentStub
-from navigation_server.generated.agent_pb2 import AgentCmdMsg, AgentResponse, NavigationSystemMsg
+from navigation_server.generated.agent_pb2 import AgentCmdMsg, AgentResponse, NavigationSystemMsg, ServiceStateMsg
 from navigation_server.generated.services_server_pb2 import ProcessState, Connection, Server, SystemProcessMsg
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
@@ -33,6 +33,16 @@ class SystemProcessMsgProxy(ProtobufProxy):
         return pb_enum_string(self._msg, 'state', self._msg.state)
 
 
+class ServiceStateMsgProxy(ProtobufProxy):
+
+    def __init__(self, msg:ServiceStateMsg):
+        super().__init__(msg)
+
+    @property
+    def state(self):
+        return pb_enum_string(self._msg, 'state', self._msg.state)
+
+
 class AgentResponseProxy(ProtobufProxy):
 
     def __init__(self, msg:AgentResponse):
@@ -113,6 +123,16 @@ class AgentClient(ServiceClient):
         else:
             return response.err_code
 
+    def stream_process_states(self, process_name: str = None):
+        """
+        generator of ServiceStateMsgProxy, current state of the processes (all or process_name) then the changes
+        """
+        msg = AgentCmdMsg()
+        if process_name is not None:
+            msg.target = process_name
+        for state in self._server_call_multiple(self._stub.StreamProcessStates, msg, ServiceStateMsgProxy):
+            yield state
+
     def get_port(self, process_name: str) -> int:
         resp = self.process_cmd('get_port', process_name)
         if resp is None:
@@ -19,8 +19,11 @@ import os.path
 
 from navigation_server.router_common import ObjectCreationError, MessageServerGlobals, ObjectFatalError, ConfigurationException
 from .grpc_server_service import GrpcServer
+from .grpc_aio_server import GrpcAioServer
 from .generic_top_server import GenericTopServer
 from .nav_threading import NavProfilingController, NavThreadingController
+from .latency_histogram import LatencyTracker
+from .fault_injection import FaultInjector, FaultConfigurationError
 
 _logger = logging.getLogger("ShipDataServer."+__name__)
 
@@ -162,10 +165,32 @@ class NavigationServerObject:
     def name(self):
         return self._name
 
+    @property
+    def class_name(self) -> str:
+        return self._class_name
+
+    @property
+    def parameters(self) -> dict:
+        return self._param
+
+    @property
+    def options(self) -> Parameters:
+        return Parameters(self._param)
+
     @property
     def object(self):
         return self._object
 
+    def changed_parameters(self, other) -> set:
+        """
+        return the names of the parameters that differ with the other description of the same object
+        """
+        keys = set(self._param.keys()) | set(other.parameters.keys())
+        return {k for k in keys if self._param.get(k) != other.parameters.get(k)}
+
+    def set_object(self, obj):
+        self._object = obj
+
     def build_object(self):
 
         if self._class is None:
@@ -227,27 +252,13 @@ class NavigationConfiguration:
         """
         MessageServerGlobals.global_variables = self
         # print(settings_file)
-        if not os.path.exists(settings_file):
-            # we merge with the home dir
-            settings_file = os.path.join(MessageServerGlobals.home_dir, "conf", settings_file)
+        settings_file, self._configuration = self.read_settings(settings_file)
         # keep the configuration path
         settings_path = os.path.dirname(settings_file)
         self.set_global('settings_path', settings_path)
         _logger.info(
             "Building configuration from settings file %s in path %s" % (settings_file, settings_path)
         )
-        try:
-            fp = open(settings_file, 'r')
-        except (IOError, FileNotFoundError) as e:
-            _logger.error("Settings file %s error %s" % (settings_file, e))
-            _logger.error(f"Current directory is {os.getcwd()}")
-            raise
-        try:
-            self._configuration = yaml.safe_load(fp)
-        except yaml.YAMLError as e:
-            _logger.error("Settings file decoding error %s" % str(e))
-            fp.close()
-            raise
         # check if we debug the configuration analysis
         if self._configuration.get('debug_configuration', False):
             _logger.setLevel(logging.DEBUG)
@@ -331,10 +342,103 @@ class NavigationConfiguration:
         profiler_conf = self._configuration.get('profiling', None)
         if profiler_conf is not None:
             MessageServerGlobals.profiling_controller.configure(self, profiler_conf)
+        # latency tracking along the message pipeline, can also be switched via the Console
+        if self._configuration.get('latency_tracking', False):
+            LatencyTracker.enable(True)
+        # statistical profiler of the NavThreads, can also be controlled via the Console
+        sampling_conf = self._configuration.get('sampling_profiler', None)
+        if sampling_conf is not None:
+            if type(sampling_conf) is dict:
+                MessageServerGlobals.thread_controller.configure_sampling(sampling_conf)
+            else:
+                _logger.error("sampling_profiler parameter syntax error")
+        # chaos mode: faults injected under the couplers and transports, to be used for tests only
+        fault_conf = self._configuration.get('fault_injection', None)
+        if fault_conf is not None:
+            try:
+                if type(fault_conf) is not dict:
+                    raise FaultConfigurationError("fault_injection must be a dictionary")
+                FaultInjector.configure(fault_conf)
+            except FaultConfigurationError as err:
+                _logger.error(f"fault_injection parameter error: {err}")
         _logger.info("Finished analyzing settings file:%s " % settings_file)
         self._settings_file = settings_file
         return self
 
+    @staticmethod
+    def read_settings(settings_file) -> tuple:
+        """
+        Read and decode the Yaml settings file
+        return the full path of the file and the settings dictionary
+        raise IOError or yaml.YAMLError
+        """
+        if not os.path.exists(settings_file):
+            # we merge with the home dir
+            settings_file = os.path.join(MessageServerGlobals.home_dir, "conf", settings_file)
+        try:
+            fp = open(settings_file, 'r')
+        except (IOError, FileNotFoundError) as e:
+            _logger.error("Settings file %s error %s" % (settings_file, e))
+            _logger.error(f"Current directory is {os.getcwd()}")
+            raise
+        try:
+            settings = yaml.safe_load(fp)
+        except yaml.YAMLError as e:
+            _logger.error("Settings file decoding error %s" % str(e))
+            raise
+        finally:
+            fp.close()
+        return settings_file, settings
+
+    def diff_settings(self, settings: dict) -> dict:
+        """
+        Compare new settings with the objects descriptions currently in use
+        return a dictionary category: (added, removed, changed) with lists of NavigationServerObject
+        (the new descriptions for added and changed, the current ones for removed)
+        The 'globals' category is the list of top level parameters that have changed
+        """
+        result = {}
+        for category, holding_dict in self._categories().items():
+            new_objects = {}
+            if settings.get(category) is not None:
+                for obj in settings[category]:
+                    nav_obj = NavigationServerObject(obj)
+                    new_objects[nav_obj.name] = nav_obj
+            if category == 'servers':
+                holding_dict = dict(holding_dict)
+                holding_dict['Main'] = self._main
+            added = [o for n, o in new_objects.items() if n not in holding_dict]
+            removed = [o for n, o in holding_dict.items() if n not in new_objects]
+            changed = [o for n, o in new_objects.items()
+                       if n in holding_dict and len(holding_dict[n].changed_parameters(o)) > 0]
+            result[category] = (added, removed, changed)
+        keys = (set(settings.keys()) | set(self._configuration.keys())) - set(self._categories().keys())
+        result['globals'] = sorted(k for k in keys if settings.get(k) != self._configuration.get(k))
+        return result
+
+    def _categories(self) -> dict:
+        return {'servers': self._servers, 'processes': self._processes, 'couplers': self._couplers,
+                'publishers': self._publishers, 'services': self._services, 'filters': self._filters,
+                'applications': self._applications}
+
+    def description(self, category: str, name: str):
+        """
+        return the description (NavigationServerObject) of an object
+        raise KeyError
+        """
+        return self._categories()[category][name]
+
+    def replace_description(self, category: str, nav_obj):
+        """
+        Install a new or modified object description, the object is then accessible via resolve_ref
+        """
+        self._categories()[category][nav_obj.name] = nav_obj
+        self._obj_dict[nav_obj.name] = nav_obj
+
+    def remove_description(self, category: str, name: str):
+        del self._categories()[category][name]
+        del self._obj_dict[name]
+
     @staticmethod
     def init_server_globals():
         MessageServerGlobals.thread_controller = NavThreadingController()
@@ -422,6 +526,7 @@ class NavigationConfiguration:
     def import_internal(self):
 
         self.add_class(GrpcServer)
+        self.add_class(GrpcAioServer)
         self.add_class(GenericTopServer)
 
     def import_feature(self, feature):
@@ -429,7 +534,8 @@ class NavigationConfiguration:
             package_name = feature
             package_items = None
         else:
-            package_name, package_items = feature.popitem()
+            # the settings are kept unchanged to be compared on configuration reload
+            package_name, package_items = next(iter(feature.items()))
 
         _logger.info(f"Include feature {package_name} with objects:")
         try:
@@ -0,0 +1,271 @@
+#-------------------------------------------------------------------------------
+# Name:        dbus_client
+# Purpose:     Minimal D-Bus client layer (method calls, properties, signals) and mock object tree
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import threading
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+ERROR_UNKNOWN_OBJECT = 'org.freedesktop.DBus.Error.UnknownObject'
+ERROR_UNKNOWN_METHOD = 'org.freedesktop.DBus.Error.UnknownMethod'
+ERROR_UNKNOWN_PROPERTY = 'org.freedesktop.DBus.Error.UnknownProperty'
+ERROR_SERVICE_UNKNOWN = 'org.freedesktop.DBus.Error.ServiceUnknown'
+
+
+class DBusException(Exception):
+    """
+    Error returned by the bus or the remote object, name is the D-Bus error name
+    """
+    def __init__(self, name: str, text: str = ''):
+        super().__init__(f"{name}: {text}" if text else name)
+        self.name = name
+
+
+def dbus_variant(value) -> tuple:
+    """
+    return the (signature, value) variant for a python value, (signature, value) tuples are kept as they are
+    int are unsigned 64 bits unless negative, strings starting with '/' are object paths
+    """
+    if type(value) is tuple:
+        return value
+    if type(value) is bool:
+        return 'b', value
+    if type(value) is int:
+        return ('x', value) if value < 0 else ('t', value)
+    if type(value) is float:
+        return 'd', value
+    if type(value) is str:
+        return ('o', value) if value.startswith('/') else ('s', value)
+    if type(value) is list:
+        if len(value) == 0 or type(value[0]) is str:
+            return 'as', value
+        if type(value[0]) is int:
+            return 'au', value
+    if type(value) is dict:
+        return 'a{sv}', {k: dbus_variant(v) for k, v in value.items()}
+    raise ValueError(f"D-Bus no signature for {type(value).__name__}")
+
+
+def unwrap_variants(properties: dict) -> dict:
+    return {name: variant[1] for name, variant in properties.items()}
+
+
+class DBusSubscription:
+
+    __slots__ = ('interface', 'member', 'path', 'path_namespace', 'callback')
+
+    def __init__(self, interface, member, path, path_namespace, callback):
+        self.interface = interface
+        self.member = member
+        self.path = path
+        self.path_namespace = path_namespace
+        self.callback = callback
+
+    def match(self, path: str) -> bool:
+        if self.path is not None:
+            return path == self.path
+        if self.path_namespace is not None:
+            return path == self.path_namespace or path.startswith(self.path_namespace + '/')
+        return True
+
+
+class DBusConnection:
+    """
+    Client side of a D-Bus connection
+    call() returns the body of the reply as a tuple, the variants are (signature, value) tuples as on the wire
+    The signal callbacks are invoked from a single dispatch thread (never from the thread doing the call) with
+    callback(path, interface, member, body), so they can call the bus
+    Subclasses implement _call and _add_match
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def call(self, service: str, path: str, interface: str, method: str, signature: str = '',
+             body: tuple = ()) -> tuple:
+        return self._call(service, path, interface, method, signature, body)
+
+    def get_all(self, service: str, path: str, interface: str) -> dict:
+        return unwrap_variants(self.call(service, path, PROPERTIES_INTERFACE, 'GetAll', 's', (interface,))[0])
+
+    def get(self, service: str, path: str, interface: str, name: str):
+        return self.call(service, path, PROPERTIES_INTERFACE, 'Get', 'ss', (interface, name))[0][1]
+
+    def subscribe(self, service: str, interface: str, member: str, callback, path: str = None,
+                  path_namespace: str = None) -> DBusSubscription:
+        subscription = DBusSubscription(interface, member, path, path_namespace, callback)
+        self._add_match(service, interface, member, path, path_namespace)
+        with self._lock:
+            key = (interface, member)
+            self._subscriptions[key] = self._subscriptions.get(key, []) + [subscription]
+        return subscription
+
+    def subscribe_properties(self, service: str, callback, path: str = None,
+                             path_namespace: str = None) -> DBusSubscription:
+        """
+        callback(path, interface, changed: dict, invalidated: list) on each PropertiesChanged signal
+        """
+        def properties_changed(s_path, interface, member, body):
+            callback(s_path, body[0], unwrap_variants(body[1]), body[2])
+        return self.subscribe(service, PROPERTIES_INTERFACE, 'PropertiesChanged', properties_changed, path,
+                              path_namespace)
+
+    def unsubscribe(self, subscription: DBusSubscription):
+        with self._lock:
+            key = (subscription.interface, subscription.member)
+            self._subscriptions[key] = [s for s in self._subscriptions.get(key, []) if s is not subscription]
+
+    def _dispatch(self, path: str, interface: str, member: str, body: tuple):
+        for subscription in self._subscriptions.get((interface, member), ()):
+            if subscription.match(path):
+                try:
+                    subscription.callback(path, interface, member, body)
+                except Exception as err:
+                    _logger.error(f"D-Bus signal {interface}.{member} on {path} callback error: {err}")
+
+    def close(self):
+        with self._lock:
+            self._subscriptions = {}
+
+    def _call(self, service, path, interface, method, signature, body) -> tuple:
+        raise NotImplementedError
+
+    def _add_match(self, service, interface, member, path, path_namespace):
+        raise NotImplementedError
+
+
+def open_dbus_connection(bus: str = 'SYSTEM', timeout: float = 5.0) -> DBusConnection:
+    """
+    Connection on the system ('SYSTEM'), session ('SESSION') or a private bus (address)
+    Requires the jeepney package (dbus option)
+    """
+    try:
+        from .dbus_jeepney import JeepneyDBusConnection
+    except ModuleNotFoundError:
+        _logger.error("No jeepney module installed - D-Bus access not available")
+        raise DBusException(ERROR_SERVICE_UNKNOWN, "no D-Bus client library")
+    return JeepneyDBusConnection(bus, timeout)
+
+
+class MockDBusObject:
+    """
+    Object of a mock tree: properties per interface and methods (interface, member) => function
+    The method functions receive the body items as arguments and return (signature, body)
+    """
+
+    def __init__(self, path: str, properties: dict = None):
+        self.path = path
+        self.properties = {interface: dict(values) for interface, values in (properties or {}).items()}
+        self.methods = {}
+
+    def add_method(self, interface: str, member: str, function):
+        self.methods[(interface, member)] = function
+
+
+class MockDBusTree:
+    """
+    Object tree of one D-Bus service used to test the clients without the real service
+    set_properties() updates the object and emits PropertiesChanged to the listeners
+    (function(path, interface, member, signature, body)), a MockDBusConnection or a test bus server
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+        self._objects = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+        self.nb_calls = 0
+
+    def add_object(self, path: str, properties: dict = None) -> MockDBusObject:
+        with self._lock:
+            obj = MockDBusObject(path, properties)
+            self._objects[path] = obj
+            return obj
+
+    def get_object(self, path: str) -> MockDBusObject:
+        return self._objects[path]
+
+    def has_object(self, path: str) -> bool:
+        return path in self._objects
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners = [l for l in self._listeners if l is not listener]
+
+    def set_properties(self, path: str, interface: str, changes: dict, emit: bool = True):
+        with self._lock:
+            self._objects[path].properties.setdefault(interface, {}).update(changes)
+        if emit:
+            self.emit_signal(path, PROPERTIES_INTERFACE, 'PropertiesChanged', 'sa{sv}as',
+                             (interface, {name: dbus_variant(value) for name, value in changes.items()}, []))
+
+    def emit_signal(self, path: str, interface: str, member: str, signature: str, body: tuple):
+        for listener in self._listeners:
+            listener(path, interface, member, signature, body)
+
+    def handle_call(self, path: str, interface: str, member: str, body: tuple) -> tuple:
+        """
+        return (signature, body) of the reply, raise DBusException
+        """
+        self.nb_calls += 1
+        with self._lock:
+            obj = self._objects.get(path)
+            if obj is None:
+                raise DBusException(ERROR_UNKNOWN_OBJECT, path)
+            if interface == PROPERTIES_INTERFACE:
+                if member == 'GetAll':
+                    values = obj.properties.get(body[0], {})
+                    return 'a{sv}', ({name: dbus_variant(value) for name, value in values.items()},)
+                elif member == 'Get':
+                    try:
+                        return 'v', (dbus_variant(obj.properties[body[0]][body[1]]),)
+                    except KeyError:
+                        raise DBusException(ERROR_UNKNOWN_PROPERTY, f"{body[0]}.{body[1]}")
+            function = obj.methods.get((interface, member))
+        if function is None:
+            raise DBusException(ERROR_UNKNOWN_METHOD, f"{interface}.{member} on {path}")
+        return function(*body)
+
+
+class MockDBusConnection(DBusConnection):
+    """
+    Connection on mock trees, the calls go directly to the tree and the signals are dispatched in the emitting
+    thread
+    """
+
+    def __init__(self, *trees):
+        super().__init__()
+        self._trees = {}
+        for tree in trees:
+            self._trees[tree.service] = tree
+            tree.add_listener(self._signal)
+
+    def _call(self, service, path, interface, method, signature, body) -> tuple:
+        try:
+            tree = self._trees[service]
+        except KeyError:
+            raise DBusException(ERROR_SERVICE_UNKNOWN, service)
+        return tree.handle_call(path, interface, method, body)[1]
+
+    def _add_match(self, service, interface, member, path, path_namespace):
+        pass
+
+    def _signal(self, path, interface, member, signature, body):
+        self._dispatch(path, interface, member, body)
+
+    def close(self):
+        super().close()
+        for tree in self._trees.values():
+            tree.remove_listener(self._signal)
@@ -0,0 +1,99 @@
+#-------------------------------------------------------------------------------
+# Name:        dbus_jeepney
+# Purpose:     D-Bus connection implemented with jeepney (pure python, no libdbus)
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import queue
+
+from jeepney import (DBusAddress, MatchRule, new_method_call, message_bus, DBusErrorResponse, MessageType,
+                     HeaderFields)
+from jeepney.io.threading import open_dbus_connection, DBusRouter, RouterClosed
+from jeepney.wrappers import unwrap_msg
+
+from .nav_threading import NavThread
+from .dbus_client import DBusConnection, DBusException
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class DBusSignalDispatcher(NavThread):
+    """
+    The jeepney router thread only queues the signals, the callbacks run here so they can call the bus
+    """
+
+    def __init__(self, connection):
+        super().__init__(name="DBusSignalDispatcher", daemon=True)
+        self._connection = connection
+        self.queue = queue.Queue()
+
+    def nrun(self) -> None:
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                break
+            fields = msg.header.fields
+            self._connection.dispatch_signal(fields.get(HeaderFields.path), fields.get(HeaderFields.interface),
+                                             fields.get(HeaderFields.member), msg.body)
+
+    def stop(self):
+        self.queue.put(None)
+
+
+class JeepneyDBusConnection(DBusConnection):
+
+    def __init__(self, bus: str = 'SYSTEM', timeout: float = 5.0):
+        super().__init__()
+        self._timeout = timeout
+        try:
+            self._connection = open_dbus_connection(bus=bus)
+        except (OSError, KeyError) as err:
+            _logger.error(f"D-Bus connection to {bus} error: {err}")
+            raise DBusException('org.freedesktop.DBus.Error.NoServer', str(err))
+        self._router = DBusRouter(self._connection)
+        self._dispatcher = DBusSignalDispatcher(self)
+        # all signals go to the dispatcher, the bus only sends the ones matching the subscriptions
+        self._filter = self._router.filter(MatchRule(type=MessageType.signal), queue=self._dispatcher.queue)
+        self._matches = set()
+        self._dispatcher.start()
+        _logger.info(f"D-Bus connected to {bus} as {self._connection.unique_name}")
+
+    def _call(self, service, path, interface, method, signature, body) -> tuple:
+        address = DBusAddress(path, bus_name=service, interface=interface)
+        msg = new_method_call(address, method, signature or None, body)
+        return self._send(msg)
+
+    def _send(self, msg) -> tuple:
+        try:
+            return unwrap_msg(self._router.send_and_get_reply(msg, timeout=self._timeout))
+        except DBusErrorResponse as err:
+            raise DBusException(err.name, ' '.join(str(d) for d in err.data))
+        except TimeoutError:
+            raise DBusException('org.freedesktop.DBus.Error.Timeout', f"no reply within {self._timeout}s")
+        except RouterClosed:
+            raise DBusException('org.freedesktop.DBus.Error.Disconnected', "connection closed")
+
+    def _add_match(self, service, interface, member, path, path_namespace):
+        key = (service, interface, member, path, path_namespace)
+        if key in self._matches:
+            return
+        rule = MatchRule(type='signal', sender=service, interface=interface, member=member, path=path,
+                         path_namespace=path_namespace)
+        self._send(message_bus.AddMatch(rule))
+        self._matches.add(key)
+
+    def dispatch_signal(self, path, interface, member, body):
+        self._dispatch(path, interface, member, body)
+
+    def close(self):
+        super().close()
+        self._filter.close()
+        self._dispatcher.stop()
+        self._router.close()
+        self._connection.close()
@@ -0,0 +1,295 @@
+#-------------------------------------------------------------------------------
+# Name:        fault_injection
+# Purpose:     Seeded fault injection (chaos mode) under the couplers and transports
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   A fault point is a named place in a data path (coupler:<name>, can:<channel>, can:<channel>:tx, grpc:<name>).
+#   The components ask the FaultInjector for their point at creation, None is returned when no fault is
+#   configured for it, so the cost on the hot path is one test when the chaos mode is not used.
+#   Each point has its own random generator seeded from the global seed and the point name, and the rules are
+#   evaluated in the same order for each item, so a run is reproducible for a given sequence of items.
+#   Two kinds of faults:
+#       - item faults, applied by process() on each message or frame: drop, duplicate, reorder, delay,
+#         corrupt, truncate (drop the remaining frames of a Fast Packet or ISO-TP sequence)
+#       - event faults, tested by the component at a given place: disconnect, read_error, write_error,
+#         close_channel, stall
+#   A rule fires with a probability (default 1.0) or every N items, optionally within time windows
+#   defined by at (seconds after the creation of the point), duration and period. Event faults fire
+#   once per window unless count is given.
+
+import collections
+import logging
+import random
+import time
+
+import grpc
+
+from .metrics_registry import MetricsRegistry
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+ITEM_FAULTS = ('drop', 'duplicate', 'reorder', 'delay', 'corrupt', 'truncate')
+EVENT_FAULTS = ('disconnect', 'read_error', 'write_error', 'close_channel', 'stall')
+
+_faults_injected = MetricsRegistry.counter('navigation_faults_injected', 'Faults injected by the chaos mode',
+                                           ('point', 'fault'))
+
+
+class FaultConfigurationError(Exception):
+    pass
+
+
+class InjectedRpcError(grpc.RpcError):
+    """
+    RpcError raised in place of the actual call when a gRPC channel is closed by the fault injection
+    """
+
+    def __init__(self, code=grpc.StatusCode.UNAVAILABLE):
+        super().__init__()
+        self._code = code
+
+    def code(self):
+        return self._code
+
+    def details(self) -> str:
+        return "Channel closed by fault injection"
+
+
+class FaultRule:
+
+    def __init__(self, conf: dict):
+        try:
+            self.fault = conf['fault']
+        except KeyError:
+            raise FaultConfigurationError("Fault rule without fault")
+        if self.fault not in ITEM_FAULTS and self.fault not in EVENT_FAULTS:
+            raise FaultConfigurationError(f"Unknown fault {self.fault}")
+        self.probability = float(conf.get('probability', 1.0))
+        self.every = conf.get('every', None)
+        self.at = conf.get('at', None)
+        self.duration = conf.get('duration', None)
+        self.period = conf.get('period', None)
+        if self.fault in EVENT_FAULTS and 'probability' not in conf and self.every is None:
+            self.count = conf.get('count', 1)
+        else:
+            self.count = conf.get('count', None)
+        self.delay = float(conf.get('delay', 5.0 if self.fault == 'stall' else 0.1))
+        self._seen = 0
+        self._fired = 0
+        self._window = 0
+
+    def triggered(self, elapsed: float, rng: random.Random) -> bool:
+        if self.at is not None:
+            if elapsed < self.at:
+                return False
+            offset = elapsed - self.at
+            window = 0
+            if self.period:
+                window = int(offset // self.period)
+                offset -= window * self.period
+            if self.duration is not None and offset >= self.duration:
+                return False
+            if window != self._window:
+                self._window = window
+                self._fired = 0
+                self._seen = 0
+        if self.count is not None and self._fired >= self.count:
+            return False
+        self._seen += 1
+        if self.every is not None:
+            hit = self._seen % self.every == 0
+        else:
+            hit = rng.random() < self.probability
+        if hit:
+            self._fired += 1
+        return hit
+
+
+class FaultPoint:
+    """
+    Faults injected at one place of a data path
+    A point is used by a single thread
+    """
+
+    def __init__(self, name: str, rules: list, seed):
+        self._name = name
+        self._rng = random.Random(f"{seed}:{name}")
+        self._item_rules = []
+        self._event_rules = {}
+        for conf in rules:
+            rule = FaultRule(conf)
+            if rule.fault in ITEM_FAULTS:
+                self._item_rules.append(rule)
+            else:
+                self._event_rules.setdefault(rule.fault, []).append(rule)
+        self._truncate = any(rule.fault == 'truncate' for rule in self._item_rules)
+        self._truncated = set()
+        self._held = None
+        self._counts = collections.Counter()
+        self._start = time.monotonic()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def counts(self) -> collections.Counter:
+        return self._counts
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def _count(self, fault: str):
+        self._counts[fault] += 1
+        _faults_injected.labels(self._name, fault).inc()
+
+    def corrupt_bytes(self, data) -> bytearray:
+        """
+        return a copy of the data with one bit inverted
+        """
+        data = bytearray(data)
+        if len(data) > 0:
+            data[self._rng.randrange(len(data))] ^= 1 << self._rng.randrange(8)
+        return data
+
+    def process(self, item, corrupt=None, key=None, continuation: bool = False) -> list:
+        """
+        Apply the item faults
+        corrupt: function(item, point) returning the corrupted item or None if the corruption is detected,
+        by default the item is bytes like
+        key and continuation identify the frames of a multi-frame sequence for the truncation
+        return the list of items to pass, empty when the item is dropped or held
+        """
+        if self._truncate and key is not None:
+            if not continuation:
+                self._truncated.discard(key)
+            elif key in self._truncated:
+                # remaining frames of a truncated sequence, the fault is counted once per sequence
+                return []
+        elapsed = time.monotonic() - self._start
+        copies = 1
+        for rule in self._item_rules:
+            fault = rule.fault
+            if fault == 'truncate' and not continuation:
+                continue
+            if not rule.triggered(elapsed, self._rng):
+                continue
+            self._count(fault)
+            if fault == 'drop':
+                return []
+            elif fault == 'truncate':
+                self._truncated.add(key)
+                return []
+            elif fault == 'corrupt':
+                item = corrupt(item, self) if corrupt is not None else self.corrupt_bytes(item)
+                if item is None:
+                    return []
+            elif fault == 'delay':
+                time.sleep(rule.delay)
+            elif fault == 'duplicate':
+                copies = 2
+            elif fault == 'reorder' and self._held is None:
+                # the item is passed after the next one
+                self._held = item
+                return []
+        result = [item] * copies
+        if self._held is not None:
+            result.append(self._held)
+            self._held = None
+        return result
+
+    def event(self, fault: str) -> bool:
+        """
+        return True if the fault shall be produced now by the component
+        """
+        rules = self._event_rules.get(fault)
+        if rules is None:
+            return False
+        elapsed = time.monotonic() - self._start
+        for rule in rules:
+            if rule.triggered(elapsed, self._rng):
+                self._count(fault)
+                return True
+        return False
+
+    def stall(self) -> float:
+        """
+        Block the calling thread when a stall is triggered
+        return the duration of the stall
+        """
+        rules = self._event_rules.get('stall')
+        if rules is None:
+            return 0.
+        elapsed = time.monotonic() - self._start
+        for rule in rules:
+            if rule.triggered(elapsed, self._rng):
+                self._count('stall')
+                _logger.warning(f"Fault injection {self._name} stall for {rule.delay:.1f}s")
+                time.sleep(rule.delay)
+                return rule.delay
+        return 0.
+
+
+class FaultInjector:
+    """
+    Registry of the fault points configured with the fault_injection global parameter
+    fault_injection:
+        seed: 1
+        points:
+            coupler:<name>: [{fault: drop, probability: 0.01}, {fault: disconnect, at: 30, period: 60}]
+    """
+
+    enabled = False
+    _seed = 0
+    _rules = {}
+    _points = {}
+
+    @classmethod
+    def configure(cls, conf: dict):
+        cls._seed = conf.get('seed', 0)
+        points = conf.get('points', {})
+        if type(points) is not dict:
+            raise FaultConfigurationError("fault_injection points must be a dictionary")
+        rules = {}
+        for name, point_rules in points.items():
+            if type(point_rules) is not list:
+                raise FaultConfigurationError(f"fault_injection rules of {name} must be a list")
+            # check the rules now to report the errors at startup
+            FaultPoint(name, point_rules, cls._seed)
+            rules[name] = point_rules
+        cls._rules = rules
+        cls._points = {}
+        cls.enabled = len(rules) > 0
+        if cls.enabled:
+            _logger.warning(f"Fault injection active on {', '.join(rules.keys())} seed {cls._seed}")
+
+    @classmethod
+    def reset(cls):
+        cls._rules = {}
+        cls._points = {}
+        cls.enabled = False
+
+    @classmethod
+    def point(cls, name: str):
+        """
+        return the FaultPoint for the name or None if there is no fault configured
+        """
+        if not cls.enabled:
+            return None
+        rules = cls._rules.get(name)
+        if rules is None:
+            return None
+        point = FaultPoint(name, rules, cls._seed)
+        cls._points[name] = point
+        return point
+
+    @classmethod
+    def points(cls) -> dict:
+        return dict(cls._points)
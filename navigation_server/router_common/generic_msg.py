@@ -19,12 +19,13 @@ _logger = logging.getLogger("ShipDataServer."+__name__)
 
 class NavGenericMsg:
 
-    __slots__ = ('_type', '_msg', '_raw', '_datalen')
+    __slots__ = ('_type', '_msg', '_raw', '_datalen', '_stamp')
 
     def __init__(self, msg_type, raw=None, msg=None):
         if msg_type not in (NULL_MSG, TRANSPARENT_MSG, N0183_MSG, N2K_MSG, N0183D_MSG):
             raise ValueError
         self._type = msg_type
+        self._stamp = 0     # reception time (monotonic ns) when the latency tracking is on
         # self._raw = raw
         if self._type == N0183_MSG:
             if msg is None:
@@ -63,6 +64,14 @@ class NavGenericMsg:
     def msg(self):
         return self._msg
 
+    @property
+    def stamp(self) -> int:
+        return self._stamp
+
+    @stamp.setter
+    def stamp(self, stamp: int):
+        self._stamp = stamp
+
     @property
     def raw(self):
         return self._raw
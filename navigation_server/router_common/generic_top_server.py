@@ -75,6 +75,12 @@ class GenericTopServer:
             _logger.debug("Server %s joined" % server.name)
         _logger.debug("Top server => all servers joined")
 
+    def install_reload_handler(self):
+        """
+        Install the configuration reload signal handler, to be called from the main thread
+        """
+        pass
+
     def stop_handler(self, signum, frame):
         self._sigint_count += 1
         if self._sigint_count == 1:
@@ -0,0 +1,534 @@
+#-------------------------------------------------------------------------------
+# Name:        grpc_aio_server
+# Purpose:     gRPC server core on grpc.aio with per service concurrency isolation
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   The grpc.aio server runs in its own event loop thread. The servicers are registered through a registrar
+#   that stands for the server in the generated add_XXX_to_server functions and wraps every method handler:
+#       - coroutine methods and asynchronous generators (native servicers) run in the event loop
+#       - synchronous unary methods run in the control pool (control services) or in the unary pool
+#       - synchronous streams run in the stream pool, one thread hop per message, the thread is held
+#         while the generator is waiting for the next message
+#   Each service has a limit of concurrent streams, above the limit the stream is refused (RESOURCE_EXHAUSTED)
+#   An idle synchronous stream holds a stream thread, so the synchronous streams of all services are also limited
+#   to the stream threads, the last control_streams threads being reserved to the control services. Above that
+#   limit the stream is refused (RESOURCE_EXHAUSTED) instead of waiting for a thread that may never be released
+#   The synchronous methods receive a SyncServicerContext that gives the interface of the grpc.server context
+#   (is_active, add_callback, abort...) on top of the grpc.aio context that can only be used in the event loop
+
+import asyncio
+import inspect
+import logging
+import threading
+from concurrent import futures
+
+import grpc
+
+from .grpc_server_service import GrpcServer, GrpcServerError
+from navigation_server.router_common import ConfigurationException
+from .nav_threading import NavThread
+from .metrics_registry import MetricsRegistry
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+_active_streams = MetricsRegistry.gauge('navigation_grpc_active_streams', 'gRPC streams running per service',
+                                        ('service',))
+_rejected_streams = MetricsRegistry.counter('navigation_grpc_rejected_streams',
+                                            'gRPC streams refused on the service limit', ('service',))
+
+_END_OF_STREAM = object()
+
+
+class _AbortRpc(Exception):
+
+    def __init__(self, code, details):
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+
+class ServicePolicy:
+    """
+    Concurrency policy of one service: limit of concurrent streams and pool for the synchronous unary calls
+    The stream counters are only modified in the event loop thread
+    """
+    def __init__(self, name: str, max_streams: int, control: bool):
+        self._name = name
+        self._max_streams = max_streams
+        self._control = control
+        self._active = 0
+        self._rejected = 0
+        _active_streams.labels(name).set_function(lambda: self._active)
+        self._rejected_metric = _rejected_streams.labels(name)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def max_streams(self) -> int:
+        return self._max_streams
+
+    @property
+    def control(self) -> bool:
+        return self._control
+
+    @property
+    def active_streams(self) -> int:
+        return self._active
+
+    @property
+    def rejected_streams(self) -> int:
+        return self._rejected
+
+    def open_stream(self) -> bool:
+        if self._active >= self._max_streams:
+            self.reject_stream()
+            return False
+        self._active += 1
+        return True
+
+    def reject_stream(self):
+        self._rejected += 1
+        self._rejected_metric.inc()
+
+    def close_stream(self):
+        self._active -= 1
+
+
+class SyncServicerContext:
+    """
+    Context given to the synchronous servicer methods, same interface as the grpc.server context
+    The methods are called from the pool threads, the ones acting on the RPC are transferred to the event loop
+    """
+    def __init__(self, context, loop):
+        self._context = context
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._active = True
+        self._callbacks = []
+        self._code = None
+        self._details = None
+        self._trailing_metadata = None
+
+    def is_active(self) -> bool:
+        return self._active
+
+    def add_callback(self, callback) -> bool:
+        with self._lock:
+            if not self._active:
+                return False
+            self._callbacks.append(callback)
+            return True
+
+    def abort(self, code, details):
+        raise _AbortRpc(code, details)
+
+    def abort_with_status(self, status):
+        raise _AbortRpc(status.code, status.details)
+
+    def set_code(self, code):
+        self._code = code
+
+    def set_details(self, details):
+        self._details = details
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+    def set_trailing_metadata(self, trailing_metadata):
+        self._trailing_metadata = trailing_metadata
+
+    def send_initial_metadata(self, initial_metadata):
+        asyncio.run_coroutine_threadsafe(self._context.send_initial_metadata(initial_metadata), self._loop).result()
+
+    def peer(self):
+        return self._context.peer()
+
+    def peer_identities(self):
+        return self._context.peer_identities()
+
+    def auth_context(self):
+        return self._context.auth_context()
+
+    def invocation_metadata(self):
+        return self._context.invocation_metadata()
+
+    def time_remaining(self):
+        return self._context.time_remaining()
+
+    def apply(self):
+        """
+        Transfer the status set by the servicer to the RPC (event loop)
+        """
+        if self._code is not None:
+            self._context.set_code(self._code)
+        if self._details is not None:
+            self._context.set_details(self._details)
+        if self._trailing_metadata is not None:
+            self._context.set_trailing_metadata(self._trailing_metadata)
+
+    def terminate(self):
+        """
+        End of the RPC (event loop): the callbacks are run like with grpc.server
+        """
+        with self._lock:
+            self._active = False
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as err:
+                _logger.error(f"gRPC callback error {err.__class__.__name__}:{err}")
+
+
+class _SyncRequestIterator:
+    """
+    Blocking iterator on the request stream (asynchronous) for the synchronous servicer methods
+    """
+    def __init__(self, request_iterator, loop):
+        self._iterator = request_iterator.__aiter__()
+        self._loop = loop
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return asyncio.run_coroutine_threadsafe(self._iterator.__anext__(), self._loop).result()
+        except StopAsyncIteration:
+            raise StopIteration
+
+
+def _close_iterator(iterator):
+    close = getattr(iterator, 'close', None)
+    if close is not None:
+        try:
+            close()
+        except Exception as err:
+            _logger.debug(f"gRPC stream close error {err}")
+
+
+class _IsolatedGenericHandler(grpc.GenericRpcHandler):
+
+    def __init__(self, handler, registrar):
+        self._handler = handler
+        self._registrar = registrar
+        self._methods = {}
+
+    def service(self, handler_call_details):
+        try:
+            return self._methods[handler_call_details.method]
+        except KeyError:
+            pass
+        method_handler = self._handler.service(handler_call_details)
+        if method_handler is not None:
+            method_handler = self._registrar.wrap(method_handler)
+        self._methods[handler_call_details.method] = method_handler
+        return method_handler
+
+
+class ServiceRegistrar:
+    """
+    Stands for the grpc.aio server in the generated add_XXX_to_server functions
+    All method handlers of the service are wrapped with the service policy
+    """
+    def __init__(self, server, policy: ServicePolicy):
+        self._server = server
+        self._policy = policy
+
+    @property
+    def policy(self) -> ServicePolicy:
+        return self._policy
+
+    def add_generic_rpc_handlers(self, generic_rpc_handlers):
+        self._server.register(
+            lambda s: s.add_generic_rpc_handlers(tuple(_IsolatedGenericHandler(h, self) for h in generic_rpc_handlers)))
+
+    def add_registered_method_handlers(self, service_name, method_handlers):
+        handlers = {method: self.wrap(handler) for method, handler in method_handlers.items()}
+        self._server.register(lambda s: s.add_registered_method_handlers(service_name, handlers))
+
+    def wrap(self, handler):
+        options = {'request_deserializer': handler.request_deserializer,
+                   'response_serializer': handler.response_serializer}
+        if handler.request_streaming and handler.response_streaming:
+            return grpc.stream_stream_rpc_method_handler(self._stream(handler.stream_stream, True), **options)
+        elif handler.request_streaming:
+            return grpc.stream_unary_rpc_method_handler(self._unary(handler.stream_unary, True), **options)
+        elif handler.response_streaming:
+            return grpc.unary_stream_rpc_method_handler(self._stream(handler.unary_stream, False), **options)
+        else:
+            return grpc.unary_unary_rpc_method_handler(self._unary(handler.unary_unary, False), **options)
+
+    def _unary(self, behavior, request_streaming: bool):
+        if inspect.iscoroutinefunction(behavior):
+            return behavior
+        server = self._server
+        executor = server.control_executor if self._policy.control else server.unary_executor
+
+        async def unary_handler(request, context):
+            loop = asyncio.get_running_loop()
+            if request_streaming:
+                request = _SyncRequestIterator(request, loop)
+            sync_context = SyncServicerContext(context, loop)
+            try:
+                response = await loop.run_in_executor(executor, behavior, request, sync_context)
+            except _AbortRpc as abort:
+                await context.abort(abort.code, abort.details)
+            finally:
+                sync_context.terminate()
+            sync_context.apply()
+            return response
+
+        return unary_handler
+
+    def _stream(self, behavior, request_streaming: bool):
+        policy = self._policy
+        if inspect.isasyncgenfunction(behavior):
+
+            async def native_stream_handler(request, context):
+                if not policy.open_stream():
+                    await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                                        f"Service {policy.name} limit of {policy.max_streams} streams reached")
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                finally:
+                    policy.close_stream()
+
+            return native_stream_handler
+
+        server = self._server
+        executor = server.stream_executor
+
+        def release_thread(future):
+            server.release_stream_thread()
+
+        async def stream_handler(request, context):
+            if not policy.open_stream():
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                                    f"Service {policy.name} limit of {policy.max_streams} streams reached")
+            if not server.acquire_stream_thread(policy.control):
+                policy.close_stream()
+                policy.reject_stream()
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                                    f"Server {server.name} no stream thread available for {policy.name}")
+            loop = asyncio.get_running_loop()
+            if request_streaming:
+                request = _SyncRequestIterator(request, loop)
+            sync_context = SyncServicerContext(context, loop)
+            iterator = None
+            pending = None
+            try:
+                iterator = await loop.run_in_executor(executor, behavior, request, sync_context)
+                while True:
+                    pending = loop.run_in_executor(executor, next, iterator, _END_OF_STREAM)
+                    response = await pending
+                    if response is _END_OF_STREAM:
+                        break
+                    yield response
+                sync_context.apply()
+            except _AbortRpc as abort:
+                await context.abort(abort.code, abort.details)
+            finally:
+                policy.close_stream()
+                # the callbacks are releasing the generator when it is waiting for a message
+                sync_context.terminate()
+                # the stream thread is released when the generator is closed
+                if iterator is None:
+                    server.release_stream_thread()
+                elif pending is None or pending.done():
+                    executor.submit(_close_iterator, iterator).add_done_callback(release_thread)
+                else:
+                    pending.add_done_callback(
+                        lambda f: executor.submit(_close_iterator, iterator).add_done_callback(release_thread))
+
+        return stream_handler
+
+
+class _EventLoopThread(NavThread):
+
+    def __init__(self, server):
+        super().__init__(name=f"{server.name}-EventLoop", daemon=True)
+        self._server = server
+
+    def nrun(self):
+        self._server.run_loop()
+
+
+class GrpcAioServer(GrpcServer):
+    """
+    gRPC server running on grpc.aio, replaces GrpcServer in the configuration (same services)
+    The streams are not holding a thread for their lifetime and cannot starve the unary calls
+    Options:
+        nb_thread: threads for the synchronous unary calls (default 5)
+        control_threads: threads reserved for the synchronous unary calls of control services (default 2)
+        stream_threads: threads shared by the synchronous streams (default 32)
+        control_streams: stream threads reserved for the synchronous streams of control services (default 2)
+        max_streams: default limit of concurrent streams per service (default stream_threads - control_streams)
+    A synchronous stream waiting for its next message holds a stream thread, the synchronous streams above
+    stream_threads - control_streams (stream_threads for the control services) are refused
+    """
+
+    asynchronous = True
+
+    def __init__(self, options):
+        self._registrations = []
+        self._policies = {}
+        self._nb_threads = options.get('nb_thread', int, 5)
+        self._control_threads = options.get('control_threads', int, 2)
+        self._stream_threads = options.get('stream_threads', int, 32)
+        self._control_streams = options.get('control_streams', int, 2)
+        if not 0 <= self._control_streams < self._stream_threads:
+            raise ConfigurationException(f"Server {options.get('name', str, None)} control_streams must be lower "
+                                         f"than stream_threads")
+        self._max_streams = options.get('max_streams', int, self._stream_threads - self._control_streams)
+        self._sync_streams = 0
+        self._stream_lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
+        self._stop_request = None
+        self._started = threading.Event()
+        self._loop_stopped = threading.Event()
+        self._start_error = None
+        self._unary_executor = None
+        self._control_executor = None
+        self._stream_executor = None
+        super().__init__(options)
+
+    def _create_server(self, options):
+        # the grpc.aio server is created in the event loop at start
+        return None
+
+    def register(self, registration):
+        """
+        Keep a registration function, they are all applied on the grpc.aio server when it is created
+        """
+        if self._grpc_server is not None:
+            raise GrpcServerError(f"Server {self._name} already running, services cannot be added")
+        self._registrations.append(registration)
+
+    def service_registrar(self, name: str, max_streams: int = 0, control: bool = False):
+        try:
+            policy = self._policies[name]
+        except KeyError:
+            if max_streams <= 0:
+                max_streams = self._max_streams
+            policy = ServicePolicy(name, max_streams, control)
+            self._policies[name] = policy
+            _logger.info(f"gRPC service {name} max streams {max_streams} control {control}")
+        return ServiceRegistrar(self, policy)
+
+    def policies(self) -> list:
+        return list(self._policies.values())
+
+    def policy(self, name: str) -> ServicePolicy:
+        return self._policies[name]
+
+    @property
+    def unary_executor(self):
+        return self._unary_executor
+
+    @property
+    def control_executor(self):
+        return self._control_executor
+
+    @property
+    def stream_executor(self):
+        return self._stream_executor
+
+    @property
+    def loop(self):
+        return self._loop
+
+    @property
+    def sync_streams(self) -> int:
+        """
+        Number of stream threads held by the synchronous streams
+        """
+        return self._sync_streams
+
+    def acquire_stream_thread(self, control: bool) -> bool:
+        """
+        Reserve a stream thread for a synchronous stream, False when all the threads available are held
+        """
+        limit = self._stream_threads if control else self._stream_threads - self._control_streams
+        with self._stream_lock:
+            if self._sync_streams >= limit:
+                return False
+            self._sync_streams += 1
+            return True
+
+    def release_stream_thread(self):
+        with self._stream_lock:
+            self._sync_streams -= 1
+
+    def start(self) -> None:
+        _logger.info("Server %s (grpc.aio) starting on port %d" % (self._name, self._port))
+        self._unary_executor = futures.ThreadPoolExecutor(self._nb_threads, thread_name_prefix=f"{self._name}-Unary")
+        self._control_executor = futures.ThreadPoolExecutor(self._control_threads,
+                                                            thread_name_prefix=f"{self._name}-Control")
+        self._stream_executor = futures.ThreadPoolExecutor(self._stream_threads,
+                                                           thread_name_prefix=f"{self._name}-Stream")
+        self._loop_thread = _EventLoopThread(self)
+        self._loop_thread.start()
+        self._started.wait()
+        if self._start_error is not None:
+            _logger.critical(f"Server {self._name} start error: {self._start_error}")
+            raise GrpcServerError(self._start_error)
+        self._running = True
+
+    def run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        finally:
+            self._loop.close()
+            for executor in (self._unary_executor, self._control_executor, self._stream_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._started.set()
+            self._loop_stopped.set()
+
+    async def _serve(self):
+        self._stop_request = asyncio.Event()
+        try:
+            server = grpc.aio.server()
+            for registration in self._registrations:
+                registration(server)
+            server.add_insecure_port("0.0.0.0:%d" % self._port)
+            await server.start()
+        except Exception as err:
+            self._start_error = f"{err.__class__.__name__}:{err}"
+            return
+        self._grpc_server = server
+        self._started.set()
+        await self._stop_request.wait()
+        await server.stop(0.1)
+        # releasing the server shuts down the grpc.aio poller before the event loop is closed
+        self._grpc_server = None
+        _logger.debug(f"Server {self._name} (grpc.aio) stopped")
+
+    def stop(self):
+        _logger.debug("Stopping %s GRPC Server (grpc.aio)" % self._name)
+        if self._loop_thread is None:
+            self._loop_stopped.set()
+        elif self._stop_request is not None and not self._loop_stopped.is_set():
+            self._loop.call_soon_threadsafe(self._stop_request.set)
+        self._end_event = self._loop_stopped
+        self._wait_lock.release()
+        self._running = False
@@ -46,6 +46,8 @@ class NavigationGrpcControlServicerImpl(NavigationGrpcControlServicer):
 class GrpcServer(NavigationServer):
 
     grpc_server_global = None
+    asynchronous = False
+
     @staticmethod
     def get_grpc_server():
         # print(__name__, "get grpc server", GrpcServer.grpc_server_global)
@@ -62,17 +64,28 @@ class GrpcServer(NavigationServer):
             raise ValueError
         self._end_event = None
         self._wait_lock = threading.Semaphore(0)
-        nb_threads = options.get('nb_thread', int, 5)
-        address = "0.0.0.0:%d" % self._port
-        self._grpc_server = grpc.server(futures.ThreadPoolExecutor(max_workers=nb_threads))
-        self._grpc_server.add_insecure_port(address)
+        self._grpc_server = self._create_server(options)
         GrpcServer.grpc_server_global = self
         self._running = False
         self._services = []
         # print(__name__, "Building GrpcServer", self.name)
         # add the default service
         self._grpc_service = NavigationGrpcControlServicerImpl()
-        add_NavigationGrpcControlServicer_to_server(self._grpc_service, self._grpc_server)
+        add_NavigationGrpcControlServicer_to_server(self._grpc_service,
+                                                    self.service_registrar('NavigationGrpcControl', control=True))
+
+    def _create_server(self, options):
+        nb_threads = options.get('nb_thread', int, 5)
+        address = "0.0.0.0:%d" % self._port
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=nb_threads))
+        server.add_insecure_port(address)
+        return server
+
+    def service_registrar(self, name: str, max_streams: int = 0, control: bool = False):
+        """
+        Return the object to pass to the add_XXX_to_server functions, all services share the thread pool here
+        """
+        return self._grpc_server
 
     def server_type(self):
         return "gRPCServer"
@@ -125,12 +138,17 @@ class GrpcServer(NavigationServer):
 
 class GrpcService:
 
+    control_service = False
+
     def __init__(self, opts):
         self._name = opts.get('name', str, "DefaultGrpcService")
         self._server_name = opts.get('server', str, None)
         if self._server_name is None:
             raise ConfigurationException(f"Service {self._name} missing server reference")
         self._server = None
+        # concurrency isolation, only used by GrpcAioServer
+        self._max_streams = opts.get('max_streams', int, 0)
+        self._control = opts.get('control', bool, self.control_service)
         _logger.info("Creating service %s on server %s" % (self._name, self._server_name))
 
     def finalize(self):
@@ -142,7 +160,14 @@ class GrpcService:
 
     @property
     def grpc_server(self):
-        return self._server.grpc_server
+        return self._server.service_registrar(self._name, self._max_streams, self._control)
+
+    @property
+    def asynchronous(self) -> bool:
+        """
+        True when the server runs the coroutine (native asynchronous) servicers
+        """
+        return self._server.asynchronous
 
     def stop_service(self):
         self._server.remove_service(self._name)
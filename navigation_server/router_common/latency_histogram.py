@@ -0,0 +1,248 @@
+#-------------------------------------------------------------------------------
+# Name:        latency_histogram
+# Purpose:     Latency tracking of the messages along the processing pipeline
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   The messages carry the monotonic time (ns) of their reception as stamp, 0 when the tracking is off.
+#   Each checkpoint owns a histogram (stage, owner) obtained once at creation, recording the time elapsed
+#   since the reception. The time spent in one stage is the difference between successive checkpoints.
+#   Histograms are log-linear (HDR style): 16 linear buckets below 16us, then 8 buckets per power of 2,
+#   that is a relative precision of 12.5%. The counters are a preallocated array, there is no lock and no
+#   allocation when recording: each histogram is written by a single thread and read as a snapshot.
+#   A checkpoint run by several threads (one per stream) is a group: each stream gets its own histogram
+#   and the histograms are merged when read. The histogram of a finished stream is folded in the group.
+
+import logging
+import threading
+import time
+from array import array
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+LATENCY_SUB_BUCKETS = 8
+LATENCY_LINEAR = 2 * LATENCY_SUB_BUCKETS
+LATENCY_BUCKETS = 192   # up to 2^26 us (67s)
+
+
+def latency_bucket(value_us: int) -> int:
+    if value_us < LATENCY_LINEAR:
+        return value_us if value_us > 0 else 0
+    exponent = value_us.bit_length() - 4
+    index = exponent * LATENCY_SUB_BUCKETS + (value_us >> exponent)
+    return index if index < LATENCY_BUCKETS else LATENCY_BUCKETS - 1
+
+
+def latency_bucket_low(index: int) -> int:
+    """
+    return the lower bound (us) of the bucket
+    """
+    if index < LATENCY_LINEAR:
+        return index
+    exponent = index // LATENCY_SUB_BUCKETS - 1
+    return (index % LATENCY_SUB_BUCKETS + LATENCY_SUB_BUCKETS) << exponent
+
+
+class LatencyHistogram:
+    """
+    Histogram of the latency (us) at one checkpoint
+    """
+
+    __slots__ = ('_stage', '_owner', '_counts', '_total', '_max')
+
+    def __init__(self, stage: str, owner: str):
+        self._stage = stage
+        self._owner = owner
+        self._counts = array('Q', bytes(8 * LATENCY_BUCKETS))
+        self._total = 0
+        self._max = 0
+
+    @property
+    def stage(self) -> str:
+        return self._stage
+
+    @property
+    def owner(self) -> str:
+        return self._owner
+
+    def record_since(self, stamp: int):
+        """
+        Record the time elapsed since the stamp (time.monotonic_ns), nothing is done if the stamp is 0
+        """
+        if stamp == 0:
+            return
+        value = (time.monotonic_ns() - stamp) // 1000
+        self._counts[latency_bucket(value)] += 1
+        self._total += value
+        if value > self._max:
+            self._max = value
+
+    def reset(self):
+        for i in range(LATENCY_BUCKETS):
+            self._counts[i] = 0
+        self._total = 0
+        self._max = 0
+
+    def snapshot(self) -> tuple:
+        """
+        return (counts, total in us, max in us), counts being a copy of the buckets
+        """
+        return array('Q', self._counts), self._total, self._max
+
+    def merge(self, counts, total: int, max_value: int):
+        """
+        Add the samples of a snapshot (counts, total, max), to be called by the thread owning the histogram
+        """
+        for index in range(LATENCY_BUCKETS):
+            self._counts[index] += counts[index]
+        self._total += total
+        if max_value > self._max:
+            self._max = max_value
+
+    @staticmethod
+    def percentile(counts, fraction: float) -> int:
+        """
+        return the upper bound (us) of the bucket including the fraction of the samples
+        """
+        nb = sum(counts)
+        if nb == 0:
+            return 0
+        threshold = fraction * nb
+        cumulated = 0
+        for index, count in enumerate(counts):
+            cumulated += count
+            if cumulated >= threshold:
+                return latency_bucket_low(index + 1)
+        return latency_bucket_low(LATENCY_BUCKETS)
+
+
+class LatencyHistogramGroup:
+    """
+    Histograms of one checkpoint run by several threads, each thread records in its own histogram
+    """
+
+    __slots__ = ('_stage', '_owner', '_writers', '_closed', '_lock')
+
+    def __init__(self, stage: str, owner: str):
+        self._stage = stage
+        self._owner = owner
+        self._writers = []
+        self._closed = LatencyHistogram(stage, owner)
+        self._lock = threading.Lock()
+
+    @property
+    def stage(self) -> str:
+        return self._stage
+
+    @property
+    def owner(self) -> str:
+        return self._owner
+
+    def writer(self) -> LatencyHistogram:
+        """
+        return a new histogram for the calling thread, to be released when the thread stops recording
+        """
+        histogram = LatencyHistogram(self._stage, self._owner)
+        with self._lock:
+            self._writers.append(histogram)
+        return histogram
+
+    def release(self, histogram: LatencyHistogram):
+        """
+        The samples of the histogram are kept in the group
+        """
+        with self._lock:
+            try:
+                self._writers.remove(histogram)
+            except ValueError:
+                return
+            self._closed.merge(*histogram.snapshot())
+
+    def reset(self):
+        with self._lock:
+            self._closed.reset()
+            for histogram in self._writers:
+                histogram.reset()
+
+    def snapshot(self) -> tuple:
+        """
+        return (counts, total in us, max in us) for all the histograms of the group
+        """
+        with self._lock:
+            counts, total, max_value = self._closed.snapshot()
+            for histogram in self._writers:
+                w_counts, w_total, w_max = histogram.snapshot()
+                for index in range(LATENCY_BUCKETS):
+                    counts[index] += w_counts[index]
+                total += w_total
+                max_value = max(max_value, w_max)
+        return counts, total, max_value
+
+
+class LatencyTracker:
+    """
+    Registry of the latency histograms and runtime switch of the tracking
+    The checkpoints test the stamp of the message, so the cost is one comparison when the tracking is off
+    """
+
+    enabled = False
+    _histograms = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def histogram(cls, stage: str, owner: str) -> LatencyHistogram:
+        """
+        return the histogram for the checkpoint, created if needed
+        """
+        with cls._lock:
+            try:
+                return cls._histograms[(stage, owner)]
+            except KeyError:
+                histogram = LatencyHistogram(stage, owner)
+                cls._histograms[(stage, owner)] = histogram
+                return histogram
+
+    @classmethod
+    def histogram_group(cls, stage: str, owner: str) -> LatencyHistogramGroup:
+        """
+        return the histogram group for a checkpoint run by several threads, created if needed
+        """
+        with cls._lock:
+            try:
+                return cls._histograms[(stage, owner)]
+            except KeyError:
+                group = LatencyHistogramGroup(stage, owner)
+                cls._histograms[(stage, owner)] = group
+                return group
+
+    @classmethod
+    def stamp(cls) -> int:
+        """
+        return the reception stamp for a new message, 0 when the tracking is off
+        """
+        if cls.enabled:
+            return time.monotonic_ns()
+        return 0
+
+    @classmethod
+    def enable(cls, enabled: bool = True):
+        _logger.info(f"Latency tracking {'enabled' if enabled else 'disabled'}")
+        cls.enabled = enabled
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            for histogram in cls._histograms.values():
+                histogram.reset()
+
+    @classmethod
+    def histograms(cls, stage: str = None, owner: str = None) -> list:
+        with cls._lock:
+            return [h for h in cls._histograms.values()
+                    if (stage is None or h.stage == stage) and (owner is None or h.owner == owner)]
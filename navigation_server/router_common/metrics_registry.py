@@ -0,0 +1,314 @@
+#-------------------------------------------------------------------------------
+# Name:        metrics_registry
+# Purpose:     Registry of the metrics (counters, gauges, histograms) of all components
+#              with OpenMetrics text exposition
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   A metric family has a type, a help text and label names. The values (children) are either:
+#       - updated by the component (inc, set, observe) with no lock: each child is written by one thread
+#       - read at scrape time from a function, that is the preferred way for the existing counters
+#         as there is then no cost at all on the hot path
+#       - produced by a collector function for the families with dynamic labels (PGN, source address...)
+#   The lock is only taken to create or remove children and collectors, never when the values are updated.
+#   The scrape reads the values without lock, a value can be one update late.
+
+import logging
+import math
+import threading
+
+from .latency_histogram import LatencyTracker, latency_bucket
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+METRIC_COUNTER = 'counter'
+METRIC_GAUGE = 'gauge'
+METRIC_HISTOGRAM = 'histogram'
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = None) -> str:
+    labels = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        labels.append(extra)
+    if len(labels) == 0:
+        return ''
+    return '{' + ','.join(labels) + '}'
+
+
+class MetricValue:
+    """
+    Counter or gauge value for one set of labels
+    """
+
+    __slots__ = ('_value', '_function')
+
+    def __init__(self):
+        self._value = 0
+        self._function = None
+
+    def inc(self, amount=1):
+        self._value += amount
+
+    def dec(self, amount=1):
+        self._value -= amount
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        """
+        The value is read by calling the function at scrape time
+        """
+        self._function = function
+
+    @property
+    def value(self):
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+
+class HistogramValue:
+    """
+    Histogram for one set of labels, the buckets are the upper bounds (le) of the cumulative counts
+    """
+
+    __slots__ = ('_bounds', '_counts', '_sum', '_count')
+
+    def __init__(self, bounds: tuple):
+        self._bounds = bounds
+        self._counts = [0] * len(bounds)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self._bounds):
+            if value <= bound:
+                self._counts[index] += 1
+                break
+        self._sum += value
+        self._count += 1
+
+    def samples(self) -> tuple:
+        """
+        return (list of (le, cumulated count), count, sum)
+        """
+        cumulated = 0
+        buckets = []
+        for bound, count in zip(self._bounds, self._counts):
+            cumulated += count
+            buckets.append((bound, cumulated))
+        buckets.append((math.inf, self._count))
+        return buckets, self._count, self._sum
+
+
+class MetricFamily:
+    """
+    Set of metrics with the same name and type distinguished by the label values
+    """
+
+    def __init__(self, name: str, metric_type: str, help_text: str, label_names: tuple = (), buckets: tuple = None):
+        self._name = name
+        self._type = metric_type
+        self._help = help_text
+        self._label_names = tuple(label_names)
+        self._buckets = buckets
+        self._children = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def metric_type(self) -> str:
+        return self._type
+
+    @property
+    def label_names(self) -> tuple:
+        return self._label_names
+
+    def labels(self, *label_values):
+        """
+        return the value for the labels, created if needed
+        The value shall be kept by the caller to avoid the lookup on the hot path
+        """
+        if len(label_values) != len(self._label_names):
+            raise ValueError(f"Metric {self._name} expects labels {self._label_names}")
+        key = tuple(str(v) for v in label_values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    if self._type == METRIC_HISTOGRAM:
+                        child = HistogramValue(self._buckets)
+                    else:
+                        child = MetricValue()
+                    self._children[key] = child
+        return child
+
+    def remove(self, *label_values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in label_values), None)
+
+    def add_collector(self, key, collector):
+        """
+        collector is a function returning an iterable of (label values, value) called at scrape time
+        For histograms the value is (list of (le, cumulated count), count, sum)
+        """
+        with self._lock:
+            self._collectors[key] = collector
+
+    def remove_collector(self, key):
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def samples(self):
+        """
+        return the list of (label values, value) for all children and collectors
+        """
+        result = []
+        for key, child in list(self._children.items()):
+            try:
+                value = child.samples() if self._type == METRIC_HISTOGRAM else child.value
+            except Exception as err:
+                _logger.error(f"Metric {self._name}{key} read error: {err}")
+                continue
+            if value is not None:
+                result.append((key, value))
+        for key, collector in list(self._collectors.items()):
+            try:
+                result.extend(collector())
+            except Exception as err:
+                _logger.error(f"Metric {self._name} collector {key} error: {err}")
+        return result
+
+    def exposition(self, lines: list):
+        samples = self.samples()
+        lines.append(f"# TYPE {self._name} {self._type}")
+        lines.append(f"# HELP {self._name} {_escape(self._help)}")
+        for label_values, value in samples:
+            if self._type == METRIC_COUNTER:
+                lines.append(f"{self._name}_total{_format_labels(self._label_names, label_values)} "
+                             f"{_format_value(value)}")
+            elif self._type == METRIC_GAUGE:
+                lines.append(f"{self._name}{_format_labels(self._label_names, label_values)} "
+                             f"{_format_value(value)}")
+            else:
+                buckets, count, total = value
+                for bound, cumulated in buckets:
+                    le = 'le="%s"' % _format_value(bound)
+                    lines.append(f"{self._name}_bucket{_format_labels(self._label_names, label_values, le)} "
+                                 f"{cumulated}")
+                lines.append(f"{self._name}_count{_format_labels(self._label_names, label_values)} {count}")
+                lines.append(f"{self._name}_sum{_format_labels(self._label_names, label_values)} "
+                             f"{_format_value(total)}")
+
+
+class MetricsRegistry:
+    """
+    Registry of all metric families of the process
+    Families are declared once per name, a second declaration returns the existing family
+    """
+
+    _families = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _family(cls, name: str, metric_type: str, help_text: str, label_names, buckets=None) -> MetricFamily:
+        with cls._lock:
+            family = cls._families.get(name)
+            if family is None:
+                family = MetricFamily(name, metric_type, help_text, label_names, buckets)
+                cls._families[name] = family
+            elif family.metric_type != metric_type or family.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} already declared with another type or labels")
+            return family
+
+    @classmethod
+    def counter(cls, name: str, help_text: str, label_names=()) -> MetricFamily:
+        return cls._family(name, METRIC_COUNTER, help_text, label_names)
+
+    @classmethod
+    def gauge(cls, name: str, help_text: str, label_names=()) -> MetricFamily:
+        return cls._family(name, METRIC_GAUGE, help_text, label_names)
+
+    @classmethod
+    def histogram(cls, name: str, help_text: str, buckets: tuple, label_names=()) -> MetricFamily:
+        return cls._family(name, METRIC_HISTOGRAM, help_text, label_names, tuple(sorted(buckets)))
+
+    @classmethod
+    def family(cls, name: str) -> MetricFamily:
+        """
+        raise KeyError if the family is not declared
+        """
+        return cls._families[name]
+
+    @classmethod
+    def exposition(cls) -> str:
+        """
+        return all metrics in OpenMetrics text format
+        """
+        with cls._lock:
+            families = sorted(cls._families.values(), key=lambda f: f.name)
+        lines = []
+        for family in families:
+            family.exposition(lines)
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+
+#
+#   Latency histograms of the message pipeline (see latency_histogram) exposed as histograms in seconds
+#
+LATENCY_EXPORT_BOUNDS = tuple(1 << e for e in range(4, 27, 2))    # us from 16us to 67s
+
+
+def _latency_samples():
+    for histogram in LatencyTracker.histograms():
+        counts, total, max_value = histogram.snapshot()
+        nb = sum(counts)
+        if nb == 0:
+            continue
+        buckets = []
+        cumulated = 0
+        index = 0
+        for bound in LATENCY_EXPORT_BOUNDS:
+            # le is <=: the bucket holding the bound is included (it starts at the bound, that is a power of 2)
+            last = latency_bucket(bound)
+            while index <= last:
+                cumulated += counts[index]
+                index += 1
+            buckets.append((bound * 1e-6, cumulated))
+        buckets.append((math.inf, nb))
+        yield (histogram.stage, histogram.owner), (buckets, nb, total * 1e-6)
+
+
+MetricsRegistry.histogram('navigation_pipeline_latency_seconds',
+                          'Time since the message reception at each pipeline checkpoint',
+                          tuple(b * 1e-6 for b in LATENCY_EXPORT_BOUNDS),
+                          ('stage', 'owner')).add_collector('latency_tracker', _latency_samples)
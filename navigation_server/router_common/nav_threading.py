@@ -14,6 +14,7 @@ import cProfile
 import pstats
 import logging
 from navigation_server.router_common.global_variables import MessageServerGlobals
+from navigation_server.router_common.sampling_profiler import SamplingProfiler
 
 _logger = logging.getLogger("ShipDataServer."+__name__)
 
@@ -84,6 +85,7 @@ class NavThreadingController:
     def __init__(self):
         self._active_threads = {}
         self._running_thread = {}
+        self._sampling_profiler = None
 
     def register(self, thread: NavThread):
         _logger.debug("NavThreading => Registering thread %s" % thread.name)
@@ -110,6 +112,45 @@ class NavThreadingController:
         for thread in self._running_thread.values():
             yield thread
 
+    def thread_idents(self) -> dict:
+        """
+        return {thread ident: thread name} for the running threads, safe to call from any thread
+        """
+        return {t.ident: t.name for t in list(self._running_thread.values())}
+
+    @property
+    def sampling_profiler(self) -> SamplingProfiler:
+        if self._sampling_profiler is None:
+            self._sampling_profiler = SamplingProfiler(self)
+        return self._sampling_profiler
+
+    def configure_sampling(self, sampling_conf: dict):
+        """
+        Configure the sampling profiler from the 'sampling_profiler' global parameter
+        keys: rate (Hz), slot_period (s), slots, autostart
+        """
+        self._sampling_profiler = SamplingProfiler(self,
+                                                   float(sampling_conf.get('rate', 100.)),
+                                                   float(sampling_conf.get('slot_period', 10.)),
+                                                   int(sampling_conf.get('slots', 30)))
+        if sampling_conf.get('autostart', False):
+            self._sampling_profiler.start()
+
+    def start_sampling(self, rate: float = None):
+        self.sampling_profiler.start(rate)
+
+    def stop_sampling(self):
+        if self._sampling_profiler is not None:
+            self._sampling_profiler.stop()
+
+    def dump_sampling(self, thread_name: str = None) -> list:
+        """
+        return the samples in folded stack format (one line per stack)
+        """
+        if self._sampling_profiler is None:
+            return []
+        return self._sampling_profiler.dump(thread_name)
+
 
 class NavProfilingController:
     """
@@ -11,6 +11,7 @@
 
 
 import logging
+import socket
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
@@ -32,3 +33,31 @@ def get_id_from_mac(source: str) -> int:
     mac_bytes = mac.split(':')
     return (int(mac_bytes[5], 16) + (int(mac_bytes[4], 16) << 8) + (int(mac_bytes[3], 16) << 16) +
                (int(mac_bytes[2], 16) << 24))
+
+
+def is_local_address(address: str) -> bool:
+    """
+    Check if the address (host or host:port) designates the local host
+    Used to select local transports when client and server are co-located
+    """
+    if address.startswith('['):
+        # bracketed IPv6 address, the port is optional
+        host = address[1:].split(']', 1)[0]
+    elif address.count(':') == 1:
+        host = address.split(':', 1)[0]
+    else:
+        # host name, IPv4 or bare IPv6 address without port
+        host = address
+    if host in ('localhost', '127.0.0.1', '::1', '0.0.0.0', ''):
+        return True
+    try:
+        target = socket.gethostbyname(host)
+    except socket.gaierror:
+        return False
+    if target.startswith('127.'):
+        return True
+    try:
+        local_addresses = socket.gethostbyname_ex(socket.gethostname())[2]
+    except socket.gaierror:
+        return False
+    return target in local_addresses
@@ -0,0 +1,196 @@
+#-------------------------------------------------------------------------------
+# Name:        sampling_profiler
+# Purpose:     Low overhead statistical profiler of the NavThread workers
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   A sampling thread reads the stacks of all threads via sys._current_frames at a fixed rate and keeps the
+#   ones of the running NavThread. A stack is recorded as the tuple of its code objects (no string built
+#   on the sampling path), the conversion in folded format (func;func;func count) is done on dump only.
+#   The samples are aggregated per thread in time slots. The slots form a ring (deque with maxlen) so
+#   the memory is bounded and the dump covers the last slots * slot_period seconds. The number of distinct
+#   stacks per thread and slot is also bounded, the extra samples are counted as [truncated].
+
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class SamplingSlot:
+    """
+    Samples of one period: thread name -> {stack (tuple of code objects): count}
+    """
+
+    __slots__ = ('start', 'threads', 'truncated')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.threads = {}
+        self.truncated = collections.Counter()
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of the running NavThreads and aggregate them in folded stack format
+    """
+
+    max_depth = 64
+    max_stacks = 2000   # per thread and slot
+
+    def __init__(self, thread_controller, rate: float = 100.0, slot_period: float = 10.0, slots: int = 30):
+        self._controller = thread_controller
+        self._rate = rate
+        self._slot_period = slot_period
+        self._ring = collections.deque(maxlen=slots)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._nb_samples = 0
+        self._cpu_time = 0.0
+        self._run_time = 0.0
+        self._labels = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def nb_samples(self) -> int:
+        return self._nb_samples
+
+    def cpu_load(self) -> float:
+        """
+        return the fraction of one core used by the sampling thread since the start
+        """
+        if self._run_time <= 0.:
+            return 0.
+        return self._cpu_time / self._run_time
+
+    def start(self, rate: float = None):
+        if self.running:
+            _logger.info("Sampling profiler already running")
+            return
+        if rate is not None and rate > 0.:
+            self._rate = rate
+        self._stop_event.clear()
+        self._cpu_time = 0.0
+        self._run_time = 0.0
+        # the sampling thread is not a NavThread, so it is never sampled itself
+        self._thread = threading.Thread(name="SamplingProfiler", target=self._run, daemon=True)
+        self._thread.start()
+        _logger.info(f"Sampling profiler started at {self._rate:.0f} Hz")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        _logger.info(f"Sampling profiler stopped after {self._nb_samples} samples cpu load {self.cpu_load():.4f}")
+
+    def reset(self):
+        with self._lock:
+            self._ring.clear()
+            self._nb_samples = 0
+
+    def _run(self):
+        interval = 1.0 / self._rate
+        cpu_start = time.thread_time()
+        run_start = time.monotonic()
+        next_sample = run_start
+        slot = None
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            if slot is None or now - slot.start >= self._slot_period:
+                slot = SamplingSlot(now)
+                with self._lock:
+                    self._ring.append(slot)
+            self._sample(slot)
+            self._cpu_time = time.thread_time() - cpu_start
+            self._run_time = time.monotonic() - run_start
+            next_sample += interval
+            delay = next_sample - time.monotonic()
+            if delay < 0.:
+                # we are late, skip the missed samples
+                next_sample = time.monotonic()
+                delay = 0.
+            self._stop_event.wait(delay)
+
+    def _sample(self, slot: SamplingSlot):
+        threads = self._controller.thread_idents()
+        max_depth = self.max_depth
+        for ident, frame in sys._current_frames().items():
+            name = threads.get(ident)
+            if name is None:
+                continue
+            stack = []
+            depth = 0
+            while frame is not None and depth < max_depth:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+                depth += 1
+            stack = tuple(stack)
+            stacks = slot.threads.get(name)
+            if stacks is None:
+                stacks = {}
+                slot.threads[name] = stacks
+            try:
+                stacks[stack] += 1
+            except KeyError:
+                if len(stacks) < self.max_stacks:
+                    stacks[stack] = 1
+                else:
+                    slot.truncated[name] += 1
+        self._nb_samples += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}"
+            self._labels[code] = label
+        return label
+
+    def folded_stacks(self, thread_name: str = None) -> dict:
+        """
+        Aggregate the slots of the ring
+        return {thread name: {folded stack: count}}, the folded stack is root first separated by ';'
+        """
+        with self._lock:
+            slots = list(self._ring)
+        result = {}
+        for slot in slots:
+            for name, stacks in list(slot.threads.items()):
+                if thread_name is not None and name != thread_name:
+                    continue
+                folded = result.setdefault(name, collections.Counter())
+                for stack, count in list(stacks.items()):
+                    folded[';'.join(self._label(code) for code in reversed(stack))] += count
+            for name, count in list(slot.truncated.items()):
+                if thread_name is None or name == thread_name:
+                    result.setdefault(name, collections.Counter())['[truncated]'] += count
+        return result
+
+    def dump(self, thread_name: str = None) -> list:
+        """
+        return the lines in folded stack format with the thread name as root: thread;func;func count
+        the lines can be directly processed by flamegraph.pl or speedscope
+        """
+        lines = []
+        for name, folded in sorted(self.folded_stacks(thread_name).items()):
+            for stack, count in folded.most_common():
+                lines.append(f"{name.replace(';', '_')};{stack} {count}")
+        return lines
@@ -0,0 +1,283 @@
+#-------------------------------------------------------------------------------
+# Name:        systemd_dbus
+# Purpose:     systemd units supervision through the systemd D-Bus API
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .dbus_client import DBusConnection, DBusException
+from navigation_server.generated.agent_pb2 import ServiceStateMsg
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+SYSTEMD_SERVICE = 'org.freedesktop.systemd1'
+SYSTEMD_PATH = '/org/freedesktop/systemd1'
+MANAGER_INTERFACE = 'org.freedesktop.systemd1.Manager'
+UNIT_INTERFACE = 'org.freedesktop.systemd1.Unit'
+SERVICE_INTERFACE = 'org.freedesktop.systemd1.Service'
+# systemd value for accounting not available
+UINT64_UNSET = 0xFFFFFFFFFFFFFFFF
+# results of the jobs kept for the waiters, JobRemoved is broadcast for all the jobs of the system
+MAX_JOB_RESULTS = 64
+
+
+def unit_name(service: str) -> str:
+    if '.' in service:
+        return service
+    return service + '.service'
+
+
+class SystemdUnit:
+    """
+    Cached state of one unit, kept up to date by the PropertiesChanged signals of the unit object
+    The accounting (MemoryCurrent, CPUUsageNSec) is not signalled by systemd and is read by refresh_accounting()
+    """
+
+    def __init__(self, manager, name: str, path: str):
+        self._manager = manager
+        self._name = name
+        self._path = path
+        self._unit = {}
+        self._service = {}
+        self._lock = threading.Lock()
+        self.timestamp = 0.0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def load_state(self) -> str:
+        return self._unit.get('LoadState', 'not-found')
+
+    @property
+    def active_state(self) -> str:
+        return self._unit.get('ActiveState', 'unknown')
+
+    @property
+    def sub_state(self) -> str:
+        return self._unit.get('SubState', 'unknown')
+
+    @property
+    def main_pid(self) -> int:
+        return self._service.get('MainPID', 0)
+
+    @property
+    def memory(self) -> int:
+        memory = self._service.get('MemoryCurrent', UINT64_UNSET)
+        return 0 if memory == UINT64_UNSET else memory
+
+    @property
+    def cpu_usage_ns(self) -> int:
+        cpu = self._service.get('CPUUsageNSec', UINT64_UNSET)
+        return 0 if cpu == UINT64_UNSET else cpu
+
+    @property
+    def restarts(self) -> int:
+        return self._service.get('NRestarts', 0)
+
+    @property
+    def exists(self) -> bool:
+        return self.load_state != 'not-found'
+
+    @property
+    def is_active(self) -> bool:
+        return self.active_state in ('active', 'reloading')
+
+    def status_code(self) -> int:
+        """
+        same codes as 'systemctl status': 0 active, 3 not active, 4 no such unit
+        """
+        if not self.exists:
+            return 4
+        return 0 if self.is_active else 3
+
+    def refresh(self):
+        unit = self._manager.connection.get_all(SYSTEMD_SERVICE, self._path, UNIT_INTERFACE)
+        service = self._manager.connection.get_all(SYSTEMD_SERVICE, self._path, SERVICE_INTERFACE)
+        with self._lock:
+            self._unit = unit
+            self._service = service
+            self.timestamp = time.time()
+
+    def refresh_accounting(self):
+        service = self._manager.connection.get_all(SYSTEMD_SERVICE, self._path, SERVICE_INTERFACE)
+        with self._lock:
+            self._service = service
+
+    def update(self, interface: str, changed: dict, invalidated: list) -> bool:
+        if interface not in (UNIT_INTERFACE, SERVICE_INTERFACE):
+            return False
+        if invalidated:
+            # systemd sends the names only for some properties
+            try:
+                changed = dict(changed)
+                changed.update(self._manager.connection.get_all(SYSTEMD_SERVICE, self._path, interface))
+            except DBusException as err:
+                _logger.error(f"systemd unit {self._name} properties read error: {err}")
+        with self._lock:
+            if interface == UNIT_INTERFACE:
+                self._unit.update(changed)
+            else:
+                self._service.update(changed)
+            self.timestamp = time.time()
+        return True
+
+    def as_protobuf(self, msg: ServiceStateMsg):
+        msg.unit = self._name
+        msg.load_state = self.load_state
+        msg.active_state = self.active_state
+        msg.sub_state = self.sub_state
+        msg.main_pid = self.main_pid
+        msg.memory = self.memory
+        msg.cpu_usage_ns = self.cpu_usage_ns
+        msg.restarts = self.restarts
+        msg.timestamp = self.timestamp
+
+
+class UnitChangeListener:
+    """
+    Receives the names of the units that changed, at most one pending notification per unit
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def notify(self, name: str):
+        with self._lock:
+            self._pending[name] = True
+            self._event.set()
+
+    def get_changes(self, timeout: float = None) -> list:
+        """
+        wait for changes and return the list of unit names, empty on timeout
+        """
+        if not self._event.wait(timeout):
+            return []
+        with self._lock:
+            names = list(self._pending.keys())
+            self._pending = {}
+            self._event.clear()
+        return names
+
+
+class SystemdManager:
+    """
+    Access to the systemd manager object, units are loaded on first access and then followed by signals
+    The jobs (start, stop, restart) are queued by systemd, wait_job() returns when JobRemoved is received
+    """
+
+    def __init__(self, connection: DBusConnection):
+        self._connection = connection
+        self._units = {}
+        self._units_by_path = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._job_done = threading.Condition()
+        # systemd only sends the unit signals to subscribed clients
+        self._call('Subscribe')
+        self._subscriptions = [
+            connection.subscribe_properties(SYSTEMD_SERVICE, self._properties_changed,
+                                            path_namespace=SYSTEMD_PATH + '/unit'),
+            connection.subscribe(SYSTEMD_SERVICE, MANAGER_INTERFACE, 'JobRemoved', self._job_removed,
+                                 path=SYSTEMD_PATH)]
+
+    @property
+    def connection(self) -> DBusConnection:
+        return self._connection
+
+    def _call(self, method: str, signature: str = '', body: tuple = ()) -> tuple:
+        return self._connection.call(SYSTEMD_SERVICE, SYSTEMD_PATH, MANAGER_INTERFACE, method, signature, body)
+
+    def unit(self, service: str) -> SystemdUnit:
+        """
+        return the unit for the service (.service is added if no unit type is given), raise DBusException
+        """
+        name = unit_name(service)
+        try:
+            return self._units[name]
+        except KeyError:
+            pass
+        # LoadUnit also returns an object for units that do not exist (LoadState not-found)
+        path = self._call('LoadUnit', 's', (name,))[0]
+        unit = SystemdUnit(self, name, path)
+        with self._lock:
+            self._units[name] = unit
+            self._units_by_path[path] = unit
+        unit.refresh()
+        _logger.debug(f"systemd unit {name} {unit.load_state} {unit.active_state}")
+        return unit
+
+    def units(self) -> list:
+        return list(self._units.values())
+
+    def start_unit(self, service: str, mode: str = 'replace') -> str:
+        return self._call('StartUnit', 'ss', (unit_name(service), mode))[0]
+
+    def stop_unit(self, service: str, mode: str = 'replace') -> str:
+        return self._call('StopUnit', 'ss', (unit_name(service), mode))[0]
+
+    def restart_unit(self, service: str, mode: str = 'replace') -> str:
+        return self._call('RestartUnit', 'ss', (unit_name(service), mode))[0]
+
+    def kill_unit(self, service: str, signal_number: int, who: str = 'main'):
+        self._call('KillUnit', 'ssi', (unit_name(service), who, int(signal_number)))
+
+    def wait_job(self, job: str, timeout: float):
+        """
+        wait for the end of the job (path returned by start_unit...), return the result ('done', 'failed',
+        'canceled', 'timeout', 'dependency', 'skipped') or None on timeout
+        """
+        with self._job_done:
+            if self._job_done.wait_for(lambda: job in self._jobs, timeout):
+                return self._jobs.pop(job)
+            return None
+
+    def _job_removed(self, path: str, interface: str, member: str, body: tuple):
+        job_id, job, unit, result = body
+        with self._job_done:
+            self._jobs[job] = result
+            if len(self._jobs) > MAX_JOB_RESULTS:
+                self._jobs.popitem(last=False)
+            self._job_done.notify_all()
+
+    def add_listener(self, listener: UnitChangeListener):
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: UnitChangeListener):
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l is not listener]
+
+    def _properties_changed(self, path: str, interface: str, changed: dict, invalidated: list):
+        unit = self._units_by_path.get(path)
+        if unit is None:
+            # unit not supervised
+            return
+        if unit.update(interface, changed, invalidated):
+            for listener in self._listeners:
+                listener.notify(unit.name)
+
+    def close(self):
+        for subscription in self._subscriptions:
+            self._connection.unsubscribe(subscription)
+        try:
+            self._call('Unsubscribe')
+        except DBusException as err:
+            _logger.debug(f"systemd unsubscribe error: {err}")
@@ -20,6 +20,7 @@ import logging
 from navigation_server.router_common import IncompleteMessage, NavThread, NavGenericMsg, TRANSPARENT_MSG
 from .coupler import Coupler, CouplerReadError, CouplerTimeOut
 from .nmea0183_msg import process_nmea0183_frame, NMEAInvalidFrame
+from .nmea0183_framing import NMEA0183Framer
 
 _logger = logging.getLogger("ShipDataServer"+"."+__name__)
 
@@ -88,6 +89,11 @@ class IP_transport:
 
     def close(self):
         if self._socket is not None:
+            try:
+                # wake up a reader blocked on the socket
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self._socket.close()
 
     def ref(self):
@@ -157,6 +163,9 @@ class TCP_reader(IP_transport):
         except socket.error as e:
             _logger.error("Error receiving from TCP socket %s: %s" % (self._ref, str(e)))
             raise CouplerReadError
+        if len(msg) == 0:
+            _logger.error("TCP connection %s closed by peer" % self._ref)
+            raise CouplerReadError
         return msg
 
     def send(self, msg):
@@ -179,9 +188,11 @@ class IPAsynchReader(NavThread):
     The syntax analysis is performed by the _msg_processing configurable method. A ValueError exception is raised when
     Additional low level messages are needed to complete the message to process NMEA2000 FastPacket for instance.
     Transport errors, except timeout, lead to the push of a specific <EOF> messages indicating the end of the flow
+    When a framer (NMEA0183Framer or another LineFramer) is given, the whole buffers are processed by the framer instead of the separator
+    search and the msg_processing
     '''
 
-    def __init__(self, coupler, out_queue, separator, msg_processing):
+    def __init__(self, coupler, out_queue, separator, msg_processing, framer=None):
         super().__init__(name=f"{coupler.name}-IPAsynchReader", daemon=True)
         if isinstance(coupler, IPCoupler):
             self._transport = coupler.transport()
@@ -198,6 +209,28 @@ class IPAsynchReader(NavThread):
         self._stop_flag = False
         self._buffer = bytearray(512)
         self._transparent = False
+        self._framer = framer
+
+    def _push(self, msg) -> bool:
+        try:
+            self._out_queue.put(msg, timeout=1.0)
+        except queue.Full:
+            _logger.error("Message overflow from %s lost 1 message" % self._transport.ref())
+            if self._coupler is not None:
+                self._coupler.increment_overruns()
+            time.sleep(0.3)
+            return False
+        return True
+
+    def _process_frames(self, buffer):
+        frames = self._framer.frames
+        messages = self._framer.messages(buffer)
+        if self._coupler is not None:
+            self._coupler.increment_msg_raw(self._framer.frames - frames)
+        for msg in messages:
+            if self._coupler is not None and msg.raw is not None:
+                self._coupler.trace_raw(Coupler.TRACE_IN, msg.raw, strip_suffix='\r\n')
+            self._push(msg)
 
     def nrun(self):
         part = False
@@ -214,6 +247,9 @@ class IPAsynchReader(NavThread):
                 msg = NavGenericMsg(TRANSPARENT_MSG, raw=buffer)
                 self._out_queue.put(msg)
                 continue
+            if self._framer is not None:
+                self._process_frames(buffer)
+                continue
             # _logger.debug("IPCoupler receive: %s" % buffer)
             # start buffer processing
             start_idx = 0
@@ -288,13 +324,19 @@ class IPAsynchReader(NavThread):
                     # self._stop_flag = True
                     # break
                     _logger.error("Message overflow from %s lost 1 message" % self._transport.ref())
+                    if self._coupler is not None:
+                        self._coupler.increment_overruns()
                     time.sleep(0.3)
                     continue
                 if self._stop_flag:
                     break
         _logger.info("Asynch reader %s stopped" % self._transport.ref())
         self._stop_flag = True
-        msg = self._msg_processing(bytes(b'\x04'))
+        if self._framer is not None:
+            self._framer.reset()
+            msg = self._framer.end_of_stream()
+        else:
+            msg = self._msg_processing(bytes(b'\x04'))
         self._out_queue.put(msg)
 
     def stop(self):
@@ -318,23 +360,53 @@ class BufferedIPCoupler(IPCoupler):
 
         self._in_queue = None
         self._asynch_io = None
+        self._asynch_separator = None
+        self._asynch_processing = None
+        self._asynch_framer = None
         self._transparent = False
         self._msg_queue_size = opts.get('msg_queue_size', int, 50)
 
-    def set_message_processing(self, separator=b'\r\n', msg_processing=None):
+    def set_message_processing(self, separator=b'\r\n', msg_processing=None, framer=None):
+        """
+        framer: LineFramer processing the whole buffers instead of the separator search and msg_processing
+        """
         if self._direction != self.WRITE_ONLY:
             self._in_queue = queue.Queue(self._msg_queue_size)
+            if framer is not None:
+                self._asynch_framer = framer
             if msg_processing is None:
                 msg_processing = self.default_msg_process
-            self._asynch_io = IPAsynchReader(self, self._in_queue, separator, msg_processing)
+                if separator == b'\r\n' and framer is None:
+                    # plain NMEA0183 stream, the buffers are framed in a single pass
+                    self._asynch_framer = NMEA0183Framer()
+            self._input_framer = self._asynch_framer
+            self._asynch_separator = separator
+            self._asynch_processing = msg_processing
+            self._asynch_io = IPAsynchReader(self, self._in_queue, separator, msg_processing, self._asynch_framer)
 
     def open(self) -> bool:
         if super().open():
             if self._state == self.CONNECTED and self._asynch_io is not None:
+                if self._asynch_io.ident is not None:
+                    # reconnection: the reader of the previous connection has stopped on the transport error
+                    self._asynch_io.join(self._timeout)
+                    self._drain_queue()
+                    self._asynch_io = IPAsynchReader(self, self._in_queue, self._asynch_separator,
+                                                     self._asynch_processing, self._asynch_framer)
+                    self._asynch_io.set_transparency(self._transparent)
                 self._asynch_io.start()
+            return True
         else:
             return False
 
+    def _drain_queue(self):
+        # remove the end of data message of the previous connection
+        while True:
+            try:
+                self._in_queue.get_nowait()
+            except queue.Empty:
+                return
+
     def _read(self) -> NavGenericMsg:
         return self._in_queue.get()
 
@@ -346,6 +418,7 @@ class BufferedIPCoupler(IPCoupler):
                 self._asynch_io.join()
 
     def set_transparency(self, flag: bool):
+        self._transparent = flag
         if self._asynch_io is not None:
             self._asynch_io.set_transparency(flag)
 
@@ -14,14 +14,22 @@ from .coupler import Coupler, CouplerReadError, CouplerTimeOut, CouplerWriteErro
 from .filters import NMEAFilter, FilterSet, TimeFilter
 from .IPCoupler import BufferedIPCoupler, TCPBufferedReader, IPAsynchReader
 from .message_server import NMEAServer, NMEASenderServer, NMEAUDPServer
-from .publisher import Publisher, PublisherOverflow, ExternalPublisher, Injector, PrintPublisher, PullPublisher
+from .publisher import (Publisher, PublisherOverflow, ExternalPublisher, Injector, PrintPublisher, PullPublisher,
+                        AsyncPullPublisher)
 from .nmea0183_msg import (NMEA0183Msg, NMEAInvalidFrame, NMEA0183Sentences, nmea0183msg_from_protobuf, XDR, ZDA,
-                           NMEA0183SentenceMsg)
+                           NMEA0183SentenceMsg, NMEA0183Index, NMEA0183Address, nmea0183_checksum)
+from .nmea0183_framing import NMEA0183Framer, LineFramer
 from .nmea2000_msg import (NMEA2000Msg, NMEA2000Writer, N2KRawDecodeError, N2KEncodeError,
                            fromProprietaryNmea)
+from .n2k_latest_values import N2KLatestValueCache
+from .source_arbitration import (SourceArbitration, ArbitrationGroup, ArbitrationPoint, DuplicateFilter,
+                                 ArbitrationConfigurationError)
 from .console import Console
+from .metrics_server import MetricsHTTPServer
 from .tcp_server import NavTCPServer, ConnectionRecord
 from .grpc_nmea_server import GrpcNMEAServerService
+from .n2k_shared_ring import (N2KSharedRingWriter, N2KSharedRingReader, SharedRingStreamReader, SharedRingError,
+                              SharedRingFull, SharedRingClosed, shared_ring_available)
 from .can_grpc_stream_reader import CANGrpcStreamReader
 
 
@@ -13,10 +13,14 @@ import logging
 import time
 
 
-from navigation_server.router_common import GrpcClient, ServiceClient, GrpcAccessException, GrpcStreamTimeout
-from navigation_server.router_core import NMEA2000Msg
+import queue
 
-from navigation_server.generated.n2k_can_service_pb2 import CANReadRequest
+from navigation_server.router_common import (GrpcClient, ServiceClient, GrpcAccessException, GrpcStreamTimeout,
+                                             is_local_address)
+from .nmea2000_msg import NMEA2000Msg
+from .n2k_shared_ring import N2KSharedRingReader, SharedRingStreamReader, SharedRingError, shared_ring_available
+
+from navigation_server.generated.n2k_can_service_pb2 import CANReadRequest, CANLocalStreamMsg, StreamOverflowPolicy
 from navigation_server.generated.n2k_can_service_pb2_grpc import CAN_ControllerServiceStub
 from navigation_server.generated.nmea2000_pb2 import nmea2000pb
 
@@ -31,6 +35,9 @@ class CANGrpcStreamReader(ServiceClient):
     specified filtering criteria. It initializes a connection, manages streaming operations,
     and provides methods to read and close the stream. The configuration setup includes
     filters for sources and PGNs using inclusion and exclusion rules.
+    When the server runs on the same host, the messages are transferred via a shared memory ring
+    (see n2k_shared_ring) instead of the gRPC stream. In that case NMEA2000Msg are delivered instead of nmea2000pb,
+    use the n2k_message method to get a NMEA2000Msg in all cases.
 
     Attributes:
         _server (str): The hostname or IP address of the gRPC server.
@@ -51,6 +58,12 @@ class CANGrpcStreamReader(ServiceClient):
         read: Reads a single message from the stream while applying filters.
         close: Closes the gRPC stream.
     """
+    overflow_policies = {
+        'disconnect': StreamOverflowPolicy.OVERFLOW_DISCONNECT,
+        'drop_oldest': StreamOverflowPolicy.OVERFLOW_DROP_OLDEST,
+        'coalesce': StreamOverflowPolicy.OVERFLOW_COALESCE
+    }
+
     def __init__(self, reference, opts):
         """
         Manages the interaction with the gRPC CAN Controller service by establishing a connection and
@@ -68,13 +81,17 @@ class CANGrpcStreamReader(ServiceClient):
             _reject_sources: A list of specific source IDs to exclude from the CAN requests.
             _select_pgn: A list of specific Parameter Group Numbers (PGN) to include.
             _reject_pgn: A list of specific Parameter Group Numbers (PGN) to exclude.
+            _local_transport: Use the shared memory transport when the server is on the same host.
+            _batch_size: When not 0, the messages are received in batches (ReadNmea2000MsgBatch).
+            _batch_max_latency: Maximum time the server holds a message to fill a batch.
             _client: The gRPC client used to interact with the CAN Controller service.
             _can_request: The CAN read request object configured for the client.
 
         Args:
             reference (str): A unique identifier for the client or reference.
             opts: A collection of configuration options including 'source_server', 'source_port',
-                'select_sources', 'reject_sources', 'select_pgn', and 'reject_pgn'.
+                'select_sources', 'reject_sources', 'select_pgn', 'reject_pgn', 'local_transport',
+                'batch_size', 'batch_max_latency' and 'overflow_policy'.
 
         Raises:
             ValueError: Raised if the 'server' or 'port' parameter is not provided in the options.
@@ -93,6 +110,12 @@ class CANGrpcStreamReader(ServiceClient):
         self._reject_sources = opts.getlist('reject_sources', int, None)
         self._select_pgn = opts.getlist('select_pgn', int, None)
         self._reject_pgn = opts.getlist('reject_pgn', int, None)
+        self._local_transport = opts.get('local_transport', bool, True)
+        self._batch_size = opts.get('batch_size', int, 0)
+        self._batch_max_latency = opts.get('batch_max_latency', float, 0.0)
+        overflow_policy = opts.get_choice('overflow_policy', self.overflow_policies.keys(), None)
+        if self._local_transport:
+            self._local_transport = shared_ring_available() and is_local_address(self._server)
         self._client:GrpcClient = GrpcClient.get_client(f"{self._server}:{self._port}")
         self._client.add_service(self)
         self._can_request = CANReadRequest()
@@ -105,6 +128,11 @@ class CANGrpcStreamReader(ServiceClient):
             self._can_request.select_pgn.extend(self._select_pgn)
         elif self._reject_pgn is not None:
             self._can_request.reject_pgn.extend(self._reject_pgn)
+        if overflow_policy is not None:
+            self._can_request.overflow_policy = self.overflow_policies[overflow_policy]
+        if self._batch_size > 0:
+            self._can_request.batch_size = self._batch_size
+            self._can_request.max_latency = self._batch_max_latency
 
     def start_stream_to_queue(self):
         _logger.debug("CANGrpcStreamReader start stream to queue")
@@ -117,7 +145,13 @@ class CANGrpcStreamReader(ServiceClient):
         if success:
             _logger.debug("CANGrpcStreamReader start => connected")
             if not self.stream_is_alive():
-                self._start_read_stream_to_queue(self._stub.ReadNmea2000Msg, self._can_request)
+                if not self._start_local_stream(queue.Queue(20), None):
+                    if self._batch_size > 0:
+                        self._read_queue = queue.Queue(max(20, self._batch_size))
+                        self._start_read_stream_to_callback(self._stub.ReadNmea2000MsgBatch, self._can_request,
+                                                            self._batch_to_queue)
+                    else:
+                        self._start_read_stream_to_queue(self._stub.ReadNmea2000Msg, self._can_request)
             return True
         else:
             _logger.debug("CANGrpcStreamReader start => failed")
@@ -133,12 +167,79 @@ class CANGrpcStreamReader(ServiceClient):
         if success:
             _logger.debug("CANGrpcStreamReader start => connected")
             if not self.stream_is_alive():
-                self._start_read_stream_to_callback(self._stub.ReadNmea2000Msg, self._can_request, process_msg_callback)
+                if not self._start_local_stream(None, process_msg_callback):
+                    if self._batch_size > 0:
+                        self._start_read_stream_to_callback(self._stub.ReadNmea2000MsgBatch, self._can_request,
+                                                            lambda batch: self._batch_to_callback(batch,
+                                                                                                  process_msg_callback))
+                    else:
+                        self._start_read_stream_to_callback(self._stub.ReadNmea2000Msg, self._can_request,
+                                                            process_msg_callback)
             return True
         else:
             _logger.debug("CANGrpcStreamReader start => failed")
             return False
 
+    def _start_local_stream(self, out_queue, process_msg_callback) -> bool:
+        """
+        Attempt to open the stream over the shared memory ring
+        Returns False if the local transport is not possible, the gRPC stream shall be used instead
+        """
+        if not self._local_transport:
+            return False
+        try:
+            resp = self._server_call(self._stub.OpenLocalStream, self._can_request, None)
+        except GrpcAccessException:
+            # most likely a server not supporting the local transport
+            _logger.info("CANGrpcStreamReader => local transport not available on server")
+            self._local_transport = False
+            return False
+        if not resp.accepted:
+            _logger.info(f"CANGrpcStreamReader => local transport refused: {resp.status}")
+            self._local_transport = False
+            return False
+        try:
+            ring = N2KSharedRingReader(resp.ring_name, resp.token)
+        except SharedRingError as err:
+            # the server is not on the same host after all, the ring is released on the server before falling back
+            _logger.info(f"CANGrpcStreamReader => local transport failed: {err}")
+            self._local_transport = False
+            self._close_local_stream(resp)
+            return False
+        _logger.info(f"CANGrpcStreamReader {self._can_request.client} using shared ring {resp.ring_name}")
+        self._read_queue = out_queue
+        self._stream_reader = SharedRingStreamReader(self._can_request.client, ring, out_queue,
+                                                     process_msg_callback, self._stream_error)
+        self._stream_reader.start()
+        return True
+
+    def _close_local_stream(self, resp: CANLocalStreamMsg):
+        try:
+            ack = self._server_call(self._stub.CloseLocalStream, resp, None)
+        except GrpcAccessException:
+            _logger.error(f"CANGrpcStreamReader => cannot release shared ring {resp.ring_name} on server")
+            return
+        if ack.error != 0:
+            _logger.error(f"CANGrpcStreamReader => shared ring {resp.ring_name} not found on server")
+
+    def _batch_to_queue(self, batch):
+        for msg_pb in batch.messages:
+            self._read_queue.put(msg_pb, block=True)
+
+    @staticmethod
+    def _batch_to_callback(batch, process_msg_callback):
+        for msg_pb in batch.messages:
+            process_msg_callback(msg_pb)
+
+    @staticmethod
+    def n2k_message(msg) -> NMEA2000Msg:
+        """
+        Return a NMEA2000Msg from a message coming from the stream (nmea2000pb or NMEA2000Msg for local transport)
+        """
+        if type(msg) is NMEA2000Msg:
+            return msg
+        return NMEA2000Msg(pgn=msg.pgn, protobuf=msg)
+
     def wait_for_stream(self):
         self._wait_for_stream_end()
 
@@ -158,8 +259,8 @@ class CANGrpcStreamReader(ServiceClient):
         """
         if self.server_connected:
             try:
-                pb_msg = self._read_stream()
-                _logger.debug("N2KGrpcCoupler message received with PGN %d" % pb_msg.pgn)
+                msg = self._read_stream()
+                _logger.debug("N2KGrpcCoupler message received with PGN %d" % msg.pgn)
             except GrpcAccessException:
                 # ok, we have a problem, let's wait and restart later
                 _logger.debug("N2KGrpcCoupler => GrpcAccessException")
@@ -168,7 +269,7 @@ class CANGrpcStreamReader(ServiceClient):
             except GrpcStreamTimeout:
                 _logger.debug("N2KGrpcCoupler => GrpcStreamTimeout")
                 raise
-            return NMEA2000Msg(pgn=pb_msg.pgn, protobuf=pb_msg)
+            return self.n2k_message(msg)
 
         else:
             # let's wait
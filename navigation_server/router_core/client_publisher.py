@@ -12,7 +12,7 @@ import socket
 import logging
 
 from .publisher import Publisher
-from navigation_server.router_common import NavGenericMsg, N2K_MSG, NULL_MSG, NavThread
+from navigation_server.router_common import NavGenericMsg, N2K_MSG, NULL_MSG, NavThread, LatencyTracker
 from .IPCoupler import TCPBufferedReader
 from .coupler import Coupler, CouplerWriteError
 from .nmea0183_msg import process_nmea0183_frame
@@ -53,6 +53,7 @@ class NMEAPublisher(Publisher):
 
         super().__init__(None, internal=True, couplers=couplers, name=client.descr(), filters=filters)
         self._client = client
+        self._send_latency = LatencyTracker.histogram('client_send', self.object_name())
         client.set_publisher(self)
         _logger.info("NMEA Publisher %s created" % self.object_name())
 
@@ -60,7 +61,9 @@ class NMEAPublisher(Publisher):
         if msg.raw is None:
             _logger.error("No transparent payload available for %s => wrong nmea2000 mode on input ?" % msg.dump())
             return True
-        return not self._client.send(msg.raw)
+        result = self._client.send(msg.raw)
+        self._send_latency.record_since(msg.stamp)
+        return not result
 
     def last_action(self):
         if not self._stopflag:
@@ -0,0 +1,279 @@
+#-------------------------------------------------------------------------------
+# Name:        configuration_reload
+# Purpose:     Apply a modified settings file on the running router without restart
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   The new settings are compared with the object descriptions in use, only the objects that are added, removed
+#   or whose parameters have changed are touched:
+#       filters: rebuilt, then swapped on the running publishers that reference them
+#       couplers: stopped and rebuilt, the servers and publishers are linked to the new instance
+#           an added coupler is linked to the servers and to the publishers that list it in their couplers
+#       publishers: filters swapped when only the filters have changed, otherwise stopped and rebuilt
+#   Servers, services, applications, processes and global parameters cannot be changed on a running
+#   gRPC server, they are reported as requiring a restart
+#   A reload where a publisher refers to a filter that does not exist anymore is rejected before any change
+#   The description of an object is replaced only when the change has been applied, so a failed change
+#   is still seen as a change on the next reload
+
+import logging
+import yaml
+
+from navigation_server.router_common import (ConfigurationException, ObjectCreationError, ObjectFatalError,
+                                             test_exec_hook)
+from .publisher import ExternalPublisher
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class ReloadResult:
+    """
+    Result of the reload for one object
+    """
+
+    __slots__ = ('name', 'category', 'action', 'success', 'status')
+
+    def __init__(self, name: str, category: str, action: str, success: bool = True, status: str = "OK"):
+        self.name = name
+        self.category = category
+        self.action = action
+        self.success = success
+        self.status = status
+
+    def set_protobuf(self, msg):
+        msg.name = self.name
+        msg.category = self.category
+        msg.action = self.action
+        msg.success = self.success
+        msg.status = self.status
+
+    def __str__(self):
+        return f"{self.category} {self.name} {self.action}: {self.status}"
+
+
+class ConfigurationReloader:
+    """
+    Compute the difference between the settings file and the running objects and apply it
+    """
+
+    restart_categories = ('servers', 'services', 'applications', 'processes')
+    filter_parameters = {'filters', 'filter_select'}
+    join_timeout = 5.0
+
+    def __init__(self, main_server, configuration):
+        self._main_server = main_server
+        self._configuration = configuration
+        self._results = []
+
+    def reload(self, settings_file: str = None) -> list:
+        """
+        Read the settings file (the current one if None) and apply the differences
+        return the list of ReloadResult
+        raise ConfigurationException if the file cannot be read or decoded
+        """
+        if settings_file is None or len(settings_file) == 0:
+            settings_file = self._configuration.settings_file
+        try:
+            settings_file, settings = self._configuration.read_settings(settings_file)
+        except (IOError, yaml.YAMLError) as err:
+            raise ConfigurationException(f"Cannot read settings file {settings_file}: {err}")
+        if not isinstance(settings, dict):
+            raise ConfigurationException(f"Invalid settings file {settings_file}")
+        _logger.info(f"Reloading configuration from {settings_file}")
+        self._results = []
+        diff = self._configuration.diff_settings(settings)
+        self._check_filter_references(diff['filters'], diff['publishers'])
+        for key in diff['globals']:
+            self._report(key, 'globals', 'changed', False, "restart required")
+        for category in self.restart_categories:
+            for action, descriptions in zip(('added', 'removed', 'changed'), diff[category]):
+                for descr in descriptions:
+                    self._report(descr.name, category, action, False, "restart required")
+        modified_filters = self._apply_filters(*diff['filters'])
+        self._apply_couplers(*diff['couplers'])
+        rebuilt = self._apply_publishers(*diff['publishers'])
+        self._swap_filters(modified_filters, rebuilt)
+        if len(self._results) == 0:
+            _logger.info("Configuration reload: no change")
+        return self._results
+
+    def _report(self, name: str, category: str, action: str, success: bool = True, status: str = "OK"):
+        result = ReloadResult(name, category, action, success, status)
+        if success:
+            _logger.info(f"Configuration reload {result}")
+        else:
+            _logger.error(f"Configuration reload {result}")
+        self._results.append(result)
+
+    @staticmethod
+    def _build(descr):
+        try:
+            return descr.build_object(), "OK"
+        except (ConfigurationException, ObjectCreationError, ObjectFatalError) as err:
+            return None, str(err)
+
+    def _stop_thread(self, thread) -> bool:
+        # the stop has been requested by the main server when removing the object
+        if thread.is_alive():
+            thread.join(self.join_timeout)
+        return not thread.is_alive()
+
+    #
+    #   Filters
+    #
+    def _check_filter_references(self, filters_diff, publishers_diff):
+        """
+        Verify that all filters referenced by the publishers exist once the settings are applied, otherwise a
+        running publisher would lose its filters
+        raise ConfigurationException, then nothing is applied
+        """
+        f_added, f_removed, f_changed = filters_diff
+        filter_names = {descr.name for descr in self._configuration.filters()} - {descr.name for descr in f_removed}
+        filter_names |= {descr.name for descr in f_added}
+        p_added, p_removed, p_changed = publishers_diff
+        replaced = {descr.name for descr in p_removed} | {descr.name for descr in p_changed}
+        publishers = [descr for descr in self._configuration.publishers() if descr.name not in replaced]
+        for descr in publishers + p_added + p_changed:
+            missing = set(descr.options.getlist('filters', str, [])) - filter_names
+            if len(missing) > 0:
+                raise ConfigurationException(f"Publisher {descr.name} refers to undefined filters "
+                                             f"{', '.join(sorted(missing))} => reload rejected")
+
+    def _apply_filters(self, added, removed, changed) -> set:
+        """
+        return the names of the filters that have been modified
+        """
+        modified = set()
+        for descr in removed:
+            self._configuration.remove_description('filters', descr.name)
+            modified.add(descr.name)
+            self._report(descr.name, 'filters', 'removed')
+        for action, descriptions in (('added', added), ('changed', changed)):
+            for descr in descriptions:
+                obj, status = self._build(descr)
+                if obj is None:
+                    self._report(descr.name, 'filters', action, False, status)
+                    continue
+                self._configuration.replace_description('filters', descr)
+                modified.add(descr.name)
+                self._report(descr.name, 'filters', action)
+        return modified
+
+    def _swap_filters(self, modified_filters: set, rebuilt: set):
+        if len(modified_filters) == 0:
+            return
+        for publisher in list(self._main_server.publishers()):
+            if publisher.object_name() in rebuilt or not isinstance(publisher, ExternalPublisher):
+                continue
+            try:
+                descr = self._configuration.description('publishers', publisher.object_name())
+            except KeyError:
+                continue
+            if modified_filters.isdisjoint(descr.options.getlist('filters', str, [])):
+                continue
+            try:
+                publisher.update_filters(descr.options)
+            except ValueError as err:
+                self._report(publisher.object_name(), 'publishers', 'filters_swapped', False,
+                             f"{err} => previous filters kept")
+                continue
+            self._report(publisher.object_name(), 'publishers', 'filters_swapped')
+
+    #
+    #   Couplers
+    #
+    def _apply_couplers(self, added, removed, changed):
+        for descr in removed:
+            coupler = self._main_server.remove_coupler(descr.name)
+            if coupler is not None and not self._stop_thread(coupler):
+                self._report(descr.name, 'couplers', 'removed', False, "coupler thread not stopped")
+            else:
+                self._report(descr.name, 'couplers', 'removed')
+            self._configuration.remove_description('couplers', descr.name)
+        for descr in changed:
+            coupler = self._main_server.remove_coupler(descr.name)
+            if coupler is not None and not self._stop_thread(coupler):
+                # the coupler is no longer used, but the new instance cannot reuse the device
+                self._report(descr.name, 'couplers', 'changed', False, "coupler thread not stopped")
+                continue
+            self._add_coupler(descr, 'changed')
+        for descr in added:
+            self._add_coupler(descr, 'added')
+
+    def _add_coupler(self, descr, action):
+        # the description is installed first to allow the coupler to resolve its own references
+        self._configuration.replace_description('couplers', descr)
+        coupler, status = self._build(descr)
+        if coupler is None:
+            self._report(descr.name, 'couplers', action, False, status)
+            return
+        # the publishers are linked before the coupler is started by the main server
+        if action == 'changed':
+            test_exec_hook(descr.name, coupler)
+            for publisher in self._main_server.publishers():
+                publisher.coupler_replaced(coupler)
+        else:
+            for publisher in self._main_server.publishers():
+                publisher.coupler_added(coupler)
+        self._main_server.add_coupler(coupler)
+        if self._main_server.console_present:
+            self._main_server.console.add_coupler(coupler)
+        self._report(descr.name, 'couplers', action)
+
+    #
+    #   Publishers
+    #
+    def _apply_publishers(self, added, removed, changed) -> set:
+        """
+        return the names of the publishers that have been rebuilt or have got new filters
+        """
+        rebuilt = set()
+        for descr in removed:
+            publisher = self._main_server.remove_publisher(descr.name)
+            if publisher is not None and not self._stop_thread(publisher):
+                self._report(descr.name, 'publishers', 'removed', False, "publisher thread not stopped")
+            else:
+                self._report(descr.name, 'publishers', 'removed')
+            self._configuration.remove_description('publishers', descr.name)
+        for descr in changed:
+            current = self._configuration.description('publishers', descr.name)
+            publisher = current.object
+            if (isinstance(publisher, ExternalPublisher) and
+                    current.changed_parameters(descr) <= self.filter_parameters):
+                try:
+                    publisher.update_filters(descr.options)
+                except ValueError as err:
+                    self._report(descr.name, 'publishers', 'filters_swapped', False, f"{err} => previous filters kept")
+                    continue
+                descr.set_object(publisher)
+                self._configuration.replace_description('publishers', descr)
+                self._report(descr.name, 'publishers', 'filters_swapped')
+                rebuilt.add(descr.name)
+                continue
+            self._main_server.remove_publisher(descr.name)
+            if publisher is not None and not self._stop_thread(publisher):
+                self._report(descr.name, 'publishers', 'changed', False, "publisher thread not stopped")
+                continue
+            if self._add_publisher(descr, 'changed'):
+                rebuilt.add(descr.name)
+        for descr in added:
+            if self._add_publisher(descr, 'added'):
+                rebuilt.add(descr.name)
+        return rebuilt
+
+    def _add_publisher(self, descr, action) -> bool:
+        self._configuration.replace_description('publishers', descr)
+        publisher, status = self._build(descr)
+        if publisher is None:
+            self._report(descr.name, 'publishers', action, False, status)
+            return False
+        self._main_server.add_publisher(publisher)
+        publisher.start()
+        self._report(descr.name, 'publishers', action)
+        return True
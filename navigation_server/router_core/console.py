@@ -13,10 +13,15 @@ from collections import namedtuple
 from socket import gethostname
 import logging
 
-from navigation_server.router_common import MessageServerGlobals, GrpcService, protob_to_dict, dict_to_protob, get_global_var
-from navigation_server.generated.console_pb2 import CouplerMsg, ServiceMsg, PublisherMsg, Response
+from navigation_server.router_common import (MessageServerGlobals, GrpcService, protob_to_dict, dict_to_protob,
+                                             get_global_var, ConfigurationException, LatencyTracker, LatencyHistogram,
+                                             latency_bucket_low, resolve_ref)
+from navigation_server.generated.console_pb2 import (CouplerMsg, ServiceMsg, PublisherMsg, Response, ReloadResponse,
+                                                     LatencyReport, ProfilerReport, ArbitrationReport,
+                                                     TrafficAnalysisReport)
 from navigation_server.generated.services_server_pb2 import ProcessState, Connection, Server, SystemProcessMsg
 from navigation_server.generated.console_pb2_grpc import *
+from .source_arbitration import SourceArbitration
 
 _logger = logging.getLogger("ShipDataServer."+__name__)
 
@@ -160,6 +165,208 @@ class ConsoleServicer(NavigationConsoleServicer):
         _logger.debug("ServerCmd response %s" % resp.status)
         return resp
 
+    def ReloadConfiguration(self, request, context):
+        '''
+        Apply the settings file (request.target, the current file if empty) on the running server
+        '''
+        _logger.debug("Console reload configuration %s" % request.target)
+        resp = ReloadResponse(id=request.id)
+        try:
+            results = self._console.main_server().reload_configuration(request.target)
+        except ConfigurationException as err:
+            resp.status = str(err)
+            return resp
+        for result in results:
+            result.set_protobuf(resp.results.add())
+        nb_errors = sum(1 for result in results if not result.success)
+        if nb_errors == 0:
+            resp.status = "OK"
+        else:
+            resp.status = f"{nb_errors} changes not applied"
+        return resp
+
+    def GetLatency(self, request, context):
+        '''
+        request.cmd: empty to read the histograms, 'enable', 'disable' or 'reset'
+        request.target: stage selection, all stages if empty
+        '''
+        _logger.debug("Console latency cmd %s stage %s" % (request.cmd, request.target))
+        resp = LatencyReport(id=request.id)
+        if request.cmd == 'enable':
+            LatencyTracker.enable(True)
+        elif request.cmd == 'disable':
+            LatencyTracker.enable(False)
+        elif request.cmd == 'reset':
+            LatencyTracker.reset()
+        elif len(request.cmd) > 0:
+            resp.status = f'unknown command {request.cmd}'
+            return resp
+        resp.enabled = LatencyTracker.enabled
+        stage = request.target if len(request.target) > 0 else None
+        for histogram in LatencyTracker.histograms(stage):
+            counts, total, max_value = histogram.snapshot()
+            nb = sum(counts)
+            if nb == 0:
+                continue
+            h_msg = resp.histograms.add()
+            h_msg.stage = histogram.stage
+            h_msg.owner = histogram.owner
+            h_msg.count = nb
+            h_msg.mean = total / nb
+            h_msg.max = max_value
+            h_msg.p50 = LatencyHistogram.percentile(counts, 0.5)
+            h_msg.p90 = LatencyHistogram.percentile(counts, 0.9)
+            h_msg.p99 = LatencyHistogram.percentile(counts, 0.99)
+            for index, count in enumerate(counts):
+                if count > 0:
+                    h_msg.bucket_low.append(latency_bucket_low(index))
+                    h_msg.bucket_count.append(count)
+        resp.status = "OK"
+        return resp
+
+    def SamplingProfiler(self, request, context):
+        '''
+        request.cmd: 'start' (kwargs rate optional), 'stop', 'reset' or 'dump' (default)
+        request.target: thread selection for the dump, all NavThreads if empty
+        '''
+        _logger.debug("Console sampling profiler cmd %s thread %s" % (request.cmd, request.target))
+        resp = ProfilerReport(id=request.id)
+        controller = MessageServerGlobals.thread_controller
+        if request.cmd == 'start':
+            rate = None
+            if request.HasField('kwargs'):
+                rate = protob_to_dict(request.kwargs.arguments).get('rate', None)
+            controller.start_sampling(rate)
+        elif request.cmd == 'stop':
+            controller.stop_sampling()
+        elif request.cmd == 'reset':
+            controller.sampling_profiler.reset()
+        elif request.cmd not in ('', 'dump'):
+            resp.status = f'unknown command {request.cmd}'
+            return resp
+        profiler = controller.sampling_profiler
+        resp.running = profiler.running
+        resp.rate = profiler.rate
+        resp.nb_samples = profiler.nb_samples
+        resp.cpu_load = profiler.cpu_load()
+        if request.cmd in ('', 'dump'):
+            thread_name = request.target if len(request.target) > 0 else None
+            for name, folded in profiler.folded_stacks(thread_name).items():
+                for stack, count in folded.items():
+                    s_msg = resp.stacks.add()
+                    s_msg.thread = name
+                    s_msg.stack = stack
+                    s_msg.count = count
+        resp.status = "OK"
+        return resp
+
+    def GetArbitration(self, request, context):
+        '''
+        request.cmd: empty to read the arbitration state, 'clear_events' to clear the failover events
+        request.target: group selection, all groups if empty
+        '''
+        _logger.debug("Console arbitration cmd %s group %s" % (request.cmd, request.target))
+        resp = ArbitrationReport(id=request.id)
+        if request.cmd == 'clear_events':
+            SourceArbitration.clear_events()
+        elif len(request.cmd) > 0:
+            resp.status = f'unknown command {request.cmd}'
+            return resp
+        duplicates = SourceArbitration.duplicates()
+        if duplicates is not None:
+            resp.duplicate_window = duplicates.window
+            resp.nb_duplicates = duplicates.nb_duplicates
+        now = time.monotonic()
+        for group in SourceArbitration.groups():
+            if len(request.target) > 0 and group.name != request.target:
+                continue
+            g_msg = resp.groups.add()
+            g_msg.name = group.name
+            primary = group.primary
+            if primary is not None:
+                g_msg.primary = primary.name
+            g_msg.nb_failovers = group.nb_failovers
+            g_msg.nb_dropped = group.nb_dropped
+            for source, healthy in group.status(now):
+                s_msg = g_msg.sources.add()
+                s_msg.name = source.name
+                s_msg.priority = source.priority
+                s_msg.primary = source is primary
+                s_msg.healthy = healthy
+                s_msg.age = now - source.last_seen
+                s_msg.rate = source.rate()
+                s_msg.nb_msg = source.nb_msg
+                s_msg.quality_ok = source.quality_ok
+        for event in SourceArbitration.events():
+            if len(request.target) > 0 and event.group != request.target:
+                continue
+            e_msg = resp.events.add()
+            e_msg.timestamp = event.timestamp
+            e_msg.group = event.group
+            if event.previous is not None:
+                e_msg.previous = event.previous
+            if event.primary is not None:
+                e_msg.primary = event.primary
+            e_msg.reason = event.reason
+        resp.status = "OK"
+        return resp
+
+    def GetTrafficAnalysis(self, request, context):
+        '''
+        request.target: name of the publisher running the analysis (N2KStatisticPublisher)
+        request.cmd: empty to read the analysis, 'reset' to restart it, 'write_csv' to write it in the csv_file
+        '''
+        _logger.debug("Console traffic analysis cmd %s publisher %s" % (request.cmd, request.target))
+        resp = TrafficAnalysisReport(id=request.id)
+        try:
+            publisher = resolve_ref(request.target)
+        except (KeyError, ValueError):
+            resp.status = f"publisher {request.target} not found"
+            return resp
+        analyzer = getattr(publisher, 'traffic_analyzer', None)
+        if analyzer is None:
+            resp.status = f"no traffic analysis on {request.target}"
+            return resp
+        if request.cmd == 'reset':
+            analyzer.reset()
+        elif request.cmd == 'write_csv':
+            try:
+                resp.status = "OK %s" % publisher.write_csv()
+            except (ValueError, IOError) as e:
+                resp.status = str(e)
+            return resp
+        elif len(request.cmd) > 0:
+            resp.status = f'unknown command {request.cmd}'
+            return resp
+        entries = analyzer.snapshot()
+        resp.start_time = analyzer.start_time
+        resp.end_time = analyzer.end_time
+        resp.total_msg = analyzer.total_msg
+        resp.total_frames = analyzer.total_frames
+        resp.bus_load = analyzer.bus_load()
+        resp.nb_overflow = analyzer.nb_overflow
+        resp.interval_bounds.extend(analyzer.interval_bounds)
+        for entry in entries:
+            e_msg = resp.entries.add()
+            e_msg.pgn = entry.pgn
+            e_msg.sa = entry.sa
+            e_msg.manufacturer = entry.manufacturer
+            e_msg.count = entry.count
+            e_msg.first_seen = entry.first_seen
+            e_msg.last_seen = entry.last_seen
+            e_msg.rate = entry.rate
+            e_msg.average_rate = entry.average_rate
+            e_msg.mean_interval = entry.mean_interval
+            e_msg.jitter = entry.jitter
+            e_msg.interval_histogram.extend(entry.histogram)
+            e_msg.frames = entry.frames
+            e_msg.bytes = entry.bytes
+            e_msg.bus_load = analyzer.bus_load(entry.bits)
+            e_msg.fp_errors = entry.fp_errors
+            e_msg.fp_timeouts = entry.fp_timeouts
+        resp.status = "OK"
+        return resp
+
     def GetServerDetails(self, request, context):
         '''
         Warning not yet implemented
@@ -179,6 +386,8 @@ ServerRecord = namedtuple('ServerRecord', ['server', 'name', 'class_name'])
 
 class Console(GrpcService):
 
+    control_service = True
+
     def __init__(self, options):
         super().__init__(options)
         self._servers = {}
@@ -215,6 +424,9 @@ class Console(GrpcService):
         # print("Console add coupler:", coupler.object_name())
         self._couplers[coupler.object_name()] = coupler
 
+    def remove_coupler(self, name):
+        self._couplers.pop(name, None)
+
     def couplers(self):
         return self._couplers.values()
 
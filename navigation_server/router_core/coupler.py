@@ -19,9 +19,12 @@ import time
 from .publisher import PublisherOverflow
 from navigation_server.router_common import (NavGenericMsg, NULL_MSG, N2K_MSG, NavThread, MessageServerGlobals,
                                              N0183_MSG, NMEAMsgTrace, MessageTraceError, IncompleteMessage,
-                                             resolve_ref, resolve_class)
+                                             resolve_ref, resolve_class, LatencyTracker, MetricsRegistry,
+                                             FaultInjector)
 from .nmea2000_msg import NMEA2000Msg, NMEA2000Writer
-from .nmea0183_msg import NMEAInvalidFrame
+from .n2k_latest_values import N2KLatestValueCache
+from .source_arbitration import SourceArbitration
+from .nmea0183_msg import NMEAInvalidFrame, NMEA0183Msg
 
 
 _logger = logging.getLogger("ShipDataServer"+"."+__name__)
@@ -47,6 +50,21 @@ class CouplerOpenRefused(Exception):
     pass
 
 
+_coupler_msg_in = MetricsRegistry.counter('navigation_coupler_messages_in', 'Messages received by the coupler',
+                                          ('coupler',))
+_coupler_msg_raw = MetricsRegistry.counter('navigation_coupler_messages_raw', 'Raw frames received by the coupler',
+                                           ('coupler',))
+_coupler_msg_out = MetricsRegistry.counter('navigation_coupler_messages_out', 'Messages sent by the coupler',
+                                           ('coupler',))
+_coupler_rate = MetricsRegistry.gauge('navigation_coupler_input_rate', 'Input messages per second', ('coupler',))
+_coupler_state = MetricsRegistry.gauge('navigation_coupler_state',
+                                       'Device state 0:not ready 1:open 2:connected 3:active', ('coupler',))
+_coupler_framing_errors = MetricsRegistry.counter('navigation_coupler_framing_errors',
+                                                  'Input lines rejected by the coupler framing', ('coupler',))
+_coupler_overruns = MetricsRegistry.counter('navigation_coupler_overruns',
+                                            'Input data lost (overlong lines, input queue overflow)', ('coupler',))
+
+
 class Coupler(NavThread):
     """
     Base abstract class for all couplers
@@ -72,6 +90,16 @@ class Coupler(NavThread):
         self._name = object_name
         self._opts = opts
         self._publishers = []
+        self._publish_latency = LatencyTracker.histogram('coupler_publish', object_name)
+        # chaos mode, None unless faults are configured for the coupler
+        self._faults = FaultInjector.point(f"coupler:{object_name}")
+        self._fault_pending = []
+        # redundant sources arbitration, None unless the coupler is part of it
+        self._arbitration = SourceArbitration.point(object_name)
+        # framer of the input stream (LineFramer) for the couplers reading buffers, and the messages lost on input
+        self._input_framer = None
+        self._overruns = 0
+        self.register_metrics()
         self._configmode = False
         self._configpub = None
         self._startTS = 0
@@ -146,6 +174,11 @@ class Coupler(NavThread):
         #
         self._n2k_controller = None
         self._n2k_ctlr_name = opts.get('nmea2000_controller', str, None)
+        # latest value per (PGN, source) for the snapshot queries
+        if opts.get('latest_value_cache', bool, False):
+            self._latest_values = N2KLatestValueCache(opts.get('latest_value_max_entries', int, 2048))
+        else:
+            self._latest_values = None
         # self._data_sink = None
         # self._data_sink_name = opts.get('data_sink', str, None)
 
@@ -161,6 +194,10 @@ class Coupler(NavThread):
     def n2k_controller(self):
         return self._n2k_controller
 
+    @property
+    def latest_values(self) -> N2KLatestValueCache:
+        return self._latest_values
+
     @property
     def mode(self):
         return self._mode
@@ -294,6 +331,10 @@ class Coupler(NavThread):
                         # good data received - filter and publish
                         self._total_msg += 1
                         self._state = self.ACTIVE
+                        if self._latest_values is not None and msg.type == N2K_MSG:
+                            self._latest_values.update(msg.msg)
+                        if self._arbitration is not None and not self._arbitration.accept(msg):
+                            continue
                         self.publish(msg)
             except CouplerTimeOut:
                 continue
@@ -334,6 +375,7 @@ class Coupler(NavThread):
         """
         Publish the incoming message on all publishers attached to the coupler
         """
+        self._publish_latency.record_since(msg.stamp)
         fault = False
         for p in self._publishers:
             try:
@@ -381,14 +423,42 @@ class Coupler(NavThread):
         else:
             return True
 
+    def register_metrics(self):
+        """
+        The counters are read at scrape time, a rebuilt coupler replaces the functions of the previous instance
+        """
+        for family, function in ((_coupler_msg_in, self.total_input_msg), (_coupler_msg_raw, self.total_msg_raw),
+                                 (_coupler_msg_out, self.total_output_msg), (_coupler_rate, self.input_rate),
+                                 (_coupler_state, self.state), (_coupler_framing_errors, self.framing_errors),
+                                 (_coupler_overruns, self.overruns)):
+            family.labels(self._name).set_function(function)
+
+    def remove_metrics(self):
+        for family in (_coupler_msg_in, _coupler_msg_raw, _coupler_msg_out, _coupler_rate, _coupler_state,
+                       _coupler_framing_errors, _coupler_overruns):
+            family.remove(self._name)
+
     def total_input_msg(self):
         return self._total_msg
 
     def total_msg_raw(self):
         return self._total_msg_raw
 
-    def increment_msg_raw(self):
-        self._total_msg_raw += 1
+    def increment_msg_raw(self, count: int = 1):
+        self._total_msg_raw += count
+
+    def framing_errors(self) -> int:
+        if self._input_framer is None:
+            return 0
+        return self._input_framer.errors
+
+    def overruns(self) -> int:
+        if self._input_framer is None:
+            return self._overruns
+        return self._overruns + self._input_framer.overruns
+
+    def increment_overruns(self, count: int = 1):
+        self._overruns += count
 
     def total_output_msg(self):
         return self._total_msg_s
@@ -461,7 +531,12 @@ class Coupler(NavThread):
         fetch_next = True
         msg = None
         while fetch_next:
-            msg = self._read()
+            if self._faults is None:
+                msg = self._read()
+            else:
+                msg = self._faulty_read()
+            if LatencyTracker.enabled and msg.stamp == 0:
+                msg.stamp = time.monotonic_ns()
             self.trace(NMEAMsgTrace.TRACE_IN, msg)
             _logger.debug("Read primary:%s", msg)
             if msg.type == N2K_MSG:
@@ -476,6 +551,7 @@ class Coupler(NavThread):
                     try:
                         for n2k_msg in self._converter.convert_to_n2kmsg(msg):
                             _logger.debug("Read valid N2K:%s", n2k_msg)
+                            n2k_msg.stamp = msg.stamp
                             yield n2k_msg
 
                     except NMEAInvalidFrame:
@@ -487,6 +563,42 @@ class Coupler(NavThread):
         # _logger.debug("Read valid data:%s", msg)
         yield msg
 
+    def _faulty_read(self) -> NavGenericMsg:
+        """
+        _read with the faults injected on the coupler (chaos mode)
+        raise CouplerReadError for the injected read errors and disconnections
+        """
+        while len(self._fault_pending) == 0:
+            self._faults.stall()
+            if self._faults.event('disconnect'):
+                _logger.warning(f"Coupler {self._name} disconnection by fault injection")
+                self.close()
+                raise CouplerReadError("Injected disconnection")
+            if self._faults.event('read_error'):
+                raise CouplerReadError("Injected read error")
+            msg = self._read()
+            if msg.type == NULL_MSG:
+                return msg
+            self._fault_pending = self._faults.process(msg, corrupt=self._corrupt_msg)
+        return self._fault_pending.pop(0)
+
+    @staticmethod
+    def _corrupt_msg(msg: NavGenericMsg, point):
+        """
+        Corrupt one bit of the message, the NMEA0183 sentences are dropped when the checksum detects it
+        """
+        if msg.type == N2K_MSG:
+            n2k_msg = msg.msg
+            corrupted = NMEA2000Msg(n2k_msg.pgn, n2k_msg.prio, n2k_msg.sa, n2k_msg.da,
+                                    point.corrupt_bytes(n2k_msg.payload), n2k_msg.timestamp)
+            return NavGenericMsg(N2K_MSG, msg=corrupted)
+        elif msg.type == N0183_MSG:
+            try:
+                return NMEA0183Msg(point.corrupt_bytes(bytes(msg.raw).rstrip(b'\r\n')))
+            except NMEAInvalidFrame:
+                return None
+        return msg
+
     def _read(self) -> NavGenericMsg:
         """
         This method only perform a basic read function without any filtering / processing
@@ -9,13 +9,16 @@
 # Licence:     Eclipse Public License 2.0
 #-------------------------------------------------------------------------------
 
+import asyncio
 import logging
 
+import grpc
+
 from navigation_server.router_common import GrpcService, GrpcServerError, MessageServerGlobals
 from navigation_server.generated.nmea_server_pb2_grpc import NMEAServerServicer, add_NMEAServerServicer_to_server
 from navigation_server.generated.nmea_messages_pb2 import server_resp, nmea_msg
-from .publisher import PullPublisher
-from navigation_server.router_common import N2K_MSG
+from .publisher import PullPublisher, AsyncPullPublisher, PublisherOverflow
+from navigation_server.router_common import N2K_MSG, LatencyTracker
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
@@ -37,7 +40,8 @@ class GrpcNMEAServer(NMEAServerServicer):
         super().__init__()
         self._couplers = couplers
         self._read_session = 0
-        self._publisher = None
+        # each stream records in its own histogram of the group
+        self._send_latency = LatencyTracker.histogram_group('grpc_send', 'GrpcNMEAServer')
 
     def status(self, request, context):
         resp = server_resp()
@@ -53,26 +57,59 @@ class GrpcNMEAServer(NMEAServerServicer):
 
     def getNMEA(self, request, context):
         _logger.debug("getNMEA - enter")
-        context.add_callback(self._get_stream_cb)
-        self._publisher = PullPublisher(self._couplers, f"Grpc-NMEAServer-{self._read_session}")
+        # the publisher belongs to the stream, several streams can run in parallel
+        publisher = PullPublisher(self._couplers, f"Grpc-NMEAServer-{self._read_session}")
+        context.add_callback(publisher.stop)
         self._read_session += 1
-        self._publisher.start()
-        while True:
-            msg = self._publisher.pull_msg()
-
-            if msg.type == N2K_MSG:
-                # _logger.debug("getNMEA message to be sent: %s" % msg.msg.format1())
-                resp_msg = nmea_msg()
-                msg.msg.as_protobuf(resp_msg.N2K_msg)
-                yield resp_msg
-            else:
-                _logger.error("get_nmea: unknown message type")
-                break
+        send_latency = self._send_latency.writer()
+        publisher.start()
+        try:
+            while True:
+                msg = publisher.pull_msg()
+
+                if msg.type == N2K_MSG:
+                    # _logger.debug("getNMEA message to be sent: %s" % msg.msg.format1())
+                    resp_msg = nmea_msg()
+                    msg.msg.as_protobuf(resp_msg.N2K_msg)
+                    yield resp_msg
+                    send_latency.record_since(msg.stamp)
+                else:
+                    _logger.error("get_nmea: unknown message type")
+                    break
+        finally:
+            self._send_latency.release(send_latency)
         _logger.debug("getNMEA - exit")
 
-    def _get_stream_cb(self):
-        _logger.debug("get_stream_cb - enter")
-        self._publisher.stop()
+
+class GrpcNMEAAsyncServer(GrpcNMEAServer):
+    """
+    Servicer for the grpc.aio server, getNMEA is a coroutine fed directly by the coupler threads
+    """
+
+    async def getNMEA(self, request, context):
+        _logger.debug("getNMEA (async) - enter")
+        publisher = AsyncPullPublisher(asyncio.get_running_loop(), self._couplers,
+                                       f"Grpc-NMEAServer-{self._read_session}")
+        self._read_session += 1
+        send_latency = self._send_latency.writer()
+        publisher.start()
+        try:
+            while True:
+                msg = await publisher.pull_msg()
+                if msg.type == N2K_MSG:
+                    resp_msg = nmea_msg()
+                    msg.msg.as_protobuf(resp_msg.N2K_msg)
+                    yield resp_msg
+                    send_latency.record_since(msg.stamp)
+                else:
+                    _logger.error("get_nmea: unknown message type")
+                    break
+        except PublisherOverflow:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Stream too slow, disconnected")
+        finally:
+            publisher.stop()
+            self._send_latency.release(send_latency)
+        _logger.debug("getNMEA (async) - exit")
 
 
 class GrpcNMEAServerService(GrpcService):
@@ -87,4 +124,8 @@ class GrpcNMEAServerService(GrpcService):
             return
         _logger.info("Adding service %s to server" % self._name)
         couplers = MessageServerGlobals.configuration.main_server.couplers()
-        add_NMEAServerServicer_to_server(GrpcNMEAServer(couplers), self.grpc_server)
\ No newline at end of file
+        if self.asynchronous:
+            servicer = GrpcNMEAAsyncServer(couplers)
+        else:
+            servicer = GrpcNMEAServer(couplers)
+        add_NMEAServerServicer_to_server(servicer, self.grpc_server)
\ No newline at end of file
@@ -0,0 +1,73 @@
+#-------------------------------------------------------------------------------
+# Name:        metrics_server
+# Purpose:     HTTP server exposing the metrics registry in OpenMetrics text format
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from navigation_server.router_common import NavigationServer, NavThread, MetricsRegistry, OPENMETRICS_CONTENT_TYPE
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = MetricsRegistry.exposition().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        _logger.debug("Metrics HTTP %s %s" % (self.address_string(), format % args))
+
+
+class MetricsHTTPServer(NavigationServer, NavThread):
+    """
+    Serve the metrics of all components on http://<address>:<port>/metrics
+    Each scrape is processed in its own thread and does not take any lock used by the message processing
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        if self._port == 0:
+            self._port = 9180
+        NavThread.__init__(self, name=self._name, daemon=True)
+        self._address = options.get('address', str, '0.0.0.0')
+        try:
+            self._http_server = ThreadingHTTPServer((self._address, self._port), _MetricsRequestHandler)
+        except OSError as err:
+            _logger.error(f"Metrics server {self._name} cannot listen on {self._address}:{self._port}: {err}")
+            raise ValueError
+        self._http_server.daemon_threads = True
+
+    def server_type(self):
+        return 'HTTP'
+
+    def protocol(self):
+        return 'OpenMetrics'
+
+    def running(self) -> bool:
+        return self.is_alive()
+
+    def nrun(self):
+        _logger.info(f"Metrics server {self._name} listening on {self._address}:{self._port}")
+        self._http_server.serve_forever(poll_interval=1.0)
+        self._http_server.server_close()
+        _logger.info(f"Metrics server {self._name} stopped")
+
+    def stop(self):
+        if self.is_alive():
+            self._http_server.shutdown()
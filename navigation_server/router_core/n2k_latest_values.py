@@ -0,0 +1,85 @@
+#-------------------------------------------------------------------------------
+# Name:        n2k_latest_values
+# Purpose:     Table of the latest NMEA2000 message received for each (PGN, source)
+#
+# Author:      Laurent Carré
+#
+# Created:     14/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import logging
+import time
+
+from .nmea2000_msg import NMEA2000Msg
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class N2KLatestValueCache:
+    """
+    Keep the last message received for each (PGN, source address)
+    The update is done in the reading thread and is kept minimal (one dictionary access)
+    The snapshot can be taken from any thread, the age of each entry is computed at that time
+    Entries are [msg, monotonic time of the last update, number of updates]
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self._table = {}
+        self._max_entries = max_entries
+        self._overflow = False
+
+    def update(self, msg: NMEA2000Msg):
+        entry = self._table.get((msg.pgn, msg.sa))
+        if entry is not None:
+            entry[0] = msg
+            entry[1] = time.monotonic()
+            entry[2] += 1
+        elif len(self._table) < self._max_entries:
+            self._table[(msg.pgn, msg.sa)] = [msg, time.monotonic(), 1]
+        elif not self._overflow:
+            _logger.error("Latest value cache full (%d entries), new PGN/source ignored" % self._max_entries)
+            self._overflow = True
+
+    def get(self, pgn: int, sa: int) -> tuple:
+        """
+        return (msg, age, updates) for the (PGN, source)
+        raise KeyError if there is no message for the (PGN, source)
+        """
+        msg, last_update, updates = self._table[(pgn, sa)]
+        return msg, time.monotonic() - last_update, updates
+
+    def snapshot(self, pgn_list=None, sa_list=None, max_age: float = 0.0) -> list:
+        """
+        return a list of (msg, age, updates) for the selected PGN and sources
+        empty or None lists select all PGN / sources. Entries older than max_age are excluded if max_age > 0
+        """
+        now = time.monotonic()
+        if pgn_list and sa_list:
+            # direct access
+            entries = []
+            for pgn in pgn_list:
+                for sa in sa_list:
+                    entry = self._table.get((pgn, sa))
+                    if entry is not None:
+                        entries.append(list(entry))
+        else:
+            pgn_set = set(pgn_list) if pgn_list else None
+            sa_set = set(sa_list) if sa_list else None
+            entries = [list(entry) for key, entry in list(self._table.items())
+                       if (pgn_set is None or key[0] in pgn_set) and (sa_set is None or key[1] in sa_set)]
+        result = []
+        for msg, last_update, updates in entries:
+            age = now - last_update
+            if 0.0 < max_age < age:
+                continue
+            result.append((msg, age, updates))
+        return result
+
+    def clear(self):
+        self._table = {}
+        self._overflow = False
+
+    def __len__(self):
+        return len(self._table)
@@ -0,0 +1,365 @@
+#-------------------------------------------------------------------------------
+# Name:        n2k_shared_ring
+# Purpose:     Shared memory transport for NMEA2000 messages between co-located services
+#
+# Author:      Laurent Carré
+#
+# Created:     12/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   Single producer / single consumer ring of fixed size records in a POSIX shared memory segment
+#   The producer is the CAN server (N2KCanService), the consumer is a CANGrpcStreamReader in another process
+#   The consumer is woken up by a doorbell datagram on an abstract UNIX socket, only when it is waiting
+#   Linux only
+
+import logging
+import mmap
+import os
+import queue
+import socket
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+from navigation_server.router_common import NavThread
+from .nmea2000_msg import NMEA2000Msg
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+
+class SharedRingError(Exception):
+    pass
+
+
+class SharedRingFull(SharedRingError):
+    pass
+
+
+class SharedRingClosed(SharedRingError):
+    pass
+
+
+def shared_ring_available() -> bool:
+    return sys.platform.startswith('linux')
+
+
+class N2KSharedRing:
+    """
+    Common layout for the shared memory ring
+
+    Header (64 bytes):
+        magic(4) version(2) slot_size(2) nb_slots(4) token(4) write_idx(8) read_idx(8)
+        reader_waiting(4) reader_closed(4) reader_heartbeat(8 - float) dropped(8)
+    Slot:
+        pgn(4) prio(1) sa(1) da(1) pad(1) length(2) timestamp(8 - float) payload(max_payload)
+
+    Indexes are free running counters, the slot is index modulo nb_slots
+    """
+
+    magic = b'N2KR'
+    version = 1
+    header_size = 64
+    max_payload = 1785      # maximum size of an ISO-TP (J1939/21) message
+    slot_size = 1808
+    _header_struct = struct.Struct("<4sHHII")
+    _index_struct = struct.Struct("<Q")
+    _flag_struct = struct.Struct("<I")
+    _ts_struct = struct.Struct("<d")
+    _record_struct = struct.Struct("<IBBBxHd")
+    (WRITE_IDX, READ_IDX, READER_WAITING, READER_CLOSED, READER_HEARTBEAT, DROPPED) = (16, 24, 32, 36, 40, 48)
+
+    def __init__(self):
+        self._shm = None
+        self._buf = None
+        self._nb_slots = 0
+        self._token = 0
+        self._name = None
+
+    @staticmethod
+    def doorbell_address(ring_name: str) -> bytes:
+        # abstract namespace => no file to clean up
+        return b'\0navigation-' + ring_name.encode()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def nb_slots(self) -> int:
+        return self._nb_slots
+
+    @property
+    def token(self) -> int:
+        return self._token
+
+    def _get_index(self, offset) -> int:
+        return self._index_struct.unpack_from(self._buf, offset)[0]
+
+    def _set_index(self, offset, value: int):
+        self._index_struct.pack_into(self._buf, offset, value)
+
+    def _get_flag(self, offset) -> int:
+        return self._flag_struct.unpack_from(self._buf, offset)[0]
+
+    def _set_flag(self, offset, value: int):
+        self._flag_struct.pack_into(self._buf, offset, value)
+
+    def pending(self) -> int:
+        return self._get_index(self.WRITE_IDX) - self._get_index(self.READ_IDX)
+
+    def dropped(self) -> int:
+        return self._get_index(self.DROPPED)
+
+    def _release(self):
+        self._buf = None
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # some memoryview are still alive, the segment is released with the process
+                pass
+
+
+class N2KSharedRingWriter(N2KSharedRing):
+    """
+    Producer side of the ring, creates and owns the shared memory segment
+    """
+
+    def __init__(self, client: str, nb_slots: int = 256, reader_timeout: float = 10.0):
+        super().__init__()
+        if not shared_ring_available():
+            raise SharedRingError("Shared memory transport only available on Linux")
+        self._nb_slots = nb_slots
+        self._token = int.from_bytes(os.urandom(4), 'little')
+        self._name = "nav_n2k_%d_%08x" % (os.getpid(), self._token)
+        self._client = client
+        self._reader_timeout = reader_timeout
+        try:
+            self._shm = shared_memory.SharedMemory(name=self._name, create=True,
+                                                   size=self.header_size + self.slot_size * nb_slots)
+        except OSError as err:
+            _logger.error("Shared ring %s creation error: %s" % (self._name, err))
+            raise SharedRingError(str(err))
+        self._buf = self._shm.buf
+        self._buf[:self.header_size] = bytes(self.header_size)
+        self._header_struct.pack_into(self._buf, 0, self.magic, self.version, self.slot_size, nb_slots, self._token)
+        self._ts_struct.pack_into(self._buf, self.READER_HEARTBEAT, time.time())
+        self._doorbell = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._doorbell.setblocking(False)
+        self._doorbell_address = self.doorbell_address(self._name)
+        self._write_idx = 0
+        self._total_msg = 0
+        self._total_doorbell = 0
+        _logger.info("Shared ring %s created for %s with %d slots" % (self._name, client, nb_slots))
+
+    def push(self, msg: NMEA2000Msg):
+        """
+        Write one message in the ring and ring the doorbell if the reader is waiting
+        raise SharedRingFull if the message cannot be written
+        raise SharedRingClosed if the reader is no longer there
+        """
+        if self._buf is None:
+            raise SharedRingClosed
+        payload = msg.payload
+        length = len(payload)
+        if length > self.max_payload:
+            _logger.error("Shared ring %s payload too large for PGN %d: %d" % (self._name, msg.pgn, length))
+            return
+        if self._write_idx - self._get_index(self.READ_IDX) >= self._nb_slots:
+            self._check_reader()
+            self._set_index(self.DROPPED, self._get_index(self.DROPPED) + 1)
+            raise SharedRingFull
+        offset = self.header_size + (self._write_idx % self._nb_slots) * self.slot_size
+        self._record_struct.pack_into(self._buf, offset, msg.pgn, msg.prio, msg.sa, msg.da, length, msg.timestamp)
+        data_offset = offset + self._record_struct.size
+        self._buf[data_offset: data_offset + length] = payload
+        # the record is complete, now it can be published
+        self._write_idx += 1
+        self._set_index(self.WRITE_IDX, self._write_idx)
+        self._total_msg += 1
+        if self._get_flag(self.READER_WAITING) != 0:
+            self._set_flag(self.READER_WAITING, 0)
+            self._ring_doorbell()
+
+    def _ring_doorbell(self):
+        try:
+            self._doorbell.sendto(b'\x01', self._doorbell_address)
+            self._total_doorbell += 1
+        except (BlockingIOError, ConnectionRefusedError, FileNotFoundError):
+            # reader not yet bound or already busy, it will check the indexes anyway
+            pass
+
+    def _check_reader(self):
+        if self._get_flag(self.READER_CLOSED) != 0:
+            raise SharedRingClosed
+        last_seen = self._ts_struct.unpack_from(self._buf, self.READER_HEARTBEAT)[0]
+        if time.time() - last_seen > self._reader_timeout:
+            _logger.warning("Shared ring %s reader %s not responding" % (self._name, self._client))
+            raise SharedRingClosed
+
+    @property
+    def total_msg(self) -> int:
+        return self._total_msg
+
+    def close(self):
+        _logger.info("Shared ring %s closing - messages:%d doorbells:%d dropped:%d" %
+                     (self._name, self._total_msg, self._total_doorbell, self.dropped() if self._buf is not None else 0))
+        self._doorbell.close()
+        shm = self._shm
+        self._release()
+        if shm is not None:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+
+class _AttachedSegment:
+    """
+    Mapping of a segment created by the writer, with the close() and buf of SharedMemory
+    SharedMemory(create=False) registers the segment in the resource tracker (before Python 3.13), that is shared
+    with the writer in a spawned child. The reader maps the segment itself, the writer owns the registration
+    """
+    def __init__(self, name: str):
+        fd = os.open(os.path.join("/dev/shm", name), os.O_RDWR)
+        try:
+            self._mmap = mmap.mmap(fd, os.fstat(fd).st_size)
+        finally:
+            os.close(fd)
+        self.buf = memoryview(self._mmap)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+
+class N2KSharedRingReader(N2KSharedRing):
+    """
+    Consumer side of the ring, attaches to an existing segment
+    """
+
+    heartbeat_interval = 1.0
+
+    def __init__(self, name: str, token: int):
+        super().__init__()
+        if not shared_ring_available():
+            raise SharedRingError("Shared memory transport only available on Linux")
+        self._name = name
+        try:
+            self._shm = _AttachedSegment(name)
+        except (FileNotFoundError, OSError, ValueError) as err:
+            # not on the same host or the ring is already gone (ValueError: empty segment)
+            raise SharedRingError(f"Cannot attach shared ring {name}: {err}")
+        self._buf = self._shm.buf
+        magic, version, slot_size, nb_slots, ring_token = self._header_struct.unpack_from(self._buf, 0)
+        if magic != self.magic or version != self.version or slot_size != self.slot_size or ring_token != token:
+            self._release()
+            raise SharedRingError(f"Shared ring {name} header mismatch")
+        self._nb_slots = nb_slots
+        self._token = token
+        self._read_idx = self._get_index(self.READ_IDX)
+        self._doorbell = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self._doorbell.bind(self.doorbell_address(name))
+        except OSError as err:
+            self._release()
+            raise SharedRingError(f"Shared ring {name} doorbell error {err}")
+        self._last_heartbeat = 0.0
+        self._heartbeat()
+
+    def _heartbeat(self):
+        now = time.time()
+        if now - self._last_heartbeat > self.heartbeat_interval:
+            self._ts_struct.pack_into(self._buf, self.READER_HEARTBEAT, now)
+            self._last_heartbeat = now
+
+    def _read_record(self) -> NMEA2000Msg:
+        offset = self.header_size + (self._read_idx % self._nb_slots) * self.slot_size
+        pgn, prio, sa, da, length, ts = self._record_struct.unpack_from(self._buf, offset)
+        data_offset = offset + self._record_struct.size
+        payload = bytearray(self._buf[data_offset: data_offset + length])
+        self._read_idx += 1
+        self._set_index(self.READ_IDX, self._read_idx)
+        return NMEA2000Msg(pgn, prio, sa, da, payload, timestamp=ts)
+
+    def get_message(self, timeout: float) -> NMEA2000Msg:
+        """
+        Return the next message from the ring
+        raise queue.Empty if no message is available within the timeout
+        """
+        if self._buf is None:
+            raise SharedRingClosed
+        self._heartbeat()
+        if self._get_index(self.WRITE_IDX) > self._read_idx:
+            return self._read_record()
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                # nothing available => signal that we are waiting, then check again to avoid missing a write
+                # the writer clears the flag when ringing, so it is set again after each doorbell
+                self._set_flag(self.READER_WAITING, 1)
+                if self._get_index(self.WRITE_IDX) > self._read_idx:
+                    return self._read_record()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0.0:
+                    raise queue.Empty
+                self._doorbell.settimeout(remaining)
+                try:
+                    # the doorbell can be stale: rung after a record was already read on the second check
+                    self._doorbell.recv(16)
+                except socket.timeout:
+                    pass
+        finally:
+            self._set_flag(self.READER_WAITING, 0)
+
+    def close(self):
+        if self._buf is not None:
+            self._set_flag(self.READER_CLOSED, 1)
+        self._doorbell.close()
+        self._release()
+        self._shm = None
+
+
+class SharedRingStreamReader(NavThread):
+    """
+    Thread reading the shared ring and pushing the messages either to a queue or a callback
+    Same behaviour as the GrpcStreamingReader for the ServiceClient
+    """
+
+    def __init__(self, client: str, ring: N2KSharedRingReader, out_queue: queue.Queue, process_msg_callback,
+                 error_callback):
+        super().__init__(name=f"{client}-local", daemon=True)
+        self._ring = ring
+        if out_queue is None:
+            self._process_func = process_msg_callback
+        else:
+            self._out_queue = out_queue
+            self._process_func = self.push_to_queue
+        self._error_callback = error_callback
+        self._stop_flag = False
+
+    def push_to_queue(self, msg):
+        self._out_queue.put(msg, block=True)
+
+    def nrun(self):
+        _logger.info("Shared ring stream %s starts" % self._ring.name)
+        try:
+            while not self._stop_flag:
+                try:
+                    msg = self._ring.get_message(1.0)
+                except queue.Empty:
+                    continue
+                self._process_func(msg)
+        except SharedRingClosed:
+            _logger.error("Shared ring %s closed" % self._ring.name)
+        self._ring.close()
+        self._error_callback()
+        _logger.info("Shared ring stream %s stops" % self.name)
+
+    def stop(self):
+        self._stop_flag = True
@@ -0,0 +1,162 @@
+#-------------------------------------------------------------------------------
+# Name:        nmea0183_framing
+# Purpose:     Single pass framing of NMEA0183 sentences (and other line oriented streams) in receive buffers
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   The framer works on the buffers as returned by the transport (socket or serial read). The line ends are located
+#   with find on the buffer and the sentences are passed to NMEA0183Msg as memoryview slices, so the only copy of the
+#   data is the raw message itself. The sentence ending in the next buffer is kept in a partial buffer.
+#   The CR LF is included in the slice when present, so NavGenericMsg does not have to extend the raw message.
+#   Characters before the sentence delimiter ($, ! or \ for a TAG block) are skipped and counted as an error.
+#   The line splitting is in LineFramer, the subclasses only decode the lines (NMEA0183Framer here and the framers of
+#   the serial couplers for the NMEA2000 messages encapsulated in sentences).
+
+import logging
+
+from navigation_server.router_common import NavGenericMsg, NULL_MSG
+from .nmea0183_msg import NMEA0183Msg, NMEAInvalidFrame
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+# longer than any valid sentence with a TAG block
+MAX_SENTENCE_LENGTH = 512
+
+
+class LineFramer:
+    """
+    Frames the lines of successive receive buffers (bytes or bytearray) of an ASCII stream
+    The lines are decoded by the subclasses in _frame
+    Counters:
+        frames: number of lines found
+        errors: lines rejected by the decoding
+        overruns: lines longer than max_length that have been discarded
+    """
+
+    def __init__(self, max_length: int = MAX_SENTENCE_LENGTH):
+        self._max_length = max_length
+        self._partial = bytearray()
+        # the end of an overlong line is discarded up to the next LF
+        self._discard = False
+        self.frames = 0
+        self.errors = 0
+        self.overruns = 0
+
+    def reset(self):
+        self._partial = bytearray()
+        self._discard = False
+
+    def _frame(self, line, timestamp):
+        """
+        Decode one line (memoryview including the CR LF when present)
+        return the message or None if the line is rejected, the error is counted by the subclass
+        """
+        raise NotImplementedError("LineFramer._frame to be implemented in subclass")
+
+    def messages(self, buffer, timestamp: float = None) -> list:
+        """
+        return the list of messages for the complete lines of the buffer
+        the invalid lines are counted and skipped
+        """
+        result = []
+        end = len(buffer)
+        start = 0
+        frame = self._frame
+        view = memoryview(buffer)
+        if self._discard:
+            index = buffer.find(b'\n')
+            if index == -1:
+                return result
+            self._discard = False
+            start = index + 1
+        elif len(self._partial) > 0:
+            index = buffer.find(b'\n')
+            if index == -1:
+                self._partial.extend(buffer)
+                if len(self._partial) > self._max_length:
+                    self._overrun()
+                return result
+            self._partial.extend(view[:index + 1])
+            start = index + 1
+            line = self._partial
+            self._partial = bytearray()
+            self.frames += 1
+            if len(line) > self._max_length:
+                self.overruns += 1
+            else:
+                length = len(line) - 1 if line[-2:-1] != b'\r' else len(line)
+                if length > 2:
+                    msg = frame(memoryview(line)[:length], timestamp)
+                    if msg is not None:
+                        result.append(msg)
+        while start < end:
+            index = buffer.find(b'\n', start)
+            if index == -1:
+                self._partial.extend(view[start:])
+                if len(self._partial) > self._max_length:
+                    self._overrun()
+                break
+            # include CR LF, or exclude the LF alone
+            stop = index + 1 if index > start and buffer[index - 1] == 0x0d else index
+            if stop - start > 2:
+                self.frames += 1
+                if stop - start > self._max_length:
+                    self.overruns += 1
+                else:
+                    msg = frame(view[start:stop], timestamp)
+                    if msg is not None:
+                        result.append(msg)
+            start = index + 1
+        return result
+
+    def _overrun(self):
+        self.overruns += 1
+        self.frames += 1
+        self._partial = bytearray()
+        self._discard = True
+
+    @staticmethod
+    def end_of_stream() -> NavGenericMsg:
+        return NavGenericMsg(NULL_MSG)
+
+
+class NMEA0183Framer(LineFramer):
+    """
+    Frames the NMEA0183 sentences in successive receive buffers
+    errors: invalid sentences (checksum, delimiter, address) or garbage before the delimiter
+    """
+
+    def __init__(self, checksum: bool = True, max_length: int = MAX_SENTENCE_LENGTH):
+        super().__init__(max_length)
+        self._checksum = checksum
+
+    def _frame(self, line, timestamp):
+        try:
+            return NMEA0183Msg(line, self._checksum, timestamp)
+        except NMEAInvalidFrame:
+            return self._recover(line, timestamp)
+
+    def _recover(self, line, timestamp):
+        """
+        the line is not a valid sentence, try from the next delimiter in case of garbage before the sentence
+        """
+        self.errors += 1
+        start = self._sentence_start(line)
+        if start > 0:
+            try:
+                return NMEA0183Msg(line[start:], self._checksum, timestamp)
+            except NMEAInvalidFrame:
+                pass
+        return None
+
+    @staticmethod
+    def _sentence_start(line) -> int:
+        line = bytes(line)
+        positions = [p for p in (line.find(b'$', 1), line.find(b'!', 1), line.find(b'\\', 1)) if p > 0]
+        return min(positions) if len(positions) > 0 else -1
@@ -15,6 +15,7 @@ from functools import reduce
 import datetime
 import time
 import logging
+import threading
 
 from navigation_server.router_common import copy_attribute, NavGenericMsg, N0183_MSG, NULL_MSG
 from navigation_server.generated.nmea0183_pb2 import nmea0183pb
@@ -27,29 +28,205 @@ class NMEAInvalidFrame(Exception):
     pass
 
 
+def nmea0183_checksum(data) -> int:
+    """
+    XOR of all the bytes of data (bytes, bytearray or memoryview)
+    The bytes are folded as a single integer, so the number of Python operations does not depend on the length
+    """
+    length = len(data)
+    if length > 127:
+        return reduce(operator.xor, data, 0)
+    x = int.from_bytes(data, 'little')
+    # each byte lands exactly once in the low byte as the shifts are distinct powers of 2
+    if length > 64:
+        x ^= x >> 512
+    if length > 32:
+        x ^= x >> 256
+    if length > 16:
+        x ^= x >> 128
+    x ^= x >> 64
+    x ^= x >> 32
+    x ^= x >> 16
+    x ^= x >> 8
+    return x & 0xff
+
+
+# value of the hexadecimal digits, -1 for the other characters
+_hex_values = [-1] * 256
+for _c in b'0123456789':
+    _hex_values[_c] = _c - 0x30
+for _c in b'ABCDEF':
+    _hex_values[_c] = _c - 0x37
+    _hex_values[_c + 0x20] = _c - 0x37
+
+
+class NMEA0183Address:
+    """
+    Interned address of a sentence with the talker and formatter integer codes
+    For proprietary sentences the talker is P and the formatter is the rest of the address (manufacturer + sentence)
+    """
+    __slots__ = ('address', 'talker', 'formatter', 'code', 'talker_code', 'formatter_code', 'proprietary')
+
+    def __init__(self, address: bytes, code: int, talker: bytes, formatter: bytes, talker_code: int,
+                 formatter_code: int):
+        self.address = address
+        self.code = code
+        self.talker = talker
+        self.formatter = formatter
+        self.talker_code = talker_code
+        self.formatter_code = formatter_code
+        self.proprietary = talker == b'P'
+
+    def __repr__(self):
+        return f"NMEA0183Address({self.address.decode()} code={self.code})"
+
+
+class NMEA0183Index:
+    """
+    Process wide index of the sentence addresses, talkers and formatters
+    Each one gets a small integer code at first sight that can be used by filters, statistics and routing instead
+    of comparing bytes or strings. The codes are stable for the life of the process.
+    The index size is bounded, addresses received beyond the limit are valid but get the code -1
+    """
+
+    max_addresses = 4096
+
+    _lock = threading.Lock()
+    _addresses = {}
+    _address_list = []
+    _talkers = {}
+    _talker_list = []
+    _formatters = {}
+    _formatter_list = []
+
+    @staticmethod
+    def _name(name) -> bytes:
+        return name.encode() if type(name) is str else bytes(name)
+
+    @classmethod
+    def _code(cls, name: bytes, codes: dict, names: list) -> int:
+        # called with the lock held
+        code = codes.get(name)
+        if code is None:
+            code = len(names)
+            names.append(name)
+            codes[name] = code
+        return code
+
+    @classmethod
+    def address(cls, address: bytes) -> NMEA0183Address:
+        try:
+            return cls._addresses[address]
+        except KeyError:
+            pass
+        if not 2 < len(address) < 12 or not address.isalnum():
+            raise NMEAInvalidFrame
+        with cls._lock:
+            entry = cls._addresses.get(address)
+            if entry is not None:
+                return entry
+            if address[0] == 0x50:
+                talker, formatter = b'P', address[1:]
+            else:
+                talker, formatter = address[:2], address[2:]
+            talker_code = cls._code(talker, cls._talkers, cls._talker_list)
+            formatter_code = cls._code(formatter, cls._formatters, cls._formatter_list)
+            if len(cls._address_list) >= cls.max_addresses:
+                _logger.warning("NMEA0183 address index full, %s not indexed" % address)
+                return NMEA0183Address(address, -1, talker, formatter, talker_code, formatter_code)
+            entry = NMEA0183Address(address, len(cls._address_list), talker, formatter, talker_code,
+                                    formatter_code)
+            cls._address_list.append(entry)
+            cls._addresses[address] = entry
+            return entry
+
+    @classmethod
+    def talker_code(cls, talker) -> int:
+        talker = cls._name(talker)
+        try:
+            return cls._talkers[talker]
+        except KeyError:
+            with cls._lock:
+                return cls._code(talker, cls._talkers, cls._talker_list)
+
+    @classmethod
+    def formatter_code(cls, formatter) -> int:
+        formatter = cls._name(formatter)
+        try:
+            return cls._formatters[formatter]
+        except KeyError:
+            with cls._lock:
+                return cls._code(formatter, cls._formatters, cls._formatter_list)
+
+    @classmethod
+    def talker(cls, code: int) -> bytes:
+        return cls._talker_list[code]
+
+    @classmethod
+    def formatter(cls, code: int) -> bytes:
+        return cls._formatter_list[code]
+
+    @classmethod
+    def address_entry(cls, code: int) -> NMEA0183Address:
+        return cls._address_list[code]
+
+
+# direct access to the index for the NMEA0183Msg constructor
+_address_index = NMEA0183Index._addresses
+
+
 class NMEA0183Msg(NavGenericMsg):
     """
     Class for handling NMEA0183 internally. This is an un-decoded form where all the data are still in the original
     sentence format
+    The frame is validated in a single pass: delimiter, optional TAG block, checksum and address. The TAG block
+    is removed from the raw message and kept aside.
     """
-    __slots__ = ('_checksum', '_datalen_s', '_ts', '_delimiter', '_address', '_datafields_s', '_proprietary')
+    __slots__ = ('_checksum', '_datalen_s', '_ts', '_delimiter', '_datafields_s', '_index', '_fields', '_tag')
 
     def __init__(self, data, checksum=True, timestamp=None):
-        super().__init__(N0183_MSG, raw=data)
+        # the NavGenericMsg attributes are set directly, the generic constructor costs as much as the validation
+        self._type = N0183_MSG
+        self._msg = self
+        self._stamp = 0
+        raw = bytearray(data)
+        datalen = len(raw)
+        if datalen < 2:
+            raise NMEAInvalidFrame
+        if raw[datalen - 1] == 0x0a and raw[datalen - 2] == 0x0d:
+            datalen -= 2
+        else:
+            raw += b'\r\n'
+        self._raw = raw
+        self._datalen = datalen
+        if raw[0] == 0x5c:
+            # TAG block \...*hh\ before the sentence
+            self._tag = self._extract_tag_block(raw)
+            datalen = self._datalen
+            if datalen == 0:
+                raise NMEAInvalidFrame
+        else:
+            self._tag = None
+        delimiter = raw[0]
+        if delimiter != 0x24 and delimiter != 0x21:
+            # neither $ nor !
+            raise NMEAInvalidFrame
+        self._delimiter = delimiter
         # verify that we have a checksum
         if checksum:
-            if self._raw[self._datalen - 3] != ord('*'):
+            if datalen < 4 or raw[datalen - 3] != 0x2a:
                 _logger.error("NMEA183 Frame without checksum")
                 raise NMEAInvalidFrame
-
-            self._checksum = int(self._raw[self._datalen-2:self._datalen], 16)
-            if self._checksum != NMEA0183Sentences.b_checksum(self._raw[1:self._datalen - 3]):
-                _logger.error("Checksum error %x %s" % (self._checksum, self._raw[:self._datalen].hex()))
+            self._checksum = (_hex_values[raw[datalen - 2]] << 4) | _hex_values[raw[datalen - 1]]
+            if self._checksum != nmea0183_checksum(raw[1:datalen - 3]):
+                _logger.error("Checksum error %s" % raw[:datalen].hex())
                 raise NMEAInvalidFrame
-            self._datalen_s = self._datalen - 3
+            datalen -= 3
         else:
             self._checksum = 0
-            self._datalen_s = self._datalen
+            if datalen > 3 and raw[datalen - 3] == 0x2a:
+                datalen -= 3
+        self._datalen_s = datalen
 
         if timestamp is None:
             # change in version 1.3 => become float and referenced to the epoch
@@ -57,51 +234,117 @@ class NMEA0183Msg(NavGenericMsg):
         else:
             self._ts = timestamp
 
-        self._delimiter = self._raw[0]
-        ind_comma = self._raw.index(b',')
+        ind_comma = raw.find(b',', 1, datalen)
+        if ind_comma == -1:
+            # sentence without data fields
+            ind_comma = datalen
         self._datafields_s = ind_comma + 1
-        self._address = self._raw[1: ind_comma]
-        if self._address[0] == b'P':
-            self._proprietary = True
-        else:
-            self._proprietary = False
+        address = bytes(raw[1: ind_comma])
+        index = _address_index.get(address)
+        self._index = index if index is not None else NMEA0183Index.address(address)
+        self._fields = None
+
+    def _extract_tag_block(self, raw) -> bytes:
+        end = raw.find(b'\\', 1, self._datalen)
+        if end == -1:
+            raise NMEAInvalidFrame
+        tag = bytes(raw[1:end])
+        star = tag.rfind(b'*')
+        if star != -1:
+            if star != len(tag) - 3 or \
+                    (_hex_values[tag[star + 1]] << 4) | _hex_values[tag[star + 2]] != nmea0183_checksum(tag[:star]):
+                _logger.error("TAG block checksum error %s" % tag)
+                raise NMEAInvalidFrame
+        del raw[:end + 1]
+        self._datalen -= end + 1
+        return tag
 
-    attributes_to_copy = ('_raw', '_checksum', '_datalen_s', '_datelen', '_ts', '_delimiter', '_datafields_s',
-                          '_address')
+    attributes_to_copy = ('_raw', '_checksum', '_datalen_s', '_datalen', '_ts', '_delimiter', '_datafields_s',
+                          '_index', '_tag')
 
     def copy_from(self, source):
         copy_attribute(source, self, self.attributes_to_copy)
+        self._fields = None
 
-    def talker(self):
-        if not self._proprietary:
-            return self._address[:2]
-        else:
-            raise ValueError
+    def talker(self) -> bytes:
+        """
+        return the talker, P for proprietary sentences
+        """
+        return self._index.talker
 
-    def formatter(self):
-        if not self._proprietary:
-            return self._address[2:]
-        else:
-            raise ValueError
+    def formatter(self) -> bytes:
+        """
+        return the formatter, manufacturer code + sentence for proprietary sentences
+        """
+        return self._index.formatter
+
+    @property
+    def talker_code(self) -> int:
+        return self._index.talker_code
+
+    @property
+    def formatter_code(self) -> int:
+        return self._index.formatter_code
+
+    @property
+    def address_code(self) -> int:
+        return self._index.code
+
+    @property
+    def index(self) -> NMEA0183Address:
+        return self._index
 
     def delimiter(self):
         return self._delimiter
 
-    def address(self):
-        return self._address
+    def encapsulated(self) -> bool:
+        """
+        True for the sentences with the ! delimiter (AIS VDM/VDO encapsulation)
+        """
+        return self._delimiter == 0x21
+
+    def address(self) -> bytes:
+        return self._index.address
 
     def proprietary(self):
-        return self._proprietary
+        return self._index.proprietary
+
+    def tag_block(self) -> dict:
+        """
+        return the parameters of the TAG block (NMEA0183 v4), empty when there is no TAG block
+        c (UNIX time) and n (line count) are converted to int
+        """
+        result = {}
+        if self._tag is None:
+            return result
+        star = self._tag.rfind(b'*')
+        block = self._tag[:star] if star != -1 else self._tag
+        for item in block.decode(errors='replace').split(','):
+            code, sep, value = item.partition(':')
+            if len(sep) == 0:
+                continue
+            if code in ('c', 'n'):
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass
+            result[code] = value
+        return result
 
     def __str__(self):
         return self._raw[:self._datalen].decode()
 
     def replace_talker(self, talker: bytes):
         self._raw[1:3] = talker[:2]
-        self._address[0:2] = talker[:2]
+        self._index = NMEA0183Index.address(bytes(self._raw[1: self._datafields_s - 1]))
 
     def fields(self) -> list:
-        return self._raw[self._datafields_s:self._datalen_s].split(b',')
+        """
+        return the list of fields, the sentence is split once and the list is shared by all callers
+        """
+        if self._fields is None:
+            self._fields = self._raw[self._datafields_s:self._datalen_s].split(b',')
+        return self._fields
 
     def as_protobuf(self, r: nmea0183pb, set_raw=False) -> nmea0183pb:
         """
@@ -114,11 +357,11 @@ class NMEA0183Msg(NavGenericMsg):
         if set_raw:
             r.raw_message = bytes(self._raw)
         else:
-            try:
+            if self._index.proprietary:
+                r.talker = self._index.address.decode()
+            else:
                 r.talker = self.talker().decode()
                 r.formatter = self.formatter().decode()
-            except ValueError:
-                r.talker = self.address().decode()
 
             # r.values.extend(self.fields())
             for f in self.fields():
@@ -140,6 +383,7 @@ class NMEA0183DecodedMsg(NavGenericMsg):
     #
 
     def __init__(self, talker: str, formatter: str, values: list, timestamp):
+        self._stamp = 0
         self._talker = talker
         self._formatter = formatter
         self._values = values
@@ -170,7 +414,7 @@ def nmea0183msg_from_protobuf(pb_msg: nmea0183pb):
     Convert the protobuf in NMEA0183 internal representation
     """
     if len(pb_msg.raw_message) > 0:
-        return NMEA0183Msg(pb_msg.raw_message, pb_msg.timestamp)
+        return NMEA0183Msg(pb_msg.raw_message, timestamp=pb_msg.timestamp)
     else:
         # that is NOT working
         return NMEA0183DecodedMsg(pb_msg.talker, pb_msg.formatter, [x for x in pb_msg.values], pb_msg.timestamp)
@@ -186,7 +430,7 @@ class NMEA0183SentenceMsg(NMEA0183Msg):
 def process_nmea0183_frame(frame, checksum=True):
     if frame[0] == 4:
         return NavGenericMsg(NULL_MSG)
-    if frame[0] not in b'$!':
+    if frame[0] not in b'$!\\':
         raise NMEAInvalidFrame
     return NMEA0183Msg(frame, checksum)
 
@@ -199,7 +443,7 @@ class NMEA0183Sentences:
 
     @staticmethod
     def b_checksum(nmea_bytes: bytes):
-        return reduce(operator.xor, nmea_bytes, 0)
+        return nmea0183_checksum(nmea_bytes)
 
     @staticmethod
     def hex_checksum(nmea_str):
@@ -37,7 +37,7 @@ class NMEA2000Msg:
     """
     Internal support for NMEA2000 messages with non-decoded payload
     """
-    __slots__ = ('_pgn', '_prio', '_sa', '_da', '_is_iso', '_ts', '_fast_packet', '_payload')
+    __slots__ = ('_pgn', '_prio', '_sa', '_da', '_is_iso', '_ts', '_fast_packet', '_payload', '_stamp')
 
     ts_format = "%H:%M:%S.%f"
     struct_2b = struct.Struct("<H")
@@ -58,6 +58,7 @@ class NMEA2000Msg:
         raise ValueError if both payload and protobuf are None
         """
         self._pgn = pgn
+        self._stamp = 0     # reception time (monotonic ns) when the latency tracking is on
         if protobuf is None:
             if payload is None:
                 _logger.error("Cannot build NMEA2000Msg with no payload and no protobuf")
@@ -84,7 +85,7 @@ class NMEA2000Msg:
     def _check_fast_packet(self):
         if self._pgn < 0x10000:
             self._fast_packet = False
-        elif 0x10000 >= self._pgn < 0x1F000:
+        elif 0x10000 <= self._pgn < 0x1F000:
             self._fast_packet = True
         elif self._pgn >= 0x1FF00:
             self._fast_packet = True
@@ -144,6 +145,14 @@ class NMEA2000Msg:
     def timestamp(self) -> float:
         return self._ts
 
+    @property
+    def stamp(self) -> int:
+        return self._stamp
+
+    @stamp.setter
+    def stamp(self, stamp: int):
+        self._stamp = stamp
+
     def display(self):
         pgn_def = find_pgn(self._pgn)
         print("PGN %d|%04X|%s|time:%s" % (self._pgn, self._pgn, pgn_def.name,
@@ -9,12 +9,15 @@
 # Licence:     Eclipse Public License 2.0
 #-------------------------------------------------------------------------------
 
+import asyncio
+import collections
 import time
 import queue
 import logging
+import threading
 
 from .filters import FilterSet
-from navigation_server.router_common import resolve_ref, set_hook, NavThread
+from navigation_server.router_common import resolve_ref, set_hook, NavThread, LatencyTracker, MetricsRegistry
 
 _logger = logging.getLogger("ShipDataServer."+__name__)
 
@@ -29,6 +32,12 @@ class PublisherOverflow(Exception):
     pass
 
 
+_publisher_lost = MetricsRegistry.counter('navigation_publisher_messages_lost',
+                                          'Messages lost on publisher queue overflow', ('publisher',))
+_publisher_queue = MetricsRegistry.gauge('navigation_publisher_queue_depth', 'Messages waiting in the publisher queue',
+                                         ('publisher',))
+
+
 class Publisher(NavThread):
     """
     Super class for all publishers
@@ -63,11 +72,15 @@ class Publisher(NavThread):
             self._couplers = {}
             for inst_name in inst_list:
                 set_hook(inst_name, self.add_coupler)
-                coupler = resolve_ref(inst_name)
+                try:
+                    coupler = resolve_ref(inst_name)
+                except KeyError:
+                    coupler = None
                 if coupler is None:
+                    # the coupler can be added later by a configuration reload
                     _logger.error(f"Publisher {object_name} reference to coupler {inst_name} not found")
                 else:
-                    self._couplers[inst_name] = resolve_ref(inst_name)
+                    self._couplers[inst_name] = coupler
             daemon = False
             self._filter_select = opts.get('filter_select', bool, False)
 
@@ -79,11 +92,17 @@ class Publisher(NavThread):
         self._queue_threshold = int(self._queue_size * 0.8)
         self._stopflag = False
         self._nb_msg_lost = 0
+        self._lost_metric = _publisher_lost.labels(object_name)
+        # read at scrape time without the queue mutex (qsize takes it): len of the underlying deque is atomic
+        _publisher_queue.labels(object_name).set_function(lambda: len(self._queue.queue))
+        self._queue_latency = LatencyTracker.histogram('publisher_queue', object_name)
         self._filters = filters
-
+        # filters and selection direction are read together by the coupler thread
+        self._filter_conf = (self._filters, self._filter_select)
 
     def start(self):
         _logger.debug("Publisher %s start flag %s" % (self._name, self._active))
+        self._filter_conf = (self._filters, self._filter_select)
         if self._active:
             for inst in self._couplers.values():
                 # print("Registering %s on %s" % (self._name, inst.name()))
@@ -96,9 +115,10 @@ class Publisher(NavThread):
         here we implement the filtering, no need to fill the queue with useless messages
         that is also implying that the filtering is processed in the Coupler thread
         """
-        if self._filters is not None:
+        filters, filter_select = self._filter_conf
+        if filters is not None:
             _logger.debug("Publisher %s publish with filter msg:%s" % (self._name, msg))
-            if self._filters.process_filter(msg, select_filter=self._filter_select):
+            if filters.process_filter(msg, select_filter=filter_select):
                 # the message does not satisfy the filter and selection direction
                 _logger.debug("Message discarded")
                 return
@@ -110,6 +130,7 @@ class Publisher(NavThread):
         except queue.Full:
             # need to empty the queue
             self._nb_msg_lost += 1
+            self._lost_metric.inc()
             _logger.warning("Overflow on connection %s total message lost %d" % (self._name, self._nb_msg_lost))
             if self._nb_msg_lost >= self._max_lost:
                 raise PublisherOverflow
@@ -132,6 +153,42 @@ class Publisher(NavThread):
         self._couplers[coupler.object_name()] = coupler
         coupler.register(self)
 
+    def has_coupler(self, name: str) -> bool:
+        return name in self._couplers
+
+    def coupler_replaced(self, coupler):
+        """
+        A coupler has been rebuilt (configuration reload), the running publisher registers on the new instance
+        """
+        name = coupler.object_name()
+        if name not in self._couplers or self._couplers[name] is coupler:
+            return
+        if self.is_alive():
+            self.add_coupler(coupler)
+        else:
+            self._couplers[name] = coupler
+
+    def coupler_added(self, coupler):
+        """
+        A coupler has been created (configuration reload), the publisher registers on it if it is in its couplers list
+        """
+        name = coupler.object_name()
+        if self._opts is None or name in self._couplers or name not in self._opts.getlist('couplers', str, []):
+            return
+        if self.is_alive():
+            self.add_coupler(coupler)
+        else:
+            self._couplers[name] = coupler
+
+    def set_filters(self, filters, filter_select: bool):
+        """
+        Replace the filters while the publisher is running, the coupler threads see either the old
+        or the new filters, never a mix of both
+        """
+        self._filters = filters
+        self._filter_select = filter_select
+        self._filter_conf = (filters, filter_select)
+
     def stop(self):
         _logger.info("Stop received for %s" % self._name)
         self._stopflag = True
@@ -150,11 +207,14 @@ class Publisher(NavThread):
                 else:
                     continue
             # print("message get in Publisher %s" % msg, count, self.ident)
+            self._queue_latency.record_since(msg.stamp)
             if not self.process_msg(msg):
                 _logger.warning(f"Publisher {self._name} error during send msg => stop")
                 break
         self.last_action()
 
+        _publisher_lost.remove(self._name)
+        _publisher_queue.remove(self._name)
         _logger.info("Publisher thread %s stops" % self._name)
 
     def last_action(self):
@@ -183,14 +243,43 @@ class ExternalPublisher(Publisher):
 
     def __init__(self, opts):
         super().__init__(opts)
+        filters = self._filter_set(opts)
+        if filters is not None:
+            self._filters = filters
+            self._filter_select = True
+
+    def _filter_set(self, opts):
         filter_names = opts.getlist('filters', str)
         if filter_names is not None and len(filter_names) > 0:
             _logger.info("Publisher:%s filter set:%s" % (self.object_name(), filter_names))
             try:
-                self._filters = FilterSet(filter_names)
-                self._filter_select = True
+                return FilterSet(filter_names)
             except ValueError:
                 _logger.error(f"Publisher {self.object_name()} Invalid filter set")
+        return None
+
+    def update_filters(self, opts):
+        """
+        Rebuild the filter set from new options (configuration reload) and swap it on the running publisher
+        raise ValueError if a filter is not defined or the set is not valid, the current filters are then kept
+        """
+        filter_names = opts.getlist('filters', str, [])
+        for filter_name in filter_names:
+            try:
+                resolve_ref(filter_name)
+            except KeyError:
+                raise ValueError(f"Publisher {self.object_name()} filter {filter_name} not defined")
+        filters = None
+        if len(filter_names) > 0:
+            try:
+                filters = FilterSet(filter_names)
+            except ValueError:
+                raise ValueError(f"Publisher {self.object_name()} invalid filter set {filter_names}")
+        self._opts = opts
+        self.set_filters(filters, self._filter_selection(opts, filters))
+
+    def _filter_selection(self, opts, filters) -> bool:
+        return filters is not None
 
 
 class Injector(ExternalPublisher):
@@ -214,6 +303,11 @@ class Injector(ExternalPublisher):
     def refresh_target(self, target):
         self._target_coupler = target
 
+    def coupler_replaced(self, coupler):
+        super().coupler_replaced(coupler)
+        if coupler.object_name() == self._target_coupler.object_name():
+            self.refresh_target(coupler)
+
 
 class PrintPublisher(ExternalPublisher):
 
@@ -244,3 +338,70 @@ class PullPublisher(Publisher):
             return self._wait_queue.get(timeout=timeout)
         except queue.Empty:
             return None
+
+
+class AsyncPullPublisher(Publisher):
+    """
+    Pull publisher for a coroutine reader (grpc.aio server)
+    There is no publisher thread, the coupler threads hand over the messages and wake up the reader through
+    its event loop only when it is waiting. After max_lost consecutive losses, the publisher is removed by the
+    coupler and pull_msg raises PublisherOverflow
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, couplers=None, name=None):
+        super().__init__(None, internal=True, couplers=couplers, name=name)
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._event = asyncio.Event()
+        self._waiting = False
+        self._overflow = False
+        _publisher_queue.labels(self._name).set_function(lambda: len(self._pending))
+
+    def start(self):
+        _logger.debug("Publisher %s (async) start" % self._name)
+        for inst in self._couplers.values():
+            inst.register(self)
+
+    def publish(self, msg):
+        filters, filter_select = self._filter_conf
+        if filters is not None and filters.process_filter(msg, select_filter=filter_select):
+            return
+        with self._lock:
+            if len(self._pending) >= self._queue_size:
+                self._nb_msg_lost += 1
+                self._lost_metric.inc()
+                self._overflow = self._nb_msg_lost >= self._max_lost
+            else:
+                self._pending.append(msg)
+                self._nb_msg_lost = 0
+            wake = self._waiting
+            self._waiting = False
+        if wake:
+            try:
+                self._loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                # event loop closed, the server is stopping
+                pass
+        if self._overflow:
+            _logger.warning("Overflow on connection %s total message lost %d" % (self._name, self._nb_msg_lost))
+            raise PublisherOverflow
+
+    async def pull_msg(self):
+        while True:
+            with self._lock:
+                if self._overflow:
+                    raise PublisherOverflow
+                if len(self._pending) > 0:
+                    msg = self._pending.popleft()
+                    break
+                self._event.clear()
+                self._waiting = True
+            await self._event.wait()
+        self._queue_latency.record_since(msg.stamp)
+        return msg
+
+    def stop(self):
+        super().stop()
+        _publisher_lost.remove(self._name)
+        _publisher_queue.remove(self._name)
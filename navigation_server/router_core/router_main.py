@@ -10,6 +10,7 @@
 #-------------------------------------------------------------------------------
 
 import logging
+import signal
 import threading
 import datetime
 
@@ -17,6 +18,8 @@ from navigation_server.router_common import MessageServerGlobals, test_exec_hook
 # from navigation_server.router_common import NavigationConfiguration
 from .console import Console
 from .publisher import Publisher
+from .configuration_reload import ConfigurationReloader
+from .source_arbitration import SourceArbitration, ArbitrationConfigurationError
 
 _logger = logging.getLogger("ShipDataServer." + __name__)
 
@@ -37,10 +40,22 @@ class NavigationMainServer(GenericTopServer):
         self._stop_in_progress = False
 
         self._stop_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        # redundant sources arbitration, must be configured before the couplers are created
+        arbitration_conf = MessageServerGlobals.configuration.get_option('source_arbitration', None)
+        if arbitration_conf is not None:
+            try:
+                SourceArbitration.configure(arbitration_conf)
+            except (ArbitrationConfigurationError, ValueError, TypeError) as err:
+                _logger.error(f"source_arbitration parameter error: {err} => no arbitration")
+                SourceArbitration.reset()
 
     def couplers(self):
         return self._couplers.values()
 
+    def publishers(self):
+        return list(self._publishers)
+
     @property
     def console_present(self) -> bool:
         return self._console is not None
@@ -119,10 +134,68 @@ class NavigationMainServer(GenericTopServer):
         if self._is_running:
             coupler.request_start()
 
+    def remove_coupler(self, name: str):
+        """
+        Stop the coupler and remove all references from the servers and console
+        return the coupler or None if not found
+        """
+        try:
+            coupler = self._couplers.pop(name)
+        except KeyError:
+            return None
+        for server in self._servers:
+            server.remove_coupler(coupler)
+        if self.console_present:
+            self._console.remove_coupler(name)
+        if coupler.is_alive():
+            coupler.stop()
+        coupler.remove_metrics()
+        return coupler
+
     def add_publisher(self, publisher: Publisher):
         self._publishers.append(publisher)
         # publisher.start()
 
+    def remove_publisher(self, name: str):
+        """
+        Stop the publisher and remove it from the list
+        return the publisher or None if not found
+        """
+        for publisher in self._publishers:
+            if publisher.object_name() == name:
+                self._publishers.remove(publisher)
+                if publisher.is_alive():
+                    publisher.stop()
+                return publisher
+        return None
+
+    def reload_configuration(self, settings_file: str = None) -> list:
+        """
+        Apply the modifications of the settings file on the running server
+        return the list of ReloadResult
+        raise ConfigurationException if the settings file cannot be used
+        """
+        if self._stop_in_progress:
+            _logger.warning("Configuration reload requested during stop => ignored")
+            return []
+        with self._reload_lock:
+            return ConfigurationReloader(self, MessageServerGlobals.configuration).reload(settings_file)
+
+    def install_reload_handler(self):
+        # signal.signal can only be called from the main thread, so not from __init__
+        signal.signal(signal.SIGHUP, self.reload_handler)
+
+    def reload_handler(self, signum, frame):
+        _logger.info("SIGHUP received => reloading the configuration")
+        # signal handlers run in the main thread that is blocked in wait
+        threading.Thread(target=self._reload_from_signal, name="ConfigurationReload", daemon=True).start()
+
+    def _reload_from_signal(self):
+        try:
+            self.reload_configuration()
+        except Exception as err:
+            _logger.error(f"Configuration reload error: {err}")
+
     def add_service(self, service):
         if type(service) is Console:
             if self._console is not None:
@@ -0,0 +1,408 @@
+#-------------------------------------------------------------------------------
+# Name:        source_arbitration
+# Purpose:     Arbitration between redundant data sources and duplicate suppression across couplers
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#  implementation notes
+#   The arbitration is defined by the global parameter source_arbitration:
+#       source_arbitration:
+#           duplicate_window: 0.2       # seconds, 0 to disable the duplicate suppression
+#           couplers: [CAN, YDGateway]  # couplers where the duplicates are suppressed (in addition to groups ones)
+#           groups:
+#               - name: position
+#                 pgn: [129025, 129029]
+#                 formatters: [GGA, RMC, GLL]
+#                 sources: [CAN:5, YDGateway, GNSS:GP]   # priority order, coupler[:sa|talker]
+#                 timeout: 2.0          # source lost when silent
+#                 min_rate: 0.0         # messages per second, 0 to disable
+#                 hold: 10.0            # time a better source must be healthy before going back to it
+#                 fix_quality: true     # GNSS fix quality is part of the source health
+#   A source is a coupler and a source address (NMEA2000) or a talker (NMEA0183). The sources that are not listed
+#   get the lowest priority in the order they are discovered.
+#   Each coupler asks for its point at creation (same principle as the fault injection), None is returned when the
+#   coupler does not participate in the arbitration so the cost is one test on the coupler thread.
+#   The messages of a group are only published from the primary source of the group. The primary is kept while it
+#   is healthy, the health of the primary is checked when a message from another source arrives, so there is no
+#   timer and no cost for the groups without traffic.
+#   A duplicate is an identical message (same NMEA2000 PGN and payload or same NMEA0183 sentence) coming from
+#   another source within the window. The same message repeated by the same source is not a duplicate.
+#   The messages of the groups are not checked for duplicates, only the primary source is published.
+
+import logging
+import threading
+import time
+from collections import deque
+
+from navigation_server.router_common import N2K_MSG, N0183_MSG, MetricsRegistry
+from .nmea0183_msg import NMEA0183Index
+
+_logger = logging.getLogger("ShipDataServer." + __name__)
+
+_arbitration_dropped = MetricsRegistry.counter('navigation_arbitration_dropped',
+                                               'Messages not published by the source arbitration', ('group', 'reason'))
+_arbitration_failovers = MetricsRegistry.counter('navigation_arbitration_failovers',
+                                                 'Primary source changes in the arbitration groups', ('group',))
+
+
+class ArbitrationConfigurationError(Exception):
+    pass
+
+
+class ArbitrationSource:
+
+    __slots__ = ('name', 'coupler', 'qualifier', 'priority', 'last_seen', 'interval', 'nb_msg', 'quality_ok',
+                 'healthy_since')
+
+    def __init__(self, name: str, coupler: str, qualifier, priority: int):
+        self.name = name
+        self.coupler = coupler
+        self.qualifier = qualifier
+        self.priority = priority
+        self.last_seen = 0.
+        # exponential average of the interval between messages
+        self.interval = 0.
+        self.nb_msg = 0
+        self.quality_ok = True
+        self.healthy_since = None
+
+    def update(self, now: float, quality_ok: bool):
+        if self.nb_msg > 0:
+            interval = now - self.last_seen
+            self.interval = interval if self.nb_msg == 1 else 0.8 * self.interval + 0.2 * interval
+        self.nb_msg += 1
+        self.last_seen = now
+        self.quality_ok = quality_ok
+
+    def rate(self) -> float:
+        return 1. / self.interval if self.interval > 0. else 0.
+
+
+class ArbitrationEvent:
+
+    __slots__ = ('timestamp', 'group', 'previous', 'primary', 'reason')
+
+    def __init__(self, group: str, previous: str, primary: str, reason: str):
+        self.timestamp = time.time()
+        self.group = group
+        self.previous = previous
+        self.primary = primary
+        self.reason = reason
+
+    def __str__(self):
+        return "Arbitration group %s primary %s -> %s (%s)" % (self.group, self.previous, self.primary, self.reason)
+
+
+def _gnss_quality_n2k(msg) -> bool:
+    # PGN 129029: method (high nibble of byte 31), 0 no GNSS, 15 not available
+    payload = msg.msg.payload
+    if msg.msg.pgn != 129029 or len(payload) < 32:
+        return True
+    return 0 < payload[31] >> 4 < 15
+
+
+def _gnss_quality_0183(msg) -> bool:
+    formatter = msg.formatter()
+    try:
+        if formatter == b'GGA':
+            return msg.fields()[5] not in (b'0', b'')
+        elif formatter == b'RMC':
+            return msg.fields()[1] == b'A'
+        elif formatter == b'GLL':
+            return msg.fields()[5] == b'A'
+    except IndexError:
+        return False
+    return True
+
+
+class ArbitrationGroup:
+    """
+    A set of equivalent messages (PGN and NMEA0183 formatters) coming from several sources
+    """
+
+    def __init__(self, conf: dict, events: deque):
+        try:
+            self._name = conf['name']
+        except KeyError:
+            raise ArbitrationConfigurationError("Arbitration group without name")
+        self._pgns = set(int(pgn) for pgn in conf.get('pgn', []))
+        self._formatters = [f.encode() if type(f) is str else f for f in conf.get('formatters', [])]
+        if len(self._pgns) == 0 and len(self._formatters) == 0:
+            raise ArbitrationConfigurationError(f"Arbitration group {self._name} without PGN nor formatters")
+        self._priorities = {}
+        self._couplers = set()
+        for priority, source in enumerate(conf.get('sources', [])):
+            coupler, sep, qualifier = str(source).partition(':')
+            if len(sep) == 0:
+                qualifier = None
+            elif qualifier.isdigit():
+                # NMEA2000 source address
+                qualifier = int(qualifier)
+            self._priorities[(coupler, qualifier)] = priority
+            self._couplers.add(coupler)
+        self._next_priority = 1000
+        self._timeout = float(conf.get('timeout', 2.0))
+        self._min_rate = float(conf.get('min_rate', 0.))
+        self._hold = float(conf.get('hold', 10.))
+        self._fix_quality = bool(conf.get('fix_quality', True))
+        self._sources = {}
+        self._primary = None
+        self._lock = threading.Lock()
+        self._events = events
+        self.nb_failovers = 0
+        self.nb_dropped = 0
+        self._dropped_metric = _arbitration_dropped.labels(self._name, 'secondary')
+        self._failover_metric = _arbitration_failovers.labels(self._name)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def pgns(self) -> set:
+        return self._pgns
+
+    @property
+    def formatters(self) -> list:
+        return self._formatters
+
+    @property
+    def couplers(self) -> set:
+        return self._couplers
+
+    @property
+    def primary(self) -> ArbitrationSource:
+        return self._primary
+
+    def sources(self) -> list:
+        with self._lock:
+            return sorted(self._sources.values(), key=lambda s: s.priority)
+
+    def status(self, now: float = None) -> list:
+        """
+        return the list of (source, healthy) in priority order
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            return [(source, self._healthy(source, now)) for source in
+                    sorted(self._sources.values(), key=lambda s: s.priority)]
+
+    def _get_source(self, coupler: str, qualifier) -> ArbitrationSource:
+        priority = self._priorities.get((coupler, qualifier))
+        if priority is None:
+            priority = self._priorities.get((coupler, None))
+            if priority is None:
+                priority = self._next_priority
+                self._next_priority += 1
+        if qualifier is None:
+            name = coupler
+        else:
+            name = f"{coupler}:{qualifier}"
+        source = ArbitrationSource(name, coupler, qualifier, priority)
+        self._sources[(coupler, qualifier)] = source
+        _logger.info("Arbitration group %s new source %s priority %d" % (self._name, name, priority))
+        return source
+
+    def _healthy(self, source: ArbitrationSource, now: float) -> bool:
+        if now - source.last_seen > self._timeout or not source.quality_ok:
+            return False
+        return self._min_rate <= 0. or source.nb_msg < 2 or source.rate() >= self._min_rate
+
+    def _switch(self, source: ArbitrationSource, reason: str):
+        previous = self._primary.name if self._primary is not None else None
+        self._primary = source
+        if previous is not None:
+            self.nb_failovers += 1
+            self._failover_metric.inc()
+        event = ArbitrationEvent(self._name, previous, source.name if source is not None else None, reason)
+        self._events.append(event)
+        _logger.info(str(event))
+
+    def _select(self, now: float, reason: str):
+        best = None
+        for source in self._sources.values():
+            if self._healthy(source, now) and (best is None or source.priority < best.priority):
+                best = source
+        if best is not self._primary:
+            self._switch(best, reason)
+
+    def accept(self, coupler: str, qualifier, msg, now: float) -> bool:
+        """
+        Update the state of the source and return True if the message is from the primary source
+        """
+        if self._fix_quality:
+            quality_ok = _gnss_quality_n2k(msg) if msg.type == N2K_MSG else _gnss_quality_0183(msg)
+        else:
+            quality_ok = True
+        with self._lock:
+            source = self._sources.get((coupler, qualifier))
+            if source is None:
+                source = self._get_source(coupler, qualifier)
+            if now - source.last_seen > self._timeout:
+                # the source was lost, the hold time restarts
+                source.healthy_since = None
+            source.update(now, quality_ok)
+            if self._healthy(source, now):
+                if source.healthy_since is None:
+                    source.healthy_since = now
+            else:
+                source.healthy_since = None
+            primary = self._primary
+            if source is primary:
+                if not quality_ok:
+                    self._select(now, f"{source.name} fix quality")
+            elif primary is None:
+                self._select(now, "initial selection")
+            elif not self._healthy(primary, now):
+                self._select(now, f"{primary.name} unhealthy")
+            elif source.priority < primary.priority and source.healthy_since is not None and \
+                    now - source.healthy_since >= self._hold:
+                self._switch(source, f"{source.name} back")
+            if source is self._primary:
+                return True
+            self.nb_dropped += 1
+        self._dropped_metric.inc()
+        return False
+
+
+class DuplicateFilter:
+    """
+    Suppression of the identical messages received from different sources within a time window
+    """
+
+    def __init__(self, window: float):
+        self._window = window
+        self._seen = {}
+        self._expiry = deque()
+        self._lock = threading.Lock()
+        self.nb_duplicates = 0
+        self._metric = _arbitration_dropped.labels('', 'duplicate')
+
+    @property
+    def window(self) -> float:
+        return self._window
+
+    def duplicate(self, key, source, now: float) -> bool:
+        with self._lock:
+            expiry = self._expiry
+            limit = now - self._window
+            while len(expiry) > 0 and expiry[0][0] < limit:
+                ts, old_key = expiry.popleft()
+                entry = self._seen.get(old_key)
+                if entry is not None and entry[1] == ts:
+                    del self._seen[old_key]
+            entry = self._seen.get(key)
+            if entry is not None and entry[0] != source and entry[1] >= limit:
+                self.nb_duplicates += 1
+                self._metric.inc()
+                return True
+            self._seen[key] = (source, now)
+            expiry.append((now, key))
+        return False
+
+
+class ArbitrationPoint:
+    """
+    The arbitration as seen by a coupler
+    """
+
+    def __init__(self, coupler: str, n2k_groups: dict, n0183_groups: dict, duplicates: DuplicateFilter):
+        self._coupler = coupler
+        self._n2k_groups = n2k_groups
+        self._n0183_groups = n0183_groups
+        self._duplicates = duplicates
+
+    def accept(self, msg, now: float = None) -> bool:
+        """
+        return False if the message shall not be published
+        """
+        if now is None:
+            now = time.monotonic()
+        if msg.type == N2K_MSG:
+            n2k = msg.msg
+            group = self._n2k_groups.get(n2k.pgn)
+            if group is not None:
+                return group.accept(self._coupler, n2k.sa, msg, now)
+            if self._duplicates is not None:
+                return not self._duplicates.duplicate((n2k.pgn, bytes(n2k.payload)), (self._coupler, n2k.sa), now)
+        elif msg.type == N0183_MSG:
+            group = self._n0183_groups.get(msg.formatter_code)
+            if group is not None:
+                return group.accept(self._coupler, msg.talker().decode(), msg, now)
+            if self._duplicates is not None:
+                return not self._duplicates.duplicate(bytes(msg.raw), (self._coupler, msg.talker_code), now)
+        return True
+
+
+class SourceArbitration:
+    """
+    Registry of the arbitration groups (global parameter source_arbitration)
+    """
+
+    _groups = []
+    _duplicates = None
+    _dedup_couplers = set()
+    _events = deque(maxlen=64)
+
+    @classmethod
+    def configure(cls, conf: dict):
+        cls.reset()
+        if type(conf) is not dict:
+            raise ArbitrationConfigurationError("source_arbitration shall be a dictionary")
+        groups = [ArbitrationGroup(group_conf, cls._events) for group_conf in conf.get('groups', [])]
+        window = float(conf.get('duplicate_window', 0.))
+        cls._groups = groups
+        cls._duplicates = DuplicateFilter(window) if window > 0. else None
+        cls._dedup_couplers = set(conf.get('couplers', []))
+        for group in groups:
+            cls._dedup_couplers |= group.couplers
+        _logger.info("Source arbitration: %d groups, duplicate window %.3f" % (len(groups), window))
+
+    @classmethod
+    def reset(cls):
+        cls._groups = []
+        cls._duplicates = None
+        cls._dedup_couplers = set()
+        cls._events = deque(maxlen=64)
+
+    @classmethod
+    def point(cls, coupler: str):
+        """
+        return the ArbitrationPoint for the coupler, None if the coupler is not part of the arbitration
+        a group without sources applies to all couplers
+        """
+        n2k_groups = {}
+        n0183_groups = {}
+        for group in cls._groups:
+            if len(group.couplers) > 0 and coupler not in group.couplers:
+                continue
+            for pgn in group.pgns:
+                n2k_groups[pgn] = group
+            for formatter in group.formatters:
+                n0183_groups[NMEA0183Index.formatter_code(formatter)] = group
+        duplicates = cls._duplicates if coupler in cls._dedup_couplers else None
+        if len(n2k_groups) == 0 and len(n0183_groups) == 0 and duplicates is None:
+            return None
+        return ArbitrationPoint(coupler, n2k_groups, n0183_groups, duplicates)
+
+    @classmethod
+    def groups(cls) -> list:
+        return cls._groups
+
+    @classmethod
+    def events(cls) -> list:
+        return list(cls._events)
+
+    @classmethod
+    def clear_events(cls):
+        cls._events.clear()
+
+    @classmethod
+    def duplicates(cls) -> DuplicateFilter:
+        return cls._duplicates
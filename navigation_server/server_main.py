@@ -63,6 +63,7 @@ def server_main():
 
     assert MessageServerGlobals.main_server is not None
     assert GrpcServer.grpc_server_global is not None
+    config.main_server.install_reload_handler()
     _logger.debug("Starting the main server")
     if config.main_server.start():
         # register the process in agent service if needed
@@ -0,0 +1,332 @@
+#-------------------------------------------------------------------------------
+# Name:        ais_tracker_benchmark
+# Purpose:     Check the AIS decoding and target tracking and measure the cost of a report
+#              for a growing number of targets
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   A harbour is simulated with N targets around own ship (class A and B), the VDM sentences are generated with the
+#   static reports on 2 fragments (message 5) and the checks are:
+#   - decoding of the generated VDM sentences and NMEA2000 PGN against the generated values
+#   - fragment reassembly with interleaved and missing fragments
+#   - CPA/TCPA on known geometries
+#   - ageing and change listener coalescing
+#   Then the time per report (NMEA0183Msg creation, reassembly, decoding and merge in the table) is measured for
+#   increasing numbers of targets, it shall not grow with the size of the table.
+
+import gc
+import math
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+from navigation_server.router_core import NMEA0183Msg, NMEA0183Sentences
+from navigation_server.nmea2000 import get_n2k_decoded_object
+from navigation_server.generated.nmea2000_classes_gen import Pgn129038Class, Pgn129794Class
+from navigation_server.generated.ais_pb2 import (AIS_CLASS_A, AIS_CLASS_B, TARGET_NEW, TARGET_POSITION, TARGET_LOST,
+                                                 ais_target)
+from navigation_server.ais import (AISFragmentAssembler, AISTargetTable, AISChangeListener, AISPositionReport,
+                                   decode_ais_payload, n2k_ais_reports)
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-n', '--targets', action='store', type=int, default=5000, help='Maximum number of targets')
+    p.add_argument('-u', '--updates', action='store', type=int, default=20000, help='Number of reports per run')
+    p.add_argument('-r', '--runs', action='store', type=int, default=3, help='Number of runs, the best one is kept')
+    p.add_argument('-s', '--seed', action='store', type=int, default=41, help='Random seed')
+    return p
+
+
+KNOT = 1852. / 3600.
+NAN = float('nan')
+OWN_LAT = 47.5
+OWN_LON = -3.1
+_sixbit = "@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_ !\"#$%&'()*+,-./0123456789:;<=>?"
+
+
+def armor(fields: list) -> tuple:
+    """
+    fields: list of (value, nb_bits), return the armored payload and the fill bits
+    """
+    value = 0
+    nb_bits = 0
+    for v, bits in fields:
+        value = (value << bits) | (v & ((1 << bits) - 1))
+        nb_bits += bits
+    fill = (6 - nb_bits % 6) % 6
+    value <<= fill
+    chars = []
+    for shift in range(nb_bits + fill - 6, -1, -6):
+        c = (value >> shift) & 0x3F
+        chars.append(chr(c + 48 if c < 40 else c + 56))
+    return ''.join(chars), fill
+
+
+def text_field(text: str, nb_chars: int) -> list:
+    text = text.ljust(nb_chars, '@')
+    return [(_sixbit.index(c), 6) for c in text]
+
+
+def sentence(body: str) -> bytes:
+    return ("%s*%02X\r\n" % (body, NMEA0183Sentences.b_checksum(body[1:].encode()))).encode()
+
+
+def vdm(payload: str, fill: int, seq_id: int = 0, fragment_size: int = 60) -> list:
+    parts = [payload[i:i + fragment_size] for i in range(0, len(payload), fragment_size)]
+    result = []
+    seq = str(seq_id) if len(parts) > 1 else ''
+    for num, part in enumerate(parts, 1):
+        result.append(sentence("!AIVDM,%d,%d,%s,A,%s,%d" % (len(parts), num, seq, part,
+                                                             fill if num == len(parts) else 0)))
+    return result
+
+
+class SimTarget:
+
+    def __init__(self, mmsi: int, rng: random.Random):
+        self.mmsi = mmsi
+        self.ais_class = AIS_CLASS_A if rng.random() < 0.6 else AIS_CLASS_B
+        distance = rng.uniform(100., 20000.)
+        angle = rng.uniform(0., 2 * math.pi)
+        self.latitude = round(OWN_LAT + distance * math.cos(angle) / 111120., 5)
+        self.longitude = round(OWN_LON + distance * math.sin(angle) / (111120. * math.cos(math.radians(OWN_LAT))), 5)
+        self.sog = round(rng.uniform(0., 20.), 1)
+        self.cog = round(rng.uniform(0., 359.9), 1)
+        self.heading = int(self.cog)
+        self.name = "SHIP %d" % mmsi
+        self.callsign = "F%05d" % (mmsi % 100000)
+        self.ship_type = rng.choice((30, 36, 37, 52, 60, 70, 80))
+        self.length = rng.randint(5, 300)
+        self.beam = rng.randint(2, 40)
+
+    def position_payload(self) -> tuple:
+        lon = round(self.longitude * 600000)
+        lat = round(self.latitude * 600000)
+        sog = round(self.sog * 10)
+        cog = round(self.cog * 10)
+        if self.ais_class == AIS_CLASS_A:
+            return armor([(1, 6), (0, 2), (self.mmsi, 30), (0, 4), (0, 8), (sog, 10), (1, 1), (lon, 28), (lat, 27),
+                          (cog, 12), (self.heading, 9), (30, 6), (0, 4), (0, 1), (0, 1), (0, 19)])
+        return armor([(18, 6), (0, 2), (self.mmsi, 30), (0, 8), (sog, 10), (1, 1), (lon, 28), (lat, 27), (cog, 12),
+                      (self.heading, 9), (30, 6), (0, 2), (1, 1), (0, 1), (1, 1), (0, 1), (0, 1), (0, 1), (0, 20)])
+
+    def static_payload(self) -> tuple:
+        bow = self.length // 2
+        port = self.beam // 2
+        if self.ais_class == AIS_CLASS_A:
+            fields = [(5, 6), (0, 2), (self.mmsi, 30), (0, 2), (9000000 + self.mmsi % 100000, 30)]
+            fields += text_field(self.callsign, 7) + text_field(self.name, 20)
+            fields += [(self.ship_type, 8), (bow, 9), (self.length - bow, 9), (port, 6), (self.beam - port, 6),
+                       (1, 4), (10, 4), (18, 5), (12, 5), (30, 6), (45, 8)]
+            fields += text_field("LORIENT", 20) + [(0, 1), (0, 1)]
+            return armor(fields)
+        # message 24 part A only, part B is sent separately
+        return armor([(24, 6), (0, 2), (self.mmsi, 30), (0, 2)] + text_field(self.name, 20))
+
+    def move(self, dt: float):
+        v = self.sog * KNOT * dt
+        self.latitude += v * math.cos(math.radians(self.cog)) / 111120.
+        self.longitude += v * math.sin(math.radians(self.cog)) / (111120. * math.cos(math.radians(OWN_LAT)))
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+def n2k_object(pgn_class, **values):
+    obj = pgn_class()
+    for attr in obj.__slots__:
+        setattr(obj, attr, '' if attr in ('_callsign', '_ship_name', '_destination') else 0)
+    for attr, value in values.items():
+        setattr(obj, attr, value)
+    return obj
+
+
+def check_decoding(targets: list) -> bool:
+    ok = True
+    assembler = AISFragmentAssembler()
+    for seq, t in enumerate(targets[:200]):
+        payload, fill = t.position_payload()
+        reports = []
+        for s in vdm(payload, fill):
+            message = assembler.add(NMEA0183Msg(s))
+            if message is not None:
+                reports.extend(decode_ais_payload(message[0], message[1]))
+        payload, fill = t.static_payload()
+        for s in vdm(payload, fill, seq % 10):
+            message = assembler.add(NMEA0183Msg(s))
+            if message is not None:
+                reports.extend(decode_ais_payload(message[0], message[1]))
+        if not check(len(reports) == 2, f"MMSI {t.mmsi} reports {len(reports)}"):
+            ok = False
+            continue
+        p, s = reports
+        ok &= check(p.mmsi == t.mmsi and p.ais_class == t.ais_class, f"MMSI {t.mmsi} position report identity")
+        ok &= check(abs(p.latitude - t.latitude) < 1e-5 and abs(p.longitude - t.longitude) < 1e-5,
+                    f"MMSI {t.mmsi} position {p.latitude} {p.longitude}")
+        ok &= check(abs(p.sog - t.sog * KNOT) < 1e-3 and abs(math.degrees(p.cog) - t.cog) < 1e-3,
+                    f"MMSI {t.mmsi} SOG/COG")
+        ok &= check(s.name == t.name, f"MMSI {t.mmsi} name {s.name}")
+        if t.ais_class == AIS_CLASS_A:
+            ok &= check(s.callsign == t.callsign and s.ship_type == t.ship_type and s.length == t.length
+                        and s.beam == t.beam and s.destination == "LORIENT" and abs(s.draft - 4.5) < 1e-6,
+                        f"MMSI {t.mmsi} static data")
+    # interleaved fragments of 2 messages, one fragment missing
+    class_a = [t for t in targets if t.ais_class == AIS_CLASS_A]
+    a = vdm(*class_a[0].static_payload(), 1, 30)
+    b = vdm(*class_a[1].static_payload(), 2, 30)
+    assembler = AISFragmentAssembler()
+    complete = 0
+    for s in [a[0], b[0], a[1], a[2], b[2]]:
+        if assembler.add(NMEA0183Msg(s)) is not None:
+            complete += 1
+    ok &= check(complete == 1 and assembler.fragment_errors == 1, "interleaved fragments")
+    # NMEA2000
+    t = targets[0]
+    n2k = n2k_object(Pgn129038Class, mmsi=t.mmsi, latitude=t.latitude, longitude=t.longitude, SOG=t.sog * KNOT,
+                     COG=math.radians(t.cog), heading=math.radians(t.heading))
+    reports = n2k_ais_reports(get_n2k_decoded_object(n2k.message()))
+    ok &= check(len(reports) == 1 and reports[0].mmsi == t.mmsi and abs(reports[0].latitude - t.latitude) < 1e-6,
+                "NMEA2000 129038")
+    n2k = n2k_object(Pgn129794Class, mmsi=t.mmsi, ship_name=t.name, callsign=t.callsign, destination="LORIENT",
+                     length=float(t.length), beam=float(t.beam))
+    reports = n2k_ais_reports(get_n2k_decoded_object(n2k.message()))
+    ok &= check(len(reports) == 1 and reports[0].name == t.name and reports[0].callsign == t.callsign
+                and reports[0].length == t.length, "NMEA2000 129794")
+    return ok
+
+
+def check_tracking() -> bool:
+    ok = True
+    table = AISTargetTable(target_timeout=60.)
+    table.set_own_position(OWN_LAT, OWN_LON, 0.)
+    table.set_own_velocity(10. * KNOT, 0.)
+    scale = 111120. * math.cos(math.radians(OWN_LAT))
+    # head on, 1 NM ahead at 10 knots => CPA 0 after 180s
+    table.update(AISPositionReport(1, AIS_CLASS_A, OWN_LAT + 1852. / 111120., OWN_LON, 10. * KNOT, math.pi, NAN), 0.)
+    # 1 NM on the beam, same course and speed
+    table.update(AISPositionReport(2, AIS_CLASS_B, OWN_LAT, OWN_LON + 1852. / scale, 10. * KNOT, 0., NAN), 0.)
+    # moving away
+    table.update(AISPositionReport(3, AIS_CLASS_A, OWN_LAT - 1852. / 111120., OWN_LON, 5. * KNOT, math.pi, NAN), 0.)
+    t1 = table.target(1)
+    ok &= check(abs(t1.range - 1852.) < 1. and abs(t1.cpa) < 1. and abs(t1.tcpa - 180.) < 0.5,
+                f"head on CPA {t1.cpa} TCPA {t1.tcpa}")
+    t2 = table.target(2)
+    ok &= check(abs(t2.cpa - 1852.) < 1. and t2.tcpa == 0. and abs(math.degrees(t2.bearing) - 90.) < 0.1,
+                f"parallel CPA {t2.cpa} TCPA {t2.tcpa}")
+    t3 = table.target(3)
+    ok &= check(t3.tcpa < 0. and abs(t3.cpa - t3.range) < 1e-6, f"diverging CPA {t3.cpa} TCPA {t3.tcpa}")
+    # own ship stops: values are refreshed on read
+    table.set_own_velocity(0., 0.)
+    t1 = table.target(1)
+    ok &= check(abs(t1.tcpa - 360.) < 0.5, f"refresh after own ship change TCPA {t1.tcpa}")
+    pb = ais_target()
+    t1.as_protobuf(pb)
+    ok &= check(pb.mmsi == 1 and abs(pb.tcpa - t1.tcpa) < 0.01, "protobuf conversion")
+    # change listener
+    listener = AISChangeListener()
+    table.add_listener(listener)
+    table.update(AISPositionReport(4, AIS_CLASS_A, OWN_LAT, OWN_LON, 0., 0., NAN), 30.)
+    table.update(AISPositionReport(4, AIS_CLASS_A, OWN_LAT, OWN_LON, 0., 0., NAN), 31.)
+    table.update(AISPositionReport(1, AIS_CLASS_A, OWN_LAT, OWN_LON, 0., 0., NAN), 32.)
+    table.update(AISPositionReport(1, AIS_CLASS_A, OWN_LAT, OWN_LON, 0., 0., NAN), 33.)
+    changes = dict(listener.get_changes(0.))
+    ok &= check(changes == {4: TARGET_NEW, 1: TARGET_POSITION}, f"coalesced changes {changes}")
+    # ageing: targets 2 and 3 have been updated at 0
+    lost = table.age_out(61.)
+    ok &= check(sorted(lost) == [2, 3] and len(table) == 2, f"ageing {lost}")
+    changes = dict(listener.get_changes(0.))
+    ok &= check(changes == {2: TARGET_LOST, 3: TARGET_LOST}, f"lost changes {changes}")
+    table.remove_listener(listener)
+    return ok
+
+
+def build_traffic(targets: list, nb_updates: int, rng: random.Random) -> list:
+    """
+    list of sentences, position reports of random targets, a static report for 10% of them
+    """
+    sentences = []
+    seq = 0
+    while len(sentences) < nb_updates:
+        t = rng.choice(targets)
+        t.move(10.)
+        payload, fill = t.position_payload()
+        sentences.extend(vdm(payload, fill))
+        if rng.random() < 0.1:
+            payload, fill = t.static_payload()
+            sentences.extend(vdm(payload, fill, seq))
+            seq = (seq + 1) % 10
+    return sentences
+
+
+def run(table: AISTargetTable, sentences: list) -> float:
+    assembler = AISFragmentAssembler()
+    gc.disable()
+    start = time.perf_counter()
+    for s in sentences:
+        msg = NMEA0183Msg(s)
+        message = assembler.add(msg)
+        if message is not None:
+            for report in decode_ais_payload(message[0], message[1]):
+                table.update(report, 0.)
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return elapsed
+
+
+def main():
+    opts = _parser().parse_args()
+    rng = random.Random(opts.seed)
+    targets = [SimTarget(227000000 + i, rng) for i in range(opts.targets)]
+    ok = check_decoding(targets)
+    ok &= check_tracking()
+    print("Reports per target count (NMEA0183Msg + reassembly + decoding + table update)")
+    results = []
+    counts = [100]
+    while counts[-1] * 4 < opts.targets:
+        counts.append(counts[-1] * 4)
+    if opts.targets > 100:
+        counts.append(opts.targets)
+    for count in counts:
+        subset = targets[:count]
+        table = AISTargetTable()
+        table.set_own_position(OWN_LAT, OWN_LON, 0.)
+        table.set_own_velocity(6. * KNOT, 1.)
+        # fill the table first, then measure
+        run(table, [s for t in subset for s in vdm(*t.position_payload())])
+        sentences = build_traffic(subset, opts.updates, rng)
+        best = min(run(table, sentences) for _ in range(opts.runs))
+        listener = AISChangeListener()
+        table.add_listener(listener)
+        best_listener = min(run(table, sentences) for _ in range(opts.runs))
+        table.remove_listener(listener)
+        snapshot_start = time.perf_counter()
+        table.set_own_velocity(6. * KNOT, 1.2)
+        snapshot = table.snapshot()
+        snapshot_time = time.perf_counter() - snapshot_start
+        ok &= check(len(table) == count and len(snapshot) == count, f"table size {len(table)} for {count} targets")
+        per_sentence = best / len(sentences) * 1e6
+        results.append(per_sentence)
+        print(f"targets {count:6d} sentences {len(sentences):6d} {per_sentence:7.1f}us/sentence "
+              f"with listener {best_listener / len(sentences) * 1e6:7.1f}us/sentence "
+              f"snapshot with CPA refresh {snapshot_time * 1e3:7.2f}ms")
+    if len(results) > 1:
+        growth = results[-1] / results[0]
+        print(f"cost per report with {opts.targets} targets / 100 targets: {growth:.2f}")
+    if ok:
+        print("AIS tracker check OK")
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+#-------------------------------------------------------------------------------
+# Name:        at_engine_test
+# Purpose:     Check the AT command engine and the modem URC handling against a scripted modem
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   ScriptedModem replaces the serial port: each command line written is looked up in a script giving the
+#   response (lines, final result code and delay), unsolicited result codes can be pushed at any time.
+#   The checks cover the correlation of the responses, URC interleaved with responses, timeouts and recovery,
+#   late results, the SMS prompt, +CME errors, concurrent submissions and the Quectel modem events
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from navigation_server.network import ATEngine, ATCommand, QuectelModem, ModemException
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+class ScriptedModem:
+    """
+    Serial port interface (read, write, flush, in_waiting, timeout, close) of a scripted modem
+    script: command (without AT) => (lines, final, delay) or a function(command) returning that tuple
+    """
+
+    def __init__(self, script: dict, timeout: float = 0.1):
+        self.script = script
+        self.timeout = timeout
+        self._output = bytearray()
+        self._input = bytearray()
+        self._cond = threading.Condition()
+        self._sms = None
+        self.commands = []
+        self.sms_text = []
+        self.closed = False
+
+    def push(self, data: bytes):
+        with self._cond:
+            self._output += data
+            self._cond.notify_all()
+
+    def urc(self, line: str):
+        self.push(f"\r\n{line}\r\n".encode())
+
+    def _respond(self, lines, final, delay):
+        data = b''.join(f"\r\n{line}\r\n".encode() for line in lines)
+        if final is not None:
+            data += f"\r\n{final}\r\n".encode()
+        if delay > 0.:
+            threading.Timer(delay, self.push, [data]).start()
+        else:
+            self.push(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._output)
+
+    def read(self, size: int = 1) -> bytes:
+        with self._cond:
+            if not self._output:
+                self._cond.wait(self.timeout)
+            data = bytes(self._output[:size])
+            del self._output[:size]
+        return data
+
+    def write(self, data: bytes):
+        self._input += data
+        if self._sms is not None:
+            end = self._input.find(b'\x1a')
+            if end >= 0:
+                self.sms_text.append((self._sms, self._input[:end].decode()))
+                del self._input[:end + 1]
+                self._sms = None
+                self._respond(["+CMGS: 12"], "OK", 0.)
+            return len(data)
+        while True:
+            end = self._input.find(b'\r')
+            if end < 0:
+                break
+            line = self._input[:end].decode()
+            del self._input[:end + 1]
+            if not line.startswith('AT'):
+                continue
+            command = line[2:]
+            self.commands.append(command)
+            if command.startswith('+CMGS='):
+                self._sms = command[6:].strip('"')
+                self.push(b"\r\n> ")
+                continue
+            response = self.script.get(command)
+            if response is None:
+                response = ([], "ERROR", 0.)
+            elif callable(response):
+                response = response(command)
+            self._respond(*response)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def echo(command: str):
+    return [f"+ECHO: {command.split('=')[1]}"], "OK", 0.
+
+
+ENGINE_SCRIPT = {
+    '': ([], "OK", 0.),
+    '+CGMR': (["EG25GGBR07A08M2G"], "OK", 0.),
+    '+CSQ': (["+CSQ: 20,99"], "OK", 0.01),
+    '+SLOW': ([], None, 0.),
+    '+LATE': (["+LATE: 1"], "OK", 0.3),
+    '+CPIN=0000': ([], "+CME ERROR: 16", 0.),
+    '+CREG?': (['+CREG: 2,1,"1A2B","01C3D4E5",7'], "OK", 0.),
+}
+
+
+def check_engine() -> bool:
+    ok = True
+    port = ScriptedModem(dict(ENGINE_SCRIPT))
+    for i in range(100):
+        port.script[f"+ECHO={i}"] = echo
+    trace = []
+    engine = ATEngine(port, trace=lambda d, t: trace.append((d, t)))
+    urcs = []
+    engine.subscribe('+CMTI', lambda p, l, t: urcs.append(l))
+    engine.subscribe('+QIND', lambda p, l, t: urcs.append(l))
+    engine.start()
+    try:
+        # correlation
+        command = engine.command("+CGMR")
+        ok &= check(command.ok and command.lines == ["EG25GGBR07A08M2G"], f"simple command {command.lines}")
+        ok &= check(('>', "AT+CGMR\r") in trace and ('<', "OK") in trace, "trace")
+        # URC between the lines of a response and between responses
+
+        def copn(command):
+            port.urc('+COPN: "20801","Orange F"')
+            port.urc('+CMTI: "ME",3')
+            return ['+COPN: "20802","Orange"'], "OK", 0.
+
+        port.script['+COPN'] = copn
+        port.urc('+QIND: "csq",20,99')
+        command = engine.command("+COPN")
+        ok &= check(command.lines == ['+COPN: "20801","Orange F"', '+COPN: "20802","Orange"'],
+                    f"response with URC {command.lines}")
+        time.sleep(0.05)
+        ok &= check(urcs == ['+QIND: "csq",20,99', '+CMTI: "ME",3'], f"URC dispatch {urcs}")
+        # the expected response is not a URC
+        command = engine.command("+CREG?")
+        ok &= check(command.lines == ['+CREG: 2,1,"1A2B","01C3D4E5",7'], f"+CREG query {command.lines}")
+        # timeout then recovery
+        start = time.monotonic()
+        command = engine.command("+SLOW", timeout=0.2)
+        ok &= check(command.state == ATCommand.TIMEOUT, "timeout state")
+        ok &= check(0.18 < time.monotonic() - start < 0.5, "timeout delay")
+        ok &= check(engine.command("+CSQ").lines == ["+CSQ: 20,99"], "recovery after timeout")
+        # late result is not attributed to the next command
+        command = engine.command("+LATE", timeout=0.1)
+        ok &= check(command.state == ATCommand.TIMEOUT, "late result timeout")
+        time.sleep(0.4)
+        command = engine.command("+CSQ")
+        ok &= check(command.ok and command.lines == ["+CSQ: 20,99"], f"command after late result {command.lines}")
+        ok &= check(engine.nb_unexpected == 1, f"late result counted {engine.nb_unexpected}")
+        # +CME error
+        command = engine.command("+CPIN=0000")
+        ok &= check(command.state == ATCommand.ERROR and command.final == "+CME ERROR: 16", "CME error")
+        ok &= check(command.lines == ["+CME ERROR: 16"], "CME error line")
+        ok &= check(engine.command("+UNKNOWN").final == "ERROR", "ERROR final")
+        # SMS prompt
+        command = engine.command('+CMGS="+33612345678"', payload="Hello")
+        ok &= check(command.ok and command.payload_sent and command.lines == ["+CMGS: 12"], "SMS send")
+        ok &= check(port.sms_text == [("+33612345678", "Hello")], f"SMS text {port.sms_text}")
+        # concurrent submission
+        results = {}
+
+        def worker(base):
+            for i in range(base, base + 25):
+                results[i] = engine.command(f"+ECHO={i}").lines
+
+        threads = [threading.Thread(target=worker, args=(n * 25,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ok &= check(all(results[i] == [f"+ECHO: {i}"] for i in range(100)), "concurrent commands correlation")
+        # asynchronous submission
+        commands = [engine.submit(f"+ECHO={i}") for i in range(10)]
+        ok &= check(all(c.wait(2.0) and c.lines == [f"+ECHO: {i}"] for i, c in enumerate(commands)), "submit")
+        # latency of a command on the scripted port
+        nb = 500
+        start = time.perf_counter()
+        for i in range(nb):
+            engine.command("")
+        latency = (time.perf_counter() - start) / nb
+        print(f"AT command round trip on scripted port {latency * 1e6:.0f}µs")
+        pending = [engine.submit("+SLOW", timeout=5.) for i in range(3)]
+    finally:
+        engine.stop()
+    ok &= check(all(c.state == ATCommand.CANCELLED for c in pending), "cancelled on stop")
+    ok &= check(engine.submit("").state == ATCommand.CANCELLED, "submit after stop")
+    ok &= check(not engine.running, "engine stopped")
+    if ok:
+        print("AT engine check OK")
+    return ok
+
+
+QUECTEL_SCRIPT = {
+    'E0': ([], "OK", 0.),
+    '+GSN': (["861234567890123"], "OK", 0.),
+    '+QSIMSTAT?': (["+QSIMSTAT: 0,1"], "OK", 0.),
+    '+CPIN?': (["+CPIN: READY"], "OK", 0.),
+    '+CIMI': (["208011234567890"], "OK", 0.),
+    '+QCCID': (["+QCCID: 89330123456789012345"], "OK", 0.),
+    '+CREG=2': ([], "OK", 0.),
+    'I': (["Quectel", "EG25", "Revision: EG25GGBR07A08M2G"], "OK", 0.),
+    '+CREG?': (['+CREG: 2,1,"1A2B","01C3D4E5",7'], "OK", 0.),
+    '+QSPN': (['+QSPN: "Orange F","Orange","",0,"20801"'], "OK", 0.),
+    '+QNWINFO': (['+QNWINFO: "FDD LTE","20801","LTE BAND 3",1300'], "OK", 0.),
+    '+CSQ': (["+CSQ: 20,99"], "OK", 0.),
+    '+CMGF?': (["+CMGF: 1"], "OK", 0.),
+    '+CPIN=1234': ([], "+CME ERROR: 16", 0.),
+    '+SILENT': ([], None, 0.),
+}
+
+
+class ScriptedQuectelModem(QuectelModem):
+
+    port = None
+
+    def _open(self):
+        self._tty = self.port
+        self._start_engine()
+
+
+def check_quectel() -> bool:
+    ok = True
+    ScriptedQuectelModem.port = ScriptedModem(QUECTEL_SCRIPT)
+    with tempfile.TemporaryDirectory() as filepath:
+        with open(os.path.join(filepath, "modem0.json"), "w") as fd:
+            json.dump({'model': 'EG25', 'AT_CMD': '/dev/ttyUSB2', 'NMEA': '/dev/ttyUSB1'}, fd)
+        modem = ScriptedQuectelModem(0, filepath=filepath)
+        events = []
+        modem.add_event_listener(events.append)
+        try:
+            ok &= check(modem.IMEI == 861234567890123 and modem.SIM_Ready(), "modem initialisation")
+            ok &= check(modem.IMSI == "208011234567890" or modem.IMSI == 208011234567890, "IMSI")
+            ok &= check(modem.model() == "EG25", "model")
+            ok &= check(modem.networkStatus(log=False), "network registration")
+            ok &= check(modem.regStatus() == "HOME" and len(events) == 1, "registration event from query")
+            events.clear()
+            port = ScriptedQuectelModem.port
+            port.urc('+CREG: 5,"1A2C","01C3D4E6",7')
+            port.urc('+QIND: "csq",25,99')
+            port.urc('+CMTI: "ME",4')
+            port.urc('+CPIN: NOT READY')
+            port.urc('RDY')
+            port.urc('+QUSIM: 1')
+            time.sleep(0.1)
+            kinds = [e.event for e in events]
+            ok &= check(kinds == ['registration', 'signal', 'sms', 'sim', 'power', 'urc'], f"modem events {kinds}")
+            if len(events) == 6:
+                ok &= check(events[0].value == "ROAMING" and events[0].parameters['lac'] == "1A2C", "registration")
+                ok &= check(events[1].value == "-63", f"signal {events[1].value}")
+                ok &= check(events[2].parameters['index'] == "4", "SMS index")
+            ok &= check(modem.regStatus() == "ROAMING" and modem.SIM_Status() == "NOT READY", "state from URC")
+            try:
+                modem.sendATcommand("+CPIN=1234", raiseException=True)
+                ok &= check(False, "CME exception")
+            except ModemException as err:
+                ok &= check(str(err) == "+CME ERROR: 16", f"CME exception {err}")
+            ok &= check(modem.sendATcommand("+SILENT", timeout=0.1) == [], "timeout without exception")
+            ok &= check(modem.sendSMS("+33612345678", "Position OK") == "OK", "modem SMS")
+        finally:
+            modem.close()
+        ok &= check(ScriptedQuectelModem.port.closed, "modem close")
+    if ok:
+        print("Quectel modem on AT engine check OK")
+    return ok
+
+
+def main():
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    ok = check_engine()
+    ok &= check_quectel()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
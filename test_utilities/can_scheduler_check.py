@@ -0,0 +1,136 @@
+#-------------------------------------------------------------------------------
+# Name:        can_scheduler_check
+# Purpose:     Check the CAN transmit scheduler (priority queues, transmit units, token bucket)
+#              and the SocketCANWriter on a virtual CAN bus
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import time
+import queue
+import logging
+from argparse import ArgumentParser
+
+import can
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.router_common.configuration import NavigationConfiguration
+from navigation_server.nmea2000_datamodel import initialize_feature
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-c', '--channel', action='store', type=str, default='scheduler-test', help='Virtual CAN channel')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+def frame(priority: int, pgn: int = 127250, sa: int = 10, index: int = 0):
+    can_id = (priority << 26) | (pgn << 8) | sa
+    return can.Message(arbitration_id=can_id, is_extended_id=True, data=bytes([index & 0xFF]) + bytes(7))
+
+
+def check_scheduler():
+    from navigation_server.can_interface.nmea2k_can_scheduler import CANTransmitScheduler, TokenBucket
+    scheduler = CANTransmitScheduler(queue_size=4)
+    scheduler.submit([frame(6, index=1)], 0.1)
+    scheduler.submit([frame(7, index=i) for i in range(3)], 0.1)
+    scheduler.submit([frame(2, index=2)], 0.1)
+    order = [scheduler.get_unit(0.1).priority for _ in range(3)]
+    check(order == [2, 6, 7] and scheduler.get_unit(0.05) is None, "Highest priority unit first")
+
+    check(scheduler.submit([frame(7, index=i) for i in range(3)], 0.1), "Unit queued")
+    start = time.monotonic()
+    accepted = scheduler.submit([frame(7, index=i) for i in range(3)], 0.1)
+    check(not accepted and scheduler.stats()[7].dropped == 1 and time.monotonic() - start >= 0.09,
+          "Unit dropped when the queue stays full")
+    scheduler.get_unit(0.1)
+    check(scheduler.submit([frame(7, index=i) for i in range(10)], 0.1) and scheduler.queued_frames() == 10,
+          "Unit larger than the queue accepted when empty")
+    unit = scheduler.get_unit(0.1)
+    check(len(unit.frames) == 10 and scheduler.stats()[7].frames == 16, "Frames of a unit kept together")
+
+    bucket = TokenBucket(500., 5)
+    start = time.monotonic()
+    for _ in range(105):
+        bucket.consume()
+    elapsed = time.monotonic() - start
+    check(0.18 < elapsed < 0.3, f"Token bucket 500 frames/s ({elapsed * 1000:.0f}ms for 100 frames over burst)")
+
+
+def receive(listener, count, timeout=5.0) -> list:
+    frames = []
+    deadline = time.monotonic() + timeout
+    while len(frames) < count and time.monotonic() < deadline:
+        msg = listener.recv(0.5)
+        if msg is not None:
+            frames.append(msg)
+    return frames
+
+
+def check_writer(channel):
+    from navigation_server.router_core import NMEA2000Msg
+    from navigation_server.can_interface.nmea2k_can_interface import SocketCANInterface
+    interface = SocketCANInterface(channel, queue.Queue(), tx_bandwidth=10., tx_burst=5, bus_interface='virtual')
+    listener = can.Bus(interface='virtual', channel=channel)
+    interface.start()
+    try:
+        # 200 frames/s => the low priority frames are still queued when the high priority messages arrive
+        for i in range(30):
+            interface.send(NMEA2000Msg(130306, 7, 10, 255, bytearray([i]) + bytearray(7)), force_send=True)
+        check(interface.send(NMEA2000Msg(129029, 3, 10, 255, bytearray(43)), force_send=True),
+              "Fast packet queued")
+        interface.send(NMEA2000Msg(127250, 6, 10, 255, bytearray(8)), force_send=True)
+        start = time.monotonic()
+        frames = receive(listener, 38)
+        elapsed = time.monotonic() - start
+        priorities = [(f.arbitration_id >> 26) & 7 for f in frames]
+        check(len(frames) == 38, "All frames sent")
+        first_fp = priorities.index(3)
+        check(priorities[first_fp:first_fp + 7] == [3] * 7 and priorities[first_fp + 7] == 6 and
+              priorities[-1] == 7, "Fast packet sent contiguously before the lower priorities")
+        check(elapsed > 0.12, f"Writer paced at 10% ({elapsed * 1000:.0f}ms for 38 frames)")
+        interface.change_bandwidth(50.)
+        for i in range(100):
+            interface.send(NMEA2000Msg(130306, 7, 10, 255, bytearray([i]) + bytearray(7)), force_send=True)
+        start = time.monotonic()
+        frames = receive(listener, 100)
+        fast_elapsed = time.monotonic() - start
+        check(len(frames) == 100 and fast_elapsed < 0.3 and interface.tx_bandwidth == 50.,
+              f"Bandwidth changed while running ({fast_elapsed * 1000:.0f}ms for 100 frames)")
+    finally:
+        interface.stop()
+        listener.shutdown()
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    NavigationConfiguration()
+    initialize_feature()
+    check_scheduler()
+    check_writer(opts.channel)
+    print("CAN scheduler check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
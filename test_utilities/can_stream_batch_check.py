@@ -0,0 +1,210 @@
+#-------------------------------------------------------------------------------
+# Name:        can_stream_batch_check
+# Purpose:     Check the overflow policies of the CAN read subscribers and the batched
+#              streaming (ReadNmea2000MsgBatch) over a local gRPC server
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import time
+import queue
+import logging
+import threading
+from concurrent import futures
+from argparse import ArgumentParser
+
+import grpc
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.router_common.configuration import Parameters, NavigationConfiguration
+from navigation_server.nmea2000_datamodel import initialize_feature
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-c', '--channel', action='store', type=str, default='batch-test', help='Virtual CAN channel')
+    p.add_argument('-p', '--port', action='store', type=int, default=4597, help='gRPC port for the test')
+    p.add_argument('-n', '--count', action='store', type=int, default=500, help='Messages sent on the stream')
+    p.add_argument('-r', '--rate', action='store', type=float, default=1000., help='Messages per second')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+def message(index: int, pgn: int = 127250, sa: int = 12):
+    from navigation_server.router_core import NMEA2000Msg
+    return NMEA2000Msg(pgn, 2, sa, 255, bytearray(index.to_bytes(4, 'little') + bytes(4)))
+
+
+def index_of(msg) -> int:
+    return int.from_bytes(msg.payload[:4], 'little')
+
+
+def subscriber(policy: str, queue_size: int):
+    from navigation_server.can_interface.nmea2k_active_controller import N2KReadSubscriber
+    return N2KReadSubscriber(policy, [], [], [], [], timeout=1.0, queue_size=queue_size, overflow_policy=policy)
+
+
+def feed(process, count: int, rate: float):
+    """
+    send count messages to process at rate messages per second
+    """
+    period = 1. / rate
+    next_time = time.monotonic()
+    for i in range(count):
+        process(message(i))
+        next_time += period
+        time.sleep(max(0., next_time - time.monotonic()))
+
+
+def check_policies():
+    sub = subscriber('drop_oldest', 4)
+    for i in range(10):
+        sub.queue_message(message(i))
+    check(sub.counters() == (4, 10, 6, 0) and [index_of(sub.get_message()) for _ in range(4)] == [6, 7, 8, 9],
+          "Overflow drop_oldest")
+
+    sub = subscriber('coalesce', 3)
+    for i, sa in enumerate((10, 11, 12)):
+        sub.queue_message(message(i, sa=sa))
+    sub.queue_message(message(3, sa=11))
+    sub.queue_message(message(4, sa=13))
+    # the message from 11 is replaced in place, then the oldest (10) is dropped for 13
+    check(sub.counters() == (3, 5, 1, 1) and [index_of(sub.get_message()) for _ in range(3)] == [3, 2, 4],
+          "Overflow coalesce")
+
+    sub = subscriber('disconnect', 2)
+    sub.queue_message(message(0))
+    sub.queue_message(message(1))
+    try:
+        sub.queue_message(message(2))
+        disconnected = False
+    except queue.Full:
+        disconnected = True
+    check(disconnected, "Overflow disconnect")
+
+
+def check_batch():
+    sub = subscriber('drop_oldest', 64)
+    for i in range(20):
+        sub.queue_message(message(i))
+    start = time.monotonic()
+    batch = sub.get_batch(8, 0.2)
+    check(len(batch) == 8 and time.monotonic() - start < 0.1, "Full batch sent without delay")
+    sub.get_batch(12, 0.2)
+    for i in range(3):
+        sub.queue_message(message(i))
+    start = time.monotonic()
+    batch = sub.get_batch(8, 0.1)
+    elapsed = time.monotonic() - start
+    check(len(batch) == 3 and 0.09 < elapsed < 0.3, f"Partial batch after max latency ({elapsed * 1000:.0f}ms)")
+
+
+def check_batch_rate(servicer, count, rate):
+    # default queue and batch sizes of the service, the batch is larger than the queue
+    sub = subscriber(servicer._overflow_policy, servicer._queue_size)
+    received = []
+
+    def read():
+        while len(received) + sub.counters()[2] < count:
+            try:
+                received.extend(sub.get_batch(servicer._batch_size, servicer._batch_max_latency))
+            except Exception:
+                break
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    feed(sub.queue_message, count, rate)
+    reader.join(5.0)
+    sub.close()
+    queued, total, dropped, coalesced = sub.counters()
+    check(dropped == 0 and [index_of(m) for m in received] == list(range(count)),
+          f"Default queue {servicer._queue_size} and batch {servicer._batch_size} at {rate:.0f} msg/s: "
+          f"{len(received)} received {dropped} dropped")
+
+
+def check_grpc_batch(controller, servicer, port, count, rate):
+    from navigation_server.generated.n2k_can_service_pb2 import CANReadRequest, CANRequest
+    from navigation_server.generated.n2k_can_service_pb2_grpc import (add_CAN_ControllerServiceServicer_to_server,
+                                                                      CAN_ControllerServiceStub)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    add_CAN_ControllerServiceServicer_to_server(servicer, server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    stub = CAN_ControllerServiceStub(channel)
+    received = []
+    batches = []
+
+    def read_stream(stream):
+        try:
+            for batch in stream:
+                batches.append(len(batch.messages))
+                received.extend(batch.messages)
+                if len(received) >= count:
+                    break
+        except grpc.RpcError:
+            pass
+
+    try:
+        # queue and batch size of the service
+        stream = stub.ReadNmea2000MsgBatch(CANReadRequest(client='batch', max_latency=0.02))
+        reader = threading.Thread(target=read_stream, args=(stream,))
+        reader.start()
+        deadline = time.monotonic() + 5.0
+        while len(controller.read_subscribers()) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        status = stub.GetStatus(CANRequest())
+        check(len(status.subscribers) == 1, "Batch stream subscriber registered")
+        feed(controller.process_msg, count, rate)
+        reader.join(5.0)
+        indexes = [int.from_bytes(m.payload[:4], 'little') for m in received]
+        check(indexes == list(range(count)), f"All messages received in order in {len(batches)} batches")
+        check(len(batches) < count and max(batches) <= servicer._queue_size, "Messages grouped in batches")
+        stream.cancel()
+        deadline = time.monotonic() + 5.0
+        while len(controller.read_subscribers()) > 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        check(len(controller.read_subscribers()) == 0, "Subscriber removed when the stream ends")
+    finally:
+        channel.close()
+        server.stop(0.1)
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    NavigationConfiguration()
+    initialize_feature()
+    from navigation_server.can_interface import NMEA2KActiveController
+    controller = NMEA2KActiveController(Parameters({'name': 'ecu-batch', 'channel': opts.channel,
+                                                    'bus_interface': 'virtual', 'mac_source': 'lo'}))
+    from navigation_server.can_interface.nmea2k_can_service import CAN_ControllerServiceServicerImpl
+    servicer = CAN_ControllerServiceServicerImpl(controller)
+    check_policies()
+    check_batch()
+    check_batch_rate(servicer, int(opts.rate), opts.rate)
+    check_grpc_batch(controller, servicer, opts.port, opts.count, opts.rate)
+    print("CAN stream batch check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#-------------------------------------------------------------------------------
+# Name:        configuration_reload_check
+# Purpose:     Check the configuration reload: filters swap, rejection of undefined filters,
+#              couplers added on the running configuration and reload signal handler
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import os
+import sys
+import signal
+import logging
+import tempfile
+import threading
+from argparse import ArgumentParser
+
+import yaml
+
+from navigation_server.router_common import MessageServerGlobals, ConfigurationException, set_root_package
+from navigation_server.router_common.configuration import Parameters, NavigationConfiguration
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-p', '--port', action='store', type=int, default=4595, help='NMEA server port for the test')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+def settings(port: int, filters: dict, couplers: list, publisher_filters: list) -> dict:
+    return {
+        'server_name': 'ReloadCheck',
+        'function': 'Configuration reload check',
+        'features': ['router_core', 'nmea2000', 'nmea0183', {'couplers': ['NMEATCPReader']}],
+        'servers': [{'Main': {'class': 'NavigationMainServer'}},
+                    {'NmeaServer': {'class': 'NMEAServer', 'port': port}}],
+        'couplers': [{name: {'class': 'NMEATCPReader', 'address': '127.0.0.1', 'port': 4590, 'autostart': False}}
+                     for name in couplers],
+        'publishers': [{'Printer': {'class': 'PrintPublisher', 'couplers': ['Reader1', 'Reader2'],
+                                    'filters': publisher_filters}}],
+        'filters': [{name: {'class': 'NMEA0183Filter', 'talker': 'GP', 'formatter': formatter, 'type': 'discard'}}
+                    for name, formatter in filters.items()],
+    }
+
+
+def write_settings(directory: str, name: str, content: dict) -> str:
+    filename = os.path.join(directory, name)
+    with open(filename, 'w') as fp:
+        yaml.safe_dump(content, fp)
+    return filename
+
+
+def check_signal_handler(main_server):
+    check(signal.getsignal(signal.SIGHUP) != main_server.reload_handler, "Reload handler not installed at creation")
+    errors = []
+
+    def install():
+        try:
+            main_server.install_reload_handler()
+        except ValueError as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=install)
+    thread.start()
+    thread.join()
+    check(len(errors) == 1, "Reload handler installation rejected outside the main thread")
+    main_server.install_reload_handler()
+    check(signal.getsignal(signal.SIGHUP) == main_server.reload_handler, "Reload handler installed from main")
+
+
+def check_reload(directory, port):
+    config = MessageServerGlobals.configuration
+    main_server = config.main_server
+    printer = config.description('publishers', 'Printer').object
+    nmea_server = config.description('servers', 'NmeaServer').object
+    filters = printer._filters
+    check(filters is not None and not printer.has_coupler('Reader2'), "Initial configuration")
+
+    # F2 removed while still used by the publisher
+    rejected = write_settings(directory, 'rejected.yml',
+                              settings(port, {'F1': 'GSV'}, ['Reader1'], ['F1', 'F2']))
+    try:
+        main_server.reload_configuration(rejected)
+        raised = False
+    except ConfigurationException:
+        raised = True
+    check(raised and printer._filters is filters and len(list(config.filters())) == 2,
+          "Reload rejected on undefined filter, previous filters kept")
+    try:
+        printer.update_filters(Parameters({'filters': ['F1', 'F3']}))
+        raised = False
+    except ValueError:
+        raised = True
+    check(raised and printer._filters is filters, "Undefined filter rejected by the publisher")
+
+    modified = write_settings(directory, 'modified.yml',
+                              settings(port, {'F1': 'GGA', 'F2': 'GSA'}, ['Reader1', 'Reader2'], ['F1', 'F2']))
+    results = {(r.category, r.name, r.action): r.success for r in main_server.reload_configuration(modified)}
+    check(results.get(('filters', 'F1', 'changed'), False) and
+          results.get(('publishers', 'Printer', 'filters_swapped'), False) and
+          printer._filters is not filters, "Filters swapped on the publisher")
+    reader = config.description('couplers', 'Reader2').object
+    check(results.get(('couplers', 'Reader2', 'added'), False) and reader in main_server.couplers() and
+          reader in nmea_server._couplers, "Added coupler linked to the servers")
+    check(printer.has_coupler('Reader2') and printer._couplers['Reader2'] is reader,
+          "Added coupler linked to the publisher")
+    results = main_server.reload_configuration(modified)
+    check(len(results) == 0, "No change on a second reload")
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    from navigation_server import server_main
+    set_root_package(server_main)
+    with tempfile.TemporaryDirectory() as directory:
+        initial = write_settings(directory, 'initial.yml',
+                                 settings(opts.port, {'F1': 'GSV', 'F2': 'GSA'}, ['Reader1'], ['F1', 'F2']))
+        config = NavigationConfiguration().build_configuration(initial)
+        logging.getLogger().setLevel(logging.CRITICAL)
+        config.initialize_features(config)
+        config.build_objects()
+        check_signal_handler(config.main_server)
+        check_reload(directory, opts.port)
+    print("Configuration reload check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#-------------------------------------------------------------------------------
+# Name:        device_registry_check
+# Purpose:     Check the NMEA2000 device registry: indexes, address moves, persistence
+#              and warm start of the controller devices
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import os
+import sys
+import struct
+import logging
+import tempfile
+from argparse import ArgumentParser
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.router_common.configuration import Parameters, NavigationConfiguration
+from navigation_server.nmea2000_datamodel import initialize_feature, NMEA2000Name
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-c', '--channel', action='store', type=str, default='registry-test', help='Virtual CAN channel')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+def iso_name(identity: int, manufacturer: int, device_class: int, function: int = 130) -> NMEA2000Name:
+    value = (identity | (manufacturer << 21) | (function << 40) | (device_class << 49) | (4 << 60) | (1 << 63))
+    return NMEA2000Name(struct.pack("<Q", value))
+
+
+def data_message(pgn: int, sa: int):
+    from navigation_server.router_core import NMEA2000Msg
+    return NMEA2000Msg(pgn, 2, sa, 255, bytearray(8))
+
+
+def product_message(sa: int, model_id: str):
+    from navigation_server.nmea2000 import ProductInformation
+    product = ProductInformation()
+    product.nmea2000_version = 2100
+    product.product_code = 1226
+    product.set_product_information(model_id, 'Version 1.0', 'Check', '00001')
+    product.certification_level = 1
+    product.load_equivalency = 1
+    msg = product.message()
+    msg.sa = sa
+    return msg
+
+
+def check_registry(filename):
+    from navigation_server.nmea2000 import NMEA2000Device, N2KDeviceRegistry
+    registry = N2KDeviceRegistry(filename)
+    name_a = iso_name(1001, 135, 60)
+    name_b = iso_name(1002, 1857, 25)
+    name_c = iso_name(1003, 135, 25)
+    device_a = NMEA2000Device(10, name_a)
+    device_b = NMEA2000Device(11, name_b)
+    registry.device_update(device_a, product_message(10, 'Registry check'))
+    registry.device_update(device_a, data_message(127250, 10))
+    registry.device_update(device_b, data_message(129025, 11))
+    check(len(registry) == 2 and registry.by_address(10).name == name_a.int_value, "Devices registered")
+    check([r.name for r in registry.senders(129025)] == [name_b.int_value] and
+          len(registry.by_manufacturer(135)) == 1 and len(registry.by_class(25)) == 1, "Indexes")
+    # device B moves to 12, device C takes the address of A
+    registry.address_claim(name_b, 12)
+    registry.address_claim(name_c, 10)
+    check(registry.get(name_a.int_value).address == -1 and registry.by_address(12).name == name_b.int_value and
+          registry.by_address(11) is None, "Address moves")
+    check(len(registry.select(manufacturers=[135], device_classes=[25])) == 1 and
+          len(registry.select(pgn=127250)) == 1 and len(registry.select(addresses=[10, 12])) == 2, "Select")
+    registry.close()
+
+    registry = N2KDeviceRegistry(filename)
+    record_a = registry.get(name_a.int_value)
+    record_b = registry.get(name_b.int_value)
+    product = record_a.product_information()
+    check(len(registry) == 3 and record_a.address == -1 and {127250, 126996} <= record_a.pgns,
+          "Registry reloaded from file")
+    check([a for a, t in record_b.address_history] == [11, 12] and record_b.pgns == {129025},
+          "Address history reloaded")
+    check(product is not None and product.model_id == 'Registry check', "Product information reloaded")
+    registry.close()
+
+
+def check_warm_start(filename, channel):
+    from navigation_server.can_interface import NMEA2KActiveController
+    controller = NMEA2KActiveController(Parameters({'name': 'ecu-registry', 'channel': channel,
+                                                    'bus_interface': 'virtual', 'mac_source': 'lo',
+                                                    'save_file': filename}))
+    device = controller.check_device(12)
+    check(device.iso_name is not None and device.iso_name.int_value == iso_name(1002, 1857, 25).int_value and
+          device.manufacturer_name is not None, "Device restored at start")
+    check(controller.check_device(20).iso_name is None, "Unknown address not restored")
+    controller.registry.close()
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    NavigationConfiguration()
+    initialize_feature()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "devices.db")
+        check_registry(filename)
+        check_warm_start(filename, opts.channel)
+    print("Device registry check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
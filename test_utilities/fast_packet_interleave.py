@@ -0,0 +1,119 @@
+#-------------------------------------------------------------------------------
+# Name:        fast_packet_interleave
+# Purpose:     Check the Fast Packet transmit sequences by replaying interleaved
+#              sends through the receive side reassembly
+#
+# Author:      Laurent Carré
+#
+# Created:     16/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import random
+from argparse import ArgumentParser
+
+from navigation_server.nmea2000 import FastPacketHandler, FastPacketException
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-n', '--rounds', action='store', type=int, default=1000, help='Number of interleaving rounds')
+    p.add_argument('-s', '--seed', action='store', type=int, default=0, help='Random seed')
+    return p
+
+
+def interleave(sequences: list, rng: random.Random) -> list:
+    """
+    Mix the frames of several sequences keeping the order within each sequence
+    """
+    pending = [list(seq) for seq in sequences]
+    result = []
+    while pending:
+        seq = rng.choice(pending)
+        result.append(seq.pop(0))
+        if len(seq) == 0:
+            pending.remove(seq)
+    return result
+
+
+def check_round(tx: FastPacketHandler, rng: random.Random) -> bool:
+    """
+    Send up to 8 messages of the same PGN/source concurrently, with a second source, interleave all frames
+    and check that the receiver rebuilds all payloads
+    """
+    rx = FastPacketHandler(None)
+    pgn = 129029
+    sent = []
+    for sa in (10, 11):
+        for i in range(rng.randint(1, 8)):
+            payload = bytearray(rng.randbytes(rng.randint(9, 60)))
+            seq = tx.allocate_seq(pgn, sa)
+            frames = [(sa, seq, frame) for frame in tx.build_frames(seq, payload)]
+            sent.append((sa, seq, payload, frames))
+    received = []
+    for sa, seq, frame in interleave([s[3] for s in sent], rng):
+        result = rx.process_frame(pgn, sa, frame)
+        if result is not None:
+            received.append((sa, result))
+    # all sequences are released once the last frame is out
+    for sa, seq, payload, frames in sent:
+        tx.free_seq(pgn, seq, sa)
+    expected = sorted((sa, bytes(payload)) for sa, seq, payload, frames in sent)
+    if sorted((sa, bytes(payload)) for sa, payload in received) != expected:
+        print("Mismatch between sent and received payloads")
+        return False
+    return True
+
+
+def check_allocation() -> bool:
+    tx = FastPacketHandler(None)
+    ok = True
+    # rotation: consecutive messages use different sequences
+    seqs = []
+    for i in range(10):
+        seq = tx.allocate_seq(130306, 5)
+        seqs.append(seq)
+        tx.free_seq(130306, seq, 5)
+    if seqs != [0, 1, 2, 3, 4, 5, 6, 7, 0, 1]:
+        print("Sequence rotation error", seqs)
+        ok = False
+    # in flight sequences are not reused
+    in_flight = [tx.allocate_seq(130306, 5) for i in range(8)]
+    if len(set(in_flight)) != 8:
+        print("Sequence reused while in flight", in_flight)
+        ok = False
+    try:
+        tx.allocate_seq(130306, 5)
+        print("Allocation shall fail when all sequences are in flight")
+        ok = False
+    except FastPacketException:
+        pass
+    tx.free_seq(130306, in_flight[3], 5)
+    if tx.allocate_seq(130306, 5) != in_flight[3]:
+        print("Released sequence not allocated")
+        ok = False
+    # sequences are independent per source
+    if tx.allocate_seq(130306, 6) != 0:
+        print("Sequence not independent per source")
+        ok = False
+    return ok
+
+
+def main():
+    opts = _parser().parse_args()
+    rng = random.Random(opts.seed)
+    ok = check_allocation()
+    tx = FastPacketHandler(None)
+    for i in range(opts.rounds):
+        if not check_round(tx, rng):
+            print(f"Round {i} failed")
+            ok = False
+            break
+    print("Fast packet interleave check", "OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#-------------------------------------------------------------------------------
+# Name:        fault_injection_test
+# Purpose:     Chaos scenarios on the couplers and transports, check the counters
+#              and the recovery times of the router components
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   Scenarios:
+#   - schedules: determinism of the seeded rules and exact counts of the 'every' rules
+#   - can_receive: frames from the traffic generator processed by the SocketCANInterface receive path
+#     with drop, duplicate, reorder, corrupt, truncate and read errors
+#   - can_write: injected write errors on a virtual CAN bus, all frames must be delivered after retry
+#   - coupler: NMEA0183 TCP coupler against a local server with injected disconnection, stall and peer
+#     close, the recovery time is the delay between the fault and the next message
+#   - grpc: channel of a GrpcPublisher closed, the recovery time is the delay until the server receives again
+
+import logging
+import queue
+import socket
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from concurrent import futures
+
+import grpc
+from can import Message, ThreadSafeBus
+
+from navigation_server.router_common import (MessageServerGlobals, NavThreadingController, NavProfilingController,
+                                             FaultInjector, FaultPoint)
+from navigation_server.router_common.configuration import Parameters
+from navigation_server.nmea2000_datamodel import initialize_feature
+from navigation_server.router_core import NMEA0183Msg
+from navigation_server.can_interface import SocketCANInterface, TrafficProfile, TrafficGenerator
+from navigation_server.couplers import NMEATCPReader
+from navigation_server.nmea2000 import GrpcPublisher
+from navigation_server.generated.nmea_messages_pb2 import server_resp
+from navigation_server.generated.input_server_pb2_grpc import (NMEAInputServerServicer,
+                                                               add_NMEAInputServerServicer_to_server)
+
+SENTENCE = b'$GPHDT,123.4,T*%02X\r\n'
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-s', '--seed', action='store', type=int, default=1, help='Fault injection seed')
+    p.add_argument('-p', '--port', action='store', type=int, default=4594, help='Base TCP port for the servers')
+    p.add_argument('-r', '--max_recovery', action='store', type=float, default=3.0,
+                   help='Maximum recovery time (s)')
+    return p
+
+
+class TestResult:
+
+    def __init__(self):
+        self.ok = True
+
+    def check(self, scenario: str, condition: bool, detail: str):
+        print(f"  {scenario:28s} {'OK' if condition else 'FAILED'} {detail}")
+        if not condition:
+            self.ok = False
+
+
+def sentence() -> bytes:
+    checksum = 0
+    for c in b'GPHDT,123.4,T':
+        checksum ^= c
+    return SENTENCE % checksum
+
+
+def schedule_scenarios(seed: int, result: TestResult):
+    print("Schedules")
+    items = list(range(1000))
+    point = FaultPoint('test', [{'fault': 'drop', 'every': 10}], seed)
+    out = [o for i in items for o in point.process(i)]
+    result.check('drop every 10', len(out) == 900 and point.counts['drop'] == 100, f"passed {len(out)}")
+
+    def run(run_seed):
+        p = FaultPoint('test', [{'fault': 'drop', 'probability': 0.05}, {'fault': 'duplicate', 'probability': 0.05},
+                                {'fault': 'reorder', 'probability': 0.05}], run_seed)
+        return [o for i in items for o in p.process(i)]
+    first, second, other = run(seed), run(seed), run(seed + 1)
+    result.check('same seed same run', first == second and first != other, f"passed {len(first)}")
+
+    point = FaultPoint('test', [{'fault': 'reorder', 'every': 2}], seed)
+    out = [o for i in range(6) for o in point.process(i)]
+    result.check('reorder', out == [0, 2, 1, 4, 3, 5] or out == [0, 2, 1, 4, 3], f"{out}")
+
+    point = FaultPoint('test', [{'fault': 'duplicate', 'every': 3}], seed)
+    out = [o for i in range(6) for o in point.process(i)]
+    result.check('duplicate', out == [0, 1, 2, 2, 3, 4, 5, 5], f"{out}")
+
+    point = FaultPoint('test', [{'fault': 'disconnect', 'at': 0.05, 'period': 0.1}], seed)
+    fired = []
+    start = time.monotonic()
+    while time.monotonic() - start < 0.48:
+        if point.event('disconnect'):
+            fired.append(round(point.elapsed(), 2))
+        time.sleep(0.002)
+    result.check('event once per window', len(fired) == 5, f"{fired}")
+
+
+def single_frame_profile() -> TrafficProfile:
+    return TrafficProfile.from_list([{'pgn': 127250, 'rate': 10., 'sources': [10, 11, 12]},
+                                     {'pgn': 128259, 'rate': 10., 'sources': [10, 11]}])
+
+
+def fast_packet_profile() -> TrafficProfile:
+    return TrafficProfile.from_list([{'pgn': 129029, 'rate': 1., 'sources': [10, 11, 12]},
+                                     {'pgn': 126996, 'rate': 1., 'sources': [20, 21]},
+                                     {'pgn': 127250, 'rate': 10., 'sources': [10]}])
+
+
+def run_can_receive(profile: TrafficProfile, rules: list, seed: int) -> tuple:
+    FaultInjector.configure({'seed': seed, 'points': {'can:chaos': rules}})
+    generator = TrafficGenerator(profile, 0., 0., seed=seed)
+    frames = [Message(arbitration_id=can_id, is_extended_id=True, data=data)
+              for t, can_id, data in generator.frames(20.)]
+    out_queue = queue.Queue()
+    can_if = SocketCANInterface('chaos', out_queue, bus_interface='virtual')
+    for frame in frames:
+        can_if.faulty_receive_msg(frame)
+    point = FaultInjector.points()['can:chaos']
+    FaultInjector.reset()
+    return generator.nb_messages, out_queue.qsize(), point.counts
+
+
+def can_receive_scenarios(seed: int, result: TestResult):
+    print("CAN receive")
+    single = single_frame_profile()
+    expected, received, counts = run_can_receive(single, [], seed)
+    result.check('no fault', received == expected, f"messages {received}/{expected}")
+    expected, received, counts = run_can_receive(single, [{'fault': 'drop', 'every': 25}], seed)
+    result.check('drop', received == expected - counts['drop'] and counts['drop'] > 0,
+                 f"messages {received}/{expected} drop {counts['drop']}")
+    expected, received, counts = run_can_receive(single, [{'fault': 'read_error', 'every': 25}], seed)
+    result.check('read error', received == expected - counts['read_error'] and counts['read_error'] > 0,
+                 f"messages {received}/{expected} read_error {counts['read_error']}")
+    expected, received, counts = run_can_receive(single, [{'fault': 'duplicate', 'every': 25}], seed)
+    result.check('duplicate', received == expected + counts['duplicate'] and counts['duplicate'] > 0,
+                 f"messages {received}/{expected} duplicate {counts['duplicate']}")
+    expected, received, counts = run_can_receive(single, [{'fault': 'reorder', 'every': 25},
+                                                          {'fault': 'corrupt', 'every': 10}], seed)
+    # the last held frame is never released
+    result.check('reorder corrupt', expected - 1 <= received <= expected and counts['reorder'] > 0 and counts['corrupt'] > 0,
+                 f"messages {received}/{expected} reorder {counts['reorder']} corrupt {counts['corrupt']}")
+    fast_packet = fast_packet_profile()
+    expected, received, counts = run_can_receive(fast_packet, [{'fault': 'truncate', 'every': 7}], seed)
+    result.check('truncate fast packet', received == expected - counts['truncate'] and counts['truncate'] > 0,
+                 f"messages {received}/{expected} truncate {counts['truncate']}")
+    expected, received, counts = run_can_receive(fast_packet, [{'fault': 'drop', 'every': 40}], seed)
+    # each drop loses at most one message, the next sequences must be reassembled
+    result.check('drop fast packet', expected - counts['drop'] <= received < expected,
+                 f"messages {received}/{expected} drop {counts['drop']}")
+
+
+def can_write_scenario(seed: int, result: TestResult):
+    print("CAN write")
+    FaultInjector.configure({'seed': seed, 'points': {'can:chaos-tx:tx': [{'fault': 'write_error', 'every': 4}]}})
+    can_if = SocketCANInterface('chaos-tx', queue.Queue(), bus_interface='virtual', tx_bandwidth=50.)
+    listener = ThreadSafeBus(channel='chaos-tx', interface='virtual')
+    can_if.start()
+    nb_frames = 200
+    for index in range(nb_frames):
+        can_if.put_can_msg((2 << 26) | (127250 << 8) | 10, bytearray([index & 0xFF] * 8))
+    received = 0
+    deadline = time.monotonic() + 10.
+    while received < nb_frames and time.monotonic() < deadline:
+        if listener.recv(0.5) is not None:
+            received += 1
+    point = FaultInjector.points()['can:chaos-tx:tx']
+    can_if.stop()
+    can_if.join()
+    listener.shutdown()
+    FaultInjector.reset()
+    result.check('write error retry', received == nb_frames and point.counts['write_error'] > 0,
+                 f"frames {received}/{nb_frames} write_error {point.counts['write_error']}")
+
+
+class SentenceServer(threading.Thread):
+    """
+    TCP server sending NMEA0183 sentences to the connected client, can close the connection on request
+    """
+
+    def __init__(self, port: int, rate: float = 100.):
+        super().__init__(daemon=True)
+        self._socket = socket.create_server(('127.0.0.1', port))
+        self._socket.settimeout(0.5)
+        self._interval = 1. / rate
+        self._stop_flag = False
+        self._close_request = threading.Event()
+        self.connections = 0
+
+    def close_connection(self):
+        self._close_request.set()
+
+    def stop(self):
+        self._stop_flag = True
+
+    def run(self):
+        data = sentence()
+        while not self._stop_flag:
+            try:
+                connection, address = self._socket.accept()
+            except socket.timeout:
+                continue
+            self.connections += 1
+            try:
+                while not self._stop_flag and not self._close_request.is_set():
+                    connection.sendall(data)
+                    time.sleep(self._interval)
+            except OSError:
+                pass
+            self._close_request.clear()
+            connection.close()
+        self._socket.close()
+
+
+def coupler_recovery(name: str, port: int, rules: list, seed: int, reconnect: bool,
+                     server_close_at: float = None) -> tuple:
+    """
+    return the recovery time (delay between the fault and the next message), the number of connections
+    and the fault counts
+    """
+    FaultInjector.configure({'seed': seed, 'points': {f"coupler:{name}": rules}})
+    server = SentenceServer(port)
+    server.start()
+    coupler = NMEATCPReader(Parameters({'name': name, 'address': '127.0.0.1', 'port': port, 'protocol': 'nmea0183',
+                                        'report_timer': 60., 'open_delay': 0.5}))
+    point = FaultInjector.points()[f"coupler:{name}"]
+    coupler.start()
+    fault_time = None
+    fault_total = 0
+    recovery = None
+    start = time.monotonic()
+    while time.monotonic() - start < 8. and recovery is None:
+        time.sleep(0.01)
+        now = time.monotonic()
+        total = coupler.total_input_msg()
+        if fault_time is None:
+            if server_close_at is not None and now - start >= server_close_at:
+                server.close_connection()
+                fault_time = now
+            elif sum(point.counts.values()) > 0:
+                fault_time = now
+            fault_total = total
+        elif total > fault_total and (not reconnect or server.connections > 1):
+            recovery = now - fault_time
+    coupler.stop()
+    coupler.join(5.)
+    server.stop()
+    server.join(2.)
+    counts = point.counts.copy()
+    FaultInjector.reset()
+    return recovery, server.connections, counts
+
+
+def coupler_scenarios(seed: int, port: int, max_recovery: float, result: TestResult):
+    print("Coupler")
+    recovery, connections, counts = coupler_recovery('ChaosTCP', port, [{'fault': 'disconnect', 'at': 1.}], seed,
+                                                     True)
+    result.check('injected disconnection', recovery is not None and recovery < max_recovery and connections == 2,
+                 f"recovery {recovery} connections {connections} faults {dict(counts)}")
+    recovery, connections, counts = coupler_recovery('ChaosStall', port + 1,
+                                                     [{'fault': 'stall', 'at': 1., 'delay': 1.}], seed, False)
+    result.check('stall', recovery is not None and recovery < max_recovery and connections == 1,
+                 f"recovery {recovery} connections {connections} faults {dict(counts)}")
+    recovery, connections, counts = coupler_recovery('ChaosPeer', port + 2, [{'fault': 'drop', 'every': 1000}],
+                                                     seed, True, server_close_at=1.)
+    result.check('peer close', recovery is not None and recovery < max_recovery and connections == 2,
+                 f"recovery {recovery} connections {connections}")
+
+
+class InputServicer(NMEAInputServerServicer):
+
+    def __init__(self):
+        self.received = 0
+        self.last_time = 0.
+
+    def status(self, request, context):
+        return server_resp(status="SERVER_OK")
+
+    def pushNMEA(self, request, context):
+        self.received += 1
+        self.last_time = time.monotonic()
+        return server_resp(reportCode=0)
+
+
+def grpc_scenario(seed: int, port: int, max_recovery: float, result: TestResult):
+    print("gRPC publisher")
+    FaultInjector.configure({'seed': seed, 'points': {'grpc:ChaosGrpc': [{'fault': 'close_channel', 'at': 0.5}]}})
+    servicer = InputServicer()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    add_NMEAInputServerServicer_to_server(servicer, server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    publisher = GrpcPublisher(Parameters({'name': 'ChaosGrpc', 'service': 'chaos', 'port': port,
+                                          'retry_interval': 0.5}))
+    point = FaultInjector.points()['grpc:ChaosGrpc']
+    msg = NMEA0183Msg(bytearray(sentence()))
+    fault_time = None
+    recovery = None
+    start = time.monotonic()
+    while time.monotonic() - start < 5. and recovery is None:
+        before = servicer.received
+        publisher.process_msg(msg)
+        now = time.monotonic()
+        if fault_time is None and point.counts['close_channel'] > 0:
+            fault_time = now
+        elif fault_time is not None and servicer.received > before:
+            recovery = now - fault_time
+        time.sleep(0.01)
+    lost = publisher._nb_lost_msg
+    publisher.stop()
+    server.stop(0)
+    FaultInjector.reset()
+    result.check('channel closed', recovery is not None and recovery < max_recovery,
+                 f"recovery {recovery} received {servicer.received} lost {lost}")
+
+
+def main():
+    opts = _parser().parse_args()
+    # the injected faults are logged by the components
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    initialize_feature()
+    result = TestResult()
+    schedule_scenarios(opts.seed, result)
+    can_receive_scenarios(opts.seed, result)
+    can_write_scenario(opts.seed, result)
+    coupler_scenarios(opts.seed, opts.port, opts.max_recovery, result)
+    grpc_scenario(opts.seed, opts.port + 3, opts.max_recovery, result)
+    print("Fault injection test", "OK" if result.ok else "FAILED")
+    sys.exit(0 if result.ok else 1)
+
+
+if __name__ == '__main__':
+    main()
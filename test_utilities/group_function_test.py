@@ -0,0 +1,142 @@
+#-------------------------------------------------------------------------------
+# Name:        group_function_test
+# Purpose:     Check the NMEA2000 Group Functions (PGN 126208) between two controllers
+#              connected on a virtual CAN bus: Request, Command, Read and Write Fields
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import time
+import logging
+from argparse import ArgumentParser
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.router_common.configuration import Parameters, NavigationConfiguration
+from navigation_server.nmea2000_datamodel import initialize_feature
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-c', '--channel', action='store', type=str, default='gf-test', help='Virtual CAN channel')
+    p.add_argument('-v', '--verbose', action='store_true', help='Show the server logs')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+def build_controller(name: str, channel: str, first_address: int, manufacturer_id: int):
+    from navigation_server.can_interface import NMEA2KActiveController
+    return NMEA2KActiveController(Parameters({'name': name, 'channel': channel, 'bus_interface': 'virtual',
+                                              'first_address': first_address, 'manufacturer_id': manufacturer_id,
+                                              'mac_source': 'lo'}))
+
+
+def ack_codes(transaction):
+    ack = transaction.acknowledge
+    if ack is None:
+        return None
+    return ack.pgn_error_code, ack.transmission_error_code, list(ack.parameters)
+
+
+def run_checks(client, server):
+    from navigation_server.nmea2000 import ReadFieldsGroupFunction
+    from navigation_server.nmea2000.nmea2k_iso_messages import (GF_PGN_NOT_SUPPORTED, GF_PGN_NOT_AVAILABLE,
+                                                                GF_TI_OK, GF_TI_TOO_LOW, GF_PARAM_OK,
+                                                                GF_PARAM_INVALID_FIELD, GF_PARAM_OUT_OF_RANGE,
+                                                                GF_PARAM_ACCESS_DENIED)
+    da = server.address
+
+    t = client.request_pgn(da, 126998)
+    check(t.wait(2.0) and t.reply.pgn == 126998 and t.reply.sa == da, "Request PGN 126998")
+
+    t = client.request_pgn(da, 126993, interval=5.0)
+    check(t.wait(2.0) and server._heartbeat_interval == 5.0, "Request heartbeat interval 5s")
+    t = client.request_pgn(da, 126993, interval=0.5)
+    t.wait(2.0)
+    check(t.status == "rejected" and ack_codes(t) == (0, GF_TI_TOO_LOW, []) and server._heartbeat_interval == 5.0,
+          "Request heartbeat interval too low")
+
+    t = client.request_pgn(da, 126998, selection={'installation_1': 'Nowhere'})
+    t.wait(2.0)
+    check(t.status == "rejected" and ack_codes(t) == (GF_PGN_NOT_AVAILABLE, GF_TI_OK, [GF_PARAM_OUT_OF_RANGE]),
+          "Request with selection mismatch")
+
+    t = client.command_pgn(da, 126998, {'installation_1': 'Chart table'})
+    check(t.wait(2.0) and ack_codes(t) == (0, 0, [GF_PARAM_OK]) and
+          server._configuration_information.installation_1 == 'Chart table', "Command installation #1")
+    t = client.command_pgn(da, 126998, [('installation_2', 'Bow'), ('manufacturer_info', 'Hacked')])
+    t.wait(2.0)
+    check(t.status == "rejected" and ack_codes(t) == (0, 0, [GF_PARAM_OK, GF_PARAM_ACCESS_DENIED]) and
+          server._configuration_information.installation_2 != 'Bow', "Command with a read only field")
+
+    t = client.read_fields(da, 126996, ['model_id', 'software_version'])
+    check(t.wait(2.0) and t.values() == {'model_id': server._product_information.model_id,
+                                         'software_version': server._product_information.software_version},
+          "Read Fields 126996")
+    t = client.read_fields(da, 126998, [2], selection={'installation_1': 'Chart table'})
+    check(t.wait(2.0) and t.values() == {'installation_2': server._configuration_information.installation_2},
+          "Read Fields with selection")
+    t = client.read_fields(da, 126998, [1], selection={'installation_1': 'Engine room'})
+    t.wait(2.0)
+    check(t.status == "rejected" and ack_codes(t)[0] == GF_PGN_NOT_AVAILABLE, "Read Fields with selection mismatch")
+    read = ReadFieldsGroupFunction(pgn=126998, unique_id=client.next_unique_id(), fields=[1, 9])
+    t = client.group_function_transaction(da, read)
+    t.wait(2.0)
+    check(t.status == "rejected" and ack_codes(t) == (0, 0, [GF_PARAM_OK, GF_PARAM_INVALID_FIELD]),
+          "Read Fields invalid field")
+
+    t = client.write_fields(da, 126998, {'installation_2': 'Stern'}, selection={1: 'Chart table'})
+    check(t.wait(2.0) and t.values() == {'installation_2': 'Stern'} and
+          server._configuration_information.installation_2 == 'Stern', "Write Fields")
+    t = client.write_fields(da, 126998, {'manufacturer_info': 'Hacked'})
+    t.wait(2.0)
+    check(t.status == "rejected" and ack_codes(t) == (0, 0, [GF_PARAM_ACCESS_DENIED]), "Write Fields read only")
+
+    t = client.request_pgn(da, 127245)
+    t.wait(2.0)
+    check(t.status == "rejected" and ack_codes(t)[0] == GF_PGN_NOT_SUPPORTED, "Request PGN not supported")
+
+    t = client.request_pgn(50, 126996, timeout=0.5)
+    check(client.request_pgn(50, 126996) is None, "Duplicate transaction")
+    check(not t.wait(2.0) and t.status == "timeout", "Request timeout")
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.INFO if opts.verbose else logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    NavigationConfiguration()
+    initialize_feature()
+    ecu_client = build_controller('ecu-client', opts.channel, 10, 999)
+    ecu_server = build_controller('ecu-server', opts.channel, 20, 135)
+    ecu_client.start()
+    ecu_server.start()
+    time.sleep(1.5)
+    try:
+        run_checks(ecu_client._applications[0], ecu_server._applications[0])
+        print("Transactions (pending, completed, rejected, timeouts):", ecu_client.group_functions.counters())
+    finally:
+        ecu_client.stop()
+        ecu_server.stop()
+    print("Group Function check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
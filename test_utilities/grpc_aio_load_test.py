@@ -0,0 +1,380 @@
+#-------------------------------------------------------------------------------
+# Name:        grpc_aio_load_test
+# Purpose:     Load test of the grpc.aio server core with hundreds of concurrent streams
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   A synthetic bus traffic is written in a raw log file, read back and replayed on a GrpcAioServer serving:
+#   - NMEAServer.getNMEA (coroutine servicer fed through AsyncPullPublisher)
+#   - CAN_ControllerService.ReadNmea2000Msg and ReadNmea2000MsgBatch (coroutine servicer on N2KReadSubscriber)
+#   - ECU_NMEA2000.getMessages: a synchronous servicer written for grpc.server, each stream holds a stream
+#     thread, the server has SYNC_LIMIT stream threads for them plus CONTROL_STREAMS reserved to control services
+#   The clients are grpc.aio coroutines running in a separate process
+#   Checked: all messages received on every stream, synchronous streams above the stream threads refused, control
+#   capacity kept, unary and control calls answered while all streams are running, number of threads, subscribers
+#   and stream threads released when the clients cancel
+
+import asyncio
+import datetime
+import logging
+import multiprocessing
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import grpc
+
+from navigation_server.router_common import (MessageServerGlobals, NavThreadingController, NavProfilingController,
+                                             NavGenericMsg, N2K_MSG, GrpcAioServer)
+from navigation_server.router_common.configuration import Parameters
+from navigation_server.nmea2000_datamodel import initialize_feature, PGNDef
+from navigation_server.nmea2000 import FastPacketHandler, FastPacketException
+from navigation_server.router_core import NMEA2000Msg
+from navigation_server.router_core.grpc_nmea_server import GrpcNMEAAsyncServer
+from navigation_server.can_interface import TrafficProfile, TrafficGenerator
+from navigation_server.can_interface.nmea2k_active_controller import N2KReadSubscriber
+from navigation_server.can_interface.nmea2k_can_service import CAN_ControllerServiceAsyncServicer
+from navigation_server.log_replay.raw_log_reader import RawLogFile
+from navigation_server.generated.nmea_server_pb2_grpc import add_NMEAServerServicer_to_server, NMEAServerStub
+from navigation_server.generated.nmea_messages_pb2 import server_cmd
+from navigation_server.generated.n2k_can_service_pb2_grpc import (add_CAN_ControllerServiceServicer_to_server,
+                                                                  CAN_ControllerServiceStub)
+from navigation_server.generated.n2k_can_service_pb2 import CANReadRequest
+from navigation_server.generated.ecu_pb2_grpc import (ECU_NMEA2000Servicer, add_ECU_NMEA2000Servicer_to_server,
+                                                      ECU_NMEA2000Stub)
+from navigation_server.generated.ecu_pb2 import ControllerApplicationRequest
+from navigation_server.generated.nmea2000_pb2 import nmea2000pb
+from navigation_server.generated.grpc_control_pb2_grpc import NavigationGrpcControlStub
+from navigation_server.generated.grpc_control_pb2 import GrpcCommand
+
+NB_NMEA_STREAMS = 200
+NB_CAN_STREAMS = 150
+NB_BATCH_STREAMS = 50
+NB_SYNC_STREAMS = 24
+SYNC_LIMIT = 16
+CONTROL_STREAMS = 2
+STREAMS_PER_CHANNEL = 100
+REPLAY_RATE = 10.
+LOG_DURATION = 10.
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+def replayed_log(work_dir: str) -> list:
+    """
+    Write the generated traffic in a raw log file and return the messages read back from the file
+    """
+    generator = TrafficGenerator(TrafficProfile.from_generated(nb_sources=4), seed=1)
+    log_file = os.path.join(work_dir, "load.log")
+    start = datetime.datetime(2025, 10, 18, 12, 0, 0)
+    with open(log_file, 'w') as fd:
+        fd.write("H0|SocketCANInterface|V1.0\n")
+        for index, (t, can_id, data) in enumerate(generator.frames(LOG_DURATION)):
+            date = (start + datetime.timedelta(seconds=t)).strftime("%Y-%m-%d %H:%M:%S.%f")
+            fd.write("R%d#%s>%08X %s\n" % (index, date, can_id, bytes(data).hex()))
+    log = RawLogFile(log_file)
+    log.load_file()
+    handler = FastPacketHandler(None)
+    messages = []
+    for record in log.records():
+        can_id = int(record.message[:8], 16)
+        data = bytes.fromhex(record.message[9:])
+        pgn, da = PGNDef.pgn_pdu1_adjust((can_id >> 8) & 0x1FFFF)
+        sa = can_id & 0xFF
+        if handler.is_pgn_active(pgn, sa, data) or PGNDef.fast_packet_check(pgn):
+            try:
+                data = handler.process_frame(pgn, sa, data)
+            except FastPacketException:
+                continue
+            if data is None:
+                continue
+        messages.append(NMEA2000Msg(pgn, 2, sa, da, bytearray(data)))
+    return messages
+
+
+class ReplaySource:
+    """
+    Replays the messages as a coupler (publishers), a CAN controller (read subscribers) and for the ECU servicer
+    """
+    def __init__(self, messages: list):
+        self._messages = messages
+        self._lock = threading.Lock()
+        self._publishers = []
+        self._subscribers = {}
+        self._queues = []
+        self.name = "Replay"
+
+    def object_name(self):
+        return self.name
+
+    def register(self, publisher):
+        with self._lock:
+            self._publishers.append(publisher)
+
+    def deregister(self, publisher):
+        with self._lock:
+            self._publishers.remove(publisher)
+
+    def add_read_subscriber(self, client, select_source, reject_source, select_pgn, reject_pgn, timeout,
+                            queue_size=20, overflow_policy='disconnect') -> N2KReadSubscriber:
+        subscriber = N2KReadSubscriber(client, select_source, reject_source, select_pgn, reject_pgn, timeout,
+                                       queue_size, overflow_policy)
+        with self._lock:
+            self._subscribers[client] = subscriber
+        return subscriber
+
+    def remove_read_subscriber(self, client):
+        with self._lock:
+            self._subscribers.pop(client).close()
+
+    def read_subscribers(self) -> list:
+        return list(self._subscribers.values())
+
+    def add_queue(self, msg_queue: queue.Queue):
+        with self._lock:
+            self._queues.append(msg_queue)
+
+    def remove_queue(self, msg_queue: queue.Queue):
+        with self._lock:
+            self._queues.remove(msg_queue)
+
+    def counts(self) -> tuple:
+        return len(self._publishers), len(self._subscribers), len(self._queues)
+
+    def replay(self, rate: float, nb_messages: int):
+        period = 1. / rate
+        next_time = time.monotonic()
+        for msg in self._messages[:nb_messages]:
+            with self._lock:
+                publishers = list(self._publishers)
+                subscribers = list(self._subscribers.values())
+                queues = list(self._queues)
+            generic = NavGenericMsg(N2K_MSG, msg=msg)
+            for publisher in publishers:
+                publisher.publish(generic)
+            for subscriber in subscribers:
+                subscriber.push_message(msg)
+            for msg_queue in queues:
+                msg_queue.put(msg)
+            next_time += period
+            time.sleep(max(0., next_time - time.monotonic()))
+
+
+class ReplayECUServicer(ECU_NMEA2000Servicer):
+    """
+    Synchronous servicer, as written for grpc.server
+    """
+    def __init__(self, source: ReplaySource):
+        self._source = source
+
+    def getMessages(self, request, context):
+        msg_queue = queue.Queue()
+        self._source.add_queue(msg_queue)
+        context.add_callback(lambda: self._source.remove_queue(msg_queue))
+        while context.is_active():
+            try:
+                msg = msg_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            msg_pb = nmea2000pb()
+            msg.as_protobuf(msg_pb)
+            yield msg_pb
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def read_stream(call, counts: list, index: int, batch: bool, refused: list):
+    try:
+        async for response in call:
+            counts[index] += len(response.messages) if batch else 1
+    except grpc.aio.AioRpcError as err:
+        if err.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+            refused.append(index)
+        elif err.code() != grpc.StatusCode.CANCELLED:
+            print("Stream", index, "error", err.code(), err.details())
+    except asyncio.CancelledError:
+        pass
+
+
+async def wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def unary_latencies(nmea_stub, control_stub, nb_calls: int) -> tuple:
+    status_latency = []
+    control_latency = []
+    for i in range(nb_calls):
+        t0 = time.perf_counter()
+        await nmea_stub.status(server_cmd(), timeout=5.)
+        status_latency.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        await control_stub.SendCommand(GrpcCommand(id=i, command="ping"), timeout=5.)
+        control_latency.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.05)
+    return sorted(status_latency), sorted(control_latency)
+
+
+async def run_clients(port: int, nb_messages: int) -> dict:
+    nb_streams = NB_NMEA_STREAMS + NB_CAN_STREAMS + NB_BATCH_STREAMS + NB_SYNC_STREAMS
+    channels = [grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+                for _ in range((nb_streams + STREAMS_PER_CHANNEL - 1) // STREAMS_PER_CHANNEL)]
+    counts = [0] * nb_streams
+    refused = []
+    calls = []
+    tasks = []
+    for index in range(nb_streams):
+        channel = channels[index // STREAMS_PER_CHANNEL]
+        batch = False
+        if index < NB_NMEA_STREAMS:
+            call = NMEAServerStub(channel).getNMEA(server_cmd())
+        elif index < NB_NMEA_STREAMS + NB_CAN_STREAMS:
+            call = CAN_ControllerServiceStub(channel).ReadNmea2000Msg(CANReadRequest(client=f"c{index}",
+                                                                                     queue_size=50))
+        elif index < NB_NMEA_STREAMS + NB_CAN_STREAMS + NB_BATCH_STREAMS:
+            call = CAN_ControllerServiceStub(channel).ReadNmea2000MsgBatch(
+                CANReadRequest(client=f"c{index}", queue_size=50, batch_size=8, max_latency=0.02))
+            batch = True
+        else:
+            call = ECU_NMEA2000Stub(channel).getMessages(ControllerApplicationRequest())
+        calls.append(call)
+        tasks.append(asyncio.create_task(read_stream(call, counts, index, batch, refused)))
+    # the replay starts when the server sees all the streams
+    await wait_for(lambda: sum(counts) > 0, 30.)
+    t0 = time.perf_counter()
+    status_latency, control_latency = await unary_latencies(NMEAServerStub(channels[0]),
+                                                            NavigationGrpcControlStub(channels[0]), 40)
+    running = [i for i in range(nb_streams) if i not in refused]
+    await wait_for(lambda: all(counts[i] >= nb_messages for i in running), 20.)
+    elapsed = time.perf_counter() - t0
+    for call in calls:
+        call.cancel()
+    await asyncio.gather(*tasks)
+    for channel in channels:
+        await channel.close()
+    return {'counts': counts, 'refused': refused, 'elapsed': elapsed,
+            'status_latency': status_latency, 'control_latency': control_latency}
+
+
+def client_process(port: int, nb_messages: int, results):
+    """
+    The clients run in their own process, grpc.aio supports only one event loop per process
+    """
+    results.put(asyncio.run(run_clients(port, nb_messages)))
+
+
+def wait_condition(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def load_test(server: GrpcAioServer, source: ReplaySource, port: int, nb_messages: int) -> bool:
+    ok = True
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    client = context.Process(target=client_process, args=(port, nb_messages, results))
+    client.start()
+    expected_sources = (NB_NMEA_STREAMS, NB_CAN_STREAMS + NB_BATCH_STREAMS, SYNC_LIMIT)
+    ok &= check(wait_condition(lambda: source.counts() == expected_sources, 30.),
+                f"streams open {source.counts()} expected {expected_sources}")
+    policy = server.policy('ECU')
+    ok &= check(wait_condition(lambda: policy.rejected_streams == NB_SYNC_STREAMS - SYNC_LIMIT, 5.),
+                f"ECU streams refused {policy.rejected_streams} expected {NB_SYNC_STREAMS - SYNC_LIMIT}")
+    ok &= check(policy.active_streams == SYNC_LIMIT and server.sync_streams == SYNC_LIMIT,
+                f"ECU streams running {policy.active_streams} stream threads held {server.sync_streams}")
+    reserved = [server.acquire_stream_thread(True) for _ in range(CONTROL_STREAMS + 1)]
+    ok &= check(not server.acquire_stream_thread(False) and reserved == [True] * CONTROL_STREAMS + [False],
+                f"stream threads reserved to control services {reserved}")
+    for _ in range(CONTROL_STREAMS):
+        server.release_stream_thread()
+    nb_threads = threading.active_count()
+    nb_running = sum(p.active_streams for p in server.policies())
+    print(f"{nb_running} streams running with {nb_threads} threads in the server process")
+    ok &= check(nb_threads < SYNC_LIMIT + 20, f"threads {nb_threads}")
+
+    source.replay(REPLAY_RATE, nb_messages)
+    result = results.get(timeout=60.)
+    client.join()
+    counts = result['counts']
+    refused = result['refused']
+    running = [i for i in range(len(counts)) if i not in refused]
+    ok &= check(len(refused) == NB_SYNC_STREAMS - SYNC_LIMIT, f"refused streams {len(refused)}")
+    incomplete = [(i, counts[i]) for i in running if counts[i] != nb_messages]
+    ok &= check(len(incomplete) == 0, f"streams with missing messages {incomplete[:10]}")
+    ok &= check(all(counts[i] == 0 for i in refused), "no message on refused streams")
+    total = sum(counts)
+    elapsed = result['elapsed']
+    print(f"{total} messages delivered in {elapsed:.1f}s ({total / elapsed:.0f} msg/s)")
+    status_latency = result['status_latency']
+    control_latency = result['control_latency']
+    print(f"NMEAServer.status latency median {status_latency[len(status_latency) // 2] * 1000.:.2f}ms "
+          f"max {status_latency[-1] * 1000.:.2f}ms")
+    print(f"Control SendCommand latency median {control_latency[len(control_latency) // 2] * 1000.:.2f}ms "
+          f"max {control_latency[-1] * 1000.:.2f}ms")
+    ok &= check(status_latency[-1] < 0.5, "unary calls answered while the streams are running")
+    ok &= check(control_latency[-1] < 0.5, "control calls answered while the streams are running")
+
+    ok &= check(wait_condition(lambda: source.counts() == (0, 0, 0), 5.),
+                f"subscribers released {source.counts()}")
+    ok &= check(wait_condition(lambda: all(p.active_streams == 0 for p in server.policies()), 5.),
+                f"stream counters {[(p.name, p.active_streams) for p in server.policies()]}")
+    ok &= check(wait_condition(lambda: server.sync_streams == 0, 5.), f"stream threads held {server.sync_streams}")
+    return ok
+
+
+def main():
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    initialize_feature()
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as work_dir:
+        messages = replayed_log(work_dir)
+    nb_messages = min(len(messages), int(REPLAY_RATE * 5))
+    print(f"{len(messages)} messages in the log, {nb_messages} replayed at {REPLAY_RATE:.0f} msg/s")
+    source = ReplaySource(messages)
+    port = free_port()
+    server = GrpcAioServer(Parameters({'name': 'LoadTestServer', 'port': port, 'max_streams': 256,
+                                       'stream_threads': SYNC_LIMIT + CONTROL_STREAMS,
+                                       'control_streams': CONTROL_STREAMS}))
+    add_NMEAServerServicer_to_server(GrpcNMEAAsyncServer([source]), server.service_registrar('NMEAServer'))
+    add_CAN_ControllerServiceServicer_to_server(CAN_ControllerServiceAsyncServicer(source),
+                                                server.service_registrar('CAN'))
+    add_ECU_NMEA2000Servicer_to_server(ReplayECUServicer(source), server.service_registrar('ECU'))
+    server.add_service('LoadTest')
+    server.start()
+    ok = load_test(server, source, port, nb_messages)
+    server.remove_service('LoadTest')
+    server.join()
+    if ok:
+        print("gRPC aio load check OK")
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#-------------------------------------------------------------------------------
+# Name:        iso_transport_loopback
+# Purpose:     Check the J1939/21 transport protocol (BAM and RTS/CTS) between two
+#              handlers connected back to back, including lost frames and timeouts
+#
+# Author:      Laurent Carré
+#
+# Created:     17/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import time
+import queue
+import random
+import threading
+from argparse import ArgumentParser
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.router_core import NMEA2000Msg
+from navigation_server.nmea2000 import IsoTransportHandler
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-n', '--messages', action='store', type=int, default=50, help='Number of messages per test')
+    p.add_argument('-s', '--seed', action='store', type=int, default=0, help='Random seed')
+    return p
+
+
+class LoopbackBus:
+    """
+    Deliver the frames sent by a handler to the handlers owning the destination address
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._queue = queue.Queue()
+        self._received = queue.Queue()
+        self._ended = queue.Queue()
+        self.drop = None    # function(pgn, data) -> True to lose the frame
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def add_node(self, address: int, window: int) -> IsoTransportHandler:
+        handler = IsoTransportHandler(f"TP-{address}", self._send, window)
+        handler.set_session_end_callback(self._ended.put)
+        handler.start()
+        self._nodes[address] = handler
+        return handler
+
+    def _send(self, pgn, sa, da, frames, on_sent):
+        self._queue.put((pgn, sa, da, frames, on_sent))
+        return True
+
+    def _run(self):
+        while True:
+            pgn, sa, da, frames, on_sent = self._queue.get()
+            for data in frames:
+                if self.drop is not None and self.drop(pgn, data):
+                    continue
+                for address, handler in self._nodes.items():
+                    if address == sa or (da != 255 and da != address):
+                        continue
+                    if pgn == 60416:
+                        handler.control_message(sa, da, 7, data)
+                    else:
+                        msg = handler.data_packet(sa, da, data)
+                        if msg is not None:
+                            self._received.put(msg)
+            if on_sent is not None:
+                on_sent()
+
+    def received(self, count: int, timeout: float) -> list:
+        result = []
+        end = time.monotonic() + timeout
+        while len(result) < count:
+            try:
+                result.append(self._received.get(timeout=max(0.01, end - time.monotonic())))
+            except queue.Empty:
+                break
+        return result
+
+    def ended(self, timeout: float) -> list:
+        result = []
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                result.append(self._ended.get(timeout=max(0.01, end - time.monotonic())))
+            except queue.Empty:
+                return result
+
+
+def check_transfers(bus: LoopbackBus, rng: random.Random, nb: int) -> bool:
+    """
+    Concurrent connection mode transfers 10 -> 20, 20 -> 10 and 30 -> 20 plus BAM from 10
+    """
+    ok = True
+    for i in range(nb):
+        sent = []
+        for sa, da in ((10, 20), (20, 10), (30, 20), (10, 255)):
+            payload = bytearray(rng.randbytes(rng.randint(9, 1785 if da != 255 else 200)))
+            msg = NMEA2000Msg(0xEF00 if da != 255 else 65280, 6, sa, da, payload)
+            if not bus._nodes[sa].send_message(msg):
+                print("Session start failure", sa, da)
+                return False
+            sent.append((sa, da, bytes(payload)))
+        received = bus.received(len(sent) + 1, 5.0)
+        # the BAM is received by both 20 and 30
+        expected = sorted(sent + [(10, 255, sent[3][2])])
+        if sorted((m.sa, m.da, bytes(m.payload)) for m in received) != expected:
+            print(f"Transfer {i} mismatch received {len(received)} messages")
+            ok = False
+            break
+    for address, handler in bus._nodes.items():
+        for session in handler.history():
+            if session.status != "complete":
+                print("Session not complete", session.sa, session.da, session.abort_reason)
+                ok = False
+    return ok
+
+
+def check_timeout(bus: LoopbackBus) -> bool:
+    """
+    Lose all data packets, both sides shall abort after the timeout
+    """
+    bus.ended(0.2)
+    bus.drop = lambda pgn, data: pgn == 60160
+    start = time.monotonic()
+    bus._nodes[10].send_message(NMEA2000Msg(0xEF00, 6, 10, 20, bytearray(100)))
+    ended = bus.ended(3.0)
+    bus.drop = None
+    reasons = sorted((s.outgoing, s.status, s.abort_reason) for s in ended)
+    if reasons != [(False, "aborted", 3), (True, "aborted", 3)]:
+        print("Unexpected timeout result", reasons)
+        return False
+    print(f"Timeout detected after {max(s.end_time for s in ended) - start:.2f}s")
+    return True
+
+
+def main():
+    opts = _parser().parse_args()
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    rng = random.Random(opts.seed)
+    bus = LoopbackBus()
+    bus.add_node(10, 16)
+    bus.add_node(20, 4)
+    bus.add_node(30, 255)
+    start = time.monotonic()
+    ok = check_transfers(bus, rng, opts.messages)
+    print(f"Transfers done in {time.monotonic() - start:.2f}s")
+    ok = check_timeout(bus) and ok
+    print("ISO transport loopback check", "OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#-------------------------------------------------------------------------------
+# Name:        latency_overhead
+# Purpose:     Check the latency histograms and measure the cost of the tracking
+#              on the message pipeline checkpoints
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import time
+import threading
+from array import array
+from argparse import ArgumentParser
+
+from navigation_server.router_common import (LatencyTracker, LatencyHistogram, latency_bucket_low, NavGenericMsg,
+                                             N2K_MSG, MetricsRegistry)
+from navigation_server.router_common.latency_histogram import latency_bucket, LATENCY_BUCKETS
+from navigation_server.router_core import NMEA2000Msg
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-n', '--messages', action='store', type=int, default=200000, help='Number of messages')
+    p.add_argument('-r', '--rate', action='store', type=float, default=2000., help='Reference frame rate')
+    return p
+
+
+def check_buckets() -> bool:
+    ok = True
+    previous = -1
+    for value in range(0, 1 << 20, 7):
+        index = latency_bucket(value)
+        if index < previous or not latency_bucket_low(index) <= value < latency_bucket_low(index + 1):
+            print("Bucket error for", value, index)
+            ok = False
+            break
+        previous = index
+    if latency_bucket(1 << 40) != LATENCY_BUCKETS - 1:
+        print("Overflow bucket error")
+        ok = False
+    counts = [0] * LATENCY_BUCKETS
+    for value in range(1, 1001):
+        counts[latency_bucket(value)] += 1
+    p50 = LatencyHistogram.percentile(counts, 0.5)
+    if not 500 <= p50 <= 500 * 1.125:
+        print("Percentile error", p50)
+        ok = False
+    return ok
+
+
+def check_group(nb_threads: int = 4, nb: int = 20000) -> bool:
+    """
+    Streams recording in parallel on the same checkpoint, no sample shall be lost
+    """
+    group = LatencyTracker.histogram_group('grpc_send', 'group-check')
+    recorded = threading.Barrier(nb_threads + 1)
+    finished = threading.Event()
+
+    def stream(release: bool):
+        histogram = group.writer()
+        stamp = time.monotonic_ns()
+        for i in range(nb):
+            histogram.record_since(stamp)
+        if release:
+            group.release(histogram)
+        recorded.wait()
+        if not release:
+            finished.wait()
+            group.release(histogram)
+
+    threads = [threading.Thread(target=stream, args=(i % 2 == 0,)) for i in range(nb_threads)]
+    for thread in threads:
+        thread.start()
+    recorded.wait()
+    counts, total, max_value = group.snapshot()
+    running_ok = sum(counts) == nb_threads * nb
+    finished.set()
+    for thread in threads:
+        thread.join()
+    counts, total, max_value = group.snapshot()
+    ok = running_ok and sum(counts) == nb_threads * nb and group in LatencyTracker.histograms('grpc_send')
+    if not ok:
+        print("Histogram group error", sum(counts))
+    return ok
+
+
+def check_export() -> bool:
+    """
+    A latency equal to a bucket bound of the metrics export is counted in that bucket (le is <=)
+    """
+    histogram = LatencyTracker.histogram('export', 'boundary-check')
+    counts = array('Q', bytes(8 * LATENCY_BUCKETS))
+    for value in (15, 16, 64, 100):
+        counts[latency_bucket(value)] += 1
+    histogram.merge(counts, 195, 100)
+    expected = {'1.6e-05': 2, '6.4e-05': 3, '0.000256': 4, '+Inf': 4}
+    found = {}
+    for line in MetricsRegistry.exposition().splitlines():
+        if line.startswith('navigation_pipeline_latency_seconds_bucket') and 'owner="boundary-check"' in line:
+            le = line.split('le="')[1].split('"')[0]
+            if le in expected:
+                found[le] = int(float(line.split()[-1]))
+    ok = found == expected
+    if not ok:
+        print("Export boundary error", found)
+    return ok
+
+
+def pipeline(nb: int, stages: list) -> float:
+    """
+    Run the checkpoints of a CAN message up to the client, return the time per message
+    """
+    payload = bytearray(8)
+    start = time.perf_counter()
+    for i in range(nb):
+        stamp = LatencyTracker.stamp()
+        msg = NMEA2000Msg(129025, 2, 10, 255, payload)
+        if stamp != 0:
+            msg.stamp = stamp
+            stages[0].record_since(stamp)
+        stages[1].record_since(msg.stamp)
+        gen_msg = NavGenericMsg(N2K_MSG, msg=msg)
+        gen_msg.stamp = msg.stamp
+        stages[2].record_since(gen_msg.stamp)
+        stages[3].record_since(gen_msg.stamp)
+        stages[4].record_since(gen_msg.stamp)
+    return (time.perf_counter() - start) / nb
+
+
+def main():
+    opts = _parser().parse_args()
+    ok = check_buckets()
+    ok = check_group() and ok
+    ok = check_export() and ok
+    stages = [LatencyTracker.histogram(stage, 'bench') for stage in
+              ('can_reassembly', 'controller_queue', 'coupler_publish', 'publisher_queue', 'client_send')]
+    LatencyTracker.enable(False)
+    t_off = pipeline(opts.messages, stages)
+    LatencyTracker.enable(True)
+    t_on = pipeline(opts.messages, stages)
+    counts, total, max_value = stages[4].snapshot()
+    if sum(counts) != opts.messages:
+        print("Missing samples", sum(counts))
+        ok = False
+    cost = (t_on - t_off) * opts.rate
+    print(f"Message creation and checkpoints: off {t_off * 1e6:.2f}us on {t_on * 1e6:.2f}us per message")
+    print(f"Tracking cost at {opts.rate:.0f} msg/s: {cost * 100:.3f}% of one core")
+    print(f"Client send p50 {LatencyHistogram.percentile(counts, 0.5)}us max {max_value}us")
+    print("Latency histogram check", "OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#-------------------------------------------------------------------------------
+# Name:        latest_value_check
+# Purpose:     Check the latest value cache per (PGN, source) and the GetSnapshot query
+#              of the CAN service over a local gRPC server
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import time
+import logging
+from concurrent import futures
+from argparse import ArgumentParser
+
+import grpc
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.router_common.configuration import Parameters, NavigationConfiguration
+from navigation_server.nmea2000_datamodel import initialize_feature
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-c', '--channel', action='store', type=str, default='snapshot-test', help='Virtual CAN channel')
+    p.add_argument('-p', '--port', action='store', type=int, default=4596, help='gRPC port for the test')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+def heading(value: int, sa: int):
+    from navigation_server.router_core import NMEA2000Msg
+    # PGN 127250 Vessel Heading: SID, heading (1e-4 rad), deviation, variation, reference
+    payload = bytearray(b'\x00' + value.to_bytes(2, 'little') + b'\xff\x7f\xff\x7f\xfc')
+    return NMEA2000Msg(127250, 2, sa, 255, payload)
+
+
+def message(pgn: int, sa: int):
+    from navigation_server.router_core import NMEA2000Msg
+    return NMEA2000Msg(pgn, 2, sa, 255, bytearray(8))
+
+
+def check_cache():
+    from navigation_server.router_core import N2KLatestValueCache
+    cache = N2KLatestValueCache(max_entries=4)
+    for value in (100, 200, 300):
+        cache.update(heading(value, 10))
+    msg, age, updates = cache.get(127250, 10)
+    check(updates == 3 and msg.payload[1:3] == (300).to_bytes(2, 'little') and age < 1.0,
+          "Latest message kept per (PGN, source)")
+    cache.update(heading(400, 11))
+    cache.update(message(128259, 10))
+    check(len(cache.snapshot([127250])) == 2 and len(cache.snapshot(None, [10])) == 2 and
+          len(cache.snapshot([127250], [11])) == 1 and len(cache.snapshot()) == 3, "Snapshot selection")
+    time.sleep(0.2)
+    cache.update(message(130306, 10))
+    check(len(cache.snapshot(max_age=0.1)) == 1, "Snapshot max age")
+    cache.update(message(129025, 10))
+    check(len(cache) == 4 and len(cache.snapshot([129025])) == 0, "Cache limited to max entries")
+
+
+def check_grpc_snapshot(controller, port):
+    from navigation_server.can_interface.nmea2k_can_service import CAN_ControllerServiceServicerImpl
+    from navigation_server.generated.nmea2000_pb2 import N2KSnapshotRequest
+    from navigation_server.generated.n2k_can_service_pb2_grpc import (add_CAN_ControllerServiceServicer_to_server,
+                                                                      CAN_ControllerServiceStub)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    add_CAN_ControllerServiceServicer_to_server(CAN_ControllerServiceServicerImpl(controller, stale_after=0.1), server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    stub = CAN_ControllerServiceStub(channel)
+    try:
+        check(controller.latest_values is not None, "Latest value cache active on the controller")
+        for value in (1000, 2000):
+            controller.process_msg(heading(value, 20))
+        controller.process_msg(heading(3000, 21))
+        controller.process_msg(message(128259, 20))
+        resp = stub.GetSnapshot(N2KSnapshotRequest(pgn=[127250], decode=True))
+        entries = {e.msg.sa: e for e in resp.entries}
+        check(resp.nb_entries == 3 and set(entries) == {20, 21}, "GetSnapshot selection by PGN")
+        check(entries[20].updates == 2 and not entries[20].stale and entries[20].HasField('decoded'),
+              "GetSnapshot entry with decoded message")
+        time.sleep(0.2)
+        controller.process_msg(heading(4000, 21))
+        resp = stub.GetSnapshot(N2KSnapshotRequest(pgn=[127250]))
+        stale = {e.msg.sa: e.stale for e in resp.entries}
+        check(stale == {20: True, 21: False}, "GetSnapshot stale flag")
+        resp = stub.GetSnapshot(N2KSnapshotRequest(sa=[20], max_age=0.1))
+        check(len(resp.entries) == 0, "GetSnapshot max age")
+    finally:
+        channel.close()
+        server.stop(0.1)
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    NavigationConfiguration()
+    initialize_feature()
+    from navigation_server.can_interface import NMEA2KActiveController
+    controller = NMEA2KActiveController(Parameters({'name': 'ecu-snapshot', 'channel': opts.channel,
+                                                    'bus_interface': 'virtual', 'mac_source': 'lo'}))
+    check_cache()
+    check_grpc_snapshot(controller, opts.port)
+    print("Latest value check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
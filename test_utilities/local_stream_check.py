@@ -0,0 +1,140 @@
+#-------------------------------------------------------------------------------
+# Name:        local_stream_check
+# Purpose:     Check the shared memory transport for co-located CAN stream clients:
+#              local address detection, ring release on fallback and overflow reporting
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import logging
+import subprocess
+from concurrent import futures
+from argparse import ArgumentParser
+
+import grpc
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.router_common.configuration import Parameters, NavigationConfiguration
+from navigation_server.nmea2000_datamodel import initialize_feature
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-c', '--channel', action='store', type=str, default='local-stream-test', help='Virtual CAN channel')
+    p.add_argument('-p', '--port', action='store', type=int, default=4598, help='gRPC port for the test')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+class WarningCounter(logging.Handler):
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def check_local_address():
+    from navigation_server.router_common import is_local_address
+    check(is_local_address("::1") and is_local_address("[::1]:4502") and is_local_address("[::1]"),
+          "IPv6 loopback")
+    check(is_local_address("127.0.0.1:4502") and is_local_address("localhost") and is_local_address("localhost:4502"),
+          "IPv4 loopback")
+    check(not is_local_address("2001:db8::1") and not is_local_address("[2001:db8::1]:4502") and
+          not is_local_address("192.0.2.1:4502"), "Remote addresses")
+
+
+def check_same_process_ring():
+    # the resource tracker reports its errors on the standard error of the process
+    script = ("from navigation_server.router_core import N2KSharedRingWriter, N2KSharedRingReader\n"
+              "w = N2KSharedRingWriter('check', 16)\n"
+              "r = N2KSharedRingReader(w.name, w.token)\n"
+              "r.close()\n"
+              "w.close()\n")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    check(result.returncode == 0 and "KeyError" not in result.stderr, "Reader and writer in the same process")
+
+
+def check_ring_release(controller, port):
+    from navigation_server.can_interface.nmea2k_can_service import CAN_ControllerServiceServicerImpl
+    from navigation_server.router_core import CANGrpcStreamReader
+    from navigation_server.generated.n2k_can_service_pb2_grpc import add_CAN_ControllerServiceServicer_to_server
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    add_CAN_ControllerServiceServicer_to_server(CAN_ControllerServiceServicerImpl(controller), server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    try:
+        reader = CANGrpcStreamReader('check', Parameters({'source_server': '127.0.0.1', 'source_port': port}))
+        reader.server_connect()
+        reader.server_connect_wait(5.0)
+        resp = reader._server_call(reader._stub.OpenLocalStream, reader._can_request, None)
+        check(resp.accepted and len(controller.read_subscribers()) == 1, "Local stream opened")
+        # what the reader does when the ring cannot be attached
+        reader._close_local_stream(resp)
+        check(len(controller.read_subscribers()) == 0, "Subscriber released before fallback")
+        ack = reader._server_call(reader._stub.CloseLocalStream, resp, None)
+        check(ack.error != 0, "Second release rejected")
+    finally:
+        server.stop(0.1)
+
+
+def check_overflow_warning():
+    from navigation_server.router_core import NMEA2000Msg, N2KSharedRingWriter, N2KSharedRingReader
+    from navigation_server.can_interface.nmea2k_active_controller import N2KSharedRingSubscriber
+    counter = WarningCounter()
+    controller_logger = logging.getLogger("ShipDataServer.navigation_server.can_interface.nmea2k_active_controller")
+    controller_logger.addHandler(counter)
+    controller_logger.setLevel(logging.WARNING)
+    controller_logger.propagate = False
+    ring = N2KSharedRingWriter('overflow', 4)
+    reader = N2KSharedRingReader(ring.name, ring.token)
+    sub = N2KSharedRingSubscriber('overflow', [], [], [], [], ring)
+    for i in range(20):
+        sub.queue_message(NMEA2000Msg(127250, 2, 12, 255, bytearray(8)))
+    check(counter.count == 1 and ring.dropped() == 16, "One warning per overflow episode")
+    for i in range(4):
+        reader.get_message(0.1)
+    sub.queue_message(NMEA2000Msg(127250, 2, 12, 255, bytearray(8)))
+    check(counter.count == 2, "End of overflow episode reported")
+    reader.close()
+    ring.close()
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    NavigationConfiguration()
+    initialize_feature()
+    from navigation_server.can_interface import NMEA2KActiveController
+    controller = NMEA2KActiveController(Parameters({'name': 'ecu-local', 'channel': opts.channel,
+                                                    'bus_interface': 'virtual', 'mac_source': 'lo'}))
+    check_local_address()
+    check_same_process_ring()
+    check_ring_release(controller, opts.port)
+    check_overflow_warning()
+    print("Local stream check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#-------------------------------------------------------------------------------
+# Name:        metrics_scrape_test
+# Purpose:     Run a router fed from a generated raw CAN log and scrape its
+#              OpenMetrics endpoint
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import datetime
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from argparse import ArgumentParser
+
+SETTINGS = """
+function: Metrics scrape test
+server_name: MetricsTest
+log_level: INFO
+trace_dir: {trace_dir}
+
+features:
+  - router_core
+  - nmea2000
+  - log_replay
+
+servers:
+
+- Main:
+    class: NavigationMainServer
+
+- gRPCMain:
+    class: GrpcServer
+    port: {grpc_port}
+
+- Metrics:
+    class: MetricsHTTPServer
+    address: 127.0.0.1
+    port: {metrics_port}
+
+- NMEANetwork:
+    class: NMEA2KController
+
+couplers:
+
+- LogReader:
+    class: RawLogCoupler
+    logfile: {logfile}
+    autostart: true
+    nmea2000_controller: NMEANetwork
+    protocol: nmea2000
+    direction: read_only
+    stop_system: false
+
+publishers:
+
+- Stats:
+    class: N2KStatisticPublisher
+    couplers: [LogReader]
+    active: true
+"""
+
+# single frame PGN: heading, speed, wind
+PGNS = ((127250, 2, 0x10), (128259, 2, 0x11), (130306, 2, 0x12))
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-n', '--frames', action='store', type=int, default=3000, help='Number of CAN frames in the log')
+    p.add_argument('-p', '--port', action='store', type=int, default=9181, help='Metrics HTTP port')
+    p.add_argument('-g', '--grpc_port', action='store', type=int, default=4592, help='gRPC port')
+    p.add_argument('-t', '--timeout', action='store', type=float, default=30.0, help='Test timeout in seconds')
+    return p
+
+
+def write_log(filename: str, nb_frames: int):
+    date = datetime.datetime(2025, 10, 18, 12, 0, 0)
+    with open(filename, 'w') as fd:
+        fd.write("H0|SocketCANInterface|V1.4\n")
+        for index in range(nb_frames):
+            pgn, prio, sa = PGNS[index % len(PGNS)]
+            can_id = (prio << 26) | (pgn << 8) | sa
+            data = bytes((index + i) & 0xFF for i in range(8))
+            fd.write(f"R{index}#{date.strftime('%Y-%m-%d %H:%M:%S.%f')}>{can_id:08X},{data.hex()}\n")
+            date += datetime.timedelta(milliseconds=5)
+
+
+def scrape(url: str) -> str:
+    with urllib.request.urlopen(url, timeout=2.0) as response:
+        return response.read().decode()
+
+
+def sample(text: str, name: str, labels: str) -> float:
+    match = re.search(r'^%s\{%s[^}]*\} (\S+)$' % (re.escape(name), labels), text, re.MULTILINE)
+    if match is None:
+        return -1.0
+    return float(match.group(1))
+
+
+def main():
+    opts = _parser().parse_args()
+    ok = True
+    with tempfile.TemporaryDirectory() as work_dir:
+        logfile = os.path.join(work_dir, 'metrics-test.log')
+        write_log(logfile, opts.frames)
+        settings = os.path.join(work_dir, 'metrics-test.yml')
+        with open(settings, 'w') as fd:
+            fd.write(SETTINGS.format(trace_dir=work_dir, grpc_port=opts.grpc_port, metrics_port=opts.port,
+                                     logfile=logfile))
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        server = subprocess.Popen([sys.executable, os.path.join(root, 'run_server.py'), '--settings', settings],
+                                  cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f"http://127.0.0.1:{opts.port}/metrics"
+        text = None
+        deadline = time.monotonic() + opts.timeout
+        try:
+            while time.monotonic() < deadline:
+                time.sleep(0.5)
+                if server.poll() is not None:
+                    print("Router stopped with code", server.returncode)
+                    break
+                try:
+                    text = scrape(url)
+                except OSError:
+                    continue
+                if sample(text, 'navigation_coupler_messages_in_total', 'coupler="LogReader"') > 0 and \
+                        sample(text, 'navigation_nmea2000_messages_total', 'owner="Stats"') > 0:
+                    break
+        finally:
+            server.terminate()
+            try:
+                server.wait(10.0)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    if text is None:
+        print("No scrape response from", url)
+        sys.exit(1)
+    if not text.endswith("# EOF\n"):
+        print("Missing # EOF terminator")
+        ok = False
+    for name, labels in (('navigation_coupler_messages_in_total', 'coupler="LogReader"'),
+                         ('navigation_nmea2000_messages_total', 'owner="Stats",pgn="127250",sa="16"')):
+        value = sample(text, name, labels)
+        print(f"{name}{{{labels}}} = {value}")
+        if value <= 0:
+            ok = False
+    print("Metrics scrape test", "OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
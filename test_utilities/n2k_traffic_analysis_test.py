@@ -0,0 +1,199 @@
+#-------------------------------------------------------------------------------
+# Name:        n2k_traffic_analysis_test
+# Purpose:     Check the NMEA2000 traffic analysis live and over a raw log file
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   A synthetic bus traffic (TrafficGenerator) is analysed
+#   - live: the frames are reassembled by a FastPacketHandler and the messages submitted to N2KStatistics
+#     as the N2KStatisticPublisher does, with the generator time as message timestamp
+#   - offline: the same frames are written in a SocketCANInterface raw log file analysed by RawLogAnalysis
+#   Checked: message and frame counts, rates, jitter, histogram, bus load, fast packet errors, bounded memory, CSV
+#   The cost of the analysis per message is measured at the end
+
+import csv
+import datetime
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from navigation_server.router_common import MessageServerGlobals, NavThreadingController, NavProfilingController
+from navigation_server.nmea2000_datamodel import initialize_feature, PGNDef
+from navigation_server.nmea2000 import FastPacketHandler, FastPacketException
+from navigation_server.router_core import NMEA2000Msg
+from navigation_server.can_interface import TrafficProfile, TrafficGenerator
+from navigation_server.nmea_data import N2KStatistics, N2KStatEntry, INTERVAL_BOUNDS
+from navigation_server.log_replay import RawLogAnalysis
+
+DURATION = 60.
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+def live_analysis(generator: TrafficGenerator, stats: N2KStatistics, duration: float = DURATION) -> list:
+    """
+    return the list of frames (t, can_id, data) for the log file
+    """
+    handler = FastPacketHandler(None)
+    stats.attach_fast_packet_handler('generator', handler)
+    frames = []
+    for t, can_id, data in generator.frames(duration):
+        frames.append((t, can_id, data))
+        pgn, da = PGNDef.pgn_pdu1_adjust((can_id >> 8) & 0x1FFFF)
+        sa = can_id & 0xFF
+        if handler.is_pgn_active(pgn, sa, data) or PGNDef.fast_packet_check(pgn):
+            try:
+                data = handler.process_frame(pgn, sa, data)
+            except FastPacketException:
+                continue
+            if data is None:
+                continue
+        stats.add_entry(NMEA2000Msg(pgn, 2, sa, da, bytearray(data)), t)
+    return frames
+
+
+def write_log(filename: str, frames: list, start: datetime.datetime):
+    with open(filename, 'w') as fd:
+        fd.write("H0|SocketCANInterface|V1.0\n")
+        for index, (t, can_id, data) in enumerate(frames):
+            date = (start + datetime.timedelta(seconds=t)).strftime("%Y-%m-%d %H:%M:%S.%f")
+            fd.write("R%d#%s>%08X %s\n" % (index, date, can_id, bytes(data).hex()))
+
+
+def check_live(profile: TrafficProfile) -> bool:
+    ok = True
+    generator = TrafficGenerator(profile, seed=1)
+    stats = N2KStatistics()
+    live_analysis(generator, stats)
+    entries = {(e.pgn, e.sa): e for e in stats.snapshot()}
+    streams = {(s.pgn, s.sa): s for s in profile.streams}
+    ok &= check(set(entries.keys()) == set(streams.keys()), "one entry per (PGN, source)")
+    ok &= check(stats.total_msg == generator.nb_messages, f"messages {stats.total_msg} {generator.nb_messages}")
+    ok &= check(stats.total_frames == generator.nb_frames, f"frames {stats.total_frames} {generator.nb_frames}")
+    for key, stream in streams.items():
+        entry = entries[key]
+        ok &= check(entry.frames == entry.count * stream.nb_frames(), f"frames of {key}")
+        ok &= check(abs(entry.average_rate - stream.rate) < 0.02 * stream.rate,
+                    f"average rate of {key} {entry.average_rate:.3f} {stream.rate}")
+        ok &= check(abs(entry.rate - stream.rate) < 0.1 * stream.rate, f"rate of {key} {entry.rate:.3f}")
+        # the interleaving on the bus is the only source of jitter
+        ok &= check(entry.jitter < 0.01, f"jitter of {key} {entry.jitter * 1000.:.2f}ms")
+        ok &= check(sum(entry.histogram) == entry.count - 1, f"histogram of {key}")
+    heading = entries[(127250, 10)]
+    ok &= check(heading.histogram[INTERVAL_BOUNDS.index(0.15)] > 0.9 * (heading.count - 1),
+                f"10Hz interval bucket {heading.histogram}")
+    load = stats.bus_load()
+    expected = profile.frame_rate() * 115. / 250000.
+    ok &= check(0.7 * expected < load < 1.3 * expected, f"bus load {load:.3f} expected about {expected:.3f}")
+    ok &= check(sum(e.bits for e in entries.values()) == stats.total_bits, "bus load contributions")
+    ok &= check(all(e.fp_errors == 0 and e.fp_timeouts == 0 for e in entries.values()), "no fast packet errors")
+    return ok
+
+
+def check_errors(profile: TrafficProfile) -> bool:
+    ok = True
+    generator = TrafficGenerator(profile, error_rate=0.05, seed=2)
+    stats = N2KStatistics()
+    live_analysis(generator, stats)
+    entries = stats.snapshot()
+    nb_errors = sum(e.fp_errors + e.fp_timeouts for e in entries)
+    fp_keys = {(s.pgn, s.sa) for s in profile.streams if s.fast_packet}
+    ok &= check(nb_errors > 0, "fast packet errors counted")
+    ok &= check(all((e.pgn, e.sa) in fp_keys for e in entries if e.fp_errors + e.fp_timeouts > 0),
+                "errors on fast packet flows only")
+    stats.reset()
+    ok &= check(sum(e.fp_errors + e.fp_timeouts for e in stats.snapshot()) == 0, "errors cleared by reset")
+    return ok
+
+
+def check_offline(profile: TrafficProfile, work_dir: str) -> bool:
+    ok = True
+    generator = TrafficGenerator(profile, seed=1)
+    live = N2KStatistics()
+    frames = live_analysis(generator, live, 20.)
+    start = datetime.datetime(2025, 10, 18, 12, 0, 0)
+    log_file = os.path.join(work_dir, "analysis.log")
+    write_log(log_file, frames, start)
+    analysis = RawLogAnalysis(log_file)
+    offline = analysis.run()
+    ok &= check(analysis.nb_invalid == 0, f"invalid records {analysis.nb_invalid}")
+    ok &= check(offline.total_msg == live.total_msg and offline.total_frames == live.total_frames,
+                f"offline counts {offline.total_msg} {live.total_msg}")
+    ok &= check(abs(offline.start_time - start.timestamp() - live.start_time) < 1e-3, "log time used")
+    live_entries = {(e.pgn, e.sa): e for e in live.snapshot()}
+    for entry in offline.snapshot():
+        reference = live_entries[(entry.pgn, entry.sa)]
+        ok &= check(entry.count == reference.count and entry.histogram == reference.histogram,
+                    f"offline entry {entry.pgn} {entry.sa}")
+        ok &= check(abs(entry.average_rate - reference.average_rate) < 1e-3, f"offline rate {entry.pgn}")
+    # CSV export
+    csv_file = os.path.join(work_dir, "analysis.csv")
+    offline.write_entries(csv_file)
+    with open(csv_file) as fd:
+        rows = list(csv.reader(fd))
+    ok &= check(rows[0] == N2KStatEntry.csv_header() and len(rows) == len(live_entries) + 1, "CSV export")
+    return ok
+
+
+def check_bounded(profile: TrafficProfile) -> bool:
+    generator = TrafficGenerator(profile, seed=3)
+    stats = N2KStatistics(max_entries=5)
+    live_analysis(generator, stats, 10.)
+    nb_analysed = sum(e.count for e in stats.snapshot())
+    return check(len(stats.snapshot()) == 5 and nb_analysed + stats.nb_overflow == stats.total_msg,
+                 f"bounded entries {len(stats.snapshot())} overflow {stats.nb_overflow}")
+
+
+def measure(profile: TrafficProfile):
+    generator = TrafficGenerator(profile, seed=4)
+    handler = FastPacketHandler(None)
+    msgs = []
+    for t, can_id, data in generator.frames(DURATION):
+        pgn, da = PGNDef.pgn_pdu1_adjust((can_id >> 8) & 0x1FFFF)
+        sa = can_id & 0xFF
+        if handler.is_pgn_active(pgn, sa, data) or PGNDef.fast_packet_check(pgn):
+            data = handler.process_frame(pgn, sa, data)
+            if data is None:
+                continue
+        msgs.append(NMEA2000Msg(pgn, 2, sa, da, bytearray(data), timestamp=1e9 + t))
+    stats = N2KStatistics()
+    start = time.perf_counter()
+    for msg in msgs:
+        stats.add_entry(msg)
+    elapsed = time.perf_counter() - start
+    print(f"analysis cost {elapsed / len(msgs) * 1e6:.2f}us/message, "
+          f"{profile.message_rate() * elapsed / len(msgs) * 100.:.2f}% CPU for {profile.message_rate():.0f}msg/s")
+
+
+def main():
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    initialize_feature()
+    # the injected errors are logged by the FastPacketHandler
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    profile = TrafficProfile.from_generated(nb_sources=3)
+    ok = check_live(profile)
+    ok &= check_errors(profile)
+    with tempfile.TemporaryDirectory() as work_dir:
+        ok &= check_offline(profile, work_dir)
+    ok &= check_bounded(profile)
+    measure(TrafficProfile.from_generated(nb_sources=8))
+    if ok:
+        print("NMEA2000 traffic analysis check OK")
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#-------------------------------------------------------------------------------
+# Name:        n2k_traffic_benchmark
+# Purpose:     Benchmark the NMEA2000 receive chain with a synthetic bus traffic
+#              and compare the results between versions
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   Two benchmarks:
+#   - components: the frames are processed in the benchmark thread by the FastPacketHandler and the
+#     SocketCANInterface receive path, the processing time of each frame is recorded in a histogram
+#   - router: a router is started with an NMEA2KActiveController on a virtual CAN bus fed by an
+#     N2KTrafficGenerator, the latency histograms of the pipeline stages are read via the Console and the
+#     counters via the metrics endpoint
+#   The results are written in a JSON file (-o) and compared with a previous run (-c)
+
+import json
+import logging
+import os
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from argparse import ArgumentParser
+
+import grpc
+from can import Message
+
+from navigation_server.router_common import (MessageServerGlobals, NavThreadingController, NavProfilingController,
+                                             LatencyHistogram)
+from navigation_server.nmea2000_datamodel import initialize_feature
+from navigation_server.nmea2000 import FastPacketHandler
+from navigation_server.can_interface import SocketCANInterface, TrafficProfile, TrafficGenerator
+from navigation_server.generated.console_pb2 import Request
+from navigation_server.generated.console_pb2_grpc import NavigationConsoleStub
+
+ROUTER_SETTINGS = """
+function: NMEA2000 traffic benchmark
+server_name: TrafficBenchmark
+log_level: WARNING
+trace_dir: {work_dir}
+latency_tracking: true
+
+features:
+  - router_core
+  - can_interface
+  - nmea2000
+
+servers:
+
+- Main:
+    class: NavigationMainServer
+
+- gRPCMain:
+    class: GrpcServer
+    port: {grpc_port}
+
+- Metrics:
+    class: MetricsHTTPServer
+    address: 127.0.0.1
+    port: {metrics_port}
+
+- BenchNetwork:
+    class: NMEA2KActiveController
+    channel: bench
+    bus_interface: virtual
+    applications: [CANCoupler]
+    default_application: false
+
+- Generator:
+    class: N2KTrafficGenerator
+    channel: bench
+    bus_interface: virtual
+    sources: {sources}
+    rate_scale: {rate_scale}
+    iso_tp_rate: {iso_tp_rate}
+    error_rate: {error_rate}
+    frame_rate: {frame_rate}
+    duration: {duration}
+    start_delay: {start_delay}
+
+couplers:
+
+- CANCoupler:
+    class: DirectCANCoupler
+
+services:
+
+- Console:
+    class: Console
+    server: gRPCMain
+
+publishers:
+
+- Stats:
+    class: N2KStatisticPublisher
+    couplers: [CANCoupler]
+    active: true
+"""
+
+
+PIPELINE_STAGES = ['can_reassembly', 'controller_queue', 'coupler_publish', 'publisher_queue', 'client_send',
+                   'grpc_send']
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-d', '--duration', action='store', type=float, default=10., help='Traffic duration (s)')
+    p.add_argument('-s', '--sources', action='store', type=int, default=3, help='Number of sources per PGN')
+    p.add_argument('-r', '--rate_scale', action='store', type=float, default=1., help='Rate multiplier')
+    p.add_argument('-i', '--iso_tp_rate', action='store', type=float, default=1., help='ISO-TP BAM messages/s')
+    p.add_argument('-e', '--error_rate', action='store', type=float, default=0., help='Error injection rate')
+    p.add_argument('-f', '--frame_rate', action='store', type=float, default=0.,
+                   help='Bus capacity in frames/s, 0 for no limit')
+    p.add_argument('-l', '--raw_log', action='store', type=str, default=None, help='Raw CAN log for the profile')
+    p.add_argument('--router', action='store_true', help='Run the router benchmark')
+    p.add_argument('--metrics_port', action='store', type=int, default=9182)
+    p.add_argument('--grpc_port', action='store', type=int, default=4593)
+    p.add_argument('-o', '--output', action='store', type=str, default=None, help='JSON result file')
+    p.add_argument('-c', '--compare', action='store', type=str, default=None, help='Previous JSON result file')
+    return p
+
+
+def histogram_result(histogram: LatencyHistogram, nb: int, elapsed: float) -> dict:
+    counts, total, max_value = histogram.snapshot()
+    return {'count': nb, 'throughput': nb / elapsed if elapsed > 0. else 0.,
+            'p50': LatencyHistogram.percentile(counts, 0.5), 'p90': LatencyHistogram.percentile(counts, 0.9),
+            'p99': LatencyHistogram.percentile(counts, 0.99), 'max': max_value}
+
+
+def build_profile(opts) -> TrafficProfile:
+    if opts.raw_log is not None:
+        profile = TrafficProfile.from_raw_log(opts.raw_log)
+    else:
+        profile = TrafficProfile.from_generated(opts.sources)
+    if opts.iso_tp_rate > 0.:
+        profile.add_iso_tp(126464, 40, opts.iso_tp_rate, 300)
+    profile.scale(opts.rate_scale)
+    return profile
+
+
+def components_benchmark(opts) -> dict:
+    """
+    Process the frames in the benchmark thread, the throughput is the processing capacity of each component
+    """
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    initialize_feature()
+    profile = build_profile(opts)
+    fp_pgns = {stream.pgn for stream in profile.streams if stream.fast_packet}
+    generator = TrafficGenerator(profile, opts.frame_rate, opts.error_rate)
+    frames = [Message(arbitration_id=can_id, is_extended_id=True, data=data)
+              for t, can_id, data in generator.frames(opts.duration)]
+    results = {'generator': {'messages': generator.nb_messages, 'frames': generator.nb_frames,
+                             'errors': sum(generator.nb_errors.values())}}
+    # Fast Packet reassembly alone
+    fp_handler = FastPacketHandler(None)
+    fp_histogram = LatencyHistogram('fast_packet', 'bench')
+    nb_fp = nb_fp_messages = 0
+    start = time.perf_counter()
+    for frame in frames:
+        pgn = (frame.arbitration_id >> 8) & 0x1FFFF
+        if pgn not in fp_pgns:
+            continue
+        stamp = time.monotonic_ns()
+        try:
+            if fp_handler.process_frame(pgn, frame.arbitration_id & 0xFF, frame.data) is not None:
+                nb_fp_messages += 1
+        except Exception:
+            pass
+        fp_histogram.record_since(stamp)
+        nb_fp += 1
+    results['fast_packet'] = histogram_result(fp_histogram, nb_fp, time.perf_counter() - start)
+    results['fast_packet']['messages'] = nb_fp_messages
+    # full receive path of the CAN interface (Fast Packet and ISO-TP)
+    out_queue = queue.Queue()
+    can_if = SocketCANInterface('bench', out_queue, bus_interface='virtual')
+    can_histogram = LatencyHistogram('can_receive', 'bench')
+    start = time.perf_counter()
+    for frame in frames:
+        stamp = time.monotonic_ns()
+        can_if.process_receive_msg(frame)
+        can_histogram.record_since(stamp)
+    results['can_receive'] = histogram_result(can_histogram, len(frames), time.perf_counter() - start)
+    results['can_receive']['messages'] = out_queue.qsize()
+    results['can_receive']['drops'] = generator.nb_messages - out_queue.qsize()
+    return results
+
+
+def scrape(port: int) -> str:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=2.0) as response:
+        return response.read().decode()
+
+
+def metric(text: str, name: str, labels: str = '') -> float:
+    total = 0.
+    for match in re.finditer(r'^%s\{[^}]*%s[^}]*\} (\S+)$' % (re.escape(name), labels), text, re.MULTILINE):
+        total += float(match.group(1))
+    return total
+
+
+def router_benchmark(opts) -> dict:
+    """
+    Run the router fed by the traffic generator, the throughput is the actual message rate at each stage
+    """
+    start_delay = 3.
+    with tempfile.TemporaryDirectory() as work_dir:
+        settings = os.path.join(work_dir, 'benchmark.yml')
+        with open(settings, 'w') as fd:
+            fd.write(ROUTER_SETTINGS.format(work_dir=work_dir, grpc_port=opts.grpc_port,
+                                            metrics_port=opts.metrics_port, sources=opts.sources,
+                                            rate_scale=opts.rate_scale, iso_tp_rate=opts.iso_tp_rate,
+                                            error_rate=opts.error_rate, frame_rate=opts.frame_rate,
+                                            duration=opts.duration, start_delay=start_delay))
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen([sys.executable, os.path.join(root, 'run_server.py'), '--settings', settings],
+                                  cwd=root, env=dict(os.environ, PYTHONPATH=root),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            time.sleep(start_delay + opts.duration + 3.)
+            if server.poll() is not None:
+                raise RuntimeError(f"router stopped with code {server.returncode}")
+            text = scrape(opts.metrics_port)
+            with grpc.insecure_channel(f"127.0.0.1:{opts.grpc_port}") as channel:
+                report = NavigationConsoleStub(channel).GetLatency(Request(id=1), timeout=5.0)
+        finally:
+            server.terminate()
+            try:
+                server.wait(10.)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    results = {'generator': {'messages': metric(text, 'navigation_generator_messages_total'),
+                             'frames': metric(text, 'navigation_generator_frames_total'),
+                             'errors': metric(text, 'navigation_generator_errors_total')},
+               'can_frames_in': metric(text, 'navigation_can_frames_in_total'),
+               'publisher_lost': metric(text, 'navigation_publisher_messages_lost_total')}
+    previous = results['generator']['messages']
+    for histogram in sorted(report.histograms, key=lambda h: PIPELINE_STAGES.index(h.stage)):
+        results[f"{histogram.stage}:{histogram.owner}"] = {
+            'count': histogram.count, 'throughput': histogram.count / opts.duration, 'drops': previous - histogram.count,
+            'p50': histogram.p50, 'p90': histogram.p90, 'p99': histogram.p99, 'max': histogram.max}
+        previous = histogram.count
+    return results
+
+
+def print_results(title: str, results: dict, reference: dict = None):
+    print(title)
+    for component, values in results.items():
+        if not isinstance(values, dict):
+            print(f"  {component:40s} {values:.0f}")
+            continue
+        line = ' '.join(f"{key}={value:.0f}" for key, value in values.items())
+        if reference is not None and component in reference and 'throughput' in values:
+            old = reference[component].get('throughput', 0.)
+            if old > 0.:
+                line += f" (throughput {(values['throughput'] - old) / old * 100:+.1f}%)"
+        print(f"  {component:40s} {line}")
+
+
+def main():
+    opts = _parser().parse_args()
+    # the injected errors are logged by the receive path
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    reference = {}
+    if opts.compare is not None:
+        with open(opts.compare) as fd:
+            reference = json.load(fd)
+    results = {'components': components_benchmark(opts)}
+    print_results("Components (processing capacity, latency in us per frame)", results['components'],
+                  reference.get('components'))
+    if opts.router:
+        results['router'] = router_benchmark(opts)
+        print_results("Router (message rate, latency in us since the frame reception)", results['router'],
+                      reference.get('router'))
+    if opts.output is not None:
+        with open(opts.output, 'w') as fd:
+            json.dump(results, fd, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+#-------------------------------------------------------------------------------
+# Name:        network_state_test
+# Purpose:     Check the NetworkManager/ModemManager state cache against mock D-Bus object trees
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   The mock trees reproduce the objects read by the cache: NetworkManager root object, devices, active
+#   connections, IP4 configurations and settings connections, the ModemManager object manager with a modem and
+#   its SIM. The signals are emitted by the trees as the daemons do (PropertiesChanged, DeviceAdded/Removed,
+#   NewConnection, InterfacesAdded/Removed, NameOwnerChanged)
+
+import logging
+import sys
+import time
+
+from navigation_server.router_common import MockDBusTree, MockDBusConnection, DBusException, dbus_variant
+from navigation_server.router_common.dbus_client import ERROR_SERVICE_UNKNOWN
+from navigation_server.network.network_state import (NetworkStateCache, NetworkStateListener, NM_SERVICE, NM_PATH,
+                                                     NM_INTERFACE, DEVICE_INTERFACE, ACTIVE_CONNECTION_INTERFACE,
+                                                     IP4CONFIG_INTERFACE, SETTINGS_PATH, SETTINGS_INTERFACE,
+                                                     SETTINGS_CONNECTION_INTERFACE, MM_SERVICE, MM_PATH,
+                                                     MODEM_INTERFACE, MODEM_3GPP_INTERFACE, SIM_INTERFACE,
+                                                     OBJECT_MANAGER_INTERFACE, BUS_SERVICE, BUS_PATH)
+from navigation_server.network.nmcli_interface import NetworkManagerControl
+from navigation_server.network.mmcli_interface import ModemControl
+
+DEVICES = NM_PATH + '/Devices/'
+ACTIVE = NM_PATH + '/ActiveConnection/'
+IP4 = NM_PATH + '/IP4Config/'
+MODEM0 = MM_PATH + '/Modem/0'
+SIM0 = MM_PATH + '/SIM/0'
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+def address_data(address: str, prefix: int) -> list:
+    return [{'address': ('s', address), 'prefix': ('u', prefix)}]
+
+
+class ServiceTree(MockDBusTree):
+    """
+    Object tree of a daemon that can be stopped
+    """
+
+    def __init__(self, service):
+        super().__init__(service)
+        self.running = True
+
+    def handle_call(self, path: str, interface: str, member: str, body: tuple) -> tuple:
+        if not self.running:
+            raise DBusException(ERROR_SERVICE_UNKNOWN, self.service)
+        return super().handle_call(path, interface, member, body)
+
+
+class MockNetworkManager:
+
+    def __init__(self):
+        self.tree = ServiceTree(NM_SERVICE)
+        self.settings = {}
+        self.tree.add_object(NM_PATH, {NM_INTERFACE: {
+            'Version': '1.42.4', 'State': ('u', 70), 'Connectivity': ('u', 4),
+            'Devices': ('ao', [DEVICES + '1', DEVICES + '2']), 'PrimaryConnection': ('o', ACTIVE + '1'),
+            'ActiveConnections': ('ao', [ACTIVE + '1'])}})
+        self.add_device(1, 'eth0', 1, 100, ACTIVE + '1', IP4 + '1')
+        self.add_device(2, 'wlan0', 2, 30, '/', '/')
+        self.tree.add_object(ACTIVE + '1', {ACTIVE_CONNECTION_INTERFACE: {
+            'Id': 'wan', 'State': ('u', 2), 'Connection': ('o', SETTINGS_PATH + '/1')}})
+        self.tree.add_object(IP4 + '1', {IP4CONFIG_INTERFACE: {
+            'AddressData': ('aa{sv}', address_data('192.168.1.20', 24)), 'Gateway': '192.168.1.1'}})
+        settings = self.tree.add_object(SETTINGS_PATH)
+        settings.add_method(SETTINGS_INTERFACE, 'ListConnections',
+                            lambda: ('ao', ([SETTINGS_PATH + '/' + str(n) for n in self.settings],)))
+        self.add_connection(1, 'wan', 'eth0', '802-3-ethernet', 'auto', None)
+        self.add_connection(2, 'hotspot', 'wlan0', '802-11-wireless', 'shared', ('10.42.0.1', 24))
+
+    def add_device(self, num, name, device_type, state, active, ip4):
+        self.tree.add_object(DEVICES + str(num), {DEVICE_INTERFACE: {
+            'Interface': name, 'DeviceType': ('u', device_type), 'State': ('u', state),
+            'ActiveConnection': ('o', active), 'Ip4Config': ('o', ip4)}})
+
+    def add_connection(self, num, name, interface, conn_type, method, address):
+        ipv4 = {'method': ('s', method)}
+        if address is not None:
+            ipv4['address-data'] = ('aa{sv}', address_data(*address))
+        settings = {'connection': {'id': ('s', name), 'interface-name': ('s', interface),
+                                   'type': ('s', conn_type)},
+                    'ipv4': ipv4, 'ipv6': {'method': ('s', 'auto')}}
+        if conn_type == '802-11-wireless':
+            settings['802-11-wireless'] = {'ssid': ('ay', b'navigation'), 'mode': ('s', 'ap')}
+        self.settings[num] = settings
+        obj = self.tree.add_object(SETTINGS_PATH + '/' + str(num))
+        obj.add_method(SETTINGS_CONNECTION_INTERFACE, 'GetSettings', lambda: ('a{sa{sv}}', (settings,)))
+
+    def signal(self, path, interface, member, signature, body):
+        self.tree.emit_signal(path, interface, member, signature, body)
+
+
+class MockModemManager:
+
+    def __init__(self):
+        self.tree = MockDBusTree(MM_SERVICE)
+        self.modems = {}
+        root = self.tree.add_object(MM_PATH)
+        root.add_method(OBJECT_MANAGER_INTERFACE, 'GetManagedObjects', self.managed_objects)
+        self.tree.add_object(SIM0, {SIM_INTERFACE: {
+            'Imsi': '208011234567890', 'SimIdentifier': '8933012345678901234', 'OperatorName': 'Orange F',
+            'OperatorIdentifier': '20801'}})
+        self.add_modem(MODEM0)
+
+    def modem_interfaces(self, path) -> dict:
+        obj = self.tree.get_object(path)
+        return {interface: {name: dbus_variant(value) for name, value in properties.items()}
+                for interface, properties in obj.properties.items()}
+
+    def managed_objects(self):
+        return 'a{oa{sa{sv}}}', ({path: self.modem_interfaces(path) for path in self.modems},)
+
+    def add_modem(self, path, emit=False):
+        self.tree.add_object(path, {
+            MODEM_INTERFACE: {'Manufacturer': 'Quectel', 'Model': 'EG25', 'Revision': 'EG25GGBR07A08M2G',
+                              'EquipmentIdentifier': '861234567890123', 'State': ('i', 8),
+                              'SignalQuality': ('(ub)', (60, True)), 'AccessTechnologies': ('u', 1 << 14),
+                              'Sim': ('o', SIM0)},
+            MODEM_3GPP_INTERFACE: {'Imei': '861234567890123', 'RegistrationState': ('u', 1),
+                                   'OperatorCode': '20801', 'OperatorName': 'Orange F'}})
+        self.modems[path] = True
+        if emit:
+            self.tree.emit_signal(MM_PATH, OBJECT_MANAGER_INTERFACE, 'InterfacesAdded', 'oa{sa{sv}}',
+                                  (path, self.modem_interfaces(path)))
+
+    def remove_modem(self, path):
+        del self.modems[path]
+        self.tree.emit_signal(MM_PATH, OBJECT_MANAGER_INTERFACE, 'InterfacesRemoved', 'oas',
+                              (path, [MODEM_INTERFACE, MODEM_3GPP_INTERFACE]))
+
+
+def check_cache() -> bool:
+    ok = True
+    nm = MockNetworkManager()
+    mm = MockModemManager()
+    bus = MockDBusTree(BUS_SERVICE)
+    connection = MockDBusConnection(nm.tree, mm.tree, bus)
+    state = NetworkStateCache(connection)
+    state.start()
+    listener = NetworkStateListener()
+    state.add_listener(listener)
+    # initial model
+    ok &= check(state.nm_running and state.nm_state == 'connected' and state.connectivity == 'full', "NM state")
+    ok &= check(state.primary_connection == 'wan', "primary connection")
+    eth0 = state.device('eth0')
+    ok &= check(eth0.type == 'ethernet' and eth0.state == 'connected' and eth0.connection == 'wan', f"eth0 {eth0}")
+    ok &= check(eth0.ip4_address == '192.168.1.20/24', f"eth0 address {eth0.ip4_address}")
+    ok &= check(state.device('wlan0').connection == '', "wlan0 not connected")
+    hotspot = state.connection_by_name('hotspot')
+    ok &= check(hotspot.get_property('ipv4.method') == 'shared' and hotspot.ipv4_address == '10.42.0.1/24',
+                "hotspot connection")
+    ok &= check(hotspot.get_property('802-11-wireless.ssid') == 'navigation', "SSID")
+    modem = state.modem(0)
+    ok &= check(modem.manufacturer == 'Quectel' and modem.state == 'registered' and modem.registration == 'home',
+                "modem state")
+    ok &= check(modem.signal_quality == 60 and modem.access_technologies == 'lte', "modem signal")
+    ok &= check(modem.sim is not None and modem.sim.imsi == '208011234567890', "SIM")
+    # reads are served from memory
+    nb_calls = nm.tree.nb_calls + mm.tree.nb_calls
+    nb = 100000
+    start = time.perf_counter()
+    for i in range(nb):
+        state.device('eth0').state
+        state.connectivity
+        state.modem(0).signal_quality
+    elapsed = (time.perf_counter() - start) / nb
+    ok &= check(nm.tree.nb_calls + mm.tree.nb_calls == nb_calls, "no D-Bus call on reads")
+    print(f"Cached network state read (device, connectivity, signal) {elapsed * 1e6:.2f}µs")
+    # device state and connection changes
+    listener.get_changes(0)
+    nm.tree.add_object(ACTIVE + '2', {ACTIVE_CONNECTION_INTERFACE: {'Id': 'hotspot', 'State': ('u', 1)}})
+    nm.tree.set_properties(DEVICES + '2', DEVICE_INTERFACE,
+                           {'State': ('u', 40), 'ActiveConnection': ('o', ACTIVE + '2')})
+    ok &= check(state.device('wlan0').state == 'connecting (prepare)', "wlan0 connecting")
+    ok &= check(state.device('wlan0').connection == 'hotspot', "wlan0 connection")
+    nm.tree.set_properties(DEVICES + '2', DEVICE_INTERFACE, {'State': ('u', 100)})
+    nm.tree.set_properties(NM_PATH, NM_INTERFACE, {'Connectivity': ('u', 3)})
+    ok &= check(state.connectivity == 'limited', "connectivity change")
+    changes = listener.get_changes(0)
+    ok &= check(sorted(changes) == [('connectivity', 'NetworkManager'), ('device', 'wlan0')],
+                f"coalesced changes {changes}")
+    # IP address change on the connected device
+    nm.tree.set_properties(IP4 + '1', IP4CONFIG_INTERFACE,
+                           {'AddressData': ('aa{sv}', address_data('10.0.0.5', 8))})
+    ok &= check(state.device('eth0').ip4_address == '10.0.0.5/8', "address change")
+    # device disconnected, active connection no longer kept
+    nm.tree.set_properties(DEVICES + '1', DEVICE_INTERFACE, {'State': ('u', 30), 'ActiveConnection': ('o', '/'),
+                                                            'Ip4Config': ('o', '/')})
+    ok &= check(state.device('eth0').connection == '' and state.device('eth0').ip4_address == '', "eth0 down")
+    # device added and removed
+    nm.add_device(3, 'wwan0', 8, 20, '/', '/')
+    nm.signal(NM_PATH, NM_INTERFACE, 'DeviceAdded', 'o', (DEVICES + '3',))
+    ok &= check(state.device('wwan0').type == 'gsm', "device added")
+    nm.signal(NM_PATH, NM_INTERFACE, 'DeviceRemoved', 'o', (DEVICES + '3',))
+    try:
+        state.device('wwan0')
+        ok &= check(False, "device removed")
+    except KeyError:
+        pass
+    # new connection
+    nm.add_connection(3, 'cellular', 'cdc-wdm0', 'gsm', 'auto', None)
+    nm.signal(SETTINGS_PATH, SETTINGS_INTERFACE, 'NewConnection', 'o', (SETTINGS_PATH + '/3',))
+    ok &= check('cellular' in [c.name for c in state.connections()], "new connection")
+    # modem signal and registration
+    listener.get_changes(0)
+    mm.tree.set_properties(MODEM0, MODEM_INTERFACE, {'SignalQuality': ('(ub)', (35, True))})
+    ok &= check(state.modem(0).signal_quality == 35, "signal quality change")
+    ok &= check(listener.get_changes(0) == [('signal', '0')], "signal event")
+    mm.tree.set_properties(MODEM0, MODEM_3GPP_INTERFACE, {'RegistrationState': ('u', 5)})
+    ok &= check(state.modem(0).registration == 'roaming', "registration change")
+    ok &= check(listener.get_changes(0) == [('modem', '0')], "modem event")
+    # modem removed then added
+    mm.remove_modem(MODEM0)
+    ok &= check(state.modems() == [], "modem removed")
+    mm.add_modem(MODEM0, emit=True)
+    ok &= check(len(state.modems()) == 1 and state.modem(0).operator_name == 'Orange F', "modem added")
+    # NetworkManager stop and restart
+    nm.tree.running = False
+    bus.emit_signal(BUS_PATH, BUS_SERVICE, 'NameOwnerChanged', 'sss', (NM_SERVICE, ':1.5', ''))
+    ok &= check(not state.nm_running and state.devices() == [], "NetworkManager stopped")
+    nm.tree.running = True
+    bus.emit_signal(BUS_PATH, BUS_SERVICE, 'NameOwnerChanged', 'sss', (NM_SERVICE, '', ':1.9'))
+    ok &= check(state.nm_running and len(state.devices()) == 2, "NetworkManager restarted")
+    # nmcli and mmcli interfaces on the cache
+    control = NetworkManagerControl(state)
+    control.check_network_manager(wait=False)
+    ok &= check(control.nm_running, "NetworkManagerControl running")
+    control.get_networking_conf()
+    ok &= check(control.get_device('wlan0').state == 'connected', "NetworkManagerControl device")
+    ok &= check(control.get_connection('hotspot').ipv4_method == 'shared', "NetworkManagerControl connection")
+    modems = ModemControl(state)
+    modems.detect()
+    ok &= check(modems.nb_modems() == 1 and modems.get_modem(0).active_sim.imsi == '208011234567890',
+                "ModemControl")
+    state.close()
+    connection.close()
+    if ok:
+        print("Network state cache check OK")
+    return ok
+
+
+def main():
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    return 0 if check_cache() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,386 @@
+#-------------------------------------------------------------------------------
+# Name:        nmea0183_framing_test
+# Purpose:     Fuzz corpus and throughput benchmark of the NMEA0183 framing, checksum
+#              validation and talker/formatter index
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   The corpus is generated from a seed (or read with -c, one line per entry, written with -w):
+#   valid sentences ($, ! with AIS fragments, proprietary, TAG blocks) and mutations of them (bit flips, deleted,
+#   inserted or duplicated characters, truncation, garbage before the delimiter, LF only, overlong lines)
+#   Checks:
+#   - checksum against the byte by byte reduction for all lengths
+#   - each entry is accepted or rejected with NMEAInvalidFrame only, as the reference validation does
+#   - the framer gives the same messages whatever the split of the stream in receive buffers
+#   - the index codes are stable and the filters and statistics use them
+#   Benchmark: separator search + NMEA0183Msg as it was (reduce checksum, copies) against NMEA0183Framer, then
+#   talker/formatter filter and statistics on bytes against the index codes
+
+import logging
+import operator
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from functools import reduce
+
+from navigation_server.router_common import NavGenericMsg, N0183_MSG
+from navigation_server.router_core import (NMEA0183Msg, NMEAInvalidFrame, NMEA0183Framer, NMEA0183Index,
+                                           nmea0183_checksum)
+from navigation_server.router_core.nmea0183_framing import MAX_SENTENCE_LENGTH
+from navigation_server.router_common.configuration import Parameters
+from navigation_server.nmea0183.nmea0183_filters import NMEA0183Filter
+from navigation_server.nmea_data.nmea_statistics import NMEA183Statistics
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-s', '--seed', action='store', type=int, default=40, help='Corpus seed')
+    p.add_argument('-n', '--entries', action='store', type=int, default=20000, help='Number of corpus entries')
+    p.add_argument('-c', '--corpus', action='store', type=str, default=None, help='Read the corpus from a file')
+    p.add_argument('-w', '--write', action='store', type=str, default=None, help='Write the corpus to a file')
+    p.add_argument('-r', '--runs', action='store', type=int, default=5, help='Benchmark runs, the best one is kept')
+    return p
+
+
+def with_checksum(body: str, delimiter: str = '$') -> bytes:
+    return f"{delimiter}{body}*{reduce(operator.xor, body.encode(), 0):02X}".encode()
+
+
+def tag_block(params: str) -> bytes:
+    return f"\\{params}*{reduce(operator.xor, params.encode(), 0):02X}\\".encode()
+
+
+def valid_sentences(rng: random.Random) -> list:
+    sentences = []
+    for i in range(50):
+        utc = f"{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}{rng.randint(0, 59):02d}.00"
+        sentences.append(with_checksum(f"GPRMC,{utc},A,4733.{rng.randint(0, 9999):04d},N,00300.7500,W,"
+                                       f"{rng.uniform(0, 10):.2f},{rng.uniform(0, 360):.1f},140725,,,A,V"))
+        sentences.append(with_checksum(f"GNGGA,{utc},4733.7920,N,00300.7500,W,1,12,0.82,12.4,M,49.6,M,,"))
+        sentences.append(with_checksum(f"IIMWV,{rng.uniform(0, 360):.1f},R,{rng.uniform(0, 30):.1f},N,A"))
+        sentences.append(with_checksum(f"IIHDG,{rng.uniform(0, 360):.1f},,,1.2,W"))
+        sentences.append(with_checksum(f"PGRME,{rng.uniform(0, 9):.1f},M,{rng.uniform(0, 9):.1f},M,3.1,M"))
+        sentences.append(with_checksum(f"AIVDM,2,1,{i % 10},A,55NBsP01;gC0?<ClL00l4ppDr0@<Tp8400000017:`"
+                                       f"9?<4i0PG02@CQDU`88888888888880,0", '!'))
+        sentences.append(with_checksum(f"AIVDM,2,2,{i % 10},A,88888888880,2", '!'))
+        sentences.append(with_checksum("AIVDO,1,1,,,B3aEOK00000000000000000000000,0", '!'))
+        sentences.append(tag_block(f"s:r{rng.randint(1000, 9999)},c:{1750000000 + i}") +
+                         with_checksum(f"GPGLL,4733.7920,N,00300.7500,W,{utc},A,A"))
+        sentences.append(with_checksum("PSMDVER,1.7.2,MiniPlex-3E,12345678,1234"))
+    return sentences
+
+
+def mutate(rng: random.Random, line: bytes) -> bytes:
+    line = bytearray(line)
+    kind = rng.randrange(9)
+    position = rng.randrange(len(line))
+    if kind == 0:
+        line[position] ^= 1 << rng.randrange(8)
+    elif kind == 1:
+        del line[position]
+    elif kind == 2:
+        line.insert(position, rng.choice(b'$!*,\\\r0A~ '))
+    elif kind == 3:
+        line = line[:position]
+    elif kind == 4:
+        line = bytearray(rng.randbytes(rng.randint(1, 8)).replace(b'\n', b'') + line)
+    elif kind == 5:
+        line[position:position] = line[position:position + rng.randint(1, 10)]
+    elif kind == 6:
+        line = line * rng.randint(6, 12)
+    elif kind == 7:
+        line[-2:] = bytes(f"{rng.randrange(256):02x}".encode())
+    else:
+        line = bytearray(rng.randbytes(rng.randint(1, 100)).replace(b'\n', b''))
+    return bytes(line)
+
+
+def generate_corpus(seed: int, entries: int) -> list:
+    rng = random.Random(seed)
+    valid = valid_sentences(rng)
+    corpus = []
+    for i in range(entries):
+        line = rng.choice(valid)
+        if rng.random() < 0.4:
+            line = mutate(rng, line)
+        corpus.append(line)
+    return corpus
+
+
+#
+#   reference processing, as the router was doing before the single pass framing
+#
+
+def reference_valid(line: bytes) -> bool:
+    if len(line) > 0 and line[0] == 0x5c:
+        end = line.find(b'\\', 1)
+        if end == -1:
+            return False
+        tag = line[1:end]
+        star = tag.rfind(b'*')
+        if star != -1:
+            try:
+                if star != len(tag) - 3 or int(tag[star + 1:], 16) != reduce(operator.xor, tag[:star], 0):
+                    return False
+            except ValueError:
+                return False
+        line = line[end + 1:]
+    if len(line) < 4 or line[0] not in b'$!' or line[-3] != 0x2a:
+        return False
+    try:
+        checksum = int(line[-2:], 16)
+    except ValueError:
+        return False
+    if not all(c in b'0123456789ABCDEFabcdef' for c in line[-2:]):
+        return False
+    if checksum != reduce(operator.xor, line[1:-3], 0):
+        return False
+    comma = line.find(b',', 1, len(line) - 3)
+    address = line[1:comma] if comma != -1 else line[1:-3]
+    return 2 < len(address) < 12 and address.isalnum()
+
+
+class LegacyMsg(NavGenericMsg):
+    """
+    NMEA0183Msg processing before the single pass framing
+    """
+    __slots__ = ('_checksum', '_datalen_s', '_ts', '_delimiter', '_address', '_datafields_s')
+
+    def __init__(self, data):
+        super().__init__(N0183_MSG, raw=data)
+        if self._raw[self._datalen - 3] != ord('*'):
+            raise NMEAInvalidFrame
+        self._checksum = int(self._raw[self._datalen - 2:self._datalen], 16)
+        if self._checksum != reduce(operator.xor, self._raw[1:self._datalen - 3], 0):
+            raise NMEAInvalidFrame
+        self._datalen_s = self._datalen - 3
+        self._ts = time.time()
+        self._delimiter = self._raw[0]
+        ind_comma = self._raw.index(b',')
+        self._datafields_s = ind_comma + 1
+        self._address = self._raw[1: ind_comma]
+
+    def talker(self):
+        return self._address[:2]
+
+    def formatter(self):
+        return self._address[2:]
+
+
+def legacy_framing(buffers) -> int:
+    # separator search and copy of IPAsynchReader then process_nmea0183_frame
+    count = 0
+    part = bytearray()
+    for buffer in buffers:
+        start = 0
+        end = len(buffer)
+        if len(part) > 0 and part[-1] == 0x0d and buffer[0] == 0x0a:
+            # CR LF split between the buffers
+            frame = part[:-1]
+            part = bytearray()
+            start = 1
+            if len(frame) > 0 and frame[0] in b'$!':
+                try:
+                    LegacyMsg(frame)
+                    count += 1
+                except (NMEAInvalidFrame, ValueError):
+                    pass
+        while start < end:
+            index = buffer.find(b'\r\n', start, end)
+            if index == -1:
+                part.extend(buffer[start:end])
+                break
+            if len(part) > 0:
+                frame = part + buffer[start:index]
+                part = bytearray()
+            else:
+                frame = bytearray(buffer[start:index])
+            start = index + 2
+            if len(frame) == 0 or frame[0] not in b'$!':
+                continue
+            try:
+                LegacyMsg(frame)
+                count += 1
+            except (NMEAInvalidFrame, ValueError):
+                continue
+    return count
+
+
+def framer_framing(buffers) -> int:
+    framer = NMEA0183Framer()
+    count = 0
+    for buffer in buffers:
+        count += len(framer.messages(buffer))
+    return count
+
+
+def legacy_consumers(messages) -> int:
+    # NMEA0183Filter and NMEA183Statistics as they were
+    talker = b'GN'
+    formatter = b'GGA'
+    entries = {}
+    selected = 0
+    for msg in messages:
+        if talker == msg.talker() and formatter == msg.formatter():
+            selected += 1
+        key = str(msg.talker() + msg.formatter())
+        entries[key] = entries.get(key, 0) + 1
+    return selected
+
+
+def indexed_consumers(messages) -> int:
+    gga_filter = NMEA0183Filter(Parameters({'name': 'gga', 'talker': 'GN', 'formatter': 'GGA', 'type': 'select'}))
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    stats = NMEA183Statistics()
+    selected = 0
+    for msg in messages:
+        if gga_filter.process_nmea0183(msg):
+            selected += 1
+        stats.add_msg(msg)
+    return selected
+
+
+def split_stream(rng: random.Random, stream: bytes, max_size: int) -> list:
+    buffers = []
+    start = 0
+    while start < len(stream):
+        size = rng.randint(1, max_size)
+        buffers.append(stream[start:start + size])
+        start += size
+    return buffers
+
+
+def best_time(function, data, runs: int) -> tuple:
+    best = None
+    result = None
+    for r in range(runs):
+        start = time.perf_counter()
+        result = function(data)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def main():
+    opts = _parser().parse_args()
+    # the invalid frames are logged by NMEA0183Msg
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    ok = True
+    if opts.corpus is not None:
+        with open(opts.corpus, 'rb') as fd:
+            corpus = [line.rstrip(b'\r\n') for line in fd]
+    else:
+        corpus = generate_corpus(opts.seed, opts.entries)
+        if opts.write is not None:
+            with open(opts.write, 'wb') as fd:
+                fd.write(b'\r\n'.join(corpus) + b'\r\n')
+
+    # checksum
+    rng = random.Random(opts.seed)
+    for length in range(300):
+        data = rng.randbytes(length)
+        if nmea0183_checksum(data) != reduce(operator.xor, data, 0) or \
+                nmea0183_checksum(memoryview(bytearray(data))) != reduce(operator.xor, data, 0):
+            print(f"Checksum error for length {length}")
+            ok = False
+            break
+
+    # each corpus entry
+    accepted = 0
+    errors = 0
+    for line in corpus:
+        expected = reference_valid(line)
+        try:
+            msg = NMEA0183Msg(line + b'\r\n')
+            result = True
+            msg.fields()
+        except NMEAInvalidFrame:
+            result = False
+        except Exception as err:
+            if errors < 5:
+                print(f"Exception {err!r} on {line}")
+            errors += 1
+            continue
+        if result != expected:
+            if errors < 5:
+                print(f"Entry {line} accepted {result} reference {expected}")
+            errors += 1
+        accepted += result
+    print(f"Corpus: {len(corpus)} entries, {accepted} valid sentences, {errors} errors")
+    ok = ok and errors == 0
+
+    # framing over any split of the stream
+    stream = b''.join(line + (b'\r\n' if i % 7 else b'\n') for i, line in enumerate(corpus))
+    reference = [str(m) for m in NMEA0183Framer().messages(stream)]
+    for max_size in (1, 7, 64, 512, 4096):
+        framer = NMEA0183Framer()
+        messages = []
+        for buffer in split_stream(rng, stream, max_size):
+            messages.extend(str(m) for m in framer.messages(buffer))
+        if messages != reference:
+            print(f"Framing with buffers up to {max_size} bytes: {len(messages)} messages, {len(reference)} expected")
+            ok = False
+    print(f"Framing: {len(reference)} messages from the stream whatever the buffer sizes")
+
+    # index, filter and statistics
+    msg = NMEA0183Msg(with_checksum("GPRMC,1,2") + b'\r\n')
+    if msg.talker_code != NMEA0183Index.talker_code('GP') or \
+            msg.formatter_code != NMEA0183Index.formatter_code(b'RMC') or \
+            NMEA0183Index.address_entry(msg.address_code).address != b'GPRMC':
+        print("Index codes mismatch")
+        ok = False
+    rmc_filter = NMEA0183Filter(Parameters({'name': 'rmc', 'formatter': 'RMC', 'type': 'select'}))
+    hdg = NMEA0183Msg(with_checksum("IIHDG,1") + b'\r\n')
+    if not rmc_filter.process_nmea0183(msg) or rmc_filter.process_nmea0183(hdg):
+        print("Filter on formatter code failed")
+        ok = False
+    stats = NMEA183Statistics()
+    for m in (msg, hdg, msg):
+        stats.add_msg(m)
+    stats.add_entry('GP', 'RMC')
+    counts = {(e.talker, e.formatter): e.count for e in stats._entries.values()}
+    if counts != {('GP', 'RMC'): 3, ('II', 'HDG'): 1}:
+        print(f"Statistics {counts}")
+        ok = False
+
+    # throughput on valid traffic
+    # the lines longer than the maximum length are discarded by the framer
+    valid = [line for line in corpus if reference_valid(line) and line[0] != 0x5c and len(line) < MAX_SENTENCE_LENGTH]
+    stream = b''.join(line + b'\r\n' for line in valid)
+    for size in (512, 4096):
+        buffers = split_stream(random.Random(size), stream, size)
+        legacy, legacy_count = best_time(legacy_framing, buffers, opts.runs)
+        framer, framer_count = best_time(framer_framing, buffers, opts.runs)
+        print(f"Buffers up to {size} bytes: split and validate {legacy_count / legacy:.0f} msg/s "
+              f"single pass {framer_count / framer:.0f} msg/s gain {(legacy - framer) / legacy * 100:+.1f}%")
+        if legacy_count != framer_count:
+            print(f"Framing count mismatch {legacy_count} {framer_count}")
+            ok = False
+    # filter and statistics on the messages
+    legacy_messages = []
+    for line in valid:
+        try:
+            legacy_messages.append(LegacyMsg(bytearray(line)))
+        except (NMEAInvalidFrame, ValueError):
+            continue
+    messages = NMEA0183Framer().messages(stream)
+    legacy, legacy_count = best_time(legacy_consumers, legacy_messages, opts.runs)
+    indexed, indexed_count = best_time(indexed_consumers, messages, opts.runs)
+    print(f"Filter and statistics: bytes {len(legacy_messages) / legacy:.0f} msg/s "
+          f"codes {len(messages) / indexed:.0f} msg/s gain {(legacy - indexed) / legacy * 100:+.1f}%")
+    if legacy_count != indexed_count:
+        print(f"Filter count mismatch {legacy_count} {indexed_count}")
+        ok = False
+    print("NMEA0183 framing check", "OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#-------------------------------------------------------------------------------
+# Name:        sampling_profiler_overhead
+# Purpose:     Measure the overhead of the sampling profiler on NavThread workers
+#              and check the folded stacks
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+
+from navigation_server.router_common import (MessageServerGlobals, NavThread, NavThreadingController,
+                                             NavProfilingController)
+from navigation_server.router_core import NMEA2000Msg
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-r', '--rate', action='store', type=float, default=100., help='Sampling rate (Hz)')
+    p.add_argument('-t', '--threads', action='store', type=int, default=8, help='Number of worker threads')
+    p.add_argument('-d', '--duration', action='store', type=float, default=5.0, help='Duration of each run (s)')
+    p.add_argument('-o', '--output', action='store', type=str, default=None, help='Folded stacks output file')
+    return p
+
+
+def build_message(index: int) -> NMEA2000Msg:
+    payload = bytearray((index + i) & 0xFF for i in range(8))
+    return NMEA2000Msg(127250, 2, index & 0xFF, 255, payload)
+
+
+def decode_message(msg: NMEA2000Msg) -> int:
+    return sum(msg.payload) + msg.pgn
+
+
+class Worker(NavThread):
+    """
+    CPU bound worker, half of the workers also wait on a queue like the publishers
+    """
+
+    def __init__(self, name: str, stop_event: threading.Event, waiting: bool):
+        super().__init__(name=name, daemon=True)
+        self._stop_event = stop_event
+        self._waiting = waiting
+        self.iterations = 0
+
+    def nrun(self):
+        index = 0
+        while not self._stop_event.is_set():
+            decode_message(build_message(index))
+            index += 1
+            if self._waiting and index % 100 == 0:
+                self._stop_event.wait(0.001)
+        self.iterations = index
+
+
+def run_workers(nb_threads: int, duration: float) -> int:
+    stop_event = threading.Event()
+    workers = [Worker(f"Worker-{i}", stop_event, i % 2 == 1) for i in range(nb_threads)]
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop_event.set()
+    for worker in workers:
+        worker.join()
+    return sum(w.iterations for w in workers)
+
+
+def main():
+    opts = _parser().parse_args()
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    controller = MessageServerGlobals.thread_controller
+    ok = True
+
+    reference = run_workers(opts.threads, opts.duration)
+    controller.start_sampling(opts.rate)
+    sampled = run_workers(opts.threads, opts.duration)
+    profiler = controller.sampling_profiler
+    controller.stop_sampling()
+
+    load = profiler.cpu_load()
+    throughput_loss = (reference - sampled) / reference
+    print(f"Workers: {opts.threads} duration {opts.duration:.1f}s sampling rate {opts.rate:.0f}Hz")
+    print(f"Samples: {profiler.nb_samples} sampler cpu load {load * 100:.3f}% of one core")
+    print(f"Worker throughput: reference {reference / opts.duration:.0f}/s sampled {sampled / opts.duration:.0f}/s "
+          f"difference {throughput_loss * 100:.2f}% (noisy, informative only)")
+    if load >= 0.01:
+        print("Sampler overhead above 1%")
+        ok = False
+
+    lines = controller.dump_sampling()
+    folded = controller.sampling_profiler.folded_stacks('Worker-0')
+    if len(folded) != 1 or not any('sampling_profiler_overhead:build_message' in s for s in folded['Worker-0']):
+        print("Worker stacks missing in the samples")
+        ok = False
+    if any(line.startswith('SamplingProfiler') or line.startswith('MainThread') for line in lines):
+        print("Non NavThread sampled")
+        ok = False
+    print(f"Folded stack lines: {len(lines)}")
+    if opts.output is not None:
+        with open(opts.output, 'w') as fd:
+            fd.write('\n'.join(lines) + '\n')
+    print("Sampling profiler check", "OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+#-------------------------------------------------------------------------------
+# Name:        serial_ingest_benchmark
+# Purpose:     Replay serial captures (iKonvert !PDGY, Miniplex $MXPGN, NMEA0183) through a pseudo-terminal
+#              and compare the line by line read with the batch reader and framers
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   The captures are raw bytes as received on the serial line (-f, the format is detected from the content) or
+#   synthesized from the traffic generator (-w to save them). Each capture is written on the master side of a pty:
+#   - readline: readline on the serial port and decoding of each line as the couplers did it
+#   - batch: SerialBatchReader with the coupler framer (PDGYFramer, MXPGNFramer, NMEA0183Framer)
+#   The CPU time of the reading thread gives the capacity, the reads count the wake-ups
+#   Checks: both paths decode the same messages, the framing errors and overruns of corrupted captures are counted
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from base64 import b64encode
+
+import serial
+
+from navigation_server.router_common import (MessageServerGlobals, NavThreadingController, NavProfilingController,
+                                             NavGenericMsg, IncompleteMessage, N2K_MSG, N0183_MSG)
+from navigation_server.router_common.configuration import Parameters, NavigationConfiguration
+from navigation_server.router_core import NMEA0183Msg, NMEA0183Framer, NMEA0183Sentences, NMEAInvalidFrame
+from navigation_server.nmea2000_datamodel import initialize_feature, PGNDef
+from navigation_server.nmea2000 import FastPacketHandler
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-f', '--capture', action='append', default=[], help='Raw serial capture file (repeatable)')
+    p.add_argument('-w', '--write', action='store', type=str, default=None,
+                   help='Directory to write the synthesized captures')
+    p.add_argument('-d', '--duration', action='store', type=float, default=60.,
+                   help='Duration of the synthesized traffic (s)')
+    p.add_argument('-n', '--sources', action='store', type=int, default=5, help='NMEA2000 sources')
+    p.add_argument('-s', '--seed', action='store', type=int, default=0, help='Random seed')
+    p.add_argument('-c', '--chunk', action='store', type=int, default=256, help='Write size on the pty')
+    p.add_argument('-b', '--batch_delay', action='store', type=float, default=0.01, help='Batch reader delay (s)')
+    return p
+
+
+_failures = 0
+
+
+def check(cond: bool, text: str):
+    global _failures
+    if cond:
+        print(f"{text} check OK")
+    else:
+        print(f"{text} check FAILED")
+        _failures += 1
+
+
+#
+#   Captures synthesis
+#
+
+def sentence(body: bytes) -> bytes:
+    return b'%s*%02X\r\n' % (body, NMEA0183Sentences.b_checksum(body[1:]))
+
+
+def synthesize_n2k(opts) -> tuple:
+    """
+    return the (PDGY, MXPGN) captures of the same NMEA2000 traffic
+    """
+    from navigation_server.can_interface import TrafficProfile, TrafficGenerator
+    generator = TrafficGenerator(TrafficProfile.from_generated(opts.sources, seed=opts.seed), frame_rate=0.,
+                                 seed=opts.seed)
+    fp_handler = FastPacketHandler(None)
+    pdgy = bytearray()
+    mxpgn = bytearray()
+    for t, can_id, data in generator.frames(opts.duration):
+        pgn_field = (can_id >> 8) & 0x1FFFF
+        sa = can_id & 0xFF
+        prio = (can_id >> 26) & 7
+        attribute = (prio << 12) | (len(data) << 8) | sa
+        mxpgn += sentence(b'$MXPGN,%06X,%04X,%s' % (pgn_field, attribute, bytes(data[::-1]).hex().upper().encode()))
+        pgn, da = PGNDef.pgn_pdu1_adjust(pgn_field)
+        if PGNDef.fast_packet_check(pgn):
+            data = fp_handler.process_frame(pgn, sa, data)
+            if data is None:
+                continue
+        pdgy += b'!PDGY,%d,%d,%d,%d,%.3f,%s\r\n' % (pgn, prio, sa, da, t, b64encode(bytes(data)))
+    return bytes(pdgy), bytes(mxpgn)
+
+
+def synthesize_nmea0183(opts) -> bytes:
+    rng = random.Random(opts.seed)
+    capture = bytearray()
+    for i in range(int(opts.duration * 40)):
+        kind = i % 4
+        if kind == 0:
+            body = b'$GPRMC,%06.2f,A,4807.%03d,N,01131.%03d,E,%.1f,%.1f,181025,,,A' % (
+                i % 86400 / 1.0, rng.randrange(1000), rng.randrange(1000), rng.random() * 10, rng.random() * 360)
+        elif kind == 1:
+            body = b'$IIMWV,%.1f,R,%.1f,N,A' % (rng.random() * 360, rng.random() * 30)
+        elif kind == 2:
+            body = b'$SDDPT,%.1f,0.5' % (rng.random() * 50)
+        else:
+            body = b'!AIVDM,1,1,,A,13u?etPv2;0n:dDPwUM1U1Cb069D,0'
+        capture += sentence(body)
+    return bytes(capture)
+
+
+def corrupt(capture: bytes, nb: int, seed: int) -> tuple:
+    """
+    Replace nb lines by invalid ones (wrong checksum or base64 data) and add an overlong line
+    return the capture, number of errors and overruns expected
+    """
+    rng = random.Random(seed)
+    lines = capture.split(b'\r\n')[:-1]
+    for index in rng.sample(range(len(lines)), nb):
+        line = lines[index]
+        if line.startswith(b'!PDGY'):
+            lines[index] = line[:line.rfind(b',') + 1] + b'!!!!'
+        else:
+            # the checksum is wrong
+            lines[index] = line[:-2] + (b'00' if line[-2:] != b'00' else b'01')
+    lines.insert(len(lines) // 2, b'$' + b'X' * 700)
+    return b'\r\n'.join(lines) + b'\r\n', nb, 1
+
+
+#
+#   Decoding paths
+#
+
+def build_mxpgn_coupler(name):
+    from navigation_server.couplers import ShipModulInterface
+    return ShipModulInterface(Parameters({'name': name, 'protocol': 'nmea2000', 'address': '127.0.0.1',
+                                          'port': 10110, 'direction': 'read_only'}))
+
+
+def legacy_decoder(kind: str):
+    if kind == 'PDGY':
+        from navigation_server.couplers.ikonvert import iKonvertMsg, N2K
+
+        def decode(line):
+            ik_msg = iKonvertMsg(line)
+            if ik_msg.type == N2K:
+                return NavGenericMsg(N2K_MSG, ik_msg.raw, ik_msg.msg)
+            return NavGenericMsg(N0183_MSG, ik_msg.raw)
+        return decode
+    elif kind == 'MXPGN':
+        from navigation_server.couplers import ShipModulInterface
+        coupler = build_mxpgn_coupler('mx-legacy')
+
+        def decode(line):
+            msg = NMEA0183Msg(line)
+            if msg.formatter() == b'PGN':
+                return ShipModulInterface.mxpgn_decode(coupler, msg)
+            return msg
+        return decode
+    return NMEA0183Msg
+
+
+def batch_framer(kind: str):
+    if kind == 'PDGY':
+        from navigation_server.couplers.ikonvert import PDGYFramer
+        return PDGYFramer()
+    elif kind == 'MXPGN':
+        from navigation_server.couplers.shipmodul_if import MXPGNFramer
+        return MXPGNFramer(build_mxpgn_coupler('mx-batch'))
+    return NMEA0183Framer()
+
+
+def message_key(msg):
+    if msg.type == N2K_MSG:
+        n2k = msg.msg
+        return n2k.pgn, n2k.sa, n2k.da, bytes(n2k.payload)
+    return bytes(msg.raw)
+
+
+class PtyReplay:
+    """
+    Write the capture on the master side of a pty, the serial port is open on the slave side
+    """
+
+    def __init__(self, capture: bytes, chunk: int):
+        self._master, self._slave = os.openpty()
+        self.port = serial.Serial(os.ttyname(self._slave), baudrate=230400, timeout=1.0)
+        self._capture = capture
+        self._chunk = chunk
+        self._writer = threading.Thread(target=self._write, daemon=True)
+
+    def _write(self):
+        view = memoryview(self._capture)
+        for start in range(0, len(view), self._chunk):
+            os.write(self._master, view[start:start + self._chunk])
+
+    def start(self):
+        self._writer.start()
+
+    def close(self):
+        self._writer.join()
+        self.port.close()
+        os.close(self._master)
+        os.close(self._slave)
+
+
+def run_readline(capture: bytes, kind: str, chunk: int) -> tuple:
+    decode = legacy_decoder(kind)
+    replay = PtyReplay(capture, chunk)
+    messages = []
+    errors = 0
+    nb_bytes = 0
+    reads = 0
+    cpu = time.thread_time()
+    replay.start()
+    while nb_bytes < len(capture):
+        line = replay.port.readline()
+        if len(line) == 0:
+            break
+        reads += 1
+        nb_bytes += len(line)
+        try:
+            messages.append(decode(line))
+        except IncompleteMessage:
+            continue
+        except (ValueError, IndexError, KeyError, NMEAInvalidFrame):
+            errors += 1
+    cpu = time.thread_time() - cpu
+    replay.close()
+    return messages, cpu, reads, errors, 0
+
+
+def run_batch(capture: bytes, kind: str, chunk: int, batch_delay: float) -> tuple:
+    from navigation_server.couplers.serial_framing import SerialBatchReader
+    framer = batch_framer(kind)
+    replay = PtyReplay(capture, chunk)
+    reader = SerialBatchReader(replay.port, framer, batch_delay)
+    messages = []
+    cpu = time.thread_time()
+    replay.start()
+    while reader.bytes < len(capture):
+        batch = reader.read_batch()
+        if batch is None:
+            break
+        messages.extend(batch)
+    cpu = time.thread_time() - cpu
+    replay.close()
+    return messages, cpu, reader.reads, framer.errors, framer.overruns
+
+
+def benchmark(name: str, capture: bytes, kind: str, opts):
+    legacy, legacy_cpu, legacy_reads, legacy_errors, _ = run_readline(capture, kind, opts.chunk)
+    batch, batch_cpu, batch_reads, errors, overruns = run_batch(capture, kind, opts.chunk, opts.batch_delay)
+    nb = len(batch)
+    print(f"{name}: {len(capture)} bytes {nb} messages")
+    print(f"  readline {len(legacy) / max(legacy_cpu, 1e-6):10.0f} msg/s CPU {legacy_reads:7d} reads")
+    print(f"  batch    {nb / max(batch_cpu, 1e-6):10.0f} msg/s CPU {batch_reads:7d} reads "
+          f"gain {legacy_cpu / max(batch_cpu, 1e-6):.1f}x")
+    check(nb > 0 and [message_key(m) for m in legacy] == [message_key(m) for m in batch],
+          f"{name} same messages")
+    check(errors == 0 and overruns == 0, f"{name} no framing error")
+    corrupted, expected_errors, expected_overruns = corrupt(capture, 20, opts.seed)
+    batch, batch_cpu, batch_reads, errors, overruns = run_batch(corrupted, kind, opts.chunk, opts.batch_delay)
+    check(errors == expected_errors and overruns == expected_overruns,
+          f"{name} corrupted capture errors {errors} overruns {overruns}")
+
+
+def capture_kind(capture: bytes) -> str:
+    if b'!PDGY' in capture[:2048]:
+        return 'PDGY'
+    elif b'$MXPGN' in capture[:2048]:
+        return 'MXPGN'
+    return 'NMEA0183'
+
+
+def main():
+    opts = _parser().parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    NavigationConfiguration()
+    initialize_feature()
+    captures = []
+    for filename in opts.capture:
+        with open(filename, 'rb') as fd:
+            capture = fd.read()
+        captures.append((os.path.basename(filename), capture))
+    if len(captures) == 0:
+        pdgy, mxpgn = synthesize_n2k(opts)
+        captures = [('ikonvert.cap', pdgy), ('miniplex.cap', mxpgn), ('nmea0183.cap', synthesize_nmea0183(opts))]
+        if opts.write is not None:
+            for name, capture in captures:
+                with open(os.path.join(opts.write, name), 'wb') as fd:
+                    fd.write(capture)
+    for name, capture in captures:
+        benchmark(name, capture, capture_kind(capture), opts)
+    print("Serial ingestion check", "OK" if _failures == 0 else f"FAILED {_failures}")
+    sys.exit(0 if _failures == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#-------------------------------------------------------------------------------
+# Name:        shared_ring_bench
+# Purpose:     Compare latency and CPU of the shared memory ring against the gRPC stream
+#              for NMEA2000 messages between two processes on the same host
+#
+# Author:      Laurent Carré
+#
+# Created:     12/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+import sys
+import time
+import struct
+import queue
+import statistics
+import multiprocessing
+from concurrent import futures
+from argparse import ArgumentParser
+
+import grpc
+
+from navigation_server.router_core import (NMEA2000Msg, N2KSharedRingWriter, N2KSharedRingReader, SharedRingFull,
+                                          SharedRingClosed)
+from navigation_server.generated.n2k_can_service_pb2 import CANReadRequest
+from navigation_server.generated.n2k_can_service_pb2_grpc import (CAN_ControllerServiceServicer, CAN_ControllerServiceStub,
+                                                                  add_CAN_ControllerServiceServicer_to_server)
+from navigation_server.generated.nmea2000_pb2 import nmea2000pb
+
+
+def _parser():
+    p = ArgumentParser(description=sys.argv[0])
+    p.add_argument('-n', '--count', action='store', type=int, default=20000, help='Number of messages')
+    p.add_argument('-r', '--rate', action='store', type=float, default=2000., help='Messages per second')
+    p.add_argument('-p', '--port', action='store', type=int, default=4599, help='gRPC port for the test')
+    return p
+
+
+# the protobuf timestamp is a float (32 bits), so the sending time is carried in the payload
+send_time = struct.Struct("<d")
+
+
+def test_messages(count, rate):
+    """
+    Generator of paced messages with a realistic payload mix (single frame and fast packet)
+    """
+    interval = 1.0 / rate
+    next_ts = time.monotonic()
+    for i in range(count):
+        if i % 4 == 0:
+            msg = NMEA2000Msg(129029, 3, 10, 255, bytearray(43))
+        else:
+            msg = NMEA2000Msg(127250, 2, 12, 255, bytearray(8))
+        send_time.pack_into(msg.payload, 0, time.time())
+        yield msg
+        next_ts += interval
+        delay = next_ts - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BenchServicer(CAN_ControllerServiceServicer):
+
+    def __init__(self, count, rate):
+        self._count = count
+        self._rate = rate
+
+    def ReadNmea2000Msg(self, request, context):
+        for msg in test_messages(self._count, self._rate):
+            msg_pb = nmea2000pb()
+            msg.as_protobuf(msg_pb)
+            yield msg_pb
+
+
+def grpc_consumer(port, result_queue):
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    stub = CAN_ControllerServiceStub(channel)
+    latencies = []
+    cpu_start = time.process_time()
+    for msg_pb in stub.ReadNmea2000Msg(CANReadRequest(client='bench')):
+        msg = NMEA2000Msg(pgn=msg_pb.pgn, protobuf=msg_pb)
+        latencies.append(time.time() - send_time.unpack_from(msg.payload, 0)[0])
+    result_queue.put((latencies, time.process_time() - cpu_start))
+
+
+def ring_consumer(name, token, count, result_queue):
+    ring = N2KSharedRingReader(name, token)
+    latencies = []
+    cpu_start = time.process_time()
+    while len(latencies) < count:
+        try:
+            msg = ring.get_message(2.0)
+        except queue.Empty:
+            break
+        latencies.append(time.time() - send_time.unpack_from(msg.payload, 0)[0])
+    result_queue.put((latencies, time.process_time() - cpu_start))
+    ring.close()
+
+
+def report(title, latencies, cpu_consumer, cpu_producer):
+    latencies.sort()
+    nb = len(latencies)
+    if nb == 0:
+        print(f"{title}: no message received")
+        return
+    print(f"{title}: messages:{nb} latency mean:{statistics.mean(latencies) * 1e6:.0f}us "
+          f"p50:{latencies[nb // 2] * 1e6:.0f}us p99:{latencies[int(nb * 0.99)] * 1e6:.0f}us "
+          f"CPU/msg producer:{cpu_producer / nb * 1e6:.1f}us consumer:{cpu_consumer / nb * 1e6:.1f}us")
+
+
+def bench_grpc(opts):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    add_CAN_ControllerServiceServicer_to_server(BenchServicer(opts.count, opts.rate), server)
+    server.add_insecure_port(f"127.0.0.1:{opts.port}")
+    server.start()
+    result_queue = multiprocessing.Queue()
+    consumer = multiprocessing.Process(target=grpc_consumer, args=(opts.port, result_queue))
+    cpu_start = time.process_time()
+    consumer.start()
+    latencies, cpu_consumer = result_queue.get()
+    cpu_producer = time.process_time() - cpu_start
+    consumer.join()
+    server.stop(0.1)
+    report("gRPC stream", latencies, cpu_consumer, cpu_producer)
+
+
+def bench_ring(opts):
+    ring = N2KSharedRingWriter('bench', 256)
+    result_queue = multiprocessing.Queue()
+    consumer = multiprocessing.Process(target=ring_consumer, args=(ring.name, ring.token, opts.count, result_queue))
+    consumer.start()
+    time.sleep(0.5)     # let the consumer attach
+    cpu_start = time.process_time()
+    dropped = 0
+    for msg in test_messages(opts.count, opts.rate):
+        try:
+            ring.push(msg)
+        except SharedRingFull:
+            dropped += 1
+        except SharedRingClosed:
+            print("Shared ring: closed by the consumer")
+            break
+    cpu_producer = time.process_time() - cpu_start
+    latencies, cpu_consumer = result_queue.get()
+    consumer.join()
+    ring.close()
+    report("Shared ring", latencies, cpu_consumer, cpu_producer)
+    if dropped > 0:
+        print(f"Shared ring: {dropped} messages dropped")
+
+
+def main():
+    opts = _parser().parse_args()
+    multiprocessing.set_start_method('spawn')
+    bench_grpc(opts)
+    bench_ring(opts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#-------------------------------------------------------------------------------
+# Name:        source_arbitration_test
+# Purpose:     Check the redundant sources arbitration and the duplicate suppression
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   The scenarios run on a simulated time (10Hz messages), the messages are submitted to the ArbitrationPoint of
+#   each coupler as the coupler thread does before publishing
+#   - failover when the primary stops and return to the primary after the hold time
+#   - failover on GNSS fix quality (NMEA0183 GGA and NMEA2000 129029) mixing both protocols in a group
+#   - minimum rate
+#   - duplicates suppression between couplers, no suppression of the repetitions of a source
+#   The cost of the arbitration per message is measured at the end
+
+import struct
+import sys
+import time
+
+from navigation_server.router_common import NavGenericMsg, N2K_MSG
+from navigation_server.router_core import NMEA2000Msg, NMEA0183Msg, NMEA0183Sentences, SourceArbitration
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+def n2k(pgn: int, sa: int, payload: bytes) -> NavGenericMsg:
+    return NavGenericMsg(N2K_MSG, msg=NMEA2000Msg(pgn, 2, sa, 255, bytearray(payload)))
+
+
+def position(sa: int, counter: int) -> NavGenericMsg:
+    return n2k(129025, sa, struct.pack('<ii', 475000000 + counter, -31000000))
+
+
+def gnss_position(sa: int, method: int) -> NavGenericMsg:
+    payload = bytearray(43)
+    payload[31] = method << 4
+    return n2k(129029, sa, payload)
+
+
+def gga(talker: str, quality: int) -> NMEA0183Msg:
+    body = "%sGGA,123519,4807.038,N,01131.000,E,%d,08,0.9,545.4,M,46.9,M,," % (talker, quality)
+    return NMEA0183Msg(("$%s*%02X\r\n" % (body, NMEA0183Sentences.b_checksum(body.encode()))).encode())
+
+
+def run(points: dict, schedule, start: float, end: float, step: float = 0.1) -> list:
+    """
+    schedule(t) returns the list of (coupler, msg) at time t
+    return the list of (t, coupler, msg) published
+    """
+    published = []
+    nb_steps = int(round((end - start) / step))
+    for i in range(nb_steps):
+        t = start + i * step
+        for coupler, msg in schedule(t):
+            if points[coupler].accept(msg, t):
+                published.append((t, coupler, msg))
+    return published
+
+
+def sources_of(published: list, start: float, end: float) -> set:
+    return set(coupler for t, coupler, msg in published if start <= t < end)
+
+
+def check_failover() -> bool:
+    ok = True
+    SourceArbitration.configure({'groups': [
+        {'name': 'position', 'pgn': [129025], 'sources': ['CAN:5', 'YDGateway'], 'timeout': 1.0, 'hold': 5.0}]})
+    points = {c: SourceArbitration.point(c) for c in ('CAN', 'YDGateway')}
+    ok &= check(SourceArbitration.point('Other') is None, "coupler outside the arbitration")
+
+    def schedule(t):
+        msgs = [('YDGateway', position(5, int(t * 10)))]
+        # CAN stops between 10 and 20
+        if not 10. <= t < 20.:
+            msgs.insert(0, ('CAN', position(5, int(t * 10))))
+        return msgs
+
+    published = run(points, schedule, 0., 40.)
+    ok &= check(sources_of(published, 0., 10.) == {'CAN'}, "primary before failure")
+    ok &= check(sources_of(published, 11.1, 20.) == {'YDGateway'}, "secondary after failure")
+    # the gap shall not exceed the timeout
+    times = [t for t, c, m in published if 9. < t < 12.]
+    ok &= check(max(b - a for a, b in zip(times, times[1:])) <= 1.15, "failover delay")
+    ok &= check(sources_of(published, 20., 25.) == {'YDGateway'}, "hold before return")
+    ok &= check(sources_of(published, 25.1, 40.) == {'CAN'}, "return to primary")
+    # one message per period except during the timeout of the primary
+    ok &= check(len(published) == 390, f"one message per period {len(published)}")
+    group = SourceArbitration.groups()[0]
+    ok &= check(group.nb_failovers == 2, f"failovers {group.nb_failovers}")
+    events = SourceArbitration.events()
+    ok &= check([(e.previous, e.primary) for e in events] == [(None, 'CAN:5'), ('CAN:5', 'YDGateway:5'),
+                                                             ('YDGateway:5', 'CAN:5')],
+                f"events {[str(e) for e in events]}")
+    return ok
+
+
+def check_fix_quality() -> bool:
+    ok = True
+    SourceArbitration.configure({'groups': [
+        {'name': 'gnss', 'pgn': [129029], 'formatters': ['GGA'], 'sources': ['CAN:10', 'GNSS:GP'], 'hold': 2.0}]})
+    points = {c: SourceArbitration.point(c) for c in ('CAN', 'GNSS')}
+
+    def schedule(t):
+        # CAN GNSS loses the fix between 5 and 10
+        method = 0 if 5. <= t < 10. else 1
+        return [('CAN', gnss_position(10, method)), ('GNSS', gga('GP', 1))]
+
+    published = run(points, schedule, 0., 20.)
+    ok &= check(sources_of(published, 0., 5.) == {'CAN'}, "NMEA2000 primary with fix")
+    ok &= check(sources_of(published, 5., 10.) == {'GNSS'}, "NMEA0183 secondary when no fix on primary")
+    ok &= check(sources_of(published, 10., 12.) == {'GNSS'}, "hold after fix recovery")
+    ok &= check(sources_of(published, 12.1, 20.) == {'CAN'}, "NMEA2000 primary back")
+    # no fix on both sides: none published
+    SourceArbitration.configure({'groups': [{'name': 'gnss', 'formatters': ['GGA']}]})
+    point = SourceArbitration.point('GNSS')
+    published = [point.accept(gga('GP', 0), t * 0.1) for t in range(10)]
+    ok &= check(not any(published), "no fix on the only source")
+    return ok
+
+
+def check_min_rate() -> bool:
+    SourceArbitration.configure({'groups': [
+        {'name': 'heading', 'pgn': [127250], 'sources': ['CAN:1', 'CAN:2'], 'min_rate': 5., 'timeout': 3.,
+         'hold': 1.}]})
+    point = SourceArbitration.point('CAN')
+    published = []
+    for i in range(200):
+        t = i * 0.1
+        # source 1 at 1Hz (too slow), source 2 at 10Hz
+        if i % 10 == 0 and point.accept(n2k(127250, 1, bytes(8)), t):
+            published.append((t, 1))
+        if point.accept(n2k(127250, 2, bytes(8)), t):
+            published.append((t, 2))
+    return check(set(s for t, s in published if t > 2.) == {2}, "slow primary replaced")
+
+
+def check_duplicates() -> bool:
+    ok = True
+    SourceArbitration.configure({'duplicate_window': 0.2, 'couplers': ['CAN', 'YDGateway']})
+    points = {c: SourceArbitration.point(c) for c in ('CAN', 'YDGateway')}
+    nb = 0
+    for i in range(100):
+        t = i * 0.1
+        wind = n2k(130306, 20, struct.pack('<BHHB', i % 256, 500, 1000, 2))
+        if points['CAN'].accept(wind, t):
+            nb += 1
+        # same message through the gateway 20ms later
+        if points['YDGateway'].accept(n2k(130306, 20, wind.msg.payload), t + 0.02):
+            nb += 1
+    ok &= check(nb == 100 and SourceArbitration.duplicates().nb_duplicates == 100, f"duplicates published {nb}")
+    # same source repeating the same message (stationary data) is not suppressed
+    nb = sum(1 for i in range(10) if points['CAN'].accept(n2k(127257, 30, bytes(8)), 20. + i * 0.05))
+    ok &= check(nb == 10, f"repetitions of a source {nb}")
+    # outside the window the copy is published
+    points['CAN'].accept(n2k(127258, 30, bytes(8)), 30.)
+    ok &= check(points['YDGateway'].accept(n2k(127258, 30, bytes(8)), 30.5), "copy outside the window")
+    return ok
+
+
+def measure() -> None:
+    SourceArbitration.configure({'duplicate_window': 0.2, 'groups': [
+        {'name': 'position', 'pgn': [129025, 129026], 'sources': ['CAN:5', 'YDGateway']}]})
+    points = {c: SourceArbitration.point(c) for c in ('CAN', 'YDGateway')}
+    msgs = []
+    for i in range(10000):
+        msgs.append(('CAN', position(5, i)))
+        msgs.append(('YDGateway', position(5, i)))
+        msgs.append(('CAN', n2k(130306, 20, struct.pack('<BHHB', i % 256, i % 1000, 1000, 2))))
+    start = time.perf_counter()
+    for coupler, msg in msgs:
+        points[coupler].accept(msg)
+    elapsed = time.perf_counter() - start
+    print(f"arbitration cost {elapsed / len(msgs) * 1e6:.2f}us/message")
+
+
+def main():
+    ok = check_failover()
+    ok &= check_fix_quality()
+    ok &= check_min_rate()
+    ok &= check_duplicates()
+    measure()
+    SourceArbitration.reset()
+    if ok:
+        print("Source arbitration check OK")
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
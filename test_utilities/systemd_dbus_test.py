@@ -0,0 +1,406 @@
+#-------------------------------------------------------------------------------
+# Name:        systemd_dbus_test
+# Purpose:     Check the systemd D-Bus backend of the agent against a mock systemd object tree
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   The mock tree reproduces the part of the systemd object model used by the agent: Manager methods (LoadUnit,
+#   Start/Stop/RestartUnit, KillUnit, Subscribe), unit objects with the Unit and Service interfaces, the
+#   PropertiesChanged and JobRemoved signals. The jobs are executed in a timer thread as systemd does.
+#   The checks run on a direct MockDBusConnection and, when dbus-daemon and jeepney are present, over a private
+#   bus where the mock tree is served by a jeepney connection (same code path as the system bus)
+#   The agent processes are then checked without D-Bus access, with a fake systemctl command on the PATH
+
+import importlib.util
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from navigation_server.router_common import (MessageServerGlobals, NavThreadingController, NavProfilingController,
+                                             MockDBusTree, MockDBusConnection, DBusException,
+                                             SystemdManager, UnitChangeListener, open_dbus_connection)
+from navigation_server.router_common.configuration import Parameters
+from navigation_server.router_common.systemd_dbus import (SYSTEMD_SERVICE, SYSTEMD_PATH, MANAGER_INTERFACE,
+                                                          UNIT_INTERFACE, SERVICE_INTERFACE, UINT64_UNSET)
+from navigation_server.generated.agent_pb2 import ServiceStateMsg
+
+JOB_DELAY = 0.02
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+def unit_path(name: str) -> str:
+    # systemd escapes the non alphanumeric characters of the unit name
+    return SYSTEMD_PATH + '/unit/' + ''.join(c if c.isalnum() else '_%02x' % ord(c) for c in name)
+
+
+class MockSystemd:
+    """
+    systemd manager and units on a MockDBusTree
+    """
+
+    def __init__(self):
+        self.tree = MockDBusTree(SYSTEMD_SERVICE)
+        manager = self.tree.add_object(SYSTEMD_PATH)
+        for member, function in (('LoadUnit', self.load_unit), ('Subscribe', self.subscribe),
+                                 ('Unsubscribe', self.subscribe), ('StartUnit', self.start_unit),
+                                 ('StopUnit', self.stop_unit), ('RestartUnit', self.restart_unit),
+                                 ('KillUnit', self.kill_unit)):
+            manager.add_method(MANAGER_INTERFACE, member, function)
+        self._job_id = 0
+        self._pid = 1000
+        self.signals = []
+        self.nb_subscribe = 0
+
+    def add_unit(self, name: str, active: bool):
+        self.tree.add_object(unit_path(name), {
+            UNIT_INTERFACE: {'Id': name, 'LoadState': 'loaded', 'ActiveState': 'active' if active else 'inactive',
+                             'SubState': 'running' if active else 'dead'},
+            SERVICE_INTERFACE: {'MainPID': ('u', self._new_pid() if active else 0), 'NRestarts': ('u', 0),
+                                'MemoryCurrent': UINT64_UNSET, 'CPUUsageNSec': UINT64_UNSET}})
+
+    def _new_pid(self) -> int:
+        self._pid += 1
+        return self._pid
+
+    def load_unit(self, name):
+        path = unit_path(name)
+        if not self.tree.has_object(path):
+            self.tree.add_object(path, {UNIT_INTERFACE: {'Id': name, 'LoadState': 'not-found',
+                                                          'ActiveState': 'inactive', 'SubState': 'dead'}})
+        return 'o', (path,)
+
+    def subscribe(self):
+        self.nb_subscribe += 1
+        return '', ()
+
+    def _job(self, name: str, transitions: list, result: str = 'done') -> tuple:
+        self._job_id += 1
+        job = SYSTEMD_PATH + '/job/%d' % self._job_id
+        job_id = self._job_id
+
+        def run():
+            for interface, changes in transitions:
+                self.tree.set_properties(unit_path(name), interface, changes)
+            self.tree.emit_signal(SYSTEMD_PATH, MANAGER_INTERFACE, 'JobRemoved', 'uoss', (job_id, job, name, result))
+
+        threading.Timer(JOB_DELAY, run).start()
+        return 'o', (job,)
+
+    def _loaded(self, name: str):
+        path = unit_path(name)
+        if not self.tree.has_object(path) or \
+                self.tree.get_object(path).properties[UNIT_INTERFACE]['LoadState'] != 'loaded':
+            raise DBusException('org.freedesktop.systemd1.NoSuchUnit', f"Unit {name} not found.")
+
+    def start_unit(self, name, mode):
+        self._loaded(name)
+        return self._job(name, [(UNIT_INTERFACE, {'ActiveState': 'activating', 'SubState': 'start'}),
+                                (SERVICE_INTERFACE, {'MainPID': ('u', self._new_pid())}),
+                                (UNIT_INTERFACE, {'ActiveState': 'active', 'SubState': 'running'})])
+
+    def stop_unit(self, name, mode):
+        self._loaded(name)
+        return self._job(name, [(UNIT_INTERFACE, {'ActiveState': 'deactivating', 'SubState': 'stop-sigterm'}),
+                                (SERVICE_INTERFACE, {'MainPID': ('u', 0)}),
+                                (UNIT_INTERFACE, {'ActiveState': 'inactive', 'SubState': 'dead'})])
+
+    def restart_unit(self, name, mode):
+        self._loaded(name)
+        return self._job(name, [(UNIT_INTERFACE, {'ActiveState': 'deactivating', 'SubState': 'stop-sigterm'}),
+                                (UNIT_INTERFACE, {'ActiveState': 'activating', 'SubState': 'start'}),
+                                (SERVICE_INTERFACE, {'MainPID': ('u', self._new_pid())}),
+                                (UNIT_INTERFACE, {'ActiveState': 'active', 'SubState': 'running'})])
+
+    def kill_unit(self, name, who, signal_number):
+        self._loaded(name)
+        self.signals.append((name, who, signal_number))
+        return '', ()
+
+    def crash(self, name: str):
+        """
+        main process killed, restarted by systemd (Restart=on-failure)
+        """
+        path = unit_path(name)
+        restarts = self.tree.get_object(path).properties[SERVICE_INTERFACE]['NRestarts'][1]
+        self.tree.set_properties(path, UNIT_INTERFACE, {'ActiveState': 'activating', 'SubState': 'auto-restart'})
+        self.tree.set_properties(path, SERVICE_INTERFACE, {'MainPID': ('u', self._new_pid()),
+                                                            'NRestarts': ('u', restarts + 1)})
+        self.tree.set_properties(path, UNIT_INTERFACE, {'ActiveState': 'active', 'SubState': 'running'})
+
+
+class BusTreeServer:
+    """
+    Serves a MockDBusTree on a bus through a jeepney connection
+    """
+
+    def __init__(self, tree: MockDBusTree, address: str):
+        from jeepney import MatchRule, message_bus, new_method_return, new_error, new_signal, DBusAddress
+        from jeepney.io.threading import open_dbus_connection as jeepney_connection, DBusRouter
+        self._new_method_return = new_method_return
+        self._new_error = new_error
+        self._new_signal = new_signal
+        self._address_class = DBusAddress
+        self._tree = tree
+        self._connection = jeepney_connection(bus=address)
+        self._router = DBusRouter(self._connection)
+        self._router.send_and_get_reply(message_bus.RequestName(tree.service), timeout=5.)
+        self._queue = queue.Queue()
+        self._filter = self._router.filter(MatchRule(type='method_call'), queue=self._queue)
+        tree.add_listener(self._signal)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        from jeepney import HeaderFields
+        while True:
+            msg = self._queue.get()
+            if msg is None:
+                break
+            fields = msg.header.fields
+            try:
+                signature, body = self._tree.handle_call(fields[HeaderFields.path], fields.get(HeaderFields.interface),
+                                                         fields[HeaderFields.member], msg.body)
+                reply = self._new_method_return(msg, signature or None, body)
+            except DBusException as err:
+                reply = self._new_error(msg, err.name, 's', (str(err),))
+            self._router.send(reply)
+
+    def _signal(self, path, interface, member, signature, body):
+        emitter = self._address_class(path, interface=interface)
+        self._router.send(self._new_signal(emitter, member, signature, body))
+
+    def close(self):
+        self._tree.remove_listener(self._signal)
+        self._queue.put(None)
+        self._filter.close()
+        self._router.close()
+        self._connection.close()
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+def check_manager(systemd: MockSystemd, connection, label: str) -> bool:
+    ok = True
+    manager = SystemdManager(connection)
+    ok &= check(systemd.nb_subscribe == 1, f"{label}: systemd subscription")
+    listener = UnitChangeListener()
+    manager.add_listener(listener)
+    # initial states
+    navigation = manager.unit('navigation')
+    energy = manager.unit('energy.service')
+    ok &= check(navigation.name == 'navigation.service' and navigation.status_code() == 3, f"{label}: inactive unit")
+    ok &= check(energy.status_code() == 0 and energy.sub_state == 'running' and energy.main_pid > 0,
+                f"{label}: active unit")
+    unknown = manager.unit('unknown')
+    ok &= check(unknown.status_code() == 4 and not unknown.exists, f"{label}: unknown unit")
+    ok &= check(manager.unit('navigation') is navigation, f"{label}: unit loaded once")
+    # status reads are served by the cache
+    nb_calls = systemd.tree.nb_calls
+    for i in range(100):
+        navigation.status_code()
+    ok &= check(systemd.tree.nb_calls == nb_calls, f"{label}: status without D-Bus calls")
+    # start job
+    result = manager.wait_job(manager.start_unit('navigation'), 2.)
+    ok &= check(result == 'done', f"{label}: start job result {result}")
+    ok &= check(navigation.status_code() == 0 and navigation.sub_state == 'running' and navigation.main_pid > 0,
+                f"{label}: state pushed after start {navigation.active_state} {navigation.main_pid}")
+    ok &= check(listener.get_changes(1.) == ['navigation.service'], f"{label}: change notified")
+    # crash and automatic restart by systemd
+    pid = navigation.main_pid
+    systemd.crash('navigation.service')
+    ok &= check(wait_for(lambda: navigation.restarts == 1), f"{label}: restart counter {navigation.restarts}")
+    ok &= check(navigation.main_pid != pid and navigation.is_active, f"{label}: new main PID")
+    # properties invalidated without value
+    systemd.tree.set_properties(unit_path('navigation.service'), UNIT_INTERFACE, {'SubState': 'reload'}, emit=False)
+    systemd.tree.emit_signal(unit_path('navigation.service'), 'org.freedesktop.DBus.Properties',
+                             'PropertiesChanged', 'sa{sv}as', (UNIT_INTERFACE, {}, ['SubState']))
+    ok &= check(wait_for(lambda: navigation.sub_state == 'reload'), f"{label}: invalidated property read")
+    # accounting is read on request only
+    ok &= check(navigation.memory == 0 and navigation.cpu_usage_ns == 0, f"{label}: accounting not available")
+    systemd.tree.set_properties(unit_path('navigation.service'), SERVICE_INTERFACE,
+                                {'MemoryCurrent': 52428800, 'CPUUsageNSec': 1250000000}, emit=False)
+    navigation.refresh_accounting()
+    ok &= check(navigation.memory == 52428800 and navigation.cpu_usage_ns == 1250000000,
+                f"{label}: accounting {navigation.memory} {navigation.cpu_usage_ns}")
+    msg = ServiceStateMsg()
+    navigation.as_protobuf(msg)
+    ok &= check(msg.unit == 'navigation.service' and msg.active_state == 'active' and msg.restarts == 1 and
+                msg.memory == 52428800, f"{label}: protobuf state")
+    # signals and jobs
+    manager.kill_unit('navigation', 2)
+    ok &= check(systemd.signals[-1] == ('navigation.service', 'main', 2), f"{label}: KillUnit")
+    pid = navigation.main_pid
+    ok &= check(manager.wait_job(manager.restart_unit('navigation'), 2.) == 'done' and navigation.is_active and
+                navigation.main_pid != pid, f"{label}: restart job")
+    ok &= check(manager.wait_job(manager.stop_unit('navigation'), 2.) == 'done' and
+                navigation.status_code() == 3 and navigation.main_pid == 0, f"{label}: stop job")
+    try:
+        manager.start_unit('unknown')
+        ok &= check(False, f"{label}: error for unknown unit")
+    except DBusException as err:
+        ok &= check(err.name == 'org.freedesktop.systemd1.NoSuchUnit', f"{label}: error name {err.name}")
+    # jobs of other units do not accumulate
+    for i in range(200):
+        manager.wait_job(manager.start_unit('energy'), 2.)
+    ok &= check(len(manager._jobs) <= 64, f"{label}: job results bounded")
+    # the changes of the units that are not supervised are ignored
+    listener.get_changes(0.)
+    systemd.add_unit('other.service', False)
+    systemd.tree.set_properties(unit_path('other.service'), UNIT_INTERFACE, {'ActiveState': 'active'})
+    ok &= check(listener.get_changes(0.1) == [], f"{label}: unit not supervised")
+    manager.remove_listener(listener)
+    manager.close()
+    return ok
+
+
+def measure(systemd: MockSystemd, connection, label: str):
+    manager = SystemdManager(connection)
+    unit = manager.unit('energy')
+    nb = 10000
+    start = time.perf_counter()
+    for i in range(nb):
+        unit.status_code()
+    cached = (time.perf_counter() - start) / nb
+    nb = 200
+    start = time.perf_counter()
+    for i in range(nb):
+        unit.refresh_accounting()
+    call = (time.perf_counter() - start) / nb
+    print(f"{label}: cached status {cached * 1e6:.2f}us, accounting read {call * 1e6:.0f}us")
+    manager.close()
+
+
+def private_bus(work_dir: str):
+    """
+    start a private dbus-daemon, return (process, address) or None
+    """
+    if shutil.which('dbus-daemon') is None or importlib.util.find_spec('jeepney') is None:
+        return None
+    address = 'unix:path=' + os.path.join(work_dir, 'bus')
+    process = subprocess.Popen(['dbus-daemon', '--session', '--nofork', '--nopidfile', '--address=' + address],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for(lambda: os.path.exists(os.path.join(work_dir, 'bus')), 5.):
+        process.kill()
+        return None
+    return process, address
+
+
+FAKE_SYSTEMCTL = """#!/bin/sh
+echo "$@" >> {work_dir}/systemctl.log
+case "$*" in
+    "status unknown") exit 4;;
+    "status navigation") [ -f {work_dir}/running ] && exit 0 || exit 3;;
+    "start navigation") touch {work_dir}/running;;
+    "stop navigation") rm -f {work_dir}/running;;
+esac
+exit 0
+"""
+
+
+def check_systemctl_fallback(work_dir: str) -> bool:
+    """
+    agent processes controlled with systemctl (fake command on the PATH) when systemd is not reachable on D-Bus
+    """
+    try:
+        from navigation_server.agent.agent_service import AgentService, SystemdProcess
+    except ModuleNotFoundError as err:
+        print(f"Agent not available ({err}) - systemctl fallback checks skipped")
+        return True
+    bin_dir = os.path.join(work_dir, 'bin')
+    os.mkdir(bin_dir)
+    systemctl = os.path.join(bin_dir, 'systemctl')
+    with open(systemctl, 'w') as fp:
+        fp.write(FAKE_SYSTEMCTL.format(work_dir=work_dir))
+    os.chmod(systemctl, 0o755)
+    path = os.environ['PATH']
+    os.environ['PATH'] = bin_dir + os.pathsep + path
+    ok = True
+    try:
+        agent = AgentService(Parameters({'name': 'Agent', 'server': 'Main',
+                                         'bus': 'unix:path=' + os.path.join(work_dir, 'nobus')}))
+        navigation = SystemdProcess(Parameters({'name': 'navigation', 'controlled': False}))
+        unknown = SystemdProcess(Parameters({'name': 'unknown'}))
+        agent.add_process(navigation)
+        agent.add_process(unknown)
+        ok &= check(not agent.systemd_available(), "fallback: no D-Bus access")
+        ok &= check(unknown.status() == 4 and navigation.status() == 3, "fallback: status")
+        ok &= check(navigation.start() == 0 and navigation.status() == 0, "fallback: start")
+        navigation.send_sigint()
+        navigation.stop()
+        ok &= check(navigation.status() == 3, "fallback: stop")
+        with open(os.path.join(work_dir, 'systemctl.log')) as fp:
+            commands = fp.read().splitlines()
+        ok &= check(f"kill --kill-who=main --signal={signal.SIGINT:d} navigation" in commands,
+                    f"fallback: commands {commands}")
+    finally:
+        os.environ['PATH'] = path
+    return ok
+
+
+def new_systemd() -> MockSystemd:
+    systemd = MockSystemd()
+    systemd.add_unit('navigation.service', False)
+    systemd.add_unit('energy.service', True)
+    return systemd
+
+
+def main():
+    MessageServerGlobals.thread_controller = NavThreadingController()
+    MessageServerGlobals.profiling_controller = NavProfilingController()
+    logging.getLogger("ShipDataServer").setLevel(logging.CRITICAL)
+    systemd = new_systemd()
+    ok = check_manager(systemd, MockDBusConnection(systemd.tree), "mock")
+    measure(systemd, MockDBusConnection(systemd.tree), "mock")
+    with tempfile.TemporaryDirectory() as work_dir:
+        bus = private_bus(work_dir)
+        if bus is None:
+            print("No dbus-daemon or jeepney - private bus checks skipped")
+        else:
+            process, address = bus
+            systemd = new_systemd()
+            server = BusTreeServer(systemd.tree, address)
+            connections = []
+            try:
+                connections.append(open_dbus_connection(address))
+                ok &= check_manager(systemd, connections[-1], "bus")
+                connections.append(open_dbus_connection(address))
+                measure(systemd, connections[-1], "bus")
+            finally:
+                for connection in connections:
+                    connection.close()
+                server.close()
+                process.terminate()
+                process.wait()
+        ok &= check_systemctl_fallback(work_dir)
+    if ok:
+        print("systemd D-Bus backend check OK")
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#-------------------------------------------------------------------------------
+# Name:        vedirect_parser_benchmark
+# Purpose:     Check and benchmark the buffer oriented VEDirect parser on recorded traces
+#
+# Author:      Laurent Carré
+#
+# Created:     18/10/2025
+# Copyright:   (c) Laurent Carré Sterwen Technology 2021-2025
+# Licence:     Eclipse Public License 2.0
+#-------------------------------------------------------------------------------
+
+#   The traces are the files written by the VEDirect coupler with trace_vedirect (one Text block per record)
+#   Without -f, a trace with MPPT and BMV blocks and HEX frames is generated and read through RawLogFile
+#   Checks: typed fields, checksum errors, HEX frames inside Text blocks, any split of the read buffers
+#   Benchmark: the trace is replayed in serial read chunks through the parser and through the former per byte
+#   state machine (reproduced below as reference)
+
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from navigation_server.couplers import VEDirectParser, VEDirectRecord, VEDirectHexRecord
+from navigation_server.log_replay import RawLogFile
+
+MPPT_FIELDS = [('PID', '0xA053'), ('FW', '159'), ('SER#', 'HQ2132QY2KR'), ('V', '13250'), ('I', '4100'),
+               ('VPV', '38120'), ('PPV', '56'), ('CS', '3'), ('MPPT', '2'), ('OR', '0x00000000'), ('ERR', '0'),
+               ('LOAD', 'ON'), ('IL', '300'), ('H19', '10342'), ('H20', '23'), ('H21', '212'), ('H22', '61'),
+               ('H23', '245'), ('HSDS', '181')]
+BMV_FIELDS = [('PID', '0xA389'), ('V', '13247'), ('VS', '12780'), ('I', '-3250'), ('P', '-43'), ('CE', '-42100'),
+              ('SOC', '876'), ('TTG', '1240'), ('Alarm', 'OFF'), ('Relay', 'OFF'), ('AR', '0'), ('BMV', 'SmartShunt'),
+              ('FW', '0413'), ('MON', '0')]
+BMV_HISTORY = [('H1', '-102340'), ('H2', '-42100'), ('H3', '-51200'), ('H4', '312'), ('H5', '0'), ('H6', '-8123400'),
+               ('H7', '11920'), ('H8', '14620'), ('H9', '86400'), ('H10', '45'), ('H11', '0'), ('H12', '0'),
+               ('H15', '11810'), ('H16', '14400'), ('H17', '8123'), ('H18', '9210')]
+
+
+def text_block(fields: list) -> bytes:
+    block = b''.join(b'\r\n%s\t%s' % (label.encode(), value.encode()) for label, value in fields)
+    block += b'\r\nChecksum\t'
+    return block + bytes([(-sum(block)) & 0xFF])
+
+
+def hex_frame(command: int, data: bytes) -> bytes:
+    checksum = (0x55 - command - sum(data)) & 0xFF
+    return b':%X%s\n' % (command, (data + bytes([checksum])).hex().upper().encode())
+
+
+def generate_trace(filename: str, nb_seconds: int):
+    """
+    one MPPT block per second, BMV main and history blocks alternating, one async HEX frame every 5 seconds
+    """
+    start = datetime.datetime(2025, 10, 18, 12, 0, 0)
+    index = 0
+    with open(filename, 'w') as fd:
+        fd.write("H0|VEDirectInterface|V1.0\n")
+        for second in range(nb_seconds):
+            blocks = [text_block(MPPT_FIELDS), text_block(BMV_FIELDS if second % 2 == 0 else BMV_HISTORY)]
+            if second % 5 == 0:
+                blocks[0] = hex_frame(0xA, bytes([0x01, 0xED, 0x00, 0x10, 0x27])) + blocks[0]
+            for block in blocks:
+                date = (start + datetime.timedelta(seconds=second)).strftime("%Y-%m-%d %H:%M:%S.%f")
+                fd.write("R%d#%s>%s\n" % (index, date, block.hex()))
+                index += 1
+
+
+def read_trace(filename: str) -> bytes:
+    log = RawLogFile(filename)
+    log.load_file()
+    if not log.file_type.startswith('VEDirect'):
+        raise ValueError(f"{filename} is not a VEDirect trace")
+    return b''.join(bytes.fromhex(record.message) for record in log.records())
+
+
+def chunks(stream: bytes, rng: random.Random, max_size: int = 64) -> list:
+    result = []
+    index = 0
+    while index < len(stream):
+        size = rng.randint(1, max_size)
+        result.append(stream[index:index + size])
+        index += size
+    return result
+
+
+class LegacyTextParser:
+    """
+    Former per byte state machine (Text protocol part), used as reference for the benchmark
+    """
+    (HEX, WAIT_HEADER, IN_KEY, IN_VALUE, IN_CHECKSUM) = range(5)
+
+    def __init__(self):
+        self.key = ''
+        self.value = ''
+        self.bytes_sum = 0
+        self.state = self.WAIT_HEADER
+        self.dict = {}
+
+    def input(self, byte):
+        if byte == 0x3A and self.state != self.IN_CHECKSUM:
+            self.state = self.HEX
+        if self.state == self.WAIT_HEADER:
+            self.bytes_sum += byte
+            if byte == 0x0A:
+                self.state = self.IN_KEY
+            return None
+        elif self.state == self.IN_KEY:
+            self.bytes_sum += byte
+            if byte == 0x09:
+                self.state = self.IN_CHECKSUM if self.key == 'Checksum' else self.IN_VALUE
+            else:
+                self.key += chr(byte)
+            return None
+        elif self.state == self.IN_VALUE:
+            self.bytes_sum += byte
+            if byte == 0x0D:
+                self.state = self.WAIT_HEADER
+                self.dict[self.key] = self.value
+                self.key = ''
+                self.value = ''
+            else:
+                self.value += chr(byte)
+            return None
+        elif self.state == self.IN_CHECKSUM:
+            self.bytes_sum += byte
+            self.key = ''
+            self.value = ''
+            self.state = self.WAIT_HEADER
+            valid = self.bytes_sum % 256 == 0
+            self.bytes_sum = 0
+            if valid:
+                result = self.dict
+                self.dict = {}
+                return result
+        elif self.state == self.HEX:
+            self.bytes_sum = 0
+            if byte == 0x0A:
+                self.state = self.WAIT_HEADER
+        return None
+
+    def feed(self, data) -> list:
+        records = []
+        for byte in data:
+            packet = self.input(byte)
+            if packet is not None:
+                records.append(packet)
+        return records
+
+
+def check(condition: bool, text: str) -> bool:
+    if not condition:
+        print("FAILED:", text)
+    return condition
+
+
+def check_parser() -> bool:
+    ok = True
+    parser = VEDirectParser()
+    records = parser.feed(text_block(MPPT_FIELDS))
+    ok &= check(len(records) == 1 and type(records[0]) is VEDirectRecord, "one record per block")
+    record = records[0]
+    ok &= check(record['V'] == 13250 and record['PID'] == '0xA053' and record['LOAD'] == 'ON', "typed fields")
+    ok &= check(abs(record.value('V') - 13.25) < 1e-9 and VEDirectRecord.unit('V') == 'V', "scaled value")
+    ok &= check(abs(record.value('H20') - 0.23) < 1e-9 and VEDirectRecord.unit('H20') == 'kWh', "yield today")
+    ok &= check(record.value('PID') == '0xA053', "string value")
+    # the history block has negative values
+    record = parser.feed(text_block(BMV_HISTORY))[0]
+    ok &= check(record['H1'] == -102340 and abs(record.value('H1') + 102.34) < 1e-9, "negative values")
+    # corrupted block
+    block = bytearray(text_block(MPPT_FIELDS))
+    block[10] ^= 0x01
+    ok &= check(parser.feed(bytes(block)) == [] and parser.nb_checksum_errors == 1, "checksum error")
+    ok &= check(len(parser.feed(text_block(BMV_FIELDS))) == 1, "resynchronisation after error")
+    # HEX frame inside a Text block
+    block = text_block(MPPT_FIELDS)
+    frame = hex_frame(0xA, bytes([0x01, 0xED, 0x00, 0x10, 0x27]))
+    records = parser.feed(block[:40] + frame + block[40:])
+    ok &= check([type(r) for r in records] == [VEDirectHexRecord, VEDirectRecord] and records[0].valid and
+                records[0].command == 0xA and records[0].data == bytes([0x01, 0xED, 0x00, 0x10, 0x27]),
+                "HEX frame inside a Text block")
+    # checksum byte equal to ':'
+    fields = list(MPPT_FIELDS)
+    for pad in range(256):
+        if pad % 95 == 0x1A:
+            # no ':' in the values
+            continue
+        fields[2] = ('SER#', 'HQ2132QY2K' + chr(0x20 + pad % 95) * (1 + pad // 95))
+        block = text_block(fields)
+        if block[-1] == 0x3A:
+            break
+    ok &= check(block[-1] == 0x3A and len(parser.feed(block + text_block(BMV_FIELDS))) == 2, "':' as checksum")
+    return ok
+
+
+def check_splits(stream: bytes, nb_blocks: int, nb_hex: int) -> bool:
+    ok = True
+    rng = random.Random(1)
+    for max_size in (1, 7, 64, 512):
+        parser = VEDirectParser()
+        records = []
+        for chunk in chunks(stream, rng, max_size):
+            records.extend(parser.feed(chunk))
+        nb_text = sum(1 for r in records if type(r) is VEDirectRecord)
+        nb_frames = sum(1 for r in records if type(r) is VEDirectHexRecord and r.valid)
+        ok &= check(nb_text == nb_blocks and nb_frames == nb_hex and parser.nb_checksum_errors == 0,
+                    f"reads of at most {max_size} bytes: {nb_text} blocks {nb_frames} HEX frames")
+    return ok
+
+
+def benchmark(stream: bytes, chunk_size: int):
+    rng = random.Random(2)
+    reads = chunks(stream, rng, chunk_size)
+    results = {}
+    for name, parser in (('per byte state machine', LegacyTextParser()), ('buffer parser', VEDirectParser())):
+        start = time.perf_counter()
+        nb_records = 0
+        for data in reads:
+            nb_records += len(parser.feed(data))
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:24s}: {nb_records} records {len(stream) / elapsed / 1e6:.2f}MB/s "
+              f"{elapsed / len(stream) * 1e9:.0f}ns/byte")
+    # one VEDirect line is at most 1920 bytes/s
+    ratio = results['per byte state machine'] / results['buffer parser']
+    print(f"speedup {ratio:.1f}x, CPU for one line at 19200 bauds: "
+          f"{1920. * results['buffer parser'] / len(stream) * 100.:.3f}%")
+
+
+def main():
+    p = ArgumentParser(description="VEDirect parser check and benchmark")
+    p.add_argument('-f', '--file', action='append', default=None, help='VEDirect trace file (several allowed)')
+    p.add_argument('-d', '--duration', type=int, default=3600, help='seconds of generated trace')
+    p.add_argument('-c', '--chunk', type=int, default=256, help='maximum size of the serial reads')
+    opts = p.parse_args()
+    ok = check_parser()
+    if opts.file is None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            filename = os.path.join(work_dir, "TRACE-VEDirect.log")
+            generate_trace(filename, opts.duration)
+            stream = read_trace(filename)
+        ok &= check_splits(stream, 2 * opts.duration, (opts.duration + 4) // 5)
+    else:
+        stream = b''.join(read_trace(f) for f in opts.file)
+    benchmark(stream, opts.chunk)
+    if ok:
+        print("VEDirect parser check OK")
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())